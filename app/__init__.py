@@ -1,15 +1,84 @@
 from flask import Flask
 from app.api.auth import auth_bp
 from app.api.ecf import ecf_bp
+from app.api.metrics import metrics_bp
+from app.api.health import health_bp
 from flask_cors import CORS
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_generation.base_builder import BaseECFBuilder
+from app.services.metrics import metrics
+from app.services.idempotency import idempotency_cache
+from app.services.auth.seed_service import seed_service
+from app.tasks.queue import job_queue
+from app.services.xml_signer import key_store, parse_passwords
+from app.services.compression import response_compressor
+from app.services.request_log import request_log
+from app.services.warmup import warmup
+from app.services.sequence_allocator import sequence_allocator
+from app.services.archive import document_archive
+from app.services.totals import totals_engine
+from app.services.emitter_profiles import emitter_profiles
+from app.services.offload import offload, parse_pool_sizes
 
 def create_app(config_class):
     app = Flask(__name__)
     app.config.from_object(config_class)
+
+    ECFBuilderManager.backend = app.config.get('ECF_BUILDER_BACKEND', 'manual')
+    BaseECFBuilder.lines_per_page = app.config.get('ECF_PAGINATION_LINES', 0)
+    metrics.configure(app.config.get('ECF_METRICS_ENABLED', True),
+                      app.config.get('ECF_METRICS_DIR'),
+                      app.config.get('ECF_METRICS_FLUSH_INTERVAL', 1.0))
+    idempotency_cache.configure(app.config.get('ECF_IDEMPOTENCY_ENABLED', True),
+                                app.config.get('ECF_IDEMPOTENCY_DB'),
+                                app.config.get('ECF_IDEMPOTENCY_MAX_ENTRIES', 10000),
+                                app.config.get('ECF_IDEMPOTENCY_TTL', 86400),
+                                app.config.get('ECF_IDEMPOTENCY_WAIT', 10.0))
+    seed_service.configure(app.config.get('SEMILLA_POOL_SIZE', 256),
+                           app.config.get('SEMILLA_TTL', 300),
+                           app.config.get('SEMILLA_MAX_AGE', 60),
+                           app.config.get('SEMILLA_DB'))
+    job_queue.configure(app.config.get('ECF_TASKS_DB'))
+    sequence_allocator.configure(app.config.get('ECF_SEQUENCE_DB'),
+                                 app.config.get('ECF_SEQUENCE_BLOCK_SIZE', 100))
+    document_archive.configure(app.config.get('ECF_ARCHIVE_ENABLED', True),
+                               app.config.get('ECF_ARCHIVE_DIR'),
+                               app.config.get('ECF_ARCHIVE_SEGMENT_DOCS', 262144),
+                               app.config.get('ECF_ARCHIVE_CODEC', 'zstd'),
+                               app.config.get('ECF_ARCHIVE_LEVEL', 3))
+    totals_engine.configure(app.config.get('ECF_TOTALS_MODE', 'missing'),
+                            app.config.get('ECF_TOTALS_TOLERANCE', '1.00'))
+    offload.configure(app.config.get('ECF_SERVER_MODE', 'sync') == 'threaded',
+                      parse_pool_sizes(app.config.get('ECF_OFFLOAD_POOLS', 'build=2')),
+                      app.config.get('ECF_OFFLOAD_QUEUE', 64),
+                      app.config.get('ECF_OFFLOAD_RETRY_AFTER', 1))
+    emitter_profiles.configure(app.config.get('ECF_PROFILES_DB'),
+                               app.config.get('ECF_PROFILES_CHECK_INTERVAL', 1.0))
+    key_store.configure(app.config.get('ECF_CERTS_DIR'),
+                        parse_passwords(app.config.get('ECF_CERT_PASSWORDS')),
+                        app.config.get('ECF_CERT_PASSWORD'),
+                        app.config.get('ECF_KEY_CACHE_SIZE', 32),
+                        app.config.get('ECF_KEY_CACHE_TTL', 3600))
+    request_log.configure(app.config.get('ECF_LOG_ENABLED', True),
+                          app.config.get('ECF_LOG_SAMPLE_RATE', 1.0),
+                          app.config.get('ECF_LOG_PAYLOAD', 'off'),
+                          app.config.get('ECF_LOG_PAYLOAD_SAMPLE_RATE', 0.01),
+                          app.config.get('ECF_LOG_PAYLOAD_MAX_BYTES', 4096),
+                          app.config.get('ECF_LOG_QUEUE_SIZE', 10000))
+    request_log.install(app.logger)
+    response_compressor.configure(app.config.get('ECF_COMPRESSION_ENCODINGS', 'zstd,gzip'),
+                                  app.config.get('ECF_COMPRESSION_MIN_BYTES', 1400),
+                                  app.config.get('ECF_COMPRESSION_GZIP_LEVEL', 6),
+                                  app.config.get('ECF_COMPRESSION_ZSTD_LEVEL', 3))
     
     # Initialize CORS
     CORS(app)
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(ecf_bp, url_prefix='/ecf')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(health_bp)
+
+    # Al final: con preload_app esto corre en el maestro de gunicorn, antes del fork
+    warmup.configure(app.config.get('ECF_WARMUP', 'background'))
     return app
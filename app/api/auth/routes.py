@@ -1,5 +1,5 @@
 from . import auth_bp
-from app.services.auth.semilla_builder import SemillaBuilder
+from app.services.auth.seed_service import seed_service
 from flask import Response
 @auth_bp.route('/login', methods=['POST', 'GET'])
 def login():
@@ -7,5 +7,6 @@ def login():
 
 @auth_bp.route('/semilla', methods=['POST', 'GET'])
 def semilla():
-    semillaXML = SemillaBuilder().get_xml_string()
+    # Sale de un pool ya generado y queda registrada para validarla al volver firmada
+    semillaXML = seed_service.issue()
     return Response(semillaXML, mimetype='application/xml')
\ No newline at end of file
@@ -1,46 +1,772 @@
+import json
+import random
+import itertools
+from functools import partial
 from . import ecf_bp
-from flask import request, jsonify, current_app as app
+from flask import request, jsonify, stream_with_context, url_for, current_app as app
 from app.services.xml_builder import ECFBuilderFactory
 from app.services.validate_xml import XMLValidator
+from app.services.schema_registry import SchemaUnavailableError
+from app.services.batch_builder import build_batch, build_chunk, build_document_chunk, read_chunk
+from app.services.ecf_reader import ecf_reader
+from app.services.xml_generation.document_builders import DOCUMENT_BUILDERS
+from app.services.metrics import metrics, PhaseTimer
+from app.services.idempotency import idempotency_cache
+from app.tasks.queue import job_queue
+from app.services.xml_signer import xml_signer
+from app.services.payload_validator import payload_validator
+from app.services.compression import response_compressor
+from app.services.request_log import request_log
+from app.services.sequence_allocator import sequence_allocator, parse_encf, unassigned_slot, check_unassigned, SequenceError
+from app.services.archive import document_archive, parse_fecha
+from app.services.totals import totals_engine
+from app.services.emitter_profiles import emitter_profiles, ProfileError
+from app.services.offload import offload, Overloaded
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def _should_validate():
+    mode = app.config.get('ECF_VALIDATION_MODE', 'request')
+    if mode == 'off':
+        return False
+    if mode == 'always':
+        return True
+    if request.args.get('validate', '').lower() in ('1', 'true', 'yes'):
+        return True
+    if mode == 'sample':
+        return random.random() < app.config.get('ECF_VALIDATION_SAMPLE_RATE', 0.0)
+    return False
+
+def _should_sign():
+    mode = app.config.get('ECF_SIGN_MODE', 'off')
+    if mode == 'always':
+        return True
+    return mode == 'request' and request.args.get('sign', '').lower() in ('1', 'true', 'yes')
+
+def _should_enqueue():
+    mode = app.config.get('ECF_ASYNC_MODE', 'request')
+    if mode == 'always':
+        return True
+    return mode == 'request' and request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def _should_stream(json_data):
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    min_items = app.config.get('ECF_STREAM_MIN_ITEMS')
+    return bool(min_items) and len(json_data.get('DetallesItems') or []) >= min_items
+
+def _is_compact():
+    value = request.args.get('format') or request.headers.get('X-ECF-Format') or app.config.get('ECF_RESPONSE_FORMAT', 'pretty')
+    return value.lower() == 'compact'
+
+def _xml_response(body, stream=False):
+    """Respuesta XML, comprimida si el cliente lo acepta y el documento lo amerita."""
+    encoding = response_compressor.negotiate(request.accept_encodings)
+    if encoding and not stream and len(body) < response_compressor.min_bytes:
+        encoding = None
+    if encoding:
+        body = response_compressor.compress_stream(body, encoding) if stream else response_compressor.compress(body, encoding)
+    response = app.response_class(body, mimetype='application/xml')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if response_compressor.encodings:
+        response.vary.add('Accept-Encoding')
+    return response
+
+def _finish(response, timer, tipo_ecf, status=None):
+    # Histogramas por fase (/metrics) y resumen de la petición en Server-Timing
+    if status is not None:
+        response.status_code = status
+    response.headers['Server-Timing'] = timer.server_timing()
+    metrics.record(timer, tipo_ecf, response.status_code)
+    # request.json ya está parseado; el registro se escribe desde el hilo del log.
+    # calculate_content_length() leería entera una respuesta en streaming: ahí no hay tamaño
+    size = None if response.is_streamed else response.calculate_content_length()
+    request_log.request(tipo_ecf, response.status_code, timer, request.get_json(silent=True),
+                        request.content_length, size)
+    return response
+
+def _preflight(json_data, document=None):
+    """Errores del JSON según las reglas del XSD; [] si no se revisa o está bien."""
+    mode = app.config.get('ECF_PREFLIGHT_MODE', 'enforce')
+    if mode == 'off':
+        return []
+    errors = payload_validator.validate(json_data, document)
+    if errors and mode == 'report':
+        app.logger.warning("Payload con %d errores de validación previa (modo report)", len(errors))
+        return []
+    return errors
+
+def _sequence_slot(json_data):
+    """(IdDoc, RNCEmisor, TipoeCF) si el servicio tiene que asignar el eNCF, o None."""
+    if app.config.get('ECF_SEQUENCE_MODE', 'missing') != 'missing':
+        return None
+    return unassigned_slot(json_data)
+
+def _assign_sequence(json_data, slot=None):
+    """
+    Completa eNCF (y FechaVencimientoSecuencia si el XSD del tipo la lleva) cuando
+    el payload no lo trae y devuelve el eNCF asignado, o None. Lo que no se pueda
+    leer lo reporta la validación previa.
+    """
+    slot = slot or _sequence_slot(json_data)
+    if slot is None:
+        return None
+    return sequence_allocator.assign(slot)
+
+def _preflight_unassigned(json_data, slot):
+    # Validación previa antes de asignar el eNCF: un payload rechazado no gasta número
+    return check_unassigned(slot, lambda: _preflight(json_data))
+
+def _void_sequence(json_data, encf, reason):
+    # El número ya se entregó y el documento no salió: queda para anularlo ante la DGII
+    try:
+        sequence_allocator.void(json_data['Encabezado']['Emisor']['RNCEmisor'], encf, reason[:500])
+    except Exception:
+        app.logger.exception("No se pudo anotar el eNCF %s como anulado", encf)
+
+def _archive(xml_bytes, json_data):
+    # El documento ya se generó: si no se puede archivar se informa, pero se entrega igual
+    try:
+        document_archive.append_document(xml_bytes, json_data)
+    except Exception:
+        app.logger.exception("No se pudo archivar el e-CF")
+
+def _archived_stream(body, json_data):
+    # Se comprime a medida que sale; si el cliente corta la descarga no se archiva
+    writer = document_archive.stream_writer(json_data)
+    for chunk in body:
+        writer.write(chunk)
+        yield chunk
+    try:
+        writer.close()
+    except Exception:
+        app.logger.exception("No se pudo archivar el e-CF")
+
+def _overloaded(e, timer, tipo_ecf):
+    # Modo 'threaded': la etapa tiene llenos sus hilos y su cola (app/services/offload.py)
+    response = _finish(jsonify({"error": str(e), "stage": e.stage}), timer, tipo_ecf, 503)
+    response.headers['Retry-After'] = str(offload.retry_after)
+    return response
+
+def _internal_error(e, timer, tipo_ecf, context):
+    # Fuera del try del build: la respuesta sigue siendo JSON, no la página 500 de Flask
+    app.logger.exception("%s: %s", context, e)
+    return _finish(jsonify({"error": f"Error interno: {str(e)}"}), timer, tipo_ecf, 500)
+
+class _InvalidDocument(Exception):
+    """El XML generado no cumple el XSD; sale de generate() para que no se cachee."""
+    def __init__(self, errors):
+        super().__init__("El XML generado no cumple el XSD")
+        self.errors = errors
+
+def _tipo_from(json_data):
+    try:
+        return int(json_data['Encabezado']['IdDoc']['TipoeCF'])
+    except (KeyError, TypeError, ValueError):
+        return 0
 
 @ecf_bp.route('/ecf', methods=['POST', 'GET'])
 def create_ecf():
+    timer = PhaseTimer()
     json_data = request.json
+    timer.mark('parse')
+    tipo_ecf = _tipo_from(json_data)
+
+    # Emisor con solo RNCEmisor: se completa con el perfil registrado
+    emisor_profile = emitter_profiles.apply(json_data)
+    timer.mark('profile')
+
+    # Totales desde DetallesItems: se completan los que faltan antes de validar
+    try:
+        errors = totals_engine.apply(json_data)
+    except Exception as e:
+        return _internal_error(e, timer, tipo_ecf, "Error al calcular los totales")
+    timer.mark('totals')
+
+    # Payloads inválidos se rechazan aquí, sin construir ni serializar nada
+    # y sin gastar un eNCF: el número se asigna después, justo antes del build
+    slot = _sequence_slot(json_data)
+    errors += _preflight_unassigned(json_data, slot)
+    timer.mark('preflight')
+    if errors:
+        return _finish(jsonify({
+            "error": "El payload no cumple las reglas del e-CF",
+            "tipo_ecf": tipo_ecf,
+            "errors": errors,
+        }), timer, tipo_ecf, 400)
+
+    # Modo asíncrono: solo se registra el documento; build, firma y envío a la
+    # DGII corren en los workers de app/tasks
+    if _should_enqueue():
+        if not isinstance(json_data, dict):
+            return _finish(jsonify({"error": "Se esperaba un objeto JSON"}), timer, tipo_ecf, 400)
+        try:
+            _assign_sequence(json_data, slot)
+        except SequenceError as e:
+            return _finish(jsonify({"error": str(e), "tipo_ecf": tipo_ecf}), timer, tipo_ecf, 409)
+        timer.mark('sequence')
+        job_id = job_queue.enqueue(json_data)
+        timer.mark('enqueue')
+        response = jsonify({"job_id": job_id, "status": "pending", "status_url": url_for('ecf.get_job', job_id=job_id)})
+        response.headers['Location'] = url_for('ecf.get_job', job_id=job_id)
+        return _finish(response, timer, tipo_ecf, 202)
+
+    # eNCF asignado en esta petición: si el documento no sale, se anota como anulado
+    assigned = []
+
+    def assign_sequence():
+        if slot is not None and not assigned:
+            assigned.append(_assign_sequence(json_data, slot))
+            timer.mark('sequence')
+
     try:
         # Instanciamos el builder adecuado usando el Factory
-        builder = ECFBuilderFactory.get_builder(json_data)
-        app.logger.info(f"Builder creado: {json_data}")
-        
-        # Construimos el árbol
-        builder.build()
-        
-        # Obtenemos el string
-        xml_str = builder.get_xml_string()
-
-        # --- VALIDACIÓN ---
-        """        # Asumiendo que tu XSD está en app/models/ecf_schema.xsd
-        xsd_path = "app/models/schemas/e-CF 34 v.1.0 (1).xsd"
-        app.logger.info(f"Validando XML contra XSD: {xsd_path}")
-        app.logger.info(f"XML a validar: {xml_str}")
-        validator = XMLValidator(xml_str.encode('utf-8'), xsd_path)
-        is_valid = validator.validate()
-        """
-
-        xml_str = xml_str.encode('utf-8')
-    
-        
-        # Opcional: Retornar los errores junto con el XML para depurar
-       
-        
-        app.logger.info("XML validado correctamente contra el XSD.")
-        
+        builder = ECFBuilderFactory.get_builder(json_data, emisor_profile=emisor_profile)
+        builder.pretty = not _is_compact()
+        timer.mark('dispatch')
+
+        validate = _should_validate()
+        sign = _should_sign()
+        client_key = request.headers.get('Idempotency-Key')
+
+        # Documentos grandes: se escriben item por item directo a la respuesta.
+        # La validación y la firma necesitan el documento completo, así que lo desactivan.
+        # No pasan por la caché de idempotencia, salvo que el cliente mande su Idempotency-Key
+        if not validate and not sign and not client_key and _should_stream(json_data):
+            assign_sequence()
+            body = builder.iter_xml_bytes()
+            if document_archive.enabled:
+                body = _archived_stream(body, json_data)
+            timer.mark('build')
+            return _finish(_xml_response(body, stream=True), timer, tipo_ecf)
+
+        variant = ('firmado' if sign else '') + ('' if builder.pretty else ',compacto')
+        cache_key = idempotency_cache.make_key(json_data, variant, client_key) if idempotency_cache.enabled else None
+
+        def generate():
+            # Dentro de la caché: reintentos y peticiones simultáneas del mismo payload sin eNCF
+            # reciben el documento con el número que se asignó una sola vez
+            assign_sequence()
+            # Construimos el árbol (en modo 'threaded', en el pool acotado de la etapa)
+            offload.run('build', builder.build)
+            timer.mark('build')
+            for section, seconds in builder.timings.items():
+                timer.add(f"build_{section}", seconds)
+
+            # Firma sobre el mismo árbol, sin serializar ni volver a parsear
+            if sign:
+                # builder.root dentro del pool: el backend 'direct' parsea ahí su texto
+                rnc = json_data['Encabezado']['Emisor']['RNCEmisor']
+                offload.run('sign', lambda: xml_signer.sign_tree(builder.root, rnc, builder.pretty))
+                timer.mark('sign')
+
+            # Obtenemos los bytes (el backend 'direct' ya los tiene escritos)
+            xml_str = builder.get_xml_bytes()
+            timer.mark('serialize')
+
+            # --- VALIDACIÓN ---
+            # Antes de salir de generate(): en la caché solo entra XML validado.
+            # El esquema de cada TipoeCF se compila una sola vez por worker (SchemaRegistry)
+            if validate:
+                validator = XMLValidator(xml_str, builder.tipo_ecf)
+                try:
+                    is_valid = offload.run('validate', validator.validate)
+                except SchemaUnavailableError as e:
+                    # No es culpa del cliente: el XSD de la DGII no compila en libxml2
+                    app.logger.warning("Validación omitida: %s", e)
+                else:
+                    timer.mark('validate')
+                    if not is_valid:
+                        raise _InvalidDocument(validator.get_errors())
+            return xml_str
+
+        # Reintentos del mismo documento: se devuelve el XML ya generado, con su
+        # FechaHoraFirma original, y las peticiones simultáneas esperan una sola construcción
+        if cache_key:
+            xml_str, cache_hit = idempotency_cache.get_or_build(cache_key, generate)
+            timer.mark('cache')
+        else:
+            xml_str, cache_hit = generate(), False
+
+        # Un reintento servido desde la caché ya quedó archivado la primera vez
+        if document_archive.enabled and not cache_hit:
+            _archive(xml_str, json_data)
+            timer.mark('archive')
+
         # Retornamos texto plano (o XML) para que lo veas en Postman
-        return app.response_class(xml_str, mimetype='application/xml')
-        
+        response = _xml_response(xml_str)
+        timer.mark('compress')
+        if cache_key:
+            response.headers['X-ECF-Cache'] = 'hit' if cache_hit else 'miss'
+        return _finish(response, timer, tipo_ecf)
+
+    except SequenceError as e:
+        return _finish(jsonify({"error": str(e), "tipo_ecf": tipo_ecf}), timer, tipo_ecf, 409)
+    except _InvalidDocument as e:
+        app.logger.error("XML inválido para e-CF %s: %d errores", builder.tipo_ecf, len(e.errors))
+        for encf in assigned:
+            _void_sequence(json_data, encf, str(e))
+        return _finish(jsonify({
+            "error": str(e),
+            "tipo_ecf": builder.tipo_ecf,
+            "errors": e.errors,
+        }), timer, tipo_ecf, 400)
+    except Overloaded as e:
+        for encf in assigned:
+            _void_sequence(json_data, encf, str(e))
+        return _overloaded(e, timer, tipo_ecf)
     except ValueError as e:
-        app.logger.error(f"Error al generar ECF: {str(e)}")
-        return jsonify({"error": str(e)}), 400
+        app.logger.error("Error al generar ECF: %s", e)
+        for encf in assigned:
+            _void_sequence(json_data, encf, str(e))
+        return _finish(jsonify({"error": str(e)}), timer, tipo_ecf, 400)
+    except Exception as e:
+        app.logger.exception("Error al generar ECF: %s", e)
+        for encf in assigned:
+            _void_sequence(json_data, encf, f"Error interno: {str(e)}")
+        return _finish(jsonify({"error": f"Error interno: {str(e)}"}), timer, tipo_ecf, 500)
+
+
+NDJSON_READ_SIZE = 64 * 1024
+
+def _iter_lines(stream):
+    # Por bloques: iterar el stream de werkzeug línea a línea hace una lectura por byte
+    # Una línea más larga que el bloque (un e-CF grande) se junta una sola vez, al cerrarse
+    pending = []
+    while True:
+        chunk = stream.read(NDJSON_READ_SIZE)
+        if not chunk:
+            break
+        if b'\n' not in chunk:
+            pending.append(chunk)
+            continue
+        lines = chunk.split(b'\n')
+        pending.append(lines[0])
+        yield b''.join(pending)
+        yield from lines[1:-1]
+        pending = [lines[-1]]
+    yield b''.join(pending)
+
+def _iter_ndjson(stream):
+    # Una línea por documento; se lee del socket a medida que el pool pide más
+    for line in _iter_lines(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+def _batch_payloads():
+    # Arreglo JSON o stream NDJSON (Content-Type: application/x-ndjson); None si no es ninguno
+    if request.mimetype in NDJSON_MIMETYPES:
+        return _iter_ndjson(request.stream)
+    payloads = request.get_json(silent=True)
+    return payloads if isinstance(payloads, list) else None
+
+@ecf_bp.route('/batch', methods=['POST'])
+def create_ecf_batch():
+    """
+    Genera muchos e-CF en paralelo y devuelve un registro NDJSON por documento.
+
+    Acepta un arreglo JSON o un stream NDJSON (Content-Type: application/x-ndjson).
+    """
+    payloads = _batch_payloads()
+    if payloads is None:
+        return jsonify({"error": "Se esperaba un arreglo JSON o un stream NDJSON"}), 400
+
+    validate = _should_validate()
+    sign = _should_sign()
+    preflight = app.config.get('ECF_PREFLIGHT_MODE', 'enforce') == 'enforce'
+    workers = app.config.get('ECF_BATCH_WORKERS')
+    chunk_size = app.config.get('ECF_BATCH_CHUNK_SIZE', 16)
+    max_in_flight = app.config.get('ECF_BATCH_MAX_IN_FLIGHT')
+    # Los eNCF faltantes se asignan en el proceso del pool, después de la validación previa
+    assign = app.config.get('ECF_SEQUENCE_MODE', 'missing') == 'missing'
+    chunk_fn = partial(build_chunk, pretty=not _is_compact(), assign=assign)
+
+    def generate():
+        for record in build_batch(payloads, validate, workers, chunk_size, max_in_flight, sign, preflight, chunk_fn):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def _create_document(document):
+    """
+    RFCE, ARECF o ACECF de un solo documento. Camino liviano: sin asignar
+    secuencias, sin caché de idempotencia ni archivo (el eNCF es el del e-CF
+    que el documento resume o responde).
+    """
+    timer = PhaseTimer()
+    json_data = request.get_json(silent=True)
+    timer.mark('parse')
+    if not isinstance(json_data, dict):
+        return _finish(jsonify({"error": "Se esperaba un objeto JSON"}), timer, document, 400)
+
+    builder = DOCUMENT_BUILDERS[document](json_data)
+    try:
+        errors = builder.prepare()
     except Exception as e:
-        app.logger.error(f"Error al generar ECF: {str(e)}")
-        return jsonify({"error": f"Error interno: {str(e)}"}), 500
-    
+        return _internal_error(e, timer, document, f"Error al preparar {document}")
+    timer.mark('totals')
+    errors += _preflight(builder.data, document)
+    timer.mark('preflight')
+    if errors:
+        return _finish(jsonify({
+            "error": f"El payload no cumple las reglas del {document}",
+            "tipo_ecf": builder.tipo_ecf,
+            "errors": errors,
+        }), timer, document, 400)
+
+    try:
+        builder.pretty = not _is_compact()
+        offload.run('build', builder.build)
+        timer.mark('build')
+        if _should_sign():
+            offload.run('sign', lambda: xml_signer.sign_tree(builder.root, builder.signer_rnc(), builder.pretty))
+            timer.mark('sign')
+        xml_bytes = builder.get_xml_bytes()
+
+        if _should_validate():
+            validator = XMLValidator(xml_bytes, document)
+            try:
+                is_valid = offload.run('validate', validator.validate)
+            except SchemaUnavailableError as e:
+                app.logger.warning("Validación omitida: %s", e)
+            else:
+                timer.mark('validate')
+                if not is_valid:
+                    return _finish(jsonify({
+                        "error": "El XML generado no cumple el XSD",
+                        "errors": validator.get_errors(),
+                    }), timer, document, 400)
+
+        response = _xml_response(xml_bytes)
+        timer.mark('compress')
+        return _finish(response, timer, document)
+
+    except Overloaded as e:
+        return _overloaded(e, timer, document)
+    except ValueError as e:
+        app.logger.error("Error al generar %s: %s", document, e)
+        return _finish(jsonify({"error": str(e)}), timer, document, 400)
+    except Exception as e:
+        app.logger.exception("Error al generar %s: %s", document, e)
+        return _finish(jsonify({"error": f"Error interno: {str(e)}"}), timer, document, 500)
+
+def _with_receiver(payloads, detail):
+    # ?rnc_comprador= completa el RNCComprador de los acuses que no lo traen
+    rnc = request.args.get('rnc_comprador')
+    for payload in payloads:
+        if rnc and isinstance(payload, dict):
+            block = payload.get(detail, payload)
+            if isinstance(block, dict):
+                block.setdefault('RNCComprador', rnc)
+        yield payload
+
+def _create_document_batch(document):
+    """Un registro NDJSON por documento y en el orden de entrada, igual que /batch."""
+    payloads = _batch_payloads()
+    if payloads is None:
+        return jsonify({"error": "Se esperaba un arreglo JSON o un stream NDJSON"}), 400
+
+    detail = DOCUMENT_BUILDERS[document].detail
+    if detail:
+        payloads = _with_receiver(payloads, detail)
+    validate = _should_validate()
+    sign = _should_sign()
+    preflight = app.config.get('ECF_PREFLIGHT_MODE', 'enforce') == 'enforce'
+    chunk_fn = partial(build_document_chunk, document=document, pretty=not _is_compact())
+    workers = app.config.get('ECF_BATCH_WORKERS')
+    chunk_size = app.config.get('ECF_DOCUMENT_BATCH_CHUNK_SIZE', 256)
+    max_in_flight = app.config.get('ECF_BATCH_MAX_IN_FLIGHT')
+
+    def generate():
+        for record in build_batch(payloads, validate, workers, chunk_size, max_in_flight, sign, preflight, chunk_fn):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@ecf_bp.route('/rfce', methods=['POST'])
+def create_rfce():
+    """
+    RFCE (Resumen Factura de Consumo) desde el mismo JSON del e-CF 32, más
+    Encabezado.CodigoSeguridadeCF, para cajas de alto volumen.
+    """
+    return _create_document('RFCE')
+
+@ecf_bp.route('/rfce/batch', methods=['POST'])
+def create_rfce_batch():
+    """RFCE de muchas facturas de consumo (p. ej. un turno completo)."""
+    return _create_document_batch('RFCE')
+
+@ecf_bp.route('/arecf', methods=['POST'])
+def create_arecf():
+    """Acuse de recibo (ARECF) de un e-CF recibido."""
+    return _create_document('ARECF')
+
+@ecf_bp.route('/arecf/batch', methods=['POST'])
+def create_arecf_batch():
+    """
+    Acuses de recibo de muchos e-CF recibidos: cada elemento trae RNCEmisor,
+    eNCF y Estado (más RNCComprador, o ?rnc_comprador= para todos).
+    """
+    return _create_document_batch('ARECF')
+
+@ecf_bp.route('/acecf', methods=['POST'])
+def create_acecf():
+    """Aprobación comercial (ACECF) de un e-CF recibido."""
+    return _create_document('ACECF')
+
+@ecf_bp.route('/acecf/batch', methods=['POST'])
+def create_acecf_batch():
+    """
+    Aprobaciones comerciales de muchos e-CF recibidos: cada elemento trae
+    RNCEmisor, eNCF, FechaEmision, MontoTotal y Estado (y DetalleMotivoRechazo
+    si es 2); RNCComprador como en /arecf/batch.
+    """
+    return _create_document_batch('ACECF')
+
+
+# Desde este tamaño (o con ?stream=1, o sin Content-Length) /parse responde a medida que lee
+PARSE_STREAM_MIN_BYTES = 1024 * 1024
+PARSE_FLUSH_SIZE = 64 * 1024
+
+def _json_response(data):
+    # json.dumps y no jsonify: las claves quedan en el orden del XSD, igual que en modo stream
+    return app.response_class(json.dumps(data, ensure_ascii=False), mimetype='application/json')
+
+def _iter_parsed(document):
+    """El JSON de un documento recibido por partes: los Item salen a medida que se leen."""
+    buf = []
+    size = 0
+    sep = '{'
+    for key, value in document.head.items():
+        buf.append(f'{sep}{json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}')
+        sep = ', '
+    try:
+        if document.document == 'ECF':
+            buf.append(f'{sep}"DetallesItems": [')
+            sep = ', '
+            item_sep = ''
+            for item in document.items():
+                text = item_sep + json.dumps(item, ensure_ascii=False)
+                item_sep = ', '
+                buf.append(text)
+                size += len(text)
+                if size >= PARSE_FLUSH_SIZE:
+                    yield ''.join(buf)
+                    buf, size = [], 0
+            buf.append(']')
+        for key, value in document.tail().items():
+            buf.append(f'{sep}{json.dumps(key)}: {json.dumps(value, ensure_ascii=False)}')
+            sep = ', '
+    except ValueError as e:
+        # Ya se envió el 200: la respuesta queda cortada, sin el '}' final
+        app.logger.error("Documento recibido inválido a mitad de la lectura: %s", e)
+        yield ''.join(buf)
+        return
+    buf.append('}' if sep == ', ' else '{}')
+    yield ''.join(buf)
+
+@ecf_bp.route('/parse', methods=['POST'])
+def parse_ecf():
+    """
+    JSON de un e-CF recibido (o de un RFCE, ARECF o ACECF), con la misma forma
+    que acepta /ecf/ecf. Los documentos grandes se leen del socket y se
+    responden a medida que salen los Item, sin tenerlos completos en memoria.
+    """
+    timer = PhaseTimer()
+    length = request.content_length
+    stream = request.args.get('stream', '').lower() in ('1', 'true', 'yes') or \
+        length is None or length >= PARSE_STREAM_MIN_BYTES
+    try:
+        document = ecf_reader.open(request.stream if stream else request.get_data())
+        timer.mark('parse')
+        tipo = document.tipo_ecf or document.document
+        if stream:
+            response = app.response_class(stream_with_context(_iter_parsed(document)), mimetype='application/json')
+            return _finish(response, timer, tipo)
+        response = _json_response(document.to_json())
+        timer.mark('read')
+        return _finish(response, timer, tipo)
+    except ValueError as e:
+        app.logger.error("Documento recibido inválido: %s", e)
+        return _finish(jsonify({"error": str(e)}), timer, 0, 400)
+    except Exception as e:
+        app.logger.exception("Error al leer el documento recibido: %s", e)
+        return _finish(jsonify({"error": f"Error interno: {str(e)}"}), timer, 0, 500)
+
+@ecf_bp.route('/parse/batch', methods=['POST'])
+def parse_ecf_batch():
+    """
+    Varios documentos recibidos en un multipart/form-data (un archivo XML por
+    parte), leídos en paralelo en el pool. Un registro NDJSON por archivo, en
+    el orden de subida, con su JSON en "json".
+    """
+    files = [f for _, f in request.files.items(multi=True)]
+    if not files:
+        return jsonify({"error": "Se esperaban archivos XML en un multipart/form-data"}), 400
+
+    validate = _should_validate()
+    workers = app.config.get('ECF_BATCH_WORKERS')
+    chunk_size = app.config.get('ECF_BATCH_CHUNK_SIZE', 16)
+    max_in_flight = app.config.get('ECF_BATCH_MAX_IN_FLIGHT')
+    # Se leen antes de responder: werkzeug cierra los archivos de la petición al terminar la vista
+    names = [f.filename for f in files]
+    sources = [f.read() for f in files]
+
+    def generate():
+        for record in build_batch(sources, validate, workers, chunk_size, max_in_flight, chunk_fn=read_chunk):
+            record["source"] = names[record["index"]]
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@ecf_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado de un trabajo del pipeline asíncrono; con ?xml=1 devuelve el XML generado."""
+    want_xml = request.args.get('xml', '').lower() in ('1', 'true', 'yes')
+    job = job_queue.get(job_id, with_xml=want_xml)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if want_xml:
+        if job['xml'] is None:
+            return jsonify({"error": "El XML todavía no se ha generado", "stage": job['stage']}), 409
+        return app.response_class(job['xml'], mimetype='application/xml')
+    return jsonify(job)
+
+
+@ecf_bp.route('/emisores', methods=['GET'])
+def list_profiles():
+    return jsonify([profile.as_json() for profile in emitter_profiles.list()])
+
+@ecf_bp.route('/emisores/<rnc>', methods=['PUT'])
+def put_profile(rnc):
+    """
+    Registra o reemplaza el perfil del emisor: los campos fijos de <Emisor>
+    (RazonSocialEmisor, DireccionEmisor...). Los e-CF que traen solo
+    RNCEmisor en el Emisor se completan con él.
+    """
+    data = request.get_json(silent=True)
+    try:
+        profile, created = emitter_profiles.put(rnc, data)
+    except ProfileError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    return jsonify(profile.as_json()), 201 if created else 200
+
+@ecf_bp.route('/emisores/<rnc>', methods=['GET'])
+def get_profile(rnc):
+    profile = emitter_profiles.get(rnc)
+    if profile is None:
+        return jsonify({"error": f"No hay un perfil registrado para {rnc}"}), 404
+    return jsonify(profile.as_json())
+
+@ecf_bp.route('/emisores/<rnc>', methods=['DELETE'])
+def delete_profile(rnc):
+    if not emitter_profiles.delete(rnc):
+        return jsonify({"error": f"No hay un perfil registrado para {rnc}"}), 404
+    return '', 204
+
+
+def _sequence_number(value):
+    # 'E310000000001' o 1
+    if isinstance(value, str) and value[:1] == 'E':
+        return parse_encf(value)[1]
+    return int(value)
+
+@ecf_bp.route('/secuencias', methods=['POST'])
+def authorize_sequences():
+    """Registra un rango de eNCF autorizado por la DGII."""
+    data = request.get_json(silent=True) or {}
+    try:
+        created = sequence_allocator.authorize(data['RNCEmisor'], data['TipoeCF'], _sequence_number(data['desde']),
+                                               _sequence_number(data['hasta']), data['FechaVencimientoSecuencia'])
+    except KeyError as e:
+        return jsonify({"error": f"Falta el campo {e.args[0]}"}), 400
+    except (SequenceError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(created), 201
+
+@ecf_bp.route('/secuencias', methods=['GET'])
+def sequence_capacity():
+    """Capacidad restante por emisor y tipo (?rnc=, ?tipo=) y tramos reservados sin usar."""
+    rnc = request.args.get('rnc')
+    tipo = request.args.get('tipo', type=int)
+    return jsonify({"capacity": sequence_allocator.capacity(rnc, tipo), "unused": sequence_allocator.unused(rnc, tipo)})
+
+@ecf_bp.route('/secuencias/asignar', methods=['POST'])
+def allocate_sequences():
+    """Asigna `cantidad` eNCF (máximo 1000) para documentos que se arman fuera del servicio."""
+    data = request.get_json(silent=True) or {}
+    try:
+        count = int(data.get('cantidad', 1))
+        if not 1 <= count <= 1000:
+            raise ValueError("cantidad debe estar entre 1 y 1000")
+        allocated = sequence_allocator.allocate_many(data['RNCEmisor'], data['TipoeCF'], count)
+    except KeyError as e:
+        return jsonify({"error": f"Falta el campo {e.args[0]}"}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except SequenceError as e:
+        return jsonify({"error": str(e)}), 409
+    # Si se agotaron los rangos, `secuencias` trae menos de las solicitadas
+    return jsonify({
+        "solicitadas": count,
+        "secuencias": [{"eNCF": encf, "FechaVencimientoSecuencia": expires} for encf, expires in allocated],
+    })
+
+
+def _archive_disabled():
+    return jsonify({"error": "El archivo de documentos está desactivado (ECF_ARCHIVE_ENABLED)"}), 404
+
+@ecf_bp.route('/archivo', methods=['GET'])
+def query_archive():
+    """
+    Documentos archivados por emisor, comprador y rango de FechaEmision, en NDJSON
+    ordenado por fecha: ?emisor=&comprador=&desde=&hasta=&tipo=&limit=; con ?xml=1
+    cada línea trae también el XML.
+    """
+    if not document_archive.enabled:
+        return _archive_disabled()
+    args = request.args
+    with_xml = args.get('xml', '').lower() in ('1', 'true', 'yes')
+    limit = args.get('limit', type=int)
+    try:
+        desde, hasta = parse_fecha(args.get('desde')), parse_fecha(args.get('hasta'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    documents = document_archive.query(args.get('emisor'), args.get('comprador'), desde, hasta,
+                                       args.get('tipo', type=int))
+
+    def generate():
+        for document in itertools.islice(documents, limit):
+            if with_xml:
+                document["xml"] = document_archive.read(document["segment"], document["offset"]).decode('utf-8')
+            yield json.dumps(document, ensure_ascii=False) + "\n"
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@ecf_bp.route('/<encf>', methods=['GET'])
+def get_archived(encf):
+    """
+    XML archivado de un eNCF (el último, si se generó más de una vez); ?rnc= filtra
+    por emisor. Con ?meta=1 devuelve las versiones archivadas en JSON.
+    """
+    if not document_archive.enabled:
+        return _archive_disabled()
+    rnc = request.args.get('rnc')
+    if request.args.get('meta', '').lower() in ('1', 'true', 'yes'):
+        return jsonify({"eNCF": encf, "documentos": document_archive.lookup(encf, rnc)})
+    found = document_archive.get(encf, rnc)
+    if found is None:
+        return jsonify({"error": "Documento no encontrado en el archivo", "eNCF": encf}), 404
+    document, xml_bytes = found
+    response = _xml_response(xml_bytes)
+    response.headers['X-ECF-RNCEmisor'] = document["RNCEmisor"]
+    response.headers['X-ECF-FechaEmision'] = document["FechaEmision"] or ''
+    return response
@@ -0,0 +1,15 @@
+import os
+from . import health_bp
+from flask import jsonify
+from app.services.warmup import warmup
+
+@health_bp.route('/health/live', methods=['GET'])
+def live():
+    # El proceso responde; no dice nada de si ya puede atender rápido
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+@health_bp.route('/health/ready', methods=['GET'])
+def ready():
+    # 200 solo cuando los esquemas y builders ya están compilados (ver app/services/warmup.py)
+    body = dict(warmup.status(), pid=os.getpid())
+    return jsonify(body), 200 if warmup.ready else 503
@@ -0,0 +1,8 @@
+from . import metrics_bp
+from flask import Response
+from app.services.metrics import metrics
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Suma de todos los workers (ver app/services/metrics.py)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -1,6 +1,6 @@
 from datetime import datetime
 
 class Semilla:
-    def __init__(self, valor):
+    def __init__(self, valor, fecha=None):
         self.valor = valor
-        self.fecha = datetime.now()
\ No newline at end of file
+        self.fecha = fecha or datetime.now()
\ No newline at end of file
@@ -0,0 +1,533 @@
+"""
+Archivo de los e-CF generados: segmentos de solo anexado, comprimidos, con índices en disco.
+
+Cada documento se comprime (zstd, o zlib si zstandard no está instalado) y se
+anexa al segmento activo:
+
+  data-NNNNNN.seg     registros [longitud comprimida, longitud, crc32, códec] + XML comprimido
+  entries-NNNNNN.idx  una entrada de 48 bytes por documento: eNCF, RNC emisor,
+                      RNC comprador, TipoeCF, FechaEmision (AAAAMMDD) y posición del registro
+
+Todos los procesos escriben en el mismo segmento, de a un documento, bajo un
+flock sobre ARCHIVE.lock; el registro se escribe antes que su entrada, así un
+lector nunca ve una entrada sin su documento. Al llegar a
+ECF_ARCHIVE_SEGMENT_DOCS documentos se abre el siguiente segmento y el
+anterior se sella en segundo plano con índices ordenados:
+
+  encf-N.idx       eNCF + RNC emisor + n.º de entrada
+  emisor-N.idx     RNC emisor + fecha + n.º de entrada
+  comprador-N.idx  RNC comprador + fecha + n.º de entrada
+  fecha-N.idx      fecha + n.º de entrada
+  bloom-N.idx      filtro de Bloom de los eNCF (marca que el segmento está sellado)
+
+Las claves están en big-endian, así que se comparan como bytes: una búsqueda
+es una búsqueda binaria sobre el archivo mapeado en memoria. Un eNCF se busca
+primero en el filtro de Bloom de cada segmento, y solo se recorre el índice de
+los que pueden tenerlo. Los segmentos sin sellar se leen desde sus entradas:
+cada proceso lleva dicts eNCF/emisor/comprador/fecha -> entradas que completa con lo
+nuevo en cada consulta.
+
+No hay fsync por documento: lo escrito queda en el page cache del sistema y
+sobrevive a la caída del proceso, no a la de la máquina.
+"""
+import os
+import mmap
+import zlib
+import time
+import heapq
+import fcntl
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ENTRY = struct.Struct('<13s11s11sBIQ')
+RECORD = struct.Struct('<IIIB')
+CODEC_ZLIB, CODEC_ZSTD = 1, 2
+
+# Tamaño de registro de cada índice sellado (el n.º de entrada ocupa los 4 últimos bytes)
+INDEX_SIZES = {'encf': 28, 'emisor': 19, 'comprador': 19, 'fecha': 8}
+BLOOM_BITS_PER_DOC = 10
+BLOOM_PROBES = 4
+
+
+def _key(value, size):
+    return str(value or '').encode('ascii', 'replace')[:size].ljust(size, b'\0')
+
+
+def _text(value):
+    return value.rstrip(b'\0').decode('ascii')
+
+
+def parse_fecha(value):
+    """'2023-10-27', '27-10-2023' o 20231027 -> 20231027"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, int):
+        return value
+    value = str(value)
+    for fmt in ('%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return parsed.year * 10000 + parsed.month * 100 + parsed.day
+    raise ValueError(f"Fecha inválida: {value!r}")
+
+
+def format_fecha(value):
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}" if value else None
+
+
+def document_fields(json_data):
+    """eNCF, RNC emisor, RNC comprador, FechaEmision y TipoeCF del JSON de entrada."""
+    encabezado = json_data.get('Encabezado') or {}
+    id_doc = encabezado.get('IdDoc') or {}
+    emisor = encabezado.get('Emisor') or {}
+    comprador = encabezado.get('Comprador') or {}
+    return (id_doc.get('eNCF'), emisor.get('RNCEmisor'), comprador.get('RNCComprador'),
+            emisor.get('FechaEmision'), int(id_doc.get('TipoeCF') or 0))
+
+
+def _bloom_probes(encf, bits):
+    digest = hashlib.blake2b(encf, digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % bits for i in range(BLOOM_PROBES)]
+
+
+def _lower_bound(mm, size, count, key):
+    lo, hi, n = 0, count, len(key)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = mid * size
+        if mm[start:start + n] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class _MappedFile:
+    """mmap de solo lectura de un archivo que puede crecer: se vuelve a mapear al leer más allá."""
+    def __init__(self, path):
+        self.path = path
+        self.mm = b''
+
+    def view(self, end=None):
+        if end is None or end > len(self.mm):
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    # El mapa anterior se libera cuando nadie lo usa
+                    self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mm
+
+
+class _Segment:
+    def __init__(self, directory, number):
+        self.number = number
+        self.path = lambda name, ext='idx': os.path.join(directory, f"{name}-{number:06d}.{ext}")
+        self.data = _MappedFile(self.path('data', 'seg'))
+        self.entries = _MappedFile(self.path('entries'))
+        self.sealed = False
+        self.indexes = {}
+        self.bloom = None
+        # Segmento sin sellar: entradas ya leídas y clave -> [n.º de entrada] en memoria
+        self.count = 0
+        self.by_encf = {}
+        self.by_emisor = {}
+        self.by_comprador = {}
+        self.by_fecha = {}
+        self.lock = threading.Lock()
+
+    def open_indexes(self):
+        self.indexes = {name: _MappedFile(self.path(name)).view() for name in INDEX_SIZES}
+        self.bloom = _MappedFile(self.path('bloom')).view()
+        self.sealed = True
+        self.by_encf, self.by_emisor, self.by_comprador, self.by_fecha = {}, {}, {}, {}
+
+    def refresh(self):
+        # Lo que otros procesos anexaron desde la última consulta (una entrada a medias se ignora)
+        count = os.stat(self.entries.path).st_size // ENTRY.size
+        if count > self.count:
+            with self.lock:
+                mm = self.entries.view(count * ENTRY.size)
+                new = ENTRY.iter_unpack(mm[self.count * ENTRY.size:count * ENTRY.size])
+                for pos, (encf, emisor, comprador, _, fecha, _) in enumerate(new, self.count):
+                    self.by_encf.setdefault(encf, []).append(pos)
+                    self.by_emisor.setdefault(emisor, []).append(pos)
+                    self.by_comprador.setdefault(comprador, []).append(pos)
+                    self.by_fecha.setdefault(fecha, []).append(pos)
+                self.count = max(self.count, count)
+        return self.count
+
+    def entry(self, pos):
+        return ENTRY.unpack_from(self.entries.view((pos + 1) * ENTRY.size), pos * ENTRY.size)
+
+    def index_count(self, name):
+        return len(self.indexes[name]) // INDEX_SIZES[name]
+
+    def might_contain(self, probes_for):
+        bloom = self.bloom
+        bits = len(bloom) * 8
+        return all(bloom[bit >> 3] & (1 << (bit & 7)) for bit in probes_for(bits))
+
+
+class DocumentArchive:
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.segment_docs = 262144
+        self.codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+        self.level = 3
+        self._segments = {}
+        self._listed = None
+        self._list_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._pid = None
+        self._writer = None
+        self._lock = None
+
+    def configure(self, enabled=True, directory=None, segment_docs=262144, codec='zstd', level=3):
+        self.enabled = enabled
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'ecf-archive')
+        self.segment_docs = max(1, segment_docs)
+        self.codec = CODEC_ZSTD if codec == 'zstd' and zstandard is not None else CODEC_ZLIB
+        self.level = level
+        self._segments = {}
+        self._listed = None
+        self._local = threading.local()
+        self._close_writer()
+        self._pid = None
+        if enabled:
+            os.makedirs(self.directory, exist_ok=True)
+
+    # --- SEGMENTOS ---
+
+    def segments(self):
+        """Segmentos del archivo, del más antiguo al más reciente; se relista si cambió el directorio."""
+        mtime = os.stat(self.directory).st_mtime_ns
+        if self._listed != mtime:
+            with self._list_lock:
+                numbers = sorted(int(name[5:11]) for name in os.listdir(self.directory)
+                                 if name.startswith('data-') and name.endswith('.seg'))
+                segments = {n: self._segments.get(n) or _Segment(self.directory, n) for n in numbers}
+                for segment in segments.values():
+                    if not segment.sealed and os.path.exists(segment.path('bloom')):
+                        segment.open_indexes()
+                self._segments = segments
+                self._listed = mtime
+        return list(self._segments.values())
+
+    def _check_pid(self):
+        # Los descriptores y el flock no se comparten con el proceso padre
+        if self._pid != os.getpid():
+            self._writer = None
+            self._lock = None
+            self._local = threading.local()
+            self._pid = os.getpid()
+
+    def _close_writer(self):
+        if self._pid == os.getpid():
+            for fd in (self._writer or ())[1:] + ((self._lock,) if self._lock is not None else ()):
+                os.close(fd)
+        self._writer = None
+        self._lock = None
+
+    def _open_writer(self, number):
+        if self._writer is not None:
+            os.close(self._writer[1])
+            os.close(self._writer[2])
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        # Primero las entradas: los lectores listan los segmentos por su archivo de datos
+        entries_path = os.path.join(self.directory, f"entries-{number:06d}.idx")
+        entries_fd = os.open(entries_path, flags, 0o644)
+        data_fd = os.open(os.path.join(self.directory, f"data-{number:06d}.seg"), flags, 0o644)
+        # Una entrada a medias (disco lleno, caída a mitad de write) desalinearía las siguientes
+        size = os.fstat(entries_fd).st_size
+        if size % ENTRY.size:
+            os.truncate(entries_path, size - size % ENTRY.size)
+        self._writer = (number, data_fd, entries_fd)
+
+    def _active_writer(self):
+        # Bajo el flock: el segmento activo es el último, salvo que ya esté lleno
+        segments = self.segments()
+        number = segments[-1].number if segments else 1
+        if self._writer is None or self._writer[0] != number:
+            self._open_writer(number)
+        if os.lseek(self._writer[2], 0, os.SEEK_END) >= self.segment_docs * ENTRY.size:
+            self._open_writer(number + 1)
+            threading.Thread(target=self.seal_pending, name="archive-seal", daemon=True).start()
+        return self._writer
+
+    # --- ESCRITURA ---
+
+    def _compress(self, xml_bytes):
+        if self.codec == CODEC_ZSTD:
+            compressor = getattr(self._local, 'compressor', None)
+            if compressor is None:
+                compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+            return compressor.compress(xml_bytes)
+        return zlib.compress(xml_bytes, self.level)
+
+    def append(self, xml_bytes, encf, rnc_emisor, rnc_comprador=None, fecha=None, tipo_ecf=0):
+        """Anexa un documento. Devuelve (segmento, posición) de su registro."""
+        if self._pid != os.getpid():
+            self._check_pid()
+        if isinstance(xml_bytes, str):
+            xml_bytes = xml_bytes.encode('utf-8')
+        compressed = self._compress(xml_bytes)
+        return self._append_record(compressed, len(xml_bytes), self.codec, encf, rnc_emisor,
+                                   rnc_comprador, fecha, tipo_ecf)
+
+    def _append_record(self, compressed, length, codec, encf, rnc_emisor, rnc_comprador, fecha, tipo_ecf):
+        record = RECORD.pack(len(compressed), length, zlib.crc32(compressed), codec) + compressed
+        fecha = parse_fecha(fecha)
+        with self._write_lock:
+            if self._lock is None:
+                self._lock = os.open(os.path.join(self.directory, 'ARCHIVE.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            lock_fd = self._lock
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            try:
+                number, data_fd, entries_fd = self._active_writer()
+                offset = os.lseek(data_fd, 0, os.SEEK_END)
+                os.write(data_fd, record)
+                os.write(entries_fd, ENTRY.pack(_key(encf, 13), _key(rnc_emisor, 11), _key(rnc_comprador, 11),
+                                                int(tipo_ecf or 0), fecha, offset))
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        return number, offset
+
+    def append_document(self, xml_bytes, json_data):
+        """Anexa el XML generado a partir de `json_data`, si el archivo está activo."""
+        if not self.enabled:
+            return None
+        encf, rnc_emisor, rnc_comprador, fecha, tipo_ecf = document_fields(json_data)
+        return self.append(xml_bytes, encf, rnc_emisor, rnc_comprador, fecha, tipo_ecf)
+
+    def stream_writer(self, json_data):
+        """Comprime un documento que se va escribiendo por partes; close() lo anexa."""
+        return _StreamWriter(self, document_fields(json_data)) if self.enabled else None
+
+    # --- SELLADO ---
+
+    def seal_pending(self):
+        """Sella los segmentos llenos que no tienen índices. Un solo proceso sella a la vez."""
+        lock_fd = os.open(os.path.join(self.directory, 'SEAL.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            for segment in self.segments()[:-1]:
+                if not os.path.exists(segment.path('bloom')):
+                    try:
+                        self.seal(segment)
+                    except Exception:
+                        logger.exception("No se pudo sellar el segmento %d del archivo", segment.number)
+        finally:
+            os.close(lock_fd)
+
+    def seal(self, segment):
+        start = time.perf_counter()
+        with open(segment.entries.path, 'rb') as f:
+            raw = f.read()
+        raw = raw[:len(raw) - len(raw) % ENTRY.size]
+        count = len(raw) // ENTRY.size
+        keys = {name: [] for name in INDEX_SIZES}
+        bits = max(64, count * BLOOM_BITS_PER_DOC + 7 & ~7)
+        bloom = bytearray(bits // 8)
+        for pos, (encf, emisor, comprador, _, fecha, _) in enumerate(ENTRY.iter_unpack(raw)):
+            p = pos.to_bytes(4, 'big')
+            f = fecha.to_bytes(4, 'big')
+            keys['encf'].append(encf + emisor + p)
+            keys['emisor'].append(emisor + f + p)
+            keys['comprador'].append(comprador + f + p)
+            keys['fecha'].append(f + p)
+            for bit in _bloom_probes(encf, bits):
+                bloom[bit >> 3] |= 1 << (bit & 7)
+        for name, values in keys.items():
+            values.sort()
+            self._write_atomic(segment.path(name), b''.join(values))
+        # El filtro de Bloom va al final: su presencia indica que el segmento está sellado
+        self._write_atomic(segment.path('bloom'), bytes(bloom))
+        logger.info("Segmento %d del archivo sellado: %d documentos en %.2f s",
+                    segment.number, count, time.perf_counter() - start)
+
+    def _write_atomic(self, path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    # --- LECTURA ---
+
+    def read(self, segment_number, offset):
+        """XML (bytes) del registro en `offset` del segmento."""
+        segment = self._segments.get(segment_number)
+        if segment is None:
+            self.segments()
+            segment = self._segments[segment_number]
+        mm = segment.data.view(offset + RECORD.size)
+        clen, length, crc, codec = RECORD.unpack_from(mm, offset)
+        mm = segment.data.view(offset + RECORD.size + clen)
+        compressed = mm[offset + RECORD.size:offset + RECORD.size + clen]
+        if zlib.crc32(compressed) != crc:
+            raise ValueError(f"Registro dañado en el segmento {segment_number}, posición {offset}")
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("El documento está comprimido con zstd y zstandard no está instalado")
+            decompressor = getattr(self._local, 'decompressor', None)
+            if decompressor is None:
+                decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+            return decompressor.decompress(compressed, max_output_size=length)
+        return zlib.decompress(compressed)
+
+    def _document(self, segment, pos, entry=None):
+        encf, emisor, comprador, tipo, fecha, offset = entry or segment.entry(pos)
+        return {"eNCF": _text(encf), "RNCEmisor": _text(emisor), "RNCComprador": _text(comprador) or None,
+                "TipoeCF": tipo, "FechaEmision": format_fecha(fecha), "segment": segment.number, "offset": offset}
+
+    def lookup(self, encf, rnc_emisor=None):
+        """Documentos archivados con ese eNCF (de todos los emisores, o de uno), del más antiguo al más reciente."""
+        if self._pid != os.getpid():
+            self._check_pid()
+        key = _key(encf, 13)
+        prefix = key + _key(rnc_emisor, 11) if rnc_emisor else key
+        found = []
+        probes = {}
+
+        def probes_for(bits):
+            if bits not in probes:
+                probes[bits] = _bloom_probes(key, bits)
+            return probes[bits]
+
+        for segment in self.segments():
+            if segment.sealed:
+                if not segment.might_contain(probes_for):
+                    continue
+                mm = segment.indexes['encf']
+                count = segment.index_count('encf')
+                i = _lower_bound(mm, 28, count, prefix)
+                while i < count and mm[i * 28:i * 28 + len(prefix)] == prefix:
+                    found.append(self._document(segment, int.from_bytes(mm[i * 28 + 24:i * 28 + 28], 'big')))
+                    i += 1
+            else:
+                segment.refresh()
+                for pos in segment.by_encf.get(key, ()):
+                    document = self._document(segment, pos)
+                    if not rnc_emisor or document["RNCEmisor"] == str(rnc_emisor):
+                        found.append(document)
+        found.sort(key=lambda d: (d["segment"], d["offset"]))
+        return found
+
+    def get(self, encf, rnc_emisor=None):
+        """(metadatos, XML) del último documento archivado con ese eNCF, o None."""
+        found = self.lookup(encf, rnc_emisor)
+        if not found:
+            return None
+        document = found[-1]
+        return document, self.read(document["segment"], document["offset"])
+
+    def query(self, rnc_emisor=None, rnc_comprador=None, desde=None, hasta=None, tipo_ecf=None):
+        """
+        Documentos por emisor, comprador y rango de FechaEmision (inclusive),
+        ordenados por fecha. Es un generador: recorre los índices a medida que se consume.
+        """
+        if self._pid != os.getpid():
+            self._check_pid()
+        desde = parse_fecha(desde)
+        hasta = parse_fecha(hasta) or 99991231
+        tipo_ecf = int(tipo_ecf) if tipo_ecf else None
+        emisor = _key(rnc_emisor, 11) if rnc_emisor else None
+        comprador = _key(rnc_comprador, 11) if rnc_comprador else None
+        # Índice más selectivo: emisor (y se filtra el comprador), comprador, o solo fecha
+        if emisor:
+            name, prefix = 'emisor', emisor
+        elif comprador:
+            name, prefix = 'comprador', comprador
+        else:
+            name, prefix = 'fecha', b''
+
+        def matches(entry):
+            return ((emisor is None or entry[1] == emisor) and (comprador is None or entry[2] == comprador)
+                    and (tipo_ecf is None or entry[3] == tipo_ecf) and desde <= entry[4] <= hasta)
+
+        def scan_sealed(segment):
+            size = INDEX_SIZES[name]
+            mm = segment.indexes[name]
+            count = segment.index_count(name)
+            low = prefix + desde.to_bytes(4, 'big')
+            high = prefix + hasta.to_bytes(4, 'big')
+            i = _lower_bound(mm, size, count, low)
+            while i < count:
+                record = mm[i * size:(i + 1) * size]
+                if record[:size - 4] > high:
+                    break
+                pos = int.from_bytes(record[size - 4:], 'big')
+                entry = segment.entry(pos)
+                if matches(entry):
+                    yield entry[4], segment.number, pos, segment, entry
+                i += 1
+
+        def scan_open(segment):
+            segment.refresh()
+            if emisor:
+                positions = segment.by_emisor.get(emisor, ())
+            elif comprador:
+                positions = segment.by_comprador.get(comprador, ())
+            else:
+                positions = [pos for fecha, found in list(segment.by_fecha.items()) if desde <= fecha <= hasta
+                             for pos in found]
+            rows = [(entry[4], segment.number, pos, segment, entry)
+                    for pos, entry in ((pos, segment.entry(pos)) for pos in positions) if matches(entry)]
+            rows.sort(key=lambda row: (row[0], row[2]))
+            yield from rows
+
+        scans = [scan_sealed(s) if s.sealed else scan_open(s) for s in self.segments()]
+        for _, _, pos, segment, entry in heapq.merge(*scans, key=lambda row: row[:3]):
+            yield self._document(segment, pos, entry)
+
+    def stats(self):
+        segments = self.segments()
+        documents = sum(os.stat(s.entries.path).st_size // ENTRY.size for s in segments)
+        stored = sum(os.stat(s.data.path).st_size for s in segments)
+        indexes = sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory)
+                      if name.endswith('.idx'))
+        return {"documents": documents, "segments": len(segments), "sealed": sum(s.sealed for s in segments),
+                "data_bytes": stored, "index_bytes": indexes}
+
+
+class _StreamWriter:
+    def __init__(self, archive, fields):
+        self.archive = archive
+        self.fields = fields
+        self.length = 0
+        self.chunks = []
+        if archive.codec == CODEC_ZSTD:
+            self.compressor = zstandard.ZstdCompressor(level=archive.level).compressobj()
+        else:
+            self.compressor = zlib.compressobj(archive.level)
+
+    def write(self, chunk):
+        self.length += len(chunk)
+        self.chunks.append(self.compressor.compress(chunk))
+
+    def close(self):
+        self.chunks.append(self.compressor.flush())
+        if self.archive._pid != os.getpid():
+            self.archive._check_pid()
+        return self.archive._append_record(b''.join(self.chunks), self.length, self.archive.codec, *self.fields)
+
+
+document_archive = DocumentArchive()
@@ -0,0 +1,138 @@
+"""
+Emisión y registro de semillas para el flujo de autenticación.
+
+Cada worker mantiene un pool de documentos <SemillaModel> ya generados que un
+hilo de fondo rellena por lotes, así que /auth/semilla solo hace un pop. Al
+generar un lote, el hilo registra las semillas en un SQLite compartido por
+todos los workers; cuando el cliente devuelve la semilla firmada, cualquier
+worker la encuentra por su Valor (clave primaria) y la consume una sola vez.
+
+Una semilla nunca pasa más de `max_age` segundos en el pool (las más viejas se
+descartan), y el registro vence `max_age + ttl` segundos después de generada:
+toda semilla emitida es válida al menos `ttl` segundos.
+"""
+import os
+import time
+import tempfile
+import threading
+from collections import deque
+from datetime import datetime
+from app.models.semilla import Semilla
+from app.services.auth.generate_key import generate_key
+from app.services.auth.semilla_builder import SemillaBuilder
+from app.utils.sqlite_store import LocalConnection
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS semillas ("
+    "valor TEXT PRIMARY KEY, fecha TEXT NOT NULL, expires REAL NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS semillas_expires ON semillas (expires)",
+)
+FECHA_FORMAT = "%Y-%m-%d %H:%M:%S"
+INLINE_BATCH = 32
+
+
+class SeedService:
+    def __init__(self):
+        self.pool_size = 256
+        self.ttl = 300
+        self.max_age = 60
+        self.path = None
+        self._db = None
+        self._pool = deque()
+        self._wakeup = threading.Event()
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def configure(self, pool_size=256, ttl=300, max_age=60, path=None):
+        self.pool_size = pool_size
+        self.ttl = ttl
+        self.max_age = max_age
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ecf-semillas.sqlite3')
+        self._db = LocalConnection(self.path, SCHEMA)
+
+    def _conn(self):
+        if self._db is None:
+            self.configure()
+        return self._db.get()
+
+    def _start(self):
+        # Un hilo de relleno por proceso; el pool del maestro no se hereda
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pool = deque()
+            self._wakeup = threading.Event()
+            self._pid = os.getpid()
+            threading.Thread(target=self._refill_loop, name="semilla-refill", daemon=True).start()
+
+    def _render(self, count):
+        """Genera `count` semillas, las registra en un solo INSERT y devuelve (creada, valor, xml)."""
+        now = time.time()
+        fecha = datetime.now()
+        rows, docs = [], []
+        for _ in range(count):
+            semilla = Semilla(generate_key(), fecha)
+            rows.append((semilla.valor, fecha.strftime(FECHA_FORMAT), now + self.max_age + self.ttl))
+            docs.append((now, semilla.valor, SemillaBuilder(semilla).get_xml_string()))
+        self._conn().executemany("INSERT OR REPLACE INTO semillas (valor, fecha, expires) VALUES (?, ?, ?)", rows)
+        return docs
+
+    def _refill(self):
+        # Descarta las que llevan demasiado tiempo esperando y completa el pool
+        limit = time.time() - self.max_age
+        while self._pool and self._pool[0][0] < limit:
+            self._pool.popleft()
+        missing = self.pool_size - len(self._pool)
+        if missing > 0:
+            self._pool.extend(self._render(missing))
+        self.purge()
+
+    def _refill_loop(self):
+        while True:
+            try:
+                self._refill()
+            except Exception:
+                # El pool se vuelve a intentar en el siguiente ciclo; issue() no depende de él
+                pass
+            self._wakeup.wait(self.max_age / 2)
+            self._wakeup.clear()
+
+    def issue(self):
+        """Devuelve el XML de una semilla nueva, ya registrada."""
+        if self._pid != os.getpid():
+            self._start()
+        limit = time.time() - self.max_age
+        while True:
+            try:
+                created, _, xml = self._pool.pop()
+            except IndexError:
+                # Pool vacío (ráfaga mayor que el relleno): generar aquí mismo un
+                # lote pequeño, para repartir el INSERT entre varias peticiones
+                self._wakeup.set()
+                docs = self._render(INLINE_BATCH)
+                self._pool.extend(docs[1:])
+                return docs[0][2]
+            if created >= limit:
+                break
+        if len(self._pool) < self.pool_size // 2:
+            self._wakeup.set()
+        return xml
+
+    def get(self, valor):
+        """Semilla registrada y vigente con ese Valor, o None."""
+        row = self._conn().execute("SELECT valor, fecha FROM semillas WHERE valor = ? AND expires > ?",
+                                   (valor, time.time())).fetchone()
+        if row is None:
+            return None
+        return Semilla(row[0], datetime.strptime(row[1], FECHA_FORMAT))
+
+    def consume(self, valor):
+        """Marca la semilla como usada; False si no existe, ya venció o ya se usó."""
+        cur = self._conn().execute("DELETE FROM semillas WHERE valor = ? AND expires > ?", (valor, time.time()))
+        return cur.rowcount == 1
+
+    def purge(self):
+        self._conn().execute("DELETE FROM semillas WHERE expires <= ?", (time.time(),))
+
+
+seed_service = SeedService()
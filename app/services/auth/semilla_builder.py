@@ -2,8 +2,8 @@ from lxml import etree
 from app.models.semilla import Semilla
 from app.services.auth.generate_key import generate_key
 class SemillaBuilder:
-    def __init__(self):
-        self.semilla = Semilla(generate_key())      
+    def __init__(self, semilla=None):
+        self.semilla = semilla or Semilla(generate_key())
     def build(self):
         root = etree.Element("SemillaModel")
 
@@ -0,0 +1,308 @@
+import os
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from lxml import etree
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.xml_generation.document_builders import DOCUMENT_BUILDERS
+from app.services.schema_registry import schema_registry, SchemaUnavailableError
+from app.services.xml_signer import xml_signer
+from app.services.payload_validator import payload_validator
+from app.services.archive import document_archive
+from app.services.totals import totals_engine
+from app.services.ecf_reader import ecf_reader
+from app.services.emitter_profiles import emitter_profiles
+from app.services.sequence_allocator import sequence_allocator, unassigned_slot, check_unassigned, SequenceError
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=None):
+    """Pool de procesos compartido por el worker (se crea en el primer lote, después del fork)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count())
+    return _executor
+
+
+def _discard_executor(broken):
+    """Descarta un pool roto (un proceso hijo murió); el siguiente get_executor() crea otro."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def _void(slot, encf, reason):
+    # El número ya se entregó y el documento no salió: queda para anularlo ante la DGII
+    try:
+        sequence_allocator.void(slot[1], encf, reason[:500])
+    except Exception:
+        logger.exception("No se pudo anotar el eNCF %s como anulado", encf)
+
+
+def build_one(index, payload, validate=False, sign=False, preflight=False, pretty=True, assign=False):
+    """
+    Construye un e-CF y devuelve un registro serializable a NDJSON.
+
+    Los errores quedan aislados por documento igual que en create_ecf:
+    ValueError es un error del payload, cualquier otra excepción es interna.
+    Con sign=True se firma con la llave del emisor, que cada proceso del pool
+    carga una sola vez (KeyStore). Con preflight=True el JSON se revisa antes de
+    construir (payload_validator) y sus errores van en el registro, junto con
+    los de totals_engine. pretty=False da el XML compacto (?format=compact).
+
+    Con assign=True un payload sin eNCF recibe uno (take(), de a uno, para que
+    el proceso del pool no guarde bloques) después de la validación previa; si
+    el documento falla más adelante, el número se anota como anulado.
+    """
+    record = {"index": index}
+    if not isinstance(payload, dict):
+        record.update(eNCF=None, status="error", code=400, error="Payload inválido: se esperaba un objeto JSON")
+        return record
+
+    try:
+        record["eNCF"] = payload['Encabezado']['IdDoc']['eNCF']
+    except (KeyError, TypeError):
+        record["eNCF"] = None
+
+    slot = unassigned_slot(payload) if assign else None
+    try:
+        # Perfil del emisor y totales se resuelven aquí, en el proceso del pool, igual que en create_ecf
+        emisor_profile = emitter_profiles.apply(payload)
+        errors = totals_engine.apply(payload)
+        if preflight:
+            errors += check_unassigned(slot, lambda: payload_validator.validate(payload))
+        if errors:
+            record.update(status="error", code=400, error="El payload no cumple las reglas del e-CF", errors=errors)
+            return record
+        if slot is not None:
+            record["eNCF"] = sequence_allocator.assign(slot, single=True)
+
+        builder = ECFBuilderFactory.get_builder(payload, emisor_profile=emisor_profile)
+        builder.pretty = pretty
+        builder.build()
+        if sign:
+            xml_signer.sign_tree(builder.root, payload['Encabezado']['Emisor']['RNCEmisor'], pretty)
+        xml_str = builder.get_xml_string()
+
+        if validate:
+            try:
+                errors = schema_registry.validate(builder.tipo_ecf, etree.fromstring(xml_str.encode('utf-8')))
+            except SchemaUnavailableError:
+                errors = []
+            if errors:
+                record.update(status="error", code=400, error="El XML generado no cumple el XSD", errors=errors)
+                return record
+
+        # Cada proceso del pool escribe en el archivo con su propio descriptor y flock
+        try:
+            document_archive.append_document(xml_str, payload)
+        except Exception:
+            logger.exception("No se pudo archivar el e-CF %s", record["eNCF"])
+        record.update(status="ok", tipo_ecf=builder.tipo_ecf, xml=xml_str)
+    except SequenceError as e:
+        record.update(status="error", code=409, error=str(e))
+    except ValueError as e:
+        record.update(status="error", code=400, error=str(e))
+    except Exception as e:
+        record.update(status="error", code=500, error=f"Error interno: {str(e)}")
+    finally:
+        if slot is not None and record["eNCF"] and record.get("status") != "ok":
+            _void(slot, record["eNCF"], record.get("error", ""))
+    return record
+
+
+def build_chunk(chunk, validate=False, sign=False, preflight=False, pretty=True, assign=False):
+    return [build_one(index, payload, validate, sign, preflight, pretty, assign) for index, payload in chunk]
+
+
+def build_document_one(index, payload, document, validate=False, sign=False, preflight=False, pretty=True):
+    """
+    Registro NDJSON de un documento que no es e-CF (RFCE, ARECF, ACECF).
+
+    Mismos errores por documento que build_one. No se archiva: el eNCF es el
+    del e-CF que el documento resume o responde.
+    """
+    record = {"index": index}
+    if not isinstance(payload, dict):
+        record.update(eNCF=None, status="error", code=400, error="Payload inválido: se esperaba un objeto JSON")
+        return record
+
+    builder = DOCUMENT_BUILDERS[document](payload)
+    builder.pretty = pretty
+    record["eNCF"] = builder.encf()
+
+    try:
+        errors = builder.prepare()
+        if preflight:
+            errors += payload_validator.validate(builder.data, document)
+        if errors:
+            record.update(status="error", code=400, error=f"El payload no cumple las reglas del {document}",
+                          errors=errors)
+            return record
+
+        builder.build()
+        if sign:
+            xml_signer.sign_tree(builder.root, builder.signer_rnc(), pretty)
+        xml_str = builder.get_xml_string()
+
+        if validate:
+            try:
+                # Compilado una vez por proceso del pool (o heredado del calentamiento antes del fork)
+                errors = schema_registry.validate(document, etree.fromstring(xml_str.encode('utf-8')))
+            except SchemaUnavailableError:
+                errors = []
+            if errors:
+                record.update(status="error", code=400, error="El XML generado no cumple el XSD", errors=errors)
+                return record
+        record.update(status="ok", tipo_ecf=builder.tipo_ecf, xml=xml_str)
+    except ValueError as e:
+        record.update(status="error", code=400, error=str(e))
+    except Exception as e:
+        record.update(status="error", code=500, error=f"Error interno: {str(e)}")
+    return record
+
+
+def build_document_chunk(chunk, validate=False, sign=False, preflight=False, document='RFCE', pretty=True):
+    return [build_document_one(index, payload, document, validate, sign, preflight, pretty)
+            for index, payload in chunk]
+
+
+def _encf_from(data):
+    # e-CF y RFCE lo traen en IdDoc; ARECF y ACECF, en su único bloque
+    if 'Encabezado' in data:
+        block = data['Encabezado'].get('IdDoc')
+    else:
+        block = next(iter(data.values()), None)
+    return block.get('eNCF') if isinstance(block, dict) else None
+
+
+def read_one(index, source, validate=False):
+    """
+    Registro NDJSON con el JSON de un documento recibido (bytes del XML o ruta
+    de un archivo). Con validate=True el XML se valida además contra el XSD del
+    tipo, lo que obliga a parsearlo completo una vez más.
+    """
+    record = {"index": index, "eNCF": None}
+    if isinstance(source, str):
+        record["source"] = os.path.basename(source)
+    try:
+        document = ecf_reader.open(source)
+        data = document.to_json()
+        record["eNCF"] = _encf_from(data)
+        if validate:
+            key = document.tipo_ecf if document.document == 'ECF' else document.document
+            try:
+                tree = etree.parse(source) if isinstance(source, str) else etree.fromstring(source)
+                errors = schema_registry.validate(key, tree)
+            except SchemaUnavailableError:
+                errors = []
+            if errors:
+                record.update(status="error", code=400, error="El XML recibido no cumple el XSD", errors=errors)
+                return record
+        record.update(status="ok", document=document.document, tipo_ecf=document.tipo_ecf, json=data)
+    except (ValueError, OSError) as e:
+        record.update(status="error", code=400, error=str(e))
+    except Exception as e:
+        record.update(status="error", code=500, error=f"Error interno: {str(e)}")
+    return record
+
+
+def read_chunk(chunk, validate=False, sign=False, preflight=False):
+    # La firma y la validación previa no aplican a lo recibido; la interfaz es la de build_batch
+    return [read_one(index, source, validate) for index, source in chunk]
+
+
+def read_directory(path, validate=False, workers=None, chunk_size=16, max_in_flight=None):
+    """Lee en paralelo los .xml de un directorio, en orden alfabético; un registro por archivo."""
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith('.xml'))
+    paths = (os.path.join(path, name) for name in names)
+    return build_batch(paths, validate, workers, chunk_size, max_in_flight, chunk_fn=read_chunk)
+
+
+def _chunks(payloads, chunk_size):
+    chunk = []
+    for index, payload in enumerate(payloads):
+        chunk.append((index, payload))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _failed_chunk(chunk, error):
+    records = []
+    for index, payload in chunk:
+        try:
+            encf = _encf_from(payload) if isinstance(payload, dict) else None
+        except (AttributeError, StopIteration):
+            encf = None
+        records.append({"index": index, "eNCF": encf, "status": "error", "code": 500, "error": error})
+    return records
+
+
+def build_batch(payloads, validate=False, workers=None, chunk_size=16, max_in_flight=None, sign=False, preflight=False,
+                chunk_fn=build_chunk):
+    """
+    Genera los registros de un lote en el mismo orden de entrada.
+
+    `payloads` puede ser cualquier iterable (p. ej. un stream NDJSON): se consume
+    a medida que se liberan ventanas, así que nunca hay más de
+    `max_in_flight` bloques de `chunk_size` documentos en memoria.
+    Con workers=0 se construye en el mismo proceso (útil en desarrollo).
+    `chunk_fn` procesa cada bloque (build_chunk, build_document_chunk para RFCE, ARECF y ACECF,
+    o read_chunk para leer documentos recibidos);
+    tiene que poder enviarse al pool (función de módulo o functools.partial).
+    """
+    if workers == 0:
+        for chunk in _chunks(payloads, chunk_size):
+            yield from chunk_fn(chunk, validate, sign, preflight)
+        return
+
+    max_in_flight = max_in_flight or 2 * (workers or os.cpu_count())
+    pending = deque()
+
+    def submit(chunk):
+        executor = get_executor(workers)
+        try:
+            return executor, executor.submit(chunk_fn, chunk, validate, sign, preflight)
+        except BrokenProcessPool:
+            _discard_executor(executor)
+            executor = get_executor(workers)
+            return executor, executor.submit(chunk_fn, chunk, validate, sign, preflight)
+
+    def results(chunk, executor, future):
+        # Si un proceso del pool muere, sus bloques (y los que esperaban en ese pool)
+        # salen como registros de error y el lote sigue con un pool nuevo
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            logger.error("Pool de procesos roto en un lote: %s", e)
+            _discard_executor(executor)
+            return _failed_chunk(chunk, f"Error interno: un proceso del pool terminó inesperadamente ({e})")
+
+    for chunk in _chunks(payloads, chunk_size):
+        pending.append((chunk, *submit(chunk)))
+        if len(pending) >= max_in_flight:
+            yield from results(*pending.popleft())
+
+    while pending:
+        yield from results(*pending.popleft())
@@ -0,0 +1,77 @@
+"""
+Compresión de las respuestas XML de /ecf/ecf.
+
+La codificación se negocia con Accept-Encoding entre las configuradas
+(ECF_COMPRESSION_ENCODINGS, en orden de preferencia del servidor). Los
+documentos por debajo de ECF_COMPRESSION_MIN_BYTES se envían sin comprimir:
+caben en pocos paquetes y comprimirlos solo gasta CPU.
+
+zstd es opcional: si el paquete zstandard no está instalado, se ofrece solo gzip.
+"""
+import gzip
+import zlib
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SUPPORTED = ('zstd', 'gzip')
+
+
+class ResponseCompressor:
+    def __init__(self):
+        self.encodings = ()
+        self.min_bytes = 1400
+        self.gzip_level = 6
+        self.zstd_level = 3
+        self._local = threading.local()
+
+    def configure(self, encodings='zstd,gzip', min_bytes=1400, gzip_level=6, zstd_level=3):
+        names = [e.strip().lower() for e in (encodings or '').split(',') if e.strip()]
+        self.encodings = tuple(e for e in names if e in SUPPORTED and (e != 'zstd' or zstandard is not None))
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self._local = threading.local()
+
+    def negotiate(self, accept_encodings):
+        """Codificación a usar según el Accept-Encoding del cliente, o None."""
+        if not self.encodings:
+            return None
+        return accept_encodings.best_match(self.encodings)
+
+    def _zstd(self):
+        # Un ZstdCompressor no se puede usar desde dos hilos a la vez
+        compressor = getattr(self._local, 'zstd', None)
+        if compressor is None:
+            compressor = self._local.zstd = zstandard.ZstdCompressor(level=self.zstd_level)
+        return compressor
+
+    def compress(self, data, encoding):
+        if encoding == 'gzip':
+            return gzip.compress(data, self.gzip_level, mtime=0)
+        if encoding == 'zstd':
+            return self._zstd().compress(data)
+        return data
+
+    def compress_stream(self, chunks, encoding):
+        """Comprime un generador de bytes pedazo a pedazo (modo streaming)."""
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            finish = compressor.flush
+        elif encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=self.zstd_level).compressobj()
+            finish = compressor.flush
+        else:
+            yield from chunks
+            return
+        for chunk in chunks:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield finish()
+
+
+response_compressor = ResponseCompressor()
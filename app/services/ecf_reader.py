@@ -0,0 +1,328 @@
+"""
+Lectura de e-CF recibidos: el XML de vuelta al JSON que consumen los builders.
+
+Un stream se recorre con iterparse: cada bloque del primer nivel (Encabezado,
+Subtotales, Paginacion...) se convierte a dict cuando se cierra y se descarta
+del árbol, y los Item de DetallesItems se entregan de a uno con items(), así
+que la memoria no depende de la cantidad de líneas. Un documento que ya está
+en memoria (bytes) se parsea completo y se recorre igual con iterwalk.
+
+La forma del JSON sale del mismo XSD que usan los builders (xsd_model.py):
+un elemento repetido es una lista, un contenedor de una lista es
+{"Hijo": [...]} salvo DetallesItems, que es la lista directa, y cada valor se
+lee según su tipo (decimales como número, enteros como entero, códigos con
+ceros y fechas como texto). Lo que se lee se vuelve a escribir con los mismos
+bytes con los backends 'generated' y 'direct'. La firma no se incluye.
+"""
+import os
+import threading
+from lxml import etree
+from app.services.schema_registry import SCHEMA_FILES, SCHEMAS_DIR
+from app.services.payload_validator import PLAIN_LISTS
+from app.services.xml_generation.xsd_model import load_schema
+
+ITEMS = 'DetallesItems'
+# Lo único que iterparse le pasa a Python: las raíces, los hijos de <ECF> en
+# los XSD 31-47 y cada Item. Ninguno de esos nombres aparece más adentro.
+ROOTS = ('ECF', 'RFCE', 'ARECF', 'ACECF')
+TAGS = ROOTS + ('Encabezado', ITEMS, 'Item', 'Subtotales', 'DescuentosORecargos', 'Paginacion',
+                'InformacionReferencia', 'FechaHoraFirma')
+_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, remove_comments=True, remove_pis=True)
+
+
+def _reader(xsd_type):
+    """Texto del XML -> valor del JSON, como lo escribiría un cliente."""
+    kind = xsd_type.kind
+    if kind[0] == 'dec':
+        # Por encima de este valor el float ya no conserva todos los decimales
+        limit = 10 ** (15 - kind[1])
+
+        def dec(text):
+            try:
+                value = float(text)
+            except ValueError:
+                return text
+            return value if abs(value) < limit else text
+        return dec
+    if kind[0] == 'str' and xsd_type.base == 'xs:integer':
+        def integer(text):
+            # Con ceros a la izquierda o signo se deja el texto, para escribirlo igual
+            if text.isdigit() and (text[0] != '0' or text == '0'):
+                return int(text)
+            return text
+        return integer
+    return str
+
+
+class _Field:
+    __slots__ = ('name', 'repeated', 'read')
+
+    def __init__(self, el):
+        self.name = el.name
+        self.repeated = el.repeated
+        self.read = _reader(el.type)
+
+    def value(self, elem, path):
+        return self.read(elem.text or '')
+
+
+class _Block:
+    __slots__ = ('name', 'repeated', 'by_name', 'fields', 'container', 'plain')
+
+    def __init__(self, el):
+        self.name = el.name
+        self.repeated = el.repeated
+        children = [_compile(c) for c in el.children if not c.is_any]
+        self.by_name = {c.name: c for c in children}
+        # Campos simples no repetidos: la mayoría de lo que se lee, sin llamadas de por medio
+        self.fields = {c.name: c.read for c in children if isinstance(c, _Field) and not c.repeated}
+        only = children[0] if len(children) == 1 else None
+        self.container = only if only is not None and only.repeated else None
+        self.plain = el.name in PLAIN_LISTS
+
+    def value(self, elem, path):
+        if self.container is not None:
+            return self._rows(elem, path)
+        fields = self.fields
+        data = {}
+        for child in elem:
+            tag = child.tag
+            read = fields.get(tag)
+            if read is not None:
+                data[tag] = read(child.text or '')
+                continue
+            if tag.__class__ is not str or tag[0] == '{':
+                continue  # comentarios, y <Signature> con su espacio de nombres
+            rule = self._rule(child, path)
+            value = rule.value(child, f"{path}/{self.name}")
+            if rule.repeated:
+                data.setdefault(tag, []).append(value)
+            else:
+                data[tag] = value
+        return data
+
+    def _rows(self, elem, path):
+        container = self.container
+        inner = f"{path}/{self.name}"
+        rows = []
+        for child in elem:
+            tag = child.tag
+            if tag.__class__ is not str or tag[0] == '{':
+                continue
+            if tag != container.name:
+                self._rule(child, path)
+            rows.append(container.value(child, inner))
+        return rows if self.plain else {container.name: rows}
+
+    def _rule(self, child, path):
+        rule = self.by_name.get(child.tag)
+        if rule is None:
+            raise ValueError(f"Elemento no esperado {path}/{self.name}/{etree.QName(child).localname}")
+        return rule
+
+
+def _compile(el):
+    return _Block(el) if el.is_complex else _Field(el)
+
+
+class ReceivedDocument:
+    """
+    Un documento recibido a medio leer. Al abrirlo ya se leyó todo lo que va
+    antes de DetallesItems (`head`); items() entrega las líneas a medida que
+    se leen y tail() los bloques posteriores. to_json() junta todo.
+    """
+    def __init__(self, reader, source):
+        # Solo se avisa de TAGS (el filtro es de libxml2): el resto del documento
+        # se arma en C sin pasar por Python
+        if isinstance(source, bytes):
+            # Ya está en memoria: el árbol completo de una vez sale más barato
+            # que iterparse, y se recorre con los mismos eventos
+            try:
+                tree = etree.fromstring(source, _PARSER)
+            except etree.XMLSyntaxError as e:
+                raise ValueError(f"XML mal formado: {e}")
+            self._events = etree.iterwalk(tree, events=('start', 'end'), tag=TAGS)
+            self._streaming = False
+        else:
+            self._events = etree.iterparse(source, events=('start', 'end'), tag=TAGS, resolve_entities=False,
+                                           no_network=True, remove_comments=True, remove_pis=True)
+            self._streaming = True
+        self._reader = reader
+        self._root = None
+        self._model = None
+        self._items_started = False
+        self._items_done = False
+        self.document = None
+        self.tipo_ecf = None
+        self.head = {}
+        self._tail = None
+        self._start()
+
+    def _next(self):
+        try:
+            return next(self._events)
+        except StopIteration:
+            raise ValueError("El XML no es un e-CF, RFCE, ARECF o ACECF completo")
+        except etree.XMLSyntaxError as e:
+            raise ValueError(f"XML mal formado: {e}")
+
+    def _start(self):
+        event, root = self._next()
+        if root.getparent() is not None or root.tag not in ROOTS:
+            raise ValueError(f"Documento {etree.QName(root.getroottree().getroot()).localname} no soportado")
+        self._root = root
+        self.document = root.tag
+        if self.document != 'ECF':
+            # RFCE, ARECF, ACECF: sin DetallesItems, pequeños; se leen de una vez
+            while self._next() != ('end', root):
+                pass
+            self.head = self._reader.model(self.document).value(root, '')
+            self._items_done = True
+            self._tail = {}
+            return
+        while True:
+            event, elem = self._next()
+            if elem is root:
+                if self._model is None:
+                    raise ValueError("El e-CF no trae Encabezado")
+                # Sin DetallesItems: el XSD lo exige, pero se entrega lo que hay
+                self._finish()
+                self._items_done = True
+                self._tail = {}
+                return
+            if elem.getparent() is not root:
+                continue
+            if event == 'start':
+                if elem.tag == ITEMS:
+                    if self._model is None:
+                        raise ValueError(f"{ITEMS} antes del Encabezado")
+                    return
+            else:
+                if elem.tag == 'Encabezado' and self._model is None:
+                    self._model = self._model_for(elem)
+                self._keep(elem, self.head)
+
+    def _model_for(self, encabezado):
+        try:
+            self.tipo_ecf = int(encabezado.findtext('IdDoc/TipoeCF'))
+        except (TypeError, ValueError):
+            raise ValueError("El e-CF no trae Encabezado/IdDoc/TipoeCF o no es un número")
+        model = self._reader.model(self.tipo_ecf)
+        if model is None:
+            raise ValueError(f"TipoeCF {self.tipo_ecf} no soportado")
+        return model
+
+    def _keep(self, elem, target):
+        """Convierte un bloque del primer nivel, lo guarda en target y lo suelta del árbol."""
+        if self._model is None:
+            raise ValueError(f"{elem.tag} antes del Encabezado")
+        target[elem.tag] = self._model.by_name[elem.tag].value(elem, '')
+        self._release(self._root, elem)
+
+    def _release(self, parent, elem):
+        # Leyendo de un stream, lo ya convertido se suelta; un árbol de
+        # iterwalk no se toca mientras se recorre
+        if self._streaming:
+            parent.remove(elem)
+
+    def _finish(self):
+        # Lo que el filtro no avisó: solo puede ser la firma
+        by_name = self._model.by_name if self._model is not None else {}
+        for child in self._root:
+            if isinstance(child.tag, str) and not child.tag.startswith('{') and child.tag not in by_name:
+                raise ValueError(f"Elemento no esperado /{child.tag}")
+
+    def items(self):
+        """Genera los Item de DetallesItems ya convertidos, soltando cada uno del árbol."""
+        if self._items_started:
+            raise RuntimeError("items() solo se puede recorrer una vez")
+        self._items_started = True
+        if self._items_done:
+            return
+        detalles = self._model.by_name[ITEMS]
+        item_rule = detalles.container
+        path = f"/{ITEMS}"
+        for event, elem in self._events_until(ITEMS):
+            if event == 'end' and elem.tag == 'Item':
+                parent = elem.getparent()
+                yield item_rule.value(elem, path)
+                self._release(parent, elem)
+        self._items_done = True
+
+    def _events_until(self, tag):
+        while True:
+            event, elem = self._next()
+            if event == 'end' and elem.tag == tag and elem.getparent() is self._root:
+                # Lo que quede dentro además de los Item no es del XSD
+                for child in elem:
+                    if isinstance(child.tag, str) and child.tag != 'Item':
+                        raise ValueError(f"Elemento no esperado /{tag}/{child.tag}")
+                self._release(self._root, elem)
+                return
+            yield event, elem
+
+    def tail(self):
+        """Bloques posteriores a DetallesItems. Los Item que no se leyeron se descartan."""
+        if self._tail is None:
+            if not self._items_done:
+                if self._items_started:
+                    raise RuntimeError("Quedan Item sin leer de un items() en curso")
+                for _ in self.items():
+                    pass
+            tail = {}
+            root = self._root
+            while True:
+                event, elem = self._next()
+                if elem is root:
+                    break
+                if event == 'end' and elem.getparent() is root:
+                    self._keep(elem, tail)
+            self._finish()
+            self._tail = tail
+        return self._tail
+
+    def to_json(self):
+        data = dict(self.head)
+        if self.document == 'ECF':
+            data[ITEMS] = list(self.items())
+        data.update(self.tail())
+        return data
+
+
+class ECFReader:
+    """Modelos de lectura por TipoeCF o documento, armados la primera vez que llega cada uno."""
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def model(self, key):
+        model = self._models.get(key, False)
+        if model is False:
+            with self._lock:
+                model = self._models.get(key, False)
+                if model is False:
+                    filename = SCHEMA_FILES.get((str(key), '1.0'))
+                    model = _Block(load_schema(os.path.join(SCHEMAS_DIR, filename))) if filename else None
+                    self._models[key] = model
+        return model
+
+    def warm_up(self, keys):
+        for key in keys:
+            self.model(key)
+
+    def open(self, source):
+        """
+        Empieza a leer `source`: bytes del XML, ruta, archivo o stream con
+        read(). Los bytes se parsean completos; lo demás, a medida que se
+        recorre el documento. Un XML mal
+        formado o que no sigue el XSD del tipo es ValueError, al abrirlo o más
+        adelante, cuando la lectura llega a esa parte.
+        """
+        return ReceivedDocument(self, source)
+
+    def read(self, source):
+        """El JSON completo del documento."""
+        return self.open(source).to_json()
+
+
+ecf_reader = ECFReader()
@@ -0,0 +1,221 @@
+"""
+Perfiles de emisor: los datos fijos del <Emisor> registrados una vez por RNC.
+
+Un cliente registra su perfil (PUT /ecf/emisores/<rnc>) y desde ahí manda en
+cada e-CF solo RNCEmisor y lo propio del documento (FechaEmision,
+NumeroFacturaInterna...). apply() completa el JSON con los campos del perfil,
+así que la validación previa, la caché de idempotencia y el archivo ven el
+documento completo, y devuelve el perfil para que el builder pegue sus campos
+ya escritos en vez de formatearlos de nuevo. Los campos del perfil son los
+primeros de <Emisor>, con los mismos tipos, en los XSD de todos los TipoeCF:
+un mismo fragmento sirve para todos.
+
+Los perfiles se guardan en un SQLite compartido por los workers y cada proceso
+los tiene en memoria con sus fragmentos. Al actualizar un perfil su versión
+sube y el proceso que lo cambió descarta el anterior en el acto; los demás lo
+notan por PRAGMA data_version, que se consulta como mucho cada
+ECF_PROFILES_CHECK_INTERVAL segundos.
+"""
+import os
+import time
+import json
+import tempfile
+import threading
+from app.utils.sqlite_store import LocalConnection
+from app.services.payload_validator import payload_validator
+
+# En el orden del XSD; lo que sigue en <Emisor> (CodigoVendedor... FechaEmision) es de cada documento
+PROFILE_FIELDS = ('RNCEmisor', 'RazonSocialEmisor', 'NombreComercial', 'Sucursal', 'DireccionEmisor',
+                  'Municipio', 'Provincia', 'TablaTelefonoEmisor', 'CorreoEmisor', 'WebSite', 'ActividadEconomica')
+# Formatos de los módulos generados: 'xml' (backend 'generated'), 'text' y 'compact' ('direct')
+FORMATS = ('xml', 'text', 'compact')
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS emitter_profiles ("
+    "rnc TEXT PRIMARY KEY, fields TEXT NOT NULL, version INTEGER NOT NULL, updated REAL NOT NULL)",
+)
+
+
+class ProfileError(Exception):
+    """El perfil no se puede registrar; `errors` con el formato de payload_validator."""
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+class EmitterProfile:
+    """Un perfil registrado y sus fragmentos ya escritos, armados la primera vez que se piden."""
+    __slots__ = ('rnc', 'fields', 'version', 'updated', '_fragments')
+
+    def __init__(self, rnc, fields, version, updated):
+        self.rnc = rnc
+        self.fields = fields
+        self.version = version
+        self.updated = updated
+        self._fragments = {}
+
+    def fragment(self, module, suffix):
+        """Texto de los campos del perfil dentro de <Emisor>, con emisor_<suffix> del módulo generado."""
+        text = self._fragments.get(suffix)
+        if text is None:
+            text = self._fragments[suffix] = getattr(module, 'emisor_' + suffix)(self.fields)
+        return text
+
+    def element(self, build):
+        """<Emisor> del backend 'manual' con los campos del perfil; build(emisor, fields) lo llena."""
+        emisor = self._fragments.get('manual')
+        if emisor is None:
+            from lxml import etree
+            emisor = etree.Element("Emisor")
+            build(emisor, self.fields)
+            self._fragments['manual'] = emisor
+        return emisor
+
+    def as_json(self):
+        return {"RNCEmisor": self.rnc, "version": self.version, "actualizado": self.updated, "Emisor": self.fields}
+
+
+def _check(rnc, fields):
+    """Errores del perfil según las reglas del <Emisor> del XSD (las mismas en todos los tipos)."""
+    if not isinstance(fields, dict):
+        return [{"path": "Emisor", "rule": "type", "message": "Se esperaba un objeto"}]
+    rules = payload_validator.rules(31).by_name['Encabezado'].by_name['Emisor']
+    errors = []
+    for name, value in fields.items():
+        if name not in PROFILE_FIELDS:
+            errors.append({"path": f"Emisor.{name}", "rule": "profile",
+                           "message": f"{name} no es un campo del perfil: va en cada documento"})
+        else:
+            rules.by_name[name].check_present(value, f"Emisor.{name}", errors)
+    for name in PROFILE_FIELDS:
+        if rules.by_name[name].required and name not in fields:
+            rules.by_name[name].missing(f"Emisor.{name}", errors)
+    if str(fields.get('RNCEmisor', rnc)) != rnc:
+        errors.append({"path": "Emisor.RNCEmisor", "rule": "profile",
+                       "message": f"No coincide con el RNC del perfil ({rnc})"})
+    return errors
+
+
+class EmitterProfiles:
+    def __init__(self):
+        self.path = None
+        self.check_interval = 1.0
+        self._db = None
+        self._profiles = {}
+        self._checked = threading.local()
+        self._lock = threading.Lock()
+
+    def configure(self, path=None, check_interval=1.0):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ecf-profiles.sqlite3')
+        self.check_interval = check_interval
+        self._db = LocalConnection(self.path, SCHEMA)
+        self._profiles = {}
+        self._checked = threading.local()
+
+    def _conn(self):
+        if self._db is None:
+            self.configure()
+        return self._db.get()
+
+    def _refresh(self):
+        # data_version cambia cuando otra conexión (otro worker) confirma una escritura
+        local = self._checked
+        now = time.monotonic()
+        if now - getattr(local, 'at', -1e9) < self.check_interval:
+            return
+        version = self._conn().execute("PRAGMA data_version").fetchone()[0]
+        if getattr(local, 'version', version) != version:
+            self._profiles = {}
+        local.version = version
+        local.at = now
+
+    def get(self, rnc):
+        """El perfil del RNC, o None si no está registrado."""
+        self._refresh()
+        rnc = str(rnc)
+        profile = self._profiles.get(rnc, False)
+        if profile is False:
+            row = self._conn().execute("SELECT fields, version, updated FROM emitter_profiles WHERE rnc = ?",
+                                       (rnc,)).fetchone()
+            profile = EmitterProfile(rnc, json.loads(row[0]), row[1], row[2]) if row else None
+            self._profiles[rnc] = profile
+        return profile
+
+    def list(self):
+        rows = self._conn().execute("SELECT rnc, fields, version, updated FROM emitter_profiles ORDER BY rnc")
+        return [EmitterProfile(rnc, json.loads(fields), version, updated) for rnc, fields, version, updated in rows]
+
+    def put(self, rnc, fields):
+        """
+        Registra o reemplaza el perfil. Devuelve (perfil, creado). Un perfil que
+        no cumple el XSD, o con caracteres que no se pueden escribir en XML, es
+        ProfileError.
+        """
+        from app.services.xml_generation.generated import GENERATED_MODULES
+        rnc = str(rnc)
+        errors = _check(rnc, fields)
+        if errors:
+            raise ProfileError("El perfil no cumple las reglas del Emisor", errors)
+        fields = dict(fields, RNCEmisor=rnc)
+        profile = EmitterProfile(rnc, fields, 0, time.time())
+        module = GENERATED_MODULES[31]
+        try:
+            for suffix in FORMATS:
+                profile.fragment(module, suffix)
+        except ValueError as e:
+            raise ProfileError(f"El perfil no se puede escribir en XML: {e}")
+        with self._lock:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT version FROM emitter_profiles WHERE rnc = ?", (rnc,)).fetchone()
+                profile.version = (row[0] if row else 0) + 1
+                conn.execute("INSERT OR REPLACE INTO emitter_profiles (rnc, fields, version, updated) VALUES (?, ?, ?, ?)",
+                             (rnc, json.dumps(fields, ensure_ascii=False), profile.version, profile.updated))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._profiles[rnc] = profile
+        return profile, row is None
+
+    def delete(self, rnc):
+        rnc = str(rnc)
+        with self._lock:
+            deleted = self._conn().execute("DELETE FROM emitter_profiles WHERE rnc = ?", (rnc,)).rowcount
+            self._profiles[rnc] = None
+        return deleted > 0
+
+    def warm_up(self):
+        """Carga todos los perfiles con sus fragmentos (antes del fork, con preload)."""
+        from app.services.xml_generation.generated import GENERATED_MODULES
+        module = GENERATED_MODULES[31]
+        for profile in self.list():
+            for suffix in FORMATS:
+                profile.fragment(module, suffix)
+            self._profiles[profile.rnc] = profile
+
+    def apply(self, data):
+        """
+        Completa el Emisor del payload con el perfil de su RNCEmisor si el
+        payload no trae RazonSocialEmisor. Lo que trae el payload prevalece.
+        Devuelve el perfil si sus campos se pueden pegar ya escritos (el
+        payload no cambia ninguno), o None.
+        """
+        try:
+            emisor = data['Encabezado']['Emisor']
+            rnc = emisor['RNCEmisor']
+        except (KeyError, TypeError):
+            return None
+        if not isinstance(emisor, dict) or 'RazonSocialEmisor' in emisor:
+            return None
+        profile = self.get(rnc)
+        if profile is None:
+            return None
+        own = [name for name in emisor if name in PROFILE_FIELDS]
+        data['Encabezado']['Emisor'] = {**profile.fields, **emisor}
+        # RNCEmisor siempre viene; si además trae otro campo del perfil, se escribe todo de nuevo
+        return profile if own == ['RNCEmisor'] else None
+
+
+emitter_profiles = EmitterProfiles()
@@ -0,0 +1,168 @@
+"""
+Caché de idempotencia de /ecf/ecf compartida entre los workers de gunicorn.
+
+Los POS reintentan el mismo documento cuando se les vence el timeout. La clave
+es (RNCEmisor, eNCF, hash del payload canónico) y el valor es el XML tal como
+se generó la primera vez, con su FechaHoraFirma original: un reintento nunca
+produce un documento con otra fecha de firma.
+
+El almacén es un SQLite local en modo WAL (un archivo por máquina, visible
+para todos los workers). Las entradas vencen por TTL y, pasado el máximo, se
+descartan las de acceso más antiguo (LRU). Dos peticiones idénticas
+simultáneas, en el mismo worker o en otro, se resuelven con una sola
+construcción: la primera reclama la clave en ecf_cache_inflight y las demás
+esperan su resultado.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+from app.services.metrics import metrics
+from app.utils.sqlite_store import LocalConnection
+
+# Cada cuántas inserciones por proceso se purgan vencidos y sobrantes
+SWEEP_EVERY = 64
+POLL_INTERVAL = 0.005
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS ecf_cache ("
+    "key TEXT PRIMARY KEY, xml BLOB NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ecf_cache_accessed ON ecf_cache (accessed)",
+    "CREATE TABLE IF NOT EXISTS ecf_cache_inflight (key TEXT PRIMARY KEY, started REAL NOT NULL)",
+)
+
+
+def payload_hash(data):
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class IdempotencyCache:
+    def __init__(self):
+        self.enabled = True
+        self.path = None
+        self.max_entries = 10000
+        self.ttl = 24 * 3600
+        self.wait_timeout = 10.0
+        self._db = None
+        self._puts = 0
+
+    def configure(self, enabled=True, path=None, max_entries=10000, ttl=24 * 3600, wait_timeout=10.0):
+        self.enabled = enabled
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ecf-idempotency.sqlite3')
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._db = LocalConnection(self.path, SCHEMA)
+
+    @staticmethod
+    def make_key(data, variant='', client_key=None):
+        """
+        Clave del documento, o None si no se cachea (sin RNCEmisor).
+        `variant` separa salidas distintas del mismo payload (p. ej. firmada).
+        Un payload sin eNCF (se lo asigna el servicio) solo se cachea con la
+        clave del cliente (header Idempotency-Key): dos ventas con el mismo
+        JSON son documentos distintos y llevan números distintos.
+        """
+        try:
+            rnc = data['Encabezado']['Emisor']['RNCEmisor']
+            encf = data['Encabezado']['IdDoc'].get('eNCF')
+        except (KeyError, TypeError, AttributeError):
+            return None
+        if not encf:
+            if not client_key:
+                return None
+            encf = f"key:{client_key}"
+        return f"{rnc}|{encf}|{payload_hash(data)}|{variant}"
+
+    def _conn(self):
+        if self._db is None:
+            self.configure()
+        return self._db.get()
+
+    def get(self, key):
+        now = time.time()
+        row = self._conn().execute("SELECT xml FROM ecf_cache WHERE key = ? AND created > ?",
+                                   (key, now - self.ttl)).fetchone()
+        if row is None:
+            return None
+        self._conn().execute("UPDATE ecf_cache SET accessed = ? WHERE key = ?", (now, key))
+        return bytes(row[0])
+
+    def put(self, key, xml_bytes):
+        now = time.time()
+        self._conn().execute("INSERT OR REPLACE INTO ecf_cache (key, xml, created, accessed) VALUES (?, ?, ?, ?)",
+                             (key, xml_bytes, now, now))
+        self._puts += 1
+        if self._puts % SWEEP_EVERY == 0:
+            self.sweep()
+
+    def sweep(self):
+        """Borra las entradas vencidas y, si sobran, las de acceso más antiguo."""
+        conn = self._conn()
+        conn.execute("DELETE FROM ecf_cache WHERE created <= ?", (time.time() - self.ttl,))
+        excess = conn.execute("SELECT COUNT(*) FROM ecf_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute("DELETE FROM ecf_cache WHERE key IN "
+                         "(SELECT key FROM ecf_cache ORDER BY accessed LIMIT ?)", (excess,))
+
+    def _claim(self, key):
+        conn = self._conn()
+        # Un dueño que no terminó a tiempo (worker caído) pierde la clave
+        conn.execute("DELETE FROM ecf_cache_inflight WHERE key = ? AND started < ?",
+                     (key, time.time() - self.wait_timeout))
+        cur = conn.execute("INSERT OR IGNORE INTO ecf_cache_inflight (key, started) VALUES (?, ?)",
+                           (key, time.time()))
+        return cur.rowcount == 1
+
+    def _release(self, key):
+        self._conn().execute("DELETE FROM ecf_cache_inflight WHERE key = ?", (key,))
+
+    def _in_flight(self, key):
+        return self._conn().execute("SELECT 1 FROM ecf_cache_inflight WHERE key = ?", (key,)).fetchone() is not None
+
+    def _count(self, result):
+        metrics.inc('ecf_idempotency_requests_total', (('result', result),))
+
+    def get_or_build(self, key, build):
+        """
+        Devuelve (xml_bytes, hit). `build` solo se llama si nadie más generó ni
+        está generando este documento; sus excepciones se propagan sin cachear nada.
+        """
+        xml_bytes = self.get(key)
+        if xml_bytes is not None:
+            self._count('hit')
+            return xml_bytes, True
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if self._claim(key):
+                try:
+                    # Pudo terminar otro entre el get() y el claim
+                    xml_bytes = self.get(key)
+                    if xml_bytes is not None:
+                        self._count('coalesced')
+                        return xml_bytes, True
+                    xml_bytes = build()
+                    self.put(key, xml_bytes)
+                    self._count('miss')
+                    return xml_bytes, False
+                finally:
+                    self._release(key)
+
+            # Otra petición idéntica lo está construyendo: esperar su resultado
+            while self._in_flight(key) and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+            xml_bytes = self.get(key)
+            if xml_bytes is not None:
+                self._count('coalesced')
+                return xml_bytes, True
+            if time.monotonic() >= deadline:
+                # El dueño no responde; construir sin cachear antes que fallar
+                self._count('miss')
+                return build(), False
+            # El dueño falló (p. ej. ValueError): intentarlo aquí
+
+
+idempotency_cache = IdempotencyCache()
@@ -0,0 +1,293 @@
+"""
+Métricas de latencia por fase, agregadas entre todos los workers de gunicorn.
+
+Cada proceso acumula sus histogramas en memoria (observe() solo suma enteros
+bajo un lock) y un hilo de fondo vuelca una instantánea a
+<ECF_METRICS_DIR>/<pid>.json cada ECF_METRICS_FLUSH_INTERVAL segundos. /metrics
+suma las instantáneas de todos los procesos, así que da el mismo resultado sin
+importar qué worker atienda el scrape. Cuando un worker muere (hook child_exit
+de gunicorn.conf.py) su instantánea se suma a retired.json y su archivo se
+borra: los contadores nunca retroceden y el directorio no crece con cada
+reciclaje de workers (max_requests).
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from bisect import bisect_left
+
+# Límites (en segundos) de los buckets de los histogramas de latencia
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'ecf_phase_duration_seconds': ('histogram', 'Duración de cada fase de la generación de un e-CF'),
+    'ecf_requests_total': ('counter', 'Peticiones de generación de e-CF por TipoeCF y código HTTP'),
+    'ecf_idempotency_requests_total': ('counter', 'Consultas a la caché de idempotencia por resultado (hit, coalesced, miss)'),
+    'ecf_idempotency_hit_ratio': ('gauge', 'Fracción de consultas a la caché de idempotencia servidas sin construir'),
+}
+
+RETIRED = "retired.json"
+
+# Gauges derivados de los contadores ya sumados: nombre -> (contador, etiqueta, valores que cuentan como acierto)
+RATIOS = {
+    'ecf_idempotency_hit_ratio': ('ecf_idempotency_requests_total', 'result', ('hit', 'coalesced')),
+}
+
+
+class PhaseTimer:
+    """
+    Cronómetro de una petición: mark(nombre) guarda el tiempo desde la marca anterior.
+
+    Las fases quedan en orden en `phases` y se usan tanto para los histogramas
+    como para el encabezado Server-Timing.
+    """
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        parts = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.phases]
+        parts.append(f"total;dur={self.total() * 1000:.3f}")
+        return ", ".join(parts)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.enabled = True
+        self.directory = None
+        self.flush_interval = 1.0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._dirty = False
+        self._pid = None
+        self._thread = None
+
+    def configure(self, enabled=True, directory=None, flush_interval=1.0):
+        self.enabled = enabled
+        self.directory = directory
+        self.flush_interval = flush_interval
+
+    @staticmethod
+    def default_dir(master_pid):
+        # Por defecto un directorio por proceso maestro: los workers de gunicorn
+        # comparten el mismo padre y un reinicio del servicio empieza de cero.
+        return os.path.join(tempfile.gettempdir(), f"ecf-metrics-{master_pid}")
+
+    def _metrics_dir(self):
+        if not self.directory:
+            self.directory = self.default_dir(os.getppid())
+        os.makedirs(self.directory, exist_ok=True)
+        return self.directory
+
+    def _after_fork(self):
+        # Un worker recién creado no debe volcar lo que acumuló el maestro
+        self._pid = os.getpid()
+        self._histograms = {}
+        self._counters = {}
+        self._thread = None
+        if self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._thread.start()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    def _observe(self, name, labels, seconds):
+        # Llamar con el lock tomado
+        key = (name, labels)
+        series = self._histograms.get(key)
+        if series is None:
+            series = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+        # El índice len(BUCKETS) es el bucket +Inf; el último valor es la suma
+        series[bisect_left(BUCKETS, seconds)] += 1
+        series[-1] += seconds
+
+    def observe(self, name, labels, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_pid()
+            self._observe(name, labels, seconds)
+            self._dirty = True
+
+    def inc(self, name, labels, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_pid()
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+            self._dirty = True
+        if self.flush_interval <= 0:
+            self._flush_quietly()
+
+    def record(self, timer, tipo_ecf, status):
+        """Vuelca las fases de un PhaseTimer y cuenta la petición (un solo lock por petición)."""
+        if not self.enabled:
+            return
+        tipo = ('tipo_ecf', str(tipo_ecf))
+        total = timer.total()
+        with self._lock:
+            self._check_pid()
+            for phase, seconds in timer.phases:
+                self._observe('ecf_phase_duration_seconds', (('phase', phase), tipo), seconds)
+            self._observe('ecf_phase_duration_seconds', (('phase', 'total'), tipo), total)
+            key = ('ecf_requests_total', (('status', str(status)), tipo))
+            self._counters[key] = self._counters.get(key, 0) + 1
+            self._dirty = True
+        if self.flush_interval <= 0:
+            self._flush_quietly()
+
+    def _snapshot(self):
+        with self._lock:
+            self._dirty = False
+            return {
+                "histograms": [[name, list(labels), list(series)] for (name, labels), series in self._histograms.items()],
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+            }
+
+    def flush(self):
+        if self._pid != os.getpid():
+            return
+        with self._flush_lock:
+            snapshot = self._snapshot()
+            path = os.path.join(self._metrics_dir(), f"{self._pid}.json")
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, path)
+
+    def _flush_quietly(self):
+        # Una métrica que no se pudo escribir nunca debe tumbar la petición
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self._flush_quietly()
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _merge(snapshot, histograms, counters):
+        for name, labels, series in snapshot["histograms"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            total = histograms.setdefault(key, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+        for name, labels, value in snapshot["counters"]:
+            key = (name, tuple(tuple(label) for label in labels))
+            counters[key] = counters.get(key, 0) + value
+
+    def retire(self, pid, directory=None):
+        """
+        Suma la instantánea de un worker que terminó a retired.json y borra su
+        archivo. Lo llama el maestro (un solo hilo) desde child_exit.
+        """
+        directory = directory or self._metrics_dir()
+        path = os.path.join(directory, f"{pid}.json")
+        snapshot = self._read(path)
+        if snapshot is None:
+            return
+        retired_path = os.path.join(directory, RETIRED)
+        retired = self._read(retired_path) or {"histograms": [], "counters": []}
+        histograms, counters = {}, {}
+        self._merge(retired, histograms, counters)
+        self._merge(snapshot, histograms, counters)
+        # retired.json lista los pids ya sumados: collect() ignora sus archivos si
+        # lo lee entre este replace y el remove. Solo quedan los que aún existen.
+        pids = [p for p in retired.get("pids", []) if os.path.exists(os.path.join(directory, f"{p}.json"))]
+        tmp = retired_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "pids": pids + [pid],
+                "histograms": [[name, list(labels), series] for (name, labels), series in histograms.items()],
+                "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+            }, f)
+        os.replace(tmp, retired_path)
+        os.remove(path)
+
+    def collect(self):
+        """Suma las instantáneas de todos los procesos, vivos y retirados."""
+        self.flush()
+        histograms, counters = {}, {}
+        directory = self._metrics_dir()
+        retired = self._read(os.path.join(directory, RETIRED))
+        skip = {RETIRED}
+        if retired is not None:
+            self._merge(retired, histograms, counters)
+            skip.update(f"{pid}.json" for pid in retired.get("pids", []))
+        for filename in os.listdir(directory):
+            if not filename.endswith(".json") or filename in skip:
+                continue
+            snapshot = self._read(os.path.join(directory, filename))
+            if snapshot is not None:
+                self._merge(snapshot, histograms, counters)
+        return histograms, counters
+
+    def render(self):
+        """Formato de texto de Prometheus (version 0.0.4)."""
+        histograms, counters = self.collect()
+        lines = []
+        emitted = set()
+
+        def header(name):
+            if name not in emitted and name in HELP:
+                kind, text = HELP[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                emitted.add(name)
+
+        for (name, labels), series in sorted(histograms.items()):
+            header(name)
+            base = ",".join(f'{k}="{v}"' for k, v in labels)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, series):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            cumulative += series[len(BUCKETS)]
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{{base}}} {series[-1]}')
+            lines.append(f'{name}_count{{{base}}} {cumulative}')
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            base = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f'{name}{{{base}}} {value}')
+
+        for name, (counter, label, hits) in RATIOS.items():
+            values = [(dict(labels).get(label), value) for (n, labels), value in counters.items() if n == counter]
+            total = sum(value for _, value in values)
+            if total:
+                header(name)
+                lines.append(f'{name} {sum(value for v, value in values if v in hits) / total}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,107 @@
+"""
+Pools acotados para el trabajo de CPU de las peticiones en el modo 'threaded'.
+
+Con workers gthread (ECF_SERVER_MODE=threaded) cada proceso atiende muchas
+peticiones a la vez en hilos: leer el cuerpo de un cliente lento o esperar
+un servicio externo ya no ocupa un proceso entero. Lo que sí gasta CPU pasa
+por un pool por etapa con un tope de hilos y de cola:
+
+  - build    -> los builders (Python puro, retienen el GIL): pocos hilos, más
+                no construyen más rápido y solo alargan la latencia de todos,
+  - validate -> validación XSD de lxml, que suelta el GIL: uno por núcleo,
+  - sign     -> firma (cryptography y la canonicalización de lxml, que
+                también lo sueltan): uno por núcleo.
+
+Si una etapa tiene llenos sus hilos y su cola, la petición se rechaza en el
+acto con Overloaded (503 y Retry-After) en vez de esperar sin límite. En el
+modo 'sync' los pools no se usan: run() llama a la función en el mismo hilo.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.services.metrics import metrics
+
+STAGES = ('build', 'validate', 'sign')
+
+
+class Overloaded(Exception):
+    """La etapa no admite más trabajo en cola: la petición se rechaza con 503."""
+    def __init__(self, stage):
+        super().__init__(f"Servicio saturado: la etapa {stage} no admite más trabajo")
+        self.stage = stage
+
+
+def parse_pool_sizes(value, default=0):
+    """'build=2,sign=4' -> {'build': 2, 'validate': default, 'sign': 4}. 0 = núcleos de la máquina."""
+    sizes = {stage: default for stage in STAGES}
+    for part in (value or '').split(','):
+        if '=' in part:
+            stage, size = part.split('=', 1)
+            if stage.strip() not in sizes:
+                raise ValueError(f"Etapa desconocida en ECF_OFFLOAD_POOLS: {stage}")
+            sizes[stage.strip()] = int(size)
+    return {stage: size or os.cpu_count() or 1 for stage, size in sizes.items()}
+
+
+class _Pool:
+    def __init__(self, stage, size, queue):
+        self.stage = stage
+        self.size = size
+        self.queue = queue
+        # Un cupo por hilo y por lugar en la cola
+        self._slots = threading.BoundedSemaphore(size + queue)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Se crea después del fork (con preload, el maestro no lo usa)
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.size,
+                                                        thread_name_prefix=f"offload-{self.stage}")
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.inc('ecf_offload_rejected_total', (('stage', self.stage),))
+            raise Overloaded(self.stage)
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+class Offload:
+    def __init__(self):
+        self.enabled = False
+        self.retry_after = 1
+        self._pools = {}
+
+    def configure(self, enabled=False, sizes=None, queue=64, retry_after=1):
+        self.shutdown()
+        self.enabled = enabled
+        self.retry_after = retry_after
+        sizes = sizes or parse_pool_sizes(None)
+        self._pools = {stage: _Pool(stage, sizes[stage], queue) for stage in STAGES}
+
+    def run(self, stage, fn, *args):
+        """fn(*args) en el pool de la etapa, esperando el resultado; directo si está desactivado."""
+        if not self.enabled:
+            return fn(*args)
+        return self._pools[stage].run(fn, *args)
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown()
+
+
+offload = Offload()
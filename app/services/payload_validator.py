@@ -0,0 +1,496 @@
+"""
+Validación previa del JSON de un e-CF, antes de construir el XML.
+
+Las reglas salen de los mismos XSD de la DGII (xsd_model.py) y se compilan una
+sola vez por TipoeCF: campos requeridos, cardinalidad, enumeraciones,
+longitudes, dígitos de los decimales, rangos y patrones. Cada valor se revisa
+ya formateado como lo escriben los builders (decimales con sus n decimales,
+códigos con ceros a la izquierda, fechas YYYY-MM-DD -> DD-MM-YYYY), así que un
+payload que pasa aquí no falla en el XSD por el valor de un campo.
+
+Para que un payload válido cueste lo mínimo, cada regla se compila además a
+una función Python generada (_FastCompiler) y el recorrido que arma los
+mensajes solo entra en lo que esa función rechaza.
+
+Devuelve todos los errores de una vez, con la ruta del campo en el JSON:
+
+    [{"path": "Encabezado.IdDoc.eNCF", "rule": "pattern", "message": "..."}]
+"""
+import os
+import re
+import threading
+from functools import lru_cache
+from app.services.schema_registry import SCHEMA_FILES, SCHEMAS_DIR
+from app.services.xml_generation.xsd_model import UNBOUNDED, load_schema
+from app.services.xml_generation.formatters import fmt_date
+
+# Los builders los rellenan si el cliente no los envía (ver codegen.DEFAULTS)
+DEFAULTED = ('Version', 'FechaHoraFirma', 'FechaHoraAcuseRecibo', 'FechaHoraAprobacionComercial')
+
+# Bloques que los builders recorren como lista directa (no aceptan {"Item": [...]})
+PLAIN_LISTS = ('DetallesItems',)
+
+_INTEGER = re.compile(r'[+-]?[0-9]+')
+
+
+def _formatter(xsd_type):
+    kind = xsd_type.kind
+    if kind[0] == 'dec':
+        fmt = f'%.{kind[1]}f'
+
+        def dec(value):
+            if isinstance(value, bool):
+                raise TypeError
+            return fmt % float(value)
+        return dec, "un número"
+    if kind[0] == 'pad':
+        fmt = f'%0{kind[1]}d'
+
+        def pad(value):
+            if isinstance(value, bool):
+                raise TypeError
+            return fmt % int(value)
+        return pad, "un código numérico"
+    if kind[0] == 'date':
+        def date(value):
+            if not isinstance(value, str):
+                raise TypeError
+            return fmt_date(value)
+        return date, "una fecha YYYY-MM-DD"
+
+    def text(value):
+        if isinstance(value, (dict, list, bool)) or value is None:
+            raise TypeError
+        return str(value)
+    return text, "un texto"
+
+
+def _significant_digits(text):
+    integer, _, fraction = text.lstrip('+-').partition('.')
+    return len(integer.lstrip('0')) + len(fraction.rstrip('0'))
+
+
+def _pattern(value):
+    # En los XSD ^ y $ no son anclas, pero la DGII los usa como tales en algún tipo
+    if value.startswith('^') and value.endswith('$'):
+        value = value[1:-1]
+    return re.compile(value)
+
+
+_RANGE_WORDS = {'minExclusive': 'mayor que', 'minInclusive': 'mayor o igual que', 'maxInclusive': 'menor o igual que'}
+
+
+def _checks(xsd_type):
+    """[(regla, test(texto) -> bool, mensaje)] en el orden en que se reportan."""
+    facets = xsd_type.facets
+    checks = []
+    if xsd_type.base == 'xs:integer' and xsd_type.kind[0] == 'str':
+        checks.append(('type', _INTEGER.fullmatch, "debe ser un número entero"))
+    if xsd_type.enumeration:
+        allowed = frozenset(xsd_type.enumeration)
+        checks.append(('enumeration', allowed.__contains__,
+                       f"debe ser uno de {', '.join(sorted(allowed))}"))
+    if 'minLength' in facets:
+        n = int(facets['minLength'])
+        checks.append(('minLength', lambda t, n=n: len(t) >= n, f"debe tener al menos {n} caracteres"))
+    if 'maxLength' in facets:
+        n = int(facets['maxLength'])
+        checks.append(('maxLength', lambda t, n=n: len(t) <= n, f"debe tener como máximo {n} caracteres"))
+    if 'totalDigits' in facets:
+        n = int(facets['totalDigits'])
+        # Casi siempre basta con la longitud del texto
+        checks.append(('totalDigits', lambda t, n=n: len(t) <= n or _significant_digits(t) <= n,
+                       f"admite como máximo {n} dígitos"))
+    if 'pattern' in facets:
+        regex = _pattern(facets['pattern'])
+        checks.append(('pattern', lambda t, r=regex.fullmatch: r(t) is not None,
+                       f"no cumple el patrón {facets['pattern']}"))
+    # Los rangos se comparan sobre el texto ya validado como número
+    for facet, test in (('minExclusive', float.__gt__), ('minInclusive', float.__ge__),
+                        ('maxInclusive', float.__le__)):
+        if facet in facets:
+            bound = float(facets[facet])
+            checks.append((facet, lambda t, b=bound, op=test: _compare(t, b, op),
+                           f"debe ser {_RANGE_WORDS[facet]} {facets[facet]}"))
+    return checks
+
+
+def _combined_match(xsd_type):
+    """
+    Las reglas de texto del tipo (entero, enumeración, longitudes y patrón) en
+    una sola expresión regular, con un lookahead anclado al final por regla.
+    """
+    facets = xsd_type.facets
+    parts = []
+    if xsd_type.base == 'xs:integer' and xsd_type.kind[0] == 'str':
+        parts.append(r'[+-]?[0-9]+')
+    if xsd_type.enumeration:
+        parts.append('|'.join(re.escape(v) for v in xsd_type.enumeration))
+    if 'minLength' in facets or 'maxLength' in facets:
+        parts.append(r'[\s\S]{%s,%s}' % (facets.get('minLength', '0'), facets.get('maxLength', '')))
+    if 'pattern' in facets:
+        parts.append(_pattern(facets['pattern']).pattern)
+    return re.compile(''.join(f'(?=(?:{p})\\Z)' for p in parts)).match
+
+
+def _compare(text, bound, op):
+    try:
+        return op(float(text), bound)
+    except ValueError:
+        return True  # ya lo reporta el tipo o el patrón
+
+
+def _check_occurs(rule, count, path, errors):
+    if count > rule.max_occurs:
+        errors.append({"path": path, "rule": "maxOccurs",
+                       "message": f"Admite como máximo {rule.max_occurs} elementos (trae {count})"})
+    elif rule.required and count < rule.min_occurs:
+        errors.append({"path": path, "rule": "minOccurs",
+                       "message": f"Requiere al menos {rule.min_occurs} elementos (trae {count})"})
+
+
+class _Field:
+    """Elemento simple: formatea el valor como el builder y aplica las facetas."""
+    __slots__ = ('name', 'xsd_type', 'required', 'repeated', 'min_occurs', 'max_occurs', 'fmt', 'expected',
+                 'checks', 'match', 'fast')
+
+    def __init__(self, el):
+        self.name = el.name
+        self.xsd_type = el.type
+        self.required = el.required and el.name not in DEFAULTED
+        self.repeated = el.repeated
+        self.min_occurs = el.min_occurs
+        self.max_occurs = el.max_occurs
+        self.fmt, self.expected = _formatter(el.type)
+        self.checks = _checks(el.type)
+        self.match = _combined_match(el.type)
+
+    def check(self, value, path, errors):
+        try:
+            text = self.fmt(value)
+        except (TypeError, ValueError):
+            errors.append({"path": path, "rule": "type", "message": f"Se esperaba {self.expected}"})
+            return
+        for rule, test, message in self.checks:
+            if not test(text):
+                errors.append({"path": path, "rule": rule, "message": f"{text!r} {message}"})
+
+    def missing(self, path, errors):
+        errors.append({"path": path, "rule": "required", "message": f"Falta el campo requerido {self.name}"})
+
+    def check_present(self, value, path, errors):
+        if value is None:
+            if self.required:
+                self.missing(path, errors)
+        elif self.repeated:
+            self.check_rows(value, path, errors)
+        else:
+            self.check(value, path, errors)
+
+    def check_rows(self, values, path, errors):
+        values = values if isinstance(values, (list, tuple)) else (values,)
+        _check_occurs(self, len(values), path, errors)
+        for n, value in enumerate(values):
+            self.check(value, f"{path}[{n}]", errors)
+
+
+class _Block:
+    """Elemento complejo: sus hijos en el orden del XSD."""
+    __slots__ = ('name', 'required', 'repeated', 'min_occurs', 'max_occurs', 'children', 'container',
+                 'by_name', 'required_children', 'fast', 'members')
+
+    def __init__(self, el):
+        self.name = el.name
+        self.required = el.required
+        self.repeated = el.repeated
+        self.min_occurs = el.min_occurs
+        self.max_occurs = el.max_occurs
+        self.children = [_compile(c) for c in el.children if not c.is_any]
+        # Contenedor de una lista: el JSON puede traer la lista directa o {"Hijo": [...]}
+        only = self.children[0] if len(self.children) == 1 else None
+        self.container = only if only is not None and only.repeated else None
+        self.by_name = {c.name: c for c in self.children}
+        self.required_children = [c for c in self.children if c.required]
+
+    def check_members(self, data, path, errors):
+        # Se recorren solo las claves presentes: los items traen pocos de sus
+        # muchos campos opcionales. Después, los requeridos que faltan. Lo que
+        # pasa el chequeo compilado (rule.fast) no se vuelve a recorrer.
+        prefix = path + '.' if path else ''
+        by_name = self.by_name
+        for name, value in data.items():
+            rule = by_name.get(name)
+            if rule is not None and (rule.fast is None or not rule.fast(value)):
+                rule.check_present(value, prefix + name, errors)
+        for rule in self.required_children:
+            if rule.name not in data:
+                rule.missing(prefix + rule.name, errors)
+
+    def check_body(self, value, path, errors):
+        if self.container is not None:
+            only = self.container
+            if isinstance(value, list):
+                rows = value
+            elif isinstance(value, dict) and self.name not in PLAIN_LISTS:
+                rows = value.get(only.name)
+                path = f"{path}.{only.name}"
+                if rows is None:
+                    rows = ()
+            else:
+                errors.append({"path": path, "rule": "type", "message": "Se esperaba una lista"})
+                return
+            only.check_rows(rows, path, errors)
+        elif isinstance(value, dict):
+            self.check_members(value, path, errors)
+        else:
+            errors.append({"path": path, "rule": "type", "message": "Se esperaba un objeto"})
+
+    def missing(self, path, errors):
+        errors.append({"path": path, "rule": "required", "message": f"Falta el bloque requerido {self.name}"})
+
+    def check_present(self, value, path, errors):
+        if not value:
+            if self.required:
+                self.missing(path, errors)
+            return
+        if self.repeated:
+            self.check_rows(value, path, errors)
+        else:
+            self.check_body(value, path, errors)
+
+    def check_rows(self, rows, path, errors):
+        rows = rows if isinstance(rows, (list, tuple)) else (rows,)
+        _check_occurs(self, len(rows), path, errors)
+        members = self.members
+        for n, row in enumerate(rows):
+            if isinstance(row, dict):
+                if not members(row):
+                    self.check_members(row, f"{path}[{n}]", errors)
+            else:
+                errors.append({"path": f"{path}[{n}]", "rule": "type", "message": "Se esperaba un objeto"})
+
+
+def _compile(el):
+    return _Block(el) if el.is_complex else _Field(el)
+
+
+class _FastCompiler:
+    """
+    Genera código Python en línea recta (como codegen.py con los builders) que
+    dice si un valor o un bloque cumple todas sus reglas, sin armar mensajes.
+    Cada regla guarda su función en rule.fast / block.members y el recorrido
+    de _Block/_Field solo describe lo que no pasa. Nunca es más permisivo que
+    ese recorrido: ante cualquier duda devuelve False.
+    """
+    def __init__(self):
+        self.lines = []
+        self.functions = []
+        self.compiled = []
+        self.blocks = []
+        # strptime es lo más caro del chequeo y las fechas se repiten mucho entre payloads
+        self.namespace = {'fmt_date': lru_cache(maxsize=4096)(fmt_date), '_significant_digits': _significant_digits,
+                          '_TEXT': (str, int, float)}
+        self.counter = 0
+
+    def name(self, prefix, value=None):
+        self.counter += 1
+        name = f"{prefix}{self.counter}"
+        if value is not None:
+            self.namespace[name] = value
+        return name
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def value(self, field, var, indent):
+        kind = field.xsd_type.kind
+        facets = field.xsd_type.facets
+        if kind[0] in ('dec', 'pad'):
+            self.emit(indent, f"if {var} is True or {var} is False:")
+            self.emit(indent + 1, "return False")
+            conversion = 'float' if kind[0] == 'dec' else 'int'
+            fmt = f"%.{kind[1]}f" if kind[0] == 'dec' else f"%0{kind[1]}d"
+            self.emit(indent, f"t = {fmt!r} % {conversion}({var})")
+        elif kind[0] == 'date':
+            self.emit(indent, f"if {var}.__class__ is not str:")
+            self.emit(indent + 1, "return False")
+            self.emit(indent, f"t = fmt_date({var})")
+        else:
+            self.emit(indent, f"if {var}.__class__ not in _TEXT:")
+            self.emit(indent + 1, "return False")
+            self.emit(indent, f"t = str({var})")
+        if field.match.__self__.pattern:
+            self.emit(indent, f"if {self.name('m', field.match)}(t) is None:")
+            self.emit(indent + 1, "return False")
+        if 'totalDigits' in facets:
+            n = int(facets['totalDigits'])
+            self.emit(indent, f"if len(t) > {n} and _significant_digits(t) > {n}:")
+            self.emit(indent + 1, "return False")
+        for facet, op in (('minExclusive', '<='), ('minInclusive', '<'), ('maxInclusive', '>')):
+            if facet in facets:
+                self.emit(indent, f"if float(t) {op} {float(facets[facet])!r}:")
+                self.emit(indent + 1, "return False")
+
+    def occurs(self, rule, var, indent):
+        conditions = []
+        if rule.max_occurs < UNBOUNDED:
+            conditions.append(f"len({var}) > {rule.max_occurs}")
+        if rule.required and rule.min_occurs > 1:
+            conditions.append(f"len({var}) < {rule.min_occurs}")
+        if conditions:
+            self.emit(indent, f"if {' or '.join(conditions)}:")
+            self.emit(indent + 1, "return False")
+
+    def rows(self, rule, var, indent):
+        """Mismo criterio que check_rows: lista, tupla o un solo elemento."""
+        rows = self.name('r')
+        self.emit(indent, f"{rows} = {var} if isinstance({var}, (list, tuple)) else ({var},)")
+        self.occurs(rule, rows, indent)
+        row = self.name('v')
+        self.emit(indent, f"for {row} in {rows}:")
+        if isinstance(rule, _Block):
+            self.emit(indent + 1, f"if {row}.__class__ is not dict or not {self.block(rule)}({row}):")
+            self.emit(indent + 2, "return False")
+        else:
+            self.value(rule, row, indent + 1)
+
+    def present(self, rule, var, indent):
+        if isinstance(rule, _Field):
+            if rule.repeated:
+                self.rows(rule, var, indent)
+            else:
+                self.value(rule, var, indent)
+        elif rule.repeated:
+            self.rows(rule, var, indent)
+        elif rule.container is not None:
+            only = rule.container
+            rows = self.name('c')
+            self.emit(indent, f"if isinstance({var}, list):")
+            self.emit(indent + 1, f"{rows} = {var}")
+            if rule.name not in PLAIN_LISTS:
+                self.emit(indent, f"elif {var}.__class__ is dict:")
+                self.emit(indent + 1, f"{rows} = {var}.get({only.name!r})")
+                self.emit(indent + 1, f"if {rows} is None:")
+                self.emit(indent + 2, f"{rows} = ()")
+            self.emit(indent, "else:")
+            self.emit(indent + 1, "return False")
+            self.rows(only, rows, indent)
+        else:
+            self.emit(indent, f"if {var}.__class__ is not dict or not {self.block(rule)}({var}):")
+            self.emit(indent + 1, "return False")
+
+    def child(self, rule):
+        """Emite la función que revisa un hijo tal como viene en el JSON (también ausente o nulo)."""
+        function = self.name('f')
+        saved, self.lines = self.lines, []
+        self.emit(0, f"def {function}(v):")
+        # Mismo criterio que check_present: un bloque vacío cuenta como ausente
+        self.emit(1, "if v is None:" if isinstance(rule, _Field) else "if not v:")
+        self.emit(2, f"return {not rule.required}")
+        self.emit(1, "try:")
+        self.present(rule, 'v', 2)
+        self.emit(1, "except (TypeError, ValueError, OverflowError):")
+        self.emit(2, "return False")
+        self.emit(1, "return True")
+        self.functions.extend(self.lines)
+        self.lines = saved
+        self.compiled.append((rule, function))
+        return function
+
+    def block(self, block):
+        """
+        Emite la función que revisa los miembros de un bloque y devuelve su
+        nombre. Como check_members, solo recorre las claves presentes (los items
+        traen pocos de sus muchos campos opcionales) y al final exige los requeridos.
+        """
+        table = self.name('T')
+        required = self.name('R', frozenset(c.name for c in block.children if c.required))
+        entries = ", ".join(f"{c.name!r}: {self.child(c)}" for c in block.children)
+        self.functions.append(f"{table} = {{{entries}}}")
+        function = self.name('b')
+        self.functions.extend([
+            f"def {function}(d):",
+            "    for k, v in d.items():",
+            f"        f = {table}.get(k)",
+            "        if f is not None and not f(v):",
+            "            return False",
+            f"    return {required} <= d.keys()",
+        ])
+        self.blocks.append((block, function))
+        return function
+
+    def compile(self, block):
+        """Compila el chequeo del documento y deja el de cada hijo en su regla (rule.fast)."""
+        root = self.block(block)
+        exec(compile("\n".join(self.functions) + "\n", "<payload_validator>", "exec"), self.namespace)
+        for rule, function in self.compiled:
+            # Las listas de bloques se revisan fila por fila (rule.members), para
+            # no recorrerlas dos veces cuando traen un error
+            is_list = isinstance(rule, _Block) and (rule.repeated or rule.container is not None)
+            rule.fast = None if is_list else self.namespace[function]
+        for block, function in self.blocks:
+            block.members = self.namespace[function]
+        return self.namespace[root]
+
+
+class PayloadValidator:
+    """Reglas compiladas por TipoeCF, cargadas la primera vez que llega cada tipo."""
+    def __init__(self):
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def rules(self, tipo_ecf):
+        """Reglas compiladas del tipo, o None si no hay XSD para él."""
+        compiled = self._compiled.get(tipo_ecf, False)
+        if compiled is False:
+            with self._lock:
+                compiled = self._compiled.get(tipo_ecf, False)
+                if compiled is False:
+                    filename = SCHEMA_FILES.get((str(tipo_ecf), '1.0'))
+                    if filename:
+                        compiled = _Block(load_schema(os.path.join(SCHEMAS_DIR, filename)))
+                        _FastCompiler().compile(compiled)
+                    else:
+                        compiled = None
+                    self._compiled[tipo_ecf] = compiled
+        return compiled
+
+    def has_element(self, tipo_ecf, path):
+        """True si el XSD del tipo tiene el elemento, p. ej. ('Encabezado', 'IdDoc', 'FechaVencimientoSecuencia')."""
+        rule = self.rules(tipo_ecf)
+        for name in path:
+            rule = getattr(rule, 'by_name', {}).get(name)
+            if rule is None:
+                return False
+        return True
+
+    def warm_up(self, tipos):
+        for tipo in tipos:
+            self.rules(tipo)
+
+    def validate(self, data, document=None):
+        """
+        Lista de errores del payload; vacía si se puede construir. Con `document`
+        ('RFCE', 'ARECF', 'ACECF') se revisa contra el XSD de ese documento en
+        vez del del TipoeCF.
+        """
+        if not isinstance(data, dict):
+            return [{"path": "", "rule": "type", "message": "Se esperaba un objeto JSON"}]
+        if document:
+            rules = self.rules(document)
+        else:
+            try:
+                tipo_ecf = int(data['Encabezado']['IdDoc']['TipoeCF'])
+            except (KeyError, TypeError, ValueError):
+                return [{"path": "Encabezado.IdDoc.TipoeCF", "rule": "required",
+                         "message": "Falta TipoeCF o no es un número"}]
+            rules = self.rules(tipo_ecf)
+            if rules is None:
+                return [{"path": "Encabezado.IdDoc.TipoeCF", "rule": "enumeration",
+                         "message": f"TipoeCF {tipo_ecf} no soportado"}]
+        errors = []
+        rules.check_members(data, '', errors)
+        return errors
+
+
+payload_validator = PayloadValidator()
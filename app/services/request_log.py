@@ -0,0 +1,198 @@
+"""
+Log estructurado de las peticiones de /ecf/ecf.
+
+Cada petición deja un registro JSON por línea con TipoeCF, eNCF, RNCEmisor,
+cantidad de items, código HTTP, tamaños y duración por fase. El hilo de la
+petición solo arma un diccionario pequeño y lo pone en una cola acotada; un
+hilo de fondo por proceso (QueueListener) lo formatea y lo escribe. Si la
+cola se llena, el registro se descarta y se cuenta en `dropped`: una salida
+de logs lenta nunca frena las respuestas.
+
+El payload no se loguea salvo que se pida (ECF_LOG_PAYLOAD): en una fracción
+de las peticiones exitosas y en todas las que fallan, sin datos del comprador
+('redacted') o completo ('full'), recortado a ECF_LOG_PAYLOAD_MAX_BYTES. Se
+serializa recién en el hilo de fondo.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+REDACTED = '***'
+
+# Datos del comprador y de contacto que no salen en los logs en modo 'redacted'
+SENSITIVE_KEYS = frozenset((
+    'RNCComprador', 'IdentificadorExtranjero', 'RazonSocialComprador', 'ContactoComprador',
+    'CorreoComprador', 'DireccionComprador', 'MunicipioComprador', 'ProvinciaComprador',
+    'TelefonoAdicional', 'CorreoEmisor', 'TablaTelefonoEmisor', 'NumeroCuentaPago',
+    'RNCOtroContribuyente', 'CodigoInternoComprador',
+))
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SENSITIVE_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    return value
+
+
+class LazyPayload:
+    """Payload que se serializa (y se censura) al escribir el log, no al pedirlo."""
+    __slots__ = ('data', 'redacted', 'max_bytes')
+
+    def __init__(self, data, redacted, max_bytes):
+        self.data = data
+        self.redacted = redacted
+        self.max_bytes = max_bytes
+
+    def __str__(self):
+        data = redact(self.data) if self.redacted else self.data
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+        if len(text) > self.max_bytes:
+            text = text[:self.max_bytes] + f"...(+{len(text) - self.max_bytes})"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro; los campos de `extra={'ecf': {...}}` van al primer nivel."""
+    def format(self, record):
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, 'ecf', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, owner):
+        super().__init__(None)
+        self.owner = owner
+
+    def prepare(self, record):
+        # El mensaje se arma en el hilo del listener: aquí solo se encola el registro
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.owner.dropped += 1
+
+    def emit(self, record):
+        self.owner._check_pid()
+        if self.queue is None:
+            # Modo sincrónico (ECF_LOG_QUEUE_SIZE=0)
+            self.owner.target.handle(record)
+            return
+        super().emit(record)
+
+
+class RequestLog:
+    def __init__(self):
+        self.enabled = True
+        self.sample_rate = 1.0
+        self.payload_mode = 'off'
+        self.payload_sample_rate = 0.0
+        self.payload_max_bytes = 4096
+        self.queue_size = 10000
+        self.dropped = 0
+        self.target = None
+        self.handler = _NonBlockingQueueHandler(self)
+        self.logger = logging.getLogger('ecf.requests')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self._pid = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def configure(self, enabled=True, sample_rate=1.0, payload_mode='off', payload_sample_rate=0.0,
+                  payload_max_bytes=4096, queue_size=10000, target=None):
+        self.stop()
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.payload_mode = payload_mode
+        self.payload_sample_rate = payload_sample_rate
+        self.payload_max_bytes = payload_max_bytes
+        self.queue_size = queue_size
+        if target is None:
+            target = logging.StreamHandler(sys.stderr)
+        if target.formatter is None:
+            target.setFormatter(JsonFormatter())
+        self.target = target
+        self._pid = None
+
+    def install(self, logger):
+        """Hace que `logger` (p. ej. app.logger) escriba por la misma cola, en JSON."""
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(self.handler)
+        if logger.level == logging.NOTSET:
+            logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    def _check_pid(self):
+        # La cola y el hilo del listener no sobreviven a un fork: uno nuevo por proceso
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self.target is None:
+                self.configure()
+            self._listener = None
+            self.handler.queue = None
+            if self.queue_size > 0:
+                self.handler.queue = queue.Queue(self.queue_size)
+                self._listener = QueueListener(self.handler.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                atexit.register(self.stop)
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Escribe lo que quede en la cola y detiene el listener de este proceso."""
+        listener = self._listener
+        if listener is not None and self._pid == os.getpid():
+            self._listener = None
+            listener.stop()
+
+    def request(self, tipo_ecf, status, timer, data=None, request_bytes=None, response_bytes=None):
+        """Registra una petición de generación de e-CF."""
+        if not self.enabled:
+            return
+        failed = status >= 400
+        if not failed and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        fields = {"tipo_ecf": tipo_ecf, "status": status}
+        if isinstance(data, dict):
+            encabezado = data.get('Encabezado')
+            if isinstance(encabezado, dict):
+                fields["encf"] = (encabezado.get('IdDoc') or {}).get('eNCF')
+                fields["rnc_emisor"] = (encabezado.get('Emisor') or {}).get('RNCEmisor')
+            items = data.get('DetallesItems')
+            fields["items"] = len(items) if isinstance(items, list) else 0
+        fields["request_bytes"] = request_bytes
+        fields["response_bytes"] = response_bytes
+        fields["duration_ms"] = round(timer.total() * 1000, 3)
+        fields["phases_ms"] = {name: round(seconds * 1000, 3) for name, seconds in timer.phases}
+        if self.payload_mode != 'off' and data is not None and (failed or random.random() < self.payload_sample_rate):
+            fields["payload"] = LazyPayload(data, self.payload_mode != 'full', self.payload_max_bytes)
+        self.logger.log(logging.WARNING if failed else logging.INFO, "ecf %s %s", tipo_ecf, status,
+                        extra={"ecf": fields})
+
+
+request_log = RequestLog()
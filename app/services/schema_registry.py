@@ -0,0 +1,139 @@
+import os
+import threading
+from lxml import etree
+
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models', 'schemas')
+
+# (tipo, version) -> archivo XSD publicado por la DGII
+SCHEMA_FILES = {
+    ('31', '1.0'): 'e-CF 31 v.1.0 (1).xsd',
+    ('32', '1.0'): 'e-CF 32 v.1.0 (2).xsd',
+    ('33', '1.0'): 'e-CF 33 v.1.0.xsd',
+    ('34', '1.0'): 'e-CF 34 v.1.0 (1).xsd',
+    ('41', '1.0'): 'e-CF 41 v.1.0 (1).xsd',
+    ('43', '1.0'): 'e-CF 43 v.1.0.xsd',
+    ('44', '1.0'): 'e-CF 44 v.1.0.xsd',
+    ('45', '1.0'): 'e-CF 45 v.1.0 (1).xsd',
+    ('46', '1.0'): 'e-CF 46 v.1.0.xsd',
+    ('47', '1.0'): 'e-CF 47 v.1.0.xsd',
+    ('RFCE', '1.0'): 'RFCE 32 v.1.0 (2).xsd',
+    ('ACECF', '1.0'): 'ACECF v.1.0 (2).xsd',
+    ('ARECF', '1.0'): 'ARECF v1.0.xsd',
+    ('Semilla', '1.0'): 'Semilla v.1.0.xsd',
+}
+
+
+class SchemaUnavailableError(Exception):
+    """El XSD no existe o libxml2 no lo puede compilar."""
+    pass
+
+
+class _SchemaEntry:
+    """
+    Un XSD parseado una sola vez y un pool de validadores compilados.
+
+    Los objetos XMLSchema de lxml guardan su error_log en la instancia, así que
+    no se pueden usar desde dos hilos a la vez. Cada validación toma un
+    validador libre del pool (o compila uno nuevo si todos están ocupados) y lo
+    devuelve al terminar; en un worker sync el pool nunca pasa de uno.
+    """
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self._lock = threading.Lock()
+        self._idle = []
+        try:
+            self._doc = etree.parse(path)
+            self._idle.append(etree.XMLSchema(self._doc))
+            self.error = None
+        except (OSError, etree.XMLSyntaxError, etree.XMLSchemaParseError) as e:
+            self._doc = None
+            self.error = str(e)
+
+    def _acquire(self):
+        if self.error:
+            raise SchemaUnavailableError(f"Esquema {self.key} no disponible: {self.error}")
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return etree.XMLSchema(self._doc)
+
+    def _release(self, schema):
+        with self._lock:
+            self._idle.append(schema)
+
+    def validate(self, xml_doc):
+        schema = self._acquire()
+        try:
+            if schema.validate(xml_doc):
+                return []
+            return [
+                {
+                    "line": error.line,
+                    "column": error.column,
+                    "path": error.path,
+                    "message": error.message,
+                }
+                for error in schema.error_log
+            ]
+        finally:
+            self._release(schema)
+
+
+class SchemaRegistry:
+    """
+    Registro de esquemas XSD compilados una vez por proceso.
+
+    Las claves son (tipo, version): el TipoeCF ('31'...'47') o el nombre del
+    documento ('RFCE', 'ACECF', 'ARECF', 'Semilla'). También acepta la ruta de
+    un XSD para los llamadores que todavía trabajan con archivos.
+    """
+    def __init__(self, schemas_dir=SCHEMAS_DIR, schema_files=None):
+        self.schemas_dir = schemas_dir
+        self.schema_files = dict(schema_files or SCHEMA_FILES)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tipo, version='1.0'):
+        return (str(tipo), str(version))
+
+    def _resolve(self, key):
+        if isinstance(key, str) and key.endswith('.xsd'):
+            return key, os.path.abspath(key)
+        if not isinstance(key, tuple):
+            key = self.make_key(key)
+        filename = self.schema_files.get(key)
+        if filename is None:
+            raise SchemaUnavailableError(f"No hay esquema registrado para {key}")
+        return key, os.path.join(self.schemas_dir, filename)
+
+    def get(self, key):
+        key, path = self._resolve(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = _SchemaEntry(key, path)
+                    self._entries[key] = entry
+        return entry
+
+    def validate(self, key, xml_doc):
+        """Devuelve la lista de errores (vacía si el documento es válido)."""
+        return self.get(key).validate(xml_doc)
+
+    def warmup(self, keys=None):
+        """Compila los esquemas indicados (todos por defecto) y devuelve los que fallaron."""
+        failed = {}
+        for key in (keys or self.schema_files.keys()):
+            entry = self.get(key)
+            if entry.error:
+                failed[entry.key] = entry.error
+        return failed
+
+    def loaded(self):
+        return {key: entry.error is None for key, entry in self._entries.items()}
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,365 @@
+"""
+Asignación de eNCF por (RNCEmisor, TipoeCF) a partir de los rangos autorizados.
+
+Los rangos que autoriza la DGII (desde, hasta, FechaVencimientoSecuencia) se
+guardan en un SQLite local compartido por todos los procesos. Un proceso no
+pide los números de a uno: reserva un bloque de ECF_SEQUENCE_BLOCK_SIZE
+números consecutivos en una transacción (BEGIN IMMEDIATE, así dos procesos
+nunca reservan el mismo tramo) y los entrega desde memoria con un contador,
+sin lock ni viaje al almacén por documento.
+
+Cada bloque queda registrado en encf_leases. Si el proceso termina bien,
+anota el último número que entregó; los números reservados y no usados (o los
+de un proceso que murió) se pueden listar con unused() para anularlos ante la
+DGII. Un número que sí se entregó pero cuyo documento no llegó a salir (falló
+el build, la firma o el XSD) se anota con void() en encf_voided y unused() lo
+lista también. Ningún número se entrega dos veces.
+
+Los procesos del pool de /ecf/batch piden con take() de a un número, reservado
+y cerrado en la misma transacción: un proceso ocioso o muerto no deja tramos
+abiertos.
+"""
+import os
+import time
+import atexit
+import tempfile
+import itertools
+import threading
+from datetime import date, datetime
+from app.utils.sqlite_store import LocalConnection
+from app.services.payload_validator import payload_validator
+
+SEQUENCE_DIGITS = 10
+MAX_SEQUENCE = 10 ** SEQUENCE_DIGITS - 1
+
+# FechaVencimientoSecuencia de relleno para la validación previa; la real llega con el eNCF
+PLACEHOLDER_EXPIRY = '2099-12-31'
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS encf_ranges ("
+    "rnc TEXT NOT NULL, tipo_ecf INTEGER NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL, "
+    "expires TEXT NOT NULL, next INTEGER NOT NULL, created REAL NOT NULL, "
+    "PRIMARY KEY (rnc, tipo_ecf, start))",
+    "CREATE TABLE IF NOT EXISTS encf_leases ("
+    "rnc TEXT NOT NULL, tipo_ecf INTEGER NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL, "
+    "pid INTEGER NOT NULL, leased REAL NOT NULL, last_used INTEGER, "
+    "PRIMARY KEY (rnc, tipo_ecf, start))",
+    "CREATE TABLE IF NOT EXISTS encf_voided ("
+    "rnc TEXT NOT NULL, tipo_ecf INTEGER NOT NULL, number INTEGER NOT NULL, reason TEXT, voided REAL NOT NULL, "
+    "PRIMARY KEY (rnc, tipo_ecf, number))",
+)
+
+
+class SequenceError(Exception):
+    """No hay un rango autorizado y vigente, o el rango pedido no es válido."""
+    pass
+
+
+def format_encf(tipo_ecf, number):
+    return f"E{int(tipo_ecf):02d}{number:0{SEQUENCE_DIGITS}d}"
+
+
+def parse_encf(encf):
+    """'E310000000001' -> (31, 1)"""
+    if not isinstance(encf, str) or len(encf) != 3 + SEQUENCE_DIGITS or encf[0] != 'E' or not encf[1:].isdigit():
+        raise SequenceError(f"eNCF inválido: {encf!r}")
+    return int(encf[1:3]), int(encf[3:])
+
+
+def _parse_date(value):
+    # Acepta YYYY-MM-DD (como el JSON de entrada) o DD-MM-YYYY (como el XML)
+    for fmt in ('%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(str(value), fmt).date()
+        except ValueError:
+            pass
+    raise SequenceError(f"Fecha de vencimiento inválida: {value!r}")
+
+
+def unassigned_slot(data):
+    """(IdDoc, RNCEmisor, TipoeCF) de un payload que no trae eNCF, o None."""
+    try:
+        id_doc = data['Encabezado']['IdDoc']
+        rnc = data['Encabezado']['Emisor']['RNCEmisor']
+        tipo_ecf = int(id_doc['TipoeCF'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not isinstance(id_doc, dict) or id_doc.get('eNCF'):
+        return None
+    return id_doc, rnc, tipo_ecf
+
+
+def check_unassigned(slot, check):
+    """
+    Corre check() antes de asignar el eNCF, con un eNCF y un vencimiento de
+    relleno en IdDoc: un payload rechazado no gasta número.
+    """
+    if slot is None:
+        return check()
+    id_doc, rnc, tipo_ecf = slot
+    added = {'eNCF': format_encf(tipo_ecf, 1)}
+    if 'FechaVencimientoSecuencia' not in id_doc:
+        added['FechaVencimientoSecuencia'] = PLACEHOLDER_EXPIRY
+    id_doc.update(added)
+    try:
+        return check()
+    finally:
+        for name in added:
+            del id_doc[name]
+
+
+class _Block:
+    """Tramo reservado por este proceso: los números salen de un contador en memoria."""
+    __slots__ = ('start', 'end', 'expires', 'counter')
+
+    def __init__(self, start, end, expires):
+        self.start = start
+        self.end = end
+        self.expires = expires
+        self.counter = itertools.count(start)
+
+
+class SequenceAllocator:
+    def __init__(self):
+        self.path = None
+        self.block_size = 100
+        self._db = None
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._exit_registered = False
+
+    def configure(self, path=None, block_size=100):
+        if self._db is not None:
+            self.release()
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ecf-sequences.sqlite3')
+        self.block_size = max(1, block_size)
+        self._db = LocalConnection(self.path, SCHEMA)
+        self._blocks = {}
+        self._pid = None
+
+    def _conn(self):
+        if self._db is None:
+            self.configure()
+        return self._db.get()
+
+    # --- RANGOS AUTORIZADOS ---
+
+    def authorize(self, rnc, tipo_ecf, start, end, expires):
+        """Registra un rango autorizado por la DGII. No puede solaparse con otro del mismo tipo."""
+        rnc, tipo_ecf, start, end = str(rnc), int(tipo_ecf), int(start), int(end)
+        if not 1 <= start <= end <= MAX_SEQUENCE:
+            raise SequenceError(f"Rango inválido: {start}-{end}")
+        expires = _parse_date(expires).isoformat()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            overlap = conn.execute(
+                "SELECT start, end FROM encf_ranges WHERE rnc = ? AND tipo_ecf = ? AND start <= ? AND end >= ?",
+                (rnc, tipo_ecf, end, start)).fetchone()
+            if overlap:
+                raise SequenceError(f"El rango {start}-{end} se solapa con {overlap[0]}-{overlap[1]}")
+            conn.execute("INSERT INTO encf_ranges (rnc, tipo_ecf, start, end, expires, next, created) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", (rnc, tipo_ecf, start, end, expires, start, time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"rnc": rnc, "tipo_ecf": tipo_ecf, "start": start, "end": end, "expires": expires}
+
+    def _lease(self, rnc, tipo_ecf, size=None):
+        """
+        Reserva el siguiente bloque del rango vigente más antiguo con números libres.
+        Con `size` se reserva ese tamaño y el bloque queda cerrado, entregado completo.
+        """
+        conn = self._conn()
+        today = date.today().isoformat()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT start, end, expires, next FROM encf_ranges "
+                "WHERE rnc = ? AND tipo_ecf = ? AND next <= end AND expires >= ? ORDER BY start LIMIT 1",
+                (rnc, tipo_ecf, today)).fetchone()
+            if row is None:
+                raise SequenceError(f"No hay secuencias autorizadas vigentes para RNC {rnc}, tipo {tipo_ecf}")
+            range_start, range_end, expires, first = row
+            last = min(range_end, first + (size or self.block_size) - 1)
+            conn.execute("UPDATE encf_ranges SET next = ? WHERE rnc = ? AND tipo_ecf = ? AND start = ?",
+                         (last + 1, rnc, tipo_ecf, range_start))
+            conn.execute("INSERT INTO encf_leases (rnc, tipo_ecf, start, end, pid, leased, last_used) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (rnc, tipo_ecf, first, last, os.getpid(), time.time(), last if size else None))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return _Block(first, last, _parse_date(expires))
+
+    # --- ASIGNACIÓN ---
+
+    def _check_pid(self):
+        # Los bloques son de un proceso: un worker recién creado no usa los del padre
+        if self._pid != os.getpid():
+            self._blocks = {}
+            self._pid = os.getpid()
+            if not self._exit_registered:
+                atexit.register(self.release)
+                self._exit_registered = True
+
+    def next_number(self, rnc, tipo_ecf):
+        """Devuelve (número, fecha de vencimiento) del siguiente eNCF del emisor y tipo."""
+        if self._pid != os.getpid():
+            self._check_pid()
+        key = (str(rnc), int(tipo_ecf))
+        block = self._blocks.get(key)
+        if block is not None:
+            # next() sobre itertools.count es atómico con el GIL: no hace falta lock
+            number = next(block.counter)
+            if number <= block.end and block.expires >= date.today():
+                return number, block.expires
+        with self._lock:
+            while True:
+                block = self._blocks.get(key)
+                if block is not None:
+                    number = next(block.counter)
+                    if number <= block.end and block.expires >= date.today():
+                        return number, block.expires
+                    self._close(key, block)
+                self._blocks[key] = self._lease(*key)
+
+    def allocate(self, rnc, tipo_ecf):
+        """Siguiente eNCF ('E31...') y su FechaVencimientoSecuencia (YYYY-MM-DD)."""
+        number, expires = self.next_number(rnc, tipo_ecf)
+        return format_encf(tipo_ecf, number), expires.isoformat()
+
+    def take(self, rnc, tipo_ecf):
+        """
+        Como allocate(), pero sin bloque en memoria: un número por transacción.
+        Más lento; para procesos que no pueden liberar sus bloques al terminar.
+        """
+        block = self._lease(str(rnc), int(tipo_ecf), size=1)
+        return format_encf(tipo_ecf, block.start), block.expires.isoformat()
+
+    def assign(self, slot, single=False):
+        """
+        Completa eNCF (y FechaVencimientoSecuencia si el XSD del tipo la lleva) en
+        el IdDoc de unassigned_slot() y devuelve el eNCF. single=True usa take().
+        """
+        id_doc, rnc, tipo_ecf = slot
+        encf, expires = (self.take if single else self.allocate)(rnc, tipo_ecf)
+        id_doc['eNCF'] = encf
+        if 'FechaVencimientoSecuencia' not in id_doc and \
+                payload_validator.has_element(tipo_ecf, ('Encabezado', 'IdDoc', 'FechaVencimientoSecuencia')):
+            id_doc['FechaVencimientoSecuencia'] = expires
+        return encf
+
+    def allocate_many(self, rnc, tipo_ecf, count):
+        """
+        Hasta `count` eNCF. Si los rangos se agotan a mitad de camino devuelve
+        los que alcanzó a asignar (ya consumidos, no se pueden devolver).
+        """
+        allocated = []
+        try:
+            for _ in range(count):
+                allocated.append(self.allocate(rnc, tipo_ecf))
+        except SequenceError:
+            if not allocated:
+                raise
+        return allocated
+
+    def _close(self, key, block):
+        # Anota hasta dónde se usó el bloque; lo que queda se reporta en unused().
+        # El contador ya pasó por todo número entregado, así que nunca se anota de menos.
+        last = min(next(block.counter) - 1, block.end)
+        self._conn().execute("UPDATE encf_leases SET last_used = ? WHERE rnc = ? AND tipo_ecf = ? AND start = ?",
+                             (last, key[0], key[1], block.start))
+        del self._blocks[key]
+
+    def void(self, rnc, encf, reason=None):
+        """Anota un eNCF entregado cuyo documento no se generó, para anularlo ante la DGII."""
+        tipo_ecf, number = parse_encf(encf)
+        self._conn().execute("INSERT OR IGNORE INTO encf_voided (rnc, tipo_ecf, number, reason, voided) "
+                             "VALUES (?, ?, ?, ?, ?)", (str(rnc), tipo_ecf, number, reason, time.time()))
+
+    def release(self):
+        """Cierra los bloques de este proceso (al terminar o antes de cambiar la configuración)."""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            for key, block in list(self._blocks.items()):
+                try:
+                    self._close(key, block)
+                except Exception:
+                    self._blocks.pop(key, None)
+
+    # --- CONSULTAS ---
+
+    def capacity(self, rnc=None, tipo_ecf=None):
+        """
+        Números disponibles por emisor y tipo: autorizados, reservados y los que
+        quedan sin reservar en rangos vigentes, con el vencimiento más próximo.
+        """
+        today = date.today().isoformat()
+        sql, args = self._filters(rnc, tipo_ecf)
+        rows = self._conn().execute("SELECT rnc, tipo_ecf, start, end, expires, next FROM encf_ranges WHERE 1 = 1"
+                                    + sql + " ORDER BY rnc, tipo_ecf, start", args)
+        summary = {}
+        for r, t, start, end, expires, next_free in rows:
+            entry = summary.setdefault((r, t), {"rnc": r, "tipo_ecf": t, "authorized": 0, "leased": 0,
+                                                "remaining": 0, "expired": 0, "next_expiry": None, "ranges": []})
+            size = end - start + 1
+            leased = next_free - start
+            entry["authorized"] += size
+            entry["leased"] += leased
+            vigente = expires >= today
+            if vigente:
+                entry["remaining"] += size - leased
+                if entry["next_expiry"] is None or expires < entry["next_expiry"]:
+                    entry["next_expiry"] = expires
+            else:
+                entry["expired"] += size - leased
+            entry["ranges"].append({"start": start, "end": end, "expires": expires, "next": next_free,
+                                    "expired": not vigente})
+        return list(summary.values())
+
+    def _filters(self, rnc, tipo_ecf):
+        sql, args = "", []
+        if rnc is not None:
+            sql += " AND rnc = ?"
+            args.append(str(rnc))
+        if tipo_ecf is not None:
+            sql += " AND tipo_ecf = ?"
+            args.append(int(tipo_ecf))
+        return sql, args
+
+    def unused(self, rnc=None, tipo_ecf=None):
+        """
+        Tramos reservados que no se entregaron, para anularlos ante la DGII.
+
+        Un bloque cerrado (agotado, vencido o liberado al terminar el proceso)
+        informa exactamente desde dónde sobró. Uno sin cerrar pertenece a un
+        proceso vivo o a uno que murió: se lista con cerrado=False y el tramo
+        completo, y hay que contrastarlo con los documentos emitidos. Los
+        números anotados con void() van al final, de a uno, con su motivo.
+        """
+        open_blocks = {(k[0], k[1], b.start) for k, b in self._blocks.items()} if self._pid == os.getpid() else set()
+        sql, args = self._filters(rnc, tipo_ecf)
+        rows = self._conn().execute(
+            "SELECT rnc, tipo_ecf, start, end, pid, last_used FROM encf_leases "
+            "WHERE (last_used IS NULL OR last_used < end)" + sql + " ORDER BY rnc, tipo_ecf, start", args)
+        gaps = []
+        for r, t, start, end, pid, last_used in rows:
+            if (r, t, start) in open_blocks:
+                continue
+            first = start if last_used is None else last_used + 1
+            gaps.append({"rnc": r, "tipo_ecf": t, "desde": format_encf(t, first), "hasta": format_encf(t, end),
+                         "cantidad": end - first + 1, "cerrado": last_used is not None, "pid": pid})
+        rows = self._conn().execute("SELECT rnc, tipo_ecf, number, reason FROM encf_voided WHERE 1 = 1" + sql
+                                    + " ORDER BY rnc, tipo_ecf, number", args)
+        for r, t, number, reason in rows:
+            gaps.append({"rnc": r, "tipo_ecf": t, "desde": format_encf(t, number), "hasta": format_encf(t, number),
+                         "cantidad": 1, "cerrado": True, "pid": None, "motivo": reason})
+        return gaps
+
+
+sequence_allocator = SequenceAllocator()
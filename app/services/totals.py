@@ -0,0 +1,334 @@
+"""
+Totales de un e-CF calculados en el servidor a partir de DetallesItems.
+
+En una sola pasada por columnas (CantidadItem, PrecioUnitarioItem,
+DescuentoMonto, RecargoMonto, MontoItem, IndicadorFacturacion) y con
+aritmética decimal exacta:
+
+  MontoItem            = CantidadItem x PrecioUnitarioItem - DescuentoMonto + RecargoMonto
+  MontoGravadoI1/I2/I3 = suma de MontoItem con IndicadorFacturacion 1/2/3, más los
+                         recargos y menos los descuentos globales (DescuentosORecargos)
+                         de ese indicador; sin el ITBIS si IndicadorMontoGravado = 1
+  MontoExento          = lo mismo con IndicadorFacturacion 4
+  MontoNoFacturable    = lo mismo con IndicadorFacturacion 0
+  TotalITBIS1/2/3      = MontoGravadoIn x ITBISn (18, 16 y 0 %)
+  MontoTotal           = MontoGravadoTotal + MontoExento + TotalITBIS + MontoImpuestoAdicional
+  TotalITBISRetenido / TotalISRRetencion = suma de la Retencion de cada línea
+  OtraMoneda           = cada monto / TipoCambio
+
+Los montos se redondean a 2 decimales (ROUND_HALF_UP). Los totales salen de
+MontoItem tal como lo envía el cliente (es lo que va en el XML); si falta, del
+calculado. Solo se completan los campos que el XSD del tipo tiene.
+
+Las columnas se pasan a enteros escalados a los decimales del XSD (centavos,
+o diezmilésimos en PrecioUnitarioItem) y se opera con enteros; Decimal queda
+para los pocos valores que no son floats exactos y para los totales.
+"""
+import logging
+import operator
+import threading
+from itertools import compress, repeat
+from decimal import Decimal, ROUND_HALF_UP
+from app.services.payload_validator import payload_validator
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal(0)
+CENT = Decimal('0.01')
+TASAS_ITBIS = {1: 18, 2: 16, 3: 0}
+EXENTO = 4
+NO_FACTURABLE = 0
+
+# Monto en pesos -> su campo en OtraMoneda
+OTRA_MONEDA = (
+    ('MontoGravadoTotal', 'MontoGravadoTotalOtraMoneda'),
+    ('MontoGravadoI1', 'MontoGravado1OtraMoneda'),
+    ('MontoGravadoI2', 'MontoGravado2OtraMoneda'),
+    ('MontoGravadoI3', 'MontoGravado3OtraMoneda'),
+    ('MontoExento', 'MontoExentoOtraMoneda'),
+    ('TotalITBIS', 'TotalITBISOtraMoneda'),
+    ('TotalITBIS1', 'TotalITBIS1OtraMoneda'),
+    ('TotalITBIS2', 'TotalITBIS2OtraMoneda'),
+    ('TotalITBIS3', 'TotalITBIS3OtraMoneda'),
+    ('MontoImpuestoAdicional', 'MontoImpuestoAdicionalOtraMoneda'),
+    ('MontoTotal', 'MontoTotalOtraMoneda'),
+)
+
+# Hasta este valor (en pesos o unidades) un float se escala a entero sin perder
+# decimales; por encima se usa Decimal
+FAST_LIMIT = 10 ** 9
+
+# Tasas: se comparan y completan como enteros, no como montos
+RATE_FIELDS = ('ITBIS1', 'ITBIS2', 'ITBIS3')
+
+
+def to_decimal(value):
+    """Número del JSON como Decimal exacto (un float por su repr más corta: 100.1 -> 100.1)."""
+    if value is None:
+        return ZERO
+    if isinstance(value, bool):
+        raise TypeError("Se esperaba un número")
+    if isinstance(value, float):
+        value = repr(value)
+    return Decimal(value)
+
+
+def round2(value):
+    return value.quantize(CENT, ROUND_HALF_UP)
+
+
+def _div_half_up(num, den):
+    """num / den redondeado a entero, la mitad lejos de cero (como ROUND_HALF_UP)."""
+    q, r = divmod(abs(num), den)
+    q += 2 * r >= den
+    return q if num >= 0 else -q
+
+
+def _cents(value):
+    return int(round2(value).scaleb(2))
+
+
+def _amount(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def _scaled(rows, field, digits):
+    """
+    Columna de un campo como enteros en unidades de 10**-digits (los decimales
+    que admite el XSD y con los que va al XML), o None si ninguna fila lo trae.
+    """
+    values = [row.get(field) or 0 for row in rows]
+    if not any(values):
+        return None
+    factor = 10 ** digits
+    try:
+        # Camino rápido, todo en C: x * 10**digits redondeado, y se comprueba que al
+        # dividir vuelve el mismo float (100.1 -> 10010 -> 100.1), es decir, que el
+        # número no tiene más decimales de los que admite el campo
+        scaled = list(map(round, map(operator.mul, values, repeat(float(factor)))))
+        if max(map(abs, scaled)) < FAST_LIMIT * factor and \
+                list(map(operator.truediv, scaled, repeat(factor))) == values:
+            return scaled
+    except (TypeError, ValueError, OverflowError):
+        pass
+    # Texto, montos enormes o con más decimales: uno por uno con Decimal
+    quantum = Decimal(1).scaleb(-digits)
+    return [int(to_decimal(value).quantize(quantum, ROUND_HALF_UP).scaleb(digits)) for value in values]
+
+
+def line_amounts(items):
+    """MontoItem calculado de cada línea, en centavos."""
+    cantidades = _scaled(items, 'CantidadItem', 2)
+    precios = _scaled(items, 'PrecioUnitarioItem', 4)
+    if cantidades is None or precios is None:
+        netos = [0] * len(items)
+    else:
+        netos = map(operator.mul, cantidades, precios)  # en 10**-6
+    for field, op in (('DescuentoMonto', operator.sub), ('RecargoMonto', operator.add)):
+        column = _scaled(items, field, 2)
+        if column:
+            netos = map(op, netos, map(operator.mul, column, repeat(10 ** 4)))
+    netos = list(netos)
+    if min(netos, default=0) >= 0:
+        return list(map(operator.floordiv, map(operator.add, netos, repeat(5000)), repeat(10 ** 4)))
+    return [_div_half_up(neto, 10 ** 4) for neto in netos]
+
+
+def includes_itbis(data):
+    """IndicadorMontoGravado = 1: los precios ya incluyen el ITBIS."""
+    return str((data['Encabezado'].get('IdDoc') or {}).get('IndicadorMontoGravado', 0)) == '1'
+
+
+def split_itbis(buckets, incluye_itbis):
+    """
+    (indicador, tasa, base, impuesto) de cada indicador gravado presente en
+    buckets ({IndicadorFacturacion: centavos}), en centavos.
+    """
+    for n, tasa in TASAS_ITBIS.items():
+        if n not in buckets:
+            continue
+        if incluye_itbis:
+            base = _div_half_up(buckets[n] * 100, 100 + tasa)
+            yield n, tasa, base, buckets[n] - base
+        else:
+            yield n, tasa, buckets[n], _div_half_up(buckets[n] * tasa, 100)
+
+
+def compute(data):
+    """
+    (totales, otra_moneda, MontoItem calculado por línea, MontoItem usado por línea).
+    Los totales son Decimal; los montos de las líneas, enteros en centavos.
+    Lanza ValueError/TypeError si un valor no es un número; la validación
+    previa es la que lo reporta.
+    """
+    items = data.get('DetallesItems') or []
+    encabezado = data['Encabezado']
+    sent_totales = encabezado.get('Totales') or {}
+    calculated = line_amounts(items)
+    # El monto de la línea que va en el XML: el del cliente si lo trae
+    montos = _scaled(items, 'MontoItem', 2) or [0] * len(items)
+    missing = [n for n, item in enumerate(items) if item.get('MontoItem') is None]
+    for n in missing:
+        montos[n] = calculated[n]
+    indicadores = [item.get('IndicadorFacturacion') or 0 for item in items]
+
+    # Suma por IndicadorFacturacion; casi siempre hay uno solo y basta un sum()
+    buckets = {}
+    kinds = set(map(int, indicadores))
+    if len(kinds) == 1:
+        buckets[kinds.pop()] = sum(montos)
+    else:
+        indicadores = list(map(int, indicadores))
+        for kind in kinds:
+            buckets[kind] = sum(compress(montos, map(operator.eq, indicadores, repeat(kind))))
+
+    # Descuentos y recargos globales, sobre el indicador al que se aplican
+    ajustes = (data.get('DescuentosORecargos') or {}).get('DescuentoORecargo') or []
+    for ajuste in ajustes:
+        indicador = int(ajuste.get('IndicadorFacturacionDescuentooRecargo') or 0)
+        monto = ajuste.get('MontoDescuentooRecargo')
+        if monto is None:
+            valor = to_decimal(ajuste.get('ValorDescuentooRecargo'))
+            if ajuste.get('TipoValor') == '%':
+                monto = int((valor * buckets.get(indicador, 0) / 100).quantize(Decimal(1), ROUND_HALF_UP))
+            else:
+                monto = _cents(valor)
+        else:
+            monto = _cents(to_decimal(monto))
+        buckets[indicador] = buckets.get(indicador, 0) + (-monto if ajuste.get('TipoAjuste') == 'D' else monto)
+
+    totales = {}
+    gravado = itbis = 0
+    for n, tasa, base, impuesto in split_itbis(buckets, includes_itbis(data)):
+        totales[f'MontoGravadoI{n}'] = _amount(base)
+        totales[f'ITBIS{n}'] = Decimal(tasa)
+        totales[f'TotalITBIS{n}'] = _amount(impuesto)
+        gravado += base
+        itbis += impuesto
+    if any(n in buckets for n in TASAS_ITBIS):
+        totales['MontoGravadoTotal'] = _amount(gravado)
+        totales['TotalITBIS'] = _amount(itbis)
+    exento = buckets.get(EXENTO, 0)
+    if EXENTO in buckets:
+        totales['MontoExento'] = _amount(exento)
+    if NO_FACTURABLE in buckets:
+        totales['MontoNoFacturable'] = _amount(buckets[NO_FACTURABLE])
+    adicional = to_decimal(sent_totales.get('MontoImpuestoAdicional'))
+    totales['MontoTotal'] = _amount(gravado + exento + itbis) + adicional
+
+    retenciones = [item['Retencion'] for item in items if item.get('Retencion')]
+    for field, total in (('MontoITBISRetenido', 'TotalITBISRetenido'), ('MontoISRRetenido', 'TotalISRRetencion')):
+        if any(r.get(field) is not None for r in retenciones):
+            totales[total] = _amount(sum(_scaled(retenciones, field, 2) or ()))
+
+    otra_moneda = {}
+    tipo_cambio = to_decimal((encabezado.get('OtraMoneda') or {}).get('TipoCambio'))
+    if tipo_cambio > 0:
+        for field, om_field in OTRA_MONEDA:
+            value = totales.get(field)
+            if value is None and field == 'MontoImpuestoAdicional' and adicional:
+                value = adicional
+            if value is not None:
+                otra_moneda[om_field] = round2(value / tipo_cambio)
+    return totales, otra_moneda, calculated, montos
+
+
+def _number(value, field):
+    return int(value) if field in RATE_FIELDS else float(value)
+
+
+class TotalsEngine:
+    """
+    Modos (ECF_TOTALS_MODE):
+      'missing' -> completa los totales y MontoItem que el cliente no envía
+      'report'  -> además registra en el log los que no coinciden
+      'enforce' -> además rechaza el documento (mismo formato de errores que la validación previa)
+      'off'     -> se emite lo que envía el cliente
+    """
+    def __init__(self):
+        self.mode = 'missing'
+        self.tolerance = Decimal('1.00')
+        self._allowed = {}
+        self._lock = threading.Lock()
+
+    def configure(self, mode='missing', tolerance='1.00'):
+        self.mode = mode
+        self.tolerance = to_decimal(tolerance)
+
+    def allowed(self, tipo_ecf):
+        """Campos de Totales y de OtraMoneda que tiene el XSD del tipo."""
+        fields = self._allowed.get(tipo_ecf)
+        if fields is None:
+            with self._lock:
+                names = [f for pair in OTRA_MONEDA for f in pair] + list(RATE_FIELDS) + [
+                    'MontoNoFacturable', 'TotalITBISRetenido', 'TotalISRRetencion']
+                fields = frozenset(
+                    [n for n in names if payload_validator.has_element(tipo_ecf, ('Encabezado', 'Totales', n))]
+                    + [n for n in names if payload_validator.has_element(tipo_ecf, ('Encabezado', 'OtraMoneda', n))])
+                self._allowed[tipo_ecf] = fields
+        return fields
+
+    def apply(self, data):
+        """
+        Completa lo que falta según el modo y devuelve los montos que no
+        coinciden con el cálculo: [{"path", "rule": "total", "message"}], más
+        los bloques Totales u OtraMoneda que no son un objeto ("rule": "type").
+        """
+        if self.mode == 'off':
+            return []
+        try:
+            tipo_ecf = int(data['Encabezado']['IdDoc']['TipoeCF'])
+            totales, otra_moneda, calculated, montos = compute(data)
+        except (KeyError, TypeError, ValueError, ArithmeticError, AttributeError):
+            # Tipos o montos ilegibles: los reporta la validación previa
+            return []
+        allowed = self.allowed(tipo_ecf)
+        check = self.mode in ('report', 'enforce')
+        errors = []
+
+        items = data.get('DetallesItems') or []
+        for n, item in enumerate(items):
+            if item.get('MontoItem') is None:
+                item['MontoItem'] = calculated[n] / 100
+        if check:
+            # Las líneas completadas arriba ya valen lo calculado; solo se recorren las que difieren
+            tolerance = _cents(self.tolerance)
+            for n in [n for n, diff in enumerate(map(operator.sub, montos, calculated)) if abs(diff) > tolerance]:
+                self._compare(items[n]['MontoItem'], _amount(calculated[n]), f"DetallesItems[{n}].MontoItem", errors)
+
+        encabezado = data['Encabezado']
+        malformed = []
+        for block, values in (('Totales', totales), ('OtraMoneda', otra_moneda)):
+            if block in encabezado and not isinstance(encabezado[block], dict):
+                # "Totales": null no es un bloque vacío: no hay dónde completar los montos
+                malformed.append({"path": f"Encabezado.{block}", "rule": "type", "message": "Se esperaba un objeto"})
+                continue
+            if block == 'OtraMoneda' and not values:
+                continue
+            sent_block = encabezado.setdefault(block, {})
+            for field, value in values.items():
+                if field not in allowed and field != 'MontoTotal':
+                    continue
+                if sent_block.get(field) is None:
+                    sent_block[field] = _number(value, field)
+                elif check:
+                    self._compare(sent_block[field], value, f"Encabezado.{block}.{field}", errors)
+
+        if errors and self.mode == 'report':
+            logger.warning("Totales que no coinciden con DetallesItems (modo report): %s",
+                           ", ".join(e['path'] for e in errors))
+            errors = []
+        # Un bloque que no es un objeto rompe el build en cualquier modo
+        return malformed + errors
+
+    def _compare(self, sent, expected, path, errors):
+        try:
+            difference = abs(to_decimal(sent) - expected)
+        except (TypeError, ValueError, ArithmeticError):
+            return
+        if difference > self.tolerance:
+            errors.append({"path": path, "rule": "total",
+                           "message": f"{sent} no coincide con el calculado {expected} (diferencia {difference})"})
+
+
+totals_engine = TotalsEngine()
@@ -1,37 +1,34 @@
 from lxml import etree
+from app.services.schema_registry import schema_registry, SchemaUnavailableError
 
 class XMLValidator:
     def __init__(self, xml_string, xsd_path):
+        # xsd_path puede ser la ruta de un XSD o una clave del registro
+        # (TipoeCF, 'RFCE', ('34', '1.0'), ...). El esquema se compila una
+        # sola vez por proceso en el SchemaRegistry.
         self.xml_string = xml_string
         self.xsd_path = xsd_path
         self.errors = []
 
     def validate(self):
         try:
-            # 1. Cargar el XSD
-            xmlschema_doc = etree.parse(self.xsd_path)
-            xmlschema = etree.XMLSchema(xmlschema_doc)
-            
-            # 2. Cargar el XML a validar
+            # 1. Cargar el XML a validar
             xml_doc = etree.fromstring(self.xml_string)
-            
-            # 3. Validar
-            xmlschema.assertValid(xml_doc)
-            
-            # Si llega aquí, es válido
-            return True
-            
+
+            # 2. Validar contra el esquema ya compilado
+            self.errors = schema_registry.validate(self.xsd_path, xml_doc)
+            return not self.errors
+
         except etree.XMLSyntaxError as e:
-            self.errors.append(f"Error de sintaxis XML: {str(e)}")
-            return False
-        except etree.DocumentInvalid as e:
-            # Esta es la clave: lxml nos da los errores detallados
-            for error in xmlschema.error_log:
-                self.errors.append(f"Línea {error.line}, Columna {error.column}: {error.message}")
+            self.errors.append({"line": e.lineno, "column": e.offset, "path": None,
+                                "message": f"Error de sintaxis XML: {str(e)}"})
             return False
+        except SchemaUnavailableError:
+            raise
         except Exception as e:
-            self.errors.append(f"Error inesperado: {str(e)}")
+            self.errors.append({"line": None, "column": None, "path": None,
+                                "message": f"Error inesperado: {str(e)}"})
             return False
 
     def get_errors(self):
-        return self.errors
\ No newline at end of file
+        return self.errors
@@ -0,0 +1,103 @@
+"""
+Arranque en caliente: deja listo todo lo que un worker usa en su primera petición.
+
+  - compila los XSD de todos los documentos (SchemaRegistry),
+  - compila las reglas de la validación previa de cada TipoeCF, del RFCE y de
+    los acuses (ARECF, ACECF),
+  - resuelve las clases de builder de cada backend (importa los módulos generados),
+  - arma los modelos de lectura de los documentos recibidos (/ecf/parse),
+  - carga los perfiles de emisor registrados con sus fragmentos ya escritos.
+
+Con gunicorn y preload_app (gunicorn.conf.py) corre una sola vez en el proceso
+maestro, antes del fork: los workers heredan esas estructuras en páginas
+compartidas copy-on-write y atienden la primera petición ya en caliente. Sin
+preload corre en cada worker al crear la app. /health/ready responde 503
+hasta que termina.
+"""
+import time
+import threading
+from app.services.schema_registry import schema_registry, SCHEMA_FILES
+from app.services.payload_validator import payload_validator
+from app.services.ecf_reader import ecf_reader
+from app.services.emitter_profiles import emitter_profiles
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_generation.generated_builder import GENERATED_BUILDERS, DIRECT_BUILDERS
+
+TIPOS = sorted(int(tipo) for tipo, _ in SCHEMA_FILES if tipo.isdigit())
+# Documentos con validación previa propia (payload_validator.validate(data, document))
+DOCUMENTS = ['RFCE', 'ARECF', 'ACECF']
+
+
+def _warm_builders():
+    # Instanciar cada clase importa y resuelve todo lo que usa el primer build
+    stub = {'Encabezado': {'IdDoc': {}}}
+    for builders in (ECFBuilderManager.BUILDERS, GENERATED_BUILDERS, DIRECT_BUILDERS):
+        for tipo, builder_class in builders.items():
+            stub['Encabezado']['IdDoc']['TipoeCF'] = tipo
+            builder_class(stub)
+
+
+class Warmup:
+    """
+    Estado del calentamiento del proceso.
+
+    Modos (ECF_WARMUP):
+      'sync'       -> create_app no vuelve hasta terminar (lo usa el preload)
+      'background' -> corre en un hilo; /health/ready da 503 mientras tanto
+      'off'        -> nada por adelantado; todo se compila en la primera petición
+    """
+    def __init__(self):
+        self.mode = 'off'
+        self.ready = True
+        self.error = None
+        self.steps = {}
+        self.failed_schemas = {}
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def configure(self, mode='off'):
+        self.mode = mode
+        if mode == 'off':
+            self.ready = True
+        elif mode == 'background':
+            self.ready = False
+            threading.Thread(target=self.run, name="warmup", daemon=True).start()
+        else:
+            self.ready = False
+            self.run()
+
+    def run(self):
+        # Una sola vez por proceso, aunque create_app se llame de nuevo (p. ej. tras un preload)
+        with self._lock:
+            if self.ready:
+                return
+            start = time.perf_counter()
+            try:
+                self._step('schemas', lambda: self.failed_schemas.update(schema_registry.warmup()))
+                self._step('preflight', lambda: payload_validator.warm_up(TIPOS + DOCUMENTS))
+                self._step('builders', _warm_builders)
+                self._step('reader', lambda: ecf_reader.warm_up(TIPOS + DOCUMENTS))
+                self._step('profiles', emitter_profiles.warm_up)
+            except Exception as e:
+                # Sin calentar se atiende igual (todo se compila a demanda); solo se informa
+                self.error = str(e)
+            self.duration = time.perf_counter() - start
+            self.ready = True
+
+    def _step(self, name, fn):
+        start = time.perf_counter()
+        fn()
+        self.steps[name] = round(time.perf_counter() - start, 4)
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "mode": self.mode,
+            "seconds": round(self.duration, 4) if self.duration is not None else None,
+            "steps": dict(self.steps),
+            "schemas_unavailable": sorted('/'.join(key) for key in self.failed_schemas),
+            "error": self.error,
+        }
+
+
+warmup = Warmup()
@@ -4,8 +4,8 @@ from .xml_generation.base_builder import BaseECFBuilder
 # Delegate to the new manager
 class ECFBuilderFactory:
     @staticmethod
-    def get_builder(data_json):
-        return ECFBuilderManager.get_builder(data_json)
+    def get_builder(data_json, backend=None, emisor_profile=None):
+        return ECFBuilderManager.get_builder(data_json, backend, emisor_profile)
 
 # Re-export BaseECFBuilder if anyone was importing it directly
 # (though ideally they should use the factory)
\ No newline at end of file
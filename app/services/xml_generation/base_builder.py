@@ -1,9 +1,21 @@
+import copy
 from lxml import etree
+from time import perf_counter
 from datetime import datetime
+from app.services.totals import includes_itbis
+from .pagination import Paginator, page_count
 
 class BaseECFBuilder:
-    def __init__(self, data_json):
+    # False: salida compacta (sin indentación ni saltos de línea), para respuestas livianas
+    pretty = True
+    # Líneas por página de la Paginacion automática; 0 = solo la que envía el cliente.
+    # create_app lo toma de ECF_PAGINATION_LINES.
+    lines_per_page = 0
+
+    def __init__(self, data_json, emisor_profile=None):
         self.data = data_json
+        # Perfil registrado del emisor (emitter_profiles.apply): sus campos se pegan ya escritos
+        self.emisor_profile = emisor_profile
         try:
             self.tipo_ecf = int(self.data['Encabezado']['IdDoc']['TipoeCF'])
         except (KeyError, ValueError):
@@ -11,14 +23,62 @@ class BaseECFBuilder:
             self.tipo_ecf = 0
             
         self.root = etree.Element("ECF")
+        # Segundos por sección del último build(); las rutas los publican como métricas
+        self.timings = {}
+        self.total_pages = self._total_pages()
+        self._paginator = None
+        self._paginacion = None
+
+    def _total_pages(self):
+        """
+        Páginas de la Paginacion automática, o 0 si el documento no la lleva
+        (cabe en una página o el cliente envía la suya). TotalPaginas va en IdDoc,
+        antes de los items: se agrega a una copia superficial del JSON.
+        """
+        items = self.data.get('DetallesItems')
+        if not self.lines_per_page or 'Paginacion' in self.data or not isinstance(items, list) \
+                or len(items) <= self.lines_per_page:
+            return 0
+        try:
+            encabezado = self.data['Encabezado']
+            id_doc = encabezado['IdDoc']
+        except (KeyError, TypeError):
+            return 0
+        pages = page_count(len(items), self.lines_per_page)
+        self.data = {**self.data, 'Encabezado': {**encabezado, 'IdDoc': {**id_doc, 'TotalPaginas': pages}}}
+        return pages
+
+    def _start_pagination(self):
+        # Un Paginator nuevo por documento escrito; <Pagina> se agregan a medida que salen los items
+        self._paginator = None
+        self._paginacion = None
+        if self.total_pages:
+            self._paginacion = etree.Element("Paginacion")
+            self._paginator = Paginator(self.tipo_ecf, self.lines_per_page, includes_itbis(self.data),
+                                        self._add_pagina)
+
+    def _add_pagina(self, pagina):
+        self._build_pagina(self._paginacion, pagina)
 
     def build(self):
-        # 1. ENCABEZADO
+        self._start_pagination()
+        t0 = perf_counter()
+        # 1. ENCABEZADO (incluye OtraMoneda, que va al final del Encabezado)
         self._build_encabezado()
+        t1 = perf_counter()
         
         # 2. DETALLE DE ITEMS
         self._build_detalles()
+        t2 = perf_counter()
         
+        # 3. BLOQUES POSTERIORES A LOS ITEMS
+        self._build_resumen()
+        t3 = perf_counter()
+
+        self.timings = {'encabezado': t1 - t0, 'detalles': t2 - t1, 'resumen': t3 - t2}
+        return self.root
+
+    def _build_resumen(self):
         # 3. SUBTOTALES (Opcional)
         if 'Subtotales' in self.data:
             self._build_subtotales()
@@ -27,27 +87,95 @@ class BaseECFBuilder:
         if 'DescuentosORecargos' in self.data:
             self._build_descuentos_recargos()
             
-        # 5. PAGINACIÓN (Opcional)
-        if 'Paginacion' in self.data:
+        # 5. PAGINACIÓN (Opcional; automática si hay más de una página)
+        if 'Paginacion' in self.data or self._paginacion is not None:
             self._build_paginacion()
 
-        # 6. OTRA MONEDA (Opcional)
-        if 'OtraMoneda' in self.data['Encabezado']:
-            self._build_otra_moneda()
-
-        # 7. REFERENCIAS (Hook for subclasses)
+        # 6. REFERENCIAS (Hook for subclasses)
         self._build_informacion_referencia()
             
-        # 8. FECHA HORA FIRMA
+        # 7. FECHA HORA FIRMA
         self._build_fecha_hora_firma()
         
-        # 9. SIGNATURE (Placeholder)
+        # 8. SIGNATURE (Placeholder)
         self._build_signature()
 
-        return self.root
+    def get_xml_bytes(self):
+        return etree.tostring(self.root, pretty_print=self.pretty, encoding='UTF-8', xml_declaration=True)
 
     def get_xml_string(self):
-        return etree.tostring(self.root, pretty_print=True, encoding='UTF-8', xml_declaration=True).decode('utf-8')
+        return self.get_xml_bytes().decode('utf-8')
+
+    # --- MODO STREAMING ---
+
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def iter_xml_bytes(self):
+        """
+        Alternativa a build() + get_xml_string() para documentos con muchos items.
+
+        Devuelve un generador de bytes idénticos a los del modo árbol. Cada Item
+        se construye, se serializa y se descarta antes del siguiente, así que la
+        memoria no crece con DetallesItems. El Encabezado y los bloques finales
+        son pequeños y se construyen aquí mismo, antes de devolver el generador,
+        para que cualquier ValueError salte antes de enviar el primer byte.
+        """
+        self._start_pagination()
+        self._build_encabezado()
+        head = self._pop_fragments()
+
+        self._build_resumen()
+        tail = self._pop_fragments()
+
+        return self._iter_document(head, tail)
+
+    def _iter_document(self, head, tail):
+        root_tag = self.root.tag.encode('utf-8')
+        pad, nl = (b"  ", b"\n") if self.pretty else (b"", b"")
+        buf = bytearray(b"<?xml version='1.0' encoding='UTF-8'?>\n<" + root_tag + b">" + nl)
+        buf += head
+
+        items = self.data.get('DetallesItems', [])
+        if not items:
+            buf += pad + b"<DetallesItems/>" + nl
+        else:
+            buf += pad + b"<DetallesItems>" + nl
+            scratch = etree.Element("DetallesItems")
+            add_page_line = self._paginator.add if self._paginator else None
+            for item_data in items:
+                item = self._build_item(scratch, item_data)
+                buf += self._serialize_fragment(item, 2)
+                scratch.remove(item)
+                if add_page_line:
+                    add_page_line(item_data)
+                if len(buf) >= self.STREAM_CHUNK_SIZE:
+                    yield bytes(buf)
+                    buf.clear()
+            buf += pad + b"</DetallesItems>" + nl
+
+        if self._paginacion is None:
+            buf += tail
+        else:
+            # En los bloques finales Paginacion quedó vacía; ya tiene sus páginas
+            self._paginator.finish()
+            before, after = tail.split(self._serialize_fragment(etree.Element("Paginacion"), 1), 1)
+            buf += before + self._serialize_fragment(self._paginacion, 1) + after
+        buf += b"</" + root_tag + b">" + nl
+        yield bytes(buf)
+
+    def _pop_fragments(self):
+        """Serializa y quita del root los hijos construidos hasta ahora."""
+        out = b"".join(self._serialize_fragment(child, 1) for child in self.root)
+        for child in list(self.root):
+            self.root.remove(child)
+        return out
+
+    def _serialize_fragment(self, node, level):
+        if not self.pretty:
+            return etree.tostring(node, encoding='UTF-8')
+        # Mismo resultado que pretty_print cuando el nodo cuelga a `level` del root
+        etree.indent(node, space="  ", level=level)
+        return b"  " * level + etree.tostring(node, encoding='UTF-8') + b"\n"
 
     # --- MÉTODOS DE CONSTRUCCIÓN ---
 
@@ -74,6 +202,10 @@ class BaseECFBuilder:
 
         # <Totales>
         self._build_totales(encabezado)
+
+        # <OtraMoneda> (Opcional)
+        if 'OtraMoneda' in self.data['Encabezado']:
+            self._build_otra_moneda()
         
     def _build_id_doc(self, encabezado_node):
         """Implementación base de IdDoc (para series 31, 32, etc regulares)"""
@@ -95,13 +227,32 @@ class BaseECFBuilder:
         if 'FechaLimitePago' in id_doc_data:
             etree.SubElement(id_doc, "FechaLimitePago").text = self._fmt_date(id_doc_data['FechaLimitePago'])
 
+        if 'TotalPaginas' in id_doc_data:
+            etree.SubElement(id_doc, "TotalPaginas").text = str(id_doc_data['TotalPaginas'])
+
     def _build_fecha_vencimiento_secuencia(self, id_doc_node):
         """Overridden in 4x builders"""
         pass
 
     def _build_emisor(self, encabezado_node):
         emisor_data = self.data['Encabezado']['Emisor']
-        emisor = etree.SubElement(encabezado_node, "Emisor")
+        if self.emisor_profile is not None:
+            # Copia del <Emisor> ya armado con el perfil; solo falta lo del documento
+            emisor = copy.deepcopy(self.emisor_profile.element(self._build_emisor_profile))
+            encabezado_node.append(emisor)
+        else:
+            emisor = etree.SubElement(encabezado_node, "Emisor")
+            self._build_emisor_profile(emisor, emisor_data)
+        # CodigoVendedor
+        # NumeroFacturaInterna
+        # NumeroPedidoInterno
+        # ZonaVenta
+        # RutaVenta
+        # InformacionAdicionalEmisor
+        etree.SubElement(emisor, "FechaEmision").text = self._fmt_date(emisor_data['FechaEmision'])
+
+    def _build_emisor_profile(self, emisor, emisor_data):
+        """Campos del <Emisor> que van en el perfil del emisor (emitter_profiles.PROFILE_FIELDS)."""
         etree.SubElement(emisor, "RNCEmisor").text = str(emisor_data['RNCEmisor'])
         etree.SubElement(emisor, "RazonSocialEmisor").text = emisor_data['RazonSocialEmisor']
         if 'NombreComercial' in emisor_data:
@@ -114,13 +265,6 @@ class BaseECFBuilder:
         # CorreoEmisor
         # WebSite
         # ActividadEconomica
-        # CodigoVendedor
-        # NumeroFacturaInterna
-        # NumeroPedidoInterno
-        # ZonaVenta
-        # RutaVenta
-        # InformacionAdicionalEmisor
-        etree.SubElement(emisor, "FechaEmision").text = self._fmt_date(emisor_data['FechaEmision'])
 
     def _build_comprador(self, encabezado_node):
         comprador_data = self.data['Encabezado'].get('Comprador')
@@ -170,7 +314,8 @@ class BaseECFBuilder:
         om_node = etree.SubElement(encabezado_node, "OtraMoneda")
 
         etree.SubElement(om_node, "TipoMoneda").text = str(om_data['TipoMoneda'])
-        etree.SubElement(om_node, "TipoCambio").text = "{:.4f}".format(float(om_data['TipoCambio']))
+        if om_data.get('TipoCambio') is not None:
+            etree.SubElement(om_node, "TipoCambio").text = "{:.4f}".format(float(om_data['TipoCambio']))
         
         fields = [
             "MontoGravadoTotalOtraMoneda", "MontoGravado1OtraMoneda", 
@@ -186,34 +331,46 @@ class BaseECFBuilder:
         detalles_node = etree.SubElement(self.root, "DetallesItems")
         items = self.data.get('DetallesItems', [])
         
+        if self._paginator is None:
+            for item_data in items:
+                self._build_item(detalles_node, item_data)
+            return
+        # Los subtotales de cada página se acumulan en el mismo recorrido
+        add_page_line = self._paginator.add
         for item_data in items:
-            item = etree.SubElement(detalles_node, "Item")
-            
-            etree.SubElement(item, "NumeroLinea").text = str(item_data['NumeroLinea'])
-            etree.SubElement(item, "IndicadorFacturacion").text = str(item_data['IndicadorFacturacion'])
-            etree.SubElement(item, "NombreItem").text = item_data['NombreItem']
-            
-            if 'IndicadorBienoServicio' in item_data:
-                etree.SubElement(item, "IndicadorBienoServicio").text = str(item_data['IndicadorBienoServicio'])
-
-            if 'DescripcionItem' in item_data:
-                etree.SubElement(item, "DescripcionItem").text = item_data['DescripcionItem']
-                
-            etree.SubElement(item, "CantidadItem").text = self._fmt_dec(item_data['CantidadItem'])
-            etree.SubElement(item, "PrecioUnitarioItem").text = self._fmt_dec(item_data['PrecioUnitarioItem'])
-            
-            if 'DescuentoMonto' in item_data:
-                 etree.SubElement(item, "DescuentoMonto").text = self._fmt_dec(item_data['DescuentoMonto'])
-
-            if 'OtraMonedaDetalle' in item_data:
-                om_det = item_data['OtraMonedaDetalle']
-                om_node = etree.SubElement(item, "OtraMonedaDetalle") 
-                etree.SubElement(om_node, "PrecioOtraMoneda").text = self._fmt_dec(om_det['PrecioOtraMoneda'])
-                etree.SubElement(om_node, "MontoItemOtraMoneda").text = self._fmt_dec(om_det['MontoItemOtraMoneda'])
-                 
-            etree.SubElement(item, "MontoItem").text = self._fmt_dec(item_data['MontoItem'])
+            self._build_item(detalles_node, item_data)
+            add_page_line(item_data)
+        self._paginator.finish()
+
+    def _build_item(self, detalles_node, item_data):
+        item = etree.SubElement(detalles_node, "Item")
+        
+        etree.SubElement(item, "NumeroLinea").text = str(item_data['NumeroLinea'])
+        etree.SubElement(item, "IndicadorFacturacion").text = str(item_data['IndicadorFacturacion'])
+        etree.SubElement(item, "NombreItem").text = item_data['NombreItem']
+        
+        if 'IndicadorBienoServicio' in item_data:
+            etree.SubElement(item, "IndicadorBienoServicio").text = str(item_data['IndicadorBienoServicio'])
+
+        if 'DescripcionItem' in item_data:
+            etree.SubElement(item, "DescripcionItem").text = item_data['DescripcionItem']
             
-            self._build_detalles_item_extensions(item, item_data)
+        etree.SubElement(item, "CantidadItem").text = self._fmt_dec(item_data['CantidadItem'])
+        etree.SubElement(item, "PrecioUnitarioItem").text = self._fmt_dec(item_data['PrecioUnitarioItem'])
+        
+        if 'DescuentoMonto' in item_data:
+             etree.SubElement(item, "DescuentoMonto").text = self._fmt_dec(item_data['DescuentoMonto'])
+
+        if 'OtraMonedaDetalle' in item_data:
+            om_det = item_data['OtraMonedaDetalle']
+            om_node = etree.SubElement(item, "OtraMonedaDetalle") 
+            etree.SubElement(om_node, "PrecioOtraMoneda").text = self._fmt_dec(om_det['PrecioOtraMoneda'])
+            etree.SubElement(om_node, "MontoItemOtraMoneda").text = self._fmt_dec(om_det['MontoItemOtraMoneda'])
+             
+        etree.SubElement(item, "MontoItem").text = self._fmt_dec(item_data['MontoItem'])
+        
+        self._build_detalles_item_extensions(item, item_data)
+        return item
 
     def _build_detalles_item_extensions(self, item_node, item_data):
         pass
@@ -274,25 +431,36 @@ class BaseECFBuilder:
                 etree.SubElement(item_node, "IndicadorFacturacionDescuentooRecargo").text = str(item['IndicadorFacturacionDescuentooRecargo'])
 
     def _build_paginacion(self):
+        if self._paginacion is not None:
+            # Automática: el nodo ya tiene (o tendrá, en streaming) las páginas
+            self.root.append(self._paginacion)
+            return
+
         pag_data = self.data.get('Paginacion')
         if not pag_data: return
 
         pag_node = etree.SubElement(self.root, "Paginacion")
         for pagina in pag_data.get('Pagina', []):
-            p_node = etree.SubElement(pag_node, "Pagina")
-            
-            etree.SubElement(p_node, "PaginaNo").text = str(pagina['PaginaNo'])
-            etree.SubElement(p_node, "NoLineaDesde").text = str(pagina['NoLineaDesde'])
-            etree.SubElement(p_node, "NoLineaHasta").text = str(pagina['NoLineaHasta'])
-            
-            if 'SubtotalMontoGravadoPagina' in pagina:
-                etree.SubElement(p_node, "SubtotalMontoGravadoPagina").text = self._fmt_dec(pagina['SubtotalMontoGravadoPagina'])
-            if 'SubtotalItbisPagina' in pagina:
-                etree.SubElement(p_node, "SubtotalItbisPagina").text = self._fmt_dec(pagina['SubtotalItbisPagina'])
-            if 'MontoSubtotalPagina' in pagina:
-                etree.SubElement(p_node, "MontoSubtotalPagina").text = self._fmt_dec(pagina['MontoSubtotalPagina'])
-            if 'SubtotalMontoNoFacturablePagina' in pagina:
-                 etree.SubElement(p_node, "SubtotalMontoNoFacturablePagina").text = self._fmt_dec(pagina['SubtotalMontoNoFacturablePagina'])
+            self._build_pagina(pag_node, pagina)
+
+    PAGINA_SUBTOTALES = (
+        'SubtotalMontoGravadoPagina', 'SubtotalMontoGravado1Pagina', 'SubtotalMontoGravado2Pagina',
+        'SubtotalMontoGravado3Pagina', 'SubtotalExentoPagina', 'SubtotalItbisPagina', 'SubtotalItbis1Pagina',
+        'SubtotalItbis2Pagina', 'SubtotalItbis3Pagina', 'SubtotalImpuestoAdicionalPagina', 'MontoSubtotalPagina',
+        'SubtotalMontoNoFacturablePagina',
+    )
+
+    def _build_pagina(self, pag_node, pagina):
+        p_node = etree.SubElement(pag_node, "Pagina")
+
+        etree.SubElement(p_node, "PaginaNo").text = str(pagina['PaginaNo'])
+        etree.SubElement(p_node, "NoLineaDesde").text = str(pagina['NoLineaDesde'])
+        etree.SubElement(p_node, "NoLineaHasta").text = str(pagina['NoLineaHasta'])
+
+        # En el orden del XSD
+        for field in self.PAGINA_SUBTOTALES:
+            if field in pagina:
+                etree.SubElement(p_node, field).text = self._fmt_dec(pagina[field])
 
     def _build_informaciones_adicionales(self, encabezado_node):
         info_data = self.data['Encabezado'].get('InformacionesAdicionales')
@@ -58,6 +58,9 @@ class ECF34Builder(ECF33Builder):
         if 'FechaLimitePago' in id_doc_data:
             etree.SubElement(id_doc, "FechaLimitePago").text = self._fmt_date(id_doc_data['FechaLimitePago'])
 
+        if 'TotalPaginas' in id_doc_data:
+            etree.SubElement(id_doc, "TotalPaginas").text = str(id_doc_data['TotalPaginas'])
+
         return id_doc
 
 
@@ -96,6 +99,9 @@ class ECF41Builder(BaseECF4xBuilder):
              
         # TerminoPago, TablaFormasPago, etc (Optional fields, adding basics for now)
 
+        if 'TotalPaginas' in id_doc_data:
+             etree.SubElement(id_doc, "TotalPaginas").text = str(id_doc_data['TotalPaginas'])
+
 class ECF43Builder(BaseECF4xBuilder):
     """Gastos Menores Electrónico (43)"""
     def _build_id_doc(self, encabezado_node):
@@ -180,6 +186,9 @@ class ECF47Builder(BaseECF4xBuilder):
         if 'FechaLimitePago' in id_doc_data:
              etree.SubElement(id_doc, "FechaLimitePago").text = self._fmt_date(id_doc_data['FechaLimitePago'])
 
+        if 'TotalPaginas' in id_doc_data:
+             etree.SubElement(id_doc, "TotalPaginas").text = str(id_doc_data['TotalPaginas'])
+
     def _build_detalles_item_extensions(self, item_node, item_data):
         # Mandatory Retencion in Item for ECF 47
         if 'Retencion' in item_data:
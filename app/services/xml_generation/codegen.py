@@ -0,0 +1,531 @@
+"""
+Genera un builder en línea recta por cada TipoeCF a partir de los XSD de la DGII.
+
+Cada módulo generado (generated/ecfNN.py) recorre los elementos en el orden
+exacto del esquema y formatea cada valor con la expresión que corresponde a su
+tipo (decimal, fecha, código con ceros), sin llamadas a métodos ni tablas en
+tiempo de ejecución. Los documentos que no son e-CF (DOCUMENTS: RFCE, ARECF, ACECF)
+tienen un módulo más simple, solo con el texto del backend 'direct'. Hay que
+regenerarlos cuando cambien los XSD:
+
+    python -m app.services.xml_generation.codegen
+"""
+import os
+import re
+from app.services.schema_registry import SCHEMA_FILES, SCHEMAS_DIR
+from app.services.xml_generation.xsd_model import load_schema
+from app.services.emitter_profiles import PROFILE_FIELDS
+
+GENERATED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated')
+TIPOS = [31, 32, 33, 34, 41, 43, 44, 45, 46, 47]
+# Documentos sin DetallesItems, que se escriben completos de una vez
+DOCUMENTS = ['RFCE', 'ARECF', 'ACECF']
+
+# Valores que el servicio rellena si el cliente no los envía
+DEFAULTS = {
+    'Version': "'1.0'",
+    'FechaHoraFirma': "datetime.now().strftime('%d-%m-%Y %H:%M:%S')",
+    'FechaHoraAcuseRecibo': "datetime.now().strftime('%d-%m-%Y %H:%M:%S')",
+    'FechaHoraAprobacionComercial': "datetime.now().strftime('%d-%m-%Y %H:%M:%S')",
+}
+
+
+# Declaración y raíz tal como las escribe lxml; con pretty_print sigue un salto de línea
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\\n<ECF>"
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\\n"
+
+
+def _format_expr(kind, value):
+    if kind[0] == 'dec':
+        return f"'%.{kind[1]}f' % float({value})"
+    if kind[0] == 'pad':
+        return f"'%0{kind[1]}d' % int({value})"
+    if kind[0] == 'date':
+        return f"esc(fmt_date({value}))"
+    return f"esc({value})"
+
+
+class _Emitter:
+    """
+    Emite el código que arma el texto XML de un bloque en una lista `p`.
+
+    El bloque se convierte en elementos lxml con un solo fromstring(), que en C
+    crea todo el subárbol de una vez: mucho más barato que un SubElement y una
+    asignación de .text por cada campo.
+    """
+    def __init__(self, tipo):
+        self.tipo = tipo
+        # Cómo se nombra el documento en los errores de bloques requeridos
+        self.label = f"e-CF tipo {tipo}"
+        self.lines = []
+        self.counter = 0
+        self.pending = []
+        # Función que escribe los campos del perfil del emisor; mientras está
+        # puesta, <Emisor> los toma ya escritos del argumento `emisor` si viene
+        self.emisor_fn = None
+
+    def var(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def text(self, indent, fragment):
+        # Los fragmentos consecutivos del mismo nivel se juntan en un solo f-string
+        if self.pending and self.pending[0][0] != indent:
+            self.flush()
+        self.pending.append((indent, fragment))
+
+    def flush(self):
+        if not self.pending:
+            return
+        indent = self.pending[0][0]
+        joined = "".join(fragment for _, fragment in self.pending)
+        prefix = "f" if "{" in joined else ""
+        self.emit(indent, f'p.append({prefix}"{joined}")')
+        self.pending = []
+
+    def control(self, indent, line):
+        self.flush()
+        self.emit(indent, line)
+
+    def element(self, el, data, indent):
+        if el.is_any:
+            # Placeholder de la firma (ver BaseECFBuilder._build_signature)
+            self.text(indent, "<Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+        elif el.is_complex:
+            self.complex(el, data, indent)
+        else:
+            self.simple(el, data, indent)
+
+    def simple(self, el, data, indent):
+        name = el.name
+        kind = el.type.kind
+        if el.repeated:
+            values = self.var('v')
+            self.control(indent, f"{values} = {data}.get('{name}')")
+            self.control(indent, f"if {values} is not None:")
+            self.control(indent + 1, f"for v in ({values} if isinstance({values}, list) else ({values},)):")
+            self.text(indent + 2, f"<{name}>{{{_format_expr(kind, 'v')}}}</{name}>")
+            self.flush()
+        elif name in DEFAULTS:
+            self.control(indent, f"v = {data}.get('{name}') or {DEFAULTS[name]}")
+            self.text(indent, f"<{name}>{{{_format_expr(kind, 'v')}}}</{name}>")
+        elif el.required:
+            self.text(indent, f"<{name}>{{{_format_expr(kind, f'{data}[{name!r}]')}}}</{name}>")
+        else:
+            # null cuenta como ausente, igual que en la validación previa
+            self.control(indent, f"if {data}.get('{name}') is not None:")
+            self.text(indent + 1, f"<{name}>{{{_format_expr(kind, f'{data}[{name!r}]')}}}</{name}>")
+            self.flush()
+
+    def complex(self, el, data, indent):
+        name = el.name
+        block = self.var('d')
+        self.control(indent, f"{block} = {data}.get('{name}')")
+        if el.required:
+            self.control(indent, f"if not {block}:")
+            self.control(indent + 1, f"raise ValueError(\"El {self.label} requiere bloque '{name}'\")")
+            self.complex_body(el, block, indent)
+        else:
+            self.control(indent, f"if {block}:")
+            self.complex_body(el, block, indent + 1)
+            self.flush()
+
+    def complex_body(self, el, block, indent):
+        if el.repeated:
+            row = self.var('d')
+            self.control(indent, f"for {row} in ({block} if isinstance({block}, list) else ({block},)):")
+            self.text(indent + 1, f"<{el.name}>")
+            self.children(el, row, indent + 1)
+            self.text(indent + 1, f"</{el.name}>")
+            self.flush()
+            return
+
+        self.text(indent, f"<{el.name}>")
+        only = el.children[0] if len(el.children) == 1 else None
+        if only is not None and only.repeated:
+            # Contenedor de una lista (DetallesItems, Subtotales, TablaTelefonoEmisor...):
+            # el JSON puede traer la lista directa o {"Item": [...]}
+            rows = self.var('d')
+            self.control(indent, f"{rows} = {block} if isinstance({block}, list) else {block}.get('{only.name}') or []")
+            if only.is_complex:
+                self.complex_body(only, rows, indent)
+            else:
+                self.control(indent, f"for v in ({rows} if isinstance({rows}, list) else ({rows},)):")
+                self.text(indent + 1, f"<{only.name}>{{{_format_expr(only.type.kind, 'v')}}}</{only.name}>")
+                self.flush()
+        else:
+            self.children(el, block, indent)
+        self.text(indent, f"</{el.name}>")
+
+    def children(self, el, data, indent):
+        children = el.children
+        if el.name == 'Emisor' and self.emisor_fn:
+            # Los campos del perfil (emitter_profiles.py) pueden venir ya escritos
+            self.control(indent, f"p.append(emisor if emisor is not None else {self.emisor_fn}({data}))")
+            children = children[len(PROFILE_FIELDS):]
+        for child in children:
+            self.element(child, data, indent)
+
+    def profile(self, emisor, data, indent):
+        """Los campos del perfil del emisor, los primeros de <Emisor> en todos los XSD."""
+        names = tuple(c.name for c in emisor.children[:len(PROFILE_FIELDS)])
+        if names != PROFILE_FIELDS:
+            raise ValueError(f"El <Emisor> del {self.label} no empieza por los campos del perfil: {names}")
+        for child in emisor.children[:len(PROFILE_FIELDS)]:
+            self.element(child, data, indent)
+
+    def resumen(self, after, data):
+        """Bloques finales; Paginacion puede venir ya escrita (la automática del builder)."""
+        for el in after:
+            if el.name == 'Paginacion':
+                self.control(1, "if paginacion is not None:")
+                self.control(2, "p.append(paginacion)")
+                self.control(1, "else:")
+                self.element(el, data, 2)
+                self.flush()
+            else:
+                self.element(el, data, 1)
+
+    def function(self, name, args, doc=None, parts=True):
+        self.flush()
+        self.emit(0, "")
+        self.emit(0, "")
+        self.emit(0, f"def {name}({args}):")
+        if doc:
+            self.emit(1, f'"""{doc}"""')
+        if parts:
+            self.emit(1, "p = []")
+
+
+def _text_expr(kind, value):
+    """Texto de un valor para el backend 'direct' (rechaza caracteres que XML no admite)."""
+    if kind[0] == 'date':
+        return f"xml_text(fmt_date({value}))"
+    return f"xml_text({value})"
+
+
+class _DirectEmitter(_Emitter):
+    """
+    Variante para el backend 'direct': emite el texto final como lo serializa
+    lxml, sin crear elementos. Con pretty=True, indentado como pretty_print
+    (dos espacios por nivel, un elemento por línea); con pretty=False, compacto.
+    En los dos casos un elemento vacío queda como <X/>. Las etiquetas con su
+    indentación quedan como constantes en el código generado.
+    """
+    def __init__(self, tipo, pretty=True, depth=1):
+        super().__init__(tipo)
+        self.pretty = pretty
+        self.nl = "\\n" if pretty else ""
+        self.depth = depth
+
+    def pad(self):
+        return "  " * self.depth if self.pretty else ""
+
+    def leaf(self, indent, name, kind, value):
+        # Un texto vacío queda como <X></X>; collapse_empty lo pasa a <X/> como lxml
+        expr = _format_expr(kind, value) if kind[0] in ('dec', 'pad') else _text_expr(kind, value)
+        self.text(indent, f"{self.pad()}<{name}>{{{expr}}}</{name}>{self.nl}")
+
+    def element(self, el, data, indent):
+        if el.is_any:
+            self.text(indent, f'{self.pad()}<Signature xmlns=\\"http://www.w3.org/2000/09/xmldsig#\\"/>{self.nl}')
+        elif el.is_complex:
+            self.complex(el, data, indent)
+        else:
+            self.simple(el, data, indent)
+
+    def simple(self, el, data, indent):
+        name = el.name
+        kind = el.type.kind
+        if el.repeated:
+            values = self.var('v')
+            self.control(indent, f"{values} = {data}.get('{name}')")
+            self.control(indent, f"if {values} is not None:")
+            self.control(indent + 1, f"for v in ({values} if isinstance({values}, list) else ({values},)):")
+            self.leaf(indent + 2, name, kind, 'v')
+            self.flush()
+        elif name in DEFAULTS:
+            self.control(indent, f"v = {data}.get('{name}') or {DEFAULTS[name]}")
+            self.leaf(indent, name, kind, 'v')
+        elif el.required:
+            self.leaf(indent, name, kind, f'{data}[{name!r}]')
+        else:
+            # null cuenta como ausente, igual que en la validación previa
+            self.control(indent, f"if {data}.get('{name}') is not None:")
+            self.leaf(indent + 1, name, kind, f'{data}[{name!r}]')
+            self.flush()
+
+    def open(self, el, indent):
+        """Abre el elemento; devuelve la variable que detecta si quedó vacío (o None)."""
+        pad = self.pad()
+        self.depth += 1
+        # Un hijo requerido y no repetido siempre se escribe (o falta y hay error)
+        if any(c.required and not c.repeated for c in el.children if not c.is_any):
+            self.text(indent, f"{pad}<{el.name}>{self.nl}")
+            return None
+        # Sin hijos requeridos puede quedar vacío, y entonces lxml escribe <X/>
+        mark = self.var('n')
+        self.control(indent, f'p.append("{pad}<{el.name}>{self.nl}")')
+        self.control(indent, f"{mark} = len(p)")
+        return mark
+
+    def close(self, el, indent, mark):
+        self.depth -= 1
+        pad = self.pad()
+        if mark is None:
+            self.text(indent, f"{pad}</{el.name}>{self.nl}")
+            return
+        self.control(indent, f"if len(p) == {mark}:")
+        self.control(indent + 1, f'p[-1] = "{pad}<{el.name}/>{self.nl}"')
+        self.control(indent, "else:")
+        self.control(indent + 1, f'p.append("{pad}</{el.name}>{self.nl}")')
+
+    def complex_body(self, el, block, indent):
+        if el.repeated:
+            row = self.var('d')
+            self.control(indent, f"for {row} in ({block} if isinstance({block}, list) else ({block},)):")
+            mark = self.open(el, indent + 1)
+            self.children(el, row, indent + 1)
+            self.close(el, indent + 1, mark)
+            self.flush()
+            return
+
+        mark = self.open(el, indent)
+        only = el.children[0] if len(el.children) == 1 else None
+        if only is not None and only.repeated:
+            rows = self.var('d')
+            self.control(indent, f"{rows} = {block} if isinstance({block}, list) else {block}.get('{only.name}') or []")
+            if only.is_complex:
+                self.complex_body(only, rows, indent)
+            else:
+                self.control(indent, f"for v in ({rows} if isinstance({rows}, list) else ({rows},)):")
+                self.leaf(indent + 1, only.name, only.type.kind, 'v')
+                self.flush()
+        else:
+            self.children(el, block, indent)
+        self.close(el, indent, mark)
+
+
+def _generate_direct(tipo, ecf, after, pretty):
+    out = _DirectEmitter(tipo, pretty)
+    suffix = 'text' if pretty else 'compact'
+    item = ecf.child('DetallesItems').child('Item')
+    pad, nl = ("  ", "\\n") if pretty else ("", "")
+    out.emit(0, "")
+    out.emit(0, "")
+    out.emit(0, f"# --- Backend 'direct' ({'pretty_print' if pretty else 'compacto'}): el documento como texto, sin lxml ---")
+
+    emisor = ecf.child('Encabezado').child('Emisor')
+    out.function(f"emisor_{suffix}", "data", "Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py).")
+    out.depth = 3
+    out.profile(emisor, "data", 1)
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function(f"encabezado_{suffix}", "data, emisor=None")
+    out.depth = 1
+    out.emisor_fn = f"emisor_{suffix}"
+    out.element(ecf.child('Encabezado'), "data", 1)
+    out.emisor_fn = None
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function(f"item_{suffix}", "data", "Texto de un <Item> de DetallesItems.")
+    out.depth = 2
+    mark = out.open(item, 1)
+    out.children(item, "data", 1)
+    out.close(item, 1, mark)
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function(f"resumen_{suffix}", "data, paginacion=None", "Bloques posteriores a DetallesItems, en el orden del XSD.")
+    out.depth = 1
+    out.resumen(after, "data")
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function(f"pagina_{suffix}", "data", "Texto de una <Pagina> de Paginacion.")
+    pagina = ecf.child('Paginacion').child('Pagina')
+    out.depth = 2
+    mark = out.open(pagina, 1)
+    out.children(pagina, "data", 1)
+    out.close(pagina, 1, mark)
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    name = "build_bytes" if pretty else "build_compact_bytes"
+    serializer = "pretty_print" if pretty else "tostring() sin pretty_print"
+    out.function(name, "data, emisor=None", f"Documento completo en UTF-8, idéntico a build() + {serializer}.",
+                 parts=False)
+    head = "XML_HEAD + '\\n'" if pretty else "XML_HEAD"
+    out.emit(1, f"p = [{head}, encabezado_{suffix}(data, emisor)]")
+    out.emit(1, "items = data.get('DetallesItems') or ()")
+    out.emit(1, "if items:")
+    out.emit(2, f"p.append('{pad}<DetallesItems>{nl}')")
+    out.emit(2, "for item in items:")
+    out.emit(3, f"p.append(item_{suffix}(item))")
+    out.emit(2, f"p.append('{pad}</DetallesItems>{nl}')")
+    out.emit(1, "else:")
+    out.emit(2, f"p.append('{pad}<DetallesItems/>{nl}')")
+    out.emit(1, f"p.append(resumen_{suffix}(data))")
+    out.emit(1, f"p.append('</ECF>{nl}')")
+    out.emit(1, "return collapse_empty(''.join(p)).encode('utf-8')")
+    return out.lines
+
+
+def generate(tipo):
+    filename = SCHEMA_FILES[(str(tipo), '1.0')]
+    ecf = load_schema(os.path.join(SCHEMAS_DIR, filename))
+    out = _Emitter(tipo)
+
+    out.emit(0, f'# Generado por app/services/xml_generation/codegen.py a partir de "{filename}".')
+    out.emit(0, "# No editar a mano: regenerar con python -m app.services.xml_generation.codegen")
+    out.emit(0, "from datetime import datetime")
+    out.emit(0, "from lxml.etree import fromstring")
+    out.emit(0, "from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty")
+    out.emit(0, "")
+    out.emit(0, f"TIPO_ECF = {tipo}")
+    out.emit(0, f'XML_HEAD = "{XML_HEAD}"')
+
+    children = ecf.children
+    names = [c.name for c in children]
+    detalles = ecf.child('DetallesItems')
+    item = detalles.child('Item')
+    after = children[names.index('DetallesItems') + 1:]
+
+    out.function("emisor_xml", "data", "Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py).")
+    out.profile(ecf.child('Encabezado').child('Emisor'), "data", 1)
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function("encabezado_xml", "data, emisor=None")
+    out.emisor_fn = "emisor_xml"
+    out.element(ecf.child('Encabezado'), "data", 1)
+    out.emisor_fn = None
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function("item_xml", "data", "Texto XML de un <Item> de DetallesItems.")
+    out.text(1, "<Item>")
+    out.children(item, "data", 1)
+    out.text(1, "</Item>")
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function("detalles_xml", "data")
+    out.emit(1, "for item in data.get('DetallesItems') or ():")
+    out.emit(2, "p.append(item_xml(item))")
+    out.emit(1, "return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'")
+
+    out.function("resumen_xml", "data, paginacion=None", "Bloques posteriores a DetallesItems, en el orden del XSD.")
+    out.resumen(after, "data")
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function("pagina_xml", "data", "Texto XML de una <Pagina> de Paginacion.")
+    pagina = ecf.child('Paginacion').child('Pagina')
+    out.text(1, "<Pagina>")
+    out.children(pagina, "data", 1)
+    out.text(1, "</Pagina>")
+    out.flush()
+    out.emit(1, "return ''.join(p)")
+
+    out.function("build", "data, emisor=None", "Devuelve el elemento <ECF> completo, armado con un solo fromstring().",
+                 parts=False)
+    out.emit(1, "return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')")
+
+    # Por partes, para el modo streaming de BaseECFBuilder
+    out.function("build_encabezado", "root, data, emisor=None", parts=False)
+    out.emit(1, "root.append(fromstring(encabezado_xml(data, emisor)))")
+
+    out.function("build_item", "parent, data", "Construye un <Item>, lo agrega a parent y lo devuelve.", parts=False)
+    out.emit(1, "node = fromstring(item_xml(data))")
+    out.emit(1, "parent.append(node)")
+    out.emit(1, "return node")
+
+    out.function("build_resumen", "root, data, paginacion=None", parts=False)
+    out.emit(1, "root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))")
+
+    out.function("build_pagina", "parent, data", "Construye una <Pagina> y la agrega a parent.", parts=False)
+    out.emit(1, "parent.append(fromstring(pagina_xml(data)))")
+
+    out.lines.extend(_generate_direct(tipo, ecf, after, pretty=True))
+    out.lines.extend(_generate_direct(tipo, ecf, after, pretty=False))
+    return "\n".join(out.lines) + "\n"
+
+
+def generate_document(name):
+    """
+    Módulo de un documento que no es e-CF: build_bytes y build_compact_bytes
+    escriben el documento completo como texto, igual que el backend 'direct'.
+    """
+    filename = SCHEMA_FILES[(name, '1.0')]
+    doc = load_schema(os.path.join(SCHEMAS_DIR, filename))
+    out = _Emitter(name)
+    out.emit(0, f'# Generado por app/services/xml_generation/codegen.py a partir de "{filename}".')
+    out.emit(0, "# No editar a mano: regenerar con python -m app.services.xml_generation.codegen")
+    body = []
+    for pretty in (True, False):
+        text = _DirectEmitter(name, pretty)
+        text.label = f"documento {name}"
+        nl = "\\n" if pretty else ""
+        head = "XML_HEAD + '\\n'" if pretty else "XML_HEAD"
+        function = "build_bytes" if pretty else "build_compact_bytes"
+        serializer = "con pretty_print" if pretty else "compacto"
+        text.function(function, "data", f"Documento completo en UTF-8, {serializer}.", parts=False)
+        text.emit(1, f"p = [{head}]")
+        text.children(doc, "data", 1)
+        text.text(1, f"</{doc.name}>{nl}")
+        text.flush()
+        text.emit(1, "return collapse_empty(''.join(p)).encode('utf-8')")
+        body.extend(text.lines)
+
+    # Solo los helpers que usa este documento: ARECF no formatea fechas con fmt_date y RFCE no usa datetime
+    code = "\n".join(body)
+    if re.search(r"\bdatetime\b", code):
+        out.emit(0, "from datetime import datetime")
+    helpers = [h for h in ("fmt_date", "xml_text", "collapse_empty") if re.search(rf"\b{h}\b", code)]
+    out.emit(0, f"from app.services.xml_generation.formatters import {', '.join(helpers)}")
+    out.emit(0, "")
+    out.emit(0, f"DOCUMENT = {name!r}")
+    out.emit(0, f'XML_HEAD = "{XML_DECLARATION}<{doc.name}>"')
+    out.lines.extend(body)
+    return "\n".join(out.lines) + "\n"
+
+
+def main():
+    os.makedirs(GENERATED_DIR, exist_ok=True)
+    modules = []
+    for tipo in TIPOS:
+        module = f"ecf{tipo}"
+        with open(os.path.join(GENERATED_DIR, module + ".py"), "w", encoding="utf-8") as f:
+            f.write(generate(tipo))
+        modules.append((tipo, module))
+        print(f"generated/{module}.py")
+
+    documents = []
+    for name in DOCUMENTS:
+        module = name.lower()
+        with open(os.path.join(GENERATED_DIR, module + ".py"), "w", encoding="utf-8") as f:
+            f.write(generate_document(name))
+        documents.append((name, module))
+        print(f"generated/{module}.py")
+
+    with open(os.path.join(GENERATED_DIR, "__init__.py"), "w", encoding="utf-8") as f:
+        f.write("# Generado por app/services/xml_generation/codegen.py. No editar a mano.\n")
+        f.write(f"from . import {', '.join(m for _, m in modules + documents)}\n\n")
+        f.write("GENERATED_MODULES = {\n")
+        for tipo, module in modules:
+            f.write(f"    {tipo}: {module},\n")
+        f.write("}\n\n")
+        f.write("DOCUMENT_MODULES = {\n")
+        for name, module in documents:
+            f.write(f"    {name!r}: {module},\n")
+        f.write("}\n")
+
+
+if __name__ == "__main__":
+    main()
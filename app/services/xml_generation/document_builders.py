@@ -0,0 +1,132 @@
+from lxml import etree
+from app.services.totals import totals_engine
+from .generated import DOCUMENT_MODULES
+
+
+class DocumentBuilder:
+    """
+    Documentos que no son e-CF (RFCE, ARECF, ACECF), escritos como texto por
+    su módulo generado (codegen.DOCUMENTS) sin crear elementos lxml.
+
+    Misma interfaz que los builders de e-CF (build, root, get_xml_bytes); el
+    árbol solo se arma si alguien pide `root` (firma). Las subclases dicen de
+    dónde sale el RNC que firma y qué se completa antes de validar.
+    """
+    document = None
+    module = None
+    # Bloque raíz de los documentos planos: el JSON puede traerlo o ser directamente su contenido
+    detail = None
+    pretty = True
+
+    def __init__(self, data_json):
+        if self.detail and isinstance(data_json, dict) and self.detail not in data_json:
+            data_json = {self.detail: data_json}
+        self.data = data_json
+        self.tipo_ecf = self._tipo_ecf()
+        self._xml = None
+        self._root = None
+
+    def encf(self):
+        """eNCF del e-CF al que se refiere el documento, o None."""
+        try:
+            return self.data[self.detail]['eNCF']
+        except (KeyError, TypeError):
+            return None
+
+    def _tipo_ecf(self):
+        # Tomado del eNCF: E310000000001 -> 31
+        try:
+            return int(self.encf()[1:3])
+        except (TypeError, ValueError):
+            return 0
+
+    def prepare(self):
+        """Lo que se completa en el JSON antes de la validación previa; devuelve errores como ellas."""
+        return []
+
+    def signer_rnc(self):
+        return self.data[self.detail]['RNCComprador']
+
+    def build(self):
+        build_bytes = self.module.build_bytes if self.pretty else self.module.build_compact_bytes
+        try:
+            self._xml = build_bytes(self.data)
+        except KeyError as e:
+            raise ValueError(f"Falta el campo requerido {e} para el {self.document}")
+        self._root = None
+        return self._xml
+
+    @property
+    def root(self):
+        if self._root is None:
+            self._root = etree.fromstring(self._xml if self._xml is not None else self.build())
+        return self._root
+
+    def get_xml_bytes(self):
+        if self._root is not None:
+            return etree.tostring(self._root, pretty_print=self.pretty, encoding='UTF-8', xml_declaration=True)
+        return self._xml if self._xml is not None else self.build()
+
+    def get_xml_string(self):
+        return self.get_xml_bytes().decode('utf-8')
+
+
+class RFCEBuilder(DocumentBuilder):
+    """
+    Resumen Factura de Consumo Electrónica (RFCE) a partir del JSON de un e-CF 32.
+
+    El XSD del RFCE es un subconjunto del e-CF 32 (IdDoc, Emisor, Comprador y
+    Totales), con las mismas rutas en el JSON: el módulo generado toma del
+    payload del ECF32Builder solo lo que lleva el resumen, sin construir el
+    e-CF. El único campo propio es Encabezado.CodigoSeguridadeCF, los 6
+    primeros caracteres del SignatureValue del e-CF 32 firmado.
+    """
+    document = 'RFCE'
+    module = DOCUMENT_MODULES['RFCE']
+
+    def encf(self):
+        try:
+            return self.data['Encabezado']['IdDoc']['eNCF']
+        except (KeyError, TypeError):
+            return None
+
+    def _tipo_ecf(self):
+        try:
+            return int(self.data['Encabezado']['IdDoc']['TipoeCF'])
+        except (KeyError, TypeError, ValueError):
+            return 0
+
+    def prepare(self):
+        # Totales desde DetallesItems, igual que en create_ecf
+        return totals_engine.apply(self.data)
+
+    def signer_rnc(self):
+        return self.data['Encabezado']['Emisor']['RNCEmisor']
+
+
+class ARECFBuilder(DocumentBuilder):
+    """
+    Acuse de recibo (ARECF) de un e-CF recibido como comprador. Firma el
+    comprador; FechaHoraAcuseRecibo es la hora actual si no viene.
+    """
+    document = 'ARECF'
+    module = DOCUMENT_MODULES['ARECF']
+    detail = 'DetalleAcusedeRecibo'
+
+
+class ACECFBuilder(DocumentBuilder):
+    """
+    Aprobación comercial (ACECF) de un e-CF recibido: Estado 1 aceptado, 2
+    rechazado (con DetalleMotivoRechazo). FechaHoraAprobacionComercial es la
+    hora actual si no viene.
+    """
+    document = 'ACECF'
+    module = DOCUMENT_MODULES['ACECF']
+    detail = 'DetalleAprobacionComercial'
+
+
+DOCUMENT_BUILDERS = {
+    'RFCE': RFCEBuilder,
+    'ARECF': ARECFBuilder,
+    'ACECF': ACECFBuilder,
+}
@@ -0,0 +1,41 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# Caracteres que XML 1.0 no admite; lxml los rechaza al parsear
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+_EMPTY_LEAF = re.compile(r'<(\w+)></\1>')
+# Lo que obliga a xml_text a hacer algo más que devolver el texto
+_SPECIAL = re.compile('[&<>\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+@lru_cache(maxsize=4096)
+def fmt_date(date_str):
+    """
+    YYYY-MM-DD -> DD-MM-YYYY; cualquier otro formato se deja tal cual (igual que BaseECFBuilder._fmt_date).
+    Las mismas pocas fechas se repiten en casi todos los documentos: strptime solo corre la primera vez.
+    """
+    if not date_str: return ""
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%m-%Y")
+    except ValueError:
+        return date_str
+
+def esc(value):
+    """Escapa un valor para el texto de un elemento (\\r como referencia para que el parser no lo normalice)."""
+    return str(value).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+
+def xml_text(value):
+    """esc() para el backend 'direct', que no pasa por el parser: rechaza lo que lxml rechazaría."""
+    text = value if value.__class__ is str else str(value)
+    if _SPECIAL.search(text) is None:
+        return text
+    text = esc(text)
+    if _INVALID_XML.search(text):
+        raise ValueError(f"Valor con caracteres no válidos en XML: {text!r}")
+    return text
+
+def collapse_empty(text):
+    """<X></X> -> <X/>, como serializa lxml. El texto va escapado, así que '></' solo aparece en esos casos."""
+    if '></' not in text:
+        return text
+    return _EMPTY_LEAF.sub(r'<\1/>', text)
@@ -0,0 +1,21 @@
+# Generado por app/services/xml_generation/codegen.py. No editar a mano.
+from . import ecf31, ecf32, ecf33, ecf34, ecf41, ecf43, ecf44, ecf45, ecf46, ecf47, rfce, arecf, acecf
+
+GENERATED_MODULES = {
+    31: ecf31,
+    32: ecf32,
+    33: ecf33,
+    34: ecf34,
+    41: ecf41,
+    43: ecf43,
+    44: ecf44,
+    45: ecf45,
+    46: ecf46,
+    47: ecf47,
+}
+
+DOCUMENT_MODULES = {
+    'RFCE': rfce,
+    'ARECF': arecf,
+    'ACECF': acecf,
+}
@@ -0,0 +1,39 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "ACECF v.1.0 (2).xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from app.services.xml_generation.formatters import fmt_date, xml_text, collapse_empty
+
+DOCUMENT = 'ACECF'
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ACECF>"
+
+
+def build_bytes(data):
+    """Documento completo en UTF-8, con pretty_print."""
+    p = [XML_HEAD + '\n']
+    d1 = data.get('DetalleAprobacionComercial')
+    if not d1:
+        raise ValueError("El documento ACECF requiere bloque 'DetalleAprobacionComercial'")
+    p.append("  <DetalleAprobacionComercial>\n")
+    v = d1.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n    <RNCEmisor>{xml_text(d1['RNCEmisor'])}</RNCEmisor>\n    <eNCF>{xml_text(d1['eNCF'])}</eNCF>\n    <FechaEmision>{xml_text(fmt_date(d1['FechaEmision']))}</FechaEmision>\n    <MontoTotal>{'%.2f' % float(d1['MontoTotal'])}</MontoTotal>\n    <RNCComprador>{xml_text(d1['RNCComprador'])}</RNCComprador>\n    <Estado>{xml_text(d1['Estado'])}</Estado>\n")
+    if d1.get('DetalleMotivoRechazo') is not None:
+        p.append(f"    <DetalleMotivoRechazo>{xml_text(d1['DetalleMotivoRechazo'])}</DetalleMotivoRechazo>\n")
+    v = d1.get('FechaHoraAprobacionComercial') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"    <FechaHoraAprobacionComercial>{xml_text(v)}</FechaHoraAprobacionComercial>\n  </DetalleAprobacionComercial>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n</ACECF>\n")
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+def build_compact_bytes(data):
+    """Documento completo en UTF-8, compacto."""
+    p = [XML_HEAD]
+    d1 = data.get('DetalleAprobacionComercial')
+    if not d1:
+        raise ValueError("El documento ACECF requiere bloque 'DetalleAprobacionComercial'")
+    p.append("<DetalleAprobacionComercial>")
+    v = d1.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version><RNCEmisor>{xml_text(d1['RNCEmisor'])}</RNCEmisor><eNCF>{xml_text(d1['eNCF'])}</eNCF><FechaEmision>{xml_text(fmt_date(d1['FechaEmision']))}</FechaEmision><MontoTotal>{'%.2f' % float(d1['MontoTotal'])}</MontoTotal><RNCComprador>{xml_text(d1['RNCComprador'])}</RNCComprador><Estado>{xml_text(d1['Estado'])}</Estado>")
+    if d1.get('DetalleMotivoRechazo') is not None:
+        p.append(f"<DetalleMotivoRechazo>{xml_text(d1['DetalleMotivoRechazo'])}</DetalleMotivoRechazo>")
+    v = d1.get('FechaHoraAprobacionComercial') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraAprobacionComercial>{xml_text(v)}</FechaHoraAprobacionComercial></DetalleAprobacionComercial><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/></ACECF>")
+    return collapse_empty(''.join(p)).encode('utf-8')
@@ -0,0 +1,39 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "ARECF v1.0.xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from app.services.xml_generation.formatters import xml_text, collapse_empty
+
+DOCUMENT = 'ARECF'
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ARECF>"
+
+
+def build_bytes(data):
+    """Documento completo en UTF-8, con pretty_print."""
+    p = [XML_HEAD + '\n']
+    d1 = data.get('DetalleAcusedeRecibo')
+    if not d1:
+        raise ValueError("El documento ARECF requiere bloque 'DetalleAcusedeRecibo'")
+    p.append("  <DetalleAcusedeRecibo>\n")
+    v = d1.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n    <RNCEmisor>{xml_text(d1['RNCEmisor'])}</RNCEmisor>\n    <RNCComprador>{xml_text(d1['RNCComprador'])}</RNCComprador>\n    <eNCF>{xml_text(d1['eNCF'])}</eNCF>\n    <Estado>{xml_text(d1['Estado'])}</Estado>\n")
+    if d1.get('CodigoMotivoNoRecibido') is not None:
+        p.append(f"    <CodigoMotivoNoRecibido>{xml_text(d1['CodigoMotivoNoRecibido'])}</CodigoMotivoNoRecibido>\n")
+    v = d1.get('FechaHoraAcuseRecibo') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"    <FechaHoraAcuseRecibo>{xml_text(v)}</FechaHoraAcuseRecibo>\n  </DetalleAcusedeRecibo>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n</ARECF>\n")
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+def build_compact_bytes(data):
+    """Documento completo en UTF-8, compacto."""
+    p = [XML_HEAD]
+    d1 = data.get('DetalleAcusedeRecibo')
+    if not d1:
+        raise ValueError("El documento ARECF requiere bloque 'DetalleAcusedeRecibo'")
+    p.append("<DetalleAcusedeRecibo>")
+    v = d1.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version><RNCEmisor>{xml_text(d1['RNCEmisor'])}</RNCEmisor><RNCComprador>{xml_text(d1['RNCComprador'])}</RNCComprador><eNCF>{xml_text(d1['eNCF'])}</eNCF><Estado>{xml_text(d1['Estado'])}</Estado>")
+    if d1.get('CodigoMotivoNoRecibido') is not None:
+        p.append(f"<CodigoMotivoNoRecibido>{xml_text(d1['CodigoMotivoNoRecibido'])}</CodigoMotivoNoRecibido>")
+    v = d1.get('FechaHoraAcuseRecibo') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraAcuseRecibo>{xml_text(v)}</FechaHoraAcuseRecibo></DetalleAcusedeRecibo><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/></ARECF>")
+    return collapse_empty(''.join(p)).encode('utf-8')
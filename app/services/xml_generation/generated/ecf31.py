@@ -0,0 +1,1950 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 31 v.1.0 (1).xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 31
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{esc(d4['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d4.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{esc(d4['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d4.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{esc(d4['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d4['TipoIngresos'])}</TipoIngresos><TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{esc(d4['TerminoPago'])}</TerminoPago>")
+    d5 = d4.get('TablaFormasPago')
+    if d5:
+        p.append("<TablaFormasPago>")
+        d6 = d5 if isinstance(d5, list) else d5.get('FormaDePago') or []
+        for d7 in (d6 if isinstance(d6, list) else (d6,)):
+            p.append(f"<FormaDePago><FormaPago>{esc(d7['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d7['MontoPago'])}</MontoPago></FormaDePago>")
+        p.append("</TablaFormasPago>")
+    if d4.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{esc(d4['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d4.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{esc(d4['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d4.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{esc(d4['BancoPago'])}</BancoPago>")
+    if d4.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{esc(fmt_date(d4['FechaDesde']))}</FechaDesde>")
+    if d4.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{esc(fmt_date(d4['FechaHasta']))}</FechaHasta>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d8 = d3.get('Emisor')
+    if not d8:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d8))
+    if d8.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{esc(d8['CodigoVendedor'])}</CodigoVendedor>")
+    if d8.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d8['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d8.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d8['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d8.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{esc(d8['ZonaVenta'])}</ZonaVenta>")
+    if d8.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{esc(d8['RutaVenta'])}</RutaVenta>")
+    if d8.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d8['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d3.get('Comprador')
+    if not d9:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Comprador'")
+    p.append(f"<Comprador><RNCComprador>{esc(d9['RNCComprador'])}</RNCComprador><RazonSocialComprador>{esc(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d9.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{esc(d9['ContactoComprador'])}</ContactoComprador>")
+    if d9.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{esc(d9['CorreoComprador'])}</CorreoComprador>")
+    if d9.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{esc(d9['DireccionComprador'])}</DireccionComprador>")
+    if d9.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d9['MunicipioComprador'])}</MunicipioComprador>")
+    if d9.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d9['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d9.get('FechaEntrega') is not None:
+        p.append(f"<FechaEntrega>{esc(fmt_date(d9['FechaEntrega']))}</FechaEntrega>")
+    if d9.get('ContactoEntrega') is not None:
+        p.append(f"<ContactoEntrega>{esc(d9['ContactoEntrega'])}</ContactoEntrega>")
+    if d9.get('DireccionEntrega') is not None:
+        p.append(f"<DireccionEntrega>{esc(d9['DireccionEntrega'])}</DireccionEntrega>")
+    if d9.get('TelefonoAdicional') is not None:
+        p.append(f"<TelefonoAdicional>{esc(d9['TelefonoAdicional'])}</TelefonoAdicional>")
+    if d9.get('FechaOrdenCompra') is not None:
+        p.append(f"<FechaOrdenCompra>{esc(fmt_date(d9['FechaOrdenCompra']))}</FechaOrdenCompra>")
+    if d9.get('NumeroOrdenCompra') is not None:
+        p.append(f"<NumeroOrdenCompra>{esc(d9['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+    if d9.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{esc(d9['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d9.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{esc(d9['ResponsablePago'])}</ResponsablePago>")
+    if d9.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{esc(d9['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d10 = d3.get('InformacionesAdicionales')
+    if d10:
+        p.append("<InformacionesAdicionales>")
+        if d10.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{esc(fmt_date(d10['FechaEmbarque']))}</FechaEmbarque>")
+        if d10.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{esc(d10['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d10.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{esc(d10['NumeroContenedor'])}</NumeroContenedor>")
+        if d10.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{esc(d10['NumeroReferencia'])}</NumeroReferencia>")
+        if d10.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d10['PesoBruto'])}</PesoBruto>")
+        if d10.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d10['PesoNeto'])}</PesoNeto>")
+        if d10.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{esc(d10['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d10.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{esc(d10['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d10.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d10['CantidadBulto'])}</CantidadBulto>")
+        if d10.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{esc(d10['UnidadBulto'])}</UnidadBulto>")
+        if d10.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d10['VolumenBulto'])}</VolumenBulto>")
+        if d10.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{esc(d10['UnidadVolumen'])}</UnidadVolumen>")
+        p.append("</InformacionesAdicionales>")
+    d11 = d3.get('Transporte')
+    if d11:
+        p.append("<Transporte>")
+        if d11.get('Conductor') is not None:
+            p.append(f"<Conductor>{esc(d11['Conductor'])}</Conductor>")
+        if d11.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{esc(d11['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d11.get('Ficha') is not None:
+            p.append(f"<Ficha>{esc(d11['Ficha'])}</Ficha>")
+        if d11.get('Placa') is not None:
+            p.append(f"<Placa>{esc(d11['Placa'])}</Placa>")
+        if d11.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{esc(d11['RutaTransporte'])}</RutaTransporte>")
+        if d11.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{esc(d11['ZonaTransporte'])}</ZonaTransporte>")
+        if d11.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{esc(d11['NumeroAlbaran'])}</NumeroAlbaran>")
+        p.append("</Transporte>")
+    d12 = d3.get('Totales')
+    if not d12:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d12.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d12['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d12.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d12['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d12.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d12['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d12.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d12['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d12.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d12['MontoExento'])}</MontoExento>")
+    if d12.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{esc(d12['ITBIS1'])}</ITBIS1>")
+    if d12.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{esc(d12['ITBIS2'])}</ITBIS2>")
+    if d12.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{esc(d12['ITBIS3'])}</ITBIS3>")
+    if d12.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d12['TotalITBIS'])}</TotalITBIS>")
+    if d12.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d12['TotalITBIS1'])}</TotalITBIS1>")
+    if d12.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d12['TotalITBIS2'])}</TotalITBIS2>")
+    if d12.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d12['TotalITBIS3'])}</TotalITBIS3>")
+    if d12.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d12['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d13 = d12.get('ImpuestosAdicionales')
+    if d13:
+        p.append("<ImpuestosAdicionales>")
+        d14 = d13 if isinstance(d13, list) else d13.get('ImpuestoAdicional') or []
+        for d15 in (d14 if isinstance(d14, list) else (d14,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d15['TipoImpuesto'])}</TipoImpuesto><TasaImpuestoAdicional>{'%.2f' % float(d15['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>")
+            if d15.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d15.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d15.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d15['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            p.append("</ImpuestoAdicional>")
+        p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d12['MontoTotal'])}</MontoTotal>")
+    if d12.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d12['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d12.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d12['MontoPeriodo'])}</MontoPeriodo>")
+    if d12.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d12['SaldoAnterior'])}</SaldoAnterior>")
+    if d12.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d12['MontoAvancePago'])}</MontoAvancePago>")
+    if d12.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d12['ValorPagar'])}</ValorPagar>")
+    if d12.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d12['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d12.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d12['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d12.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d12['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d12.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d12['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d16 = d3.get('OtraMoneda')
+    if d16:
+        p.append("<OtraMoneda>")
+        if d16.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d16['TipoMoneda'])}</TipoMoneda>")
+        if d16.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d16['TipoCambio'])}</TipoCambio>")
+        if d16.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d16['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d16.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d16['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d16.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d16['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d16.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d16['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d16.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d16['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d16.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d16['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d16.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d16['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d16.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d16['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d16.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d16['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d16.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d16['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d17 = d16.get('ImpuestosAdicionalesOtraMoneda')
+        if d17:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            d18 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicionalOtraMoneda') or []
+            for d19 in (d18 if isinstance(d18, list) else (d18,)):
+                p.append(f"<ImpuestoAdicionalOtraMoneda><TipoImpuestoOtraMoneda>{'%03d' % int(d19['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda><TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d19['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d19.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d19['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>")
+                if d19.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d19['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>")
+                if d19.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d19['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d16.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d16['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d20 = data.get('TablaCodigosItem')
+    if d20:
+        p.append("<TablaCodigosItem>")
+        d21 = d20 if isinstance(d20, list) else d20.get('CodigosItem') or []
+        for d22 in (d21 if isinstance(d21, list) else (d21,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d22['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d22['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d23 = data.get('Retencion')
+    if d23:
+        p.append("<Retencion>")
+        if d23.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"<IndicadorAgenteRetencionoPercepcion>{esc(d23['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+        if d23.get('MontoITBISRetenido') is not None:
+            p.append(f"<MontoITBISRetenido>{'%.2f' % float(d23['MontoITBISRetenido'])}</MontoITBISRetenido>")
+        if d23.get('MontoISRRetenido') is not None:
+            p.append(f"<MontoISRRetenido>{'%.2f' % float(d23['MontoISRRetenido'])}</MontoISRRetenido>")
+        p.append("</Retencion>")
+    p.append(f"<NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"<CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"<UnidadReferencia>{esc(data['UnidadReferencia'])}</UnidadReferencia>")
+    d24 = data.get('TablaSubcantidad')
+    if d24:
+        p.append("<TablaSubcantidad>")
+        d25 = d24 if isinstance(d24, list) else d24.get('SubcantidadItem') or []
+        for d26 in (d25 if isinstance(d25, list) else (d25,)):
+            p.append("<SubcantidadItem>")
+            if d26.get('Subcantidad') is not None:
+                p.append(f"<Subcantidad>{'%.3f' % float(d26['Subcantidad'])}</Subcantidad>")
+            if d26.get('CodigoSubcantidad') is not None:
+                p.append(f"<CodigoSubcantidad>{esc(d26['CodigoSubcantidad'])}</CodigoSubcantidad>")
+            p.append("</SubcantidadItem>")
+        p.append("</TablaSubcantidad>")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"<GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"<PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{esc(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{esc(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d27 = data.get('TablaSubDescuento')
+    if d27:
+        p.append("<TablaSubDescuento>")
+        d28 = d27 if isinstance(d27, list) else d27.get('SubDescuento') or []
+        for d29 in (d28 if isinstance(d28, list) else (d28,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{esc(d29['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d29.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d29['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d29.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d29['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d30 = data.get('TablaSubRecargo')
+    if d30:
+        p.append("<TablaSubRecargo>")
+        d31 = d30 if isinstance(d30, list) else d30.get('SubRecargo') or []
+        for d32 in (d31 if isinstance(d31, list) else (d31,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{esc(d32['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d32.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d32['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d32.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d32['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        p.append("</TablaSubRecargo>")
+    d33 = data.get('TablaImpuestoAdicional')
+    if d33:
+        p.append("<TablaImpuestoAdicional>")
+        d34 = d33 if isinstance(d33, list) else d33.get('ImpuestoAdicional') or []
+        for d35 in (d34 if isinstance(d34, list) else (d34,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d35['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        p.append("</TablaImpuestoAdicional>")
+    d36 = data.get('OtraMonedaDetalle')
+    if d36:
+        p.append("<OtraMonedaDetalle>")
+        if d36.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d36['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d36.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d36['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d36.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d36['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d36.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d36['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d37 = data.get('Subtotales')
+    if d37:
+        p.append("<Subtotales>")
+        d38 = d37 if isinstance(d37, list) else d37.get('Subtotal') or []
+        for d39 in (d38 if isinstance(d38, list) else (d38,)):
+            p.append("<Subtotal>")
+            if d39.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d39['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d39.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d39['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d39.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d39['Orden'])}</Orden>")
+            if d39.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d39['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d39.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d39['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d39.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d39['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d39.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d39['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d39.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d39['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d39.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d39['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d39.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d39['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d39.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d39['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d39.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d39['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d39.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d39['SubTotalExento'])}</SubTotalExento>")
+            if d39.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d39['MontoSubTotal'])}</MontoSubTotal>")
+            if d39.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d39['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    d40 = data.get('DescuentosORecargos')
+    if d40:
+        p.append("<DescuentosORecargos>")
+        d41 = d40 if isinstance(d40, list) else d40.get('DescuentoORecargo') or []
+        for d42 in (d41 if isinstance(d41, list) else (d41,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{esc(d42['NumeroLinea'])}</NumeroLinea><TipoAjuste>{esc(d42['TipoAjuste'])}</TipoAjuste>")
+            if d42.get('IndicadorNorma1007') is not None:
+                p.append(f"<IndicadorNorma1007>{esc(d42['IndicadorNorma1007'])}</IndicadorNorma1007>")
+            if d42.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{esc(d42['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d42.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{esc(d42['TipoValor'])}</TipoValor>")
+            if d42.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d42['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d42.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d42['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d42.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d42['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d42.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{esc(d42['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d43 = data.get('Paginacion')
+        if d43:
+            p.append("<Paginacion>")
+            d44 = d43 if isinstance(d43, list) else d43.get('Pagina') or []
+            for d45 in (d44 if isinstance(d44, list) else (d44,)):
+                p.append("<Pagina>")
+                if d45.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d45['PaginaNo'])}</PaginaNo>")
+                if d45.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d45['NoLineaDesde'])}</NoLineaDesde>")
+                if d45.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d45['NoLineaHasta'])}</NoLineaHasta>")
+                if d45.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d45['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d45.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d45['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d45.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d45['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d45.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d45['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d45.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d45['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d45.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d45['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d45.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d45['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d45.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d45['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d45.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d45['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d45.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d45['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d46 = d45.get('SubtotalImpuestoAdicional')
+                if d46:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    if d46.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d46['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+                    if d46.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d46['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    p.append("</SubtotalImpuestoAdicional>")
+                if d45.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d45['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d45.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d45['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d47 = data.get('InformacionReferencia')
+    if d47:
+        p.append("<InformacionReferencia>")
+        if d47.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{esc(d47['NCFModificado'])}</NCFModificado>")
+        if d47.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{esc(d47['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d47.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{esc(fmt_date(d47['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d47.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{esc(d47['CodigoModificacion'])}</CodigoModificacion>")
+        p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d48 = data.get('SubtotalImpuestoAdicional')
+    if d48:
+        p.append("<SubtotalImpuestoAdicional>")
+        if d48.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d48['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+        if d48.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d48['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"      <IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>\n")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"      <IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>\n")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"      <IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>\n")
+    p.append(f"      <TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos>\n      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"      <TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>\n")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("      <TablaFormasPago>\n")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"        <FormaDePago>\n          <FormaPago>{xml_text(d9['FormaPago'])}</FormaPago>\n          <MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago>\n        </FormaDePago>\n")
+        if len(p) == n7:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"      <TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>\n")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"      <NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>\n")
+    if d5.get('BancoPago') is not None:
+        p.append(f"      <BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>\n")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"      <FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>\n")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"      <FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"      <CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>\n")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"      <ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>\n")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"      <RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>\n")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Comprador'")
+    p.append(f"    <Comprador>\n      <RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>\n      <RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>\n")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"      <ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>\n")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"      <CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>\n")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"      <DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>\n")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"      <MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>\n")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"      <ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>\n")
+    if d11.get('FechaEntrega') is not None:
+        p.append(f"      <FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>\n")
+    if d11.get('ContactoEntrega') is not None:
+        p.append(f"      <ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>\n")
+    if d11.get('DireccionEntrega') is not None:
+        p.append(f"      <DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>\n")
+    if d11.get('TelefonoAdicional') is not None:
+        p.append(f"      <TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>\n")
+    if d11.get('FechaOrdenCompra') is not None:
+        p.append(f"      <FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>\n")
+    if d11.get('NumeroOrdenCompra') is not None:
+        p.append(f"      <NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>\n")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"      <CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>\n")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"      <ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>\n")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"      <InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>\n")
+    p.append("    </Comprador>\n")
+    d12 = d4.get('InformacionesAdicionales')
+    if d12:
+        p.append("    <InformacionesAdicionales>\n")
+        n13 = len(p)
+        if d12.get('FechaEmbarque') is not None:
+            p.append(f"      <FechaEmbarque>{xml_text(fmt_date(d12['FechaEmbarque']))}</FechaEmbarque>\n")
+        if d12.get('NumeroEmbarque') is not None:
+            p.append(f"      <NumeroEmbarque>{xml_text(d12['NumeroEmbarque'])}</NumeroEmbarque>\n")
+        if d12.get('NumeroContenedor') is not None:
+            p.append(f"      <NumeroContenedor>{xml_text(d12['NumeroContenedor'])}</NumeroContenedor>\n")
+        if d12.get('NumeroReferencia') is not None:
+            p.append(f"      <NumeroReferencia>{xml_text(d12['NumeroReferencia'])}</NumeroReferencia>\n")
+        if d12.get('PesoBruto') is not None:
+            p.append(f"      <PesoBruto>{'%.2f' % float(d12['PesoBruto'])}</PesoBruto>\n")
+        if d12.get('PesoNeto') is not None:
+            p.append(f"      <PesoNeto>{'%.2f' % float(d12['PesoNeto'])}</PesoNeto>\n")
+        if d12.get('UnidadPesoBruto') is not None:
+            p.append(f"      <UnidadPesoBruto>{xml_text(d12['UnidadPesoBruto'])}</UnidadPesoBruto>\n")
+        if d12.get('UnidadPesoNeto') is not None:
+            p.append(f"      <UnidadPesoNeto>{xml_text(d12['UnidadPesoNeto'])}</UnidadPesoNeto>\n")
+        if d12.get('CantidadBulto') is not None:
+            p.append(f"      <CantidadBulto>{'%.2f' % float(d12['CantidadBulto'])}</CantidadBulto>\n")
+        if d12.get('UnidadBulto') is not None:
+            p.append(f"      <UnidadBulto>{xml_text(d12['UnidadBulto'])}</UnidadBulto>\n")
+        if d12.get('VolumenBulto') is not None:
+            p.append(f"      <VolumenBulto>{'%.2f' % float(d12['VolumenBulto'])}</VolumenBulto>\n")
+        if d12.get('UnidadVolumen') is not None:
+            p.append(f"      <UnidadVolumen>{xml_text(d12['UnidadVolumen'])}</UnidadVolumen>\n")
+        if len(p) == n13:
+            p[-1] = "    <InformacionesAdicionales/>\n"
+        else:
+            p.append("    </InformacionesAdicionales>\n")
+    d14 = d4.get('Transporte')
+    if d14:
+        p.append("    <Transporte>\n")
+        n15 = len(p)
+        if d14.get('Conductor') is not None:
+            p.append(f"      <Conductor>{xml_text(d14['Conductor'])}</Conductor>\n")
+        if d14.get('DocumentoTransporte') is not None:
+            p.append(f"      <DocumentoTransporte>{xml_text(d14['DocumentoTransporte'])}</DocumentoTransporte>\n")
+        if d14.get('Ficha') is not None:
+            p.append(f"      <Ficha>{xml_text(d14['Ficha'])}</Ficha>\n")
+        if d14.get('Placa') is not None:
+            p.append(f"      <Placa>{xml_text(d14['Placa'])}</Placa>\n")
+        if d14.get('RutaTransporte') is not None:
+            p.append(f"      <RutaTransporte>{xml_text(d14['RutaTransporte'])}</RutaTransporte>\n")
+        if d14.get('ZonaTransporte') is not None:
+            p.append(f"      <ZonaTransporte>{xml_text(d14['ZonaTransporte'])}</ZonaTransporte>\n")
+        if d14.get('NumeroAlbaran') is not None:
+            p.append(f"      <NumeroAlbaran>{xml_text(d14['NumeroAlbaran'])}</NumeroAlbaran>\n")
+        if len(p) == n15:
+            p[-1] = "    <Transporte/>\n"
+        else:
+            p.append("    </Transporte>\n")
+    d16 = d4.get('Totales')
+    if not d16:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d16.get('MontoGravadoTotal') is not None:
+        p.append(f"      <MontoGravadoTotal>{'%.2f' % float(d16['MontoGravadoTotal'])}</MontoGravadoTotal>\n")
+    if d16.get('MontoGravadoI1') is not None:
+        p.append(f"      <MontoGravadoI1>{'%.2f' % float(d16['MontoGravadoI1'])}</MontoGravadoI1>\n")
+    if d16.get('MontoGravadoI2') is not None:
+        p.append(f"      <MontoGravadoI2>{'%.2f' % float(d16['MontoGravadoI2'])}</MontoGravadoI2>\n")
+    if d16.get('MontoGravadoI3') is not None:
+        p.append(f"      <MontoGravadoI3>{'%.2f' % float(d16['MontoGravadoI3'])}</MontoGravadoI3>\n")
+    if d16.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d16['MontoExento'])}</MontoExento>\n")
+    if d16.get('ITBIS1') is not None:
+        p.append(f"      <ITBIS1>{xml_text(d16['ITBIS1'])}</ITBIS1>\n")
+    if d16.get('ITBIS2') is not None:
+        p.append(f"      <ITBIS2>{xml_text(d16['ITBIS2'])}</ITBIS2>\n")
+    if d16.get('ITBIS3') is not None:
+        p.append(f"      <ITBIS3>{xml_text(d16['ITBIS3'])}</ITBIS3>\n")
+    if d16.get('TotalITBIS') is not None:
+        p.append(f"      <TotalITBIS>{'%.2f' % float(d16['TotalITBIS'])}</TotalITBIS>\n")
+    if d16.get('TotalITBIS1') is not None:
+        p.append(f"      <TotalITBIS1>{'%.2f' % float(d16['TotalITBIS1'])}</TotalITBIS1>\n")
+    if d16.get('TotalITBIS2') is not None:
+        p.append(f"      <TotalITBIS2>{'%.2f' % float(d16['TotalITBIS2'])}</TotalITBIS2>\n")
+    if d16.get('TotalITBIS3') is not None:
+        p.append(f"      <TotalITBIS3>{'%.2f' % float(d16['TotalITBIS3'])}</TotalITBIS3>\n")
+    if d16.get('MontoImpuestoAdicional') is not None:
+        p.append(f"      <MontoImpuestoAdicional>{'%.2f' % float(d16['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>\n")
+    d17 = d16.get('ImpuestosAdicionales')
+    if d17:
+        p.append("      <ImpuestosAdicionales>\n")
+        n18 = len(p)
+        d19 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicional') or []
+        for d20 in (d19 if isinstance(d19, list) else (d19,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d20['TipoImpuesto'])}</TipoImpuesto>\n          <TasaImpuestoAdicional>{'%.2f' % float(d20['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>\n")
+            if d20.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d20['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>\n")
+            if d20.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d20['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>\n")
+            if d20.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"          <OtrosImpuestosAdicionales>{'%.2f' % float(d20['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>\n")
+            p.append("        </ImpuestoAdicional>\n")
+        if len(p) == n18:
+            p[-1] = "      <ImpuestosAdicionales/>\n"
+        else:
+            p.append("      </ImpuestosAdicionales>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d16['MontoTotal'])}</MontoTotal>\n")
+    if d16.get('MontoNoFacturable') is not None:
+        p.append(f"      <MontoNoFacturable>{'%.2f' % float(d16['MontoNoFacturable'])}</MontoNoFacturable>\n")
+    if d16.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d16['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d16.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d16['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d16.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d16['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d16.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d16['ValorPagar'])}</ValorPagar>\n")
+    if d16.get('TotalITBISRetenido') is not None:
+        p.append(f"      <TotalITBISRetenido>{'%.2f' % float(d16['TotalITBISRetenido'])}</TotalITBISRetenido>\n")
+    if d16.get('TotalISRRetencion') is not None:
+        p.append(f"      <TotalISRRetencion>{'%.2f' % float(d16['TotalISRRetencion'])}</TotalISRRetencion>\n")
+    if d16.get('TotalITBISPercepcion') is not None:
+        p.append(f"      <TotalITBISPercepcion>{'%.2f' % float(d16['TotalITBISPercepcion'])}</TotalITBISPercepcion>\n")
+    if d16.get('TotalISRPercepcion') is not None:
+        p.append(f"      <TotalISRPercepcion>{'%.2f' % float(d16['TotalISRPercepcion'])}</TotalISRPercepcion>\n")
+    p.append("    </Totales>\n")
+    d21 = d4.get('OtraMoneda')
+    if d21:
+        p.append("    <OtraMoneda>\n")
+        n22 = len(p)
+        if d21.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d21['TipoMoneda'])}</TipoMoneda>\n")
+        if d21.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d21['TipoCambio'])}</TipoCambio>\n")
+        if d21.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoGravadoTotalOtraMoneda>{'%.2f' % float(d21['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>\n")
+        if d21.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"      <MontoGravado1OtraMoneda>{'%.2f' % float(d21['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>\n")
+        if d21.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"      <MontoGravado2OtraMoneda>{'%.2f' % float(d21['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>\n")
+        if d21.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"      <MontoGravado3OtraMoneda>{'%.2f' % float(d21['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>\n")
+        if d21.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d21['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d21.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"      <TotalITBISOtraMoneda>{'%.2f' % float(d21['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>\n")
+        if d21.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS1OtraMoneda>{'%.2f' % float(d21['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>\n")
+        if d21.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS2OtraMoneda>{'%.2f' % float(d21['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>\n")
+        if d21.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS3OtraMoneda>{'%.2f' % float(d21['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>\n")
+        if d21.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"      <MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d21['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>\n")
+        d23 = d21.get('ImpuestosAdicionalesOtraMoneda')
+        if d23:
+            p.append("      <ImpuestosAdicionalesOtraMoneda>\n")
+            n24 = len(p)
+            d25 = d23 if isinstance(d23, list) else d23.get('ImpuestoAdicionalOtraMoneda') or []
+            for d26 in (d25 if isinstance(d25, list) else (d25,)):
+                p.append(f"        <ImpuestoAdicionalOtraMoneda>\n          <TipoImpuestoOtraMoneda>{'%03d' % int(d26['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda>\n          <TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d26['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>\n")
+                if d26.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"          <MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d26['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>\n")
+                if d26.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"          <MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d26['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>\n")
+                if d26.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"          <OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d26['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>\n")
+                p.append("        </ImpuestoAdicionalOtraMoneda>\n")
+            if len(p) == n24:
+                p[-1] = "      <ImpuestosAdicionalesOtraMoneda/>\n"
+            else:
+                p.append("      </ImpuestosAdicionalesOtraMoneda>\n")
+        if d21.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d21['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n22:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d27 = data.get('TablaCodigosItem')
+    if d27:
+        p.append("      <TablaCodigosItem>\n")
+        n28 = len(p)
+        d29 = d27 if isinstance(d27, list) else d27.get('CodigosItem') or []
+        for d30 in (d29 if isinstance(d29, list) else (d29,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d30['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d30['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n28:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n")
+    d31 = data.get('Retencion')
+    if d31:
+        p.append("      <Retencion>\n")
+        n32 = len(p)
+        if d31.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"        <IndicadorAgenteRetencionoPercepcion>{xml_text(d31['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>\n")
+        if d31.get('MontoITBISRetenido') is not None:
+            p.append(f"        <MontoITBISRetenido>{'%.2f' % float(d31['MontoITBISRetenido'])}</MontoITBISRetenido>\n")
+        if d31.get('MontoISRRetenido') is not None:
+            p.append(f"        <MontoISRRetenido>{'%.2f' % float(d31['MontoISRRetenido'])}</MontoISRRetenido>\n")
+        if len(p) == n32:
+            p[-1] = "      <Retencion/>\n"
+        else:
+            p.append("      </Retencion>\n")
+    p.append(f"      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"      <CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>\n")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"      <UnidadReferencia>{xml_text(data['UnidadReferencia'])}</UnidadReferencia>\n")
+    d33 = data.get('TablaSubcantidad')
+    if d33:
+        p.append("      <TablaSubcantidad>\n")
+        n34 = len(p)
+        d35 = d33 if isinstance(d33, list) else d33.get('SubcantidadItem') or []
+        for d36 in (d35 if isinstance(d35, list) else (d35,)):
+            p.append("        <SubcantidadItem>\n")
+            n37 = len(p)
+            if d36.get('Subcantidad') is not None:
+                p.append(f"          <Subcantidad>{'%.3f' % float(d36['Subcantidad'])}</Subcantidad>\n")
+            if d36.get('CodigoSubcantidad') is not None:
+                p.append(f"          <CodigoSubcantidad>{xml_text(d36['CodigoSubcantidad'])}</CodigoSubcantidad>\n")
+            if len(p) == n37:
+                p[-1] = "        <SubcantidadItem/>\n"
+            else:
+                p.append("        </SubcantidadItem>\n")
+        if len(p) == n34:
+            p[-1] = "      <TablaSubcantidad/>\n"
+        else:
+            p.append("      </TablaSubcantidad>\n")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"      <GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>\n")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"      <PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>\n")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"      <FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>\n")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"      <FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"      <DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>\n")
+    d38 = data.get('TablaSubDescuento')
+    if d38:
+        p.append("      <TablaSubDescuento>\n")
+        n39 = len(p)
+        d40 = d38 if isinstance(d38, list) else d38.get('SubDescuento') or []
+        for d41 in (d40 if isinstance(d40, list) else (d40,)):
+            p.append(f"        <SubDescuento>\n          <TipoSubDescuento>{xml_text(d41['TipoSubDescuento'])}</TipoSubDescuento>\n")
+            if d41.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"          <SubDescuentoPorcentaje>{'%.2f' % float(d41['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>\n")
+            if d41.get('MontoSubDescuento') is not None:
+                p.append(f"          <MontoSubDescuento>{'%.2f' % float(d41['MontoSubDescuento'])}</MontoSubDescuento>\n")
+            p.append("        </SubDescuento>\n")
+        if len(p) == n39:
+            p[-1] = "      <TablaSubDescuento/>\n"
+        else:
+            p.append("      </TablaSubDescuento>\n")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"      <RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>\n")
+    d42 = data.get('TablaSubRecargo')
+    if d42:
+        p.append("      <TablaSubRecargo>\n")
+        n43 = len(p)
+        d44 = d42 if isinstance(d42, list) else d42.get('SubRecargo') or []
+        for d45 in (d44 if isinstance(d44, list) else (d44,)):
+            p.append(f"        <SubRecargo>\n          <TipoSubRecargo>{xml_text(d45['TipoSubRecargo'])}</TipoSubRecargo>\n")
+            if d45.get('SubRecargoPorcentaje') is not None:
+                p.append(f"          <SubRecargoPorcentaje>{'%.2f' % float(d45['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>\n")
+            if d45.get('MontoSubRecargo') is not None:
+                p.append(f"          <MontoSubRecargo>{'%.2f' % float(d45['MontoSubRecargo'])}</MontoSubRecargo>\n")
+            p.append("        </SubRecargo>\n")
+        if len(p) == n43:
+            p[-1] = "      <TablaSubRecargo/>\n"
+        else:
+            p.append("      </TablaSubRecargo>\n")
+    d46 = data.get('TablaImpuestoAdicional')
+    if d46:
+        p.append("      <TablaImpuestoAdicional>\n")
+        n47 = len(p)
+        d48 = d46 if isinstance(d46, list) else d46.get('ImpuestoAdicional') or []
+        for d49 in (d48 if isinstance(d48, list) else (d48,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d49['TipoImpuesto'])}</TipoImpuesto>\n        </ImpuestoAdicional>\n")
+        if len(p) == n47:
+            p[-1] = "      <TablaImpuestoAdicional/>\n"
+        else:
+            p.append("      </TablaImpuestoAdicional>\n")
+    d50 = data.get('OtraMonedaDetalle')
+    if d50:
+        p.append("      <OtraMonedaDetalle>\n")
+        n51 = len(p)
+        if d50.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d50['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d50.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d50['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d50.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d50['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d50.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d50['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n51:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d52 = data.get('Subtotales')
+    if d52:
+        p.append("  <Subtotales>\n")
+        n53 = len(p)
+        d54 = d52 if isinstance(d52, list) else d52.get('Subtotal') or []
+        for d55 in (d54 if isinstance(d54, list) else (d54,)):
+            p.append("    <Subtotal>\n")
+            n56 = len(p)
+            if d55.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d55['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d55.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d55['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d55.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d55['Orden'])}</Orden>\n")
+            if d55.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"      <SubTotalMontoGravadoTotal>{'%.2f' % float(d55['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>\n")
+            if d55.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"      <SubTotalMontoGravadoI1>{'%.2f' % float(d55['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>\n")
+            if d55.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"      <SubTotalMontoGravadoI2>{'%.2f' % float(d55['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>\n")
+            if d55.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"      <SubTotalMontoGravadoI3>{'%.2f' % float(d55['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>\n")
+            if d55.get('SubTotaITBIS') is not None:
+                p.append(f"      <SubTotaITBIS>{'%.2f' % float(d55['SubTotaITBIS'])}</SubTotaITBIS>\n")
+            if d55.get('SubTotaITBIS1') is not None:
+                p.append(f"      <SubTotaITBIS1>{'%.2f' % float(d55['SubTotaITBIS1'])}</SubTotaITBIS1>\n")
+            if d55.get('SubTotaITBIS2') is not None:
+                p.append(f"      <SubTotaITBIS2>{'%.2f' % float(d55['SubTotaITBIS2'])}</SubTotaITBIS2>\n")
+            if d55.get('SubTotaITBIS3') is not None:
+                p.append(f"      <SubTotaITBIS3>{'%.2f' % float(d55['SubTotaITBIS3'])}</SubTotaITBIS3>\n")
+            if d55.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"      <SubTotalImpuestoAdicional>{'%.2f' % float(d55['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>\n")
+            if d55.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d55['SubTotalExento'])}</SubTotalExento>\n")
+            if d55.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d55['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d55.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d55['Lineas'])}</Lineas>\n")
+            if len(p) == n56:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n53:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    d57 = data.get('DescuentosORecargos')
+    if d57:
+        p.append("  <DescuentosORecargos>\n")
+        n58 = len(p)
+        d59 = d57 if isinstance(d57, list) else d57.get('DescuentoORecargo') or []
+        for d60 in (d59 if isinstance(d59, list) else (d59,)):
+            p.append(f"    <DescuentoORecargo>\n      <NumeroLinea>{xml_text(d60['NumeroLinea'])}</NumeroLinea>\n      <TipoAjuste>{xml_text(d60['TipoAjuste'])}</TipoAjuste>\n")
+            if d60.get('IndicadorNorma1007') is not None:
+                p.append(f"      <IndicadorNorma1007>{xml_text(d60['IndicadorNorma1007'])}</IndicadorNorma1007>\n")
+            if d60.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"      <DescripcionDescuentooRecargo>{xml_text(d60['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>\n")
+            if d60.get('TipoValor') is not None:
+                p.append(f"      <TipoValor>{xml_text(d60['TipoValor'])}</TipoValor>\n")
+            if d60.get('ValorDescuentooRecargo') is not None:
+                p.append(f"      <ValorDescuentooRecargo>{'%.2f' % float(d60['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>\n")
+            if d60.get('MontoDescuentooRecargo') is not None:
+                p.append(f"      <MontoDescuentooRecargo>{'%.2f' % float(d60['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>\n")
+            if d60.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"      <MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d60['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>\n")
+            if d60.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"      <IndicadorFacturacionDescuentooRecargo>{xml_text(d60['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>\n")
+            p.append("    </DescuentoORecargo>\n")
+        if len(p) == n58:
+            p[-1] = "  <DescuentosORecargos/>\n"
+        else:
+            p.append("  </DescuentosORecargos>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d61 = data.get('Paginacion')
+        if d61:
+            p.append("  <Paginacion>\n")
+            n62 = len(p)
+            d63 = d61 if isinstance(d61, list) else d61.get('Pagina') or []
+            for d64 in (d63 if isinstance(d63, list) else (d63,)):
+                p.append("    <Pagina>\n")
+                n65 = len(p)
+                if d64.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d64['PaginaNo'])}</PaginaNo>\n")
+                if d64.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d64['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d64.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d64['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d64.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(d64['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+                if d64.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(d64['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+                if d64.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(d64['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+                if d64.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(d64['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+                if d64.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d64['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d64.get('SubtotalItbisPagina') is not None:
+                    p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(d64['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+                if d64.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(d64['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+                if d64.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(d64['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+                if d64.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(d64['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+                if d64.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d64['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+                d66 = d64.get('SubtotalImpuestoAdicional')
+                if d66:
+                    p.append("      <SubtotalImpuestoAdicional>\n")
+                    n67 = len(p)
+                    if d66.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"        <SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d66['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>\n")
+                    if d66.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d66['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+                    if len(p) == n67:
+                        p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+                    else:
+                        p.append("      </SubtotalImpuestoAdicional>\n")
+                if d64.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d64['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if d64.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(d64['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+                if len(p) == n65:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n62:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d68 = data.get('InformacionReferencia')
+    if d68:
+        p.append("  <InformacionReferencia>\n")
+        n69 = len(p)
+        if d68.get('NCFModificado') is not None:
+            p.append(f"    <NCFModificado>{xml_text(d68['NCFModificado'])}</NCFModificado>\n")
+        if d68.get('RNCOtroContribuyente') is not None:
+            p.append(f"    <RNCOtroContribuyente>{xml_text(d68['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+        if d68.get('FechaNCFModificado') is not None:
+            p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d68['FechaNCFModificado']))}</FechaNCFModificado>\n")
+        if d68.get('CodigoModificacion') is not None:
+            p.append(f"    <CodigoModificacion>{xml_text(d68['CodigoModificacion'])}</CodigoModificacion>\n")
+        if len(p) == n69:
+            p[-1] = "  <InformacionReferencia/>\n"
+        else:
+            p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n70 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+    d71 = data.get('SubtotalImpuestoAdicional')
+    if d71:
+        p.append("      <SubtotalImpuestoAdicional>\n")
+        n72 = len(p)
+        if d71.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"        <SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d71['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>\n")
+        if d71.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d71['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+        if len(p) == n72:
+            p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+        else:
+            p.append("      </SubtotalImpuestoAdicional>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+    if len(p) == n70:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos><TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("<TablaFormasPago>")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"<FormaDePago><FormaPago>{xml_text(d9['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago></FormaDePago>")
+        if len(p) == n7:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d5.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision></Emisor>")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Comprador'")
+    p.append(f"<Comprador><RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador><RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d11.get('FechaEntrega') is not None:
+        p.append(f"<FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>")
+    if d11.get('ContactoEntrega') is not None:
+        p.append(f"<ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>")
+    if d11.get('DireccionEntrega') is not None:
+        p.append(f"<DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>")
+    if d11.get('TelefonoAdicional') is not None:
+        p.append(f"<TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>")
+    if d11.get('FechaOrdenCompra') is not None:
+        p.append(f"<FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>")
+    if d11.get('NumeroOrdenCompra') is not None:
+        p.append(f"<NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d12 = d4.get('InformacionesAdicionales')
+    if d12:
+        p.append("<InformacionesAdicionales>")
+        n13 = len(p)
+        if d12.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{xml_text(fmt_date(d12['FechaEmbarque']))}</FechaEmbarque>")
+        if d12.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{xml_text(d12['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d12.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{xml_text(d12['NumeroContenedor'])}</NumeroContenedor>")
+        if d12.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{xml_text(d12['NumeroReferencia'])}</NumeroReferencia>")
+        if d12.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d12['PesoBruto'])}</PesoBruto>")
+        if d12.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d12['PesoNeto'])}</PesoNeto>")
+        if d12.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{xml_text(d12['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d12.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{xml_text(d12['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d12.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d12['CantidadBulto'])}</CantidadBulto>")
+        if d12.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{xml_text(d12['UnidadBulto'])}</UnidadBulto>")
+        if d12.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d12['VolumenBulto'])}</VolumenBulto>")
+        if d12.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{xml_text(d12['UnidadVolumen'])}</UnidadVolumen>")
+        if len(p) == n13:
+            p[-1] = "<InformacionesAdicionales/>"
+        else:
+            p.append("</InformacionesAdicionales>")
+    d14 = d4.get('Transporte')
+    if d14:
+        p.append("<Transporte>")
+        n15 = len(p)
+        if d14.get('Conductor') is not None:
+            p.append(f"<Conductor>{xml_text(d14['Conductor'])}</Conductor>")
+        if d14.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{xml_text(d14['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d14.get('Ficha') is not None:
+            p.append(f"<Ficha>{xml_text(d14['Ficha'])}</Ficha>")
+        if d14.get('Placa') is not None:
+            p.append(f"<Placa>{xml_text(d14['Placa'])}</Placa>")
+        if d14.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{xml_text(d14['RutaTransporte'])}</RutaTransporte>")
+        if d14.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{xml_text(d14['ZonaTransporte'])}</ZonaTransporte>")
+        if d14.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{xml_text(d14['NumeroAlbaran'])}</NumeroAlbaran>")
+        if len(p) == n15:
+            p[-1] = "<Transporte/>"
+        else:
+            p.append("</Transporte>")
+    d16 = d4.get('Totales')
+    if not d16:
+        raise ValueError("El e-CF tipo 31 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d16.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d16['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d16.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d16['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d16.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d16['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d16.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d16['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d16.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d16['MontoExento'])}</MontoExento>")
+    if d16.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{xml_text(d16['ITBIS1'])}</ITBIS1>")
+    if d16.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{xml_text(d16['ITBIS2'])}</ITBIS2>")
+    if d16.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{xml_text(d16['ITBIS3'])}</ITBIS3>")
+    if d16.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d16['TotalITBIS'])}</TotalITBIS>")
+    if d16.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d16['TotalITBIS1'])}</TotalITBIS1>")
+    if d16.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d16['TotalITBIS2'])}</TotalITBIS2>")
+    if d16.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d16['TotalITBIS3'])}</TotalITBIS3>")
+    if d16.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d16['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d17 = d16.get('ImpuestosAdicionales')
+    if d17:
+        p.append("<ImpuestosAdicionales>")
+        n18 = len(p)
+        d19 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicional') or []
+        for d20 in (d19 if isinstance(d19, list) else (d19,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d20['TipoImpuesto'])}</TipoImpuesto><TasaImpuestoAdicional>{'%.2f' % float(d20['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>")
+            if d20.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d20['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d20.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d20['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d20.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d20['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            p.append("</ImpuestoAdicional>")
+        if len(p) == n18:
+            p[-1] = "<ImpuestosAdicionales/>"
+        else:
+            p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d16['MontoTotal'])}</MontoTotal>")
+    if d16.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d16['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d16.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d16['MontoPeriodo'])}</MontoPeriodo>")
+    if d16.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d16['SaldoAnterior'])}</SaldoAnterior>")
+    if d16.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d16['MontoAvancePago'])}</MontoAvancePago>")
+    if d16.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d16['ValorPagar'])}</ValorPagar>")
+    if d16.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d16['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d16.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d16['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d16.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d16['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d16.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d16['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d21 = d4.get('OtraMoneda')
+    if d21:
+        p.append("<OtraMoneda>")
+        n22 = len(p)
+        if d21.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d21['TipoMoneda'])}</TipoMoneda>")
+        if d21.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d21['TipoCambio'])}</TipoCambio>")
+        if d21.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d21['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d21.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d21['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d21.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d21['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d21.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d21['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d21.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d21['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d21.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d21['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d21.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d21['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d21.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d21['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d21.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d21['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d21.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d21['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d23 = d21.get('ImpuestosAdicionalesOtraMoneda')
+        if d23:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            n24 = len(p)
+            d25 = d23 if isinstance(d23, list) else d23.get('ImpuestoAdicionalOtraMoneda') or []
+            for d26 in (d25 if isinstance(d25, list) else (d25,)):
+                p.append(f"<ImpuestoAdicionalOtraMoneda><TipoImpuestoOtraMoneda>{'%03d' % int(d26['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda><TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d26['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d26.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d26['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>")
+                if d26.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d26['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>")
+                if d26.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d26['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            if len(p) == n24:
+                p[-1] = "<ImpuestosAdicionalesOtraMoneda/>"
+            else:
+                p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d21.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d21['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n22:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d27 = data.get('TablaCodigosItem')
+    if d27:
+        p.append("<TablaCodigosItem>")
+        n28 = len(p)
+        d29 = d27 if isinstance(d27, list) else d27.get('CodigosItem') or []
+        for d30 in (d29 if isinstance(d29, list) else (d29,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d30['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d30['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n28:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d31 = data.get('Retencion')
+    if d31:
+        p.append("<Retencion>")
+        n32 = len(p)
+        if d31.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"<IndicadorAgenteRetencionoPercepcion>{xml_text(d31['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+        if d31.get('MontoITBISRetenido') is not None:
+            p.append(f"<MontoITBISRetenido>{'%.2f' % float(d31['MontoITBISRetenido'])}</MontoITBISRetenido>")
+        if d31.get('MontoISRRetenido') is not None:
+            p.append(f"<MontoISRRetenido>{'%.2f' % float(d31['MontoISRRetenido'])}</MontoISRRetenido>")
+        if len(p) == n32:
+            p[-1] = "<Retencion/>"
+        else:
+            p.append("</Retencion>")
+    p.append(f"<NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"<CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"<UnidadReferencia>{xml_text(data['UnidadReferencia'])}</UnidadReferencia>")
+    d33 = data.get('TablaSubcantidad')
+    if d33:
+        p.append("<TablaSubcantidad>")
+        n34 = len(p)
+        d35 = d33 if isinstance(d33, list) else d33.get('SubcantidadItem') or []
+        for d36 in (d35 if isinstance(d35, list) else (d35,)):
+            p.append("<SubcantidadItem>")
+            n37 = len(p)
+            if d36.get('Subcantidad') is not None:
+                p.append(f"<Subcantidad>{'%.3f' % float(d36['Subcantidad'])}</Subcantidad>")
+            if d36.get('CodigoSubcantidad') is not None:
+                p.append(f"<CodigoSubcantidad>{xml_text(d36['CodigoSubcantidad'])}</CodigoSubcantidad>")
+            if len(p) == n37:
+                p[-1] = "<SubcantidadItem/>"
+            else:
+                p.append("</SubcantidadItem>")
+        if len(p) == n34:
+            p[-1] = "<TablaSubcantidad/>"
+        else:
+            p.append("</TablaSubcantidad>")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"<GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"<PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d38 = data.get('TablaSubDescuento')
+    if d38:
+        p.append("<TablaSubDescuento>")
+        n39 = len(p)
+        d40 = d38 if isinstance(d38, list) else d38.get('SubDescuento') or []
+        for d41 in (d40 if isinstance(d40, list) else (d40,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{xml_text(d41['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d41.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d41['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d41.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d41['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        if len(p) == n39:
+            p[-1] = "<TablaSubDescuento/>"
+        else:
+            p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d42 = data.get('TablaSubRecargo')
+    if d42:
+        p.append("<TablaSubRecargo>")
+        n43 = len(p)
+        d44 = d42 if isinstance(d42, list) else d42.get('SubRecargo') or []
+        for d45 in (d44 if isinstance(d44, list) else (d44,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{xml_text(d45['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d45.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d45['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d45.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d45['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        if len(p) == n43:
+            p[-1] = "<TablaSubRecargo/>"
+        else:
+            p.append("</TablaSubRecargo>")
+    d46 = data.get('TablaImpuestoAdicional')
+    if d46:
+        p.append("<TablaImpuestoAdicional>")
+        n47 = len(p)
+        d48 = d46 if isinstance(d46, list) else d46.get('ImpuestoAdicional') or []
+        for d49 in (d48 if isinstance(d48, list) else (d48,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d49['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        if len(p) == n47:
+            p[-1] = "<TablaImpuestoAdicional/>"
+        else:
+            p.append("</TablaImpuestoAdicional>")
+    d50 = data.get('OtraMonedaDetalle')
+    if d50:
+        p.append("<OtraMonedaDetalle>")
+        n51 = len(p)
+        if d50.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d50['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d50.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d50['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d50.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d50['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d50.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d50['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n51:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d52 = data.get('Subtotales')
+    if d52:
+        p.append("<Subtotales>")
+        n53 = len(p)
+        d54 = d52 if isinstance(d52, list) else d52.get('Subtotal') or []
+        for d55 in (d54 if isinstance(d54, list) else (d54,)):
+            p.append("<Subtotal>")
+            n56 = len(p)
+            if d55.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d55['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d55.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d55['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d55.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d55['Orden'])}</Orden>")
+            if d55.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d55['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d55.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d55['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d55.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d55['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d55.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d55['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d55.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d55['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d55.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d55['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d55.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d55['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d55.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d55['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d55.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d55['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d55.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d55['SubTotalExento'])}</SubTotalExento>")
+            if d55.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d55['MontoSubTotal'])}</MontoSubTotal>")
+            if d55.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d55['Lineas'])}</Lineas>")
+            if len(p) == n56:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n53:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    d57 = data.get('DescuentosORecargos')
+    if d57:
+        p.append("<DescuentosORecargos>")
+        n58 = len(p)
+        d59 = d57 if isinstance(d57, list) else d57.get('DescuentoORecargo') or []
+        for d60 in (d59 if isinstance(d59, list) else (d59,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{xml_text(d60['NumeroLinea'])}</NumeroLinea><TipoAjuste>{xml_text(d60['TipoAjuste'])}</TipoAjuste>")
+            if d60.get('IndicadorNorma1007') is not None:
+                p.append(f"<IndicadorNorma1007>{xml_text(d60['IndicadorNorma1007'])}</IndicadorNorma1007>")
+            if d60.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{xml_text(d60['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d60.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{xml_text(d60['TipoValor'])}</TipoValor>")
+            if d60.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d60['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d60.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d60['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d60.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d60['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d60.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{xml_text(d60['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        if len(p) == n58:
+            p[-1] = "<DescuentosORecargos/>"
+        else:
+            p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d61 = data.get('Paginacion')
+        if d61:
+            p.append("<Paginacion>")
+            n62 = len(p)
+            d63 = d61 if isinstance(d61, list) else d61.get('Pagina') or []
+            for d64 in (d63 if isinstance(d63, list) else (d63,)):
+                p.append("<Pagina>")
+                n65 = len(p)
+                if d64.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d64['PaginaNo'])}</PaginaNo>")
+                if d64.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d64['NoLineaDesde'])}</NoLineaDesde>")
+                if d64.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d64['NoLineaHasta'])}</NoLineaHasta>")
+                if d64.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d64['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d64.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d64['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d64.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d64['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d64.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d64['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d64.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d64['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d64.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d64['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d64.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d64['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d64.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d64['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d64.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d64['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d64.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d64['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d66 = d64.get('SubtotalImpuestoAdicional')
+                if d66:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    n67 = len(p)
+                    if d66.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d66['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+                    if d66.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d66['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    if len(p) == n67:
+                        p[-1] = "<SubtotalImpuestoAdicional/>"
+                    else:
+                        p.append("</SubtotalImpuestoAdicional>")
+                if d64.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d64['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d64.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d64['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                if len(p) == n65:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n62:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d68 = data.get('InformacionReferencia')
+    if d68:
+        p.append("<InformacionReferencia>")
+        n69 = len(p)
+        if d68.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{xml_text(d68['NCFModificado'])}</NCFModificado>")
+        if d68.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{xml_text(d68['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d68.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d68['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d68.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{xml_text(d68['CodigoModificacion'])}</CodigoModificacion>")
+        if len(p) == n69:
+            p[-1] = "<InformacionReferencia/>"
+        else:
+            p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n70 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d71 = data.get('SubtotalImpuestoAdicional')
+    if d71:
+        p.append("<SubtotalImpuestoAdicional>")
+        n72 = len(p)
+        if d71.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d71['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+        if d71.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d71['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        if len(p) == n72:
+            p[-1] = "<SubtotalImpuestoAdicional/>"
+        else:
+            p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    if len(p) == n70:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
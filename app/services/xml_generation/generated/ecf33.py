@@ -0,0 +1,2003 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 33 v.1.0.xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 33
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{esc(d4['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d4.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{esc(d4['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d4.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{esc(d4['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d4['TipoIngresos'])}</TipoIngresos><TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{esc(d4['TerminoPago'])}</TerminoPago>")
+    d5 = d4.get('TablaFormasPago')
+    if d5:
+        p.append("<TablaFormasPago>")
+        d6 = d5 if isinstance(d5, list) else d5.get('FormaDePago') or []
+        for d7 in (d6 if isinstance(d6, list) else (d6,)):
+            p.append(f"<FormaDePago><FormaPago>{esc(d7['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d7['MontoPago'])}</MontoPago></FormaDePago>")
+        p.append("</TablaFormasPago>")
+    if d4.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{esc(d4['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d4.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{esc(d4['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d4.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{esc(d4['BancoPago'])}</BancoPago>")
+    if d4.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{esc(fmt_date(d4['FechaDesde']))}</FechaDesde>")
+    if d4.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{esc(fmt_date(d4['FechaHasta']))}</FechaHasta>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d8 = d3.get('Emisor')
+    if not d8:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d8))
+    if d8.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{esc(d8['CodigoVendedor'])}</CodigoVendedor>")
+    if d8.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d8['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d8.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d8['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d8.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{esc(d8['ZonaVenta'])}</ZonaVenta>")
+    if d8.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{esc(d8['RutaVenta'])}</RutaVenta>")
+    if d8.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d8['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d3.get('Comprador')
+    if d9:
+        p.append("<Comprador>")
+        if d9.get('RNCComprador') is not None:
+            p.append(f"<RNCComprador>{esc(d9['RNCComprador'])}</RNCComprador>")
+        if d9.get('IdentificadorExtranjero') is not None:
+            p.append(f"<IdentificadorExtranjero>{esc(d9['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+        if d9.get('RazonSocialComprador') is not None:
+            p.append(f"<RazonSocialComprador>{esc(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+        if d9.get('ContactoComprador') is not None:
+            p.append(f"<ContactoComprador>{esc(d9['ContactoComprador'])}</ContactoComprador>")
+        if d9.get('CorreoComprador') is not None:
+            p.append(f"<CorreoComprador>{esc(d9['CorreoComprador'])}</CorreoComprador>")
+        if d9.get('DireccionComprador') is not None:
+            p.append(f"<DireccionComprador>{esc(d9['DireccionComprador'])}</DireccionComprador>")
+        if d9.get('MunicipioComprador') is not None:
+            p.append(f"<MunicipioComprador>{'%06d' % int(d9['MunicipioComprador'])}</MunicipioComprador>")
+        if d9.get('ProvinciaComprador') is not None:
+            p.append(f"<ProvinciaComprador>{'%06d' % int(d9['ProvinciaComprador'])}</ProvinciaComprador>")
+        if d9.get('FechaEntrega') is not None:
+            p.append(f"<FechaEntrega>{esc(fmt_date(d9['FechaEntrega']))}</FechaEntrega>")
+        if d9.get('ContactoEntrega') is not None:
+            p.append(f"<ContactoEntrega>{esc(d9['ContactoEntrega'])}</ContactoEntrega>")
+        if d9.get('DireccionEntrega') is not None:
+            p.append(f"<DireccionEntrega>{esc(d9['DireccionEntrega'])}</DireccionEntrega>")
+        if d9.get('TelefonoAdicional') is not None:
+            p.append(f"<TelefonoAdicional>{esc(d9['TelefonoAdicional'])}</TelefonoAdicional>")
+        if d9.get('FechaOrdenCompra') is not None:
+            p.append(f"<FechaOrdenCompra>{esc(fmt_date(d9['FechaOrdenCompra']))}</FechaOrdenCompra>")
+        if d9.get('NumeroOrdenCompra') is not None:
+            p.append(f"<NumeroOrdenCompra>{esc(d9['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+        if d9.get('CodigoInternoComprador') is not None:
+            p.append(f"<CodigoInternoComprador>{esc(d9['CodigoInternoComprador'])}</CodigoInternoComprador>")
+        if d9.get('ResponsablePago') is not None:
+            p.append(f"<ResponsablePago>{esc(d9['ResponsablePago'])}</ResponsablePago>")
+        if d9.get('InformacionAdicionalComprador') is not None:
+            p.append(f"<InformacionAdicionalComprador>{esc(d9['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+        p.append("</Comprador>")
+    d10 = d3.get('InformacionesAdicionales')
+    if d10:
+        p.append("<InformacionesAdicionales>")
+        if d10.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{esc(fmt_date(d10['FechaEmbarque']))}</FechaEmbarque>")
+        if d10.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{esc(d10['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d10.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{esc(d10['NumeroContenedor'])}</NumeroContenedor>")
+        if d10.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{esc(d10['NumeroReferencia'])}</NumeroReferencia>")
+        if d10.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d10['PesoBruto'])}</PesoBruto>")
+        if d10.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d10['PesoNeto'])}</PesoNeto>")
+        if d10.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{esc(d10['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d10.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{esc(d10['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d10.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d10['CantidadBulto'])}</CantidadBulto>")
+        if d10.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{esc(d10['UnidadBulto'])}</UnidadBulto>")
+        if d10.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d10['VolumenBulto'])}</VolumenBulto>")
+        if d10.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{esc(d10['UnidadVolumen'])}</UnidadVolumen>")
+        p.append("</InformacionesAdicionales>")
+    d11 = d3.get('Transporte')
+    if d11:
+        p.append("<Transporte>")
+        if d11.get('Conductor') is not None:
+            p.append(f"<Conductor>{esc(d11['Conductor'])}</Conductor>")
+        if d11.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{esc(d11['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d11.get('Ficha') is not None:
+            p.append(f"<Ficha>{esc(d11['Ficha'])}</Ficha>")
+        if d11.get('Placa') is not None:
+            p.append(f"<Placa>{esc(d11['Placa'])}</Placa>")
+        if d11.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{esc(d11['RutaTransporte'])}</RutaTransporte>")
+        if d11.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{esc(d11['ZonaTransporte'])}</ZonaTransporte>")
+        if d11.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{esc(d11['NumeroAlbaran'])}</NumeroAlbaran>")
+        p.append("</Transporte>")
+    d12 = d3.get('Totales')
+    if not d12:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d12.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d12['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d12.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d12['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d12.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d12['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d12.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d12['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d12.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d12['MontoExento'])}</MontoExento>")
+    if d12.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{esc(d12['ITBIS1'])}</ITBIS1>")
+    if d12.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{esc(d12['ITBIS2'])}</ITBIS2>")
+    if d12.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{esc(d12['ITBIS3'])}</ITBIS3>")
+    if d12.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d12['TotalITBIS'])}</TotalITBIS>")
+    if d12.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d12['TotalITBIS1'])}</TotalITBIS1>")
+    if d12.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d12['TotalITBIS2'])}</TotalITBIS2>")
+    if d12.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d12['TotalITBIS3'])}</TotalITBIS3>")
+    if d12.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d12['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d13 = d12.get('ImpuestosAdicionales')
+    if d13:
+        p.append("<ImpuestosAdicionales>")
+        d14 = d13 if isinstance(d13, list) else d13.get('ImpuestoAdicional') or []
+        for d15 in (d14 if isinstance(d14, list) else (d14,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d15['TipoImpuesto'])}</TipoImpuesto><TasaImpuestoAdicional>{'%.2f' % float(d15['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>")
+            if d15.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d15.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d15.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d15['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            p.append("</ImpuestoAdicional>")
+        p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d12['MontoTotal'])}</MontoTotal>")
+    if d12.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d12['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d12.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d12['MontoPeriodo'])}</MontoPeriodo>")
+    if d12.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d12['SaldoAnterior'])}</SaldoAnterior>")
+    if d12.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d12['MontoAvancePago'])}</MontoAvancePago>")
+    if d12.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d12['ValorPagar'])}</ValorPagar>")
+    if d12.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d12['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d12.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d12['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d12.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d12['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d12.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d12['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d16 = d3.get('OtraMoneda')
+    if d16:
+        p.append("<OtraMoneda>")
+        if d16.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d16['TipoMoneda'])}</TipoMoneda>")
+        if d16.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d16['TipoCambio'])}</TipoCambio>")
+        if d16.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d16['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d16.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d16['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d16.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d16['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d16.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d16['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d16.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d16['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d16.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d16['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d16.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d16['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d16.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d16['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d16.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d16['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d16.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d16['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d17 = d16.get('ImpuestosAdicionalesOtraMoneda')
+        if d17:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            d18 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicionalOtraMoneda') or []
+            for d19 in (d18 if isinstance(d18, list) else (d18,)):
+                p.append(f"<ImpuestoAdicionalOtraMoneda><TipoImpuestoOtraMoneda>{'%03d' % int(d19['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda><TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d19['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d19.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d19['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>")
+                if d19.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d19['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>")
+                if d19.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d19['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d16.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d16['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d20 = data.get('TablaCodigosItem')
+    if d20:
+        p.append("<TablaCodigosItem>")
+        d21 = d20 if isinstance(d20, list) else d20.get('CodigosItem') or []
+        for d22 in (d21 if isinstance(d21, list) else (d21,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d22['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d22['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d23 = data.get('Retencion')
+    if d23:
+        p.append("<Retencion>")
+        if d23.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"<IndicadorAgenteRetencionoPercepcion>{esc(d23['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+        if d23.get('MontoITBISRetenido') is not None:
+            p.append(f"<MontoITBISRetenido>{'%.2f' % float(d23['MontoITBISRetenido'])}</MontoITBISRetenido>")
+        if d23.get('MontoISRRetenido') is not None:
+            p.append(f"<MontoISRRetenido>{'%.2f' % float(d23['MontoISRRetenido'])}</MontoISRRetenido>")
+        p.append("</Retencion>")
+    p.append(f"<NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"<CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"<UnidadReferencia>{esc(data['UnidadReferencia'])}</UnidadReferencia>")
+    d24 = data.get('TablaSubcantidad')
+    if d24:
+        p.append("<TablaSubcantidad>")
+        d25 = d24 if isinstance(d24, list) else d24.get('SubcantidadItem') or []
+        for d26 in (d25 if isinstance(d25, list) else (d25,)):
+            p.append("<SubcantidadItem>")
+            if d26.get('Subcantidad') is not None:
+                p.append(f"<Subcantidad>{'%.3f' % float(d26['Subcantidad'])}</Subcantidad>")
+            if d26.get('CodigoSubcantidad') is not None:
+                p.append(f"<CodigoSubcantidad>{esc(d26['CodigoSubcantidad'])}</CodigoSubcantidad>")
+            p.append("</SubcantidadItem>")
+        p.append("</TablaSubcantidad>")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"<GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"<PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{esc(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{esc(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    d27 = data.get('Mineria')
+    if d27:
+        p.append("<Mineria>")
+        if d27.get('PesoNetoKilogramo') is not None:
+            p.append(f"<PesoNetoKilogramo>{'%.3f' % float(d27['PesoNetoKilogramo'])}</PesoNetoKilogramo>")
+        if d27.get('PesoNetoMineria') is not None:
+            p.append(f"<PesoNetoMineria>{'%.3f' % float(d27['PesoNetoMineria'])}</PesoNetoMineria>")
+        if d27.get('TipoAfiliacion') is not None:
+            p.append(f"<TipoAfiliacion>{esc(d27['TipoAfiliacion'])}</TipoAfiliacion>")
+        if d27.get('Liquidacion') is not None:
+            p.append(f"<Liquidacion>{esc(d27['Liquidacion'])}</Liquidacion>")
+        p.append("</Mineria>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d28 = data.get('TablaSubDescuento')
+    if d28:
+        p.append("<TablaSubDescuento>")
+        d29 = d28 if isinstance(d28, list) else d28.get('SubDescuento') or []
+        for d30 in (d29 if isinstance(d29, list) else (d29,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{esc(d30['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d30.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d30['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d30.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d30['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d31 = data.get('TablaSubRecargo')
+    if d31:
+        p.append("<TablaSubRecargo>")
+        d32 = d31 if isinstance(d31, list) else d31.get('SubRecargo') or []
+        for d33 in (d32 if isinstance(d32, list) else (d32,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{esc(d33['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d33.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d33['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d33.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d33['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        p.append("</TablaSubRecargo>")
+    d34 = data.get('TablaImpuestoAdicional')
+    if d34:
+        p.append("<TablaImpuestoAdicional>")
+        d35 = d34 if isinstance(d34, list) else d34.get('ImpuestoAdicional') or []
+        for d36 in (d35 if isinstance(d35, list) else (d35,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d36['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        p.append("</TablaImpuestoAdicional>")
+    d37 = data.get('OtraMonedaDetalle')
+    if d37:
+        p.append("<OtraMonedaDetalle>")
+        if d37.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d37['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d37.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d37['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d37.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d37['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d37.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d37['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d38 = data.get('Subtotales')
+    if d38:
+        p.append("<Subtotales>")
+        d39 = d38 if isinstance(d38, list) else d38.get('Subtotal') or []
+        for d40 in (d39 if isinstance(d39, list) else (d39,)):
+            p.append("<Subtotal>")
+            if d40.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d40['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d40.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d40['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d40.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d40['Orden'])}</Orden>")
+            if d40.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d40['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d40.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d40['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d40.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d40['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d40.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d40['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d40.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d40['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d40.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d40['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d40.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d40['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d40.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d40['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d40.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d40['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d40.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d40['SubTotalExento'])}</SubTotalExento>")
+            if d40.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d40['MontoSubTotal'])}</MontoSubTotal>")
+            if d40.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d40['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    d41 = data.get('DescuentosORecargos')
+    if d41:
+        p.append("<DescuentosORecargos>")
+        d42 = d41 if isinstance(d41, list) else d41.get('DescuentoORecargo') or []
+        for d43 in (d42 if isinstance(d42, list) else (d42,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{esc(d43['NumeroLinea'])}</NumeroLinea><TipoAjuste>{esc(d43['TipoAjuste'])}</TipoAjuste>")
+            if d43.get('IndicadorNorma1007') is not None:
+                p.append(f"<IndicadorNorma1007>{esc(d43['IndicadorNorma1007'])}</IndicadorNorma1007>")
+            if d43.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{esc(d43['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d43.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{esc(d43['TipoValor'])}</TipoValor>")
+            if d43.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d43['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d43.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d43['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d43.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d43['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d43.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{esc(d43['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d44 = data.get('Paginacion')
+        if d44:
+            p.append("<Paginacion>")
+            d45 = d44 if isinstance(d44, list) else d44.get('Pagina') or []
+            for d46 in (d45 if isinstance(d45, list) else (d45,)):
+                p.append("<Pagina>")
+                if d46.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d46['PaginaNo'])}</PaginaNo>")
+                if d46.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d46['NoLineaDesde'])}</NoLineaDesde>")
+                if d46.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d46['NoLineaHasta'])}</NoLineaHasta>")
+                if d46.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d46['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d46.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d46['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d46.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d46['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d46.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d46['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d46.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d46['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d46.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d46['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d46.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d46['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d46.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d46['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d46.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d46['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d46.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d46['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d47 = d46.get('SubtotalImpuestoAdicional')
+                if d47:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    if d47.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d47['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+                    if d47.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d47['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    p.append("</SubtotalImpuestoAdicional>")
+                if d46.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d46['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d46.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d46['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d48 = data.get('InformacionReferencia')
+    if not d48:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'InformacionReferencia'")
+    p.append(f"<InformacionReferencia><NCFModificado>{esc(d48['NCFModificado'])}</NCFModificado>")
+    if d48.get('RNCOtroContribuyente') is not None:
+        p.append(f"<RNCOtroContribuyente>{esc(d48['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+    p.append(f"<FechaNCFModificado>{esc(fmt_date(d48['FechaNCFModificado']))}</FechaNCFModificado><CodigoModificacion>{esc(d48['CodigoModificacion'])}</CodigoModificacion>")
+    if d48.get('RazonModificacion') is not None:
+        p.append(f"<RazonModificacion>{esc(d48['RazonModificacion'])}</RazonModificacion>")
+    p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d49 = data.get('SubtotalImpuestoAdicional')
+    if d49:
+        p.append("<SubtotalImpuestoAdicional>")
+        if d49.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d49['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+        if d49.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d49['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"      <IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>\n")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"      <IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>\n")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"      <IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>\n")
+    p.append(f"      <TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos>\n      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"      <TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>\n")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("      <TablaFormasPago>\n")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"        <FormaDePago>\n          <FormaPago>{xml_text(d9['FormaPago'])}</FormaPago>\n          <MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago>\n        </FormaDePago>\n")
+        if len(p) == n7:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"      <TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>\n")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"      <NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>\n")
+    if d5.get('BancoPago') is not None:
+        p.append(f"      <BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>\n")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"      <FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>\n")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"      <FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"      <CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>\n")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"      <ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>\n")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"      <RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>\n")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d11 = d4.get('Comprador')
+    if d11:
+        p.append("    <Comprador>\n")
+        n12 = len(p)
+        if d11.get('RNCComprador') is not None:
+            p.append(f"      <RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>\n")
+        if d11.get('IdentificadorExtranjero') is not None:
+            p.append(f"      <IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>\n")
+        if d11.get('RazonSocialComprador') is not None:
+            p.append(f"      <RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>\n")
+        if d11.get('ContactoComprador') is not None:
+            p.append(f"      <ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>\n")
+        if d11.get('CorreoComprador') is not None:
+            p.append(f"      <CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>\n")
+        if d11.get('DireccionComprador') is not None:
+            p.append(f"      <DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>\n")
+        if d11.get('MunicipioComprador') is not None:
+            p.append(f"      <MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>\n")
+        if d11.get('ProvinciaComprador') is not None:
+            p.append(f"      <ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>\n")
+        if d11.get('FechaEntrega') is not None:
+            p.append(f"      <FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>\n")
+        if d11.get('ContactoEntrega') is not None:
+            p.append(f"      <ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>\n")
+        if d11.get('DireccionEntrega') is not None:
+            p.append(f"      <DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>\n")
+        if d11.get('TelefonoAdicional') is not None:
+            p.append(f"      <TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>\n")
+        if d11.get('FechaOrdenCompra') is not None:
+            p.append(f"      <FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>\n")
+        if d11.get('NumeroOrdenCompra') is not None:
+            p.append(f"      <NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>\n")
+        if d11.get('CodigoInternoComprador') is not None:
+            p.append(f"      <CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>\n")
+        if d11.get('ResponsablePago') is not None:
+            p.append(f"      <ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>\n")
+        if d11.get('InformacionAdicionalComprador') is not None:
+            p.append(f"      <InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>\n")
+        if len(p) == n12:
+            p[-1] = "    <Comprador/>\n"
+        else:
+            p.append("    </Comprador>\n")
+    d13 = d4.get('InformacionesAdicionales')
+    if d13:
+        p.append("    <InformacionesAdicionales>\n")
+        n14 = len(p)
+        if d13.get('FechaEmbarque') is not None:
+            p.append(f"      <FechaEmbarque>{xml_text(fmt_date(d13['FechaEmbarque']))}</FechaEmbarque>\n")
+        if d13.get('NumeroEmbarque') is not None:
+            p.append(f"      <NumeroEmbarque>{xml_text(d13['NumeroEmbarque'])}</NumeroEmbarque>\n")
+        if d13.get('NumeroContenedor') is not None:
+            p.append(f"      <NumeroContenedor>{xml_text(d13['NumeroContenedor'])}</NumeroContenedor>\n")
+        if d13.get('NumeroReferencia') is not None:
+            p.append(f"      <NumeroReferencia>{xml_text(d13['NumeroReferencia'])}</NumeroReferencia>\n")
+        if d13.get('PesoBruto') is not None:
+            p.append(f"      <PesoBruto>{'%.2f' % float(d13['PesoBruto'])}</PesoBruto>\n")
+        if d13.get('PesoNeto') is not None:
+            p.append(f"      <PesoNeto>{'%.2f' % float(d13['PesoNeto'])}</PesoNeto>\n")
+        if d13.get('UnidadPesoBruto') is not None:
+            p.append(f"      <UnidadPesoBruto>{xml_text(d13['UnidadPesoBruto'])}</UnidadPesoBruto>\n")
+        if d13.get('UnidadPesoNeto') is not None:
+            p.append(f"      <UnidadPesoNeto>{xml_text(d13['UnidadPesoNeto'])}</UnidadPesoNeto>\n")
+        if d13.get('CantidadBulto') is not None:
+            p.append(f"      <CantidadBulto>{'%.2f' % float(d13['CantidadBulto'])}</CantidadBulto>\n")
+        if d13.get('UnidadBulto') is not None:
+            p.append(f"      <UnidadBulto>{xml_text(d13['UnidadBulto'])}</UnidadBulto>\n")
+        if d13.get('VolumenBulto') is not None:
+            p.append(f"      <VolumenBulto>{'%.2f' % float(d13['VolumenBulto'])}</VolumenBulto>\n")
+        if d13.get('UnidadVolumen') is not None:
+            p.append(f"      <UnidadVolumen>{xml_text(d13['UnidadVolumen'])}</UnidadVolumen>\n")
+        if len(p) == n14:
+            p[-1] = "    <InformacionesAdicionales/>\n"
+        else:
+            p.append("    </InformacionesAdicionales>\n")
+    d15 = d4.get('Transporte')
+    if d15:
+        p.append("    <Transporte>\n")
+        n16 = len(p)
+        if d15.get('Conductor') is not None:
+            p.append(f"      <Conductor>{xml_text(d15['Conductor'])}</Conductor>\n")
+        if d15.get('DocumentoTransporte') is not None:
+            p.append(f"      <DocumentoTransporte>{xml_text(d15['DocumentoTransporte'])}</DocumentoTransporte>\n")
+        if d15.get('Ficha') is not None:
+            p.append(f"      <Ficha>{xml_text(d15['Ficha'])}</Ficha>\n")
+        if d15.get('Placa') is not None:
+            p.append(f"      <Placa>{xml_text(d15['Placa'])}</Placa>\n")
+        if d15.get('RutaTransporte') is not None:
+            p.append(f"      <RutaTransporte>{xml_text(d15['RutaTransporte'])}</RutaTransporte>\n")
+        if d15.get('ZonaTransporte') is not None:
+            p.append(f"      <ZonaTransporte>{xml_text(d15['ZonaTransporte'])}</ZonaTransporte>\n")
+        if d15.get('NumeroAlbaran') is not None:
+            p.append(f"      <NumeroAlbaran>{xml_text(d15['NumeroAlbaran'])}</NumeroAlbaran>\n")
+        if len(p) == n16:
+            p[-1] = "    <Transporte/>\n"
+        else:
+            p.append("    </Transporte>\n")
+    d17 = d4.get('Totales')
+    if not d17:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d17.get('MontoGravadoTotal') is not None:
+        p.append(f"      <MontoGravadoTotal>{'%.2f' % float(d17['MontoGravadoTotal'])}</MontoGravadoTotal>\n")
+    if d17.get('MontoGravadoI1') is not None:
+        p.append(f"      <MontoGravadoI1>{'%.2f' % float(d17['MontoGravadoI1'])}</MontoGravadoI1>\n")
+    if d17.get('MontoGravadoI2') is not None:
+        p.append(f"      <MontoGravadoI2>{'%.2f' % float(d17['MontoGravadoI2'])}</MontoGravadoI2>\n")
+    if d17.get('MontoGravadoI3') is not None:
+        p.append(f"      <MontoGravadoI3>{'%.2f' % float(d17['MontoGravadoI3'])}</MontoGravadoI3>\n")
+    if d17.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d17['MontoExento'])}</MontoExento>\n")
+    if d17.get('ITBIS1') is not None:
+        p.append(f"      <ITBIS1>{xml_text(d17['ITBIS1'])}</ITBIS1>\n")
+    if d17.get('ITBIS2') is not None:
+        p.append(f"      <ITBIS2>{xml_text(d17['ITBIS2'])}</ITBIS2>\n")
+    if d17.get('ITBIS3') is not None:
+        p.append(f"      <ITBIS3>{xml_text(d17['ITBIS3'])}</ITBIS3>\n")
+    if d17.get('TotalITBIS') is not None:
+        p.append(f"      <TotalITBIS>{'%.2f' % float(d17['TotalITBIS'])}</TotalITBIS>\n")
+    if d17.get('TotalITBIS1') is not None:
+        p.append(f"      <TotalITBIS1>{'%.2f' % float(d17['TotalITBIS1'])}</TotalITBIS1>\n")
+    if d17.get('TotalITBIS2') is not None:
+        p.append(f"      <TotalITBIS2>{'%.2f' % float(d17['TotalITBIS2'])}</TotalITBIS2>\n")
+    if d17.get('TotalITBIS3') is not None:
+        p.append(f"      <TotalITBIS3>{'%.2f' % float(d17['TotalITBIS3'])}</TotalITBIS3>\n")
+    if d17.get('MontoImpuestoAdicional') is not None:
+        p.append(f"      <MontoImpuestoAdicional>{'%.2f' % float(d17['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>\n")
+    d18 = d17.get('ImpuestosAdicionales')
+    if d18:
+        p.append("      <ImpuestosAdicionales>\n")
+        n19 = len(p)
+        d20 = d18 if isinstance(d18, list) else d18.get('ImpuestoAdicional') or []
+        for d21 in (d20 if isinstance(d20, list) else (d20,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d21['TipoImpuesto'])}</TipoImpuesto>\n          <TasaImpuestoAdicional>{'%.2f' % float(d21['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>\n")
+            if d21.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d21['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>\n")
+            if d21.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d21['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>\n")
+            if d21.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"          <OtrosImpuestosAdicionales>{'%.2f' % float(d21['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>\n")
+            p.append("        </ImpuestoAdicional>\n")
+        if len(p) == n19:
+            p[-1] = "      <ImpuestosAdicionales/>\n"
+        else:
+            p.append("      </ImpuestosAdicionales>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d17['MontoTotal'])}</MontoTotal>\n")
+    if d17.get('MontoNoFacturable') is not None:
+        p.append(f"      <MontoNoFacturable>{'%.2f' % float(d17['MontoNoFacturable'])}</MontoNoFacturable>\n")
+    if d17.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d17['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d17.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d17['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d17.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d17['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d17.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d17['ValorPagar'])}</ValorPagar>\n")
+    if d17.get('TotalITBISRetenido') is not None:
+        p.append(f"      <TotalITBISRetenido>{'%.2f' % float(d17['TotalITBISRetenido'])}</TotalITBISRetenido>\n")
+    if d17.get('TotalISRRetencion') is not None:
+        p.append(f"      <TotalISRRetencion>{'%.2f' % float(d17['TotalISRRetencion'])}</TotalISRRetencion>\n")
+    if d17.get('TotalITBISPercepcion') is not None:
+        p.append(f"      <TotalITBISPercepcion>{'%.2f' % float(d17['TotalITBISPercepcion'])}</TotalITBISPercepcion>\n")
+    if d17.get('TotalISRPercepcion') is not None:
+        p.append(f"      <TotalISRPercepcion>{'%.2f' % float(d17['TotalISRPercepcion'])}</TotalISRPercepcion>\n")
+    p.append("    </Totales>\n")
+    d22 = d4.get('OtraMoneda')
+    if d22:
+        p.append("    <OtraMoneda>\n")
+        n23 = len(p)
+        if d22.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d22['TipoMoneda'])}</TipoMoneda>\n")
+        if d22.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d22['TipoCambio'])}</TipoCambio>\n")
+        if d22.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoGravadoTotalOtraMoneda>{'%.2f' % float(d22['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>\n")
+        if d22.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"      <MontoGravado1OtraMoneda>{'%.2f' % float(d22['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>\n")
+        if d22.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"      <MontoGravado2OtraMoneda>{'%.2f' % float(d22['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>\n")
+        if d22.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"      <MontoGravado3OtraMoneda>{'%.2f' % float(d22['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>\n")
+        if d22.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d22['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d22.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"      <TotalITBISOtraMoneda>{'%.2f' % float(d22['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>\n")
+        if d22.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS1OtraMoneda>{'%.2f' % float(d22['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>\n")
+        if d22.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS2OtraMoneda>{'%.2f' % float(d22['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>\n")
+        if d22.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS3OtraMoneda>{'%.2f' % float(d22['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>\n")
+        if d22.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"      <MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d22['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>\n")
+        d24 = d22.get('ImpuestosAdicionalesOtraMoneda')
+        if d24:
+            p.append("      <ImpuestosAdicionalesOtraMoneda>\n")
+            n25 = len(p)
+            d26 = d24 if isinstance(d24, list) else d24.get('ImpuestoAdicionalOtraMoneda') or []
+            for d27 in (d26 if isinstance(d26, list) else (d26,)):
+                p.append(f"        <ImpuestoAdicionalOtraMoneda>\n          <TipoImpuestoOtraMoneda>{'%03d' % int(d27['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda>\n          <TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d27['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>\n")
+                if d27.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"          <MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d27['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>\n")
+                if d27.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"          <MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d27['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>\n")
+                if d27.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"          <OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d27['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>\n")
+                p.append("        </ImpuestoAdicionalOtraMoneda>\n")
+            if len(p) == n25:
+                p[-1] = "      <ImpuestosAdicionalesOtraMoneda/>\n"
+            else:
+                p.append("      </ImpuestosAdicionalesOtraMoneda>\n")
+        if d22.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d22['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n23:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d28 = data.get('TablaCodigosItem')
+    if d28:
+        p.append("      <TablaCodigosItem>\n")
+        n29 = len(p)
+        d30 = d28 if isinstance(d28, list) else d28.get('CodigosItem') or []
+        for d31 in (d30 if isinstance(d30, list) else (d30,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d31['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d31['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n29:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n")
+    d32 = data.get('Retencion')
+    if d32:
+        p.append("      <Retencion>\n")
+        n33 = len(p)
+        if d32.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"        <IndicadorAgenteRetencionoPercepcion>{xml_text(d32['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>\n")
+        if d32.get('MontoITBISRetenido') is not None:
+            p.append(f"        <MontoITBISRetenido>{'%.2f' % float(d32['MontoITBISRetenido'])}</MontoITBISRetenido>\n")
+        if d32.get('MontoISRRetenido') is not None:
+            p.append(f"        <MontoISRRetenido>{'%.2f' % float(d32['MontoISRRetenido'])}</MontoISRRetenido>\n")
+        if len(p) == n33:
+            p[-1] = "      <Retencion/>\n"
+        else:
+            p.append("      </Retencion>\n")
+    p.append(f"      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"      <CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>\n")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"      <UnidadReferencia>{xml_text(data['UnidadReferencia'])}</UnidadReferencia>\n")
+    d34 = data.get('TablaSubcantidad')
+    if d34:
+        p.append("      <TablaSubcantidad>\n")
+        n35 = len(p)
+        d36 = d34 if isinstance(d34, list) else d34.get('SubcantidadItem') or []
+        for d37 in (d36 if isinstance(d36, list) else (d36,)):
+            p.append("        <SubcantidadItem>\n")
+            n38 = len(p)
+            if d37.get('Subcantidad') is not None:
+                p.append(f"          <Subcantidad>{'%.3f' % float(d37['Subcantidad'])}</Subcantidad>\n")
+            if d37.get('CodigoSubcantidad') is not None:
+                p.append(f"          <CodigoSubcantidad>{xml_text(d37['CodigoSubcantidad'])}</CodigoSubcantidad>\n")
+            if len(p) == n38:
+                p[-1] = "        <SubcantidadItem/>\n"
+            else:
+                p.append("        </SubcantidadItem>\n")
+        if len(p) == n35:
+            p[-1] = "      <TablaSubcantidad/>\n"
+        else:
+            p.append("      </TablaSubcantidad>\n")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"      <GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>\n")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"      <PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>\n")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"      <FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>\n")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"      <FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>\n")
+    d39 = data.get('Mineria')
+    if d39:
+        p.append("      <Mineria>\n")
+        n40 = len(p)
+        if d39.get('PesoNetoKilogramo') is not None:
+            p.append(f"        <PesoNetoKilogramo>{'%.3f' % float(d39['PesoNetoKilogramo'])}</PesoNetoKilogramo>\n")
+        if d39.get('PesoNetoMineria') is not None:
+            p.append(f"        <PesoNetoMineria>{'%.3f' % float(d39['PesoNetoMineria'])}</PesoNetoMineria>\n")
+        if d39.get('TipoAfiliacion') is not None:
+            p.append(f"        <TipoAfiliacion>{xml_text(d39['TipoAfiliacion'])}</TipoAfiliacion>\n")
+        if d39.get('Liquidacion') is not None:
+            p.append(f"        <Liquidacion>{xml_text(d39['Liquidacion'])}</Liquidacion>\n")
+        if len(p) == n40:
+            p[-1] = "      <Mineria/>\n"
+        else:
+            p.append("      </Mineria>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"      <DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>\n")
+    d41 = data.get('TablaSubDescuento')
+    if d41:
+        p.append("      <TablaSubDescuento>\n")
+        n42 = len(p)
+        d43 = d41 if isinstance(d41, list) else d41.get('SubDescuento') or []
+        for d44 in (d43 if isinstance(d43, list) else (d43,)):
+            p.append(f"        <SubDescuento>\n          <TipoSubDescuento>{xml_text(d44['TipoSubDescuento'])}</TipoSubDescuento>\n")
+            if d44.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"          <SubDescuentoPorcentaje>{'%.2f' % float(d44['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>\n")
+            if d44.get('MontoSubDescuento') is not None:
+                p.append(f"          <MontoSubDescuento>{'%.2f' % float(d44['MontoSubDescuento'])}</MontoSubDescuento>\n")
+            p.append("        </SubDescuento>\n")
+        if len(p) == n42:
+            p[-1] = "      <TablaSubDescuento/>\n"
+        else:
+            p.append("      </TablaSubDescuento>\n")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"      <RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>\n")
+    d45 = data.get('TablaSubRecargo')
+    if d45:
+        p.append("      <TablaSubRecargo>\n")
+        n46 = len(p)
+        d47 = d45 if isinstance(d45, list) else d45.get('SubRecargo') or []
+        for d48 in (d47 if isinstance(d47, list) else (d47,)):
+            p.append(f"        <SubRecargo>\n          <TipoSubRecargo>{xml_text(d48['TipoSubRecargo'])}</TipoSubRecargo>\n")
+            if d48.get('SubRecargoPorcentaje') is not None:
+                p.append(f"          <SubRecargoPorcentaje>{'%.2f' % float(d48['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>\n")
+            if d48.get('MontoSubRecargo') is not None:
+                p.append(f"          <MontoSubRecargo>{'%.2f' % float(d48['MontoSubRecargo'])}</MontoSubRecargo>\n")
+            p.append("        </SubRecargo>\n")
+        if len(p) == n46:
+            p[-1] = "      <TablaSubRecargo/>\n"
+        else:
+            p.append("      </TablaSubRecargo>\n")
+    d49 = data.get('TablaImpuestoAdicional')
+    if d49:
+        p.append("      <TablaImpuestoAdicional>\n")
+        n50 = len(p)
+        d51 = d49 if isinstance(d49, list) else d49.get('ImpuestoAdicional') or []
+        for d52 in (d51 if isinstance(d51, list) else (d51,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d52['TipoImpuesto'])}</TipoImpuesto>\n        </ImpuestoAdicional>\n")
+        if len(p) == n50:
+            p[-1] = "      <TablaImpuestoAdicional/>\n"
+        else:
+            p.append("      </TablaImpuestoAdicional>\n")
+    d53 = data.get('OtraMonedaDetalle')
+    if d53:
+        p.append("      <OtraMonedaDetalle>\n")
+        n54 = len(p)
+        if d53.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d53['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d53.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d53['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d53.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d53['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d53.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d53['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n54:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d55 = data.get('Subtotales')
+    if d55:
+        p.append("  <Subtotales>\n")
+        n56 = len(p)
+        d57 = d55 if isinstance(d55, list) else d55.get('Subtotal') or []
+        for d58 in (d57 if isinstance(d57, list) else (d57,)):
+            p.append("    <Subtotal>\n")
+            n59 = len(p)
+            if d58.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d58['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d58.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d58['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d58.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d58['Orden'])}</Orden>\n")
+            if d58.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"      <SubTotalMontoGravadoTotal>{'%.2f' % float(d58['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>\n")
+            if d58.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"      <SubTotalMontoGravadoI1>{'%.2f' % float(d58['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>\n")
+            if d58.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"      <SubTotalMontoGravadoI2>{'%.2f' % float(d58['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>\n")
+            if d58.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"      <SubTotalMontoGravadoI3>{'%.2f' % float(d58['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>\n")
+            if d58.get('SubTotaITBIS') is not None:
+                p.append(f"      <SubTotaITBIS>{'%.2f' % float(d58['SubTotaITBIS'])}</SubTotaITBIS>\n")
+            if d58.get('SubTotaITBIS1') is not None:
+                p.append(f"      <SubTotaITBIS1>{'%.2f' % float(d58['SubTotaITBIS1'])}</SubTotaITBIS1>\n")
+            if d58.get('SubTotaITBIS2') is not None:
+                p.append(f"      <SubTotaITBIS2>{'%.2f' % float(d58['SubTotaITBIS2'])}</SubTotaITBIS2>\n")
+            if d58.get('SubTotaITBIS3') is not None:
+                p.append(f"      <SubTotaITBIS3>{'%.2f' % float(d58['SubTotaITBIS3'])}</SubTotaITBIS3>\n")
+            if d58.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"      <SubTotalImpuestoAdicional>{'%.2f' % float(d58['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>\n")
+            if d58.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d58['SubTotalExento'])}</SubTotalExento>\n")
+            if d58.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d58['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d58.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d58['Lineas'])}</Lineas>\n")
+            if len(p) == n59:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n56:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    d60 = data.get('DescuentosORecargos')
+    if d60:
+        p.append("  <DescuentosORecargos>\n")
+        n61 = len(p)
+        d62 = d60 if isinstance(d60, list) else d60.get('DescuentoORecargo') or []
+        for d63 in (d62 if isinstance(d62, list) else (d62,)):
+            p.append(f"    <DescuentoORecargo>\n      <NumeroLinea>{xml_text(d63['NumeroLinea'])}</NumeroLinea>\n      <TipoAjuste>{xml_text(d63['TipoAjuste'])}</TipoAjuste>\n")
+            if d63.get('IndicadorNorma1007') is not None:
+                p.append(f"      <IndicadorNorma1007>{xml_text(d63['IndicadorNorma1007'])}</IndicadorNorma1007>\n")
+            if d63.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"      <DescripcionDescuentooRecargo>{xml_text(d63['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>\n")
+            if d63.get('TipoValor') is not None:
+                p.append(f"      <TipoValor>{xml_text(d63['TipoValor'])}</TipoValor>\n")
+            if d63.get('ValorDescuentooRecargo') is not None:
+                p.append(f"      <ValorDescuentooRecargo>{'%.2f' % float(d63['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>\n")
+            if d63.get('MontoDescuentooRecargo') is not None:
+                p.append(f"      <MontoDescuentooRecargo>{'%.2f' % float(d63['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>\n")
+            if d63.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"      <MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d63['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>\n")
+            if d63.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"      <IndicadorFacturacionDescuentooRecargo>{xml_text(d63['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>\n")
+            p.append("    </DescuentoORecargo>\n")
+        if len(p) == n61:
+            p[-1] = "  <DescuentosORecargos/>\n"
+        else:
+            p.append("  </DescuentosORecargos>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d64 = data.get('Paginacion')
+        if d64:
+            p.append("  <Paginacion>\n")
+            n65 = len(p)
+            d66 = d64 if isinstance(d64, list) else d64.get('Pagina') or []
+            for d67 in (d66 if isinstance(d66, list) else (d66,)):
+                p.append("    <Pagina>\n")
+                n68 = len(p)
+                if d67.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d67['PaginaNo'])}</PaginaNo>\n")
+                if d67.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d67['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d67.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d67['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d67.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(d67['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+                if d67.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(d67['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+                if d67.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(d67['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+                if d67.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(d67['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+                if d67.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d67['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d67.get('SubtotalItbisPagina') is not None:
+                    p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(d67['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+                if d67.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(d67['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+                if d67.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(d67['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+                if d67.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(d67['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+                if d67.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d67['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+                d69 = d67.get('SubtotalImpuestoAdicional')
+                if d69:
+                    p.append("      <SubtotalImpuestoAdicional>\n")
+                    n70 = len(p)
+                    if d69.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"        <SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d69['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>\n")
+                    if d69.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d69['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+                    if len(p) == n70:
+                        p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+                    else:
+                        p.append("      </SubtotalImpuestoAdicional>\n")
+                if d67.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d67['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if d67.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(d67['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+                if len(p) == n68:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n65:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d71 = data.get('InformacionReferencia')
+    if not d71:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'InformacionReferencia'")
+    p.append(f"  <InformacionReferencia>\n    <NCFModificado>{xml_text(d71['NCFModificado'])}</NCFModificado>\n")
+    if d71.get('RNCOtroContribuyente') is not None:
+        p.append(f"    <RNCOtroContribuyente>{xml_text(d71['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+    p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d71['FechaNCFModificado']))}</FechaNCFModificado>\n    <CodigoModificacion>{xml_text(d71['CodigoModificacion'])}</CodigoModificacion>\n")
+    if d71.get('RazonModificacion') is not None:
+        p.append(f"    <RazonModificacion>{xml_text(d71['RazonModificacion'])}</RazonModificacion>\n")
+    p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n72 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+    d73 = data.get('SubtotalImpuestoAdicional')
+    if d73:
+        p.append("      <SubtotalImpuestoAdicional>\n")
+        n74 = len(p)
+        if d73.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"        <SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d73['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>\n")
+        if d73.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d73['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+        if len(p) == n74:
+            p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+        else:
+            p.append("      </SubtotalImpuestoAdicional>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+    if len(p) == n72:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos><TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("<TablaFormasPago>")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"<FormaDePago><FormaPago>{xml_text(d9['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago></FormaDePago>")
+        if len(p) == n7:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d5.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision></Emisor>")
+    d11 = d4.get('Comprador')
+    if d11:
+        p.append("<Comprador>")
+        n12 = len(p)
+        if d11.get('RNCComprador') is not None:
+            p.append(f"<RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>")
+        if d11.get('IdentificadorExtranjero') is not None:
+            p.append(f"<IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+        if d11.get('RazonSocialComprador') is not None:
+            p.append(f"<RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>")
+        if d11.get('ContactoComprador') is not None:
+            p.append(f"<ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>")
+        if d11.get('CorreoComprador') is not None:
+            p.append(f"<CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>")
+        if d11.get('DireccionComprador') is not None:
+            p.append(f"<DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>")
+        if d11.get('MunicipioComprador') is not None:
+            p.append(f"<MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>")
+        if d11.get('ProvinciaComprador') is not None:
+            p.append(f"<ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>")
+        if d11.get('FechaEntrega') is not None:
+            p.append(f"<FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>")
+        if d11.get('ContactoEntrega') is not None:
+            p.append(f"<ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>")
+        if d11.get('DireccionEntrega') is not None:
+            p.append(f"<DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>")
+        if d11.get('TelefonoAdicional') is not None:
+            p.append(f"<TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>")
+        if d11.get('FechaOrdenCompra') is not None:
+            p.append(f"<FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>")
+        if d11.get('NumeroOrdenCompra') is not None:
+            p.append(f"<NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+        if d11.get('CodigoInternoComprador') is not None:
+            p.append(f"<CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>")
+        if d11.get('ResponsablePago') is not None:
+            p.append(f"<ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>")
+        if d11.get('InformacionAdicionalComprador') is not None:
+            p.append(f"<InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+        if len(p) == n12:
+            p[-1] = "<Comprador/>"
+        else:
+            p.append("</Comprador>")
+    d13 = d4.get('InformacionesAdicionales')
+    if d13:
+        p.append("<InformacionesAdicionales>")
+        n14 = len(p)
+        if d13.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{xml_text(fmt_date(d13['FechaEmbarque']))}</FechaEmbarque>")
+        if d13.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{xml_text(d13['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d13.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{xml_text(d13['NumeroContenedor'])}</NumeroContenedor>")
+        if d13.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{xml_text(d13['NumeroReferencia'])}</NumeroReferencia>")
+        if d13.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d13['PesoBruto'])}</PesoBruto>")
+        if d13.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d13['PesoNeto'])}</PesoNeto>")
+        if d13.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{xml_text(d13['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d13.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{xml_text(d13['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d13.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d13['CantidadBulto'])}</CantidadBulto>")
+        if d13.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{xml_text(d13['UnidadBulto'])}</UnidadBulto>")
+        if d13.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d13['VolumenBulto'])}</VolumenBulto>")
+        if d13.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{xml_text(d13['UnidadVolumen'])}</UnidadVolumen>")
+        if len(p) == n14:
+            p[-1] = "<InformacionesAdicionales/>"
+        else:
+            p.append("</InformacionesAdicionales>")
+    d15 = d4.get('Transporte')
+    if d15:
+        p.append("<Transporte>")
+        n16 = len(p)
+        if d15.get('Conductor') is not None:
+            p.append(f"<Conductor>{xml_text(d15['Conductor'])}</Conductor>")
+        if d15.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{xml_text(d15['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d15.get('Ficha') is not None:
+            p.append(f"<Ficha>{xml_text(d15['Ficha'])}</Ficha>")
+        if d15.get('Placa') is not None:
+            p.append(f"<Placa>{xml_text(d15['Placa'])}</Placa>")
+        if d15.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{xml_text(d15['RutaTransporte'])}</RutaTransporte>")
+        if d15.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{xml_text(d15['ZonaTransporte'])}</ZonaTransporte>")
+        if d15.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{xml_text(d15['NumeroAlbaran'])}</NumeroAlbaran>")
+        if len(p) == n16:
+            p[-1] = "<Transporte/>"
+        else:
+            p.append("</Transporte>")
+    d17 = d4.get('Totales')
+    if not d17:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d17.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d17['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d17.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d17['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d17.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d17['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d17.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d17['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d17.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d17['MontoExento'])}</MontoExento>")
+    if d17.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{xml_text(d17['ITBIS1'])}</ITBIS1>")
+    if d17.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{xml_text(d17['ITBIS2'])}</ITBIS2>")
+    if d17.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{xml_text(d17['ITBIS3'])}</ITBIS3>")
+    if d17.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d17['TotalITBIS'])}</TotalITBIS>")
+    if d17.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d17['TotalITBIS1'])}</TotalITBIS1>")
+    if d17.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d17['TotalITBIS2'])}</TotalITBIS2>")
+    if d17.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d17['TotalITBIS3'])}</TotalITBIS3>")
+    if d17.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d17['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d18 = d17.get('ImpuestosAdicionales')
+    if d18:
+        p.append("<ImpuestosAdicionales>")
+        n19 = len(p)
+        d20 = d18 if isinstance(d18, list) else d18.get('ImpuestoAdicional') or []
+        for d21 in (d20 if isinstance(d20, list) else (d20,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d21['TipoImpuesto'])}</TipoImpuesto><TasaImpuestoAdicional>{'%.2f' % float(d21['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>")
+            if d21.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d21['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d21.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d21['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d21.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d21['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            p.append("</ImpuestoAdicional>")
+        if len(p) == n19:
+            p[-1] = "<ImpuestosAdicionales/>"
+        else:
+            p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d17['MontoTotal'])}</MontoTotal>")
+    if d17.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d17['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d17.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d17['MontoPeriodo'])}</MontoPeriodo>")
+    if d17.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d17['SaldoAnterior'])}</SaldoAnterior>")
+    if d17.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d17['MontoAvancePago'])}</MontoAvancePago>")
+    if d17.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d17['ValorPagar'])}</ValorPagar>")
+    if d17.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d17['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d17.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d17['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d17.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d17['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d17.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d17['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d22 = d4.get('OtraMoneda')
+    if d22:
+        p.append("<OtraMoneda>")
+        n23 = len(p)
+        if d22.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d22['TipoMoneda'])}</TipoMoneda>")
+        if d22.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d22['TipoCambio'])}</TipoCambio>")
+        if d22.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d22['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d22.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d22['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d22.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d22['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d22.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d22['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d22.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d22['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d22.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d22['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d22.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d22['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d22.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d22['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d22.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d22['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d22.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d22['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d24 = d22.get('ImpuestosAdicionalesOtraMoneda')
+        if d24:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            n25 = len(p)
+            d26 = d24 if isinstance(d24, list) else d24.get('ImpuestoAdicionalOtraMoneda') or []
+            for d27 in (d26 if isinstance(d26, list) else (d26,)):
+                p.append(f"<ImpuestoAdicionalOtraMoneda><TipoImpuestoOtraMoneda>{'%03d' % int(d27['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda><TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d27['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d27.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d27['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>")
+                if d27.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d27['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>")
+                if d27.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d27['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            if len(p) == n25:
+                p[-1] = "<ImpuestosAdicionalesOtraMoneda/>"
+            else:
+                p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d22.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d22['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n23:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d28 = data.get('TablaCodigosItem')
+    if d28:
+        p.append("<TablaCodigosItem>")
+        n29 = len(p)
+        d30 = d28 if isinstance(d28, list) else d28.get('CodigosItem') or []
+        for d31 in (d30 if isinstance(d30, list) else (d30,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d31['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d31['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n29:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d32 = data.get('Retencion')
+    if d32:
+        p.append("<Retencion>")
+        n33 = len(p)
+        if d32.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"<IndicadorAgenteRetencionoPercepcion>{xml_text(d32['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+        if d32.get('MontoITBISRetenido') is not None:
+            p.append(f"<MontoITBISRetenido>{'%.2f' % float(d32['MontoITBISRetenido'])}</MontoITBISRetenido>")
+        if d32.get('MontoISRRetenido') is not None:
+            p.append(f"<MontoISRRetenido>{'%.2f' % float(d32['MontoISRRetenido'])}</MontoISRRetenido>")
+        if len(p) == n33:
+            p[-1] = "<Retencion/>"
+        else:
+            p.append("</Retencion>")
+    p.append(f"<NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"<CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"<UnidadReferencia>{xml_text(data['UnidadReferencia'])}</UnidadReferencia>")
+    d34 = data.get('TablaSubcantidad')
+    if d34:
+        p.append("<TablaSubcantidad>")
+        n35 = len(p)
+        d36 = d34 if isinstance(d34, list) else d34.get('SubcantidadItem') or []
+        for d37 in (d36 if isinstance(d36, list) else (d36,)):
+            p.append("<SubcantidadItem>")
+            n38 = len(p)
+            if d37.get('Subcantidad') is not None:
+                p.append(f"<Subcantidad>{'%.3f' % float(d37['Subcantidad'])}</Subcantidad>")
+            if d37.get('CodigoSubcantidad') is not None:
+                p.append(f"<CodigoSubcantidad>{xml_text(d37['CodigoSubcantidad'])}</CodigoSubcantidad>")
+            if len(p) == n38:
+                p[-1] = "<SubcantidadItem/>"
+            else:
+                p.append("</SubcantidadItem>")
+        if len(p) == n35:
+            p[-1] = "<TablaSubcantidad/>"
+        else:
+            p.append("</TablaSubcantidad>")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"<GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"<PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    d39 = data.get('Mineria')
+    if d39:
+        p.append("<Mineria>")
+        n40 = len(p)
+        if d39.get('PesoNetoKilogramo') is not None:
+            p.append(f"<PesoNetoKilogramo>{'%.3f' % float(d39['PesoNetoKilogramo'])}</PesoNetoKilogramo>")
+        if d39.get('PesoNetoMineria') is not None:
+            p.append(f"<PesoNetoMineria>{'%.3f' % float(d39['PesoNetoMineria'])}</PesoNetoMineria>")
+        if d39.get('TipoAfiliacion') is not None:
+            p.append(f"<TipoAfiliacion>{xml_text(d39['TipoAfiliacion'])}</TipoAfiliacion>")
+        if d39.get('Liquidacion') is not None:
+            p.append(f"<Liquidacion>{xml_text(d39['Liquidacion'])}</Liquidacion>")
+        if len(p) == n40:
+            p[-1] = "<Mineria/>"
+        else:
+            p.append("</Mineria>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d41 = data.get('TablaSubDescuento')
+    if d41:
+        p.append("<TablaSubDescuento>")
+        n42 = len(p)
+        d43 = d41 if isinstance(d41, list) else d41.get('SubDescuento') or []
+        for d44 in (d43 if isinstance(d43, list) else (d43,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{xml_text(d44['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d44.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d44['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d44.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d44['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        if len(p) == n42:
+            p[-1] = "<TablaSubDescuento/>"
+        else:
+            p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d45 = data.get('TablaSubRecargo')
+    if d45:
+        p.append("<TablaSubRecargo>")
+        n46 = len(p)
+        d47 = d45 if isinstance(d45, list) else d45.get('SubRecargo') or []
+        for d48 in (d47 if isinstance(d47, list) else (d47,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{xml_text(d48['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d48.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d48['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d48.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d48['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        if len(p) == n46:
+            p[-1] = "<TablaSubRecargo/>"
+        else:
+            p.append("</TablaSubRecargo>")
+    d49 = data.get('TablaImpuestoAdicional')
+    if d49:
+        p.append("<TablaImpuestoAdicional>")
+        n50 = len(p)
+        d51 = d49 if isinstance(d49, list) else d49.get('ImpuestoAdicional') or []
+        for d52 in (d51 if isinstance(d51, list) else (d51,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d52['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        if len(p) == n50:
+            p[-1] = "<TablaImpuestoAdicional/>"
+        else:
+            p.append("</TablaImpuestoAdicional>")
+    d53 = data.get('OtraMonedaDetalle')
+    if d53:
+        p.append("<OtraMonedaDetalle>")
+        n54 = len(p)
+        if d53.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d53['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d53.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d53['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d53.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d53['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d53.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d53['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n54:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d55 = data.get('Subtotales')
+    if d55:
+        p.append("<Subtotales>")
+        n56 = len(p)
+        d57 = d55 if isinstance(d55, list) else d55.get('Subtotal') or []
+        for d58 in (d57 if isinstance(d57, list) else (d57,)):
+            p.append("<Subtotal>")
+            n59 = len(p)
+            if d58.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d58['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d58.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d58['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d58.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d58['Orden'])}</Orden>")
+            if d58.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d58['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d58.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d58['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d58.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d58['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d58.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d58['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d58.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d58['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d58.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d58['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d58.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d58['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d58.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d58['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d58.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d58['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d58.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d58['SubTotalExento'])}</SubTotalExento>")
+            if d58.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d58['MontoSubTotal'])}</MontoSubTotal>")
+            if d58.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d58['Lineas'])}</Lineas>")
+            if len(p) == n59:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n56:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    d60 = data.get('DescuentosORecargos')
+    if d60:
+        p.append("<DescuentosORecargos>")
+        n61 = len(p)
+        d62 = d60 if isinstance(d60, list) else d60.get('DescuentoORecargo') or []
+        for d63 in (d62 if isinstance(d62, list) else (d62,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{xml_text(d63['NumeroLinea'])}</NumeroLinea><TipoAjuste>{xml_text(d63['TipoAjuste'])}</TipoAjuste>")
+            if d63.get('IndicadorNorma1007') is not None:
+                p.append(f"<IndicadorNorma1007>{xml_text(d63['IndicadorNorma1007'])}</IndicadorNorma1007>")
+            if d63.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{xml_text(d63['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d63.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{xml_text(d63['TipoValor'])}</TipoValor>")
+            if d63.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d63['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d63.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d63['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d63.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d63['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d63.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{xml_text(d63['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        if len(p) == n61:
+            p[-1] = "<DescuentosORecargos/>"
+        else:
+            p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d64 = data.get('Paginacion')
+        if d64:
+            p.append("<Paginacion>")
+            n65 = len(p)
+            d66 = d64 if isinstance(d64, list) else d64.get('Pagina') or []
+            for d67 in (d66 if isinstance(d66, list) else (d66,)):
+                p.append("<Pagina>")
+                n68 = len(p)
+                if d67.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d67['PaginaNo'])}</PaginaNo>")
+                if d67.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d67['NoLineaDesde'])}</NoLineaDesde>")
+                if d67.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d67['NoLineaHasta'])}</NoLineaHasta>")
+                if d67.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d67['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d67.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d67['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d67.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d67['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d67.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d67['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d67.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d67['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d67.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d67['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d67.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d67['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d67.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d67['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d67.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d67['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d67.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d67['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d69 = d67.get('SubtotalImpuestoAdicional')
+                if d69:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    n70 = len(p)
+                    if d69.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d69['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+                    if d69.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d69['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    if len(p) == n70:
+                        p[-1] = "<SubtotalImpuestoAdicional/>"
+                    else:
+                        p.append("</SubtotalImpuestoAdicional>")
+                if d67.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d67['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d67.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d67['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                if len(p) == n68:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n65:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d71 = data.get('InformacionReferencia')
+    if not d71:
+        raise ValueError("El e-CF tipo 33 requiere bloque 'InformacionReferencia'")
+    p.append(f"<InformacionReferencia><NCFModificado>{xml_text(d71['NCFModificado'])}</NCFModificado>")
+    if d71.get('RNCOtroContribuyente') is not None:
+        p.append(f"<RNCOtroContribuyente>{xml_text(d71['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+    p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d71['FechaNCFModificado']))}</FechaNCFModificado><CodigoModificacion>{xml_text(d71['CodigoModificacion'])}</CodigoModificacion>")
+    if d71.get('RazonModificacion') is not None:
+        p.append(f"<RazonModificacion>{xml_text(d71['RazonModificacion'])}</RazonModificacion>")
+    p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n72 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d73 = data.get('SubtotalImpuestoAdicional')
+    if d73:
+        p.append("<SubtotalImpuestoAdicional>")
+        n74 = len(p)
+        if d73.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d73['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+        if d73.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d73['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        if len(p) == n74:
+            p[-1] = "<SubtotalImpuestoAdicional/>"
+        else:
+            p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    if len(p) == n72:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
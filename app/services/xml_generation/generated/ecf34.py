@@ -0,0 +1,1970 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 34 v.1.0 (1).xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 34
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><IndicadorNotaCredito>{esc(d4['IndicadorNotaCredito'])}</IndicadorNotaCredito>")
+    if d4.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{esc(d4['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d4.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{esc(d4['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d4.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{esc(d4['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d4['TipoIngresos'])}</TipoIngresos><TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{esc(fmt_date(d4['FechaDesde']))}</FechaDesde>")
+    if d4.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{esc(fmt_date(d4['FechaHasta']))}</FechaHasta>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d5 = d3.get('Emisor')
+    if not d5:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d5))
+    if d5.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{esc(d5['CodigoVendedor'])}</CodigoVendedor>")
+    if d5.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d5['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d5.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d5['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d5.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{esc(d5['ZonaVenta'])}</ZonaVenta>")
+    if d5.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{esc(d5['RutaVenta'])}</RutaVenta>")
+    if d5.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d5['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d5['FechaEmision']))}</FechaEmision></Emisor>")
+    d6 = d3.get('Comprador')
+    if d6:
+        p.append("<Comprador>")
+        if d6.get('RNCComprador') is not None:
+            p.append(f"<RNCComprador>{esc(d6['RNCComprador'])}</RNCComprador>")
+        if d6.get('IdentificadorExtranjero') is not None:
+            p.append(f"<IdentificadorExtranjero>{esc(d6['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+        if d6.get('RazonSocialComprador') is not None:
+            p.append(f"<RazonSocialComprador>{esc(d6['RazonSocialComprador'])}</RazonSocialComprador>")
+        if d6.get('ContactoComprador') is not None:
+            p.append(f"<ContactoComprador>{esc(d6['ContactoComprador'])}</ContactoComprador>")
+        if d6.get('CorreoComprador') is not None:
+            p.append(f"<CorreoComprador>{esc(d6['CorreoComprador'])}</CorreoComprador>")
+        if d6.get('DireccionComprador') is not None:
+            p.append(f"<DireccionComprador>{esc(d6['DireccionComprador'])}</DireccionComprador>")
+        if d6.get('MunicipioComprador') is not None:
+            p.append(f"<MunicipioComprador>{'%06d' % int(d6['MunicipioComprador'])}</MunicipioComprador>")
+        if d6.get('ProvinciaComprador') is not None:
+            p.append(f"<ProvinciaComprador>{'%06d' % int(d6['ProvinciaComprador'])}</ProvinciaComprador>")
+        if d6.get('FechaEntrega') is not None:
+            p.append(f"<FechaEntrega>{esc(fmt_date(d6['FechaEntrega']))}</FechaEntrega>")
+        if d6.get('ContactoEntrega') is not None:
+            p.append(f"<ContactoEntrega>{esc(d6['ContactoEntrega'])}</ContactoEntrega>")
+        if d6.get('DireccionEntrega') is not None:
+            p.append(f"<DireccionEntrega>{esc(d6['DireccionEntrega'])}</DireccionEntrega>")
+        if d6.get('TelefonoAdicional') is not None:
+            p.append(f"<TelefonoAdicional>{esc(d6['TelefonoAdicional'])}</TelefonoAdicional>")
+        if d6.get('FechaOrdenCompra') is not None:
+            p.append(f"<FechaOrdenCompra>{esc(fmt_date(d6['FechaOrdenCompra']))}</FechaOrdenCompra>")
+        if d6.get('NumeroOrdenCompra') is not None:
+            p.append(f"<NumeroOrdenCompra>{esc(d6['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+        if d6.get('CodigoInternoComprador') is not None:
+            p.append(f"<CodigoInternoComprador>{esc(d6['CodigoInternoComprador'])}</CodigoInternoComprador>")
+        if d6.get('ResponsablePago') is not None:
+            p.append(f"<ResponsablePago>{esc(d6['ResponsablePago'])}</ResponsablePago>")
+        if d6.get('InformacionAdicionalComprador') is not None:
+            p.append(f"<InformacionAdicionalComprador>{esc(d6['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+        p.append("</Comprador>")
+    d7 = d3.get('InformacionesAdicionales')
+    if d7:
+        p.append("<InformacionesAdicionales>")
+        if d7.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{esc(fmt_date(d7['FechaEmbarque']))}</FechaEmbarque>")
+        if d7.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{esc(d7['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d7.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{esc(d7['NumeroContenedor'])}</NumeroContenedor>")
+        if d7.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{esc(d7['NumeroReferencia'])}</NumeroReferencia>")
+        if d7.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d7['PesoBruto'])}</PesoBruto>")
+        if d7.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d7['PesoNeto'])}</PesoNeto>")
+        if d7.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{esc(d7['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d7.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{esc(d7['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d7.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d7['CantidadBulto'])}</CantidadBulto>")
+        if d7.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{esc(d7['UnidadBulto'])}</UnidadBulto>")
+        if d7.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d7['VolumenBulto'])}</VolumenBulto>")
+        if d7.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{esc(d7['UnidadVolumen'])}</UnidadVolumen>")
+        p.append("</InformacionesAdicionales>")
+    d8 = d3.get('Transporte')
+    if d8:
+        p.append("<Transporte>")
+        if d8.get('Conductor') is not None:
+            p.append(f"<Conductor>{esc(d8['Conductor'])}</Conductor>")
+        if d8.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{esc(d8['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d8.get('Ficha') is not None:
+            p.append(f"<Ficha>{esc(d8['Ficha'])}</Ficha>")
+        if d8.get('Placa') is not None:
+            p.append(f"<Placa>{esc(d8['Placa'])}</Placa>")
+        if d8.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{esc(d8['RutaTransporte'])}</RutaTransporte>")
+        if d8.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{esc(d8['ZonaTransporte'])}</ZonaTransporte>")
+        if d8.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{esc(d8['NumeroAlbaran'])}</NumeroAlbaran>")
+        p.append("</Transporte>")
+    d9 = d3.get('Totales')
+    if not d9:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d9.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d9['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d9.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d9['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d9.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d9['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d9.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d9['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d9.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d9['MontoExento'])}</MontoExento>")
+    if d9.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{esc(d9['ITBIS1'])}</ITBIS1>")
+    if d9.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{esc(d9['ITBIS2'])}</ITBIS2>")
+    if d9.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{esc(d9['ITBIS3'])}</ITBIS3>")
+    if d9.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d9['TotalITBIS'])}</TotalITBIS>")
+    if d9.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d9['TotalITBIS1'])}</TotalITBIS1>")
+    if d9.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d9['TotalITBIS2'])}</TotalITBIS2>")
+    if d9.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d9['TotalITBIS3'])}</TotalITBIS3>")
+    if d9.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d9['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d10 = d9.get('ImpuestosAdicionales')
+    if d10:
+        p.append("<ImpuestosAdicionales>")
+        d11 = d10 if isinstance(d10, list) else d10.get('ImpuestoAdicional') or []
+        for d12 in (d11 if isinstance(d11, list) else (d11,)):
+            p.append("<ImpuestoAdicional>")
+            if d12.get('TipoImpuesto') is not None:
+                p.append(f"<TipoImpuesto>{'%03d' % int(d12['TipoImpuesto'])}</TipoImpuesto>")
+            if d12.get('TasaImpuestoAdicional') is not None:
+                p.append(f"<TasaImpuestoAdicional>{'%.2f' % float(d12['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>")
+            if d12.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d12['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d12.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d12['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d12.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d12['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            p.append("</ImpuestoAdicional>")
+        p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d9['MontoTotal'])}</MontoTotal>")
+    if d9.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d9['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d9.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d9['MontoPeriodo'])}</MontoPeriodo>")
+    if d9.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d9['SaldoAnterior'])}</SaldoAnterior>")
+    if d9.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d9['MontoAvancePago'])}</MontoAvancePago>")
+    if d9.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d9['ValorPagar'])}</ValorPagar>")
+    if d9.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d9['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d9.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d9['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d9.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d9['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d9.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d9['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d13 = d3.get('OtraMoneda')
+    if d13:
+        p.append("<OtraMoneda>")
+        if d13.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d13['TipoMoneda'])}</TipoMoneda>")
+        if d13.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d13['TipoCambio'])}</TipoCambio>")
+        if d13.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d13['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d13.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d13['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d13.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d13['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d13.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d13['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d13.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d13['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d13.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d13['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d13.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d13['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d13.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d13['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d13.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d13['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d13.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d13['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d14 = d13.get('ImpuestosAdicionalesOtraMoneda')
+        if d14:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            d15 = d14 if isinstance(d14, list) else d14.get('ImpuestoAdicionalOtraMoneda') or []
+            for d16 in (d15 if isinstance(d15, list) else (d15,)):
+                p.append(f"<ImpuestoAdicionalOtraMoneda><TipoImpuestoOtraMoneda>{'%03d' % int(d16['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda><TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d16['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d16.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d16['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>")
+                if d16.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d16['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>")
+                if d16.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d16['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d13.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d13['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d17 = data.get('TablaCodigosItem')
+    if d17:
+        p.append("<TablaCodigosItem>")
+        d18 = d17 if isinstance(d17, list) else d17.get('CodigosItem') or []
+        for d19 in (d18 if isinstance(d18, list) else (d18,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d19['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d19['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d20 = data.get('Retencion')
+    if d20:
+        p.append("<Retencion>")
+        if d20.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"<IndicadorAgenteRetencionoPercepcion>{esc(d20['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+        if d20.get('MontoITBISRetenido') is not None:
+            p.append(f"<MontoITBISRetenido>{'%.2f' % float(d20['MontoITBISRetenido'])}</MontoITBISRetenido>")
+        if d20.get('MontoISRRetenido') is not None:
+            p.append(f"<MontoISRRetenido>{'%.2f' % float(d20['MontoISRRetenido'])}</MontoISRRetenido>")
+        p.append("</Retencion>")
+    p.append(f"<NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"<CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"<UnidadReferencia>{esc(data['UnidadReferencia'])}</UnidadReferencia>")
+    d21 = data.get('TablaSubcantidad')
+    if d21:
+        p.append("<TablaSubcantidad>")
+        d22 = d21 if isinstance(d21, list) else d21.get('SubcantidadItem') or []
+        for d23 in (d22 if isinstance(d22, list) else (d22,)):
+            p.append("<SubcantidadItem>")
+            if d23.get('Subcantidad') is not None:
+                p.append(f"<Subcantidad>{'%.3f' % float(d23['Subcantidad'])}</Subcantidad>")
+            if d23.get('CodigoSubcantidad') is not None:
+                p.append(f"<CodigoSubcantidad>{esc(d23['CodigoSubcantidad'])}</CodigoSubcantidad>")
+            p.append("</SubcantidadItem>")
+        p.append("</TablaSubcantidad>")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"<GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"<PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{esc(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{esc(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    d24 = data.get('Mineria')
+    if d24:
+        p.append("<Mineria>")
+        if d24.get('PesoNetoKilogramo') is not None:
+            p.append(f"<PesoNetoKilogramo>{'%.3f' % float(d24['PesoNetoKilogramo'])}</PesoNetoKilogramo>")
+        if d24.get('PesoNetoMineria') is not None:
+            p.append(f"<PesoNetoMineria>{'%.3f' % float(d24['PesoNetoMineria'])}</PesoNetoMineria>")
+        if d24.get('TipoAfiliacion') is not None:
+            p.append(f"<TipoAfiliacion>{esc(d24['TipoAfiliacion'])}</TipoAfiliacion>")
+        if d24.get('Liquidacion') is not None:
+            p.append(f"<Liquidacion>{esc(d24['Liquidacion'])}</Liquidacion>")
+        p.append("</Mineria>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d25 = data.get('TablaSubDescuento')
+    if d25:
+        p.append("<TablaSubDescuento>")
+        d26 = d25 if isinstance(d25, list) else d25.get('SubDescuento') or []
+        for d27 in (d26 if isinstance(d26, list) else (d26,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{esc(d27['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d27.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d27['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d27.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d27['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d28 = data.get('TablaSubRecargo')
+    if d28:
+        p.append("<TablaSubRecargo>")
+        d29 = d28 if isinstance(d28, list) else d28.get('SubRecargo') or []
+        for d30 in (d29 if isinstance(d29, list) else (d29,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{esc(d30['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d30.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d30['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d30.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d30['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        p.append("</TablaSubRecargo>")
+    d31 = data.get('TablaImpuestoAdicional')
+    if d31:
+        p.append("<TablaImpuestoAdicional>")
+        d32 = d31 if isinstance(d31, list) else d31.get('ImpuestoAdicional') or []
+        for d33 in (d32 if isinstance(d32, list) else (d32,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d33['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        p.append("</TablaImpuestoAdicional>")
+    d34 = data.get('OtraMonedaDetalle')
+    if d34:
+        p.append("<OtraMonedaDetalle>")
+        if d34.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d34['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d34.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d34['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d34.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d34['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d34.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d34['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d35 = data.get('Subtotales')
+    if d35:
+        p.append("<Subtotales>")
+        d36 = d35 if isinstance(d35, list) else d35.get('Subtotal') or []
+        for d37 in (d36 if isinstance(d36, list) else (d36,)):
+            p.append("<Subtotal>")
+            if d37.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d37['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d37.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d37['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d37.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d37['Orden'])}</Orden>")
+            if d37.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d37['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d37.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d37['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d37.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d37['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d37.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d37['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d37.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d37['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d37.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d37['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d37.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d37['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d37.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d37['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d37.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d37['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d37.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d37['SubTotalExento'])}</SubTotalExento>")
+            if d37.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d37['MontoSubTotal'])}</MontoSubTotal>")
+            if d37.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d37['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    d38 = data.get('DescuentosORecargos')
+    if d38:
+        p.append("<DescuentosORecargos>")
+        d39 = d38 if isinstance(d38, list) else d38.get('DescuentoORecargo') or []
+        for d40 in (d39 if isinstance(d39, list) else (d39,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{esc(d40['NumeroLinea'])}</NumeroLinea><TipoAjuste>{esc(d40['TipoAjuste'])}</TipoAjuste>")
+            if d40.get('IndicadorNorma1007') is not None:
+                p.append(f"<IndicadorNorma1007>{esc(d40['IndicadorNorma1007'])}</IndicadorNorma1007>")
+            if d40.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{esc(d40['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d40.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{esc(d40['TipoValor'])}</TipoValor>")
+            if d40.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d40['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d40.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d40['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d40.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d40['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d40.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{esc(d40['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d41 = data.get('Paginacion')
+        if d41:
+            p.append("<Paginacion>")
+            d42 = d41 if isinstance(d41, list) else d41.get('Pagina') or []
+            for d43 in (d42 if isinstance(d42, list) else (d42,)):
+                p.append("<Pagina>")
+                if d43.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d43['PaginaNo'])}</PaginaNo>")
+                if d43.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d43['NoLineaDesde'])}</NoLineaDesde>")
+                if d43.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d43['NoLineaHasta'])}</NoLineaHasta>")
+                if d43.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d43['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d43.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d43['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d43.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d43['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d43.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d43['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d43.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d43['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d43.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d43['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d43.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d43['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d43.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d43['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d43.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d43['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d43.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d43['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d44 = d43.get('SubtotalImpuestoAdicional')
+                if d44:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    if d44.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d44['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+                    if d44.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d44['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    p.append("</SubtotalImpuestoAdicional>")
+                if d43.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d43['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d43.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d43['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d45 = data.get('InformacionReferencia')
+    if not d45:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'InformacionReferencia'")
+    p.append(f"<InformacionReferencia><NCFModificado>{esc(d45['NCFModificado'])}</NCFModificado>")
+    if d45.get('RNCOtroContribuyente') is not None:
+        p.append(f"<RNCOtroContribuyente>{esc(d45['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+    p.append(f"<FechaNCFModificado>{esc(fmt_date(d45['FechaNCFModificado']))}</FechaNCFModificado><CodigoModificacion>{esc(d45['CodigoModificacion'])}</CodigoModificacion>")
+    if d45.get('RazonModificacion') is not None:
+        p.append(f"<RazonModificacion>{esc(d45['RazonModificacion'])}</RazonModificacion>")
+    p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d46 = data.get('SubtotalImpuestoAdicional')
+    if d46:
+        p.append("<SubtotalImpuestoAdicional>")
+        if d46.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d46['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+        if d46.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d46['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <IndicadorNotaCredito>{xml_text(d5['IndicadorNotaCredito'])}</IndicadorNotaCredito>\n")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"      <IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>\n")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"      <IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>\n")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"      <IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>\n")
+    p.append(f"      <TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos>\n      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"      <FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>\n")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"      <FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d6 = d4.get('Emisor')
+    if not d6:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d6))
+    if d6.get('CodigoVendedor') is not None:
+        p.append(f"      <CodigoVendedor>{xml_text(d6['CodigoVendedor'])}</CodigoVendedor>\n")
+    if d6.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d6['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d6.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d6['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d6.get('ZonaVenta') is not None:
+        p.append(f"      <ZonaVenta>{xml_text(d6['ZonaVenta'])}</ZonaVenta>\n")
+    if d6.get('RutaVenta') is not None:
+        p.append(f"      <RutaVenta>{xml_text(d6['RutaVenta'])}</RutaVenta>\n")
+    if d6.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d6['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d6['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d7 = d4.get('Comprador')
+    if d7:
+        p.append("    <Comprador>\n")
+        n8 = len(p)
+        if d7.get('RNCComprador') is not None:
+            p.append(f"      <RNCComprador>{xml_text(d7['RNCComprador'])}</RNCComprador>\n")
+        if d7.get('IdentificadorExtranjero') is not None:
+            p.append(f"      <IdentificadorExtranjero>{xml_text(d7['IdentificadorExtranjero'])}</IdentificadorExtranjero>\n")
+        if d7.get('RazonSocialComprador') is not None:
+            p.append(f"      <RazonSocialComprador>{xml_text(d7['RazonSocialComprador'])}</RazonSocialComprador>\n")
+        if d7.get('ContactoComprador') is not None:
+            p.append(f"      <ContactoComprador>{xml_text(d7['ContactoComprador'])}</ContactoComprador>\n")
+        if d7.get('CorreoComprador') is not None:
+            p.append(f"      <CorreoComprador>{xml_text(d7['CorreoComprador'])}</CorreoComprador>\n")
+        if d7.get('DireccionComprador') is not None:
+            p.append(f"      <DireccionComprador>{xml_text(d7['DireccionComprador'])}</DireccionComprador>\n")
+        if d7.get('MunicipioComprador') is not None:
+            p.append(f"      <MunicipioComprador>{'%06d' % int(d7['MunicipioComprador'])}</MunicipioComprador>\n")
+        if d7.get('ProvinciaComprador') is not None:
+            p.append(f"      <ProvinciaComprador>{'%06d' % int(d7['ProvinciaComprador'])}</ProvinciaComprador>\n")
+        if d7.get('FechaEntrega') is not None:
+            p.append(f"      <FechaEntrega>{xml_text(fmt_date(d7['FechaEntrega']))}</FechaEntrega>\n")
+        if d7.get('ContactoEntrega') is not None:
+            p.append(f"      <ContactoEntrega>{xml_text(d7['ContactoEntrega'])}</ContactoEntrega>\n")
+        if d7.get('DireccionEntrega') is not None:
+            p.append(f"      <DireccionEntrega>{xml_text(d7['DireccionEntrega'])}</DireccionEntrega>\n")
+        if d7.get('TelefonoAdicional') is not None:
+            p.append(f"      <TelefonoAdicional>{xml_text(d7['TelefonoAdicional'])}</TelefonoAdicional>\n")
+        if d7.get('FechaOrdenCompra') is not None:
+            p.append(f"      <FechaOrdenCompra>{xml_text(fmt_date(d7['FechaOrdenCompra']))}</FechaOrdenCompra>\n")
+        if d7.get('NumeroOrdenCompra') is not None:
+            p.append(f"      <NumeroOrdenCompra>{xml_text(d7['NumeroOrdenCompra'])}</NumeroOrdenCompra>\n")
+        if d7.get('CodigoInternoComprador') is not None:
+            p.append(f"      <CodigoInternoComprador>{xml_text(d7['CodigoInternoComprador'])}</CodigoInternoComprador>\n")
+        if d7.get('ResponsablePago') is not None:
+            p.append(f"      <ResponsablePago>{xml_text(d7['ResponsablePago'])}</ResponsablePago>\n")
+        if d7.get('InformacionAdicionalComprador') is not None:
+            p.append(f"      <InformacionAdicionalComprador>{xml_text(d7['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>\n")
+        if len(p) == n8:
+            p[-1] = "    <Comprador/>\n"
+        else:
+            p.append("    </Comprador>\n")
+    d9 = d4.get('InformacionesAdicionales')
+    if d9:
+        p.append("    <InformacionesAdicionales>\n")
+        n10 = len(p)
+        if d9.get('FechaEmbarque') is not None:
+            p.append(f"      <FechaEmbarque>{xml_text(fmt_date(d9['FechaEmbarque']))}</FechaEmbarque>\n")
+        if d9.get('NumeroEmbarque') is not None:
+            p.append(f"      <NumeroEmbarque>{xml_text(d9['NumeroEmbarque'])}</NumeroEmbarque>\n")
+        if d9.get('NumeroContenedor') is not None:
+            p.append(f"      <NumeroContenedor>{xml_text(d9['NumeroContenedor'])}</NumeroContenedor>\n")
+        if d9.get('NumeroReferencia') is not None:
+            p.append(f"      <NumeroReferencia>{xml_text(d9['NumeroReferencia'])}</NumeroReferencia>\n")
+        if d9.get('PesoBruto') is not None:
+            p.append(f"      <PesoBruto>{'%.2f' % float(d9['PesoBruto'])}</PesoBruto>\n")
+        if d9.get('PesoNeto') is not None:
+            p.append(f"      <PesoNeto>{'%.2f' % float(d9['PesoNeto'])}</PesoNeto>\n")
+        if d9.get('UnidadPesoBruto') is not None:
+            p.append(f"      <UnidadPesoBruto>{xml_text(d9['UnidadPesoBruto'])}</UnidadPesoBruto>\n")
+        if d9.get('UnidadPesoNeto') is not None:
+            p.append(f"      <UnidadPesoNeto>{xml_text(d9['UnidadPesoNeto'])}</UnidadPesoNeto>\n")
+        if d9.get('CantidadBulto') is not None:
+            p.append(f"      <CantidadBulto>{'%.2f' % float(d9['CantidadBulto'])}</CantidadBulto>\n")
+        if d9.get('UnidadBulto') is not None:
+            p.append(f"      <UnidadBulto>{xml_text(d9['UnidadBulto'])}</UnidadBulto>\n")
+        if d9.get('VolumenBulto') is not None:
+            p.append(f"      <VolumenBulto>{'%.2f' % float(d9['VolumenBulto'])}</VolumenBulto>\n")
+        if d9.get('UnidadVolumen') is not None:
+            p.append(f"      <UnidadVolumen>{xml_text(d9['UnidadVolumen'])}</UnidadVolumen>\n")
+        if len(p) == n10:
+            p[-1] = "    <InformacionesAdicionales/>\n"
+        else:
+            p.append("    </InformacionesAdicionales>\n")
+    d11 = d4.get('Transporte')
+    if d11:
+        p.append("    <Transporte>\n")
+        n12 = len(p)
+        if d11.get('Conductor') is not None:
+            p.append(f"      <Conductor>{xml_text(d11['Conductor'])}</Conductor>\n")
+        if d11.get('DocumentoTransporte') is not None:
+            p.append(f"      <DocumentoTransporte>{xml_text(d11['DocumentoTransporte'])}</DocumentoTransporte>\n")
+        if d11.get('Ficha') is not None:
+            p.append(f"      <Ficha>{xml_text(d11['Ficha'])}</Ficha>\n")
+        if d11.get('Placa') is not None:
+            p.append(f"      <Placa>{xml_text(d11['Placa'])}</Placa>\n")
+        if d11.get('RutaTransporte') is not None:
+            p.append(f"      <RutaTransporte>{xml_text(d11['RutaTransporte'])}</RutaTransporte>\n")
+        if d11.get('ZonaTransporte') is not None:
+            p.append(f"      <ZonaTransporte>{xml_text(d11['ZonaTransporte'])}</ZonaTransporte>\n")
+        if d11.get('NumeroAlbaran') is not None:
+            p.append(f"      <NumeroAlbaran>{xml_text(d11['NumeroAlbaran'])}</NumeroAlbaran>\n")
+        if len(p) == n12:
+            p[-1] = "    <Transporte/>\n"
+        else:
+            p.append("    </Transporte>\n")
+    d13 = d4.get('Totales')
+    if not d13:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d13.get('MontoGravadoTotal') is not None:
+        p.append(f"      <MontoGravadoTotal>{'%.2f' % float(d13['MontoGravadoTotal'])}</MontoGravadoTotal>\n")
+    if d13.get('MontoGravadoI1') is not None:
+        p.append(f"      <MontoGravadoI1>{'%.2f' % float(d13['MontoGravadoI1'])}</MontoGravadoI1>\n")
+    if d13.get('MontoGravadoI2') is not None:
+        p.append(f"      <MontoGravadoI2>{'%.2f' % float(d13['MontoGravadoI2'])}</MontoGravadoI2>\n")
+    if d13.get('MontoGravadoI3') is not None:
+        p.append(f"      <MontoGravadoI3>{'%.2f' % float(d13['MontoGravadoI3'])}</MontoGravadoI3>\n")
+    if d13.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d13['MontoExento'])}</MontoExento>\n")
+    if d13.get('ITBIS1') is not None:
+        p.append(f"      <ITBIS1>{xml_text(d13['ITBIS1'])}</ITBIS1>\n")
+    if d13.get('ITBIS2') is not None:
+        p.append(f"      <ITBIS2>{xml_text(d13['ITBIS2'])}</ITBIS2>\n")
+    if d13.get('ITBIS3') is not None:
+        p.append(f"      <ITBIS3>{xml_text(d13['ITBIS3'])}</ITBIS3>\n")
+    if d13.get('TotalITBIS') is not None:
+        p.append(f"      <TotalITBIS>{'%.2f' % float(d13['TotalITBIS'])}</TotalITBIS>\n")
+    if d13.get('TotalITBIS1') is not None:
+        p.append(f"      <TotalITBIS1>{'%.2f' % float(d13['TotalITBIS1'])}</TotalITBIS1>\n")
+    if d13.get('TotalITBIS2') is not None:
+        p.append(f"      <TotalITBIS2>{'%.2f' % float(d13['TotalITBIS2'])}</TotalITBIS2>\n")
+    if d13.get('TotalITBIS3') is not None:
+        p.append(f"      <TotalITBIS3>{'%.2f' % float(d13['TotalITBIS3'])}</TotalITBIS3>\n")
+    if d13.get('MontoImpuestoAdicional') is not None:
+        p.append(f"      <MontoImpuestoAdicional>{'%.2f' % float(d13['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>\n")
+    d14 = d13.get('ImpuestosAdicionales')
+    if d14:
+        p.append("      <ImpuestosAdicionales>\n")
+        n15 = len(p)
+        d16 = d14 if isinstance(d14, list) else d14.get('ImpuestoAdicional') or []
+        for d17 in (d16 if isinstance(d16, list) else (d16,)):
+            p.append("        <ImpuestoAdicional>\n")
+            n18 = len(p)
+            if d17.get('TipoImpuesto') is not None:
+                p.append(f"          <TipoImpuesto>{'%03d' % int(d17['TipoImpuesto'])}</TipoImpuesto>\n")
+            if d17.get('TasaImpuestoAdicional') is not None:
+                p.append(f"          <TasaImpuestoAdicional>{'%.2f' % float(d17['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>\n")
+            if d17.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d17['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>\n")
+            if d17.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d17['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>\n")
+            if d17.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"          <OtrosImpuestosAdicionales>{'%.2f' % float(d17['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>\n")
+            if len(p) == n18:
+                p[-1] = "        <ImpuestoAdicional/>\n"
+            else:
+                p.append("        </ImpuestoAdicional>\n")
+        if len(p) == n15:
+            p[-1] = "      <ImpuestosAdicionales/>\n"
+        else:
+            p.append("      </ImpuestosAdicionales>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d13['MontoTotal'])}</MontoTotal>\n")
+    if d13.get('MontoNoFacturable') is not None:
+        p.append(f"      <MontoNoFacturable>{'%.2f' % float(d13['MontoNoFacturable'])}</MontoNoFacturable>\n")
+    if d13.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d13['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d13.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d13['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d13.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d13['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d13.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d13['ValorPagar'])}</ValorPagar>\n")
+    if d13.get('TotalITBISRetenido') is not None:
+        p.append(f"      <TotalITBISRetenido>{'%.2f' % float(d13['TotalITBISRetenido'])}</TotalITBISRetenido>\n")
+    if d13.get('TotalISRRetencion') is not None:
+        p.append(f"      <TotalISRRetencion>{'%.2f' % float(d13['TotalISRRetencion'])}</TotalISRRetencion>\n")
+    if d13.get('TotalITBISPercepcion') is not None:
+        p.append(f"      <TotalITBISPercepcion>{'%.2f' % float(d13['TotalITBISPercepcion'])}</TotalITBISPercepcion>\n")
+    if d13.get('TotalISRPercepcion') is not None:
+        p.append(f"      <TotalISRPercepcion>{'%.2f' % float(d13['TotalISRPercepcion'])}</TotalISRPercepcion>\n")
+    p.append("    </Totales>\n")
+    d19 = d4.get('OtraMoneda')
+    if d19:
+        p.append("    <OtraMoneda>\n")
+        n20 = len(p)
+        if d19.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d19['TipoMoneda'])}</TipoMoneda>\n")
+        if d19.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d19['TipoCambio'])}</TipoCambio>\n")
+        if d19.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoGravadoTotalOtraMoneda>{'%.2f' % float(d19['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>\n")
+        if d19.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"      <MontoGravado1OtraMoneda>{'%.2f' % float(d19['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>\n")
+        if d19.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"      <MontoGravado2OtraMoneda>{'%.2f' % float(d19['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>\n")
+        if d19.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"      <MontoGravado3OtraMoneda>{'%.2f' % float(d19['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>\n")
+        if d19.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d19['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d19.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"      <TotalITBISOtraMoneda>{'%.2f' % float(d19['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>\n")
+        if d19.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS1OtraMoneda>{'%.2f' % float(d19['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>\n")
+        if d19.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS2OtraMoneda>{'%.2f' % float(d19['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>\n")
+        if d19.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS3OtraMoneda>{'%.2f' % float(d19['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>\n")
+        if d19.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"      <MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d19['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>\n")
+        d21 = d19.get('ImpuestosAdicionalesOtraMoneda')
+        if d21:
+            p.append("      <ImpuestosAdicionalesOtraMoneda>\n")
+            n22 = len(p)
+            d23 = d21 if isinstance(d21, list) else d21.get('ImpuestoAdicionalOtraMoneda') or []
+            for d24 in (d23 if isinstance(d23, list) else (d23,)):
+                p.append(f"        <ImpuestoAdicionalOtraMoneda>\n          <TipoImpuestoOtraMoneda>{'%03d' % int(d24['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda>\n          <TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d24['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>\n")
+                if d24.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"          <MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d24['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>\n")
+                if d24.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"          <MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d24['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>\n")
+                if d24.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"          <OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d24['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>\n")
+                p.append("        </ImpuestoAdicionalOtraMoneda>\n")
+            if len(p) == n22:
+                p[-1] = "      <ImpuestosAdicionalesOtraMoneda/>\n"
+            else:
+                p.append("      </ImpuestosAdicionalesOtraMoneda>\n")
+        if d19.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d19['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n20:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d25 = data.get('TablaCodigosItem')
+    if d25:
+        p.append("      <TablaCodigosItem>\n")
+        n26 = len(p)
+        d27 = d25 if isinstance(d25, list) else d25.get('CodigosItem') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d28['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d28['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n26:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n")
+    d29 = data.get('Retencion')
+    if d29:
+        p.append("      <Retencion>\n")
+        n30 = len(p)
+        if d29.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"        <IndicadorAgenteRetencionoPercepcion>{xml_text(d29['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>\n")
+        if d29.get('MontoITBISRetenido') is not None:
+            p.append(f"        <MontoITBISRetenido>{'%.2f' % float(d29['MontoITBISRetenido'])}</MontoITBISRetenido>\n")
+        if d29.get('MontoISRRetenido') is not None:
+            p.append(f"        <MontoISRRetenido>{'%.2f' % float(d29['MontoISRRetenido'])}</MontoISRRetenido>\n")
+        if len(p) == n30:
+            p[-1] = "      <Retencion/>\n"
+        else:
+            p.append("      </Retencion>\n")
+    p.append(f"      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"      <CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>\n")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"      <UnidadReferencia>{xml_text(data['UnidadReferencia'])}</UnidadReferencia>\n")
+    d31 = data.get('TablaSubcantidad')
+    if d31:
+        p.append("      <TablaSubcantidad>\n")
+        n32 = len(p)
+        d33 = d31 if isinstance(d31, list) else d31.get('SubcantidadItem') or []
+        for d34 in (d33 if isinstance(d33, list) else (d33,)):
+            p.append("        <SubcantidadItem>\n")
+            n35 = len(p)
+            if d34.get('Subcantidad') is not None:
+                p.append(f"          <Subcantidad>{'%.3f' % float(d34['Subcantidad'])}</Subcantidad>\n")
+            if d34.get('CodigoSubcantidad') is not None:
+                p.append(f"          <CodigoSubcantidad>{xml_text(d34['CodigoSubcantidad'])}</CodigoSubcantidad>\n")
+            if len(p) == n35:
+                p[-1] = "        <SubcantidadItem/>\n"
+            else:
+                p.append("        </SubcantidadItem>\n")
+        if len(p) == n32:
+            p[-1] = "      <TablaSubcantidad/>\n"
+        else:
+            p.append("      </TablaSubcantidad>\n")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"      <GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>\n")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"      <PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>\n")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"      <FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>\n")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"      <FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>\n")
+    d36 = data.get('Mineria')
+    if d36:
+        p.append("      <Mineria>\n")
+        n37 = len(p)
+        if d36.get('PesoNetoKilogramo') is not None:
+            p.append(f"        <PesoNetoKilogramo>{'%.3f' % float(d36['PesoNetoKilogramo'])}</PesoNetoKilogramo>\n")
+        if d36.get('PesoNetoMineria') is not None:
+            p.append(f"        <PesoNetoMineria>{'%.3f' % float(d36['PesoNetoMineria'])}</PesoNetoMineria>\n")
+        if d36.get('TipoAfiliacion') is not None:
+            p.append(f"        <TipoAfiliacion>{xml_text(d36['TipoAfiliacion'])}</TipoAfiliacion>\n")
+        if d36.get('Liquidacion') is not None:
+            p.append(f"        <Liquidacion>{xml_text(d36['Liquidacion'])}</Liquidacion>\n")
+        if len(p) == n37:
+            p[-1] = "      <Mineria/>\n"
+        else:
+            p.append("      </Mineria>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"      <DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>\n")
+    d38 = data.get('TablaSubDescuento')
+    if d38:
+        p.append("      <TablaSubDescuento>\n")
+        n39 = len(p)
+        d40 = d38 if isinstance(d38, list) else d38.get('SubDescuento') or []
+        for d41 in (d40 if isinstance(d40, list) else (d40,)):
+            p.append(f"        <SubDescuento>\n          <TipoSubDescuento>{xml_text(d41['TipoSubDescuento'])}</TipoSubDescuento>\n")
+            if d41.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"          <SubDescuentoPorcentaje>{'%.2f' % float(d41['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>\n")
+            if d41.get('MontoSubDescuento') is not None:
+                p.append(f"          <MontoSubDescuento>{'%.2f' % float(d41['MontoSubDescuento'])}</MontoSubDescuento>\n")
+            p.append("        </SubDescuento>\n")
+        if len(p) == n39:
+            p[-1] = "      <TablaSubDescuento/>\n"
+        else:
+            p.append("      </TablaSubDescuento>\n")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"      <RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>\n")
+    d42 = data.get('TablaSubRecargo')
+    if d42:
+        p.append("      <TablaSubRecargo>\n")
+        n43 = len(p)
+        d44 = d42 if isinstance(d42, list) else d42.get('SubRecargo') or []
+        for d45 in (d44 if isinstance(d44, list) else (d44,)):
+            p.append(f"        <SubRecargo>\n          <TipoSubRecargo>{xml_text(d45['TipoSubRecargo'])}</TipoSubRecargo>\n")
+            if d45.get('SubRecargoPorcentaje') is not None:
+                p.append(f"          <SubRecargoPorcentaje>{'%.2f' % float(d45['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>\n")
+            if d45.get('MontoSubRecargo') is not None:
+                p.append(f"          <MontoSubRecargo>{'%.2f' % float(d45['MontoSubRecargo'])}</MontoSubRecargo>\n")
+            p.append("        </SubRecargo>\n")
+        if len(p) == n43:
+            p[-1] = "      <TablaSubRecargo/>\n"
+        else:
+            p.append("      </TablaSubRecargo>\n")
+    d46 = data.get('TablaImpuestoAdicional')
+    if d46:
+        p.append("      <TablaImpuestoAdicional>\n")
+        n47 = len(p)
+        d48 = d46 if isinstance(d46, list) else d46.get('ImpuestoAdicional') or []
+        for d49 in (d48 if isinstance(d48, list) else (d48,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d49['TipoImpuesto'])}</TipoImpuesto>\n        </ImpuestoAdicional>\n")
+        if len(p) == n47:
+            p[-1] = "      <TablaImpuestoAdicional/>\n"
+        else:
+            p.append("      </TablaImpuestoAdicional>\n")
+    d50 = data.get('OtraMonedaDetalle')
+    if d50:
+        p.append("      <OtraMonedaDetalle>\n")
+        n51 = len(p)
+        if d50.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d50['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d50.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d50['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d50.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d50['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d50.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d50['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n51:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d52 = data.get('Subtotales')
+    if d52:
+        p.append("  <Subtotales>\n")
+        n53 = len(p)
+        d54 = d52 if isinstance(d52, list) else d52.get('Subtotal') or []
+        for d55 in (d54 if isinstance(d54, list) else (d54,)):
+            p.append("    <Subtotal>\n")
+            n56 = len(p)
+            if d55.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d55['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d55.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d55['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d55.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d55['Orden'])}</Orden>\n")
+            if d55.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"      <SubTotalMontoGravadoTotal>{'%.2f' % float(d55['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>\n")
+            if d55.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"      <SubTotalMontoGravadoI1>{'%.2f' % float(d55['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>\n")
+            if d55.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"      <SubTotalMontoGravadoI2>{'%.2f' % float(d55['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>\n")
+            if d55.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"      <SubTotalMontoGravadoI3>{'%.2f' % float(d55['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>\n")
+            if d55.get('SubTotaITBIS') is not None:
+                p.append(f"      <SubTotaITBIS>{'%.2f' % float(d55['SubTotaITBIS'])}</SubTotaITBIS>\n")
+            if d55.get('SubTotaITBIS1') is not None:
+                p.append(f"      <SubTotaITBIS1>{'%.2f' % float(d55['SubTotaITBIS1'])}</SubTotaITBIS1>\n")
+            if d55.get('SubTotaITBIS2') is not None:
+                p.append(f"      <SubTotaITBIS2>{'%.2f' % float(d55['SubTotaITBIS2'])}</SubTotaITBIS2>\n")
+            if d55.get('SubTotaITBIS3') is not None:
+                p.append(f"      <SubTotaITBIS3>{'%.2f' % float(d55['SubTotaITBIS3'])}</SubTotaITBIS3>\n")
+            if d55.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"      <SubTotalImpuestoAdicional>{'%.2f' % float(d55['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>\n")
+            if d55.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d55['SubTotalExento'])}</SubTotalExento>\n")
+            if d55.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d55['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d55.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d55['Lineas'])}</Lineas>\n")
+            if len(p) == n56:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n53:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    d57 = data.get('DescuentosORecargos')
+    if d57:
+        p.append("  <DescuentosORecargos>\n")
+        n58 = len(p)
+        d59 = d57 if isinstance(d57, list) else d57.get('DescuentoORecargo') or []
+        for d60 in (d59 if isinstance(d59, list) else (d59,)):
+            p.append(f"    <DescuentoORecargo>\n      <NumeroLinea>{xml_text(d60['NumeroLinea'])}</NumeroLinea>\n      <TipoAjuste>{xml_text(d60['TipoAjuste'])}</TipoAjuste>\n")
+            if d60.get('IndicadorNorma1007') is not None:
+                p.append(f"      <IndicadorNorma1007>{xml_text(d60['IndicadorNorma1007'])}</IndicadorNorma1007>\n")
+            if d60.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"      <DescripcionDescuentooRecargo>{xml_text(d60['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>\n")
+            if d60.get('TipoValor') is not None:
+                p.append(f"      <TipoValor>{xml_text(d60['TipoValor'])}</TipoValor>\n")
+            if d60.get('ValorDescuentooRecargo') is not None:
+                p.append(f"      <ValorDescuentooRecargo>{'%.2f' % float(d60['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>\n")
+            if d60.get('MontoDescuentooRecargo') is not None:
+                p.append(f"      <MontoDescuentooRecargo>{'%.2f' % float(d60['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>\n")
+            if d60.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"      <MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d60['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>\n")
+            if d60.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"      <IndicadorFacturacionDescuentooRecargo>{xml_text(d60['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>\n")
+            p.append("    </DescuentoORecargo>\n")
+        if len(p) == n58:
+            p[-1] = "  <DescuentosORecargos/>\n"
+        else:
+            p.append("  </DescuentosORecargos>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d61 = data.get('Paginacion')
+        if d61:
+            p.append("  <Paginacion>\n")
+            n62 = len(p)
+            d63 = d61 if isinstance(d61, list) else d61.get('Pagina') or []
+            for d64 in (d63 if isinstance(d63, list) else (d63,)):
+                p.append("    <Pagina>\n")
+                n65 = len(p)
+                if d64.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d64['PaginaNo'])}</PaginaNo>\n")
+                if d64.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d64['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d64.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d64['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d64.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(d64['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+                if d64.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(d64['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+                if d64.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(d64['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+                if d64.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(d64['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+                if d64.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d64['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d64.get('SubtotalItbisPagina') is not None:
+                    p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(d64['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+                if d64.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(d64['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+                if d64.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(d64['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+                if d64.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(d64['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+                if d64.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d64['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+                d66 = d64.get('SubtotalImpuestoAdicional')
+                if d66:
+                    p.append("      <SubtotalImpuestoAdicional>\n")
+                    n67 = len(p)
+                    if d66.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"        <SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d66['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>\n")
+                    if d66.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d66['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+                    if len(p) == n67:
+                        p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+                    else:
+                        p.append("      </SubtotalImpuestoAdicional>\n")
+                if d64.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d64['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if d64.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(d64['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+                if len(p) == n65:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n62:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d68 = data.get('InformacionReferencia')
+    if not d68:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'InformacionReferencia'")
+    p.append(f"  <InformacionReferencia>\n    <NCFModificado>{xml_text(d68['NCFModificado'])}</NCFModificado>\n")
+    if d68.get('RNCOtroContribuyente') is not None:
+        p.append(f"    <RNCOtroContribuyente>{xml_text(d68['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+    p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d68['FechaNCFModificado']))}</FechaNCFModificado>\n    <CodigoModificacion>{xml_text(d68['CodigoModificacion'])}</CodigoModificacion>\n")
+    if d68.get('RazonModificacion') is not None:
+        p.append(f"    <RazonModificacion>{xml_text(d68['RazonModificacion'])}</RazonModificacion>\n")
+    p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n69 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+    d70 = data.get('SubtotalImpuestoAdicional')
+    if d70:
+        p.append("      <SubtotalImpuestoAdicional>\n")
+        n71 = len(p)
+        if d70.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"        <SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d70['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>\n")
+        if d70.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d70['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+        if len(p) == n71:
+            p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+        else:
+            p.append("      </SubtotalImpuestoAdicional>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+    if len(p) == n69:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><IndicadorNotaCredito>{xml_text(d5['IndicadorNotaCredito'])}</IndicadorNotaCredito>")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos><TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d6 = d4.get('Emisor')
+    if not d6:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d6))
+    if d6.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{xml_text(d6['CodigoVendedor'])}</CodigoVendedor>")
+    if d6.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d6['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d6.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d6['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d6.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{xml_text(d6['ZonaVenta'])}</ZonaVenta>")
+    if d6.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{xml_text(d6['RutaVenta'])}</RutaVenta>")
+    if d6.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d6['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d6['FechaEmision']))}</FechaEmision></Emisor>")
+    d7 = d4.get('Comprador')
+    if d7:
+        p.append("<Comprador>")
+        n8 = len(p)
+        if d7.get('RNCComprador') is not None:
+            p.append(f"<RNCComprador>{xml_text(d7['RNCComprador'])}</RNCComprador>")
+        if d7.get('IdentificadorExtranjero') is not None:
+            p.append(f"<IdentificadorExtranjero>{xml_text(d7['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+        if d7.get('RazonSocialComprador') is not None:
+            p.append(f"<RazonSocialComprador>{xml_text(d7['RazonSocialComprador'])}</RazonSocialComprador>")
+        if d7.get('ContactoComprador') is not None:
+            p.append(f"<ContactoComprador>{xml_text(d7['ContactoComprador'])}</ContactoComprador>")
+        if d7.get('CorreoComprador') is not None:
+            p.append(f"<CorreoComprador>{xml_text(d7['CorreoComprador'])}</CorreoComprador>")
+        if d7.get('DireccionComprador') is not None:
+            p.append(f"<DireccionComprador>{xml_text(d7['DireccionComprador'])}</DireccionComprador>")
+        if d7.get('MunicipioComprador') is not None:
+            p.append(f"<MunicipioComprador>{'%06d' % int(d7['MunicipioComprador'])}</MunicipioComprador>")
+        if d7.get('ProvinciaComprador') is not None:
+            p.append(f"<ProvinciaComprador>{'%06d' % int(d7['ProvinciaComprador'])}</ProvinciaComprador>")
+        if d7.get('FechaEntrega') is not None:
+            p.append(f"<FechaEntrega>{xml_text(fmt_date(d7['FechaEntrega']))}</FechaEntrega>")
+        if d7.get('ContactoEntrega') is not None:
+            p.append(f"<ContactoEntrega>{xml_text(d7['ContactoEntrega'])}</ContactoEntrega>")
+        if d7.get('DireccionEntrega') is not None:
+            p.append(f"<DireccionEntrega>{xml_text(d7['DireccionEntrega'])}</DireccionEntrega>")
+        if d7.get('TelefonoAdicional') is not None:
+            p.append(f"<TelefonoAdicional>{xml_text(d7['TelefonoAdicional'])}</TelefonoAdicional>")
+        if d7.get('FechaOrdenCompra') is not None:
+            p.append(f"<FechaOrdenCompra>{xml_text(fmt_date(d7['FechaOrdenCompra']))}</FechaOrdenCompra>")
+        if d7.get('NumeroOrdenCompra') is not None:
+            p.append(f"<NumeroOrdenCompra>{xml_text(d7['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+        if d7.get('CodigoInternoComprador') is not None:
+            p.append(f"<CodigoInternoComprador>{xml_text(d7['CodigoInternoComprador'])}</CodigoInternoComprador>")
+        if d7.get('ResponsablePago') is not None:
+            p.append(f"<ResponsablePago>{xml_text(d7['ResponsablePago'])}</ResponsablePago>")
+        if d7.get('InformacionAdicionalComprador') is not None:
+            p.append(f"<InformacionAdicionalComprador>{xml_text(d7['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+        if len(p) == n8:
+            p[-1] = "<Comprador/>"
+        else:
+            p.append("</Comprador>")
+    d9 = d4.get('InformacionesAdicionales')
+    if d9:
+        p.append("<InformacionesAdicionales>")
+        n10 = len(p)
+        if d9.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{xml_text(fmt_date(d9['FechaEmbarque']))}</FechaEmbarque>")
+        if d9.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{xml_text(d9['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d9.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{xml_text(d9['NumeroContenedor'])}</NumeroContenedor>")
+        if d9.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{xml_text(d9['NumeroReferencia'])}</NumeroReferencia>")
+        if d9.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d9['PesoBruto'])}</PesoBruto>")
+        if d9.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d9['PesoNeto'])}</PesoNeto>")
+        if d9.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{xml_text(d9['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d9.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{xml_text(d9['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d9.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d9['CantidadBulto'])}</CantidadBulto>")
+        if d9.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{xml_text(d9['UnidadBulto'])}</UnidadBulto>")
+        if d9.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d9['VolumenBulto'])}</VolumenBulto>")
+        if d9.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{xml_text(d9['UnidadVolumen'])}</UnidadVolumen>")
+        if len(p) == n10:
+            p[-1] = "<InformacionesAdicionales/>"
+        else:
+            p.append("</InformacionesAdicionales>")
+    d11 = d4.get('Transporte')
+    if d11:
+        p.append("<Transporte>")
+        n12 = len(p)
+        if d11.get('Conductor') is not None:
+            p.append(f"<Conductor>{xml_text(d11['Conductor'])}</Conductor>")
+        if d11.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{xml_text(d11['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d11.get('Ficha') is not None:
+            p.append(f"<Ficha>{xml_text(d11['Ficha'])}</Ficha>")
+        if d11.get('Placa') is not None:
+            p.append(f"<Placa>{xml_text(d11['Placa'])}</Placa>")
+        if d11.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{xml_text(d11['RutaTransporte'])}</RutaTransporte>")
+        if d11.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{xml_text(d11['ZonaTransporte'])}</ZonaTransporte>")
+        if d11.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{xml_text(d11['NumeroAlbaran'])}</NumeroAlbaran>")
+        if len(p) == n12:
+            p[-1] = "<Transporte/>"
+        else:
+            p.append("</Transporte>")
+    d13 = d4.get('Totales')
+    if not d13:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d13.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d13['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d13.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d13['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d13.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d13['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d13.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d13['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d13.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d13['MontoExento'])}</MontoExento>")
+    if d13.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{xml_text(d13['ITBIS1'])}</ITBIS1>")
+    if d13.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{xml_text(d13['ITBIS2'])}</ITBIS2>")
+    if d13.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{xml_text(d13['ITBIS3'])}</ITBIS3>")
+    if d13.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d13['TotalITBIS'])}</TotalITBIS>")
+    if d13.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d13['TotalITBIS1'])}</TotalITBIS1>")
+    if d13.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d13['TotalITBIS2'])}</TotalITBIS2>")
+    if d13.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d13['TotalITBIS3'])}</TotalITBIS3>")
+    if d13.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d13['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d14 = d13.get('ImpuestosAdicionales')
+    if d14:
+        p.append("<ImpuestosAdicionales>")
+        n15 = len(p)
+        d16 = d14 if isinstance(d14, list) else d14.get('ImpuestoAdicional') or []
+        for d17 in (d16 if isinstance(d16, list) else (d16,)):
+            p.append("<ImpuestoAdicional>")
+            n18 = len(p)
+            if d17.get('TipoImpuesto') is not None:
+                p.append(f"<TipoImpuesto>{'%03d' % int(d17['TipoImpuesto'])}</TipoImpuesto>")
+            if d17.get('TasaImpuestoAdicional') is not None:
+                p.append(f"<TasaImpuestoAdicional>{'%.2f' % float(d17['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>")
+            if d17.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d17['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d17.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d17['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d17.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d17['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            if len(p) == n18:
+                p[-1] = "<ImpuestoAdicional/>"
+            else:
+                p.append("</ImpuestoAdicional>")
+        if len(p) == n15:
+            p[-1] = "<ImpuestosAdicionales/>"
+        else:
+            p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d13['MontoTotal'])}</MontoTotal>")
+    if d13.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d13['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d13.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d13['MontoPeriodo'])}</MontoPeriodo>")
+    if d13.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d13['SaldoAnterior'])}</SaldoAnterior>")
+    if d13.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d13['MontoAvancePago'])}</MontoAvancePago>")
+    if d13.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d13['ValorPagar'])}</ValorPagar>")
+    if d13.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d13['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d13.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d13['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d13.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d13['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d13.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d13['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d19 = d4.get('OtraMoneda')
+    if d19:
+        p.append("<OtraMoneda>")
+        n20 = len(p)
+        if d19.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d19['TipoMoneda'])}</TipoMoneda>")
+        if d19.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d19['TipoCambio'])}</TipoCambio>")
+        if d19.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d19['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d19.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d19['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d19.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d19['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d19.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d19['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d19.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d19['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d19.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d19['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d19.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d19['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d19.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d19['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d19.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d19['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d19.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d19['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d21 = d19.get('ImpuestosAdicionalesOtraMoneda')
+        if d21:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            n22 = len(p)
+            d23 = d21 if isinstance(d21, list) else d21.get('ImpuestoAdicionalOtraMoneda') or []
+            for d24 in (d23 if isinstance(d23, list) else (d23,)):
+                p.append(f"<ImpuestoAdicionalOtraMoneda><TipoImpuestoOtraMoneda>{'%03d' % int(d24['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda><TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d24['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d24.get('MontoImpuestoSelectivoConsumoEspecificoOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>{'%.2f' % float(d24['MontoImpuestoSelectivoConsumoEspecificoOtraMoneda'])}</MontoImpuestoSelectivoConsumoEspecificoOtraMoneda>")
+                if d24.get('MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda') is not None:
+                    p.append(f"<MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>{'%.2f' % float(d24['MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda'])}</MontoImpuestoSelectivoConsumoAdvaloremOtraMoneda>")
+                if d24.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d24['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            if len(p) == n22:
+                p[-1] = "<ImpuestosAdicionalesOtraMoneda/>"
+            else:
+                p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d19.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d19['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n20:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d25 = data.get('TablaCodigosItem')
+    if d25:
+        p.append("<TablaCodigosItem>")
+        n26 = len(p)
+        d27 = d25 if isinstance(d25, list) else d25.get('CodigosItem') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d28['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d28['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n26:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d29 = data.get('Retencion')
+    if d29:
+        p.append("<Retencion>")
+        n30 = len(p)
+        if d29.get('IndicadorAgenteRetencionoPercepcion') is not None:
+            p.append(f"<IndicadorAgenteRetencionoPercepcion>{xml_text(d29['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+        if d29.get('MontoITBISRetenido') is not None:
+            p.append(f"<MontoITBISRetenido>{'%.2f' % float(d29['MontoITBISRetenido'])}</MontoITBISRetenido>")
+        if d29.get('MontoISRRetenido') is not None:
+            p.append(f"<MontoISRRetenido>{'%.2f' % float(d29['MontoISRRetenido'])}</MontoISRRetenido>")
+        if len(p) == n30:
+            p[-1] = "<Retencion/>"
+        else:
+            p.append("</Retencion>")
+    p.append(f"<NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('CantidadReferencia') is not None:
+        p.append(f"<CantidadReferencia>{'%.2f' % float(data['CantidadReferencia'])}</CantidadReferencia>")
+    if data.get('UnidadReferencia') is not None:
+        p.append(f"<UnidadReferencia>{xml_text(data['UnidadReferencia'])}</UnidadReferencia>")
+    d31 = data.get('TablaSubcantidad')
+    if d31:
+        p.append("<TablaSubcantidad>")
+        n32 = len(p)
+        d33 = d31 if isinstance(d31, list) else d31.get('SubcantidadItem') or []
+        for d34 in (d33 if isinstance(d33, list) else (d33,)):
+            p.append("<SubcantidadItem>")
+            n35 = len(p)
+            if d34.get('Subcantidad') is not None:
+                p.append(f"<Subcantidad>{'%.3f' % float(d34['Subcantidad'])}</Subcantidad>")
+            if d34.get('CodigoSubcantidad') is not None:
+                p.append(f"<CodigoSubcantidad>{xml_text(d34['CodigoSubcantidad'])}</CodigoSubcantidad>")
+            if len(p) == n35:
+                p[-1] = "<SubcantidadItem/>"
+            else:
+                p.append("</SubcantidadItem>")
+        if len(p) == n32:
+            p[-1] = "<TablaSubcantidad/>"
+        else:
+            p.append("</TablaSubcantidad>")
+    if data.get('GradosAlcohol') is not None:
+        p.append(f"<GradosAlcohol>{'%.2f' % float(data['GradosAlcohol'])}</GradosAlcohol>")
+    if data.get('PrecioUnitarioReferencia') is not None:
+        p.append(f"<PrecioUnitarioReferencia>{'%.2f' % float(data['PrecioUnitarioReferencia'])}</PrecioUnitarioReferencia>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    d36 = data.get('Mineria')
+    if d36:
+        p.append("<Mineria>")
+        n37 = len(p)
+        if d36.get('PesoNetoKilogramo') is not None:
+            p.append(f"<PesoNetoKilogramo>{'%.3f' % float(d36['PesoNetoKilogramo'])}</PesoNetoKilogramo>")
+        if d36.get('PesoNetoMineria') is not None:
+            p.append(f"<PesoNetoMineria>{'%.3f' % float(d36['PesoNetoMineria'])}</PesoNetoMineria>")
+        if d36.get('TipoAfiliacion') is not None:
+            p.append(f"<TipoAfiliacion>{xml_text(d36['TipoAfiliacion'])}</TipoAfiliacion>")
+        if d36.get('Liquidacion') is not None:
+            p.append(f"<Liquidacion>{xml_text(d36['Liquidacion'])}</Liquidacion>")
+        if len(p) == n37:
+            p[-1] = "<Mineria/>"
+        else:
+            p.append("</Mineria>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d38 = data.get('TablaSubDescuento')
+    if d38:
+        p.append("<TablaSubDescuento>")
+        n39 = len(p)
+        d40 = d38 if isinstance(d38, list) else d38.get('SubDescuento') or []
+        for d41 in (d40 if isinstance(d40, list) else (d40,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{xml_text(d41['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d41.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d41['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d41.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d41['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        if len(p) == n39:
+            p[-1] = "<TablaSubDescuento/>"
+        else:
+            p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d42 = data.get('TablaSubRecargo')
+    if d42:
+        p.append("<TablaSubRecargo>")
+        n43 = len(p)
+        d44 = d42 if isinstance(d42, list) else d42.get('SubRecargo') or []
+        for d45 in (d44 if isinstance(d44, list) else (d44,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{xml_text(d45['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d45.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d45['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d45.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d45['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        if len(p) == n43:
+            p[-1] = "<TablaSubRecargo/>"
+        else:
+            p.append("</TablaSubRecargo>")
+    d46 = data.get('TablaImpuestoAdicional')
+    if d46:
+        p.append("<TablaImpuestoAdicional>")
+        n47 = len(p)
+        d48 = d46 if isinstance(d46, list) else d46.get('ImpuestoAdicional') or []
+        for d49 in (d48 if isinstance(d48, list) else (d48,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d49['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        if len(p) == n47:
+            p[-1] = "<TablaImpuestoAdicional/>"
+        else:
+            p.append("</TablaImpuestoAdicional>")
+    d50 = data.get('OtraMonedaDetalle')
+    if d50:
+        p.append("<OtraMonedaDetalle>")
+        n51 = len(p)
+        if d50.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d50['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d50.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d50['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d50.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d50['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d50.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d50['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n51:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d52 = data.get('Subtotales')
+    if d52:
+        p.append("<Subtotales>")
+        n53 = len(p)
+        d54 = d52 if isinstance(d52, list) else d52.get('Subtotal') or []
+        for d55 in (d54 if isinstance(d54, list) else (d54,)):
+            p.append("<Subtotal>")
+            n56 = len(p)
+            if d55.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d55['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d55.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d55['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d55.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d55['Orden'])}</Orden>")
+            if d55.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d55['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d55.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d55['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d55.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d55['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d55.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d55['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d55.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d55['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d55.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d55['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d55.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d55['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d55.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d55['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d55.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d55['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d55.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d55['SubTotalExento'])}</SubTotalExento>")
+            if d55.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d55['MontoSubTotal'])}</MontoSubTotal>")
+            if d55.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d55['Lineas'])}</Lineas>")
+            if len(p) == n56:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n53:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    d57 = data.get('DescuentosORecargos')
+    if d57:
+        p.append("<DescuentosORecargos>")
+        n58 = len(p)
+        d59 = d57 if isinstance(d57, list) else d57.get('DescuentoORecargo') or []
+        for d60 in (d59 if isinstance(d59, list) else (d59,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{xml_text(d60['NumeroLinea'])}</NumeroLinea><TipoAjuste>{xml_text(d60['TipoAjuste'])}</TipoAjuste>")
+            if d60.get('IndicadorNorma1007') is not None:
+                p.append(f"<IndicadorNorma1007>{xml_text(d60['IndicadorNorma1007'])}</IndicadorNorma1007>")
+            if d60.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{xml_text(d60['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d60.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{xml_text(d60['TipoValor'])}</TipoValor>")
+            if d60.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d60['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d60.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d60['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d60.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d60['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d60.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{xml_text(d60['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        if len(p) == n58:
+            p[-1] = "<DescuentosORecargos/>"
+        else:
+            p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d61 = data.get('Paginacion')
+        if d61:
+            p.append("<Paginacion>")
+            n62 = len(p)
+            d63 = d61 if isinstance(d61, list) else d61.get('Pagina') or []
+            for d64 in (d63 if isinstance(d63, list) else (d63,)):
+                p.append("<Pagina>")
+                n65 = len(p)
+                if d64.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d64['PaginaNo'])}</PaginaNo>")
+                if d64.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d64['NoLineaDesde'])}</NoLineaDesde>")
+                if d64.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d64['NoLineaHasta'])}</NoLineaHasta>")
+                if d64.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d64['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d64.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d64['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d64.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d64['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d64.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d64['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d64.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d64['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d64.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d64['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d64.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d64['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d64.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d64['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d64.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d64['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d64.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d64['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d66 = d64.get('SubtotalImpuestoAdicional')
+                if d66:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    n67 = len(p)
+                    if d66.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+                        p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d66['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+                    if d66.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d66['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    if len(p) == n67:
+                        p[-1] = "<SubtotalImpuestoAdicional/>"
+                    else:
+                        p.append("</SubtotalImpuestoAdicional>")
+                if d64.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d64['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d64.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d64['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                if len(p) == n65:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n62:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d68 = data.get('InformacionReferencia')
+    if not d68:
+        raise ValueError("El e-CF tipo 34 requiere bloque 'InformacionReferencia'")
+    p.append(f"<InformacionReferencia><NCFModificado>{xml_text(d68['NCFModificado'])}</NCFModificado>")
+    if d68.get('RNCOtroContribuyente') is not None:
+        p.append(f"<RNCOtroContribuyente>{xml_text(d68['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+    p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d68['FechaNCFModificado']))}</FechaNCFModificado><CodigoModificacion>{xml_text(d68['CodigoModificacion'])}</CodigoModificacion>")
+    if d68.get('RazonModificacion') is not None:
+        p.append(f"<RazonModificacion>{xml_text(d68['RazonModificacion'])}</RazonModificacion>")
+    p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n69 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d70 = data.get('SubtotalImpuestoAdicional')
+    if d70:
+        p.append("<SubtotalImpuestoAdicional>")
+        n71 = len(p)
+        if d70.get('SubtotalImpuestoSelectivoConsumoEspecificoPagina') is not None:
+            p.append(f"<SubtotalImpuestoSelectivoConsumoEspecificoPagina>{'%.2f' % float(d70['SubtotalImpuestoSelectivoConsumoEspecificoPagina'])}</SubtotalImpuestoSelectivoConsumoEspecificoPagina>")
+        if d70.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d70['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        if len(p) == n71:
+            p[-1] = "<SubtotalImpuestoAdicional/>"
+        else:
+            p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    if len(p) == n69:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
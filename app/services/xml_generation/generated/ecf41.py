@@ -0,0 +1,1390 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 41 v.1.0 (1).xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 41
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{esc(d4['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d4.get('TipoPago') is not None:
+        p.append(f"<TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{esc(d4['TerminoPago'])}</TerminoPago>")
+    d5 = d4.get('TablaFormasPago')
+    if d5:
+        p.append("<TablaFormasPago>")
+        d6 = d5 if isinstance(d5, list) else d5.get('FormaDePago') or []
+        for d7 in (d6 if isinstance(d6, list) else (d6,)):
+            p.append(f"<FormaDePago><FormaPago>{esc(d7['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d7['MontoPago'])}</MontoPago></FormaDePago>")
+        p.append("</TablaFormasPago>")
+    if d4.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{esc(d4['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d4.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{esc(d4['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d4.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{esc(d4['BancoPago'])}</BancoPago>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d8 = d3.get('Emisor')
+    if not d8:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d8))
+    if d8.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d8['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d8.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d8['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d8.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d8['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d3.get('Comprador')
+    if not d9:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Comprador'")
+    p.append(f"<Comprador><RNCComprador>{esc(d9['RNCComprador'])}</RNCComprador><RazonSocialComprador>{esc(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d9.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{esc(d9['ContactoComprador'])}</ContactoComprador>")
+    if d9.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{esc(d9['CorreoComprador'])}</CorreoComprador>")
+    if d9.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{esc(d9['DireccionComprador'])}</DireccionComprador>")
+    if d9.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d9['MunicipioComprador'])}</MunicipioComprador>")
+    if d9.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d9['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d9.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{esc(d9['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d9.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{esc(d9['ResponsablePago'])}</ResponsablePago>")
+    if d9.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{esc(d9['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d10 = d3.get('Totales')
+    if not d10:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d10.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d10['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d10.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d10['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d10.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d10['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d10.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d10['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d10.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d10['MontoExento'])}</MontoExento>")
+    if d10.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{esc(d10['ITBIS1'])}</ITBIS1>")
+    if d10.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{esc(d10['ITBIS2'])}</ITBIS2>")
+    if d10.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{esc(d10['ITBIS3'])}</ITBIS3>")
+    if d10.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d10['TotalITBIS'])}</TotalITBIS>")
+    if d10.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d10['TotalITBIS1'])}</TotalITBIS1>")
+    if d10.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d10['TotalITBIS2'])}</TotalITBIS2>")
+    if d10.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d10['TotalITBIS3'])}</TotalITBIS3>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d10['MontoTotal'])}</MontoTotal>")
+    if d10.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d10['MontoPeriodo'])}</MontoPeriodo>")
+    if d10.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d10['SaldoAnterior'])}</SaldoAnterior>")
+    if d10.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d10['MontoAvancePago'])}</MontoAvancePago>")
+    if d10.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d10['ValorPagar'])}</ValorPagar>")
+    if d10.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d10['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d10.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d10['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d10.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d10['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d10.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d10['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d11 = d3.get('OtraMoneda')
+    if d11:
+        p.append("<OtraMoneda>")
+        if d11.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d11['TipoMoneda'])}</TipoMoneda>")
+        if d11.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d11['TipoCambio'])}</TipoCambio>")
+        if d11.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d11['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d11.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d11['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d11.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d11['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d11.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d11['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d11.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d11['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d11.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d11['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d11.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d11['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d11.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d11['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d11.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d11['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d11.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d11['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d12 = data.get('TablaCodigosItem')
+    if d12:
+        p.append("<TablaCodigosItem>")
+        d13 = d12 if isinstance(d12, list) else d12.get('CodigosItem') or []
+        for d14 in (d13 if isinstance(d13, list) else (d13,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d14['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d14['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d15 = data.get('Retencion')
+    if not d15:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Retencion'")
+    p.append(f"<Retencion><IndicadorAgenteRetencionoPercepcion>{esc(d15['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+    if d15.get('MontoITBISRetenido') is not None:
+        p.append(f"<MontoITBISRetenido>{'%.2f' % float(d15['MontoITBISRetenido'])}</MontoITBISRetenido>")
+    if d15.get('MontoISRRetenido') is not None:
+        p.append(f"<MontoISRRetenido>{'%.2f' % float(d15['MontoISRRetenido'])}</MontoISRRetenido>")
+    p.append(f"</Retencion><NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{esc(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{esc(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d16 = data.get('TablaSubDescuento')
+    if d16:
+        p.append("<TablaSubDescuento>")
+        d17 = d16 if isinstance(d16, list) else d16.get('SubDescuento') or []
+        for d18 in (d17 if isinstance(d17, list) else (d17,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{esc(d18['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d18.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d18['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d18.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d18['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d19 = data.get('TablaSubRecargo')
+    if d19:
+        p.append("<TablaSubRecargo>")
+        d20 = d19 if isinstance(d19, list) else d19.get('SubRecargo') or []
+        for d21 in (d20 if isinstance(d20, list) else (d20,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{esc(d21['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d21.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d21['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d21.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d21['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        p.append("</TablaSubRecargo>")
+    d22 = data.get('OtraMonedaDetalle')
+    if d22:
+        p.append("<OtraMonedaDetalle>")
+        if d22.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d22['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d22.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d22['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d22.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d22['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d22.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d22['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d23 = data.get('Subtotales')
+    if d23:
+        p.append("<Subtotales>")
+        d24 = d23 if isinstance(d23, list) else d23.get('Subtotal') or []
+        for d25 in (d24 if isinstance(d24, list) else (d24,)):
+            p.append("<Subtotal>")
+            if d25.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d25['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d25.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d25['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d25.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d25['Orden'])}</Orden>")
+            if d25.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d25['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d25.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d25['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d25.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d25['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d25.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d25['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d25.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d25['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d25.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d25['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d25.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d25['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d25.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d25['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d25.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d25['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d25.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d25['SubTotalExento'])}</SubTotalExento>")
+            if d25.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d25['MontoSubTotal'])}</MontoSubTotal>")
+            if d25.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d25['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    d26 = data.get('DescuentosORecargos')
+    if d26:
+        p.append("<DescuentosORecargos>")
+        d27 = d26 if isinstance(d26, list) else d26.get('DescuentoORecargo') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{esc(d28['NumeroLinea'])}</NumeroLinea><TipoAjuste>{esc(d28['TipoAjuste'])}</TipoAjuste>")
+            if d28.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{esc(d28['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d28.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{esc(d28['TipoValor'])}</TipoValor>")
+            if d28.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d28['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d28.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d28['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d28.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d28['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d28.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{esc(d28['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d29 = data.get('Paginacion')
+        if d29:
+            p.append("<Paginacion>")
+            d30 = d29 if isinstance(d29, list) else d29.get('Pagina') or []
+            for d31 in (d30 if isinstance(d30, list) else (d30,)):
+                p.append("<Pagina>")
+                if d31.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d31['PaginaNo'])}</PaginaNo>")
+                if d31.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d31['NoLineaDesde'])}</NoLineaDesde>")
+                if d31.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d31['NoLineaHasta'])}</NoLineaHasta>")
+                if d31.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d31['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d31.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d31['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d31.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d31['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d31.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d31['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d31.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d31['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d31.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d31['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d31.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d31['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d31.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d31['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d31.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d31['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d31.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d31['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d32 = data.get('InformacionReferencia')
+    if d32:
+        p.append("<InformacionReferencia>")
+        if d32.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{esc(d32['NCFModificado'])}</NCFModificado>")
+        if d32.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{esc(d32['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d32.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{esc(fmt_date(d32['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d32.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{esc(d32['CodigoModificacion'])}</CodigoModificacion>")
+        p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"      <IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>\n")
+    if d5.get('TipoPago') is not None:
+        p.append(f"      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"      <TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>\n")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("      <TablaFormasPago>\n")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"        <FormaDePago>\n          <FormaPago>{xml_text(d9['FormaPago'])}</FormaPago>\n          <MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago>\n        </FormaDePago>\n")
+        if len(p) == n7:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"      <TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>\n")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"      <NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>\n")
+    if d5.get('BancoPago') is not None:
+        p.append(f"      <BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d10))
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Comprador'")
+    p.append(f"    <Comprador>\n      <RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>\n      <RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>\n")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"      <ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>\n")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"      <CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>\n")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"      <DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>\n")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"      <MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>\n")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"      <ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>\n")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"      <CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>\n")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"      <ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>\n")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"      <InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>\n")
+    p.append("    </Comprador>\n")
+    d12 = d4.get('Totales')
+    if not d12:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d12.get('MontoGravadoTotal') is not None:
+        p.append(f"      <MontoGravadoTotal>{'%.2f' % float(d12['MontoGravadoTotal'])}</MontoGravadoTotal>\n")
+    if d12.get('MontoGravadoI1') is not None:
+        p.append(f"      <MontoGravadoI1>{'%.2f' % float(d12['MontoGravadoI1'])}</MontoGravadoI1>\n")
+    if d12.get('MontoGravadoI2') is not None:
+        p.append(f"      <MontoGravadoI2>{'%.2f' % float(d12['MontoGravadoI2'])}</MontoGravadoI2>\n")
+    if d12.get('MontoGravadoI3') is not None:
+        p.append(f"      <MontoGravadoI3>{'%.2f' % float(d12['MontoGravadoI3'])}</MontoGravadoI3>\n")
+    if d12.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d12['MontoExento'])}</MontoExento>\n")
+    if d12.get('ITBIS1') is not None:
+        p.append(f"      <ITBIS1>{xml_text(d12['ITBIS1'])}</ITBIS1>\n")
+    if d12.get('ITBIS2') is not None:
+        p.append(f"      <ITBIS2>{xml_text(d12['ITBIS2'])}</ITBIS2>\n")
+    if d12.get('ITBIS3') is not None:
+        p.append(f"      <ITBIS3>{xml_text(d12['ITBIS3'])}</ITBIS3>\n")
+    if d12.get('TotalITBIS') is not None:
+        p.append(f"      <TotalITBIS>{'%.2f' % float(d12['TotalITBIS'])}</TotalITBIS>\n")
+    if d12.get('TotalITBIS1') is not None:
+        p.append(f"      <TotalITBIS1>{'%.2f' % float(d12['TotalITBIS1'])}</TotalITBIS1>\n")
+    if d12.get('TotalITBIS2') is not None:
+        p.append(f"      <TotalITBIS2>{'%.2f' % float(d12['TotalITBIS2'])}</TotalITBIS2>\n")
+    if d12.get('TotalITBIS3') is not None:
+        p.append(f"      <TotalITBIS3>{'%.2f' % float(d12['TotalITBIS3'])}</TotalITBIS3>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d12['MontoTotal'])}</MontoTotal>\n")
+    if d12.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d12['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d12.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d12['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d12.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d12['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d12.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d12['ValorPagar'])}</ValorPagar>\n")
+    if d12.get('TotalITBISRetenido') is not None:
+        p.append(f"      <TotalITBISRetenido>{'%.2f' % float(d12['TotalITBISRetenido'])}</TotalITBISRetenido>\n")
+    if d12.get('TotalISRRetencion') is not None:
+        p.append(f"      <TotalISRRetencion>{'%.2f' % float(d12['TotalISRRetencion'])}</TotalISRRetencion>\n")
+    if d12.get('TotalITBISPercepcion') is not None:
+        p.append(f"      <TotalITBISPercepcion>{'%.2f' % float(d12['TotalITBISPercepcion'])}</TotalITBISPercepcion>\n")
+    if d12.get('TotalISRPercepcion') is not None:
+        p.append(f"      <TotalISRPercepcion>{'%.2f' % float(d12['TotalISRPercepcion'])}</TotalISRPercepcion>\n")
+    p.append("    </Totales>\n")
+    d13 = d4.get('OtraMoneda')
+    if d13:
+        p.append("    <OtraMoneda>\n")
+        n14 = len(p)
+        if d13.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d13['TipoMoneda'])}</TipoMoneda>\n")
+        if d13.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d13['TipoCambio'])}</TipoCambio>\n")
+        if d13.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoGravadoTotalOtraMoneda>{'%.2f' % float(d13['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>\n")
+        if d13.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"      <MontoGravado1OtraMoneda>{'%.2f' % float(d13['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>\n")
+        if d13.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"      <MontoGravado2OtraMoneda>{'%.2f' % float(d13['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>\n")
+        if d13.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"      <MontoGravado3OtraMoneda>{'%.2f' % float(d13['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>\n")
+        if d13.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d13['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d13.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"      <TotalITBISOtraMoneda>{'%.2f' % float(d13['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>\n")
+        if d13.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS1OtraMoneda>{'%.2f' % float(d13['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>\n")
+        if d13.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS2OtraMoneda>{'%.2f' % float(d13['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>\n")
+        if d13.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS3OtraMoneda>{'%.2f' % float(d13['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>\n")
+        if d13.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d13['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n14:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d15 = data.get('TablaCodigosItem')
+    if d15:
+        p.append("      <TablaCodigosItem>\n")
+        n16 = len(p)
+        d17 = d15 if isinstance(d15, list) else d15.get('CodigosItem') or []
+        for d18 in (d17 if isinstance(d17, list) else (d17,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d18['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d18['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n16:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n")
+    d19 = data.get('Retencion')
+    if not d19:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Retencion'")
+    p.append(f"      <Retencion>\n        <IndicadorAgenteRetencionoPercepcion>{xml_text(d19['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>\n")
+    if d19.get('MontoITBISRetenido') is not None:
+        p.append(f"        <MontoITBISRetenido>{'%.2f' % float(d19['MontoITBISRetenido'])}</MontoITBISRetenido>\n")
+    if d19.get('MontoISRRetenido') is not None:
+        p.append(f"        <MontoISRRetenido>{'%.2f' % float(d19['MontoISRRetenido'])}</MontoISRRetenido>\n")
+    p.append(f"      </Retencion>\n      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"      <FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>\n")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"      <FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"      <DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>\n")
+    d20 = data.get('TablaSubDescuento')
+    if d20:
+        p.append("      <TablaSubDescuento>\n")
+        n21 = len(p)
+        d22 = d20 if isinstance(d20, list) else d20.get('SubDescuento') or []
+        for d23 in (d22 if isinstance(d22, list) else (d22,)):
+            p.append(f"        <SubDescuento>\n          <TipoSubDescuento>{xml_text(d23['TipoSubDescuento'])}</TipoSubDescuento>\n")
+            if d23.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"          <SubDescuentoPorcentaje>{'%.2f' % float(d23['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>\n")
+            if d23.get('MontoSubDescuento') is not None:
+                p.append(f"          <MontoSubDescuento>{'%.2f' % float(d23['MontoSubDescuento'])}</MontoSubDescuento>\n")
+            p.append("        </SubDescuento>\n")
+        if len(p) == n21:
+            p[-1] = "      <TablaSubDescuento/>\n"
+        else:
+            p.append("      </TablaSubDescuento>\n")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"      <RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>\n")
+    d24 = data.get('TablaSubRecargo')
+    if d24:
+        p.append("      <TablaSubRecargo>\n")
+        n25 = len(p)
+        d26 = d24 if isinstance(d24, list) else d24.get('SubRecargo') or []
+        for d27 in (d26 if isinstance(d26, list) else (d26,)):
+            p.append(f"        <SubRecargo>\n          <TipoSubRecargo>{xml_text(d27['TipoSubRecargo'])}</TipoSubRecargo>\n")
+            if d27.get('SubRecargoPorcentaje') is not None:
+                p.append(f"          <SubRecargoPorcentaje>{'%.2f' % float(d27['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>\n")
+            if d27.get('MontoSubRecargo') is not None:
+                p.append(f"          <MontoSubRecargo>{'%.2f' % float(d27['MontoSubRecargo'])}</MontoSubRecargo>\n")
+            p.append("        </SubRecargo>\n")
+        if len(p) == n25:
+            p[-1] = "      <TablaSubRecargo/>\n"
+        else:
+            p.append("      </TablaSubRecargo>\n")
+    d28 = data.get('OtraMonedaDetalle')
+    if d28:
+        p.append("      <OtraMonedaDetalle>\n")
+        n29 = len(p)
+        if d28.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d28['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d28.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d28['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d28.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d28['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d28.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d28['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n29:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d30 = data.get('Subtotales')
+    if d30:
+        p.append("  <Subtotales>\n")
+        n31 = len(p)
+        d32 = d30 if isinstance(d30, list) else d30.get('Subtotal') or []
+        for d33 in (d32 if isinstance(d32, list) else (d32,)):
+            p.append("    <Subtotal>\n")
+            n34 = len(p)
+            if d33.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d33['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d33.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d33['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d33.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d33['Orden'])}</Orden>\n")
+            if d33.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"      <SubTotalMontoGravadoTotal>{'%.2f' % float(d33['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>\n")
+            if d33.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"      <SubTotalMontoGravadoI1>{'%.2f' % float(d33['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>\n")
+            if d33.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"      <SubTotalMontoGravadoI2>{'%.2f' % float(d33['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>\n")
+            if d33.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"      <SubTotalMontoGravadoI3>{'%.2f' % float(d33['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>\n")
+            if d33.get('SubTotaITBIS') is not None:
+                p.append(f"      <SubTotaITBIS>{'%.2f' % float(d33['SubTotaITBIS'])}</SubTotaITBIS>\n")
+            if d33.get('SubTotaITBIS1') is not None:
+                p.append(f"      <SubTotaITBIS1>{'%.2f' % float(d33['SubTotaITBIS1'])}</SubTotaITBIS1>\n")
+            if d33.get('SubTotaITBIS2') is not None:
+                p.append(f"      <SubTotaITBIS2>{'%.2f' % float(d33['SubTotaITBIS2'])}</SubTotaITBIS2>\n")
+            if d33.get('SubTotaITBIS3') is not None:
+                p.append(f"      <SubTotaITBIS3>{'%.2f' % float(d33['SubTotaITBIS3'])}</SubTotaITBIS3>\n")
+            if d33.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"      <SubTotalImpuestoAdicional>{'%.2f' % float(d33['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>\n")
+            if d33.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d33['SubTotalExento'])}</SubTotalExento>\n")
+            if d33.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d33['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d33.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d33['Lineas'])}</Lineas>\n")
+            if len(p) == n34:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n31:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    d35 = data.get('DescuentosORecargos')
+    if d35:
+        p.append("  <DescuentosORecargos>\n")
+        n36 = len(p)
+        d37 = d35 if isinstance(d35, list) else d35.get('DescuentoORecargo') or []
+        for d38 in (d37 if isinstance(d37, list) else (d37,)):
+            p.append(f"    <DescuentoORecargo>\n      <NumeroLinea>{xml_text(d38['NumeroLinea'])}</NumeroLinea>\n      <TipoAjuste>{xml_text(d38['TipoAjuste'])}</TipoAjuste>\n")
+            if d38.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"      <DescripcionDescuentooRecargo>{xml_text(d38['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>\n")
+            if d38.get('TipoValor') is not None:
+                p.append(f"      <TipoValor>{xml_text(d38['TipoValor'])}</TipoValor>\n")
+            if d38.get('ValorDescuentooRecargo') is not None:
+                p.append(f"      <ValorDescuentooRecargo>{'%.2f' % float(d38['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>\n")
+            if d38.get('MontoDescuentooRecargo') is not None:
+                p.append(f"      <MontoDescuentooRecargo>{'%.2f' % float(d38['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>\n")
+            if d38.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"      <MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d38['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>\n")
+            if d38.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"      <IndicadorFacturacionDescuentooRecargo>{xml_text(d38['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>\n")
+            p.append("    </DescuentoORecargo>\n")
+        if len(p) == n36:
+            p[-1] = "  <DescuentosORecargos/>\n"
+        else:
+            p.append("  </DescuentosORecargos>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d39 = data.get('Paginacion')
+        if d39:
+            p.append("  <Paginacion>\n")
+            n40 = len(p)
+            d41 = d39 if isinstance(d39, list) else d39.get('Pagina') or []
+            for d42 in (d41 if isinstance(d41, list) else (d41,)):
+                p.append("    <Pagina>\n")
+                n43 = len(p)
+                if d42.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d42['PaginaNo'])}</PaginaNo>\n")
+                if d42.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d42['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d42.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d42['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d42.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(d42['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+                if d42.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(d42['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+                if d42.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(d42['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+                if d42.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(d42['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+                if d42.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d42['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d42.get('SubtotalItbisPagina') is not None:
+                    p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(d42['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+                if d42.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(d42['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+                if d42.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(d42['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+                if d42.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(d42['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+                if d42.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d42['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if len(p) == n43:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n40:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d44 = data.get('InformacionReferencia')
+    if d44:
+        p.append("  <InformacionReferencia>\n")
+        n45 = len(p)
+        if d44.get('NCFModificado') is not None:
+            p.append(f"    <NCFModificado>{xml_text(d44['NCFModificado'])}</NCFModificado>\n")
+        if d44.get('RNCOtroContribuyente') is not None:
+            p.append(f"    <RNCOtroContribuyente>{xml_text(d44['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+        if d44.get('FechaNCFModificado') is not None:
+            p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d44['FechaNCFModificado']))}</FechaNCFModificado>\n")
+        if d44.get('CodigoModificacion') is not None:
+            p.append(f"    <CodigoModificacion>{xml_text(d44['CodigoModificacion'])}</CodigoModificacion>\n")
+        if len(p) == n45:
+            p[-1] = "  <InformacionReferencia/>\n"
+        else:
+            p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n46 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>\n")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>\n")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"      <SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>\n")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"      <SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>\n")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if len(p) == n46:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('IndicadorMontoGravado') is not None:
+        p.append(f"<IndicadorMontoGravado>{xml_text(d5['IndicadorMontoGravado'])}</IndicadorMontoGravado>")
+    if d5.get('TipoPago') is not None:
+        p.append(f"<TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("<TablaFormasPago>")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"<FormaDePago><FormaPago>{xml_text(d9['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago></FormaDePago>")
+        if len(p) == n7:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d5.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d10))
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision></Emisor>")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Comprador'")
+    p.append(f"<Comprador><RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador><RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d12 = d4.get('Totales')
+    if not d12:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d12.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d12['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d12.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d12['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d12.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d12['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d12.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d12['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d12.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d12['MontoExento'])}</MontoExento>")
+    if d12.get('ITBIS1') is not None:
+        p.append(f"<ITBIS1>{xml_text(d12['ITBIS1'])}</ITBIS1>")
+    if d12.get('ITBIS2') is not None:
+        p.append(f"<ITBIS2>{xml_text(d12['ITBIS2'])}</ITBIS2>")
+    if d12.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{xml_text(d12['ITBIS3'])}</ITBIS3>")
+    if d12.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d12['TotalITBIS'])}</TotalITBIS>")
+    if d12.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d12['TotalITBIS1'])}</TotalITBIS1>")
+    if d12.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d12['TotalITBIS2'])}</TotalITBIS2>")
+    if d12.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d12['TotalITBIS3'])}</TotalITBIS3>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d12['MontoTotal'])}</MontoTotal>")
+    if d12.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d12['MontoPeriodo'])}</MontoPeriodo>")
+    if d12.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d12['SaldoAnterior'])}</SaldoAnterior>")
+    if d12.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d12['MontoAvancePago'])}</MontoAvancePago>")
+    if d12.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d12['ValorPagar'])}</ValorPagar>")
+    if d12.get('TotalITBISRetenido') is not None:
+        p.append(f"<TotalITBISRetenido>{'%.2f' % float(d12['TotalITBISRetenido'])}</TotalITBISRetenido>")
+    if d12.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d12['TotalISRRetencion'])}</TotalISRRetencion>")
+    if d12.get('TotalITBISPercepcion') is not None:
+        p.append(f"<TotalITBISPercepcion>{'%.2f' % float(d12['TotalITBISPercepcion'])}</TotalITBISPercepcion>")
+    if d12.get('TotalISRPercepcion') is not None:
+        p.append(f"<TotalISRPercepcion>{'%.2f' % float(d12['TotalISRPercepcion'])}</TotalISRPercepcion>")
+    p.append("</Totales>")
+    d13 = d4.get('OtraMoneda')
+    if d13:
+        p.append("<OtraMoneda>")
+        n14 = len(p)
+        if d13.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d13['TipoMoneda'])}</TipoMoneda>")
+        if d13.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d13['TipoCambio'])}</TipoCambio>")
+        if d13.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d13['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d13.get('MontoGravado1OtraMoneda') is not None:
+            p.append(f"<MontoGravado1OtraMoneda>{'%.2f' % float(d13['MontoGravado1OtraMoneda'])}</MontoGravado1OtraMoneda>")
+        if d13.get('MontoGravado2OtraMoneda') is not None:
+            p.append(f"<MontoGravado2OtraMoneda>{'%.2f' % float(d13['MontoGravado2OtraMoneda'])}</MontoGravado2OtraMoneda>")
+        if d13.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d13['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d13.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d13['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d13.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d13['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d13.get('TotalITBIS1OtraMoneda') is not None:
+            p.append(f"<TotalITBIS1OtraMoneda>{'%.2f' % float(d13['TotalITBIS1OtraMoneda'])}</TotalITBIS1OtraMoneda>")
+        if d13.get('TotalITBIS2OtraMoneda') is not None:
+            p.append(f"<TotalITBIS2OtraMoneda>{'%.2f' % float(d13['TotalITBIS2OtraMoneda'])}</TotalITBIS2OtraMoneda>")
+        if d13.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d13['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d13.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d13['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n14:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d15 = data.get('TablaCodigosItem')
+    if d15:
+        p.append("<TablaCodigosItem>")
+        n16 = len(p)
+        d17 = d15 if isinstance(d15, list) else d15.get('CodigosItem') or []
+        for d18 in (d17 if isinstance(d17, list) else (d17,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d18['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d18['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n16:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d19 = data.get('Retencion')
+    if not d19:
+        raise ValueError("El e-CF tipo 41 requiere bloque 'Retencion'")
+    p.append(f"<Retencion><IndicadorAgenteRetencionoPercepcion>{xml_text(d19['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>")
+    if d19.get('MontoITBISRetenido') is not None:
+        p.append(f"<MontoITBISRetenido>{'%.2f' % float(d19['MontoITBISRetenido'])}</MontoITBISRetenido>")
+    if d19.get('MontoISRRetenido') is not None:
+        p.append(f"<MontoISRRetenido>{'%.2f' % float(d19['MontoISRRetenido'])}</MontoISRRetenido>")
+    p.append(f"</Retencion><NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d20 = data.get('TablaSubDescuento')
+    if d20:
+        p.append("<TablaSubDescuento>")
+        n21 = len(p)
+        d22 = d20 if isinstance(d20, list) else d20.get('SubDescuento') or []
+        for d23 in (d22 if isinstance(d22, list) else (d22,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{xml_text(d23['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d23.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d23['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d23.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d23['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        if len(p) == n21:
+            p[-1] = "<TablaSubDescuento/>"
+        else:
+            p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d24 = data.get('TablaSubRecargo')
+    if d24:
+        p.append("<TablaSubRecargo>")
+        n25 = len(p)
+        d26 = d24 if isinstance(d24, list) else d24.get('SubRecargo') or []
+        for d27 in (d26 if isinstance(d26, list) else (d26,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{xml_text(d27['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d27.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d27['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d27.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d27['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        if len(p) == n25:
+            p[-1] = "<TablaSubRecargo/>"
+        else:
+            p.append("</TablaSubRecargo>")
+    d28 = data.get('OtraMonedaDetalle')
+    if d28:
+        p.append("<OtraMonedaDetalle>")
+        n29 = len(p)
+        if d28.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d28['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d28.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d28['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d28.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d28['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d28.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d28['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n29:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d30 = data.get('Subtotales')
+    if d30:
+        p.append("<Subtotales>")
+        n31 = len(p)
+        d32 = d30 if isinstance(d30, list) else d30.get('Subtotal') or []
+        for d33 in (d32 if isinstance(d32, list) else (d32,)):
+            p.append("<Subtotal>")
+            n34 = len(p)
+            if d33.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d33['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d33.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d33['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d33.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d33['Orden'])}</Orden>")
+            if d33.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d33['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d33.get('SubTotalMontoGravadoI1') is not None:
+                p.append(f"<SubTotalMontoGravadoI1>{'%.2f' % float(d33['SubTotalMontoGravadoI1'])}</SubTotalMontoGravadoI1>")
+            if d33.get('SubTotalMontoGravadoI2') is not None:
+                p.append(f"<SubTotalMontoGravadoI2>{'%.2f' % float(d33['SubTotalMontoGravadoI2'])}</SubTotalMontoGravadoI2>")
+            if d33.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d33['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d33.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d33['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d33.get('SubTotaITBIS1') is not None:
+                p.append(f"<SubTotaITBIS1>{'%.2f' % float(d33['SubTotaITBIS1'])}</SubTotaITBIS1>")
+            if d33.get('SubTotaITBIS2') is not None:
+                p.append(f"<SubTotaITBIS2>{'%.2f' % float(d33['SubTotaITBIS2'])}</SubTotaITBIS2>")
+            if d33.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d33['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d33.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d33['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d33.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d33['SubTotalExento'])}</SubTotalExento>")
+            if d33.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d33['MontoSubTotal'])}</MontoSubTotal>")
+            if d33.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d33['Lineas'])}</Lineas>")
+            if len(p) == n34:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n31:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    d35 = data.get('DescuentosORecargos')
+    if d35:
+        p.append("<DescuentosORecargos>")
+        n36 = len(p)
+        d37 = d35 if isinstance(d35, list) else d35.get('DescuentoORecargo') or []
+        for d38 in (d37 if isinstance(d37, list) else (d37,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{xml_text(d38['NumeroLinea'])}</NumeroLinea><TipoAjuste>{xml_text(d38['TipoAjuste'])}</TipoAjuste>")
+            if d38.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{xml_text(d38['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d38.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{xml_text(d38['TipoValor'])}</TipoValor>")
+            if d38.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d38['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d38.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d38['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d38.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d38['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d38.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{xml_text(d38['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        if len(p) == n36:
+            p[-1] = "<DescuentosORecargos/>"
+        else:
+            p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d39 = data.get('Paginacion')
+        if d39:
+            p.append("<Paginacion>")
+            n40 = len(p)
+            d41 = d39 if isinstance(d39, list) else d39.get('Pagina') or []
+            for d42 in (d41 if isinstance(d41, list) else (d41,)):
+                p.append("<Pagina>")
+                n43 = len(p)
+                if d42.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d42['PaginaNo'])}</PaginaNo>")
+                if d42.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d42['NoLineaDesde'])}</NoLineaDesde>")
+                if d42.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d42['NoLineaHasta'])}</NoLineaHasta>")
+                if d42.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d42['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d42.get('SubtotalMontoGravado1Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(d42['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+                if d42.get('SubtotalMontoGravado2Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(d42['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+                if d42.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d42['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d42.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d42['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d42.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d42['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d42.get('SubtotalItbis1Pagina') is not None:
+                    p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(d42['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+                if d42.get('SubtotalItbis2Pagina') is not None:
+                    p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(d42['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+                if d42.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d42['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d42.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d42['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if len(p) == n43:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n40:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d44 = data.get('InformacionReferencia')
+    if d44:
+        p.append("<InformacionReferencia>")
+        n45 = len(p)
+        if d44.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{xml_text(d44['NCFModificado'])}</NCFModificado>")
+        if d44.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{xml_text(d44['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d44.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d44['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d44.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{xml_text(d44['CodigoModificacion'])}</CodigoModificacion>")
+        if len(p) == n45:
+            p[-1] = "<InformacionReferencia/>"
+        else:
+            p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n46 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado1Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado1Pagina>{'%.2f' % float(data['SubtotalMontoGravado1Pagina'])}</SubtotalMontoGravado1Pagina>")
+    if data.get('SubtotalMontoGravado2Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado2Pagina>{'%.2f' % float(data['SubtotalMontoGravado2Pagina'])}</SubtotalMontoGravado2Pagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis1Pagina') is not None:
+        p.append(f"<SubtotalItbis1Pagina>{'%.2f' % float(data['SubtotalItbis1Pagina'])}</SubtotalItbis1Pagina>")
+    if data.get('SubtotalItbis2Pagina') is not None:
+        p.append(f"<SubtotalItbis2Pagina>{'%.2f' % float(data['SubtotalItbis2Pagina'])}</SubtotalItbis2Pagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if len(p) == n46:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
@@ -0,0 +1,767 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 43 v.1.0.xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 43
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('TipoPago') is not None:
+        p.append(f"<TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d5 = d3.get('Emisor')
+    if not d5:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d5))
+    if d5.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d5['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d5.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d5['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d5.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d5['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d5['FechaEmision']))}</FechaEmision></Emisor>")
+    d6 = d3.get('Totales')
+    if not d6:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d6.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d6['MontoExento'])}</MontoExento>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d6['MontoTotal'])}</MontoTotal>")
+    if d6.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d6['MontoPeriodo'])}</MontoPeriodo>")
+    if d6.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d6['SaldoAnterior'])}</SaldoAnterior>")
+    if d6.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d6['MontoAvancePago'])}</MontoAvancePago>")
+    if d6.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d6['ValorPagar'])}</ValorPagar>")
+    p.append("</Totales>")
+    d7 = d3.get('OtraMoneda')
+    if d7:
+        p.append("<OtraMoneda>")
+        if d7.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d7['TipoMoneda'])}</TipoMoneda>")
+        if d7.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d7['TipoCambio'])}</TipoCambio>")
+        if d7.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d7['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d7.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d7['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d8 = data.get('TablaCodigosItem')
+    if d8:
+        p.append("<TablaCodigosItem>")
+        d9 = d8 if isinstance(d8, list) else d8.get('CodigosItem') or []
+        for d10 in (d9 if isinstance(d9, list) else (d9,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d10['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d10['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion><NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    d11 = data.get('OtraMonedaDetalle')
+    if d11:
+        p.append("<OtraMonedaDetalle>")
+        if d11.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d11['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d11.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d11['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d11.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d11['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d11.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d11['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d12 = data.get('Subtotales')
+    if d12:
+        p.append("<Subtotales>")
+        d13 = d12 if isinstance(d12, list) else d12.get('Subtotal') or []
+        for d14 in (d13 if isinstance(d13, list) else (d13,)):
+            p.append("<Subtotal>")
+            if d14.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d14['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d14.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d14['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d14.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d14['Orden'])}</Orden>")
+            if d14.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d14['SubTotalExento'])}</SubTotalExento>")
+            if d14.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d14['MontoSubTotal'])}</MontoSubTotal>")
+            if d14.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d14['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d15 = data.get('Paginacion')
+        if d15:
+            p.append("<Paginacion>")
+            d16 = d15 if isinstance(d15, list) else d15.get('Pagina') or []
+            for d17 in (d16 if isinstance(d16, list) else (d16,)):
+                p.append("<Pagina>")
+                if d17.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d17['PaginaNo'])}</PaginaNo>")
+                if d17.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d17['NoLineaDesde'])}</NoLineaDesde>")
+                if d17.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d17['NoLineaHasta'])}</NoLineaHasta>")
+                if d17.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d17['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d17.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d17['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d18 = data.get('InformacionReferencia')
+    if d18:
+        p.append("<InformacionReferencia>")
+        if d18.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{esc(d18['NCFModificado'])}</NCFModificado>")
+        if d18.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{esc(d18['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d18.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{esc(fmt_date(d18['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d18.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{esc(d18['CodigoModificacion'])}</CodigoModificacion>")
+        p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('TipoPago') is not None:
+        p.append(f"      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d6 = d4.get('Emisor')
+    if not d6:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d6))
+    if d6.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d6['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d6.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d6['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d6.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d6['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d6['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d7 = d4.get('Totales')
+    if not d7:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d7.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d7['MontoExento'])}</MontoExento>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d7['MontoTotal'])}</MontoTotal>\n")
+    if d7.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d7['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d7.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d7['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d7.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d7['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d7.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d7['ValorPagar'])}</ValorPagar>\n")
+    p.append("    </Totales>\n")
+    d8 = d4.get('OtraMoneda')
+    if d8:
+        p.append("    <OtraMoneda>\n")
+        n9 = len(p)
+        if d8.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d8['TipoMoneda'])}</TipoMoneda>\n")
+        if d8.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d8['TipoCambio'])}</TipoCambio>\n")
+        if d8.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d8['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d8.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d8['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n9:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d10 = data.get('TablaCodigosItem')
+    if d10:
+        p.append("      <TablaCodigosItem>\n")
+        n11 = len(p)
+        d12 = d10 if isinstance(d10, list) else d10.get('CodigosItem') or []
+        for d13 in (d12 if isinstance(d12, list) else (d12,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d13['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d13['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n11:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    d14 = data.get('OtraMonedaDetalle')
+    if d14:
+        p.append("      <OtraMonedaDetalle>\n")
+        n15 = len(p)
+        if d14.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d14['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d14.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d14['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d14.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d14['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d14.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d14['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n15:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d16 = data.get('Subtotales')
+    if d16:
+        p.append("  <Subtotales>\n")
+        n17 = len(p)
+        d18 = d16 if isinstance(d16, list) else d16.get('Subtotal') or []
+        for d19 in (d18 if isinstance(d18, list) else (d18,)):
+            p.append("    <Subtotal>\n")
+            n20 = len(p)
+            if d19.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d19['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d19.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d19['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d19.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d19['Orden'])}</Orden>\n")
+            if d19.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d19['SubTotalExento'])}</SubTotalExento>\n")
+            if d19.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d19['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d19.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d19['Lineas'])}</Lineas>\n")
+            if len(p) == n20:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n17:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d21 = data.get('Paginacion')
+        if d21:
+            p.append("  <Paginacion>\n")
+            n22 = len(p)
+            d23 = d21 if isinstance(d21, list) else d21.get('Pagina') or []
+            for d24 in (d23 if isinstance(d23, list) else (d23,)):
+                p.append("    <Pagina>\n")
+                n25 = len(p)
+                if d24.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d24['PaginaNo'])}</PaginaNo>\n")
+                if d24.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d24['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d24.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d24['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d24.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d24['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d24.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d24['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if len(p) == n25:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n22:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d26 = data.get('InformacionReferencia')
+    if d26:
+        p.append("  <InformacionReferencia>\n")
+        n27 = len(p)
+        if d26.get('NCFModificado') is not None:
+            p.append(f"    <NCFModificado>{xml_text(d26['NCFModificado'])}</NCFModificado>\n")
+        if d26.get('RNCOtroContribuyente') is not None:
+            p.append(f"    <RNCOtroContribuyente>{xml_text(d26['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+        if d26.get('FechaNCFModificado') is not None:
+            p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d26['FechaNCFModificado']))}</FechaNCFModificado>\n")
+        if d26.get('CodigoModificacion') is not None:
+            p.append(f"    <CodigoModificacion>{xml_text(d26['CodigoModificacion'])}</CodigoModificacion>\n")
+        if len(p) == n27:
+            p[-1] = "  <InformacionReferencia/>\n"
+        else:
+            p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n28 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if len(p) == n28:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('TipoPago') is not None:
+        p.append(f"<TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d6 = d4.get('Emisor')
+    if not d6:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d6))
+    if d6.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d6['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d6.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d6['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d6.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d6['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d6['FechaEmision']))}</FechaEmision></Emisor>")
+    d7 = d4.get('Totales')
+    if not d7:
+        raise ValueError("El e-CF tipo 43 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d7.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d7['MontoExento'])}</MontoExento>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d7['MontoTotal'])}</MontoTotal>")
+    if d7.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d7['MontoPeriodo'])}</MontoPeriodo>")
+    if d7.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d7['SaldoAnterior'])}</SaldoAnterior>")
+    if d7.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d7['MontoAvancePago'])}</MontoAvancePago>")
+    if d7.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d7['ValorPagar'])}</ValorPagar>")
+    p.append("</Totales>")
+    d8 = d4.get('OtraMoneda')
+    if d8:
+        p.append("<OtraMoneda>")
+        n9 = len(p)
+        if d8.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d8['TipoMoneda'])}</TipoMoneda>")
+        if d8.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d8['TipoCambio'])}</TipoCambio>")
+        if d8.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d8['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d8.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d8['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n9:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d10 = data.get('TablaCodigosItem')
+    if d10:
+        p.append("<TablaCodigosItem>")
+        n11 = len(p)
+        d12 = d10 if isinstance(d10, list) else d10.get('CodigosItem') or []
+        for d13 in (d12 if isinstance(d12, list) else (d12,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d13['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d13['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n11:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion><NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    d14 = data.get('OtraMonedaDetalle')
+    if d14:
+        p.append("<OtraMonedaDetalle>")
+        n15 = len(p)
+        if d14.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d14['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d14.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d14['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d14.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d14['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d14.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d14['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n15:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d16 = data.get('Subtotales')
+    if d16:
+        p.append("<Subtotales>")
+        n17 = len(p)
+        d18 = d16 if isinstance(d16, list) else d16.get('Subtotal') or []
+        for d19 in (d18 if isinstance(d18, list) else (d18,)):
+            p.append("<Subtotal>")
+            n20 = len(p)
+            if d19.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d19['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d19.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d19['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d19.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d19['Orden'])}</Orden>")
+            if d19.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d19['SubTotalExento'])}</SubTotalExento>")
+            if d19.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d19['MontoSubTotal'])}</MontoSubTotal>")
+            if d19.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d19['Lineas'])}</Lineas>")
+            if len(p) == n20:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n17:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d21 = data.get('Paginacion')
+        if d21:
+            p.append("<Paginacion>")
+            n22 = len(p)
+            d23 = d21 if isinstance(d21, list) else d21.get('Pagina') or []
+            for d24 in (d23 if isinstance(d23, list) else (d23,)):
+                p.append("<Pagina>")
+                n25 = len(p)
+                if d24.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d24['PaginaNo'])}</PaginaNo>")
+                if d24.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d24['NoLineaDesde'])}</NoLineaDesde>")
+                if d24.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d24['NoLineaHasta'])}</NoLineaHasta>")
+                if d24.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d24['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d24.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d24['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if len(p) == n25:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n22:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d26 = data.get('InformacionReferencia')
+    if d26:
+        p.append("<InformacionReferencia>")
+        n27 = len(p)
+        if d26.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{xml_text(d26['NCFModificado'])}</NCFModificado>")
+        if d26.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{xml_text(d26['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d26.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d26['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d26.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{xml_text(d26['CodigoModificacion'])}</CodigoModificacion>")
+        if len(p) == n27:
+            p[-1] = "<InformacionReferencia/>"
+        else:
+            p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n28 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if len(p) == n28:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
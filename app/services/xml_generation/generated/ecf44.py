@@ -0,0 +1,1529 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 44 v.1.0.xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 44
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{esc(d4['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d4.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{esc(d4['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d4['TipoIngresos'])}</TipoIngresos><TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{esc(d4['TerminoPago'])}</TerminoPago>")
+    d5 = d4.get('TablaFormasPago')
+    if d5:
+        p.append("<TablaFormasPago>")
+        d6 = d5 if isinstance(d5, list) else d5.get('FormaDePago') or []
+        for d7 in (d6 if isinstance(d6, list) else (d6,)):
+            p.append(f"<FormaDePago><FormaPago>{esc(d7['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d7['MontoPago'])}</MontoPago></FormaDePago>")
+        p.append("</TablaFormasPago>")
+    if d4.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{esc(d4['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d4.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{esc(d4['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d4.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{esc(d4['BancoPago'])}</BancoPago>")
+    if d4.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{esc(fmt_date(d4['FechaDesde']))}</FechaDesde>")
+    if d4.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{esc(fmt_date(d4['FechaHasta']))}</FechaHasta>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d8 = d3.get('Emisor')
+    if not d8:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d8))
+    if d8.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{esc(d8['CodigoVendedor'])}</CodigoVendedor>")
+    if d8.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d8['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d8.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d8['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d8.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{esc(d8['ZonaVenta'])}</ZonaVenta>")
+    if d8.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{esc(d8['RutaVenta'])}</RutaVenta>")
+    if d8.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d8['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d3.get('Comprador')
+    if not d9:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Comprador'")
+    p.append("<Comprador>")
+    if d9.get('RNCComprador') is not None:
+        p.append(f"<RNCComprador>{esc(d9['RNCComprador'])}</RNCComprador>")
+    if d9.get('IdentificadorExtranjero') is not None:
+        p.append(f"<IdentificadorExtranjero>{esc(d9['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+    p.append(f"<RazonSocialComprador>{esc(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d9.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{esc(d9['ContactoComprador'])}</ContactoComprador>")
+    if d9.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{esc(d9['CorreoComprador'])}</CorreoComprador>")
+    if d9.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{esc(d9['DireccionComprador'])}</DireccionComprador>")
+    if d9.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d9['MunicipioComprador'])}</MunicipioComprador>")
+    if d9.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d9['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d9.get('FechaEntrega') is not None:
+        p.append(f"<FechaEntrega>{esc(fmt_date(d9['FechaEntrega']))}</FechaEntrega>")
+    if d9.get('ContactoEntrega') is not None:
+        p.append(f"<ContactoEntrega>{esc(d9['ContactoEntrega'])}</ContactoEntrega>")
+    if d9.get('DireccionEntrega') is not None:
+        p.append(f"<DireccionEntrega>{esc(d9['DireccionEntrega'])}</DireccionEntrega>")
+    if d9.get('TelefonoAdicional') is not None:
+        p.append(f"<TelefonoAdicional>{esc(d9['TelefonoAdicional'])}</TelefonoAdicional>")
+    if d9.get('FechaOrdenCompra') is not None:
+        p.append(f"<FechaOrdenCompra>{esc(fmt_date(d9['FechaOrdenCompra']))}</FechaOrdenCompra>")
+    if d9.get('NumeroOrdenCompra') is not None:
+        p.append(f"<NumeroOrdenCompra>{esc(d9['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+    if d9.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{esc(d9['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d9.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{esc(d9['ResponsablePago'])}</ResponsablePago>")
+    if d9.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{esc(d9['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d10 = d3.get('InformacionesAdicionales')
+    if d10:
+        p.append("<InformacionesAdicionales>")
+        if d10.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{esc(fmt_date(d10['FechaEmbarque']))}</FechaEmbarque>")
+        if d10.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{esc(d10['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d10.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{esc(d10['NumeroContenedor'])}</NumeroContenedor>")
+        if d10.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{esc(d10['NumeroReferencia'])}</NumeroReferencia>")
+        if d10.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d10['PesoBruto'])}</PesoBruto>")
+        if d10.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d10['PesoNeto'])}</PesoNeto>")
+        if d10.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{esc(d10['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d10.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{esc(d10['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d10.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d10['CantidadBulto'])}</CantidadBulto>")
+        if d10.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{esc(d10['UnidadBulto'])}</UnidadBulto>")
+        if d10.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d10['VolumenBulto'])}</VolumenBulto>")
+        if d10.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{esc(d10['UnidadVolumen'])}</UnidadVolumen>")
+        p.append("</InformacionesAdicionales>")
+    d11 = d3.get('Transporte')
+    if d11:
+        p.append("<Transporte>")
+        if d11.get('Conductor') is not None:
+            p.append(f"<Conductor>{esc(d11['Conductor'])}</Conductor>")
+        if d11.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{esc(d11['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d11.get('Ficha') is not None:
+            p.append(f"<Ficha>{esc(d11['Ficha'])}</Ficha>")
+        if d11.get('Placa') is not None:
+            p.append(f"<Placa>{esc(d11['Placa'])}</Placa>")
+        if d11.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{esc(d11['RutaTransporte'])}</RutaTransporte>")
+        if d11.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{esc(d11['ZonaTransporte'])}</ZonaTransporte>")
+        if d11.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{esc(d11['NumeroAlbaran'])}</NumeroAlbaran>")
+        p.append("</Transporte>")
+    d12 = d3.get('Totales')
+    if not d12:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d12.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d12['MontoExento'])}</MontoExento>")
+    if d12.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d12['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d13 = d12.get('ImpuestosAdicionales')
+    if d13:
+        p.append("<ImpuestosAdicionales>")
+        d14 = d13 if isinstance(d13, list) else d13.get('ImpuestoAdicional') or []
+        for d15 in (d14 if isinstance(d14, list) else (d14,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d15['TipoImpuesto'])}</TipoImpuesto><TasaImpuestoAdicional>{'%.2f' % float(d15['TasaImpuestoAdicional'])}</TasaImpuestoAdicional><OtrosImpuestosAdicionales>{'%.2f' % float(d15['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales></ImpuestoAdicional>")
+        p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d12['MontoTotal'])}</MontoTotal>")
+    if d12.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d12['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d12.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d12['MontoPeriodo'])}</MontoPeriodo>")
+    if d12.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d12['SaldoAnterior'])}</SaldoAnterior>")
+    if d12.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d12['MontoAvancePago'])}</MontoAvancePago>")
+    if d12.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d12['ValorPagar'])}</ValorPagar>")
+    p.append("</Totales>")
+    d16 = d3.get('OtraMoneda')
+    if d16:
+        p.append("<OtraMoneda>")
+        if d16.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d16['TipoMoneda'])}</TipoMoneda>")
+        if d16.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d16['TipoCambio'])}</TipoCambio>")
+        if d16.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d16['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d16.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d16['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d17 = d16.get('ImpuestosAdicionalesOtraMoneda')
+        if d17:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            d18 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicionalOtraMoneda') or []
+            for d19 in (d18 if isinstance(d18, list) else (d18,)):
+                p.append("<ImpuestoAdicionalOtraMoneda>")
+                if d19.get('TipoImpuestoOtraMoneda') is not None:
+                    p.append(f"<TipoImpuestoOtraMoneda>{'%03d' % int(d19['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda>")
+                if d19.get('TasaImpuestoAdicionalOtraMoneda') is not None:
+                    p.append(f"<TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d19['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d19.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d19['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                p.append("</ImpuestoAdicionalOtraMoneda>")
+            p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d16.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d16['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d20 = data.get('TablaCodigosItem')
+    if d20:
+        p.append("<TablaCodigosItem>")
+        d21 = d20 if isinstance(d20, list) else d20.get('CodigosItem') or []
+        for d22 in (d21 if isinstance(d21, list) else (d21,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d22['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d22['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion><NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{esc(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{esc(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d23 = data.get('TablaSubDescuento')
+    if d23:
+        p.append("<TablaSubDescuento>")
+        d24 = d23 if isinstance(d23, list) else d23.get('SubDescuento') or []
+        for d25 in (d24 if isinstance(d24, list) else (d24,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{esc(d25['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d25.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d25['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d25.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d25['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d26 = data.get('TablaSubRecargo')
+    if d26:
+        p.append("<TablaSubRecargo>")
+        d27 = d26 if isinstance(d26, list) else d26.get('SubRecargo') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{esc(d28['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d28.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d28['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d28.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d28['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        p.append("</TablaSubRecargo>")
+    d29 = data.get('TablaImpuestoAdicional')
+    if d29:
+        p.append("<TablaImpuestoAdicional>")
+        d30 = d29 if isinstance(d29, list) else d29.get('ImpuestoAdicional') or []
+        for d31 in (d30 if isinstance(d30, list) else (d30,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d31['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        p.append("</TablaImpuestoAdicional>")
+    d32 = data.get('OtraMonedaDetalle')
+    if d32:
+        p.append("<OtraMonedaDetalle>")
+        if d32.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d32['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d32.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d32['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d32.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d32['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d32.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d32['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d33 = data.get('Subtotales')
+    if d33:
+        p.append("<Subtotales>")
+        d34 = d33 if isinstance(d33, list) else d33.get('Subtotal') or []
+        for d35 in (d34 if isinstance(d34, list) else (d34,)):
+            p.append("<Subtotal>")
+            if d35.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d35['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d35.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d35['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d35.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d35['Orden'])}</Orden>")
+            if d35.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d35['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d35.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d35['SubTotalExento'])}</SubTotalExento>")
+            if d35.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d35['MontoSubTotal'])}</MontoSubTotal>")
+            if d35.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d35['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    d36 = data.get('DescuentosORecargos')
+    if d36:
+        p.append("<DescuentosORecargos>")
+        d37 = d36 if isinstance(d36, list) else d36.get('DescuentoORecargo') or []
+        for d38 in (d37 if isinstance(d37, list) else (d37,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{esc(d38['NumeroLinea'])}</NumeroLinea><TipoAjuste>{esc(d38['TipoAjuste'])}</TipoAjuste>")
+            if d38.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{esc(d38['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d38.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{esc(d38['TipoValor'])}</TipoValor>")
+            if d38.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d38['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d38.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d38['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d38.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d38['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d38.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{esc(d38['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d39 = data.get('Paginacion')
+        if d39:
+            p.append("<Paginacion>")
+            d40 = d39 if isinstance(d39, list) else d39.get('Pagina') or []
+            for d41 in (d40 if isinstance(d40, list) else (d40,)):
+                p.append("<Pagina>")
+                if d41.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d41['PaginaNo'])}</PaginaNo>")
+                if d41.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d41['NoLineaDesde'])}</NoLineaDesde>")
+                if d41.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d41['NoLineaHasta'])}</NoLineaHasta>")
+                if d41.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d41['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d41.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d41['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d42 = d41.get('SubtotalImpuestoAdicional')
+                if d42:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    if d42.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d42['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    p.append("</SubtotalImpuestoAdicional>")
+                if d41.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d41['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d41.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d41['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d43 = data.get('InformacionReferencia')
+    if d43:
+        p.append("<InformacionReferencia>")
+        if d43.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{esc(d43['NCFModificado'])}</NCFModificado>")
+        if d43.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{esc(d43['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d43.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{esc(fmt_date(d43['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d43.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{esc(d43['CodigoModificacion'])}</CodigoModificacion>")
+        p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d44 = data.get('SubtotalImpuestoAdicional')
+    if d44:
+        p.append("<SubtotalImpuestoAdicional>")
+        if d44.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d44['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"      <IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>\n")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"      <IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>\n")
+    p.append(f"      <TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos>\n      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"      <TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>\n")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("      <TablaFormasPago>\n")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"        <FormaDePago>\n          <FormaPago>{xml_text(d9['FormaPago'])}</FormaPago>\n          <MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago>\n        </FormaDePago>\n")
+        if len(p) == n7:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"      <TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>\n")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"      <NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>\n")
+    if d5.get('BancoPago') is not None:
+        p.append(f"      <BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>\n")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"      <FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>\n")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"      <FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"      <CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>\n")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"      <ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>\n")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"      <RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>\n")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Comprador'")
+    p.append("    <Comprador>\n")
+    if d11.get('RNCComprador') is not None:
+        p.append(f"      <RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>\n")
+    if d11.get('IdentificadorExtranjero') is not None:
+        p.append(f"      <IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>\n")
+    p.append(f"      <RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>\n")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"      <ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>\n")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"      <CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>\n")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"      <DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>\n")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"      <MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>\n")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"      <ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>\n")
+    if d11.get('FechaEntrega') is not None:
+        p.append(f"      <FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>\n")
+    if d11.get('ContactoEntrega') is not None:
+        p.append(f"      <ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>\n")
+    if d11.get('DireccionEntrega') is not None:
+        p.append(f"      <DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>\n")
+    if d11.get('TelefonoAdicional') is not None:
+        p.append(f"      <TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>\n")
+    if d11.get('FechaOrdenCompra') is not None:
+        p.append(f"      <FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>\n")
+    if d11.get('NumeroOrdenCompra') is not None:
+        p.append(f"      <NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>\n")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"      <CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>\n")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"      <ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>\n")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"      <InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>\n")
+    p.append("    </Comprador>\n")
+    d12 = d4.get('InformacionesAdicionales')
+    if d12:
+        p.append("    <InformacionesAdicionales>\n")
+        n13 = len(p)
+        if d12.get('FechaEmbarque') is not None:
+            p.append(f"      <FechaEmbarque>{xml_text(fmt_date(d12['FechaEmbarque']))}</FechaEmbarque>\n")
+        if d12.get('NumeroEmbarque') is not None:
+            p.append(f"      <NumeroEmbarque>{xml_text(d12['NumeroEmbarque'])}</NumeroEmbarque>\n")
+        if d12.get('NumeroContenedor') is not None:
+            p.append(f"      <NumeroContenedor>{xml_text(d12['NumeroContenedor'])}</NumeroContenedor>\n")
+        if d12.get('NumeroReferencia') is not None:
+            p.append(f"      <NumeroReferencia>{xml_text(d12['NumeroReferencia'])}</NumeroReferencia>\n")
+        if d12.get('PesoBruto') is not None:
+            p.append(f"      <PesoBruto>{'%.2f' % float(d12['PesoBruto'])}</PesoBruto>\n")
+        if d12.get('PesoNeto') is not None:
+            p.append(f"      <PesoNeto>{'%.2f' % float(d12['PesoNeto'])}</PesoNeto>\n")
+        if d12.get('UnidadPesoBruto') is not None:
+            p.append(f"      <UnidadPesoBruto>{xml_text(d12['UnidadPesoBruto'])}</UnidadPesoBruto>\n")
+        if d12.get('UnidadPesoNeto') is not None:
+            p.append(f"      <UnidadPesoNeto>{xml_text(d12['UnidadPesoNeto'])}</UnidadPesoNeto>\n")
+        if d12.get('CantidadBulto') is not None:
+            p.append(f"      <CantidadBulto>{'%.2f' % float(d12['CantidadBulto'])}</CantidadBulto>\n")
+        if d12.get('UnidadBulto') is not None:
+            p.append(f"      <UnidadBulto>{xml_text(d12['UnidadBulto'])}</UnidadBulto>\n")
+        if d12.get('VolumenBulto') is not None:
+            p.append(f"      <VolumenBulto>{'%.2f' % float(d12['VolumenBulto'])}</VolumenBulto>\n")
+        if d12.get('UnidadVolumen') is not None:
+            p.append(f"      <UnidadVolumen>{xml_text(d12['UnidadVolumen'])}</UnidadVolumen>\n")
+        if len(p) == n13:
+            p[-1] = "    <InformacionesAdicionales/>\n"
+        else:
+            p.append("    </InformacionesAdicionales>\n")
+    d14 = d4.get('Transporte')
+    if d14:
+        p.append("    <Transporte>\n")
+        n15 = len(p)
+        if d14.get('Conductor') is not None:
+            p.append(f"      <Conductor>{xml_text(d14['Conductor'])}</Conductor>\n")
+        if d14.get('DocumentoTransporte') is not None:
+            p.append(f"      <DocumentoTransporte>{xml_text(d14['DocumentoTransporte'])}</DocumentoTransporte>\n")
+        if d14.get('Ficha') is not None:
+            p.append(f"      <Ficha>{xml_text(d14['Ficha'])}</Ficha>\n")
+        if d14.get('Placa') is not None:
+            p.append(f"      <Placa>{xml_text(d14['Placa'])}</Placa>\n")
+        if d14.get('RutaTransporte') is not None:
+            p.append(f"      <RutaTransporte>{xml_text(d14['RutaTransporte'])}</RutaTransporte>\n")
+        if d14.get('ZonaTransporte') is not None:
+            p.append(f"      <ZonaTransporte>{xml_text(d14['ZonaTransporte'])}</ZonaTransporte>\n")
+        if d14.get('NumeroAlbaran') is not None:
+            p.append(f"      <NumeroAlbaran>{xml_text(d14['NumeroAlbaran'])}</NumeroAlbaran>\n")
+        if len(p) == n15:
+            p[-1] = "    <Transporte/>\n"
+        else:
+            p.append("    </Transporte>\n")
+    d16 = d4.get('Totales')
+    if not d16:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d16.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d16['MontoExento'])}</MontoExento>\n")
+    if d16.get('MontoImpuestoAdicional') is not None:
+        p.append(f"      <MontoImpuestoAdicional>{'%.2f' % float(d16['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>\n")
+    d17 = d16.get('ImpuestosAdicionales')
+    if d17:
+        p.append("      <ImpuestosAdicionales>\n")
+        n18 = len(p)
+        d19 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicional') or []
+        for d20 in (d19 if isinstance(d19, list) else (d19,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d20['TipoImpuesto'])}</TipoImpuesto>\n          <TasaImpuestoAdicional>{'%.2f' % float(d20['TasaImpuestoAdicional'])}</TasaImpuestoAdicional>\n          <OtrosImpuestosAdicionales>{'%.2f' % float(d20['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>\n        </ImpuestoAdicional>\n")
+        if len(p) == n18:
+            p[-1] = "      <ImpuestosAdicionales/>\n"
+        else:
+            p.append("      </ImpuestosAdicionales>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d16['MontoTotal'])}</MontoTotal>\n")
+    if d16.get('MontoNoFacturable') is not None:
+        p.append(f"      <MontoNoFacturable>{'%.2f' % float(d16['MontoNoFacturable'])}</MontoNoFacturable>\n")
+    if d16.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d16['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d16.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d16['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d16.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d16['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d16.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d16['ValorPagar'])}</ValorPagar>\n")
+    p.append("    </Totales>\n")
+    d21 = d4.get('OtraMoneda')
+    if d21:
+        p.append("    <OtraMoneda>\n")
+        n22 = len(p)
+        if d21.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d21['TipoMoneda'])}</TipoMoneda>\n")
+        if d21.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d21['TipoCambio'])}</TipoCambio>\n")
+        if d21.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d21['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d21.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"      <MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d21['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>\n")
+        d23 = d21.get('ImpuestosAdicionalesOtraMoneda')
+        if d23:
+            p.append("      <ImpuestosAdicionalesOtraMoneda>\n")
+            n24 = len(p)
+            d25 = d23 if isinstance(d23, list) else d23.get('ImpuestoAdicionalOtraMoneda') or []
+            for d26 in (d25 if isinstance(d25, list) else (d25,)):
+                p.append("        <ImpuestoAdicionalOtraMoneda>\n")
+                n27 = len(p)
+                if d26.get('TipoImpuestoOtraMoneda') is not None:
+                    p.append(f"          <TipoImpuestoOtraMoneda>{'%03d' % int(d26['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda>\n")
+                if d26.get('TasaImpuestoAdicionalOtraMoneda') is not None:
+                    p.append(f"          <TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d26['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>\n")
+                if d26.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"          <OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d26['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>\n")
+                if len(p) == n27:
+                    p[-1] = "        <ImpuestoAdicionalOtraMoneda/>\n"
+                else:
+                    p.append("        </ImpuestoAdicionalOtraMoneda>\n")
+            if len(p) == n24:
+                p[-1] = "      <ImpuestosAdicionalesOtraMoneda/>\n"
+            else:
+                p.append("      </ImpuestosAdicionalesOtraMoneda>\n")
+        if d21.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d21['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n22:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d28 = data.get('TablaCodigosItem')
+    if d28:
+        p.append("      <TablaCodigosItem>\n")
+        n29 = len(p)
+        d30 = d28 if isinstance(d28, list) else d28.get('CodigosItem') or []
+        for d31 in (d30 if isinstance(d30, list) else (d30,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d31['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d31['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n29:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"      <FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>\n")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"      <FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"      <DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>\n")
+    d32 = data.get('TablaSubDescuento')
+    if d32:
+        p.append("      <TablaSubDescuento>\n")
+        n33 = len(p)
+        d34 = d32 if isinstance(d32, list) else d32.get('SubDescuento') or []
+        for d35 in (d34 if isinstance(d34, list) else (d34,)):
+            p.append(f"        <SubDescuento>\n          <TipoSubDescuento>{xml_text(d35['TipoSubDescuento'])}</TipoSubDescuento>\n")
+            if d35.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"          <SubDescuentoPorcentaje>{'%.2f' % float(d35['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>\n")
+            if d35.get('MontoSubDescuento') is not None:
+                p.append(f"          <MontoSubDescuento>{'%.2f' % float(d35['MontoSubDescuento'])}</MontoSubDescuento>\n")
+            p.append("        </SubDescuento>\n")
+        if len(p) == n33:
+            p[-1] = "      <TablaSubDescuento/>\n"
+        else:
+            p.append("      </TablaSubDescuento>\n")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"      <RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>\n")
+    d36 = data.get('TablaSubRecargo')
+    if d36:
+        p.append("      <TablaSubRecargo>\n")
+        n37 = len(p)
+        d38 = d36 if isinstance(d36, list) else d36.get('SubRecargo') or []
+        for d39 in (d38 if isinstance(d38, list) else (d38,)):
+            p.append(f"        <SubRecargo>\n          <TipoSubRecargo>{xml_text(d39['TipoSubRecargo'])}</TipoSubRecargo>\n")
+            if d39.get('SubRecargoPorcentaje') is not None:
+                p.append(f"          <SubRecargoPorcentaje>{'%.2f' % float(d39['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>\n")
+            if d39.get('MontoSubRecargo') is not None:
+                p.append(f"          <MontoSubRecargo>{'%.2f' % float(d39['MontoSubRecargo'])}</MontoSubRecargo>\n")
+            p.append("        </SubRecargo>\n")
+        if len(p) == n37:
+            p[-1] = "      <TablaSubRecargo/>\n"
+        else:
+            p.append("      </TablaSubRecargo>\n")
+    d40 = data.get('TablaImpuestoAdicional')
+    if d40:
+        p.append("      <TablaImpuestoAdicional>\n")
+        n41 = len(p)
+        d42 = d40 if isinstance(d40, list) else d40.get('ImpuestoAdicional') or []
+        for d43 in (d42 if isinstance(d42, list) else (d42,)):
+            p.append(f"        <ImpuestoAdicional>\n          <TipoImpuesto>{'%03d' % int(d43['TipoImpuesto'])}</TipoImpuesto>\n        </ImpuestoAdicional>\n")
+        if len(p) == n41:
+            p[-1] = "      <TablaImpuestoAdicional/>\n"
+        else:
+            p.append("      </TablaImpuestoAdicional>\n")
+    d44 = data.get('OtraMonedaDetalle')
+    if d44:
+        p.append("      <OtraMonedaDetalle>\n")
+        n45 = len(p)
+        if d44.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d44['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d44.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d44['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d44.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d44['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d44.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d44['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n45:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d46 = data.get('Subtotales')
+    if d46:
+        p.append("  <Subtotales>\n")
+        n47 = len(p)
+        d48 = d46 if isinstance(d46, list) else d46.get('Subtotal') or []
+        for d49 in (d48 if isinstance(d48, list) else (d48,)):
+            p.append("    <Subtotal>\n")
+            n50 = len(p)
+            if d49.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d49['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d49.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d49['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d49.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d49['Orden'])}</Orden>\n")
+            if d49.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"      <SubTotalImpuestoAdicional>{'%.2f' % float(d49['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>\n")
+            if d49.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d49['SubTotalExento'])}</SubTotalExento>\n")
+            if d49.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d49['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d49.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d49['Lineas'])}</Lineas>\n")
+            if len(p) == n50:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n47:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    d51 = data.get('DescuentosORecargos')
+    if d51:
+        p.append("  <DescuentosORecargos>\n")
+        n52 = len(p)
+        d53 = d51 if isinstance(d51, list) else d51.get('DescuentoORecargo') or []
+        for d54 in (d53 if isinstance(d53, list) else (d53,)):
+            p.append(f"    <DescuentoORecargo>\n      <NumeroLinea>{xml_text(d54['NumeroLinea'])}</NumeroLinea>\n      <TipoAjuste>{xml_text(d54['TipoAjuste'])}</TipoAjuste>\n")
+            if d54.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"      <DescripcionDescuentooRecargo>{xml_text(d54['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>\n")
+            if d54.get('TipoValor') is not None:
+                p.append(f"      <TipoValor>{xml_text(d54['TipoValor'])}</TipoValor>\n")
+            if d54.get('ValorDescuentooRecargo') is not None:
+                p.append(f"      <ValorDescuentooRecargo>{'%.2f' % float(d54['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>\n")
+            if d54.get('MontoDescuentooRecargo') is not None:
+                p.append(f"      <MontoDescuentooRecargo>{'%.2f' % float(d54['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>\n")
+            if d54.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"      <MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d54['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>\n")
+            if d54.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"      <IndicadorFacturacionDescuentooRecargo>{xml_text(d54['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>\n")
+            p.append("    </DescuentoORecargo>\n")
+        if len(p) == n52:
+            p[-1] = "  <DescuentosORecargos/>\n"
+        else:
+            p.append("  </DescuentosORecargos>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d55 = data.get('Paginacion')
+        if d55:
+            p.append("  <Paginacion>\n")
+            n56 = len(p)
+            d57 = d55 if isinstance(d55, list) else d55.get('Pagina') or []
+            for d58 in (d57 if isinstance(d57, list) else (d57,)):
+                p.append("    <Pagina>\n")
+                n59 = len(p)
+                if d58.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d58['PaginaNo'])}</PaginaNo>\n")
+                if d58.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d58['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d58.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d58['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d58.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d58['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d58.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d58['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+                d60 = d58.get('SubtotalImpuestoAdicional')
+                if d60:
+                    p.append("      <SubtotalImpuestoAdicional>\n")
+                    n61 = len(p)
+                    if d60.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d60['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+                    if len(p) == n61:
+                        p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+                    else:
+                        p.append("      </SubtotalImpuestoAdicional>\n")
+                if d58.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d58['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if d58.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(d58['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+                if len(p) == n59:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n56:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d62 = data.get('InformacionReferencia')
+    if d62:
+        p.append("  <InformacionReferencia>\n")
+        n63 = len(p)
+        if d62.get('NCFModificado') is not None:
+            p.append(f"    <NCFModificado>{xml_text(d62['NCFModificado'])}</NCFModificado>\n")
+        if d62.get('RNCOtroContribuyente') is not None:
+            p.append(f"    <RNCOtroContribuyente>{xml_text(d62['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+        if d62.get('FechaNCFModificado') is not None:
+            p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d62['FechaNCFModificado']))}</FechaNCFModificado>\n")
+        if d62.get('CodigoModificacion') is not None:
+            p.append(f"    <CodigoModificacion>{xml_text(d62['CodigoModificacion'])}</CodigoModificacion>\n")
+        if len(p) == n63:
+            p[-1] = "  <InformacionReferencia/>\n"
+        else:
+            p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n64 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"      <SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>\n")
+    d65 = data.get('SubtotalImpuestoAdicional')
+    if d65:
+        p.append("      <SubtotalImpuestoAdicional>\n")
+        n66 = len(p)
+        if d65.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"        <SubtotalOtrosImpuesto>{'%.2f' % float(d65['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>\n")
+        if len(p) == n66:
+            p[-1] = "      <SubtotalImpuestoAdicional/>\n"
+        else:
+            p.append("      </SubtotalImpuestoAdicional>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+    if len(p) == n64:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    if d5.get('IndicadorServicioTodoIncluido') is not None:
+        p.append(f"<IndicadorServicioTodoIncluido>{xml_text(d5['IndicadorServicioTodoIncluido'])}</IndicadorServicioTodoIncluido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos><TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("<TablaFormasPago>")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"<FormaDePago><FormaPago>{xml_text(d9['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago></FormaDePago>")
+        if len(p) == n7:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d5.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision></Emisor>")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Comprador'")
+    p.append("<Comprador>")
+    if d11.get('RNCComprador') is not None:
+        p.append(f"<RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>")
+    if d11.get('IdentificadorExtranjero') is not None:
+        p.append(f"<IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+    p.append(f"<RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d11.get('FechaEntrega') is not None:
+        p.append(f"<FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>")
+    if d11.get('ContactoEntrega') is not None:
+        p.append(f"<ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>")
+    if d11.get('DireccionEntrega') is not None:
+        p.append(f"<DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>")
+    if d11.get('TelefonoAdicional') is not None:
+        p.append(f"<TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>")
+    if d11.get('FechaOrdenCompra') is not None:
+        p.append(f"<FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>")
+    if d11.get('NumeroOrdenCompra') is not None:
+        p.append(f"<NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d12 = d4.get('InformacionesAdicionales')
+    if d12:
+        p.append("<InformacionesAdicionales>")
+        n13 = len(p)
+        if d12.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{xml_text(fmt_date(d12['FechaEmbarque']))}</FechaEmbarque>")
+        if d12.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{xml_text(d12['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d12.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{xml_text(d12['NumeroContenedor'])}</NumeroContenedor>")
+        if d12.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{xml_text(d12['NumeroReferencia'])}</NumeroReferencia>")
+        if d12.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d12['PesoBruto'])}</PesoBruto>")
+        if d12.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d12['PesoNeto'])}</PesoNeto>")
+        if d12.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{xml_text(d12['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d12.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{xml_text(d12['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d12.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d12['CantidadBulto'])}</CantidadBulto>")
+        if d12.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{xml_text(d12['UnidadBulto'])}</UnidadBulto>")
+        if d12.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d12['VolumenBulto'])}</VolumenBulto>")
+        if d12.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{xml_text(d12['UnidadVolumen'])}</UnidadVolumen>")
+        if len(p) == n13:
+            p[-1] = "<InformacionesAdicionales/>"
+        else:
+            p.append("</InformacionesAdicionales>")
+    d14 = d4.get('Transporte')
+    if d14:
+        p.append("<Transporte>")
+        n15 = len(p)
+        if d14.get('Conductor') is not None:
+            p.append(f"<Conductor>{xml_text(d14['Conductor'])}</Conductor>")
+        if d14.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{xml_text(d14['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d14.get('Ficha') is not None:
+            p.append(f"<Ficha>{xml_text(d14['Ficha'])}</Ficha>")
+        if d14.get('Placa') is not None:
+            p.append(f"<Placa>{xml_text(d14['Placa'])}</Placa>")
+        if d14.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{xml_text(d14['RutaTransporte'])}</RutaTransporte>")
+        if d14.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{xml_text(d14['ZonaTransporte'])}</ZonaTransporte>")
+        if d14.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{xml_text(d14['NumeroAlbaran'])}</NumeroAlbaran>")
+        if len(p) == n15:
+            p[-1] = "<Transporte/>"
+        else:
+            p.append("</Transporte>")
+    d16 = d4.get('Totales')
+    if not d16:
+        raise ValueError("El e-CF tipo 44 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d16.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d16['MontoExento'])}</MontoExento>")
+    if d16.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d16['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d17 = d16.get('ImpuestosAdicionales')
+    if d17:
+        p.append("<ImpuestosAdicionales>")
+        n18 = len(p)
+        d19 = d17 if isinstance(d17, list) else d17.get('ImpuestoAdicional') or []
+        for d20 in (d19 if isinstance(d19, list) else (d19,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d20['TipoImpuesto'])}</TipoImpuesto><TasaImpuestoAdicional>{'%.2f' % float(d20['TasaImpuestoAdicional'])}</TasaImpuestoAdicional><OtrosImpuestosAdicionales>{'%.2f' % float(d20['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales></ImpuestoAdicional>")
+        if len(p) == n18:
+            p[-1] = "<ImpuestosAdicionales/>"
+        else:
+            p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d16['MontoTotal'])}</MontoTotal>")
+    if d16.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d16['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d16.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d16['MontoPeriodo'])}</MontoPeriodo>")
+    if d16.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d16['SaldoAnterior'])}</SaldoAnterior>")
+    if d16.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d16['MontoAvancePago'])}</MontoAvancePago>")
+    if d16.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d16['ValorPagar'])}</ValorPagar>")
+    p.append("</Totales>")
+    d21 = d4.get('OtraMoneda')
+    if d21:
+        p.append("<OtraMoneda>")
+        n22 = len(p)
+        if d21.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d21['TipoMoneda'])}</TipoMoneda>")
+        if d21.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d21['TipoCambio'])}</TipoCambio>")
+        if d21.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d21['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d21.get('MontoImpuestoAdicionalOtraMoneda') is not None:
+            p.append(f"<MontoImpuestoAdicionalOtraMoneda>{'%.2f' % float(d21['MontoImpuestoAdicionalOtraMoneda'])}</MontoImpuestoAdicionalOtraMoneda>")
+        d23 = d21.get('ImpuestosAdicionalesOtraMoneda')
+        if d23:
+            p.append("<ImpuestosAdicionalesOtraMoneda>")
+            n24 = len(p)
+            d25 = d23 if isinstance(d23, list) else d23.get('ImpuestoAdicionalOtraMoneda') or []
+            for d26 in (d25 if isinstance(d25, list) else (d25,)):
+                p.append("<ImpuestoAdicionalOtraMoneda>")
+                n27 = len(p)
+                if d26.get('TipoImpuestoOtraMoneda') is not None:
+                    p.append(f"<TipoImpuestoOtraMoneda>{'%03d' % int(d26['TipoImpuestoOtraMoneda'])}</TipoImpuestoOtraMoneda>")
+                if d26.get('TasaImpuestoAdicionalOtraMoneda') is not None:
+                    p.append(f"<TasaImpuestoAdicionalOtraMoneda>{'%.2f' % float(d26['TasaImpuestoAdicionalOtraMoneda'])}</TasaImpuestoAdicionalOtraMoneda>")
+                if d26.get('OtrosImpuestosAdicionalesOtraMoneda') is not None:
+                    p.append(f"<OtrosImpuestosAdicionalesOtraMoneda>{'%.2f' % float(d26['OtrosImpuestosAdicionalesOtraMoneda'])}</OtrosImpuestosAdicionalesOtraMoneda>")
+                if len(p) == n27:
+                    p[-1] = "<ImpuestoAdicionalOtraMoneda/>"
+                else:
+                    p.append("</ImpuestoAdicionalOtraMoneda>")
+            if len(p) == n24:
+                p[-1] = "<ImpuestosAdicionalesOtraMoneda/>"
+            else:
+                p.append("</ImpuestosAdicionalesOtraMoneda>")
+        if d21.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d21['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n22:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d28 = data.get('TablaCodigosItem')
+    if d28:
+        p.append("<TablaCodigosItem>")
+        n29 = len(p)
+        d30 = d28 if isinstance(d28, list) else d28.get('CodigosItem') or []
+        for d31 in (d30 if isinstance(d30, list) else (d30,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d31['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d31['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n29:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion><NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d32 = data.get('TablaSubDescuento')
+    if d32:
+        p.append("<TablaSubDescuento>")
+        n33 = len(p)
+        d34 = d32 if isinstance(d32, list) else d32.get('SubDescuento') or []
+        for d35 in (d34 if isinstance(d34, list) else (d34,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{xml_text(d35['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d35.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d35['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d35.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d35['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        if len(p) == n33:
+            p[-1] = "<TablaSubDescuento/>"
+        else:
+            p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d36 = data.get('TablaSubRecargo')
+    if d36:
+        p.append("<TablaSubRecargo>")
+        n37 = len(p)
+        d38 = d36 if isinstance(d36, list) else d36.get('SubRecargo') or []
+        for d39 in (d38 if isinstance(d38, list) else (d38,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{xml_text(d39['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d39.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d39['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d39.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d39['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        if len(p) == n37:
+            p[-1] = "<TablaSubRecargo/>"
+        else:
+            p.append("</TablaSubRecargo>")
+    d40 = data.get('TablaImpuestoAdicional')
+    if d40:
+        p.append("<TablaImpuestoAdicional>")
+        n41 = len(p)
+        d42 = d40 if isinstance(d40, list) else d40.get('ImpuestoAdicional') or []
+        for d43 in (d42 if isinstance(d42, list) else (d42,)):
+            p.append(f"<ImpuestoAdicional><TipoImpuesto>{'%03d' % int(d43['TipoImpuesto'])}</TipoImpuesto></ImpuestoAdicional>")
+        if len(p) == n41:
+            p[-1] = "<TablaImpuestoAdicional/>"
+        else:
+            p.append("</TablaImpuestoAdicional>")
+    d44 = data.get('OtraMonedaDetalle')
+    if d44:
+        p.append("<OtraMonedaDetalle>")
+        n45 = len(p)
+        if d44.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d44['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d44.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d44['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d44.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d44['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d44.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d44['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n45:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d46 = data.get('Subtotales')
+    if d46:
+        p.append("<Subtotales>")
+        n47 = len(p)
+        d48 = d46 if isinstance(d46, list) else d46.get('Subtotal') or []
+        for d49 in (d48 if isinstance(d48, list) else (d48,)):
+            p.append("<Subtotal>")
+            n50 = len(p)
+            if d49.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d49['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d49.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d49['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d49.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d49['Orden'])}</Orden>")
+            if d49.get('SubTotalImpuestoAdicional') is not None:
+                p.append(f"<SubTotalImpuestoAdicional>{'%.2f' % float(d49['SubTotalImpuestoAdicional'])}</SubTotalImpuestoAdicional>")
+            if d49.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d49['SubTotalExento'])}</SubTotalExento>")
+            if d49.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d49['MontoSubTotal'])}</MontoSubTotal>")
+            if d49.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d49['Lineas'])}</Lineas>")
+            if len(p) == n50:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n47:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    d51 = data.get('DescuentosORecargos')
+    if d51:
+        p.append("<DescuentosORecargos>")
+        n52 = len(p)
+        d53 = d51 if isinstance(d51, list) else d51.get('DescuentoORecargo') or []
+        for d54 in (d53 if isinstance(d53, list) else (d53,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{xml_text(d54['NumeroLinea'])}</NumeroLinea><TipoAjuste>{xml_text(d54['TipoAjuste'])}</TipoAjuste>")
+            if d54.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{xml_text(d54['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d54.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{xml_text(d54['TipoValor'])}</TipoValor>")
+            if d54.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d54['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d54.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d54['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d54.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d54['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d54.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{xml_text(d54['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        if len(p) == n52:
+            p[-1] = "<DescuentosORecargos/>"
+        else:
+            p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d55 = data.get('Paginacion')
+        if d55:
+            p.append("<Paginacion>")
+            n56 = len(p)
+            d57 = d55 if isinstance(d55, list) else d55.get('Pagina') or []
+            for d58 in (d57 if isinstance(d57, list) else (d57,)):
+                p.append("<Pagina>")
+                n59 = len(p)
+                if d58.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d58['PaginaNo'])}</PaginaNo>")
+                if d58.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d58['NoLineaDesde'])}</NoLineaDesde>")
+                if d58.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d58['NoLineaHasta'])}</NoLineaHasta>")
+                if d58.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d58['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d58.get('SubtotalImpuestoAdicionalPagina') is not None:
+                    p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(d58['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+                d60 = d58.get('SubtotalImpuestoAdicional')
+                if d60:
+                    p.append("<SubtotalImpuestoAdicional>")
+                    n61 = len(p)
+                    if d60.get('SubtotalOtrosImpuesto') is not None:
+                        p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d60['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+                    if len(p) == n61:
+                        p[-1] = "<SubtotalImpuestoAdicional/>"
+                    else:
+                        p.append("</SubtotalImpuestoAdicional>")
+                if d58.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d58['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d58.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d58['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                if len(p) == n59:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n56:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d62 = data.get('InformacionReferencia')
+    if d62:
+        p.append("<InformacionReferencia>")
+        n63 = len(p)
+        if d62.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{xml_text(d62['NCFModificado'])}</NCFModificado>")
+        if d62.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{xml_text(d62['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d62.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d62['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d62.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{xml_text(d62['CodigoModificacion'])}</CodigoModificacion>")
+        if len(p) == n63:
+            p[-1] = "<InformacionReferencia/>"
+        else:
+            p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n64 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('SubtotalImpuestoAdicionalPagina') is not None:
+        p.append(f"<SubtotalImpuestoAdicionalPagina>{'%.2f' % float(data['SubtotalImpuestoAdicionalPagina'])}</SubtotalImpuestoAdicionalPagina>")
+    d65 = data.get('SubtotalImpuestoAdicional')
+    if d65:
+        p.append("<SubtotalImpuestoAdicional>")
+        n66 = len(p)
+        if d65.get('SubtotalOtrosImpuesto') is not None:
+            p.append(f"<SubtotalOtrosImpuesto>{'%.2f' % float(d65['SubtotalOtrosImpuesto'])}</SubtotalOtrosImpuesto>")
+        if len(p) == n66:
+            p[-1] = "<SubtotalImpuestoAdicional/>"
+        else:
+            p.append("</SubtotalImpuestoAdicional>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    if len(p) == n64:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
@@ -0,0 +1,1573 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 46 v.1.0.xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 46
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{esc(d4['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d4['TipoIngresos'])}</TipoIngresos><TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{esc(d4['TerminoPago'])}</TerminoPago>")
+    d5 = d4.get('TablaFormasPago')
+    if d5:
+        p.append("<TablaFormasPago>")
+        d6 = d5 if isinstance(d5, list) else d5.get('FormaDePago') or []
+        for d7 in (d6 if isinstance(d6, list) else (d6,)):
+            p.append(f"<FormaDePago><FormaPago>{esc(d7['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d7['MontoPago'])}</MontoPago></FormaDePago>")
+        p.append("</TablaFormasPago>")
+    if d4.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{esc(d4['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d4.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{esc(d4['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d4.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{esc(d4['BancoPago'])}</BancoPago>")
+    if d4.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{esc(fmt_date(d4['FechaDesde']))}</FechaDesde>")
+    if d4.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{esc(fmt_date(d4['FechaHasta']))}</FechaHasta>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d8 = d3.get('Emisor')
+    if not d8:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d8))
+    if d8.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{esc(d8['CodigoVendedor'])}</CodigoVendedor>")
+    if d8.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d8['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d8.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d8['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d8.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{esc(d8['ZonaVenta'])}</ZonaVenta>")
+    if d8.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{esc(d8['RutaVenta'])}</RutaVenta>")
+    if d8.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d8['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d3.get('Comprador')
+    if not d9:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Comprador'")
+    p.append("<Comprador>")
+    if d9.get('RNCComprador') is not None:
+        p.append(f"<RNCComprador>{esc(d9['RNCComprador'])}</RNCComprador>")
+    if d9.get('IdentificadorExtranjero') is not None:
+        p.append(f"<IdentificadorExtranjero>{esc(d9['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+    p.append(f"<RazonSocialComprador>{esc(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d9.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{esc(d9['ContactoComprador'])}</ContactoComprador>")
+    if d9.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{esc(d9['CorreoComprador'])}</CorreoComprador>")
+    if d9.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{esc(d9['DireccionComprador'])}</DireccionComprador>")
+    if d9.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d9['MunicipioComprador'])}</MunicipioComprador>")
+    if d9.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d9['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d9.get('PaisComprador') is not None:
+        p.append(f"<PaisComprador>{esc(d9['PaisComprador'])}</PaisComprador>")
+    if d9.get('FechaEntrega') is not None:
+        p.append(f"<FechaEntrega>{esc(fmt_date(d9['FechaEntrega']))}</FechaEntrega>")
+    if d9.get('ContactoEntrega') is not None:
+        p.append(f"<ContactoEntrega>{esc(d9['ContactoEntrega'])}</ContactoEntrega>")
+    if d9.get('DireccionEntrega') is not None:
+        p.append(f"<DireccionEntrega>{esc(d9['DireccionEntrega'])}</DireccionEntrega>")
+    if d9.get('TelefonoAdicional') is not None:
+        p.append(f"<TelefonoAdicional>{esc(d9['TelefonoAdicional'])}</TelefonoAdicional>")
+    if d9.get('FechaOrdenCompra') is not None:
+        p.append(f"<FechaOrdenCompra>{esc(fmt_date(d9['FechaOrdenCompra']))}</FechaOrdenCompra>")
+    if d9.get('NumeroOrdenCompra') is not None:
+        p.append(f"<NumeroOrdenCompra>{esc(d9['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+    if d9.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{esc(d9['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d9.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{esc(d9['ResponsablePago'])}</ResponsablePago>")
+    if d9.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{esc(d9['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d10 = d3.get('InformacionesAdicionales')
+    if d10:
+        p.append("<InformacionesAdicionales>")
+        if d10.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{esc(fmt_date(d10['FechaEmbarque']))}</FechaEmbarque>")
+        if d10.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{esc(d10['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d10.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{esc(d10['NumeroContenedor'])}</NumeroContenedor>")
+        if d10.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{esc(d10['NumeroReferencia'])}</NumeroReferencia>")
+        if d10.get('NombrePuertoEmbarque') is not None:
+            p.append(f"<NombrePuertoEmbarque>{esc(d10['NombrePuertoEmbarque'])}</NombrePuertoEmbarque>")
+        if d10.get('CondicionesEntrega') is not None:
+            p.append(f"<CondicionesEntrega>{esc(d10['CondicionesEntrega'])}</CondicionesEntrega>")
+        if d10.get('TotalFob') is not None:
+            p.append(f"<TotalFob>{'%.2f' % float(d10['TotalFob'])}</TotalFob>")
+        if d10.get('Seguro') is not None:
+            p.append(f"<Seguro>{'%.2f' % float(d10['Seguro'])}</Seguro>")
+        if d10.get('Flete') is not None:
+            p.append(f"<Flete>{'%.2f' % float(d10['Flete'])}</Flete>")
+        if d10.get('OtrosGastos') is not None:
+            p.append(f"<OtrosGastos>{'%.2f' % float(d10['OtrosGastos'])}</OtrosGastos>")
+        if d10.get('TotalCif') is not None:
+            p.append(f"<TotalCif>{'%.2f' % float(d10['TotalCif'])}</TotalCif>")
+        if d10.get('RegimenAduanero') is not None:
+            p.append(f"<RegimenAduanero>{esc(d10['RegimenAduanero'])}</RegimenAduanero>")
+        if d10.get('NombrePuertoSalida') is not None:
+            p.append(f"<NombrePuertoSalida>{esc(d10['NombrePuertoSalida'])}</NombrePuertoSalida>")
+        if d10.get('NombrePuertoDesembarque') is not None:
+            p.append(f"<NombrePuertoDesembarque>{esc(d10['NombrePuertoDesembarque'])}</NombrePuertoDesembarque>")
+        if d10.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d10['PesoBruto'])}</PesoBruto>")
+        if d10.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d10['PesoNeto'])}</PesoNeto>")
+        if d10.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{esc(d10['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d10.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{esc(d10['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d10.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d10['CantidadBulto'])}</CantidadBulto>")
+        if d10.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{esc(d10['UnidadBulto'])}</UnidadBulto>")
+        if d10.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d10['VolumenBulto'])}</VolumenBulto>")
+        if d10.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{esc(d10['UnidadVolumen'])}</UnidadVolumen>")
+        p.append("</InformacionesAdicionales>")
+    d11 = d3.get('Transporte')
+    if d11:
+        p.append("<Transporte>")
+        if d11.get('ViaTransporte') is not None:
+            p.append(f"<ViaTransporte>{'%02d' % int(d11['ViaTransporte'])}</ViaTransporte>")
+        if d11.get('PaisOrigen') is not None:
+            p.append(f"<PaisOrigen>{esc(d11['PaisOrigen'])}</PaisOrigen>")
+        if d11.get('DireccionDestino') is not None:
+            p.append(f"<DireccionDestino>{esc(d11['DireccionDestino'])}</DireccionDestino>")
+        if d11.get('PaisDestino') is not None:
+            p.append(f"<PaisDestino>{esc(d11['PaisDestino'])}</PaisDestino>")
+        if d11.get('RNCIdentificacionCompaniaTransportista') is not None:
+            p.append(f"<RNCIdentificacionCompaniaTransportista>{esc(d11['RNCIdentificacionCompaniaTransportista'])}</RNCIdentificacionCompaniaTransportista>")
+        if d11.get('NombreCompaniaTransportista') is not None:
+            p.append(f"<NombreCompaniaTransportista>{esc(d11['NombreCompaniaTransportista'])}</NombreCompaniaTransportista>")
+        if d11.get('NumeroViaje') is not None:
+            p.append(f"<NumeroViaje>{esc(d11['NumeroViaje'])}</NumeroViaje>")
+        if d11.get('Conductor') is not None:
+            p.append(f"<Conductor>{esc(d11['Conductor'])}</Conductor>")
+        if d11.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{esc(d11['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d11.get('Ficha') is not None:
+            p.append(f"<Ficha>{esc(d11['Ficha'])}</Ficha>")
+        if d11.get('Placa') is not None:
+            p.append(f"<Placa>{esc(d11['Placa'])}</Placa>")
+        if d11.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{esc(d11['RutaTransporte'])}</RutaTransporte>")
+        if d11.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{esc(d11['ZonaTransporte'])}</ZonaTransporte>")
+        if d11.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{esc(d11['NumeroAlbaran'])}</NumeroAlbaran>")
+        p.append("</Transporte>")
+    d12 = d3.get('Totales')
+    if not d12:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d12.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d12['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d12.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d12['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d12.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{esc(d12['ITBIS3'])}</ITBIS3>")
+    if d12.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d12['TotalITBIS'])}</TotalITBIS>")
+    if d12.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d12['TotalITBIS3'])}</TotalITBIS3>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d12['MontoTotal'])}</MontoTotal>")
+    if d12.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d12['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d12.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d12['MontoPeriodo'])}</MontoPeriodo>")
+    if d12.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d12['SaldoAnterior'])}</SaldoAnterior>")
+    if d12.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d12['MontoAvancePago'])}</MontoAvancePago>")
+    if d12.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d12['ValorPagar'])}</ValorPagar>")
+    p.append("</Totales>")
+    d13 = d3.get('OtraMoneda')
+    if d13:
+        p.append("<OtraMoneda>")
+        if d13.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d13['TipoMoneda'])}</TipoMoneda>")
+        if d13.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d13['TipoCambio'])}</TipoCambio>")
+        if d13.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d13['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d13.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d13['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d13.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d13['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d13.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d13['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d13.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d13['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d14 = data.get('TablaCodigosItem')
+    if d14:
+        p.append("<TablaCodigosItem>")
+        d15 = d14 if isinstance(d14, list) else d14.get('CodigosItem') or []
+        for d16 in (d15 if isinstance(d15, list) else (d15,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d16['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d16['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion><NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{esc(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{esc(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    d17 = data.get('Mineria')
+    if d17:
+        p.append("<Mineria>")
+        if d17.get('PesoNetoKilogramo') is not None:
+            p.append(f"<PesoNetoKilogramo>{'%.3f' % float(d17['PesoNetoKilogramo'])}</PesoNetoKilogramo>")
+        if d17.get('PesoNetoMineria') is not None:
+            p.append(f"<PesoNetoMineria>{'%.3f' % float(d17['PesoNetoMineria'])}</PesoNetoMineria>")
+        if d17.get('TipoAfiliacion') is not None:
+            p.append(f"<TipoAfiliacion>{esc(d17['TipoAfiliacion'])}</TipoAfiliacion>")
+        if d17.get('Liquidacion') is not None:
+            p.append(f"<Liquidacion>{esc(d17['Liquidacion'])}</Liquidacion>")
+        p.append("</Mineria>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d18 = data.get('TablaSubDescuento')
+    if d18:
+        p.append("<TablaSubDescuento>")
+        d19 = d18 if isinstance(d18, list) else d18.get('SubDescuento') or []
+        for d20 in (d19 if isinstance(d19, list) else (d19,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{esc(d20['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d20.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d20['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d20.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d20['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d21 = data.get('TablaSubRecargo')
+    if d21:
+        p.append("<TablaSubRecargo>")
+        d22 = d21 if isinstance(d21, list) else d21.get('SubRecargo') or []
+        for d23 in (d22 if isinstance(d22, list) else (d22,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{esc(d23['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d23.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d23['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d23.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d23['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        p.append("</TablaSubRecargo>")
+    d24 = data.get('OtraMonedaDetalle')
+    if d24:
+        p.append("<OtraMonedaDetalle>")
+        if d24.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d24['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d24.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d24['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d24.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d24['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d24.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d24['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d25 = data.get('Subtotales')
+    if d25:
+        p.append("<Subtotales>")
+        d26 = d25 if isinstance(d25, list) else d25.get('Subtotal') or []
+        for d27 in (d26 if isinstance(d26, list) else (d26,)):
+            p.append("<Subtotal>")
+            if d27.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d27['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d27.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d27['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d27.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d27['Orden'])}</Orden>")
+            if d27.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d27['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d27.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d27['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d27.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d27['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d27.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d27['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d27.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d27['MontoSubTotal'])}</MontoSubTotal>")
+            if d27.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d27['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    d28 = data.get('DescuentosORecargos')
+    if d28:
+        p.append("<DescuentosORecargos>")
+        d29 = d28 if isinstance(d28, list) else d28.get('DescuentoORecargo') or []
+        for d30 in (d29 if isinstance(d29, list) else (d29,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{esc(d30['NumeroLinea'])}</NumeroLinea><TipoAjuste>{esc(d30['TipoAjuste'])}</TipoAjuste>")
+            if d30.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{esc(d30['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d30.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{esc(d30['TipoValor'])}</TipoValor>")
+            if d30.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d30['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d30.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d30['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d30.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d30['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d30.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{esc(d30['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d31 = data.get('Paginacion')
+        if d31:
+            p.append("<Paginacion>")
+            d32 = d31 if isinstance(d31, list) else d31.get('Pagina') or []
+            for d33 in (d32 if isinstance(d32, list) else (d32,)):
+                p.append("<Pagina>")
+                if d33.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d33['PaginaNo'])}</PaginaNo>")
+                if d33.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d33['NoLineaDesde'])}</NoLineaDesde>")
+                if d33.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d33['NoLineaHasta'])}</NoLineaHasta>")
+                if d33.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d33['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d33.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d33['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d33.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d33['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d33.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d33['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d33.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d33['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d33.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d33['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d34 = data.get('InformacionReferencia')
+    if d34:
+        p.append("<InformacionReferencia>")
+        if d34.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{esc(d34['NCFModificado'])}</NCFModificado>")
+        if d34.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{esc(d34['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d34.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{esc(fmt_date(d34['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d34.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{esc(d34['CodigoModificacion'])}</CodigoModificacion>")
+        p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"      <IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>\n")
+    p.append(f"      <TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos>\n      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"      <TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>\n")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("      <TablaFormasPago>\n")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"        <FormaDePago>\n          <FormaPago>{xml_text(d9['FormaPago'])}</FormaPago>\n          <MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago>\n        </FormaDePago>\n")
+        if len(p) == n7:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"      <TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>\n")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"      <NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>\n")
+    if d5.get('BancoPago') is not None:
+        p.append(f"      <BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>\n")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"      <FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>\n")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"      <FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"      <CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>\n")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"      <ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>\n")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"      <RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>\n")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Comprador'")
+    p.append("    <Comprador>\n")
+    if d11.get('RNCComprador') is not None:
+        p.append(f"      <RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>\n")
+    if d11.get('IdentificadorExtranjero') is not None:
+        p.append(f"      <IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>\n")
+    p.append(f"      <RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>\n")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"      <ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>\n")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"      <CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>\n")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"      <DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>\n")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"      <MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>\n")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"      <ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>\n")
+    if d11.get('PaisComprador') is not None:
+        p.append(f"      <PaisComprador>{xml_text(d11['PaisComprador'])}</PaisComprador>\n")
+    if d11.get('FechaEntrega') is not None:
+        p.append(f"      <FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>\n")
+    if d11.get('ContactoEntrega') is not None:
+        p.append(f"      <ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>\n")
+    if d11.get('DireccionEntrega') is not None:
+        p.append(f"      <DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>\n")
+    if d11.get('TelefonoAdicional') is not None:
+        p.append(f"      <TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>\n")
+    if d11.get('FechaOrdenCompra') is not None:
+        p.append(f"      <FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>\n")
+    if d11.get('NumeroOrdenCompra') is not None:
+        p.append(f"      <NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>\n")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"      <CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>\n")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"      <ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>\n")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"      <InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>\n")
+    p.append("    </Comprador>\n")
+    d12 = d4.get('InformacionesAdicionales')
+    if d12:
+        p.append("    <InformacionesAdicionales>\n")
+        n13 = len(p)
+        if d12.get('FechaEmbarque') is not None:
+            p.append(f"      <FechaEmbarque>{xml_text(fmt_date(d12['FechaEmbarque']))}</FechaEmbarque>\n")
+        if d12.get('NumeroEmbarque') is not None:
+            p.append(f"      <NumeroEmbarque>{xml_text(d12['NumeroEmbarque'])}</NumeroEmbarque>\n")
+        if d12.get('NumeroContenedor') is not None:
+            p.append(f"      <NumeroContenedor>{xml_text(d12['NumeroContenedor'])}</NumeroContenedor>\n")
+        if d12.get('NumeroReferencia') is not None:
+            p.append(f"      <NumeroReferencia>{xml_text(d12['NumeroReferencia'])}</NumeroReferencia>\n")
+        if d12.get('NombrePuertoEmbarque') is not None:
+            p.append(f"      <NombrePuertoEmbarque>{xml_text(d12['NombrePuertoEmbarque'])}</NombrePuertoEmbarque>\n")
+        if d12.get('CondicionesEntrega') is not None:
+            p.append(f"      <CondicionesEntrega>{xml_text(d12['CondicionesEntrega'])}</CondicionesEntrega>\n")
+        if d12.get('TotalFob') is not None:
+            p.append(f"      <TotalFob>{'%.2f' % float(d12['TotalFob'])}</TotalFob>\n")
+        if d12.get('Seguro') is not None:
+            p.append(f"      <Seguro>{'%.2f' % float(d12['Seguro'])}</Seguro>\n")
+        if d12.get('Flete') is not None:
+            p.append(f"      <Flete>{'%.2f' % float(d12['Flete'])}</Flete>\n")
+        if d12.get('OtrosGastos') is not None:
+            p.append(f"      <OtrosGastos>{'%.2f' % float(d12['OtrosGastos'])}</OtrosGastos>\n")
+        if d12.get('TotalCif') is not None:
+            p.append(f"      <TotalCif>{'%.2f' % float(d12['TotalCif'])}</TotalCif>\n")
+        if d12.get('RegimenAduanero') is not None:
+            p.append(f"      <RegimenAduanero>{xml_text(d12['RegimenAduanero'])}</RegimenAduanero>\n")
+        if d12.get('NombrePuertoSalida') is not None:
+            p.append(f"      <NombrePuertoSalida>{xml_text(d12['NombrePuertoSalida'])}</NombrePuertoSalida>\n")
+        if d12.get('NombrePuertoDesembarque') is not None:
+            p.append(f"      <NombrePuertoDesembarque>{xml_text(d12['NombrePuertoDesembarque'])}</NombrePuertoDesembarque>\n")
+        if d12.get('PesoBruto') is not None:
+            p.append(f"      <PesoBruto>{'%.2f' % float(d12['PesoBruto'])}</PesoBruto>\n")
+        if d12.get('PesoNeto') is not None:
+            p.append(f"      <PesoNeto>{'%.2f' % float(d12['PesoNeto'])}</PesoNeto>\n")
+        if d12.get('UnidadPesoBruto') is not None:
+            p.append(f"      <UnidadPesoBruto>{xml_text(d12['UnidadPesoBruto'])}</UnidadPesoBruto>\n")
+        if d12.get('UnidadPesoNeto') is not None:
+            p.append(f"      <UnidadPesoNeto>{xml_text(d12['UnidadPesoNeto'])}</UnidadPesoNeto>\n")
+        if d12.get('CantidadBulto') is not None:
+            p.append(f"      <CantidadBulto>{'%.2f' % float(d12['CantidadBulto'])}</CantidadBulto>\n")
+        if d12.get('UnidadBulto') is not None:
+            p.append(f"      <UnidadBulto>{xml_text(d12['UnidadBulto'])}</UnidadBulto>\n")
+        if d12.get('VolumenBulto') is not None:
+            p.append(f"      <VolumenBulto>{'%.2f' % float(d12['VolumenBulto'])}</VolumenBulto>\n")
+        if d12.get('UnidadVolumen') is not None:
+            p.append(f"      <UnidadVolumen>{xml_text(d12['UnidadVolumen'])}</UnidadVolumen>\n")
+        if len(p) == n13:
+            p[-1] = "    <InformacionesAdicionales/>\n"
+        else:
+            p.append("    </InformacionesAdicionales>\n")
+    d14 = d4.get('Transporte')
+    if d14:
+        p.append("    <Transporte>\n")
+        n15 = len(p)
+        if d14.get('ViaTransporte') is not None:
+            p.append(f"      <ViaTransporte>{'%02d' % int(d14['ViaTransporte'])}</ViaTransporte>\n")
+        if d14.get('PaisOrigen') is not None:
+            p.append(f"      <PaisOrigen>{xml_text(d14['PaisOrigen'])}</PaisOrigen>\n")
+        if d14.get('DireccionDestino') is not None:
+            p.append(f"      <DireccionDestino>{xml_text(d14['DireccionDestino'])}</DireccionDestino>\n")
+        if d14.get('PaisDestino') is not None:
+            p.append(f"      <PaisDestino>{xml_text(d14['PaisDestino'])}</PaisDestino>\n")
+        if d14.get('RNCIdentificacionCompaniaTransportista') is not None:
+            p.append(f"      <RNCIdentificacionCompaniaTransportista>{xml_text(d14['RNCIdentificacionCompaniaTransportista'])}</RNCIdentificacionCompaniaTransportista>\n")
+        if d14.get('NombreCompaniaTransportista') is not None:
+            p.append(f"      <NombreCompaniaTransportista>{xml_text(d14['NombreCompaniaTransportista'])}</NombreCompaniaTransportista>\n")
+        if d14.get('NumeroViaje') is not None:
+            p.append(f"      <NumeroViaje>{xml_text(d14['NumeroViaje'])}</NumeroViaje>\n")
+        if d14.get('Conductor') is not None:
+            p.append(f"      <Conductor>{xml_text(d14['Conductor'])}</Conductor>\n")
+        if d14.get('DocumentoTransporte') is not None:
+            p.append(f"      <DocumentoTransporte>{xml_text(d14['DocumentoTransporte'])}</DocumentoTransporte>\n")
+        if d14.get('Ficha') is not None:
+            p.append(f"      <Ficha>{xml_text(d14['Ficha'])}</Ficha>\n")
+        if d14.get('Placa') is not None:
+            p.append(f"      <Placa>{xml_text(d14['Placa'])}</Placa>\n")
+        if d14.get('RutaTransporte') is not None:
+            p.append(f"      <RutaTransporte>{xml_text(d14['RutaTransporte'])}</RutaTransporte>\n")
+        if d14.get('ZonaTransporte') is not None:
+            p.append(f"      <ZonaTransporte>{xml_text(d14['ZonaTransporte'])}</ZonaTransporte>\n")
+        if d14.get('NumeroAlbaran') is not None:
+            p.append(f"      <NumeroAlbaran>{xml_text(d14['NumeroAlbaran'])}</NumeroAlbaran>\n")
+        if len(p) == n15:
+            p[-1] = "    <Transporte/>\n"
+        else:
+            p.append("    </Transporte>\n")
+    d16 = d4.get('Totales')
+    if not d16:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d16.get('MontoGravadoTotal') is not None:
+        p.append(f"      <MontoGravadoTotal>{'%.2f' % float(d16['MontoGravadoTotal'])}</MontoGravadoTotal>\n")
+    if d16.get('MontoGravadoI3') is not None:
+        p.append(f"      <MontoGravadoI3>{'%.2f' % float(d16['MontoGravadoI3'])}</MontoGravadoI3>\n")
+    if d16.get('ITBIS3') is not None:
+        p.append(f"      <ITBIS3>{xml_text(d16['ITBIS3'])}</ITBIS3>\n")
+    if d16.get('TotalITBIS') is not None:
+        p.append(f"      <TotalITBIS>{'%.2f' % float(d16['TotalITBIS'])}</TotalITBIS>\n")
+    if d16.get('TotalITBIS3') is not None:
+        p.append(f"      <TotalITBIS3>{'%.2f' % float(d16['TotalITBIS3'])}</TotalITBIS3>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d16['MontoTotal'])}</MontoTotal>\n")
+    if d16.get('MontoNoFacturable') is not None:
+        p.append(f"      <MontoNoFacturable>{'%.2f' % float(d16['MontoNoFacturable'])}</MontoNoFacturable>\n")
+    if d16.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d16['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d16.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d16['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d16.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d16['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d16.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d16['ValorPagar'])}</ValorPagar>\n")
+    p.append("    </Totales>\n")
+    d17 = d4.get('OtraMoneda')
+    if d17:
+        p.append("    <OtraMoneda>\n")
+        n18 = len(p)
+        if d17.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d17['TipoMoneda'])}</TipoMoneda>\n")
+        if d17.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d17['TipoCambio'])}</TipoCambio>\n")
+        if d17.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoGravadoTotalOtraMoneda>{'%.2f' % float(d17['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>\n")
+        if d17.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"      <MontoGravado3OtraMoneda>{'%.2f' % float(d17['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>\n")
+        if d17.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"      <TotalITBISOtraMoneda>{'%.2f' % float(d17['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>\n")
+        if d17.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"      <TotalITBIS3OtraMoneda>{'%.2f' % float(d17['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>\n")
+        if d17.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d17['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n18:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d19 = data.get('TablaCodigosItem')
+    if d19:
+        p.append("      <TablaCodigosItem>\n")
+        n20 = len(p)
+        d21 = d19 if isinstance(d19, list) else d19.get('CodigosItem') or []
+        for d22 in (d21 if isinstance(d21, list) else (d21,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d22['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d22['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n20:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"      <FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>\n")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"      <FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>\n")
+    d23 = data.get('Mineria')
+    if d23:
+        p.append("      <Mineria>\n")
+        n24 = len(p)
+        if d23.get('PesoNetoKilogramo') is not None:
+            p.append(f"        <PesoNetoKilogramo>{'%.3f' % float(d23['PesoNetoKilogramo'])}</PesoNetoKilogramo>\n")
+        if d23.get('PesoNetoMineria') is not None:
+            p.append(f"        <PesoNetoMineria>{'%.3f' % float(d23['PesoNetoMineria'])}</PesoNetoMineria>\n")
+        if d23.get('TipoAfiliacion') is not None:
+            p.append(f"        <TipoAfiliacion>{xml_text(d23['TipoAfiliacion'])}</TipoAfiliacion>\n")
+        if d23.get('Liquidacion') is not None:
+            p.append(f"        <Liquidacion>{xml_text(d23['Liquidacion'])}</Liquidacion>\n")
+        if len(p) == n24:
+            p[-1] = "      <Mineria/>\n"
+        else:
+            p.append("      </Mineria>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"      <DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>\n")
+    d25 = data.get('TablaSubDescuento')
+    if d25:
+        p.append("      <TablaSubDescuento>\n")
+        n26 = len(p)
+        d27 = d25 if isinstance(d25, list) else d25.get('SubDescuento') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append(f"        <SubDescuento>\n          <TipoSubDescuento>{xml_text(d28['TipoSubDescuento'])}</TipoSubDescuento>\n")
+            if d28.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"          <SubDescuentoPorcentaje>{'%.2f' % float(d28['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>\n")
+            if d28.get('MontoSubDescuento') is not None:
+                p.append(f"          <MontoSubDescuento>{'%.2f' % float(d28['MontoSubDescuento'])}</MontoSubDescuento>\n")
+            p.append("        </SubDescuento>\n")
+        if len(p) == n26:
+            p[-1] = "      <TablaSubDescuento/>\n"
+        else:
+            p.append("      </TablaSubDescuento>\n")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"      <RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>\n")
+    d29 = data.get('TablaSubRecargo')
+    if d29:
+        p.append("      <TablaSubRecargo>\n")
+        n30 = len(p)
+        d31 = d29 if isinstance(d29, list) else d29.get('SubRecargo') or []
+        for d32 in (d31 if isinstance(d31, list) else (d31,)):
+            p.append(f"        <SubRecargo>\n          <TipoSubRecargo>{xml_text(d32['TipoSubRecargo'])}</TipoSubRecargo>\n")
+            if d32.get('SubRecargoPorcentaje') is not None:
+                p.append(f"          <SubRecargoPorcentaje>{'%.2f' % float(d32['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>\n")
+            if d32.get('MontoSubRecargo') is not None:
+                p.append(f"          <MontoSubRecargo>{'%.2f' % float(d32['MontoSubRecargo'])}</MontoSubRecargo>\n")
+            p.append("        </SubRecargo>\n")
+        if len(p) == n30:
+            p[-1] = "      <TablaSubRecargo/>\n"
+        else:
+            p.append("      </TablaSubRecargo>\n")
+    d33 = data.get('OtraMonedaDetalle')
+    if d33:
+        p.append("      <OtraMonedaDetalle>\n")
+        n34 = len(p)
+        if d33.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d33['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d33.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d33['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d33.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d33['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d33.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d33['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n34:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d35 = data.get('Subtotales')
+    if d35:
+        p.append("  <Subtotales>\n")
+        n36 = len(p)
+        d37 = d35 if isinstance(d35, list) else d35.get('Subtotal') or []
+        for d38 in (d37 if isinstance(d37, list) else (d37,)):
+            p.append("    <Subtotal>\n")
+            n39 = len(p)
+            if d38.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d38['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d38.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d38['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d38.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d38['Orden'])}</Orden>\n")
+            if d38.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"      <SubTotalMontoGravadoTotal>{'%.2f' % float(d38['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>\n")
+            if d38.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"      <SubTotalMontoGravadoI3>{'%.2f' % float(d38['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>\n")
+            if d38.get('SubTotaITBIS') is not None:
+                p.append(f"      <SubTotaITBIS>{'%.2f' % float(d38['SubTotaITBIS'])}</SubTotaITBIS>\n")
+            if d38.get('SubTotaITBIS3') is not None:
+                p.append(f"      <SubTotaITBIS3>{'%.2f' % float(d38['SubTotaITBIS3'])}</SubTotaITBIS3>\n")
+            if d38.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d38['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d38.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d38['Lineas'])}</Lineas>\n")
+            if len(p) == n39:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n36:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    d40 = data.get('DescuentosORecargos')
+    if d40:
+        p.append("  <DescuentosORecargos>\n")
+        n41 = len(p)
+        d42 = d40 if isinstance(d40, list) else d40.get('DescuentoORecargo') or []
+        for d43 in (d42 if isinstance(d42, list) else (d42,)):
+            p.append(f"    <DescuentoORecargo>\n      <NumeroLinea>{xml_text(d43['NumeroLinea'])}</NumeroLinea>\n      <TipoAjuste>{xml_text(d43['TipoAjuste'])}</TipoAjuste>\n")
+            if d43.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"      <DescripcionDescuentooRecargo>{xml_text(d43['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>\n")
+            if d43.get('TipoValor') is not None:
+                p.append(f"      <TipoValor>{xml_text(d43['TipoValor'])}</TipoValor>\n")
+            if d43.get('ValorDescuentooRecargo') is not None:
+                p.append(f"      <ValorDescuentooRecargo>{'%.2f' % float(d43['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>\n")
+            if d43.get('MontoDescuentooRecargo') is not None:
+                p.append(f"      <MontoDescuentooRecargo>{'%.2f' % float(d43['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>\n")
+            if d43.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"      <MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d43['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>\n")
+            if d43.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"      <IndicadorFacturacionDescuentooRecargo>{xml_text(d43['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>\n")
+            p.append("    </DescuentoORecargo>\n")
+        if len(p) == n41:
+            p[-1] = "  <DescuentosORecargos/>\n"
+        else:
+            p.append("  </DescuentosORecargos>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d44 = data.get('Paginacion')
+        if d44:
+            p.append("  <Paginacion>\n")
+            n45 = len(p)
+            d46 = d44 if isinstance(d44, list) else d44.get('Pagina') or []
+            for d47 in (d46 if isinstance(d46, list) else (d46,)):
+                p.append("    <Pagina>\n")
+                n48 = len(p)
+                if d47.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d47['PaginaNo'])}</PaginaNo>\n")
+                if d47.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d47['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d47.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d47['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d47.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(d47['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+                if d47.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(d47['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+                if d47.get('SubtotalItbisPagina') is not None:
+                    p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(d47['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+                if d47.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(d47['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+                if d47.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d47['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if d47.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(d47['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+                if len(p) == n48:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n45:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d49 = data.get('InformacionReferencia')
+    if d49:
+        p.append("  <InformacionReferencia>\n")
+        n50 = len(p)
+        if d49.get('NCFModificado') is not None:
+            p.append(f"    <NCFModificado>{xml_text(d49['NCFModificado'])}</NCFModificado>\n")
+        if d49.get('RNCOtroContribuyente') is not None:
+            p.append(f"    <RNCOtroContribuyente>{xml_text(d49['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+        if d49.get('FechaNCFModificado') is not None:
+            p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d49['FechaNCFModificado']))}</FechaNCFModificado>\n")
+        if d49.get('CodigoModificacion') is not None:
+            p.append(f"    <CodigoModificacion>{xml_text(d49['CodigoModificacion'])}</CodigoModificacion>\n")
+        if len(p) == n50:
+            p[-1] = "  <InformacionReferencia/>\n"
+        else:
+            p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n51 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"      <SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>\n")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"      <SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>\n")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"      <SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>\n")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"      <SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"      <SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>\n")
+    if len(p) == n51:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('IndicadorEnvioDiferido') is not None:
+        p.append(f"<IndicadorEnvioDiferido>{xml_text(d5['IndicadorEnvioDiferido'])}</IndicadorEnvioDiferido>")
+    p.append(f"<TipoIngresos>{'%02d' % int(d5['TipoIngresos'])}</TipoIngresos><TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("<TablaFormasPago>")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"<FormaDePago><FormaPago>{xml_text(d9['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago></FormaDePago>")
+        if len(p) == n7:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d5.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d10))
+    if d10.get('CodigoVendedor') is not None:
+        p.append(f"<CodigoVendedor>{xml_text(d10['CodigoVendedor'])}</CodigoVendedor>")
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d10.get('ZonaVenta') is not None:
+        p.append(f"<ZonaVenta>{xml_text(d10['ZonaVenta'])}</ZonaVenta>")
+    if d10.get('RutaVenta') is not None:
+        p.append(f"<RutaVenta>{xml_text(d10['RutaVenta'])}</RutaVenta>")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision></Emisor>")
+    d11 = d4.get('Comprador')
+    if not d11:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Comprador'")
+    p.append("<Comprador>")
+    if d11.get('RNCComprador') is not None:
+        p.append(f"<RNCComprador>{xml_text(d11['RNCComprador'])}</RNCComprador>")
+    if d11.get('IdentificadorExtranjero') is not None:
+        p.append(f"<IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+    p.append(f"<RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>")
+    if d11.get('ContactoComprador') is not None:
+        p.append(f"<ContactoComprador>{xml_text(d11['ContactoComprador'])}</ContactoComprador>")
+    if d11.get('CorreoComprador') is not None:
+        p.append(f"<CorreoComprador>{xml_text(d11['CorreoComprador'])}</CorreoComprador>")
+    if d11.get('DireccionComprador') is not None:
+        p.append(f"<DireccionComprador>{xml_text(d11['DireccionComprador'])}</DireccionComprador>")
+    if d11.get('MunicipioComprador') is not None:
+        p.append(f"<MunicipioComprador>{'%06d' % int(d11['MunicipioComprador'])}</MunicipioComprador>")
+    if d11.get('ProvinciaComprador') is not None:
+        p.append(f"<ProvinciaComprador>{'%06d' % int(d11['ProvinciaComprador'])}</ProvinciaComprador>")
+    if d11.get('PaisComprador') is not None:
+        p.append(f"<PaisComprador>{xml_text(d11['PaisComprador'])}</PaisComprador>")
+    if d11.get('FechaEntrega') is not None:
+        p.append(f"<FechaEntrega>{xml_text(fmt_date(d11['FechaEntrega']))}</FechaEntrega>")
+    if d11.get('ContactoEntrega') is not None:
+        p.append(f"<ContactoEntrega>{xml_text(d11['ContactoEntrega'])}</ContactoEntrega>")
+    if d11.get('DireccionEntrega') is not None:
+        p.append(f"<DireccionEntrega>{xml_text(d11['DireccionEntrega'])}</DireccionEntrega>")
+    if d11.get('TelefonoAdicional') is not None:
+        p.append(f"<TelefonoAdicional>{xml_text(d11['TelefonoAdicional'])}</TelefonoAdicional>")
+    if d11.get('FechaOrdenCompra') is not None:
+        p.append(f"<FechaOrdenCompra>{xml_text(fmt_date(d11['FechaOrdenCompra']))}</FechaOrdenCompra>")
+    if d11.get('NumeroOrdenCompra') is not None:
+        p.append(f"<NumeroOrdenCompra>{xml_text(d11['NumeroOrdenCompra'])}</NumeroOrdenCompra>")
+    if d11.get('CodigoInternoComprador') is not None:
+        p.append(f"<CodigoInternoComprador>{xml_text(d11['CodigoInternoComprador'])}</CodigoInternoComprador>")
+    if d11.get('ResponsablePago') is not None:
+        p.append(f"<ResponsablePago>{xml_text(d11['ResponsablePago'])}</ResponsablePago>")
+    if d11.get('InformacionAdicionalComprador') is not None:
+        p.append(f"<InformacionAdicionalComprador>{xml_text(d11['InformacionAdicionalComprador'])}</InformacionAdicionalComprador>")
+    p.append("</Comprador>")
+    d12 = d4.get('InformacionesAdicionales')
+    if d12:
+        p.append("<InformacionesAdicionales>")
+        n13 = len(p)
+        if d12.get('FechaEmbarque') is not None:
+            p.append(f"<FechaEmbarque>{xml_text(fmt_date(d12['FechaEmbarque']))}</FechaEmbarque>")
+        if d12.get('NumeroEmbarque') is not None:
+            p.append(f"<NumeroEmbarque>{xml_text(d12['NumeroEmbarque'])}</NumeroEmbarque>")
+        if d12.get('NumeroContenedor') is not None:
+            p.append(f"<NumeroContenedor>{xml_text(d12['NumeroContenedor'])}</NumeroContenedor>")
+        if d12.get('NumeroReferencia') is not None:
+            p.append(f"<NumeroReferencia>{xml_text(d12['NumeroReferencia'])}</NumeroReferencia>")
+        if d12.get('NombrePuertoEmbarque') is not None:
+            p.append(f"<NombrePuertoEmbarque>{xml_text(d12['NombrePuertoEmbarque'])}</NombrePuertoEmbarque>")
+        if d12.get('CondicionesEntrega') is not None:
+            p.append(f"<CondicionesEntrega>{xml_text(d12['CondicionesEntrega'])}</CondicionesEntrega>")
+        if d12.get('TotalFob') is not None:
+            p.append(f"<TotalFob>{'%.2f' % float(d12['TotalFob'])}</TotalFob>")
+        if d12.get('Seguro') is not None:
+            p.append(f"<Seguro>{'%.2f' % float(d12['Seguro'])}</Seguro>")
+        if d12.get('Flete') is not None:
+            p.append(f"<Flete>{'%.2f' % float(d12['Flete'])}</Flete>")
+        if d12.get('OtrosGastos') is not None:
+            p.append(f"<OtrosGastos>{'%.2f' % float(d12['OtrosGastos'])}</OtrosGastos>")
+        if d12.get('TotalCif') is not None:
+            p.append(f"<TotalCif>{'%.2f' % float(d12['TotalCif'])}</TotalCif>")
+        if d12.get('RegimenAduanero') is not None:
+            p.append(f"<RegimenAduanero>{xml_text(d12['RegimenAduanero'])}</RegimenAduanero>")
+        if d12.get('NombrePuertoSalida') is not None:
+            p.append(f"<NombrePuertoSalida>{xml_text(d12['NombrePuertoSalida'])}</NombrePuertoSalida>")
+        if d12.get('NombrePuertoDesembarque') is not None:
+            p.append(f"<NombrePuertoDesembarque>{xml_text(d12['NombrePuertoDesembarque'])}</NombrePuertoDesembarque>")
+        if d12.get('PesoBruto') is not None:
+            p.append(f"<PesoBruto>{'%.2f' % float(d12['PesoBruto'])}</PesoBruto>")
+        if d12.get('PesoNeto') is not None:
+            p.append(f"<PesoNeto>{'%.2f' % float(d12['PesoNeto'])}</PesoNeto>")
+        if d12.get('UnidadPesoBruto') is not None:
+            p.append(f"<UnidadPesoBruto>{xml_text(d12['UnidadPesoBruto'])}</UnidadPesoBruto>")
+        if d12.get('UnidadPesoNeto') is not None:
+            p.append(f"<UnidadPesoNeto>{xml_text(d12['UnidadPesoNeto'])}</UnidadPesoNeto>")
+        if d12.get('CantidadBulto') is not None:
+            p.append(f"<CantidadBulto>{'%.2f' % float(d12['CantidadBulto'])}</CantidadBulto>")
+        if d12.get('UnidadBulto') is not None:
+            p.append(f"<UnidadBulto>{xml_text(d12['UnidadBulto'])}</UnidadBulto>")
+        if d12.get('VolumenBulto') is not None:
+            p.append(f"<VolumenBulto>{'%.2f' % float(d12['VolumenBulto'])}</VolumenBulto>")
+        if d12.get('UnidadVolumen') is not None:
+            p.append(f"<UnidadVolumen>{xml_text(d12['UnidadVolumen'])}</UnidadVolumen>")
+        if len(p) == n13:
+            p[-1] = "<InformacionesAdicionales/>"
+        else:
+            p.append("</InformacionesAdicionales>")
+    d14 = d4.get('Transporte')
+    if d14:
+        p.append("<Transporte>")
+        n15 = len(p)
+        if d14.get('ViaTransporte') is not None:
+            p.append(f"<ViaTransporte>{'%02d' % int(d14['ViaTransporte'])}</ViaTransporte>")
+        if d14.get('PaisOrigen') is not None:
+            p.append(f"<PaisOrigen>{xml_text(d14['PaisOrigen'])}</PaisOrigen>")
+        if d14.get('DireccionDestino') is not None:
+            p.append(f"<DireccionDestino>{xml_text(d14['DireccionDestino'])}</DireccionDestino>")
+        if d14.get('PaisDestino') is not None:
+            p.append(f"<PaisDestino>{xml_text(d14['PaisDestino'])}</PaisDestino>")
+        if d14.get('RNCIdentificacionCompaniaTransportista') is not None:
+            p.append(f"<RNCIdentificacionCompaniaTransportista>{xml_text(d14['RNCIdentificacionCompaniaTransportista'])}</RNCIdentificacionCompaniaTransportista>")
+        if d14.get('NombreCompaniaTransportista') is not None:
+            p.append(f"<NombreCompaniaTransportista>{xml_text(d14['NombreCompaniaTransportista'])}</NombreCompaniaTransportista>")
+        if d14.get('NumeroViaje') is not None:
+            p.append(f"<NumeroViaje>{xml_text(d14['NumeroViaje'])}</NumeroViaje>")
+        if d14.get('Conductor') is not None:
+            p.append(f"<Conductor>{xml_text(d14['Conductor'])}</Conductor>")
+        if d14.get('DocumentoTransporte') is not None:
+            p.append(f"<DocumentoTransporte>{xml_text(d14['DocumentoTransporte'])}</DocumentoTransporte>")
+        if d14.get('Ficha') is not None:
+            p.append(f"<Ficha>{xml_text(d14['Ficha'])}</Ficha>")
+        if d14.get('Placa') is not None:
+            p.append(f"<Placa>{xml_text(d14['Placa'])}</Placa>")
+        if d14.get('RutaTransporte') is not None:
+            p.append(f"<RutaTransporte>{xml_text(d14['RutaTransporte'])}</RutaTransporte>")
+        if d14.get('ZonaTransporte') is not None:
+            p.append(f"<ZonaTransporte>{xml_text(d14['ZonaTransporte'])}</ZonaTransporte>")
+        if d14.get('NumeroAlbaran') is not None:
+            p.append(f"<NumeroAlbaran>{xml_text(d14['NumeroAlbaran'])}</NumeroAlbaran>")
+        if len(p) == n15:
+            p[-1] = "<Transporte/>"
+        else:
+            p.append("</Transporte>")
+    d16 = d4.get('Totales')
+    if not d16:
+        raise ValueError("El e-CF tipo 46 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d16.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d16['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d16.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d16['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d16.get('ITBIS3') is not None:
+        p.append(f"<ITBIS3>{xml_text(d16['ITBIS3'])}</ITBIS3>")
+    if d16.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d16['TotalITBIS'])}</TotalITBIS>")
+    if d16.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d16['TotalITBIS3'])}</TotalITBIS3>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d16['MontoTotal'])}</MontoTotal>")
+    if d16.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d16['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d16.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d16['MontoPeriodo'])}</MontoPeriodo>")
+    if d16.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d16['SaldoAnterior'])}</SaldoAnterior>")
+    if d16.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d16['MontoAvancePago'])}</MontoAvancePago>")
+    if d16.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d16['ValorPagar'])}</ValorPagar>")
+    p.append("</Totales>")
+    d17 = d4.get('OtraMoneda')
+    if d17:
+        p.append("<OtraMoneda>")
+        n18 = len(p)
+        if d17.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d17['TipoMoneda'])}</TipoMoneda>")
+        if d17.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d17['TipoCambio'])}</TipoCambio>")
+        if d17.get('MontoGravadoTotalOtraMoneda') is not None:
+            p.append(f"<MontoGravadoTotalOtraMoneda>{'%.2f' % float(d17['MontoGravadoTotalOtraMoneda'])}</MontoGravadoTotalOtraMoneda>")
+        if d17.get('MontoGravado3OtraMoneda') is not None:
+            p.append(f"<MontoGravado3OtraMoneda>{'%.2f' % float(d17['MontoGravado3OtraMoneda'])}</MontoGravado3OtraMoneda>")
+        if d17.get('TotalITBISOtraMoneda') is not None:
+            p.append(f"<TotalITBISOtraMoneda>{'%.2f' % float(d17['TotalITBISOtraMoneda'])}</TotalITBISOtraMoneda>")
+        if d17.get('TotalITBIS3OtraMoneda') is not None:
+            p.append(f"<TotalITBIS3OtraMoneda>{'%.2f' % float(d17['TotalITBIS3OtraMoneda'])}</TotalITBIS3OtraMoneda>")
+        if d17.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d17['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n18:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d19 = data.get('TablaCodigosItem')
+    if d19:
+        p.append("<TablaCodigosItem>")
+        n20 = len(p)
+        d21 = d19 if isinstance(d19, list) else d19.get('CodigosItem') or []
+        for d22 in (d21 if isinstance(d21, list) else (d21,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d22['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d22['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n20:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion><NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    if data.get('FechaElaboracion') is not None:
+        p.append(f"<FechaElaboracion>{xml_text(fmt_date(data['FechaElaboracion']))}</FechaElaboracion>")
+    if data.get('FechaVencimientoItem') is not None:
+        p.append(f"<FechaVencimientoItem>{xml_text(fmt_date(data['FechaVencimientoItem']))}</FechaVencimientoItem>")
+    d23 = data.get('Mineria')
+    if d23:
+        p.append("<Mineria>")
+        n24 = len(p)
+        if d23.get('PesoNetoKilogramo') is not None:
+            p.append(f"<PesoNetoKilogramo>{'%.3f' % float(d23['PesoNetoKilogramo'])}</PesoNetoKilogramo>")
+        if d23.get('PesoNetoMineria') is not None:
+            p.append(f"<PesoNetoMineria>{'%.3f' % float(d23['PesoNetoMineria'])}</PesoNetoMineria>")
+        if d23.get('TipoAfiliacion') is not None:
+            p.append(f"<TipoAfiliacion>{xml_text(d23['TipoAfiliacion'])}</TipoAfiliacion>")
+        if d23.get('Liquidacion') is not None:
+            p.append(f"<Liquidacion>{xml_text(d23['Liquidacion'])}</Liquidacion>")
+        if len(p) == n24:
+            p[-1] = "<Mineria/>"
+        else:
+            p.append("</Mineria>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    if data.get('DescuentoMonto') is not None:
+        p.append(f"<DescuentoMonto>{'%.2f' % float(data['DescuentoMonto'])}</DescuentoMonto>")
+    d25 = data.get('TablaSubDescuento')
+    if d25:
+        p.append("<TablaSubDescuento>")
+        n26 = len(p)
+        d27 = d25 if isinstance(d25, list) else d25.get('SubDescuento') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append(f"<SubDescuento><TipoSubDescuento>{xml_text(d28['TipoSubDescuento'])}</TipoSubDescuento>")
+            if d28.get('SubDescuentoPorcentaje') is not None:
+                p.append(f"<SubDescuentoPorcentaje>{'%.2f' % float(d28['SubDescuentoPorcentaje'])}</SubDescuentoPorcentaje>")
+            if d28.get('MontoSubDescuento') is not None:
+                p.append(f"<MontoSubDescuento>{'%.2f' % float(d28['MontoSubDescuento'])}</MontoSubDescuento>")
+            p.append("</SubDescuento>")
+        if len(p) == n26:
+            p[-1] = "<TablaSubDescuento/>"
+        else:
+            p.append("</TablaSubDescuento>")
+    if data.get('RecargoMonto') is not None:
+        p.append(f"<RecargoMonto>{'%.2f' % float(data['RecargoMonto'])}</RecargoMonto>")
+    d29 = data.get('TablaSubRecargo')
+    if d29:
+        p.append("<TablaSubRecargo>")
+        n30 = len(p)
+        d31 = d29 if isinstance(d29, list) else d29.get('SubRecargo') or []
+        for d32 in (d31 if isinstance(d31, list) else (d31,)):
+            p.append(f"<SubRecargo><TipoSubRecargo>{xml_text(d32['TipoSubRecargo'])}</TipoSubRecargo>")
+            if d32.get('SubRecargoPorcentaje') is not None:
+                p.append(f"<SubRecargoPorcentaje>{'%.2f' % float(d32['SubRecargoPorcentaje'])}</SubRecargoPorcentaje>")
+            if d32.get('MontoSubRecargo') is not None:
+                p.append(f"<MontoSubRecargo>{'%.2f' % float(d32['MontoSubRecargo'])}</MontoSubRecargo>")
+            p.append("</SubRecargo>")
+        if len(p) == n30:
+            p[-1] = "<TablaSubRecargo/>"
+        else:
+            p.append("</TablaSubRecargo>")
+    d33 = data.get('OtraMonedaDetalle')
+    if d33:
+        p.append("<OtraMonedaDetalle>")
+        n34 = len(p)
+        if d33.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d33['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d33.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d33['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d33.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d33['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d33.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d33['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n34:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d35 = data.get('Subtotales')
+    if d35:
+        p.append("<Subtotales>")
+        n36 = len(p)
+        d37 = d35 if isinstance(d35, list) else d35.get('Subtotal') or []
+        for d38 in (d37 if isinstance(d37, list) else (d37,)):
+            p.append("<Subtotal>")
+            n39 = len(p)
+            if d38.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d38['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d38.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d38['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d38.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d38['Orden'])}</Orden>")
+            if d38.get('SubTotalMontoGravadoTotal') is not None:
+                p.append(f"<SubTotalMontoGravadoTotal>{'%.2f' % float(d38['SubTotalMontoGravadoTotal'])}</SubTotalMontoGravadoTotal>")
+            if d38.get('SubTotalMontoGravadoI3') is not None:
+                p.append(f"<SubTotalMontoGravadoI3>{'%.2f' % float(d38['SubTotalMontoGravadoI3'])}</SubTotalMontoGravadoI3>")
+            if d38.get('SubTotaITBIS') is not None:
+                p.append(f"<SubTotaITBIS>{'%.2f' % float(d38['SubTotaITBIS'])}</SubTotaITBIS>")
+            if d38.get('SubTotaITBIS3') is not None:
+                p.append(f"<SubTotaITBIS3>{'%.2f' % float(d38['SubTotaITBIS3'])}</SubTotaITBIS3>")
+            if d38.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d38['MontoSubTotal'])}</MontoSubTotal>")
+            if d38.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d38['Lineas'])}</Lineas>")
+            if len(p) == n39:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n36:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    d40 = data.get('DescuentosORecargos')
+    if d40:
+        p.append("<DescuentosORecargos>")
+        n41 = len(p)
+        d42 = d40 if isinstance(d40, list) else d40.get('DescuentoORecargo') or []
+        for d43 in (d42 if isinstance(d42, list) else (d42,)):
+            p.append(f"<DescuentoORecargo><NumeroLinea>{xml_text(d43['NumeroLinea'])}</NumeroLinea><TipoAjuste>{xml_text(d43['TipoAjuste'])}</TipoAjuste>")
+            if d43.get('DescripcionDescuentooRecargo') is not None:
+                p.append(f"<DescripcionDescuentooRecargo>{xml_text(d43['DescripcionDescuentooRecargo'])}</DescripcionDescuentooRecargo>")
+            if d43.get('TipoValor') is not None:
+                p.append(f"<TipoValor>{xml_text(d43['TipoValor'])}</TipoValor>")
+            if d43.get('ValorDescuentooRecargo') is not None:
+                p.append(f"<ValorDescuentooRecargo>{'%.2f' % float(d43['ValorDescuentooRecargo'])}</ValorDescuentooRecargo>")
+            if d43.get('MontoDescuentooRecargo') is not None:
+                p.append(f"<MontoDescuentooRecargo>{'%.2f' % float(d43['MontoDescuentooRecargo'])}</MontoDescuentooRecargo>")
+            if d43.get('MontoDescuentooRecargoOtraMoneda') is not None:
+                p.append(f"<MontoDescuentooRecargoOtraMoneda>{'%.2f' % float(d43['MontoDescuentooRecargoOtraMoneda'])}</MontoDescuentooRecargoOtraMoneda>")
+            if d43.get('IndicadorFacturacionDescuentooRecargo') is not None:
+                p.append(f"<IndicadorFacturacionDescuentooRecargo>{xml_text(d43['IndicadorFacturacionDescuentooRecargo'])}</IndicadorFacturacionDescuentooRecargo>")
+            p.append("</DescuentoORecargo>")
+        if len(p) == n41:
+            p[-1] = "<DescuentosORecargos/>"
+        else:
+            p.append("</DescuentosORecargos>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d44 = data.get('Paginacion')
+        if d44:
+            p.append("<Paginacion>")
+            n45 = len(p)
+            d46 = d44 if isinstance(d44, list) else d44.get('Pagina') or []
+            for d47 in (d46 if isinstance(d46, list) else (d46,)):
+                p.append("<Pagina>")
+                n48 = len(p)
+                if d47.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d47['PaginaNo'])}</PaginaNo>")
+                if d47.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d47['NoLineaDesde'])}</NoLineaDesde>")
+                if d47.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d47['NoLineaHasta'])}</NoLineaHasta>")
+                if d47.get('SubtotalMontoGravadoPagina') is not None:
+                    p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(d47['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+                if d47.get('SubtotalMontoGravado3Pagina') is not None:
+                    p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(d47['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+                if d47.get('SubtotalItbisPagina') is not None:
+                    p.append(f"<SubtotalItbisPagina>{'%.2f' % float(d47['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+                if d47.get('SubtotalItbis3Pagina') is not None:
+                    p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(d47['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+                if d47.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d47['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if d47.get('SubtotalMontoNoFacturablePagina') is not None:
+                    p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(d47['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+                if len(p) == n48:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n45:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d49 = data.get('InformacionReferencia')
+    if d49:
+        p.append("<InformacionReferencia>")
+        n50 = len(p)
+        if d49.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{xml_text(d49['NCFModificado'])}</NCFModificado>")
+        if d49.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{xml_text(d49['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d49.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d49['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d49.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{xml_text(d49['CodigoModificacion'])}</CodigoModificacion>")
+        if len(p) == n50:
+            p[-1] = "<InformacionReferencia/>"
+        else:
+            p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n51 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalMontoGravadoPagina') is not None:
+        p.append(f"<SubtotalMontoGravadoPagina>{'%.2f' % float(data['SubtotalMontoGravadoPagina'])}</SubtotalMontoGravadoPagina>")
+    if data.get('SubtotalMontoGravado3Pagina') is not None:
+        p.append(f"<SubtotalMontoGravado3Pagina>{'%.2f' % float(data['SubtotalMontoGravado3Pagina'])}</SubtotalMontoGravado3Pagina>")
+    if data.get('SubtotalItbisPagina') is not None:
+        p.append(f"<SubtotalItbisPagina>{'%.2f' % float(data['SubtotalItbisPagina'])}</SubtotalItbisPagina>")
+    if data.get('SubtotalItbis3Pagina') is not None:
+        p.append(f"<SubtotalItbis3Pagina>{'%.2f' % float(data['SubtotalItbis3Pagina'])}</SubtotalItbis3Pagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if data.get('SubtotalMontoNoFacturablePagina') is not None:
+        p.append(f"<SubtotalMontoNoFacturablePagina>{'%.2f' % float(data['SubtotalMontoNoFacturablePagina'])}</SubtotalMontoNoFacturablePagina>")
+    if len(p) == n51:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
@@ -0,0 +1,914 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "e-CF 47 v.1.0.xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from datetime import datetime
+from lxml.etree import fromstring
+from app.services.xml_generation.formatters import esc, fmt_date, xml_text, collapse_empty
+
+TIPO_ECF = 47
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<ECF>"
+
+
+def emisor_xml(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{esc(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{esc(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{esc(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{esc(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{esc(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        d2 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d2 if isinstance(d2, list) else (d2,)):
+            p.append(f"<TelefonoEmisor>{esc(v)}</TelefonoEmisor>")
+        p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{esc(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{esc(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{esc(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_xml(data, emisor=None):
+    p = []
+    d3 = data.get('Encabezado')
+    if not d3:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d3.get('Version') or '1.0'
+    p.append(f"<Version>{esc(v)}</Version>")
+    d4 = d3.get('IdDoc')
+    if not d4:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{esc(d4['TipoeCF'])}</TipoeCF><eNCF>{esc(d4['eNCF'])}</eNCF><FechaVencimientoSecuencia>{esc(fmt_date(d4['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d4.get('TipoPago') is not None:
+        p.append(f"<TipoPago>{esc(d4['TipoPago'])}</TipoPago>")
+    if d4.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{esc(fmt_date(d4['FechaLimitePago']))}</FechaLimitePago>")
+    if d4.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{esc(d4['TerminoPago'])}</TerminoPago>")
+    d5 = d4.get('TablaFormasPago')
+    if d5:
+        p.append("<TablaFormasPago>")
+        d6 = d5 if isinstance(d5, list) else d5.get('FormaDePago') or []
+        for d7 in (d6 if isinstance(d6, list) else (d6,)):
+            p.append(f"<FormaDePago><FormaPago>{esc(d7['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d7['MontoPago'])}</MontoPago></FormaDePago>")
+        p.append("</TablaFormasPago>")
+    if d4.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{esc(d4['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d4.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{esc(d4['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d4.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{esc(d4['BancoPago'])}</BancoPago>")
+    if d4.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{esc(fmt_date(d4['FechaDesde']))}</FechaDesde>")
+    if d4.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{esc(fmt_date(d4['FechaHasta']))}</FechaHasta>")
+    if d4.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{esc(d4['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d8 = d3.get('Emisor')
+    if not d8:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_xml(d8))
+    if d8.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{esc(d8['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d8.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{esc(d8['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d8.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{esc(d8['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{esc(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d3.get('Comprador')
+    if d9:
+        p.append("<Comprador>")
+        if d9.get('IdentificadorExtranjero') is not None:
+            p.append(f"<IdentificadorExtranjero>{esc(d9['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+        if d9.get('RazonSocialComprador') is not None:
+            p.append(f"<RazonSocialComprador>{esc(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+        p.append("</Comprador>")
+    d10 = d3.get('Transporte')
+    if d10:
+        p.append("<Transporte>")
+        if d10.get('PaisDestino') is not None:
+            p.append(f"<PaisDestino>{esc(d10['PaisDestino'])}</PaisDestino>")
+        p.append("</Transporte>")
+    d11 = d3.get('Totales')
+    if not d11:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d11.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d11['MontoExento'])}</MontoExento>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d11['MontoTotal'])}</MontoTotal>")
+    if d11.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d11['MontoPeriodo'])}</MontoPeriodo>")
+    if d11.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d11['SaldoAnterior'])}</SaldoAnterior>")
+    if d11.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d11['MontoAvancePago'])}</MontoAvancePago>")
+    if d11.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d11['ValorPagar'])}</ValorPagar>")
+    if d11.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d11['TotalISRRetencion'])}</TotalISRRetencion>")
+    p.append("</Totales>")
+    d12 = d3.get('OtraMoneda')
+    if d12:
+        p.append("<OtraMoneda>")
+        if d12.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{esc(d12['TipoMoneda'])}</TipoMoneda>")
+        if d12.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d12['TipoCambio'])}</TipoCambio>")
+        if d12.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d12['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d12.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d12['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_xml(data):
+    """Texto XML de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{esc(data['NumeroLinea'])}</NumeroLinea>")
+    d13 = data.get('TablaCodigosItem')
+    if d13:
+        p.append("<TablaCodigosItem>")
+        d14 = d13 if isinstance(d13, list) else d13.get('CodigosItem') or []
+        for d15 in (d14 if isinstance(d14, list) else (d14,)):
+            p.append(f"<CodigosItem><TipoCodigo>{esc(d15['TipoCodigo'])}</TipoCodigo><CodigoItem>{esc(d15['CodigoItem'])}</CodigoItem></CodigosItem>")
+        p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{esc(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d16 = data.get('Retencion')
+    if not d16:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Retencion'")
+    p.append(f"<Retencion><IndicadorAgenteRetencionoPercepcion>{esc(d16['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion><MontoISRRetenido>{'%.2f' % float(d16['MontoISRRetenido'])}</MontoISRRetenido></Retencion><NombreItem>{esc(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{esc(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{esc(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{esc(data['UnidadMedida'])}</UnidadMedida>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    d17 = data.get('OtraMonedaDetalle')
+    if d17:
+        p.append("<OtraMonedaDetalle>")
+        if d17.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d17['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d17.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d17['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d17.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d17['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d17.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d17['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def detalles_xml(data):
+    p = []
+    for item in data.get('DetallesItems') or ():
+        p.append(item_xml(item))
+    return '<DetallesItems>' + ''.join(p) + '</DetallesItems>'
+
+
+def resumen_xml(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d18 = data.get('Subtotales')
+    if d18:
+        p.append("<Subtotales>")
+        d19 = d18 if isinstance(d18, list) else d18.get('Subtotal') or []
+        for d20 in (d19 if isinstance(d19, list) else (d19,)):
+            p.append("<Subtotal>")
+            if d20.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{esc(d20['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d20.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{esc(d20['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d20.get('Orden') is not None:
+                p.append(f"<Orden>{esc(d20['Orden'])}</Orden>")
+            if d20.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d20['SubTotalExento'])}</SubTotalExento>")
+            if d20.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d20['MontoSubTotal'])}</MontoSubTotal>")
+            if d20.get('Lineas') is not None:
+                p.append(f"<Lineas>{esc(d20['Lineas'])}</Lineas>")
+            p.append("</Subtotal>")
+        p.append("</Subtotales>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d21 = data.get('Paginacion')
+        if d21:
+            p.append("<Paginacion>")
+            d22 = d21 if isinstance(d21, list) else d21.get('Pagina') or []
+            for d23 in (d22 if isinstance(d22, list) else (d22,)):
+                p.append("<Pagina>")
+                if d23.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{esc(d23['PaginaNo'])}</PaginaNo>")
+                if d23.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{esc(d23['NoLineaDesde'])}</NoLineaDesde>")
+                if d23.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{esc(d23['NoLineaHasta'])}</NoLineaHasta>")
+                if d23.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d23['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d23.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d23['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                p.append("</Pagina>")
+            p.append("</Paginacion>")
+    d24 = data.get('InformacionReferencia')
+    if d24:
+        p.append("<InformacionReferencia>")
+        if d24.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{esc(d24['NCFModificado'])}</NCFModificado>")
+        if d24.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{esc(d24['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d24.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{esc(fmt_date(d24['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d24.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{esc(d24['CodigoModificacion'])}</CodigoModificacion>")
+        p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{esc(v)}</FechaHoraFirma><Signature xmlns='http://www.w3.org/2000/09/xmldsig#'/>")
+    return ''.join(p)
+
+
+def pagina_xml(data):
+    """Texto XML de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{esc(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{esc(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{esc(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build(data, emisor=None):
+    """Devuelve el elemento <ECF> completo, armado con un solo fromstring()."""
+    return fromstring('<ECF>' + encabezado_xml(data, emisor) + detalles_xml(data) + resumen_xml(data) + '</ECF>')
+
+
+def build_encabezado(root, data, emisor=None):
+    root.append(fromstring(encabezado_xml(data, emisor)))
+
+
+def build_item(parent, data):
+    """Construye un <Item>, lo agrega a parent y lo devuelve."""
+    node = fromstring(item_xml(data))
+    parent.append(node)
+    return node
+
+
+def build_resumen(root, data, paginacion=None):
+    root.extend(fromstring('<ECF>' + resumen_xml(data, paginacion) + '</ECF>'))
+
+
+def build_pagina(parent, data):
+    """Construye una <Pagina> y la agrega a parent."""
+    parent.append(fromstring(pagina_xml(data)))
+
+
+# --- Backend 'direct' (pretty_print): el documento como texto, sin lxml ---
+
+
+def emisor_text(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"      <RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>\n")
+    if data.get('NombreComercial') is not None:
+        p.append(f"      <NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>\n")
+    if data.get('Sucursal') is not None:
+        p.append(f"      <Sucursal>{xml_text(data['Sucursal'])}</Sucursal>\n")
+    p.append(f"      <DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>\n")
+    if data.get('Municipio') is not None:
+        p.append(f"      <Municipio>{'%06d' % int(data['Municipio'])}</Municipio>\n")
+    if data.get('Provincia') is not None:
+        p.append(f"      <Provincia>{'%06d' % int(data['Provincia'])}</Provincia>\n")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("      <TablaTelefonoEmisor>\n")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"        <TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>\n")
+        if len(p) == n2:
+            p[-1] = "      <TablaTelefonoEmisor/>\n"
+        else:
+            p.append("      </TablaTelefonoEmisor>\n")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"      <CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>\n")
+    if data.get('WebSite') is not None:
+        p.append(f"      <WebSite>{xml_text(data['WebSite'])}</WebSite>\n")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"      <ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>\n")
+    return ''.join(p)
+
+
+def encabezado_text(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d4.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d5['eNCF'])}</eNCF>\n      <FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>\n")
+    if d5.get('TipoPago') is not None:
+        p.append(f"      <TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>\n")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"      <FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>\n")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"      <TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>\n")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("      <TablaFormasPago>\n")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"        <FormaDePago>\n          <FormaPago>{xml_text(d9['FormaPago'])}</FormaPago>\n          <MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago>\n        </FormaDePago>\n")
+        if len(p) == n7:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"      <TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>\n")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"      <NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>\n")
+    if d5.get('BancoPago') is not None:
+        p.append(f"      <BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>\n")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"      <FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>\n")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"      <FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>\n")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"      <TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>\n")
+    p.append("    </IdDoc>\n")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Emisor'")
+    p.append("    <Emisor>\n")
+    p.append(emisor if emisor is not None else emisor_text(d10))
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"      <NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>\n")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"      <NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>\n")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"      <InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>\n")
+    p.append(f"      <FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d11 = d4.get('Comprador')
+    if d11:
+        p.append("    <Comprador>\n")
+        n12 = len(p)
+        if d11.get('IdentificadorExtranjero') is not None:
+            p.append(f"      <IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>\n")
+        if d11.get('RazonSocialComprador') is not None:
+            p.append(f"      <RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>\n")
+        if len(p) == n12:
+            p[-1] = "    <Comprador/>\n"
+        else:
+            p.append("    </Comprador>\n")
+    d13 = d4.get('Transporte')
+    if d13:
+        p.append("    <Transporte>\n")
+        n14 = len(p)
+        if d13.get('PaisDestino') is not None:
+            p.append(f"      <PaisDestino>{xml_text(d13['PaisDestino'])}</PaisDestino>\n")
+        if len(p) == n14:
+            p[-1] = "    <Transporte/>\n"
+        else:
+            p.append("    </Transporte>\n")
+    d15 = d4.get('Totales')
+    if not d15:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d15.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d15['MontoExento'])}</MontoExento>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d15['MontoTotal'])}</MontoTotal>\n")
+    if d15.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d15['MontoPeriodo'])}</MontoPeriodo>\n")
+    if d15.get('SaldoAnterior') is not None:
+        p.append(f"      <SaldoAnterior>{'%.2f' % float(d15['SaldoAnterior'])}</SaldoAnterior>\n")
+    if d15.get('MontoAvancePago') is not None:
+        p.append(f"      <MontoAvancePago>{'%.2f' % float(d15['MontoAvancePago'])}</MontoAvancePago>\n")
+    if d15.get('ValorPagar') is not None:
+        p.append(f"      <ValorPagar>{'%.2f' % float(d15['ValorPagar'])}</ValorPagar>\n")
+    if d15.get('TotalISRRetencion') is not None:
+        p.append(f"      <TotalISRRetencion>{'%.2f' % float(d15['TotalISRRetencion'])}</TotalISRRetencion>\n")
+    p.append("    </Totales>\n")
+    d16 = d4.get('OtraMoneda')
+    if d16:
+        p.append("    <OtraMoneda>\n")
+        n17 = len(p)
+        if d16.get('TipoMoneda') is not None:
+            p.append(f"      <TipoMoneda>{xml_text(d16['TipoMoneda'])}</TipoMoneda>\n")
+        if d16.get('TipoCambio') is not None:
+            p.append(f"      <TipoCambio>{'%.4f' % float(d16['TipoCambio'])}</TipoCambio>\n")
+        if d16.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"      <MontoExentoOtraMoneda>{'%.2f' % float(d16['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>\n")
+        if d16.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"      <MontoTotalOtraMoneda>{'%.2f' % float(d16['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>\n")
+        if len(p) == n17:
+            p[-1] = "    <OtraMoneda/>\n"
+        else:
+            p.append("    </OtraMoneda>\n")
+    p.append("  </Encabezado>\n")
+    return ''.join(p)
+
+
+def item_text(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"    <Item>\n      <NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>\n")
+    d18 = data.get('TablaCodigosItem')
+    if d18:
+        p.append("      <TablaCodigosItem>\n")
+        n19 = len(p)
+        d20 = d18 if isinstance(d18, list) else d18.get('CodigosItem') or []
+        for d21 in (d20 if isinstance(d20, list) else (d20,)):
+            p.append(f"        <CodigosItem>\n          <TipoCodigo>{xml_text(d21['TipoCodigo'])}</TipoCodigo>\n          <CodigoItem>{xml_text(d21['CodigoItem'])}</CodigoItem>\n        </CodigosItem>\n")
+        if len(p) == n19:
+            p[-1] = "      <TablaCodigosItem/>\n"
+        else:
+            p.append("      </TablaCodigosItem>\n")
+    p.append(f"      <IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>\n")
+    d22 = data.get('Retencion')
+    if not d22:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Retencion'")
+    p.append(f"      <Retencion>\n        <IndicadorAgenteRetencionoPercepcion>{xml_text(d22['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion>\n        <MontoISRRetenido>{'%.2f' % float(d22['MontoISRRetenido'])}</MontoISRRetenido>\n      </Retencion>\n      <NombreItem>{xml_text(data['NombreItem'])}</NombreItem>\n      <IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>\n")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"      <DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>\n")
+    p.append(f"      <CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>\n")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"      <UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>\n")
+    p.append(f"      <PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>\n")
+    d23 = data.get('OtraMonedaDetalle')
+    if d23:
+        p.append("      <OtraMonedaDetalle>\n")
+        n24 = len(p)
+        if d23.get('PrecioOtraMoneda') is not None:
+            p.append(f"        <PrecioOtraMoneda>{'%.4f' % float(d23['PrecioOtraMoneda'])}</PrecioOtraMoneda>\n")
+        if d23.get('DescuentoOtraMoneda') is not None:
+            p.append(f"        <DescuentoOtraMoneda>{'%.2f' % float(d23['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>\n")
+        if d23.get('RecargoOtraMoneda') is not None:
+            p.append(f"        <RecargoOtraMoneda>{'%.2f' % float(d23['RecargoOtraMoneda'])}</RecargoOtraMoneda>\n")
+        if d23.get('MontoItemOtraMoneda') is not None:
+            p.append(f"        <MontoItemOtraMoneda>{'%.2f' % float(d23['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>\n")
+        if len(p) == n24:
+            p[-1] = "      <OtraMonedaDetalle/>\n"
+        else:
+            p.append("      </OtraMonedaDetalle>\n")
+    p.append(f"      <MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem>\n    </Item>\n")
+    return ''.join(p)
+
+
+def resumen_text(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d25 = data.get('Subtotales')
+    if d25:
+        p.append("  <Subtotales>\n")
+        n26 = len(p)
+        d27 = d25 if isinstance(d25, list) else d25.get('Subtotal') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append("    <Subtotal>\n")
+            n29 = len(p)
+            if d28.get('NumeroSubTotal') is not None:
+                p.append(f"      <NumeroSubTotal>{xml_text(d28['NumeroSubTotal'])}</NumeroSubTotal>\n")
+            if d28.get('DescripcionSubtotal') is not None:
+                p.append(f"      <DescripcionSubtotal>{xml_text(d28['DescripcionSubtotal'])}</DescripcionSubtotal>\n")
+            if d28.get('Orden') is not None:
+                p.append(f"      <Orden>{xml_text(d28['Orden'])}</Orden>\n")
+            if d28.get('SubTotalExento') is not None:
+                p.append(f"      <SubTotalExento>{'%.2f' % float(d28['SubTotalExento'])}</SubTotalExento>\n")
+            if d28.get('MontoSubTotal') is not None:
+                p.append(f"      <MontoSubTotal>{'%.2f' % float(d28['MontoSubTotal'])}</MontoSubTotal>\n")
+            if d28.get('Lineas') is not None:
+                p.append(f"      <Lineas>{xml_text(d28['Lineas'])}</Lineas>\n")
+            if len(p) == n29:
+                p[-1] = "    <Subtotal/>\n"
+            else:
+                p.append("    </Subtotal>\n")
+        if len(p) == n26:
+            p[-1] = "  <Subtotales/>\n"
+        else:
+            p.append("  </Subtotales>\n")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d30 = data.get('Paginacion')
+        if d30:
+            p.append("  <Paginacion>\n")
+            n31 = len(p)
+            d32 = d30 if isinstance(d30, list) else d30.get('Pagina') or []
+            for d33 in (d32 if isinstance(d32, list) else (d32,)):
+                p.append("    <Pagina>\n")
+                n34 = len(p)
+                if d33.get('PaginaNo') is not None:
+                    p.append(f"      <PaginaNo>{xml_text(d33['PaginaNo'])}</PaginaNo>\n")
+                if d33.get('NoLineaDesde') is not None:
+                    p.append(f"      <NoLineaDesde>{xml_text(d33['NoLineaDesde'])}</NoLineaDesde>\n")
+                if d33.get('NoLineaHasta') is not None:
+                    p.append(f"      <NoLineaHasta>{xml_text(d33['NoLineaHasta'])}</NoLineaHasta>\n")
+                if d33.get('SubtotalExentoPagina') is not None:
+                    p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(d33['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+                if d33.get('MontoSubtotalPagina') is not None:
+                    p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(d33['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+                if len(p) == n34:
+                    p[-1] = "    <Pagina/>\n"
+                else:
+                    p.append("    </Pagina>\n")
+            if len(p) == n31:
+                p[-1] = "  <Paginacion/>\n"
+            else:
+                p.append("  </Paginacion>\n")
+    d35 = data.get('InformacionReferencia')
+    if d35:
+        p.append("  <InformacionReferencia>\n")
+        n36 = len(p)
+        if d35.get('NCFModificado') is not None:
+            p.append(f"    <NCFModificado>{xml_text(d35['NCFModificado'])}</NCFModificado>\n")
+        if d35.get('RNCOtroContribuyente') is not None:
+            p.append(f"    <RNCOtroContribuyente>{xml_text(d35['RNCOtroContribuyente'])}</RNCOtroContribuyente>\n")
+        if d35.get('FechaNCFModificado') is not None:
+            p.append(f"    <FechaNCFModificado>{xml_text(fmt_date(d35['FechaNCFModificado']))}</FechaNCFModificado>\n")
+        if d35.get('CodigoModificacion') is not None:
+            p.append(f"    <CodigoModificacion>{xml_text(d35['CodigoModificacion'])}</CodigoModificacion>\n")
+        if len(p) == n36:
+            p[-1] = "  <InformacionReferencia/>\n"
+        else:
+            p.append("  </InformacionReferencia>\n")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"  <FechaHoraFirma>{xml_text(v)}</FechaHoraFirma>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n")
+    return ''.join(p)
+
+
+def pagina_text(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("    <Pagina>\n")
+    n37 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"      <PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>\n")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"      <NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>\n")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"      <NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>\n")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"      <SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>\n")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"      <MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>\n")
+    if len(p) == n37:
+        p[-1] = "    <Pagina/>\n"
+    else:
+        p.append("    </Pagina>\n")
+    return ''.join(p)
+
+
+def build_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + pretty_print."""
+    p = [XML_HEAD + '\n', encabezado_text(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('  <DetallesItems>\n')
+        for item in items:
+            p.append(item_text(item))
+        p.append('  </DetallesItems>\n')
+    else:
+        p.append('  <DetallesItems/>\n')
+    p.append(resumen_text(data))
+    p.append('</ECF>\n')
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+# --- Backend 'direct' (compacto): el documento como texto, sin lxml ---
+
+
+def emisor_compact(data):
+    """Campos del perfil del emisor dentro de <Emisor> (ver emitter_profiles.py)."""
+    p = []
+    p.append(f"<RNCEmisor>{xml_text(data['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(data['RazonSocialEmisor'])}</RazonSocialEmisor>")
+    if data.get('NombreComercial') is not None:
+        p.append(f"<NombreComercial>{xml_text(data['NombreComercial'])}</NombreComercial>")
+    if data.get('Sucursal') is not None:
+        p.append(f"<Sucursal>{xml_text(data['Sucursal'])}</Sucursal>")
+    p.append(f"<DireccionEmisor>{xml_text(data['DireccionEmisor'])}</DireccionEmisor>")
+    if data.get('Municipio') is not None:
+        p.append(f"<Municipio>{'%06d' % int(data['Municipio'])}</Municipio>")
+    if data.get('Provincia') is not None:
+        p.append(f"<Provincia>{'%06d' % int(data['Provincia'])}</Provincia>")
+    d1 = data.get('TablaTelefonoEmisor')
+    if d1:
+        p.append("<TablaTelefonoEmisor>")
+        n2 = len(p)
+        d3 = d1 if isinstance(d1, list) else d1.get('TelefonoEmisor') or []
+        for v in (d3 if isinstance(d3, list) else (d3,)):
+            p.append(f"<TelefonoEmisor>{xml_text(v)}</TelefonoEmisor>")
+        if len(p) == n2:
+            p[-1] = "<TablaTelefonoEmisor/>"
+        else:
+            p.append("</TablaTelefonoEmisor>")
+    if data.get('CorreoEmisor') is not None:
+        p.append(f"<CorreoEmisor>{xml_text(data['CorreoEmisor'])}</CorreoEmisor>")
+    if data.get('WebSite') is not None:
+        p.append(f"<WebSite>{xml_text(data['WebSite'])}</WebSite>")
+    if data.get('ActividadEconomica') is not None:
+        p.append(f"<ActividadEconomica>{xml_text(data['ActividadEconomica'])}</ActividadEconomica>")
+    return ''.join(p)
+
+
+def encabezado_compact(data, emisor=None):
+    p = []
+    d4 = data.get('Encabezado')
+    if not d4:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d4.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d5 = d4.get('IdDoc')
+    if not d5:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d5['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d5['eNCF'])}</eNCF><FechaVencimientoSecuencia>{xml_text(fmt_date(d5['FechaVencimientoSecuencia']))}</FechaVencimientoSecuencia>")
+    if d5.get('TipoPago') is not None:
+        p.append(f"<TipoPago>{xml_text(d5['TipoPago'])}</TipoPago>")
+    if d5.get('FechaLimitePago') is not None:
+        p.append(f"<FechaLimitePago>{xml_text(fmt_date(d5['FechaLimitePago']))}</FechaLimitePago>")
+    if d5.get('TerminoPago') is not None:
+        p.append(f"<TerminoPago>{xml_text(d5['TerminoPago'])}</TerminoPago>")
+    d6 = d5.get('TablaFormasPago')
+    if d6:
+        p.append("<TablaFormasPago>")
+        n7 = len(p)
+        d8 = d6 if isinstance(d6, list) else d6.get('FormaDePago') or []
+        for d9 in (d8 if isinstance(d8, list) else (d8,)):
+            p.append(f"<FormaDePago><FormaPago>{xml_text(d9['FormaPago'])}</FormaPago><MontoPago>{'%.2f' % float(d9['MontoPago'])}</MontoPago></FormaDePago>")
+        if len(p) == n7:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    if d5.get('TipoCuentaPago') is not None:
+        p.append(f"<TipoCuentaPago>{xml_text(d5['TipoCuentaPago'])}</TipoCuentaPago>")
+    if d5.get('NumeroCuentaPago') is not None:
+        p.append(f"<NumeroCuentaPago>{xml_text(d5['NumeroCuentaPago'])}</NumeroCuentaPago>")
+    if d5.get('BancoPago') is not None:
+        p.append(f"<BancoPago>{xml_text(d5['BancoPago'])}</BancoPago>")
+    if d5.get('FechaDesde') is not None:
+        p.append(f"<FechaDesde>{xml_text(fmt_date(d5['FechaDesde']))}</FechaDesde>")
+    if d5.get('FechaHasta') is not None:
+        p.append(f"<FechaHasta>{xml_text(fmt_date(d5['FechaHasta']))}</FechaHasta>")
+    if d5.get('TotalPaginas') is not None:
+        p.append(f"<TotalPaginas>{xml_text(d5['TotalPaginas'])}</TotalPaginas>")
+    p.append("</IdDoc>")
+    d10 = d4.get('Emisor')
+    if not d10:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Emisor'")
+    p.append("<Emisor>")
+    p.append(emisor if emisor is not None else emisor_compact(d10))
+    if d10.get('NumeroFacturaInterna') is not None:
+        p.append(f"<NumeroFacturaInterna>{xml_text(d10['NumeroFacturaInterna'])}</NumeroFacturaInterna>")
+    if d10.get('NumeroPedidoInterno') is not None:
+        p.append(f"<NumeroPedidoInterno>{xml_text(d10['NumeroPedidoInterno'])}</NumeroPedidoInterno>")
+    if d10.get('InformacionAdicionalEmisor') is not None:
+        p.append(f"<InformacionAdicionalEmisor>{xml_text(d10['InformacionAdicionalEmisor'])}</InformacionAdicionalEmisor>")
+    p.append(f"<FechaEmision>{xml_text(fmt_date(d10['FechaEmision']))}</FechaEmision></Emisor>")
+    d11 = d4.get('Comprador')
+    if d11:
+        p.append("<Comprador>")
+        n12 = len(p)
+        if d11.get('IdentificadorExtranjero') is not None:
+            p.append(f"<IdentificadorExtranjero>{xml_text(d11['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+        if d11.get('RazonSocialComprador') is not None:
+            p.append(f"<RazonSocialComprador>{xml_text(d11['RazonSocialComprador'])}</RazonSocialComprador>")
+        if len(p) == n12:
+            p[-1] = "<Comprador/>"
+        else:
+            p.append("</Comprador>")
+    d13 = d4.get('Transporte')
+    if d13:
+        p.append("<Transporte>")
+        n14 = len(p)
+        if d13.get('PaisDestino') is not None:
+            p.append(f"<PaisDestino>{xml_text(d13['PaisDestino'])}</PaisDestino>")
+        if len(p) == n14:
+            p[-1] = "<Transporte/>"
+        else:
+            p.append("</Transporte>")
+    d15 = d4.get('Totales')
+    if not d15:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d15.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d15['MontoExento'])}</MontoExento>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d15['MontoTotal'])}</MontoTotal>")
+    if d15.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d15['MontoPeriodo'])}</MontoPeriodo>")
+    if d15.get('SaldoAnterior') is not None:
+        p.append(f"<SaldoAnterior>{'%.2f' % float(d15['SaldoAnterior'])}</SaldoAnterior>")
+    if d15.get('MontoAvancePago') is not None:
+        p.append(f"<MontoAvancePago>{'%.2f' % float(d15['MontoAvancePago'])}</MontoAvancePago>")
+    if d15.get('ValorPagar') is not None:
+        p.append(f"<ValorPagar>{'%.2f' % float(d15['ValorPagar'])}</ValorPagar>")
+    if d15.get('TotalISRRetencion') is not None:
+        p.append(f"<TotalISRRetencion>{'%.2f' % float(d15['TotalISRRetencion'])}</TotalISRRetencion>")
+    p.append("</Totales>")
+    d16 = d4.get('OtraMoneda')
+    if d16:
+        p.append("<OtraMoneda>")
+        n17 = len(p)
+        if d16.get('TipoMoneda') is not None:
+            p.append(f"<TipoMoneda>{xml_text(d16['TipoMoneda'])}</TipoMoneda>")
+        if d16.get('TipoCambio') is not None:
+            p.append(f"<TipoCambio>{'%.4f' % float(d16['TipoCambio'])}</TipoCambio>")
+        if d16.get('MontoExentoOtraMoneda') is not None:
+            p.append(f"<MontoExentoOtraMoneda>{'%.2f' % float(d16['MontoExentoOtraMoneda'])}</MontoExentoOtraMoneda>")
+        if d16.get('MontoTotalOtraMoneda') is not None:
+            p.append(f"<MontoTotalOtraMoneda>{'%.2f' % float(d16['MontoTotalOtraMoneda'])}</MontoTotalOtraMoneda>")
+        if len(p) == n17:
+            p[-1] = "<OtraMoneda/>"
+        else:
+            p.append("</OtraMoneda>")
+    p.append("</Encabezado>")
+    return ''.join(p)
+
+
+def item_compact(data):
+    """Texto de un <Item> de DetallesItems."""
+    p = []
+    p.append(f"<Item><NumeroLinea>{xml_text(data['NumeroLinea'])}</NumeroLinea>")
+    d18 = data.get('TablaCodigosItem')
+    if d18:
+        p.append("<TablaCodigosItem>")
+        n19 = len(p)
+        d20 = d18 if isinstance(d18, list) else d18.get('CodigosItem') or []
+        for d21 in (d20 if isinstance(d20, list) else (d20,)):
+            p.append(f"<CodigosItem><TipoCodigo>{xml_text(d21['TipoCodigo'])}</TipoCodigo><CodigoItem>{xml_text(d21['CodigoItem'])}</CodigoItem></CodigosItem>")
+        if len(p) == n19:
+            p[-1] = "<TablaCodigosItem/>"
+        else:
+            p.append("</TablaCodigosItem>")
+    p.append(f"<IndicadorFacturacion>{xml_text(data['IndicadorFacturacion'])}</IndicadorFacturacion>")
+    d22 = data.get('Retencion')
+    if not d22:
+        raise ValueError("El e-CF tipo 47 requiere bloque 'Retencion'")
+    p.append(f"<Retencion><IndicadorAgenteRetencionoPercepcion>{xml_text(d22['IndicadorAgenteRetencionoPercepcion'])}</IndicadorAgenteRetencionoPercepcion><MontoISRRetenido>{'%.2f' % float(d22['MontoISRRetenido'])}</MontoISRRetenido></Retencion><NombreItem>{xml_text(data['NombreItem'])}</NombreItem><IndicadorBienoServicio>{xml_text(data['IndicadorBienoServicio'])}</IndicadorBienoServicio>")
+    if data.get('DescripcionItem') is not None:
+        p.append(f"<DescripcionItem>{xml_text(data['DescripcionItem'])}</DescripcionItem>")
+    p.append(f"<CantidadItem>{'%.2f' % float(data['CantidadItem'])}</CantidadItem>")
+    if data.get('UnidadMedida') is not None:
+        p.append(f"<UnidadMedida>{xml_text(data['UnidadMedida'])}</UnidadMedida>")
+    p.append(f"<PrecioUnitarioItem>{'%.4f' % float(data['PrecioUnitarioItem'])}</PrecioUnitarioItem>")
+    d23 = data.get('OtraMonedaDetalle')
+    if d23:
+        p.append("<OtraMonedaDetalle>")
+        n24 = len(p)
+        if d23.get('PrecioOtraMoneda') is not None:
+            p.append(f"<PrecioOtraMoneda>{'%.4f' % float(d23['PrecioOtraMoneda'])}</PrecioOtraMoneda>")
+        if d23.get('DescuentoOtraMoneda') is not None:
+            p.append(f"<DescuentoOtraMoneda>{'%.2f' % float(d23['DescuentoOtraMoneda'])}</DescuentoOtraMoneda>")
+        if d23.get('RecargoOtraMoneda') is not None:
+            p.append(f"<RecargoOtraMoneda>{'%.2f' % float(d23['RecargoOtraMoneda'])}</RecargoOtraMoneda>")
+        if d23.get('MontoItemOtraMoneda') is not None:
+            p.append(f"<MontoItemOtraMoneda>{'%.2f' % float(d23['MontoItemOtraMoneda'])}</MontoItemOtraMoneda>")
+        if len(p) == n24:
+            p[-1] = "<OtraMonedaDetalle/>"
+        else:
+            p.append("</OtraMonedaDetalle>")
+    p.append(f"<MontoItem>{'%.2f' % float(data['MontoItem'])}</MontoItem></Item>")
+    return ''.join(p)
+
+
+def resumen_compact(data, paginacion=None):
+    """Bloques posteriores a DetallesItems, en el orden del XSD."""
+    p = []
+    d25 = data.get('Subtotales')
+    if d25:
+        p.append("<Subtotales>")
+        n26 = len(p)
+        d27 = d25 if isinstance(d25, list) else d25.get('Subtotal') or []
+        for d28 in (d27 if isinstance(d27, list) else (d27,)):
+            p.append("<Subtotal>")
+            n29 = len(p)
+            if d28.get('NumeroSubTotal') is not None:
+                p.append(f"<NumeroSubTotal>{xml_text(d28['NumeroSubTotal'])}</NumeroSubTotal>")
+            if d28.get('DescripcionSubtotal') is not None:
+                p.append(f"<DescripcionSubtotal>{xml_text(d28['DescripcionSubtotal'])}</DescripcionSubtotal>")
+            if d28.get('Orden') is not None:
+                p.append(f"<Orden>{xml_text(d28['Orden'])}</Orden>")
+            if d28.get('SubTotalExento') is not None:
+                p.append(f"<SubTotalExento>{'%.2f' % float(d28['SubTotalExento'])}</SubTotalExento>")
+            if d28.get('MontoSubTotal') is not None:
+                p.append(f"<MontoSubTotal>{'%.2f' % float(d28['MontoSubTotal'])}</MontoSubTotal>")
+            if d28.get('Lineas') is not None:
+                p.append(f"<Lineas>{xml_text(d28['Lineas'])}</Lineas>")
+            if len(p) == n29:
+                p[-1] = "<Subtotal/>"
+            else:
+                p.append("</Subtotal>")
+        if len(p) == n26:
+            p[-1] = "<Subtotales/>"
+        else:
+            p.append("</Subtotales>")
+    if paginacion is not None:
+        p.append(paginacion)
+    else:
+        d30 = data.get('Paginacion')
+        if d30:
+            p.append("<Paginacion>")
+            n31 = len(p)
+            d32 = d30 if isinstance(d30, list) else d30.get('Pagina') or []
+            for d33 in (d32 if isinstance(d32, list) else (d32,)):
+                p.append("<Pagina>")
+                n34 = len(p)
+                if d33.get('PaginaNo') is not None:
+                    p.append(f"<PaginaNo>{xml_text(d33['PaginaNo'])}</PaginaNo>")
+                if d33.get('NoLineaDesde') is not None:
+                    p.append(f"<NoLineaDesde>{xml_text(d33['NoLineaDesde'])}</NoLineaDesde>")
+                if d33.get('NoLineaHasta') is not None:
+                    p.append(f"<NoLineaHasta>{xml_text(d33['NoLineaHasta'])}</NoLineaHasta>")
+                if d33.get('SubtotalExentoPagina') is not None:
+                    p.append(f"<SubtotalExentoPagina>{'%.2f' % float(d33['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+                if d33.get('MontoSubtotalPagina') is not None:
+                    p.append(f"<MontoSubtotalPagina>{'%.2f' % float(d33['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+                if len(p) == n34:
+                    p[-1] = "<Pagina/>"
+                else:
+                    p.append("</Pagina>")
+            if len(p) == n31:
+                p[-1] = "<Paginacion/>"
+            else:
+                p.append("</Paginacion>")
+    d35 = data.get('InformacionReferencia')
+    if d35:
+        p.append("<InformacionReferencia>")
+        n36 = len(p)
+        if d35.get('NCFModificado') is not None:
+            p.append(f"<NCFModificado>{xml_text(d35['NCFModificado'])}</NCFModificado>")
+        if d35.get('RNCOtroContribuyente') is not None:
+            p.append(f"<RNCOtroContribuyente>{xml_text(d35['RNCOtroContribuyente'])}</RNCOtroContribuyente>")
+        if d35.get('FechaNCFModificado') is not None:
+            p.append(f"<FechaNCFModificado>{xml_text(fmt_date(d35['FechaNCFModificado']))}</FechaNCFModificado>")
+        if d35.get('CodigoModificacion') is not None:
+            p.append(f"<CodigoModificacion>{xml_text(d35['CodigoModificacion'])}</CodigoModificacion>")
+        if len(p) == n36:
+            p[-1] = "<InformacionReferencia/>"
+        else:
+            p.append("</InformacionReferencia>")
+    v = data.get('FechaHoraFirma') or datetime.now().strftime('%d-%m-%Y %H:%M:%S')
+    p.append(f"<FechaHoraFirma>{xml_text(v)}</FechaHoraFirma><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>")
+    return ''.join(p)
+
+
+def pagina_compact(data):
+    """Texto de una <Pagina> de Paginacion."""
+    p = []
+    p.append("<Pagina>")
+    n37 = len(p)
+    if data.get('PaginaNo') is not None:
+        p.append(f"<PaginaNo>{xml_text(data['PaginaNo'])}</PaginaNo>")
+    if data.get('NoLineaDesde') is not None:
+        p.append(f"<NoLineaDesde>{xml_text(data['NoLineaDesde'])}</NoLineaDesde>")
+    if data.get('NoLineaHasta') is not None:
+        p.append(f"<NoLineaHasta>{xml_text(data['NoLineaHasta'])}</NoLineaHasta>")
+    if data.get('SubtotalExentoPagina') is not None:
+        p.append(f"<SubtotalExentoPagina>{'%.2f' % float(data['SubtotalExentoPagina'])}</SubtotalExentoPagina>")
+    if data.get('MontoSubtotalPagina') is not None:
+        p.append(f"<MontoSubtotalPagina>{'%.2f' % float(data['MontoSubtotalPagina'])}</MontoSubtotalPagina>")
+    if len(p) == n37:
+        p[-1] = "<Pagina/>"
+    else:
+        p.append("</Pagina>")
+    return ''.join(p)
+
+
+def build_compact_bytes(data, emisor=None):
+    """Documento completo en UTF-8, idéntico a build() + tostring() sin pretty_print."""
+    p = [XML_HEAD, encabezado_compact(data, emisor)]
+    items = data.get('DetallesItems') or ()
+    if items:
+        p.append('<DetallesItems>')
+        for item in items:
+            p.append(item_compact(item))
+        p.append('</DetallesItems>')
+    else:
+        p.append('<DetallesItems/>')
+    p.append(resumen_compact(data))
+    p.append('</ECF>')
+    return collapse_empty(''.join(p)).encode('utf-8')
@@ -0,0 +1,226 @@
+# Generado por app/services/xml_generation/codegen.py a partir de "RFCE 32 v.1.0 (2).xsd".
+# No editar a mano: regenerar con python -m app.services.xml_generation.codegen
+from app.services.xml_generation.formatters import fmt_date, xml_text, collapse_empty
+
+DOCUMENT = 'RFCE'
+XML_HEAD = "<?xml version='1.0' encoding='UTF-8'?>\n<RFCE>"
+
+
+def build_bytes(data):
+    """Documento completo en UTF-8, con pretty_print."""
+    p = [XML_HEAD + '\n']
+    d1 = data.get('Encabezado')
+    if not d1:
+        raise ValueError("El documento RFCE requiere bloque 'Encabezado'")
+    p.append("  <Encabezado>\n")
+    v = d1.get('Version') or '1.0'
+    p.append(f"    <Version>{xml_text(v)}</Version>\n")
+    d2 = d1.get('IdDoc')
+    if not d2:
+        raise ValueError("El documento RFCE requiere bloque 'IdDoc'")
+    p.append(f"    <IdDoc>\n      <TipoeCF>{xml_text(d2['TipoeCF'])}</TipoeCF>\n      <eNCF>{xml_text(d2['eNCF'])}</eNCF>\n      <TipoIngresos>{'%02d' % int(d2['TipoIngresos'])}</TipoIngresos>\n      <TipoPago>{xml_text(d2['TipoPago'])}</TipoPago>\n")
+    d3 = d2.get('TablaFormasPago')
+    if d3:
+        p.append("      <TablaFormasPago>\n")
+        n4 = len(p)
+        d5 = d3 if isinstance(d3, list) else d3.get('FormaDePago') or []
+        for d6 in (d5 if isinstance(d5, list) else (d5,)):
+            p.append("        <FormaDePago>\n")
+            n7 = len(p)
+            if d6.get('FormaPago') is not None:
+                p.append(f"          <FormaPago>{xml_text(d6['FormaPago'])}</FormaPago>\n")
+            if d6.get('MontoPago') is not None:
+                p.append(f"          <MontoPago>{'%.2f' % float(d6['MontoPago'])}</MontoPago>\n")
+            if len(p) == n7:
+                p[-1] = "        <FormaDePago/>\n"
+            else:
+                p.append("        </FormaDePago>\n")
+        if len(p) == n4:
+            p[-1] = "      <TablaFormasPago/>\n"
+        else:
+            p.append("      </TablaFormasPago>\n")
+    p.append("    </IdDoc>\n")
+    d8 = d1.get('Emisor')
+    if not d8:
+        raise ValueError("El documento RFCE requiere bloque 'Emisor'")
+    p.append(f"    <Emisor>\n      <RNCEmisor>{xml_text(d8['RNCEmisor'])}</RNCEmisor>\n      <RazonSocialEmisor>{xml_text(d8['RazonSocialEmisor'])}</RazonSocialEmisor>\n      <FechaEmision>{xml_text(fmt_date(d8['FechaEmision']))}</FechaEmision>\n    </Emisor>\n")
+    d9 = d1.get('Comprador')
+    if not d9:
+        raise ValueError("El documento RFCE requiere bloque 'Comprador'")
+    p.append("    <Comprador>\n")
+    n10 = len(p)
+    if d9.get('RNCComprador') is not None:
+        p.append(f"      <RNCComprador>{xml_text(d9['RNCComprador'])}</RNCComprador>\n")
+    if d9.get('IdentificadorExtranjero') is not None:
+        p.append(f"      <IdentificadorExtranjero>{xml_text(d9['IdentificadorExtranjero'])}</IdentificadorExtranjero>\n")
+    if d9.get('RazonSocialComprador') is not None:
+        p.append(f"      <RazonSocialComprador>{xml_text(d9['RazonSocialComprador'])}</RazonSocialComprador>\n")
+    if len(p) == n10:
+        p[-1] = "    <Comprador/>\n"
+    else:
+        p.append("    </Comprador>\n")
+    d11 = d1.get('Totales')
+    if not d11:
+        raise ValueError("El documento RFCE requiere bloque 'Totales'")
+    p.append("    <Totales>\n")
+    if d11.get('MontoGravadoTotal') is not None:
+        p.append(f"      <MontoGravadoTotal>{'%.2f' % float(d11['MontoGravadoTotal'])}</MontoGravadoTotal>\n")
+    if d11.get('MontoGravadoI1') is not None:
+        p.append(f"      <MontoGravadoI1>{'%.2f' % float(d11['MontoGravadoI1'])}</MontoGravadoI1>\n")
+    if d11.get('MontoGravadoI2') is not None:
+        p.append(f"      <MontoGravadoI2>{'%.2f' % float(d11['MontoGravadoI2'])}</MontoGravadoI2>\n")
+    if d11.get('MontoGravadoI3') is not None:
+        p.append(f"      <MontoGravadoI3>{'%.2f' % float(d11['MontoGravadoI3'])}</MontoGravadoI3>\n")
+    if d11.get('MontoExento') is not None:
+        p.append(f"      <MontoExento>{'%.2f' % float(d11['MontoExento'])}</MontoExento>\n")
+    if d11.get('TotalITBIS') is not None:
+        p.append(f"      <TotalITBIS>{'%.2f' % float(d11['TotalITBIS'])}</TotalITBIS>\n")
+    if d11.get('TotalITBIS1') is not None:
+        p.append(f"      <TotalITBIS1>{'%.2f' % float(d11['TotalITBIS1'])}</TotalITBIS1>\n")
+    if d11.get('TotalITBIS2') is not None:
+        p.append(f"      <TotalITBIS2>{'%.2f' % float(d11['TotalITBIS2'])}</TotalITBIS2>\n")
+    if d11.get('TotalITBIS3') is not None:
+        p.append(f"      <TotalITBIS3>{'%.2f' % float(d11['TotalITBIS3'])}</TotalITBIS3>\n")
+    if d11.get('MontoImpuestoAdicional') is not None:
+        p.append(f"      <MontoImpuestoAdicional>{'%.2f' % float(d11['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>\n")
+    d12 = d11.get('ImpuestosAdicionales')
+    if d12:
+        p.append("      <ImpuestosAdicionales>\n")
+        n13 = len(p)
+        d14 = d12 if isinstance(d12, list) else d12.get('ImpuestoAdicional') or []
+        for d15 in (d14 if isinstance(d14, list) else (d14,)):
+            p.append("        <ImpuestoAdicional>\n")
+            n16 = len(p)
+            if d15.get('TipoImpuesto') is not None:
+                p.append(f"          <TipoImpuesto>{'%03d' % int(d15['TipoImpuesto'])}</TipoImpuesto>\n")
+            if d15.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>\n")
+            if d15.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"          <MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>\n")
+            if d15.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"          <OtrosImpuestosAdicionales>{'%.2f' % float(d15['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>\n")
+            if len(p) == n16:
+                p[-1] = "        <ImpuestoAdicional/>\n"
+            else:
+                p.append("        </ImpuestoAdicional>\n")
+        if len(p) == n13:
+            p[-1] = "      <ImpuestosAdicionales/>\n"
+        else:
+            p.append("      </ImpuestosAdicionales>\n")
+    p.append(f"      <MontoTotal>{'%.2f' % float(d11['MontoTotal'])}</MontoTotal>\n")
+    if d11.get('MontoNoFacturable') is not None:
+        p.append(f"      <MontoNoFacturable>{'%.2f' % float(d11['MontoNoFacturable'])}</MontoNoFacturable>\n")
+    if d11.get('MontoPeriodo') is not None:
+        p.append(f"      <MontoPeriodo>{'%.2f' % float(d11['MontoPeriodo'])}</MontoPeriodo>\n")
+    p.append(f"    </Totales>\n    <CodigoSeguridadeCF>{xml_text(d1['CodigoSeguridadeCF'])}</CodigoSeguridadeCF>\n  </Encabezado>\n  <Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/>\n</RFCE>\n")
+    return collapse_empty(''.join(p)).encode('utf-8')
+
+
+def build_compact_bytes(data):
+    """Documento completo en UTF-8, compacto."""
+    p = [XML_HEAD]
+    d1 = data.get('Encabezado')
+    if not d1:
+        raise ValueError("El documento RFCE requiere bloque 'Encabezado'")
+    p.append("<Encabezado>")
+    v = d1.get('Version') or '1.0'
+    p.append(f"<Version>{xml_text(v)}</Version>")
+    d2 = d1.get('IdDoc')
+    if not d2:
+        raise ValueError("El documento RFCE requiere bloque 'IdDoc'")
+    p.append(f"<IdDoc><TipoeCF>{xml_text(d2['TipoeCF'])}</TipoeCF><eNCF>{xml_text(d2['eNCF'])}</eNCF><TipoIngresos>{'%02d' % int(d2['TipoIngresos'])}</TipoIngresos><TipoPago>{xml_text(d2['TipoPago'])}</TipoPago>")
+    d3 = d2.get('TablaFormasPago')
+    if d3:
+        p.append("<TablaFormasPago>")
+        n4 = len(p)
+        d5 = d3 if isinstance(d3, list) else d3.get('FormaDePago') or []
+        for d6 in (d5 if isinstance(d5, list) else (d5,)):
+            p.append("<FormaDePago>")
+            n7 = len(p)
+            if d6.get('FormaPago') is not None:
+                p.append(f"<FormaPago>{xml_text(d6['FormaPago'])}</FormaPago>")
+            if d6.get('MontoPago') is not None:
+                p.append(f"<MontoPago>{'%.2f' % float(d6['MontoPago'])}</MontoPago>")
+            if len(p) == n7:
+                p[-1] = "<FormaDePago/>"
+            else:
+                p.append("</FormaDePago>")
+        if len(p) == n4:
+            p[-1] = "<TablaFormasPago/>"
+        else:
+            p.append("</TablaFormasPago>")
+    p.append("</IdDoc>")
+    d8 = d1.get('Emisor')
+    if not d8:
+        raise ValueError("El documento RFCE requiere bloque 'Emisor'")
+    p.append(f"<Emisor><RNCEmisor>{xml_text(d8['RNCEmisor'])}</RNCEmisor><RazonSocialEmisor>{xml_text(d8['RazonSocialEmisor'])}</RazonSocialEmisor><FechaEmision>{xml_text(fmt_date(d8['FechaEmision']))}</FechaEmision></Emisor>")
+    d9 = d1.get('Comprador')
+    if not d9:
+        raise ValueError("El documento RFCE requiere bloque 'Comprador'")
+    p.append("<Comprador>")
+    n10 = len(p)
+    if d9.get('RNCComprador') is not None:
+        p.append(f"<RNCComprador>{xml_text(d9['RNCComprador'])}</RNCComprador>")
+    if d9.get('IdentificadorExtranjero') is not None:
+        p.append(f"<IdentificadorExtranjero>{xml_text(d9['IdentificadorExtranjero'])}</IdentificadorExtranjero>")
+    if d9.get('RazonSocialComprador') is not None:
+        p.append(f"<RazonSocialComprador>{xml_text(d9['RazonSocialComprador'])}</RazonSocialComprador>")
+    if len(p) == n10:
+        p[-1] = "<Comprador/>"
+    else:
+        p.append("</Comprador>")
+    d11 = d1.get('Totales')
+    if not d11:
+        raise ValueError("El documento RFCE requiere bloque 'Totales'")
+    p.append("<Totales>")
+    if d11.get('MontoGravadoTotal') is not None:
+        p.append(f"<MontoGravadoTotal>{'%.2f' % float(d11['MontoGravadoTotal'])}</MontoGravadoTotal>")
+    if d11.get('MontoGravadoI1') is not None:
+        p.append(f"<MontoGravadoI1>{'%.2f' % float(d11['MontoGravadoI1'])}</MontoGravadoI1>")
+    if d11.get('MontoGravadoI2') is not None:
+        p.append(f"<MontoGravadoI2>{'%.2f' % float(d11['MontoGravadoI2'])}</MontoGravadoI2>")
+    if d11.get('MontoGravadoI3') is not None:
+        p.append(f"<MontoGravadoI3>{'%.2f' % float(d11['MontoGravadoI3'])}</MontoGravadoI3>")
+    if d11.get('MontoExento') is not None:
+        p.append(f"<MontoExento>{'%.2f' % float(d11['MontoExento'])}</MontoExento>")
+    if d11.get('TotalITBIS') is not None:
+        p.append(f"<TotalITBIS>{'%.2f' % float(d11['TotalITBIS'])}</TotalITBIS>")
+    if d11.get('TotalITBIS1') is not None:
+        p.append(f"<TotalITBIS1>{'%.2f' % float(d11['TotalITBIS1'])}</TotalITBIS1>")
+    if d11.get('TotalITBIS2') is not None:
+        p.append(f"<TotalITBIS2>{'%.2f' % float(d11['TotalITBIS2'])}</TotalITBIS2>")
+    if d11.get('TotalITBIS3') is not None:
+        p.append(f"<TotalITBIS3>{'%.2f' % float(d11['TotalITBIS3'])}</TotalITBIS3>")
+    if d11.get('MontoImpuestoAdicional') is not None:
+        p.append(f"<MontoImpuestoAdicional>{'%.2f' % float(d11['MontoImpuestoAdicional'])}</MontoImpuestoAdicional>")
+    d12 = d11.get('ImpuestosAdicionales')
+    if d12:
+        p.append("<ImpuestosAdicionales>")
+        n13 = len(p)
+        d14 = d12 if isinstance(d12, list) else d12.get('ImpuestoAdicional') or []
+        for d15 in (d14 if isinstance(d14, list) else (d14,)):
+            p.append("<ImpuestoAdicional>")
+            n16 = len(p)
+            if d15.get('TipoImpuesto') is not None:
+                p.append(f"<TipoImpuesto>{'%03d' % int(d15['TipoImpuesto'])}</TipoImpuesto>")
+            if d15.get('MontoImpuestoSelectivoConsumoEspecifico') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoEspecifico>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoEspecifico'])}</MontoImpuestoSelectivoConsumoEspecifico>")
+            if d15.get('MontoImpuestoSelectivoConsumoAdvalorem') is not None:
+                p.append(f"<MontoImpuestoSelectivoConsumoAdvalorem>{'%.2f' % float(d15['MontoImpuestoSelectivoConsumoAdvalorem'])}</MontoImpuestoSelectivoConsumoAdvalorem>")
+            if d15.get('OtrosImpuestosAdicionales') is not None:
+                p.append(f"<OtrosImpuestosAdicionales>{'%.2f' % float(d15['OtrosImpuestosAdicionales'])}</OtrosImpuestosAdicionales>")
+            if len(p) == n16:
+                p[-1] = "<ImpuestoAdicional/>"
+            else:
+                p.append("</ImpuestoAdicional>")
+        if len(p) == n13:
+            p[-1] = "<ImpuestosAdicionales/>"
+        else:
+            p.append("</ImpuestosAdicionales>")
+    p.append(f"<MontoTotal>{'%.2f' % float(d11['MontoTotal'])}</MontoTotal>")
+    if d11.get('MontoNoFacturable') is not None:
+        p.append(f"<MontoNoFacturable>{'%.2f' % float(d11['MontoNoFacturable'])}</MontoNoFacturable>")
+    if d11.get('MontoPeriodo') is not None:
+        p.append(f"<MontoPeriodo>{'%.2f' % float(d11['MontoPeriodo'])}</MontoPeriodo>")
+    p.append(f"</Totales><CodigoSeguridadeCF>{xml_text(d1['CodigoSeguridadeCF'])}</CodigoSeguridadeCF></Encabezado><Signature xmlns=\"http://www.w3.org/2000/09/xmldsig#\"/></RFCE>")
+    return collapse_empty(''.join(p)).encode('utf-8')
@@ -0,0 +1,174 @@
+from lxml import etree
+from app.services.totals import includes_itbis
+from .base_builder import BaseECFBuilder
+from .generated import GENERATED_MODULES
+from .formatters import collapse_empty
+from .pagination import Paginator
+
+class GeneratedECFBuilder(BaseECFBuilder):
+    """
+    Builder que delega en el módulo generado desde el XSD del tipo (ver codegen.py).
+
+    Conserva la interfaz de BaseECFBuilder (build, get_xml_string, iter_xml_bytes)
+    y cubre el esquema completo en su orden exacto. Un campo requerido ausente
+    se reporta como ValueError, igual que los bloques requeridos.
+    """
+    module = None
+
+    def _required(self, fn, *args):
+        try:
+            return fn(*args)
+        except KeyError as e:
+            raise ValueError(f"Falta el campo requerido {e} para el e-CF tipo {self.tipo_ecf}")
+        except etree.XMLSyntaxError as e:
+            # Un valor con caracteres que no son válidos en XML (p. ej. de control)
+            raise ValueError(f"Valor no válido en el e-CF tipo {self.tipo_ecf}: {e}")
+
+    def _emisor(self, suffix):
+        # Campos del perfil del emisor ya escritos, o None para escribirlos del JSON
+        profile = self.emisor_profile
+        return profile.fragment(self.module, suffix) if profile is not None else None
+
+    def _pages(self):
+        pages = []
+        paginator = Paginator(self.tipo_ecf, self.lines_per_page, includes_itbis(self.data), pages.append)
+        for item in self.data['DetallesItems']:
+            paginator.add(item)
+        paginator.finish()
+        return pages
+
+    def _document_data(self):
+        """
+        El JSON que escribe el módulo generado. Con Paginacion automática, una
+        copia superficial con las páginas ya calculadas: sumar los montos de las
+        líneas es barato y así el documento se sigue escribiendo de una vez.
+        """
+        if not self.total_pages:
+            return self.data
+        return {**self.data, 'Paginacion': {'Pagina': self._required(self._pages)}}
+
+    def build(self):
+        # Todo el documento en un solo fromstring(); ver codegen.py
+        self.root = self._required(self.module.build, self._document_data(), self._emisor('xml'))
+        return self.root
+
+    def _build_encabezado(self):
+        self._required(self.module.build_encabezado, self.root, self.data, self._emisor('xml'))
+
+    def _build_item(self, detalles_node, item_data):
+        return self._required(self.module.build_item, detalles_node, item_data)
+
+    def _build_resumen(self):
+        if self._paginacion is None:
+            self._required(self.module.build_resumen, self.root, self.data)
+            return
+        # Se reserva el lugar de Paginacion y se pone ahí el nodo que llenan los items
+        self._required(self.module.build_resumen, self.root, self.data, "<Paginacion/>")
+        self.root.replace(self.root.find("Paginacion"), self._paginacion)
+
+    def _build_pagina(self, pag_node, pagina):
+        self.module.build_pagina(pag_node, pagina)
+
+
+GENERATED_BUILDERS = {
+    tipo: type(f"GeneratedECF{tipo}Builder", (GeneratedECFBuilder,), {"module": module})
+    for tipo, module in GENERATED_MODULES.items()
+}
+
+
+class DirectECFBuilder(GeneratedECFBuilder):
+    """
+    Backend 'direct': escribe el documento como texto UTF-8 con las funciones
+    *_text (o *_compact si pretty=False) del módulo generado, sin crear
+    elementos lxml. La salida es idéntica byte a byte a la del backend
+    'generated' serializado con el mismo pretty_print.
+
+    El árbol solo se arma si alguien pide `root` (firma): se parsea el
+    documento ya escrito y desde ahí se sigue como cualquier builder.
+    """
+    def __init__(self, data_json, emisor_profile=None):
+        self._xml = None
+        super().__init__(data_json, emisor_profile)
+
+    @property
+    def root(self):
+        if self._xml is not None:
+            self._root = etree.fromstring(self._xml)
+            self._xml = None
+        return self._root
+
+    @root.setter
+    def root(self, value):
+        self._root = value
+        self._xml = None
+
+    def build(self):
+        data = self._document_data()
+        if self.pretty:
+            self._xml = self._required(self.module.build_bytes, data, self._emisor('text'))
+        else:
+            self._xml = self._required(self.module.build_compact_bytes, data, self._emisor('compact'))
+        return self._xml
+
+    def get_xml_bytes(self):
+        if self._xml is not None:
+            return self._xml
+        return super().get_xml_bytes()
+
+    def _start_pagination(self):
+        super()._start_pagination()
+        # Las <Pagina> se escriben como texto; se juntan hasta cerrar DetallesItems
+        self._paginacion = None
+        self._pages = []
+
+    def _add_pagina(self, pagina):
+        suffix = 'text' if self.pretty else 'compact'
+        self._pages.append(self._required(getattr(self.module, 'pagina_' + suffix), pagina))
+
+    def iter_xml_bytes(self):
+        # Encabezado y bloques finales primero, para que un error salte antes del primer byte
+        self._start_pagination()
+        suffix = 'text' if self.pretty else 'compact'
+        pad, nl = ("  ", "\n") if self.pretty else ("", "")
+        head = self._required(getattr(self.module, 'encabezado_' + suffix), self.data, self._emisor(suffix))
+        placeholder = pad + "<Paginacion/>" + nl if self._paginator else None
+        tail = self._required(getattr(self.module, 'resumen_' + suffix), self.data, placeholder)
+        return self._iter_text(head, tail, getattr(self.module, 'item_' + suffix))
+
+    def _iter_text(self, head, tail, item_text):
+        pad, nl = ("  ", "\n") if self.pretty else ("", "")
+        add_page_line = self._paginator.add if self._paginator else None
+        parts = [self.module.XML_HEAD + nl, head]
+        size = 0
+        items = self.data.get('DetallesItems') or ()
+        if not items:
+            parts.append(pad + "<DetallesItems/>" + nl)
+        else:
+            parts.append(pad + "<DetallesItems>" + nl)
+            for item_data in items:
+                text = self._required(item_text, item_data)
+                parts.append(text)
+                size += len(text)
+                if add_page_line:
+                    add_page_line(item_data)
+                if size >= self.STREAM_CHUNK_SIZE:
+                    yield collapse_empty(''.join(parts)).encode('utf-8')
+                    parts = []
+                    size = 0
+            parts.append(pad + "</DetallesItems>" + nl)
+        if add_page_line:
+            self._paginator.finish()
+            before, after = tail.split(pad + "<Paginacion/>" + nl, 1)
+            parts.append(before + pad + "<Paginacion>" + nl)
+            parts.extend(self._pages)
+            parts.append(pad + "</Paginacion>" + nl + after)
+        else:
+            parts.append(tail)
+        parts.append("</ECF>" + nl)
+        yield collapse_empty(''.join(parts)).encode('utf-8')
+
+
+DIRECT_BUILDERS = {
+    tipo: type(f"DirectECF{tipo}Builder", (DirectECFBuilder,), {"module": module})
+    for tipo, module in GENERATED_MODULES.items()
+}
@@ -3,28 +3,42 @@ from .builders import (
     ECF31Builder, ECF32Builder, ECF33Builder, ECF34Builder,
     ECF41Builder, ECF43Builder, ECF44Builder, ECF45Builder, ECF46Builder, ECF47Builder
 )
+from .generated_builder import GENERATED_BUILDERS, DIRECT_BUILDERS
 
 class ECFBuilderManager:
+    # 'manual' usa los builders escritos a mano; 'generated' los generados desde el XSD;
+    # 'direct' los mismos generados, pero escribiendo el texto sin lxml.
+    # create_app lo toma de ECF_BUILDER_BACKEND.
+    backend = 'manual'
+
+    BUILDERS = {
+        31: ECF31Builder,
+        32: ECF32Builder,
+        33: ECF33Builder,
+        34: ECF34Builder,
+        41: ECF41Builder,
+        43: ECF43Builder,
+        44: ECF44Builder,
+        45: ECF45Builder,
+        46: ECF46Builder,
+        47: ECF47Builder,
+    }
+
     @staticmethod
-    def get_builder(data_json):
+    def get_builder(data_json, backend=None, emisor_profile=None):
         try:
             tipo_ecf = int(data_json['Encabezado']['IdDoc']['TipoeCF'])
         except (KeyError, ValueError):
             # Default to base if type missing (shouldn't happen in valid data)
             return BaseECFBuilder(data_json)
 
-        builders = {
-            31: ECF31Builder,
-            32: ECF32Builder,
-            33: ECF33Builder,
-            34: ECF34Builder,
-            41: ECF41Builder,
-            43: ECF43Builder,
-            44: ECF44Builder,
-            45: ECF45Builder,
-            46: ECF46Builder,
-            47: ECF47Builder,
-        }
+        backend = backend or ECFBuilderManager.backend
+        if backend == 'generated':
+            builders = GENERATED_BUILDERS
+        elif backend == 'direct':
+            builders = DIRECT_BUILDERS
+        else:
+            builders = ECFBuilderManager.BUILDERS
 
         builder_class = builders.get(tipo_ecf, BaseECFBuilder)
-        return builder_class(data_json)
+        return builder_class(data_json, emisor_profile)
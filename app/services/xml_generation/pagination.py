@@ -0,0 +1,109 @@
+"""
+Paginacion automática: páginas de N líneas de DetallesItems con sus subtotales.
+
+El builder llama a add() con cada Item en el mismo recorrido que lo escribe;
+aquí solo se acumulan los centavos de la página en curso por
+IndicadorFacturacion. Al completarse una página se arma su <Pagina> (un dict
+que el builder escribe enseguida y descarta), así que la memoria no depende
+de la cantidad de líneas ni de páginas.
+
+Los subtotales se calculan como los totales del documento (app/services/totals.py)
+sobre el MontoItem tal como queda en el XML: MontoGravado e ITBIS por tasa,
+exento, no facturable y MontoSubtotalPagina = gravado + exento + ITBIS. Solo
+se escriben los campos que el XSD del tipo tiene en <Pagina>.
+"""
+import threading
+from app.services.payload_validator import payload_validator
+from app.services.totals import split_itbis, EXENTO, NO_FACTURABLE
+
+PAGE_FIELDS = (
+    'SubtotalMontoGravadoPagina', 'SubtotalMontoGravado1Pagina', 'SubtotalMontoGravado2Pagina',
+    'SubtotalMontoGravado3Pagina', 'SubtotalExentoPagina', 'SubtotalItbisPagina', 'SubtotalItbis1Pagina',
+    'SubtotalItbis2Pagina', 'SubtotalItbis3Pagina', 'MontoSubtotalPagina', 'SubtotalMontoNoFacturablePagina',
+)
+
+_allowed = {}
+_allowed_lock = threading.Lock()
+
+
+def page_fields(tipo_ecf):
+    """Subtotales de <Pagina> que tiene el XSD del tipo."""
+    fields = _allowed.get(tipo_ecf)
+    if fields is None:
+        with _allowed_lock:
+            fields = frozenset(f for f in PAGE_FIELDS
+                               if payload_validator.has_element(tipo_ecf, ('Paginacion', 'Pagina', f)))
+            _allowed[tipo_ecf] = fields
+    return fields
+
+
+def page_count(lines, lines_per_page):
+    return -(-lines // lines_per_page)
+
+
+class Paginator:
+    """
+    Acumula una página a la vez y entrega cada <Pagina> terminada a `emit`.
+    add() recibe el Item tal como se escribe; finish() cierra la última página.
+    """
+    def __init__(self, tipo_ecf, lines_per_page, incluye_itbis, emit):
+        self.lines_per_page = lines_per_page
+        self.incluye_itbis = incluye_itbis
+        self.emit = emit
+        self.fields = page_fields(tipo_ecf)
+        self.page = 0
+        self.count = 0
+        self.first = self.last = None
+        self.buckets = {}
+
+    def add(self, item):
+        if not self.count:
+            self.first = item
+        self.last = item
+        # Los centavos del texto que va en el XML ('%.2f', como los builders);
+        # round() da lo mismo salvo cerca de la mitad o en montos enormes
+        monto = item['MontoItem']
+        x = float(monto) * 100
+        cents = round(x)
+        if abs(x - cents) > 0.49 or abs(x) > 1e13:
+            cents = int(('%.2f' % float(monto)).replace('.', ''))
+        indicador = int(item['IndicadorFacturacion'])
+        buckets = self.buckets
+        buckets[indicador] = buckets.get(indicador, 0) + cents
+        self.count += 1
+        if self.count == self.lines_per_page:
+            self._close()
+
+    def finish(self):
+        if self.count:
+            self._close()
+
+    def _close(self):
+        start = self.page * self.lines_per_page + 1
+        self.page += 1
+        pagina = {'PaginaNo': self.page, 'NoLineaDesde': self.first.get('NumeroLinea', start),
+                  'NoLineaHasta': self.last.get('NumeroLinea', start + self.count - 1)}
+        buckets = self.buckets
+        gravado = itbis = 0
+        subtotales = {}
+        for n, tasa, base, impuesto in split_itbis(buckets, self.incluye_itbis):
+            subtotales[f'SubtotalMontoGravado{n}Pagina'] = base
+            subtotales[f'SubtotalItbis{n}Pagina'] = impuesto
+            gravado += base
+            itbis += impuesto
+        if subtotales:
+            subtotales['SubtotalMontoGravadoPagina'] = gravado
+            subtotales['SubtotalItbisPagina'] = itbis
+        exento = buckets.get(EXENTO, 0)
+        if EXENTO in buckets:
+            subtotales['SubtotalExentoPagina'] = exento
+        if NO_FACTURABLE in buckets:
+            subtotales['SubtotalMontoNoFacturablePagina'] = buckets[NO_FACTURABLE]
+        subtotales['MontoSubtotalPagina'] = gravado + exento + itbis
+        fields = self.fields
+        for field, cents in subtotales.items():
+            if field in fields:
+                pagina[field] = cents / 100
+        self.count = 0
+        self.buckets = {}
+        self.emit(pagina)
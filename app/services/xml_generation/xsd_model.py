@@ -0,0 +1,151 @@
+"""
+Modelo mínimo de los XSD de la DGII.
+
+Los esquemas e-CF solo usan secuencias de elementos con complexType en línea o
+con un simpleType con nombre, más un xs:any final para la firma. Este módulo
+los lee como XML (sin compilarlos con libxml2, que rechaza algunos) y devuelve
+un árbol de XsdElement con lo que necesitan el generador de código y los
+validadores: orden, cardinalidad y restricciones del tipo.
+"""
+from lxml import etree
+
+XS = '{http://www.w3.org/2001/XMLSchema}'
+UNBOUNDED = 10 ** 9
+
+
+class XsdType:
+    def __init__(self, name, base=None, facets=None, enumeration=None):
+        self.name = name
+        self.base = base
+        self.facets = facets or {}
+        self.enumeration = enumeration or []
+
+    @property
+    def kind(self):
+        """
+        Formato de salida del valor:
+          ('dec', n)  -> decimal con n decimales
+          ('pad', n)  -> código numérico con ceros a la izquierda
+          ('date',)   -> fecha DD-MM-YYYY
+          ('str',)    -> texto tal cual
+        """
+        enum = self.enumeration
+        if enum:
+            if all(v.isdigit() for v in enum) and len(set(map(len, enum))) == 1 \
+                    and len(enum[0]) > 1 and any(v.startswith('0') for v in enum):
+                return ('pad', len(enum[0]))
+            return ('str',)
+        if self.base == 'xs:decimal':
+            return ('dec', int(self.facets.get('fractionDigits', 2)))
+        pattern = self.facets.get('pattern', '')
+        if pattern == '[0]{1}[1-6]{1}':
+            return ('pad', 2)
+        # Fecha sin hora; '(?:' es un grupo del patrón, no los ':' de una hora
+        if r'\-' in pattern and ':' not in pattern.replace('(?:', '('):
+            return ('date',)
+        return ('str',)
+
+
+STRING_TYPE = XsdType(None, 'xs:string')
+
+
+class XsdElement:
+    def __init__(self, name, xsd_type=None, min_occurs=1, max_occurs=1, children=None, is_any=False):
+        self.name = name
+        self.type = xsd_type
+        self.min_occurs = min_occurs
+        self.max_occurs = max_occurs
+        self.children = children if children is not None else []
+        self.is_any = is_any
+
+    @property
+    def is_complex(self):
+        return bool(self.children)
+
+    @property
+    def required(self):
+        return self.min_occurs > 0
+
+    @property
+    def repeated(self):
+        return self.max_occurs > 1
+
+    def child(self, name):
+        for c in self.children:
+            if c.name == name:
+                return c
+        return None
+
+    def walk(self, path=()):
+        """Recorre (ruta, elemento) en orden de documento."""
+        path = path + (self.name,)
+        yield path, self
+        for c in self.children:
+            yield from c.walk(path)
+
+    def __repr__(self):
+        return f"XsdElement({self.name!r}, {self.min_occurs}..{self.max_occurs})"
+
+
+def _occurs(value, default=1):
+    if value is None:
+        return default
+    if value == 'unbounded':
+        return UNBOUNDED
+    return int(value)
+
+
+def _parse_simple_type(st, name):
+    restriction = st.find(XS + 'restriction')
+    if restriction is None:
+        return STRING_TYPE
+    facets, enumeration = {}, []
+    for facet in restriction:
+        if not isinstance(facet.tag, str):
+            continue
+        tag = facet.tag[len(XS):]
+        if tag == 'enumeration':
+            enumeration.append(facet.get('value'))
+        else:
+            facets[tag] = facet.get('value')
+    return XsdType(name, restriction.get('base'), facets, enumeration)
+
+
+def _parse_types(root):
+    return {
+        st.get('name'): _parse_simple_type(st, st.get('name'))
+        for st in root.iter(XS + 'simpleType')
+        if st.get('name')
+    }
+
+
+def _parse_element(node, types):
+    name = node.get('name')
+    min_occurs = _occurs(node.get('minOccurs'))
+    max_occurs = _occurs(node.get('maxOccurs'))
+
+    sequence = node.find(XS + 'complexType/' + XS + 'sequence')
+    if sequence is not None:
+        children = []
+        for child in sequence:
+            if child.tag == XS + 'element':
+                children.append(_parse_element(child, types))
+            elif child.tag == XS + 'any':
+                # La DGII reserva el xs:any final para <Signature>
+                children.append(XsdElement('Signature', None, _occurs(child.get('minOccurs')),
+                                           _occurs(child.get('maxOccurs')), is_any=True))
+        return XsdElement(name, None, min_occurs, max_occurs, children)
+
+    inline = node.find(XS + 'simpleType')
+    if inline is not None:
+        xsd_type = _parse_simple_type(inline, name)
+    else:
+        xsd_type = types.get(node.get('type'), STRING_TYPE)
+    return XsdElement(name, xsd_type, min_occurs, max_occurs)
+
+
+def load_schema(path):
+    """Devuelve el XsdElement raíz del XSD (ECF, RFCE, ACECF, ...)."""
+    root = etree.parse(path).getroot()
+    types = _parse_types(root)
+    return _parse_element(root.find(XS + 'element'), types)
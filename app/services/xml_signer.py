@@ -0,0 +1,251 @@
+"""
+Firma XMLDSig de los e-CF dentro del servicio.
+
+Perfil de la DGII: firma envuelta (Reference URI="" con la transformación
+enveloped-signature), C14N 1.0 inclusiva, RSA-SHA256 y digest SHA-256, con el
+certificado del emisor en KeyInfo/X509Data.
+
+La firma trabaja sobre el árbol que produjo el builder: se indenta, se
+canonicaliza y se calcula el digest sin serializar ni volver a parsear. La
+serialización final (get_xml_string) conserva exactamente esos espacios, así
+que los bytes que se envían son los que se firmaron.
+
+El certificado y la llave de cada emisor (PKCS#12) se cargan una sola vez por
+proceso en KeyStore, con un máximo de entradas (LRU) y un TTL para recoger
+certificados renovados.
+"""
+import os
+import time
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from lxml import etree
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+DS_NS = 'http://www.w3.org/2000/09/xmldsig#'
+C14N_ALGORITHM = 'http://www.w3.org/TR/2001/REC-xml-c14n-20010315'
+SIGNATURE_ALGORITHM = 'http://www.w3.org/2001/04/xmldsig-more#rsa-sha256'
+DIGEST_ALGORITHM = 'http://www.w3.org/2001/04/xmlenc#sha256'
+ENVELOPED_TRANSFORM = 'http://www.w3.org/2000/09/xmldsig#enveloped-signature'
+
+DS = '{%s}' % DS_NS
+
+
+class SigningKeyError(ValueError):
+    """No hay certificado (o no se puede abrir) para el emisor."""
+    pass
+
+
+class KeyMaterial:
+    def __init__(self, private_key, certificate):
+        self.private_key = private_key
+        self.certificate = certificate
+        self.certificate_b64 = base64.b64encode(
+            certificate.public_bytes(serialization.Encoding.DER)).decode('ascii')
+
+
+class KeyStore:
+    """
+    Certificados PKCS#12 por RNC emisor, leídos de `<certs_dir>/<RNC>.p12`
+    (o .pfx). La contraseña sale de `passwords[RNC]` o de `default_password`.
+    """
+    EXTENSIONS = ('.p12', '.pfx')
+
+    def __init__(self, certs_dir=None, passwords=None, default_password=None, max_entries=32, ttl=3600):
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(certs_dir, passwords, default_password, max_entries, ttl)
+
+    def configure(self, certs_dir=None, passwords=None, default_password=None, max_entries=32, ttl=3600):
+        self.certs_dir = certs_dir
+        self.passwords = passwords or {}
+        self.default_password = default_password
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.invalidate()
+
+    def _path(self, rnc):
+        if not self.certs_dir:
+            raise SigningKeyError("No hay directorio de certificados configurado (ECF_CERTS_DIR)")
+        for ext in self.EXTENSIONS:
+            path = os.path.join(self.certs_dir, f"{rnc}{ext}")
+            if os.path.exists(path):
+                return path
+        raise SigningKeyError(f"No hay certificado para el RNC emisor {rnc}")
+
+    def _load(self, rnc):
+        path = self._path(rnc)
+        password = self.passwords.get(str(rnc), self.default_password)
+        try:
+            with open(path, 'rb') as f:
+                key, cert, _ = pkcs12.load_key_and_certificates(
+                    f.read(), password.encode('utf-8') if password else None)
+        except (OSError, ValueError) as e:
+            raise SigningKeyError(f"No se pudo abrir el certificado del RNC {rnc}: {str(e)}")
+        if key is None or cert is None:
+            raise SigningKeyError(f"El certificado del RNC {rnc} no trae llave privada")
+        return KeyMaterial(key, cert)
+
+    def get(self, rnc):
+        rnc = str(rnc)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(rnc)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(rnc)
+                return entry[1]
+        # Leer el PKCS#12 fuera del lock: es lo caro (derivación de la contraseña)
+        material = self._load(rnc)
+        with self._lock:
+            self._cache[rnc] = (now + self.ttl, material)
+            self._cache.move_to_end(rnc)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return material
+
+    def invalidate(self, rnc=None):
+        with self._lock:
+            if rnc is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(str(rnc), None)
+
+
+def _c14n(node):
+    return etree.tostring(node, method='c14n')
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii')
+
+
+def _remove_placeholder(root):
+    for child in reversed(root):
+        if isinstance(child.tag, str) and etree.QName(child).localname == 'Signature':
+            root.remove(child)
+
+
+def _signature_skeleton(material):
+    sig = etree.Element(DS + 'Signature', nsmap={None: DS_NS})
+    signed_info = etree.SubElement(sig, DS + 'SignedInfo')
+    etree.SubElement(signed_info, DS + 'CanonicalizationMethod', Algorithm=C14N_ALGORITHM)
+    etree.SubElement(signed_info, DS + 'SignatureMethod', Algorithm=SIGNATURE_ALGORITHM)
+    reference = etree.SubElement(signed_info, DS + 'Reference', URI='')
+    transforms = etree.SubElement(reference, DS + 'Transforms')
+    etree.SubElement(transforms, DS + 'Transform', Algorithm=ENVELOPED_TRANSFORM)
+    etree.SubElement(reference, DS + 'DigestMethod', Algorithm=DIGEST_ALGORITHM)
+    etree.SubElement(reference, DS + 'DigestValue')
+    etree.SubElement(sig, DS + 'SignatureValue')
+    key_info = etree.SubElement(sig, DS + 'KeyInfo')
+    x509_data = etree.SubElement(key_info, DS + 'X509Data')
+    etree.SubElement(x509_data, DS + 'X509Certificate').text = material.certificate_b64
+    return sig
+
+
+def _enveloped_digest(root, sig):
+    """Digest del documento sin el elemento Signature (transformación enveloped-signature)."""
+    # La transformación quita solo el elemento; el texto que lo seguía se queda.
+    # En lxml ese texto es el tail de Signature, así que se pasa al hermano anterior.
+    previous = sig.getprevious()
+    index = root.index(sig)
+    sig_tail = sig.tail
+    if previous is not None:
+        saved = previous.tail
+        previous.tail = (saved or '') + (sig_tail or '')
+    else:
+        saved = root.text
+        root.text = (saved or '') + (sig_tail or '')
+    root.remove(sig)
+    try:
+        return hashlib.sha256(_c14n(root)).digest()
+    finally:
+        root.insert(index, sig)
+        sig.tail = sig_tail
+        if previous is not None:
+            previous.tail = saved
+        else:
+            root.text = saved
+
+
+def sign_tree(root, material, pretty=True):
+    """
+    Firma en el lugar el árbol <ECF> (o cualquier documento con firma envuelta).
+    Con pretty=False el árbol se firma tal cual, para serializarlo compacto.
+    """
+    _remove_placeholder(root)
+    sig = _signature_skeleton(material)
+    root.append(sig)
+    # Los espacios de la indentación forman parte de lo firmado: fijarlos antes del digest
+    if pretty:
+        etree.indent(root)
+
+    sig.find(DS + 'SignedInfo/' + DS + 'Reference/' + DS + 'DigestValue').text = _b64(_enveloped_digest(root, sig))
+
+    signed_info = sig.find(DS + 'SignedInfo')
+    signature = material.private_key.sign(_c14n(signed_info), padding.PKCS1v15(), hashes.SHA256())
+    sig.find(DS + 'SignatureValue').text = _b64(signature)
+    return root
+
+
+def verify_tree(root, certificate=None):
+    """
+    Comprueba digest y firma de un documento firmado. Usa el certificado de
+    KeyInfo si no se indica otro. Devuelve True o lanza ValueError.
+    """
+    sig = root.find(DS + 'Signature')
+    if sig is None:
+        raise ValueError("El documento no tiene Signature")
+    if certificate is None:
+        der = base64.b64decode(sig.findtext('.//' + DS + 'X509Certificate'))
+        certificate = x509.load_der_x509_certificate(der)
+
+    expected = base64.b64decode(sig.findtext('.//' + DS + 'DigestValue'))
+    if _enveloped_digest(root, sig) != expected:
+        raise ValueError("DigestValue no coincide con el documento")
+
+    signature = base64.b64decode(sig.findtext(DS + 'SignatureValue'))
+    try:
+        certificate.public_key().verify(signature, _c14n(sig.find(DS + 'SignedInfo')),
+                                        padding.PKCS1v15(), hashes.SHA256())
+    except Exception:
+        raise ValueError("SignatureValue no es válido")
+    return True
+
+
+class XMLSigner:
+    """Firma documentos con la llave de su emisor, tomada del KeyStore del proceso."""
+    def __init__(self, key_store):
+        self.key_store = key_store
+
+    def sign_tree(self, root, rnc, pretty=True):
+        return sign_tree(root, self.key_store.get(rnc), pretty)
+
+    def sign_bytes(self, xml_bytes, rnc):
+        """Para XML ya serializado (p. ej. en la cola de trabajos): parsea, firma y serializa."""
+        root = etree.fromstring(xml_bytes)
+        self.sign_tree(root, rnc)
+        return etree.tostring(root, encoding='UTF-8', xml_declaration=True)
+
+    def sign_builders(self, builders):
+        """Firma en lote builders ya construidos; la llave de cada emisor se carga una vez."""
+        for builder in builders:
+            self.sign_tree(builder.root, builder.data['Encabezado']['Emisor']['RNCEmisor'])
+        return builders
+
+
+def parse_passwords(value):
+    """'101010101=clave1,131313131=clave2' -> {'101010101': 'clave1', ...}"""
+    passwords = {}
+    for part in (value or '').split(','):
+        if '=' in part:
+            rnc, password = part.split('=', 1)
+            passwords[rnc.strip()] = password
+    return passwords
+
+
+key_store = KeyStore()
+xml_signer = XMLSigner(key_store)
@@ -0,0 +1,68 @@
+"""
+Cliente HTTP mínimo de los servicios de la DGII usados por el pipeline.
+
+Recepción:  POST {base}/recepcion/api/facturaselectronicas  (multipart, campo "xml")
+Consulta:   GET  {base}/consultaresultado/api/consultas/estado?trackid=...
+
+Los errores transitorios (red, timeout, 429 y 5xx) se reportan como
+RetryableError para que la cola reintente con backoff; los demás 4xx son
+definitivos (ValueError).
+
+requests.Session no es thread-safe y las etapas del pipeline corren en hilos
+distintos: cada hilo usa su propia sesión (con su pool de conexiones).
+"""
+import threading
+import requests
+
+RECEPCION_PATH = '/recepcion/api/facturaselectronicas'
+CONSULTA_PATH = '/consultaresultado/api/consultas/estado'
+
+
+class RetryableError(Exception):
+    """Error transitorio: la etapa se reintenta más tarde."""
+    pass
+
+
+class DGIIClient:
+    def __init__(self, base_url, token=None, timeout=30.0):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _headers(self):
+        return {'Authorization': f'Bearer {self.token}'} if self.token else {}
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, self.base_url + path, headers=self._headers(),
+                                            timeout=self.timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(f"DGII no disponible: {str(e)}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableError(f"DGII respondió {response.status_code}")
+        if response.status_code >= 400:
+            raise ValueError(f"DGII rechazó la petición ({response.status_code}): {response.text[:500]}")
+        try:
+            return response.json()
+        except ValueError:
+            raise RetryableError("Respuesta de la DGII no es JSON")
+
+    def submit(self, filename, xml_bytes):
+        """Envía un e-CF firmado y devuelve el trackId."""
+        data = self._request('POST', RECEPCION_PATH, files={'xml': (filename, xml_bytes, 'text/xml')})
+        track_id = data.get('trackId')
+        if not track_id:
+            raise ValueError(f"La DGII no devolvió trackId: {data}")
+        return track_id
+
+    def status(self, track_id):
+        """Resultado de la consulta por trackId (estado, codigo, mensajes...)."""
+        return self._request('GET', CONSULTA_PATH, params={'trackid': track_id})
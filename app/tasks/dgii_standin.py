@@ -0,0 +1,144 @@
+"""
+Sustituto local de los servicios de recepción y consulta de la DGII.
+
+Sirve para probar el pipeline sin salir de la máquina. Son configurables:
+
+  - la latencia: una base fija, más una parte exponencial al azar (jitter,
+    su media) y, en una fracción de las peticiones, una pausa larga (stall)
+    para que el cliente llegue a su timeout,
+  - los fallos transitorios: una fracción de 503 y otra de 429,
+  - la tasa de rechazos y la cantidad de consultas que un documento pasa
+    "En Proceso".
+
+Guarda los documentos recibidos en memoria y cuenta lo que respondió en
+GET /standin/stats.
+
+    python -m app.tasks.dgii_standin --port 8001 --latency 0.05 --jitter 0.02 --failure-rate 0.1
+"""
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import Counter
+from flask import Flask, request, jsonify
+from lxml import etree
+from app.tasks.dgii_client import RECEPCION_PATH, CONSULTA_PATH
+
+
+STATS_PATH = '/standin/stats'
+
+
+def create_standin_app(latency=0.0, failure_rate=0.0, reject_rate=0.0, processing_polls=1, seed=None,
+                       jitter=0.0, stall_rate=0.0, stall=0.0, throttle_rate=0.0):
+    app = Flask(__name__)
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    received = {}
+    stats = Counter()
+    app.config['DGII_RECEIVED'] = received
+    app.config['DGII_STATS'] = stats
+
+    def delay(endpoint):
+        """Espera la latencia simulada; devuelve el código de un fallo inyectado, o None."""
+        with lock:
+            seconds = latency + (rng.expovariate(1 / jitter) if jitter else 0.0)
+            stalled = rng.random() < stall_rate
+            draw = rng.random()
+            stats[endpoint] += 1
+            if stalled:
+                stats['stall'] += 1
+        time.sleep(seconds + (stall if stalled else 0.0))
+        status = 503 if draw < failure_rate else 429 if draw < failure_rate + throttle_rate else None
+        if status:
+            with lock:
+                stats[str(status)] += 1
+        return status
+
+    def unavailable(status):
+        message = "Servicio no disponible" if status == 503 else "Demasiadas peticiones"
+        return jsonify({"error": message}), status
+
+    @app.route(RECEPCION_PATH, methods=['POST'])
+    def recepcion():
+        status = delay('recepcion')
+        if status:
+            return unavailable(status)
+        upload = request.files.get('xml')
+        if upload is None:
+            return jsonify({"error": "Falta el archivo xml"}), 400
+        try:
+            root = etree.fromstring(upload.read())
+        except etree.XMLSyntaxError as e:
+            return jsonify({"error": f"XML mal formado: {str(e)}"}), 400
+
+        track_id = str(uuid.uuid4())
+        with lock:
+            rejected = rng.random() < reject_rate
+        with lock:
+            stats['rechazados' if rejected else 'aceptados'] += 1
+        received[track_id] = {
+            "encf": root.findtext('Encabezado/IdDoc/eNCF'),
+            "rnc": root.findtext('Encabezado/Emisor/RNCEmisor'),
+            "signed": root.find('{http://www.w3.org/2000/09/xmldsig#}Signature/'
+                                '{http://www.w3.org/2000/09/xmldsig#}SignatureValue') is not None,
+            "polls": 0,
+            "estado": "Rechazado" if rejected else "Aceptado",
+            "fechaRecepcion": time.strftime("%d-%m-%Y %H:%M:%S"),
+        }
+        return jsonify({"trackId": track_id})
+
+    @app.route(CONSULTA_PATH, methods=['GET'])
+    def consulta():
+        status = delay('consulta')
+        if status:
+            return unavailable(status)
+        track_id = request.args.get('trackid')
+        doc = received.get(track_id)
+        if doc is None:
+            return jsonify({"error": "trackId no encontrado"}), 404
+        doc["polls"] += 1
+        estado = "En Proceso" if doc["polls"] <= processing_polls else doc["estado"]
+        mensajes = []
+        if estado == "Rechazado":
+            mensajes.append({"valor": "Documento rechazado por el sustituto local", "codigo": 1})
+        return jsonify({
+            "trackId": track_id,
+            "codigo": {"En Proceso": 3, "Aceptado": 1, "Rechazado": 2}[estado],
+            "estado": estado,
+            "rnc": doc["rnc"],
+            "encf": doc["encf"],
+            "secuenciaUtilizada": estado != "En Proceso",
+            "fechaRecepcion": doc["fechaRecepcion"],
+            "mensajes": mensajes,
+        })
+
+    @app.route(STATS_PATH, methods=['GET'])
+    def standin_stats():
+        with lock:
+            return jsonify(dict(stats, recibidos=len(received)))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sustituto local de la DGII")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos por petición")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Media en segundos de la latencia extra al azar")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fracción de peticiones con pausa larga")
+    parser.add_argument("--stall", type=float, default=0.0, help="Segundos de la pausa larga")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fracción de respuestas 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fracción de respuestas 429")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="Fracción de documentos rechazados")
+    parser.add_argument("--processing-polls", type=int, default=1, help="Consultas que un documento pasa En Proceso")
+    args = parser.parse_args()
+    app = create_standin_app(args.latency, args.failure_rate, args.reject_rate, args.processing_polls,
+                             jitter=args.jitter, stall_rate=args.stall_rate, stall=args.stall,
+                             throttle_rate=args.throttle_rate)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
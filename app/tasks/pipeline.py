@@ -0,0 +1,76 @@
+"""
+Etapas del pipeline asíncrono de un e-CF: build -> validate -> sign -> submit -> poll.
+
+Cada etapa recibe el trabajo tomado de la cola y devuelve los campos que se
+guardan al pasar a la siguiente. Un ValueError es un error del documento y
+termina el trabajo; RetryableError (y cualquier otra excepción) se reintenta
+con backoff; RetryLater reprograma la etapa sin contar un intento (la DGII
+todavía está procesando).
+"""
+import logging
+from lxml import etree
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.schema_registry import schema_registry, SchemaUnavailableError
+from app.services.archive import document_archive
+
+logger = logging.getLogger(__name__)
+
+
+class RetryLater(Exception):
+    def __init__(self, message, delay):
+        super().__init__(message)
+        self.delay = delay
+
+
+class Pipeline:
+    def __init__(self, client, signer=None, validate=True, poll_interval=5.0):
+        self.client = client
+        # signer(xml_bytes, rnc) -> xml_bytes firmado; sin signer el documento
+        # se envía con el placeholder de <Signature>
+        self.signer = signer
+        self.validate_xsd = validate
+        self.poll_interval = poll_interval
+
+    def run(self, stage, job):
+        return getattr(self, stage)(job)
+
+    def build(self, job):
+        builder = ECFBuilderFactory.get_builder(job['payload'])
+        builder.build()
+        return {'xml': builder.get_xml_bytes(), 'tipo_ecf': builder.tipo_ecf}
+
+    def validate(self, job):
+        if self.validate_xsd:
+            try:
+                errors = schema_registry.validate(job['tipo_ecf'], etree.fromstring(job['xml']))
+            except SchemaUnavailableError:
+                errors = []
+            if errors:
+                first = errors[0]
+                raise ValueError(f"El XML generado no cumple el XSD ({len(errors)} errores): "
+                                 f"línea {first['line']}: {first['message']}")
+        return {}
+
+    def sign(self, job):
+        if self.signer is None:
+            return {}
+        return {'xml': self.signer(job['xml'], job['rnc'])}
+
+    def submit(self, job):
+        filename = f"{job['rnc']}{job['encf']}.xml"
+        track_id = self.client.submit(filename, job['xml'])
+        # Se archiva lo que recibió la DGII (ya firmado). Un fallo aquí no debe
+        # reintentar el envío, que ya se hizo
+        try:
+            document_archive.append_document(job['xml'], job['payload'])
+        except Exception:
+            logger.exception("No se pudo archivar el e-CF %s", job['encf'])
+        return {'track_id': track_id}
+
+    def poll(self, job):
+        result = self.client.status(job['track_id'])
+        estado = result.get('estado')
+        if estado in (None, 'En Proceso'):
+            raise RetryLater(f"DGII: {estado or 'sin estado'}", self.poll_interval)
+        return {'result': result, 'status': 'rejected' if estado == 'Rechazado' else 'done'}
+
@@ -0,0 +1,149 @@
+"""
+Cola de trabajos durable en SQLite (modo WAL) compartida por la API y los workers.
+
+Cada trabajo es un e-CF que recorre las etapas del pipeline en orden
+(STAGES). Un trabajo está en una sola etapa a la vez con estado:
+
+    pending   esperando a que un worker de la etapa lo tome (desde next_run)
+    running   tomado por un worker hasta lease_until
+    done      terminó todas las etapas (aceptado por la DGII)
+    rejected  la DGII lo rechazó
+    failed    error permanente o se agotaron los reintentos
+
+Un worker que muere con un trabajo tomado no lo pierde: al vencer el lease
+vuelve a estar disponible para su etapa.
+"""
+import os
+import json
+import time
+import uuid
+import tempfile
+from app.utils.sqlite_store import LocalConnection
+
+STAGES = ('build', 'validate', 'sign', 'submit', 'poll')
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, rnc TEXT, encf TEXT, tipo_ecf INTEGER, "
+    "stage TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+    "next_run REAL NOT NULL, lease_until REAL, payload TEXT NOT NULL, xml BLOB, "
+    "track_id TEXT, result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (stage, status, next_run)",
+)
+
+FINAL_STATUSES = ('done', 'rejected', 'failed')
+
+
+class JobQueue:
+    def __init__(self, path=None):
+        self.path = None
+        self._db = None
+        if path:
+            self.configure(path)
+
+    def configure(self, path=None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'ecf-tasks.sqlite3')
+        self._db = LocalConnection(self.path, SCHEMA)
+
+    def _conn(self):
+        if self._db is None:
+            self.configure()
+        return self._db.get()
+
+    def enqueue(self, payload):
+        """Registra un documento en la primera etapa y devuelve el id del trabajo."""
+        job_id = uuid.uuid4().hex
+        try:
+            encabezado = payload['Encabezado']
+            rnc = encabezado['Emisor'].get('RNCEmisor')
+            encf = encabezado['IdDoc'].get('eNCF')
+            tipo_ecf = int(encabezado['IdDoc']['TipoeCF'])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            rnc, encf, tipo_ecf = None, None, 0
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, rnc, encf, tipo_ecf, stage, status, next_run, payload, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?)",
+            (job_id, rnc, encf, tipo_ecf, STAGES[0], now, json.dumps(payload, ensure_ascii=False), now, now))
+        return job_id
+
+    def claim(self, stage, max_in_flight, lease):
+        """
+        Toma el siguiente trabajo listo de la etapa, o None si no hay o si la
+        etapa ya tiene max_in_flight trabajos en curso (contando todos los procesos).
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            running = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE stage = ? AND status = 'running' AND lease_until > ?",
+                (stage, now)).fetchone()[0]
+            row = None
+            if running < max_in_flight:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE stage = ? AND ("
+                    "(status = 'pending' AND next_run <= ?) OR (status = 'running' AND lease_until <= ?)"
+                    ") ORDER BY next_run LIMIT 1", (stage, now, now)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET status = 'running', lease_until = ?, updated = ? WHERE id = ?",
+                                 (now + lease, now, row[0]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row[0], with_payload=True) if row else None
+
+    def advance(self, job_id, stage, **fields):
+        """Pasa el trabajo a la etapa siguiente (o a done) guardando los campos producidos."""
+        index = STAGES.index(stage)
+        if index + 1 < len(STAGES):
+            self._update(job_id, stage=STAGES[index + 1], status='pending', attempts=0,
+                         next_run=time.time(), lease_until=None, error=None, **fields)
+        else:
+            self._update(job_id, status=fields.pop('status', 'done'), lease_until=None, error=None, **fields)
+
+    def retry(self, job_id, error, delay, count_attempt=True):
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = 'pending', attempts = attempts + ?, next_run = ?, lease_until = NULL, "
+            "error = ?, updated = ? WHERE id = ?",
+            (1 if count_attempt else 0, now + delay, error, now, job_id))
+
+    def fail(self, job_id, error):
+        self._update(job_id, status='failed', lease_until=None, error=error)
+
+    def _update(self, job_id, **fields):
+        if 'result' in fields and fields['result'] is not None:
+            fields['result'] = json.dumps(fields['result'], ensure_ascii=False)
+        fields['updated'] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._conn().execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id, with_payload=False, with_xml=False):
+        columns = ["id", "rnc", "encf", "tipo_ecf", "stage", "status", "attempts",
+                   "next_run", "track_id", "result", "error", "created", "updated"]
+        if with_payload:
+            columns.append("payload")
+        if with_xml or with_payload:
+            # Las etapas posteriores a build trabajan sobre el XML guardado
+            columns.append("xml")
+        row = self._conn().execute(f"SELECT {', '.join(columns)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(columns, row))
+        if job.get('result'):
+            job['result'] = json.loads(job['result'])
+        if job.get('payload'):
+            job['payload'] = json.loads(job['payload'])
+        if job.get('xml') is not None:
+            job['xml'] = bytes(job['xml'])
+        return job
+
+    def counts(self):
+        """Trabajos por (etapa, estado), para métricas y monitoreo."""
+        rows = self._conn().execute("SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status").fetchall()
+        return {(stage, status): count for stage, status, count in rows}
+
+
+job_queue = JobQueue()
@@ -0,0 +1,131 @@
+"""
+Proceso de workers del pipeline asíncrono.
+
+Cada etapa tiene su propio grupo de hilos (tantos como su límite de trabajos
+en curso). El límite se cuenta en la cola, así que se respeta aunque corran
+varios procesos de workers a la vez.
+
+    python -m app.tasks.worker          (usa FLASK_CONFIG, igual que run.py)
+"""
+import os
+import random
+import logging
+import threading
+from app.tasks.queue import STAGES, job_queue
+from app.tasks.pipeline import Pipeline, RetryLater
+from app.tasks.dgii_client import DGIIClient, RetryableError
+from app.services.xml_signer import xml_signer
+
+logger = logging.getLogger(__name__)
+
+
+def parse_stage_limits(value, default=4):
+    """'build=4,submit=8' -> {'build': 4, 'validate': default, ...}"""
+    limits = {stage: default for stage in STAGES}
+    for part in (value or '').split(','):
+        if '=' in part:
+            stage, limit = part.split('=', 1)
+            if stage.strip() not in limits:
+                raise ValueError(f"Etapa desconocida en ECF_TASKS_STAGE_LIMITS: {stage}")
+            limits[stage.strip()] = int(limit)
+    return limits
+
+
+class TaskWorker:
+    def __init__(self, queue, pipeline, stage_limits, max_attempts=8, backoff_base=1.0,
+                 backoff_max=300.0, lease=60.0, idle_interval=0.2):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.stage_limits = stage_limits
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.idle_interval = idle_interval
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def backoff(self, attempts):
+        # Exponencial con jitter completo, para no reintentar todos a la vez
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempts))
+
+    def process(self, stage, job):
+        job_id = job['id']
+        try:
+            fields = self.pipeline.run(stage, job)
+        except RetryLater as e:
+            self.queue.retry(job_id, str(e), e.delay, count_attempt=False)
+        except ValueError as e:
+            logger.warning("Trabajo %s falló en %s: %s", job_id, stage, e)
+            self.queue.fail(job_id, str(e))
+        except Exception as e:
+            # RetryableError o un error interno: reintentar hasta agotar los intentos
+            error = str(e) if isinstance(e, RetryableError) else f"Error interno: {str(e)}"
+            if job['attempts'] + 1 >= self.max_attempts:
+                logger.error("Trabajo %s agotó los reintentos en %s: %s", job_id, stage, error)
+                self.queue.fail(job_id, error)
+            else:
+                self.queue.retry(job_id, error, self.backoff(job['attempts']))
+        else:
+            self.queue.advance(job_id, stage, **fields)
+
+    def run_stage(self, stage):
+        limit = self.stage_limits[stage]
+        while not self.stop_event.is_set():
+            try:
+                job = self.queue.claim(stage, limit, self.lease)
+            except Exception:
+                logger.exception("No se pudo tomar un trabajo de %s", stage)
+                job = None
+            if job is None:
+                self.stop_event.wait(self.idle_interval)
+                continue
+            self.process(stage, job)
+
+    def start(self):
+        for stage in STAGES:
+            for n in range(self.stage_limits[stage]):
+                thread = threading.Thread(target=self.run_stage, args=(stage,), name=f"{stage}-{n}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+
+def worker_from_config(config, signer=None):
+    if signer is None and config.get('ECF_CERTS_DIR'):
+        # Llaves cargadas una vez por proceso de workers (create_app configura el KeyStore)
+        signer = xml_signer.sign_bytes
+    client = DGIIClient(config.get('DGII_BASE_URL'), config.get('DGII_TOKEN'), config.get('DGII_TIMEOUT', 30.0))
+    pipeline = Pipeline(client, signer=signer,
+                        validate=config.get('ECF_TASKS_VALIDATE', True),
+                        poll_interval=config.get('ECF_TASKS_POLL_INTERVAL', 5.0))
+    return TaskWorker(job_queue, pipeline,
+                      parse_stage_limits(config.get('ECF_TASKS_STAGE_LIMITS')),
+                      max_attempts=config.get('ECF_TASKS_MAX_ATTEMPTS', 8),
+                      backoff_base=config.get('ECF_TASKS_BACKOFF_BASE', 1.0),
+                      backoff_max=config.get('ECF_TASKS_BACKOFF_MAX', 300.0),
+                      lease=config.get('ECF_TASKS_LEASE', 60.0))
+
+
+def main():
+    from app.__init__ import create_app
+    from config import config
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(levelname)s %(message)s")
+    app = create_app(config[os.getenv('FLASK_CONFIG') or 'default'])
+    worker = worker_from_config(app.config)
+    worker.start()
+    logger.info("Workers del pipeline iniciados: %s", worker.stage_limits)
+    try:
+        worker.stop_event.wait()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
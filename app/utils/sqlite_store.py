@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import threading
+
+
+class LocalConnection:
+    """
+    Conexión SQLite por hilo y por proceso a un archivo compartido entre workers.
+
+    sqlite3 no permite usar una conexión desde otro hilo ni después de un fork,
+    así que cada hilo abre la suya la primera vez que la pide. El archivo se
+    abre en modo WAL (lectores y un escritor a la vez, sin bloquearse) y el
+    esquema se crea si no existe.
+    """
+    def __init__(self, path, schema=()):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,143 @@
+"""
+Archivo de e-CF: ritmo de ingesta y latencia de consulta con millones de documentos.
+
+Los documentos son XML reales (backend direct, compacto) de todos los TipoeCF,
+a los que solo se les cambia el eNCF; emisor, comprador y FechaEmision se
+reparten entre 1000 emisores, 100 000 compradores y un año de fechas.
+
+Mide:
+  - ingesta: documentos/s y MB/s (XML sin comprimir), bytes en disco por documento,
+  - sellado: segundos para indexar los segmentos llenos,
+  - búsqueda por eNCF (lookup) y lectura del XML (get), aciertos y fallos, p50/p99,
+  - consultas por emisor, comprador y fecha: tiempo hasta el primer documento (la
+    primera vez, con índices fuera del page cache, y la segunda) y documentos/s
+    al recorrerlas completas.
+
+Uso: python -m benchmarks.archive [documentos] [documentos_por_segmento] [directorio]
+     (10 000 000 documentos ocupan unos 5 GB en disco)
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from app.services.archive import DocumentArchive
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.xml_generation.manager import ECFBuilderManager
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.suite import _percentile
+
+EMISORES = 1000
+COMPRADORES = 100000
+
+
+def _templates():
+    ECFBuilderManager.backend = 'direct'
+    templates = []
+    for n, tipo in enumerate(TIPOS * 2):
+        payload = make_payload(tipo, items=1 + n % 4, seq=n + 1)
+        builder = ECFBuilderFactory.get_builder(payload)
+        builder.pretty = False
+        builder.build()
+        templates.append((tipo, payload['Encabezado']['IdDoc']['eNCF'].encode(), builder.get_xml_bytes()))
+    return templates
+
+
+def _document(i):
+    # Determinista: la consulta puede reconstruir los metadatos del documento i
+    tipo_index = i % len(TIPOS)
+    emisor = f"{100000000 + i % EMISORES}"
+    comprador = f"{200000000 + (i * 7919) % COMPRADORES}"
+    day = i % 365
+    fecha = 20240000 + (day // 28 % 12 + 1) * 100 + day % 28 + 1
+    return tipo_index, f"E{TIPOS[tipo_index]:02d}{i:010d}", emisor, comprador, fecha
+
+
+def ingest(archive, count, templates):
+    raw = 0
+    start = time.perf_counter()
+    for i in range(count):
+        tipo_index, encf, emisor, comprador, fecha = _document(i)
+        tipo, placeholder, xml = templates[tipo_index + (i // len(TIPOS)) % 2 * len(TIPOS)]
+        xml = xml.replace(placeholder, encf.encode())
+        raw += len(xml)
+        archive.append(xml, encf, emisor, comprador, fecha, tipo)
+        if i and i % 1000000 == 0:
+            print(f"  {i:>11,} documentos, {i / (time.perf_counter() - start):,.0f}/s", flush=True)
+    return time.perf_counter() - start, raw
+
+
+def _timed(fn, samples):
+    times = []
+    for arg in samples:
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    segment_docs = int(sys.argv[2]) if len(sys.argv) > 2 else 262144
+    workdir = sys.argv[3] if len(sys.argv) > 3 else tempfile.mkdtemp()
+    directory = os.path.join(workdir, 'archive')
+    shutil.rmtree(directory, ignore_errors=True)
+
+    templates = _templates()
+    archive = DocumentArchive()
+    archive.configure(True, directory, segment_docs)
+    print(f"{count:,} documentos, segmentos de {segment_docs:,}, códec "
+          f"{'zstd' if archive.codec == 2 else 'zlib'}, en {directory}")
+
+    elapsed, raw = ingest(archive, count, templates)
+    # Lo que quedaba por sellar lo hacen los hilos de rotación; se espera y se sella lo pendiente
+    start = time.perf_counter()
+    archive.seal_pending()
+    while archive.stats()['sealed'] < len(archive.segments()) - 1:
+        time.sleep(0.1)
+        archive.seal_pending()
+    sealing = time.perf_counter() - start
+    stats = archive.stats()
+    print(f"ingesta: {count / elapsed:,.0f} documentos/s, {raw / elapsed / 1e6:.1f} MB/s de XML "
+          f"({elapsed:.1f} s, incluye el sellado en segundo plano)")
+    print(f"  en disco: {stats['data_bytes'] / count:.0f} B/documento de datos + "
+          f"{stats['index_bytes'] / count:.0f} B/documento de índices (XML medio {raw / count:.0f} B)")
+    print(f"  {stats['segments']} segmentos, sellado pendiente al terminar: {sealing:.2f} s")
+
+    rng = random.Random(7)
+    hits = [_document(rng.randrange(count))[1] for _ in range(20000)]
+    misses = [f"E31{count + rng.randrange(10 ** 9):010d}" for _ in range(20000)]
+    for encf in hits[:200]:
+        archive.get(encf)  # mapas abiertos y páginas de índices en caché
+    print(f"\n{'consulta':<34}{'p50 µs':>10}{'p99 µs':>10}")
+    for name, fn, samples in (('lookup eNCF (acierto)', archive.lookup, hits),
+                              ('lookup eNCF (fallo)', archive.lookup, misses),
+                              ('get eNCF (metadatos + XML)', archive.get, hits),
+                              ('get eNCF + RNC emisor', lambda e: archive.get(e, _document(int(e[3:]))[2]), hits)):
+        times = _timed(fn, samples)
+        print(f"{name:<34}{_percentile(times, 50) * 1e6:>10.1f}{_percentile(times, 99) * 1e6:>10.1f}")
+    wrong = [encf for encf in hits[:1000] if encf.encode() not in archive.get(encf)[1]]
+    print(f"  documentos leídos con otro eNCF: {len(wrong)}")
+
+    # La primera pasada lee índices y entradas del disco; la segunda los encuentra en el page cache
+    print(f"\n{'rango':<30}{'docs':>8}{'1º ms frío':>12}{'1º ms':>8}{'total ms':>10}{'docs/s':>10}")
+    emisor = _document(rng.randrange(count))[2]
+    comprador = _document(rng.randrange(count))[3]
+    for name, kwargs in (('emisor, un mes', {'rnc_emisor': emisor, 'desde': 20240301, 'hasta': 20240331}),
+                         ('emisor, todo', {'rnc_emisor': _document(rng.randrange(count))[2]}),
+                         ('comprador, todo', {'rnc_comprador': comprador}),
+                         ('un día, todos los emisores', {'desde': 20240615, 'hasta': 20240615})):
+        firsts = []
+        for _ in range(2):
+            start = time.perf_counter()
+            documents = archive.query(**kwargs)
+            first = next(documents, None)
+            firsts.append((time.perf_counter() - start) * 1000)
+            total = (first is not None) + sum(1 for _ in documents)
+            seconds = time.perf_counter() - start
+        print(f"{name:<30}{total:>8,}{firsts[0]:>12.2f}{firsts[1]:>8.2f}{seconds * 1000:>10.1f}{total / seconds:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Rendimiento de build_batch: en serie (workers=0) contra el pool de procesos
+con distinto número de workers.
+
+Uso: python -m benchmarks.batch [documentos] [items_por_documento]
+"""
+import os
+import sys
+import time
+import resource
+from verify_builders import get_base_mock_data
+from app.services import batch_builder
+
+
+def make_payloads(count, items):
+    for i in range(count):
+        data = get_base_mock_data(31, f"E31{i:010d}")
+        item = data['DetallesItems'][0]
+        data['DetallesItems'] = [dict(item, NumeroLinea=n + 1) for n in range(items)]
+        yield data
+
+
+def run(count, items, workers):
+    start = time.perf_counter()
+    done = 0
+    for record in batch_builder.build_batch(make_payloads(count, items), workers=workers):
+        done += record["status"] == "ok"
+    elapsed = time.perf_counter() - start
+    return done / elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"{count} documentos x {items} items, {os.cpu_count()} CPUs")
+    print(f"{'workers':<10}{'docs/s':>12}")
+    print(f"{'serie':<10}{run(count, items, 0):>12.0f}")
+
+    workers = 1
+    while workers <= os.cpu_count():
+        print(f"{workers:<10}{run(count, items, workers):>12.0f}")
+        batch_builder.shutdown_executor()
+        workers *= 2
+
+    # La ventana acotada mantiene el RSS del proceso padre plano aunque crezca el lote
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"RSS máximo del proceso padre: {rss_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Rendimiento por TipoeCF de los builders escritos a mano contra los generados
+desde el XSD (ECF_BUILDER_BACKEND = 'manual' | 'generated'). Mide build() y
+build() + get_xml_string(), que es lo que hace create_ecf.
+
+Uso: python -m benchmarks.builders [items ...]
+"""
+import sys
+import timeit
+from app.services.xml_builder import ECFBuilderFactory
+from benchmarks.payloads import TIPOS, make_payload
+
+
+def docs_per_second(data, backend, serialize, number):
+    def run():
+        builder = ECFBuilderFactory.get_builder(data, backend)
+        builder.build()
+        if serialize:
+            builder.get_xml_string()
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return number / best
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1, 10, 100]
+    for items in sizes:
+        number = max(5, 2000 // items)
+        print(f"\n{items} items por documento")
+        print(f"{'Tipo':<6}{'manual/s':>12}{'generado/s':>12}{'x':>7}{'+XML manual/s':>16}{'+XML gen/s':>13}{'x':>7}")
+        for tipo in TIPOS:
+            data = make_payload(tipo, items)
+            m = docs_per_second(data, 'manual', False, number)
+            g = docs_per_second(data, 'generated', False, number)
+            ms = docs_per_second(data, 'manual', True, number)
+            gs = docs_per_second(data, 'generated', True, number)
+            print(f"{tipo:<6}{m:>12.0f}{g:>12.0f}{g / m:>7.2f}{ms:>16.0f}{gs:>13.0f}{gs / ms:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Certificado autofirmado PKCS#12 para probar la firma sin el certificado real de un emisor."""
+import os
+import datetime
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+
+def write_self_signed_p12(certs_dir, rnc, password="prueba", key_size=2048):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    name = x509.Name([
+        x509.NameAttribute(NameOID.COUNTRY_NAME, "DO"),
+        x509.NameAttribute(NameOID.COMMON_NAME, f"Emisor de prueba {rnc}"),
+        x509.NameAttribute(NameOID.SERIAL_NUMBER, str(rnc)),
+    ])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=365))
+            .sign(key, hashes.SHA256()))
+    data = pkcs12.serialize_key_and_certificates(
+        str(rnc).encode(), key, cert, None, serialization.BestAvailableEncryption(password.encode()))
+    os.makedirs(certs_dir, exist_ok=True)
+    path = os.path.join(certs_dir, f"{rnc}.p12")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
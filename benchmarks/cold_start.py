@@ -0,0 +1,142 @@
+"""
+Arranque en frío de gunicorn con gunicorn.conf.py: perfiles con y sin preload.
+
+  lazy            -> sin preload, ECF_WARMUP=off (cada worker compila todo en sus
+                     primeras peticiones)
+  warm por worker -> sin preload, ECF_WARMUP=sync (cada worker se calienta solo)
+  preload         -> preload + ECF_WARMUP=sync (se calienta el maestro y los
+                     workers lo heredan por fork)
+
+Para cada perfil mide:
+  - segundos desde que se lanza gunicorn hasta el primer 200 de /health/ready,
+  - latencia de las primeras peticiones /ecf/ecf?validate=1 (un TipoeCF distinto
+    cada vez, así cada worker toca esquemas y reglas que no ha usado),
+  - RSS, PSS y memoria privada (USS) de cada worker según /proc/<pid>/smaps_rollup.
+    PSS reparte las páginas compartidas entre los procesos que las usan; USS es lo
+    que el worker no comparte con nadie.
+
+Uso: python -m benchmarks.cold_start [workers]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import tempfile
+import subprocess
+import urllib.request
+import urllib.error
+from benchmarks.payloads import TIPOS, make_payload
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = (
+    ('lazy', {'ECF_SERVER_PRELOAD': '0', 'ECF_WARMUP': 'off'}),
+    ('warm por worker', {'ECF_SERVER_PRELOAD': '0', 'ECF_WARMUP': 'sync'}),
+    ('preload', {'ECF_SERVER_PRELOAD': '1', 'ECF_WARMUP': 'sync'}),
+)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _get(url, data=None):
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def _memory(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    uss = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0) / 1024, values.get('Pss', 0) / 1024, uss / 1024
+
+
+def run_profile(name, overrides, workers):
+    port = _free_port()
+    workdir = tempfile.mkdtemp()
+    env = dict(os.environ, ECF_SERVER_BIND=f'127.0.0.1:{port}', ECF_SERVER_WORKERS=str(workers),
+               ECF_BUILDER_BACKEND='generated', ECF_METRICS_DIR=os.path.join(workdir, 'metrics'),
+               ECF_IDEMPOTENCY_ENABLED='0', SEMILLA_DB=os.path.join(workdir, 'semillas.sqlite3'),
+               ECF_LOG_ENABLED='0', FLASK_CONFIG='prod', **overrides)
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    try:
+        while True:
+            try:
+                if _get(base + '/health/ready')[0] == 200:
+                    break
+            except OSError:
+                pass
+            if time.perf_counter() - start > 60:
+                raise RuntimeError(f"{name}: gunicorn no quedó listo en 60 s")
+            time.sleep(0.01)
+        ready = time.perf_counter() - start
+
+        first = []
+        for n in range(len(TIPOS) * 2):
+            body = json.dumps(make_payload(TIPOS[n % len(TIPOS)], items=5, seq=n + 1)).encode('utf-8')
+            t0 = time.perf_counter()
+            _get(base + '/ecf/ecf?validate=1', body)
+            first.append(time.perf_counter() - t0)
+        warm = []
+        for n in range(50):
+            body = json.dumps(make_payload(TIPOS[n % len(TIPOS)], items=5, seq=n + 1)).encode('utf-8')
+            t0 = time.perf_counter()
+            _get(base + '/ecf/ecf?validate=1', body)
+            warm.append(time.perf_counter() - t0)
+
+        memory = [_memory(pid) for pid in _children(server.pid)]
+        master = _memory(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+    return ready, first, warm, memory, master
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print(f"gunicorn con {workers} workers sync, backend generated, ?validate=1")
+    print(f"{'perfil':<17}{'listo s':>8}{'1ª pet. máx ms':>16}{'1ª pet. media ms':>18}{'caliente ms':>13}"
+          f"{'RSS MB':>8}{'PSS MB':>8}{'USS MB':>8}{'maestro RSS':>13}")
+    for name, overrides in PROFILES:
+        ready, first, warm, memory, master = run_profile(name, overrides, workers)
+        rss = sum(m[0] for m in memory) / len(memory)
+        pss = sum(m[1] for m in memory) / len(memory)
+        uss = sum(m[2] for m in memory) / len(memory)
+        print(f"{name:<17}{ready:>8.2f}{max(first) * 1000:>16.1f}{sum(first) / len(first) * 1000:>18.1f}"
+              f"{sorted(warm)[len(warm) // 2] * 1000:>13.2f}{rss:>8.1f}{pss:>8.1f}{uss:>8.1f}{master[0]:>13.1f}")
+    print("RSS/PSS/USS: promedio por worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Bytes enviados y CPU por petición de la respuesta de /ecf/ecf según formato
+(pretty / compact) y Content-Encoding (identity / gzip / zstd).
+
+Tamaños: factura chica (1 item), mediana (50) y de 10.000 líneas. La grande
+supera el maxOccurs del XSD, así que se arma directamente con el builder (sin
+pasar por la validación previa de la ruta); con eso se mide igual el costo de
+serializar y comprimir un documento de ese tamaño.
+
+CPU = time.process_time() de build + serializar + comprimir, p50 por petición.
+
+Uso: python -m benchmarks.compression [backend] [tipo]
+"""
+import sys
+import time
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.compression import response_compressor, zstandard
+from benchmarks.payloads import make_payload
+from benchmarks.suite import _percentile
+
+SIZES = (('chica', 1), ('mediana', 50), ('10k líneas', 10000))
+
+
+def _respond(payload, backend, pretty, encoding):
+    builder = ECFBuilderFactory.get_builder(payload, backend)
+    builder.pretty = pretty
+    builder.build()
+    body = builder.get_xml_bytes()
+    if encoding and len(body) >= response_compressor.min_bytes:
+        body = response_compressor.compress(body, encoding)
+    return body
+
+
+def _cpu(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append(time.process_time() - start)
+    return _percentile(samples, 50)
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'generated'
+    tipo = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    response_compressor.configure('zstd,gzip')
+    encodings = [None, 'gzip'] + (['zstd'] if zstandard is not None else [])
+
+    print(f"backend: {backend}  tipo: {tipo}  umbral: {response_compressor.min_bytes} bytes")
+    print(f"{'documento':<12}{'formato':<9}{'encoding':<10}{'bytes':>11}{'vs pretty':>11}{'CPU ms':>10}")
+    for label, items in SIZES:
+        payload = make_payload(tipo, items=items)
+        repeat = max(5, 2000 // items)
+        baseline = None
+        for pretty in (True, False):
+            for encoding in encodings:
+                body = _respond(payload, backend, pretty, encoding)
+                baseline = baseline or len(body)
+                cpu = _cpu(lambda: _respond(payload, backend, pretty, encoding), repeat)
+                print(f"{label:<12}{'pretty' if pretty else 'compact':<9}{encoding or 'identity':<10}"
+                      f"{len(body):>11}{len(body) / baseline:>10.1%}{cpu * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Backend 'direct' (texto escrito sin lxml) contra 'generated' (árbol lxml +
+pretty_print).
+
+1. Comparación diferencial: para cada TipoeCF y una serie de variantes del
+   payload (sin items, muchos items, bloques opcionales, textos con & < > \\r,
+   acentos, vacíos, bloques vacíos) ambos backends deben dar los mismos bytes,
+   también en modo streaming, en salida compacta (pretty=False) y después de
+   firmar.
+2. Rendimiento: documentos por segundo y memoria Python asignada por documento
+   (tracemalloc). Los nodos de lxml viven en C y no aparecen en tracemalloc, así
+   que además se reporta cuántos elementos crea el backend generated.
+
+Uso: python -m benchmarks.direct_emitter [items ...]
+"""
+import sys
+import timeit
+import tempfile
+import tracemalloc
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.xml_signer import KeyStore, XMLSigner
+from benchmarks.certs import write_self_signed_p12
+from benchmarks.payloads import TIPOS, make_payload
+
+RNC = '101010101'
+
+
+def _variants(tipo):
+    yield 'mínimo', make_payload(tipo, items=1)
+    yield 'sin items', dict(make_payload(tipo, items=1), DetallesItems=[])
+    yield 'opcionales, 25 items', make_payload(tipo, items=25, optional=True)
+
+    data = make_payload(tipo, items=3, optional=True)
+    emisor = data['Encabezado']['Emisor']
+    emisor['RazonSocialEmisor'] = 'Peña & Asociados <S.R.L.> "El Águila" \'x\''
+    emisor['DireccionEmisor'] = 'Calle 1\r\nNo. 2\ttercer piso'
+    emisor['NombreComercial'] = ''
+    data['DetallesItems'][0]['NombreItem'] = 'ñandú ≥ 5 € — 😀'
+    yield 'textos especiales', data
+
+    data = make_payload(tipo, items=2, optional=True)
+    data['Encabezado']['IdDoc']['TablaFormasPago'] = {'FormaDePago': []}
+    data['Encabezado']['Emisor']['TablaTelefonoEmisor'] = []
+    yield 'bloques vacíos', data
+
+
+def _build(payload, backend, stream=False, pretty=True):
+    builder = ECFBuilderFactory.get_builder(payload, backend)
+    builder.pretty = pretty
+    if stream:
+        return b''.join(builder.iter_xml_bytes())
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+def _signed(payload, backend, signer):
+    builder = ECFBuilderFactory.get_builder(payload, backend)
+    builder.build()
+    signer.sign_tree(builder.root, RNC)
+    return builder.get_xml_bytes()
+
+
+def differential():
+    certs_dir = tempfile.mkdtemp()
+    write_self_signed_p12(certs_dir, RNC, 'prueba')
+    signer = XMLSigner(KeyStore(certs_dir, default_password='prueba'))
+    checked = failed = 0
+    for tipo in TIPOS:
+        for name, payload in _variants(tipo):
+            expected = _build(payload, 'generated')
+            compact = _build(payload, 'generated', pretty=False)
+            outputs = {
+                'build': (_build(payload, 'direct'), expected),
+                'stream': (_build(payload, 'direct', stream=True), expected),
+                'compacto': (_build(payload, 'direct', pretty=False), compact),
+                'stream compacto': (_build(payload, 'direct', stream=True, pretty=False), compact),
+                'stream compacto (lxml)': (_build(payload, 'generated', stream=True, pretty=False), compact),
+            }
+            for mode, (output, reference) in outputs.items():
+                checked += 1
+                if output != reference:
+                    failed += 1
+                    print(f"  DIFERENTE: tipo {tipo}, {name}, {mode}")
+        # La firma parte del árbol que arma cada backend; la FechaHoraFirma tiene que ser la misma
+        payload = make_payload(tipo, items=5)
+        payload['FechaHoraFirma'] = '01-01-2024 10:00:00'
+        checked += 1
+        if _signed(payload, 'direct', signer) != _signed(payload, 'generated', signer):
+            failed += 1
+            print(f"  DIFERENTE: tipo {tipo}, firmado")
+
+    bad = make_payload(32, items=1)
+    bad['Encabezado']['Emisor']['RazonSocialEmisor'] = 'control \x01'
+    errors = []
+    for backend in ('generated', 'direct'):
+        try:
+            _build(bad, backend)
+        except ValueError:
+            errors.append(backend)
+    print(f"comparaciones byte a byte: {checked}, diferentes: {failed}")
+    print(f"carácter de control rechazado (ValueError) por: {', '.join(errors)}")
+    return failed == 0
+
+
+def _docs_per_second(payload, backend, number):
+    best = min(timeit.repeat(lambda: _build(payload, backend), number=number, repeat=5))
+    return number / best
+
+
+def _python_bytes(payload, backend, number=50):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(number):
+        _build(payload, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main():
+    ok = differential()
+    sizes = [int(a) for a in sys.argv[1:]] or [1, 10, 100]
+    for items in sizes:
+        number = max(5, 2000 // items)
+        print(f"\n{items} items por documento")
+        print(f"{'Tipo':<6}{'generated/s':>12}{'direct/s':>10}{'x':>7}{'pico py gen':>13}{'pico py dir':>13}{'nodos lxml':>12}")
+        for tipo in TIPOS:
+            payload = make_payload(tipo, items)
+            g = _docs_per_second(payload, 'generated', number)
+            d = _docs_per_second(payload, 'direct', number)
+            builder = ECFBuilderFactory.get_builder(payload, 'generated')
+            nodes = sum(1 for _ in builder.build().iter())
+            pg = _python_bytes(payload, 'generated')
+            pd = _python_bytes(payload, 'direct')
+            print(f"{tipo:<6}{g:>12.0f}{d:>10.0f}{d / g:>7.2f}{pg / 1024:>11.1f}KB{pd / 1024:>11.1f}KB{nodes:>12}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
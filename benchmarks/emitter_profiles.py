@@ -0,0 +1,195 @@
+"""
+Perfiles de emisor (app/services/emitter_profiles.py): coherencia, invalidación y ahorro.
+
+1. Para cada TipoeCF, backend ('manual', 'generated', 'direct') y formato, el
+   documento armado desde el payload con solo RNCEmisor y el perfil registrado
+   tiene los mismos bytes que el armado con el Emisor completo. Con 3 líneas y
+   con 250 (Paginacion automática, que arma el documento por partes).
+2. Invalidación: tras PUT /ecf/emisores/<rnc> el siguiente documento del mismo
+   proceso ya sale con el perfil nuevo; si lo cambia otro proceso, se nota en
+   a lo sumo ECF_PROFILES_CHECK_INTERVAL segundos.
+3. Tamaño del payload y costo por documento con y sin perfil: solo el build
+   y /ecf/ecf completo en el cliente de pruebas de Flask (backend 'direct',
+   compacto), con los payloads de benchmarks.payloads.
+
+Uso: python -m benchmarks.emitter_profiles [peticiones]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import tempfile
+import multiprocessing
+from app import create_app
+from app.services.emitter_profiles import emitter_profiles
+from app.services.xml_generation.base_builder import BaseECFBuilder
+from app.services.xml_generation.manager import ECFBuilderManager
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.rfce import _BenchConfig, requests_per_second
+from benchmarks.suite import _percentile
+
+RNC = '101010101'
+PROFILE = {
+    "RNCEmisor": RNC,
+    "RazonSocialEmisor": "Distribuidora Emisor Test, S.R.L.",
+    "NombreComercial": "Emisor Test & Asociados",
+    "Sucursal": "Principal",
+    "DireccionEmisor": "Av. Winston Churchill No. 1099, Torre Empresarial, Piso 8",
+    "Municipio": "010101",
+    "Provincia": "010000",
+    "TablaTelefonoEmisor": ["809-555-0101", "809-555-0102", "829-555-0103"],
+    "CorreoEmisor": "facturacion@emisortest.com.do",
+    "WebSite": "www.emisortest.com.do",
+    "ActividadEconomica": "Venta al por mayor de productos alimenticios",
+}
+# Lo que sigue mandando cada documento
+OWN = {"FechaEmision": "2023-10-27", "NumeroFacturaInterna": "FI-000123"}
+
+
+def payloads(tipo, items):
+    """(completo, con perfil) del mismo documento."""
+    full = make_payload(tipo, items=items, optional=True)
+    full['FechaHoraFirma'] = '01-01-2024 12:00:00'
+    full['Encabezado']['Emisor'] = dict(PROFILE, **OWN)
+    slim = copy.deepcopy(full)
+    slim['Encabezado']['Emisor'] = dict(OWN, RNCEmisor=RNC)
+    return full, slim
+
+
+def _xml(data, backend, pretty, profile=None):
+    builder = ECFBuilderManager.get_builder(copy.deepcopy(data), backend, profile)
+    builder.pretty = pretty
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+def coherence():
+    failures = []
+    cases = 0
+    BaseECFBuilder.lines_per_page = 100
+    try:
+        for tipo in TIPOS:
+            for items in (3, 250):
+                full, slim = payloads(tipo, items)
+                profile = emitter_profiles.apply(slim)
+                if profile is None or slim != full:
+                    failures.append(f"{tipo}: apply() no completa el Emisor con el perfil")
+                    continue
+                for backend in ('manual', 'generated', 'direct'):
+                    for pretty in (True, False):
+                        cases += 1
+                        if _xml(full, backend, pretty) != _xml(slim, backend, pretty, profile):
+                            failures.append(f"{tipo} {backend} {'indentado' if pretty else 'compacto'} "
+                                            f"{items} líneas: el documento con perfil no es el mismo")
+    finally:
+        BaseECFBuilder.lines_per_page = 0
+    print(f"coherencia: {cases} casos ({len(TIPOS)} tipos x 3 backends x 2 formatos x 2 tamaños), "
+          f"{len(failures)} fallas")
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    return not failures
+
+
+def _rename(path, name):
+    emitter_profiles.configure(path)
+    emitter_profiles.put(RNC, dict(PROFILE, RazonSocialEmisor=name))
+
+
+def invalidation(client, path):
+    failures = []
+    slim = payloads(31, 1)[1]
+
+    def razon_social():
+        body = client.post('/ecf/ecf', json=copy.deepcopy(slim)).data.decode('utf-8')
+        return body.split('<RazonSocialEmisor>')[1].split('<')[0]
+
+    client.put(f'/ecf/emisores/{RNC}', json=dict(PROFILE, RazonSocialEmisor="Nombre A"))
+    razon_social()
+    client.put(f'/ecf/emisores/{RNC}', json=dict(PROFILE, RazonSocialEmisor="Nombre B"))
+    if razon_social() != "Nombre B":
+        failures.append("el mismo proceso sigue usando el perfil anterior después del PUT")
+
+    interval = emitter_profiles.check_interval
+    ctx = multiprocessing.get_context('spawn')
+    proc = ctx.Process(target=_rename, args=(path, "Nombre C"))
+    proc.start()
+    proc.join()
+    changed = time.perf_counter()
+    while razon_social() != "Nombre C":
+        if time.perf_counter() - changed > interval + 1:
+            failures.append("el cambio de otro proceso no se notó")
+            break
+        time.sleep(0.01)
+    seen = time.perf_counter() - changed
+    print(f"\ninvalidación: mismo proceso en el acto; otro proceso en {seen:.2f} s "
+          f"(intervalo {interval:.1f} s), {len(failures)} fallas")
+    for failure in failures:
+        print(f"  {failure}")
+    client.put(f'/ecf/emisores/{RNC}', json=PROFILE)
+    return not failures
+
+
+def build_cost(backend, data, profile, repeat):
+    times = []
+    for _ in range(repeat):
+        builder = ECFBuilderManager.get_builder(data, backend, profile)
+        builder.pretty = False
+        start = time.perf_counter()
+        builder.build()
+        builder.get_xml_bytes()
+        times.append(time.perf_counter() - start)
+    return _percentile(times, 50)
+
+
+def savings(client, count):
+    print(f"\npayload y costo por documento, 1 línea, compacto ({os.cpu_count()} CPU)")
+    print(f"{'tipo':<6}{'JSON completo':>15}{'con perfil':>12}{'ahorro':>9}")
+    for tipo in (31, 32, 41, 47):
+        full, slim = payloads(tipo, 1)
+        full_size, slim_size = len(json.dumps(full)), len(json.dumps(slim))
+        print(f"{tipo:<6}{full_size:>13} B{slim_size:>10} B{1 - slim_size / full_size:>8.0%}")
+
+    full, slim = payloads(31, 1)
+    merged = copy.deepcopy(slim)
+    profile = emitter_profiles.apply(merged)
+    print(f"\nbuild del e-CF 31 (p50 de {count}), µs/doc")
+    print(f"{'backend':<11}{'Emisor completo':>17}{'perfil':>9}")
+    for backend in ('manual', 'generated', 'direct'):
+        without = build_cost(backend, full, None, count)
+        with_profile = build_cost(backend, merged, profile, count)
+        print(f"{backend:<11}{without * 1e6:>17.1f}{with_profile * 1e6:>9.1f}")
+
+    print(f"\n/ecf/ecf, {count} peticiones por caso, cliente de pruebas de Flask")
+    print(f"{'payload':<16}{'req/s':>8}{'p50 µs':>9}{'p99 µs':>9}")
+    for label, data in (('Emisor completo', full), ('perfil', slim)):
+        rate, p50, p99 = requests_per_second(client, '/ecf/ecf', [json.dumps(data)] * count)
+        print(f"{label:<16}{rate:>8.0f}{p50 * 1e6:>9.0f}{p99 * 1e6:>9.0f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'perfiles.sqlite3')
+
+    class BenchConfig(_BenchConfig):
+        ECF_PROFILES_DB = path
+        ECF_PROFILES_CHECK_INTERVAL = 0.5
+
+    try:
+        client = create_app(BenchConfig).test_client()
+        response = client.put(f'/ecf/emisores/{RNC}', json=PROFILE)
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"PUT /ecf/emisores/{RNC}: {response.status_code} {response.data[:300]!r}")
+        ok = coherence()
+        ok = invalidation(client, path) and ok
+        savings(client, count)
+    finally:
+        shutil.rmtree(workdir)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
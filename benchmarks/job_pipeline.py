@@ -0,0 +1,93 @@
+"""
+Pipeline asíncrono de punta a punta contra el sustituto local de la DGII.
+
+Levanta el sustituto (con latencia y fallos 503 inyectados), encola N
+documentos por /ecf/ecf?async=1, corre los workers en este mismo proceso y
+espera a que todos los trabajos terminen. Reporta la latencia HTTP de encolar
+(p50/p99), el tiempo total y el estado final de los trabajos.
+
+Uso: python -m benchmarks.job_pipeline [documentos] [latencia_s] [tasa_fallos]
+"""
+import sys
+import time
+import tempfile
+import threading
+import os
+import logging
+from collections import Counter
+from werkzeug.serving import make_server
+from app import create_app
+from config import Config
+from app.tasks.queue import job_queue, FINAL_STATUSES
+from app.tasks.worker import worker_from_config
+from app.tasks.dgii_standin import create_standin_app
+from benchmarks.certs import write_self_signed_p12
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.suite import _percentile
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    failure_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    standin_app = create_standin_app(latency, failure_rate, reject_rate=0.05, seed=1)
+    standin = make_server('127.0.0.1', 0, standin_app, threaded=True)
+    threading.Thread(target=standin.serve_forever, daemon=True).start()
+    workdir = tempfile.mkdtemp()
+    write_self_signed_p12(os.path.join(workdir, 'certs'), '101010101', 'prueba')
+
+    class BenchConfig(Config):
+        ECF_ASYNC_MODE = 'always'
+        # Los builders generados cubren el XSD completo, así pasan la etapa validate
+        ECF_BUILDER_BACKEND = 'generated'
+        ECF_TASKS_DB = os.path.join(workdir, 'tasks.sqlite3')
+        ECF_CERTS_DIR = os.path.join(workdir, 'certs')
+        ECF_CERT_PASSWORD = 'prueba'
+        ECF_METRICS_DIR = os.path.join(workdir, 'metrics')
+        ECF_IDEMPOTENCY_DB = os.path.join(workdir, 'idempotency.sqlite3')
+        DGII_BASE_URL = f"http://127.0.0.1:{standin.server_port}"
+        ECF_TASKS_POLL_INTERVAL = 0.05
+        ECF_TASKS_BACKOFF_BASE = 0.05
+        ECF_TASKS_BACKOFF_MAX = 1.0
+
+    app = create_app(BenchConfig)
+    client = app.test_client()
+    worker = worker_from_config(app.config)
+
+    samples, job_ids = [], []
+    start = time.perf_counter()
+    for n in range(count):
+        payload = make_payload(TIPOS[n % len(TIPOS)], items=5, seq=n + 1)
+        t0 = time.perf_counter()
+        response = client.post('/ecf/ecf', json=payload)
+        samples.append(time.perf_counter() - t0)
+        assert response.status_code == 202, response.data
+        job_ids.append(response.get_json()['job_id'])
+    enqueued = time.perf_counter() - start
+
+    worker.start()
+    pending = set(job_ids)
+    while pending:
+        time.sleep(0.05)
+        pending = {job_id for job_id in pending if job_queue.get(job_id)['status'] not in FINAL_STATUSES}
+    elapsed = time.perf_counter() - start
+    worker.stop(timeout=1)
+    standin.shutdown()
+
+    statuses = Counter(job_queue.get(job_id)['status'] for job_id in job_ids)
+    errors = Counter(job_queue.get(job_id)['error'] for job_id in job_ids if job_queue.get(job_id)['status'] == 'failed')
+    print(f"documentos: {count}  latencia DGII: {latency * 1000:.0f} ms  fallos 503: {failure_rate:.0%}")
+    print(f"encolar: p50 {_percentile(samples, 50) * 1000:.2f} ms  p99 {_percentile(samples, 99) * 1000:.2f} ms"
+          f"  ({count / enqueued:.0f} docs/s)")
+    print(f"pipeline completo: {elapsed:.2f} s ({count / elapsed:.0f} docs/s)")
+    print(f"estados finales: {dict(statuses)}")
+    signed = sum(1 for doc in standin_app.config['DGII_RECEIVED'].values() if doc['signed'])
+    print(f"recibidos por la DGII local: {len(standin_app.config['DGII_RECEIVED'])} ({signed} firmados)")
+    for error, n in errors.most_common(5):
+        print(f"  {n} x {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Prueba de carga local: una mezcla de documentos contra run:app, para reproducir
+la carga de producción antes de una versión.
+
+La mezcla (--mix) es una lista de tipo[:líneas]=peso separada por comas:
+
+  31:5=4      e-CF 31 de 5 líneas, peso 4   -> /ecf/ecf   (benchmarks.payloads.make_payload)
+  rfce:3=2    RFCE de 3 líneas              -> /ecf/rfce  (benchmarks.rfce.receipt)
+  arecf=1     acuse de recibo               -> /ecf/arecf (benchmarks.receipts.outcome)
+  acecf=1     aprobación comercial          -> /ecf/acecf (benchmarks.receipts.outcome)
+
+Los cuerpos salen de las mismas fábricas que usan los benchmarks de los
+builders y se arman antes de empezar (--variants por entrada, cada uno con su
+eNCF), así el cliente no compite por CPU con el servidor armando JSON.
+
+Modos:
+  closed -> --clients clientes; cada uno manda la siguiente petición cuando
+            recibe la respuesta de la anterior.
+  open   -> --rate llegadas por segundo a intervalos fijos (o exponenciales con
+            --poisson), sin esperar las respuestas. La latencia se cuenta desde
+            el momento en que tocaba enviar: si el servidor se atrasa, la espera
+            se ve en los percentiles en vez de bajar el ritmo. Con --max-inflight
+            peticiones en curso, las llegadas siguientes se descartan y se
+            cuentan como error.
+
+Contra un servidor que ya corre, --url; si no, levanta gunicorn con
+gunicorn.conf.py (--serve sync|threaded, --env VAR=valor para el resto). Con
+--pipeline levanta también el sustituto de la DGII (app/tasks/dgii_standin.py,
+con --dgii-latency, --dgii-jitter, --dgii-failure-rate...) y un proceso de
+workers, con ECF_ASYNC_MODE=always: /ecf/ecf encola y al final se espera
+(--drain) a que los trabajos terminen. Las respuestas 202 con job_id se siguen
+también contra --url.
+
+Reporte por entrada de la mezcla (TipoeCF y tamaño): peticiones por segundo
+respondidas con 2xx, latencia p50/p95/p99 de esas respuestas y tasa de
+errores con sus causas; con trabajos, el estado final y el tiempo de punta a
+punta (de encolado a estado final). --json guarda lo mismo en un archivo.
+
+Uso: python -m benchmarks.loadtest --mix 31:5=4,32:1=4,rfce:3=2 --mode open --rate 50 --duration 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import make_server
+from app.tasks.dgii_standin import create_standin_app
+from app.tasks.queue import FINAL_STATUSES
+from benchmarks.certs import write_self_signed_p12
+from benchmarks.cold_start import ROOT
+from benchmarks.payloads import make_payload
+from benchmarks.receipts import COMPRADOR, outcome
+from benchmarks.rfce import receipt
+from benchmarks.serving import start_server, stop_server
+from benchmarks.suite import _percentile
+
+DOCUMENTS = ('rfce', 'arecf', 'acecf')
+DEFAULT_MIX = '31:5=3,32:1=4,32:50=1,34:3=1,rfce:3=2,arecf=1'
+EMISOR = '101010101'
+
+
+class Entry:
+    """Una entrada de la mezcla con sus cuerpos ya armados."""
+    def __init__(self, kind, lines, weight):
+        self.kind = kind
+        self.lines = lines
+        self.weight = weight
+        self.label = f"{kind}:{lines}" if lines else kind
+        self.path = '/ecf/ecf' if kind.isdigit() else f'/ecf/{kind}'
+        self.bodies = []
+
+    def generate(self, rng, variants):
+        for n in range(variants):
+            if self.kind == 'rfce':
+                data = receipt(rng, self.lines)
+            elif self.kind in ('arecf', 'acecf'):
+                data = dict(outcome(rng, self.kind.upper(), n), RNCComprador=COMPRADOR)
+            else:
+                data = make_payload(int(self.kind), items=self.lines, seq=rng.randrange(1, 10 ** 10))
+            self.bodies.append(json.dumps(data).encode('utf-8'))
+
+
+def parse_mix(value):
+    """'31:5=3,rfce=1' -> [Entry]; las líneas por omisión son 1 (3 en el RFCE) y los acuses no llevan."""
+    entries = []
+    for part in value.split(','):
+        spec, _, weight = part.strip().partition('=')
+        kind, _, lines = spec.strip().lower().partition(':')
+        if not (kind.isdigit() or kind in DOCUMENTS):
+            raise ValueError(f"Tipo desconocido en la mezcla: {kind}")
+        if kind in ('arecf', 'acecf'):
+            lines = 0
+        else:
+            lines = int(lines or (3 if kind == 'rfce' else 1))
+        entries.append(Entry(kind, lines, float(weight or 1)))
+    return entries
+
+
+class Target:
+    def __init__(self, url, query, timeout):
+        parts = urlsplit(url)
+        self.https = parts.scheme == 'https'
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+        self.query = query
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        """(estado, cuerpo) de una petición en una conexión nueva, como un POS."""
+        factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        conn = factory(self.host, self.port, timeout=self.timeout)
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            conn.close()
+
+    def send(self, entry, rng):
+        path = entry.path + (f"?{self.query}" if self.query else '')
+        return self.request('POST', path, rng.choice(entry.bodies))
+
+
+class Results:
+    def __init__(self, entries, measure_from):
+        self.measure_from = measure_from
+        self.latencies = {entry.label: [] for entry in entries}
+        self.sent = Counter()
+        self.errors = {entry.label: Counter() for entry in entries}
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, scheduled, elapsed, status, body=b''):
+        # Lo que tocaba enviar durante el calentamiento no cuenta
+        if scheduled < self.measure_from:
+            return
+        with self._lock:
+            self.sent[label] += 1
+            if isinstance(status, int) and 200 <= status < 300:
+                self.latencies[label].append(elapsed)
+                if status == 202:
+                    try:
+                        self.jobs[json.loads(body)['job_id']] = label
+                    except (ValueError, KeyError, TypeError):
+                        pass
+            else:
+                self.errors[label][str(status)] += 1
+
+
+def _fire(target, entry, rng, scheduled, results):
+    try:
+        status, body = target.send(entry, rng)
+    except (OSError, http.client.HTTPException) as e:
+        status, body = type(e).__name__, b''
+    results.record(entry.label, scheduled, time.perf_counter() - scheduled, status, body)
+
+
+def closed_loop(target, entries, clients, seconds, seed, results):
+    deadline = time.perf_counter() + seconds
+    weights = [entry.weight for entry in entries]
+
+    def client(n):
+        rng = random.Random(seed + n)
+        while time.perf_counter() < deadline:
+            entry = rng.choices(entries, weights)[0]
+            _fire(target, entry, rng, time.perf_counter(), results)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def open_loop(target, entries, rate, seconds, poisson, max_inflight, seed, results):
+    rng = random.Random(seed)
+    weights = [entry.weight for entry in entries]
+    slots = threading.BoundedSemaphore(max_inflight)
+    local = threading.local()
+
+    def fire(entry, scheduled):
+        # random.Random no es seguro entre hilos: uno por hilo del pool
+        if not hasattr(local, 'rng'):
+            local.rng = random.Random(rng.random())
+        try:
+            _fire(target, entry, local.rng, scheduled, results)
+        finally:
+            slots.release()
+
+    start = time.perf_counter()
+    due = start
+    with ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix='loadtest') as pool:
+        while due < start + seconds:
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            entry = rng.choices(entries, weights)[0]
+            if slots.acquire(blocking=False):
+                pool.submit(fire, entry, due)
+            else:
+                results.record(entry.label, due, 0.0, 'descartada')
+            due += rng.expovariate(rate) if poisson else 1 / rate
+
+
+def drain(target, results, timeout):
+    """Espera el estado final de los trabajos encolados; {job_id: trabajo}."""
+    pending = dict(results.jobs)
+    finished = {}
+    deadline = time.perf_counter() + timeout
+    while pending and time.perf_counter() < deadline:
+        for job_id in list(pending):
+            try:
+                status, body = target.request('GET', f'/ecf/jobs/{job_id}')
+            except (OSError, http.client.HTTPException):
+                continue
+            job = json.loads(body) if status == 200 else None
+            if job and job['status'] in FINAL_STATUSES:
+                finished[job_id] = job
+                del pending[job_id]
+        if pending:
+            time.sleep(0.2)
+    return finished, len(pending)
+
+
+def report(entries, results, seconds, finished, unfinished):
+    summary = {}
+    print(f"{'entrada':<12}{'enviadas':>9}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}")
+    rows = [(entry.label, [entry.label]) for entry in entries] + [('total', [entry.label for entry in entries])]
+    for name, labels in rows:
+        ok = [t for label in labels for t in results.latencies[label]]
+        sent = sum(results.sent[label] for label in labels)
+        errors = sum((results.errors[label] for label in labels), Counter())
+        p50, p95, p99 = (_percentile(ok, q) * 1000 if ok else float('nan') for q in (50, 95, 99))
+        error_rate = sum(errors.values()) / max(sent, 1)
+        kinds = ', '.join(f"{kind} x{n}" for kind, n in errors.most_common(3))
+        print(f"{name:<12}{sent:>9}{len(ok) / seconds:>8.1f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{error_rate:>8.1%}"
+              + (f"  ({kinds})" if kinds else ""))
+        summary[name] = {"enviadas": sent, "req_s": len(ok) / seconds, "p50_ms": p50, "p95_ms": p95,
+                         "p99_ms": p99, "errores": error_rate, "causas": dict(errors)}
+
+    if results.jobs:
+        print(f"\ntrabajos: {len(results.jobs)} encolados, {unfinished} sin terminar al vencer --drain")
+        print(f"{'entrada':<12}{'done':>7}{'rejected':>10}{'failed':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}")
+        for entry in entries:
+            jobs = [job for job_id, job in finished.items() if results.jobs[job_id] == entry.label]
+            if not jobs:
+                continue
+            statuses = Counter(job['status'] for job in jobs)
+            total = [job['updated'] - job['created'] for job in jobs]
+            p50, p95, p99 = (_percentile(total, q) for q in (50, 95, 99))
+            print(f"{entry.label:<12}{statuses['done']:>7}{statuses['rejected']:>10}{statuses['failed']:>8}"
+                  f"{p50:>8.2f}{p95:>8.2f}{p99:>8.2f}")
+            summary[entry.label]["trabajos"] = dict(statuses, p50_s=p50, p95_s=p95, p99_s=p99)
+        failures = Counter(job['error'] for job in finished.values() if job['status'] == 'failed')
+        for error, n in failures.most_common(3):
+            print(f"  {n} x {error}")
+    return summary
+
+
+def start_standin(args):
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app = create_standin_app(args.dgii_latency, args.dgii_failure_rate, args.dgii_reject_rate, seed=args.seed,
+                             jitter=args.dgii_jitter, stall_rate=args.dgii_stall_rate, stall=args.dgii_stall,
+                             throttle_rate=args.dgii_throttle_rate)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return app, server
+
+
+def pipeline_env(workdir, standin_port):
+    write_self_signed_p12(os.path.join(workdir, 'certs'), EMISOR, 'prueba')
+    return {
+        'ECF_ASYNC_MODE': 'always',
+        # Los builders generados cubren el XSD completo, así pasan la etapa validate
+        'ECF_BUILDER_BACKEND': 'generated',
+        'ECF_TASKS_DB': os.path.join(workdir, 'tasks.sqlite3'),
+        'ECF_CERTS_DIR': os.path.join(workdir, 'certs'),
+        'ECF_CERT_PASSWORD': 'prueba',
+        'DGII_BASE_URL': f"http://127.0.0.1:{standin_port}",
+        'ECF_TASKS_POLL_INTERVAL': '0.05',
+        'ECF_TASKS_BACKOFF_BASE': '0.05',
+        'ECF_TASKS_BACKOFF_MAX': '1.0',
+    }
+
+
+def start_worker(workdir, env):
+    env = dict(os.environ, FLASK_CONFIG='prod', ECF_LOG_ENABLED='0',
+               ECF_METRICS_DIR=os.path.join(workdir, 'metrics'), **env)
+    return subprocess.Popen([sys.executable, '-m', 'app.tasks.worker'], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga local con una mezcla de documentos")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="tipo[:líneas]=peso,... (tipos: 31..47, rfce, arecf, acecf)")
+    parser.add_argument("--mode", choices=('open', 'closed'), default='closed')
+    parser.add_argument("--clients", type=int, default=8, help="Clientes en el modo closed")
+    parser.add_argument("--rate", type=float, default=50.0, help="Llegadas por segundo en el modo open")
+    parser.add_argument("--poisson", action="store_true", help="Llegadas exponenciales en vez de a intervalos fijos")
+    parser.add_argument("--max-inflight", type=int, default=256, help="Peticiones en curso como máximo (open)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos medidos")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Segundos iniciales que no se cuentan")
+    parser.add_argument("--variants", type=int, default=32, help="Cuerpos distintos por entrada de la mezcla")
+    parser.add_argument("--query", default="format=compact", help="Query string de cada petición")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por petición")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Archivo donde guardar el resumen")
+    parser.add_argument("--url", help="Servidor que ya corre, p. ej. http://127.0.0.1:8000")
+    parser.add_argument("--serve", choices=('sync', 'threaded'), default='sync',
+                        help="Sin --url: modo de gunicorn (ECF_SERVER_MODE)")
+    parser.add_argument("--env", action="append", default=[], help="Sin --url: VAR=valor para gunicorn")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Sin --url: async con workers y el sustituto de la DGII")
+    parser.add_argument("--drain", type=float, default=60.0, help="Segundos de espera por los trabajos")
+    parser.add_argument("--dgii-latency", type=float, default=0.05)
+    parser.add_argument("--dgii-jitter", type=float, default=0.02)
+    parser.add_argument("--dgii-stall-rate", type=float, default=0.0)
+    parser.add_argument("--dgii-stall", type=float, default=0.0)
+    parser.add_argument("--dgii-failure-rate", type=float, default=0.05)
+    parser.add_argument("--dgii-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--dgii-reject-rate", type=float, default=0.02)
+    args = parser.parse_args(argv)
+    if args.pipeline and args.url:
+        parser.error("--pipeline levanta su propio servidor: no va con --url "
+                     "(contra un servidor propio, python -m app.tasks.dgii_standin)")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    entries = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    for entry in entries:
+        entry.generate(rng, args.variants)
+
+    workdir = tempfile.mkdtemp()
+    server = worker = standin = standin_app = None
+    try:
+        url = args.url
+        if not url:
+            overrides = dict(item.split('=', 1) for item in args.env)
+            if args.pipeline:
+                standin_app, standin = start_standin(args)
+                env = pipeline_env(workdir, standin.server_port)
+                overrides = dict(env, **overrides)
+                worker = start_worker(workdir, env)
+            server, port = start_server(args.serve, workdir, **overrides)
+            url = f"http://127.0.0.1:{port}"
+        target = Target(url, args.query, args.timeout)
+
+        mix = ', '.join(f"{entry.label}={entry.weight:g}" for entry in entries)
+        load = (f"{args.clients} clientes" if args.mode == 'closed'
+                else f"{args.rate:g} llegadas/s {'exponenciales' if args.poisson else 'fijas'}")
+        print(f"{url}  mezcla {mix}  modo {args.mode}, {load}, {args.duration:g} s (+{args.warmup:g} s de "
+              f"calentamiento), {os.cpu_count()} CPU")
+        total = args.warmup + args.duration
+        results = Results(entries, time.perf_counter() + args.warmup)
+        if args.mode == 'closed':
+            closed_loop(target, entries, args.clients, total, args.seed, results)
+        else:
+            open_loop(target, entries, args.rate, total, args.poisson, args.max_inflight, args.seed, results)
+
+        finished, unfinished = drain(target, results, args.drain) if results.jobs else ({}, 0)
+        summary = report(entries, results, args.duration, finished, unfinished)
+        if standin_app is not None:
+            stats = dict(standin_app.config['DGII_STATS'], recibidos=len(standin_app.config['DGII_RECEIVED']))
+            print(f"\nDGII local: {json.dumps(stats, ensure_ascii=False)}")
+            summary['dgii'] = stats
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+    finally:
+        if server is not None:
+            stop_server(server)
+        if worker is not None:
+            worker.send_signal(signal.SIGINT)
+            try:
+                worker.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                worker.kill()
+        if standin is not None:
+            standin.shutdown()
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
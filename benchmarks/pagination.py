@@ -0,0 +1,152 @@
+"""
+Paginacion automática: coherencia de las páginas y costo sobre documentos grandes.
+
+1. Para cada TipoeCF y backend, con líneas de todos los IndicadorFacturacion:
+     - árbol y streaming dan los mismos bytes, y 'generated' y 'direct' también,
+     - TotalPaginas = cantidad de <Pagina>, y los rangos NoLineaDesde-NoLineaHasta
+       cubren todas las líneas sin huecos,
+     - la suma de los subtotales de las páginas es la de los MontoItem del XML
+       (gravado por tasa, exento, no facturable) calculada aparte.
+2. Tiempo y memoria pico del streaming ('direct', compacto) con y sin
+   Paginacion, según crece la cantidad de líneas. Cada medición corre en un
+   proceso nuevo para que ru_maxrss no arrastre la anterior.
+
+Uso: python -m benchmarks.pagination [líneas_por_página]
+"""
+import sys
+import copy
+import time
+import resource
+import multiprocessing
+from datetime import datetime
+from decimal import Decimal
+from lxml import etree
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_generation.pagination import page_fields
+import app.services.xml_generation.base_builder as base_builder
+from benchmarks.payloads import TIPOS, make_payload
+
+SIZES = [1000, 10000, 100000, 500000]
+INDICADORES = [1, 1, 2, 3, 4, 0]
+
+
+class _FixedDatetime(datetime):
+    # FechaHoraFirma fija para poder comparar bytes entre modos
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _payload(tipo, lines):
+    data = make_payload(tipo, items=1, seq=1)
+    data['FechaHoraFirma'] = '01-01-2024 12:00:00'  # los módulos generados no usan base_builder.datetime
+    item = data['DetallesItems'][0]
+    data['DetallesItems'] = [dict(item, NumeroLinea=n + 1, IndicadorFacturacion=INDICADORES[n % len(INDICADORES)],
+                                  MontoItem=round(100 + n * 0.37, 2)) for n in range(lines)]
+    return data
+
+
+def _xml(data, backend, pretty, stream):
+    builder = ECFBuilderManager.get_builder(copy.deepcopy(data), backend)
+    builder.pretty = pretty
+    if stream:
+        return b"".join(builder.iter_xml_bytes())
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+def _cents(text):
+    return int(Decimal(text) * 100)
+
+
+def check_type(tipo, lines, failures):
+    data = _payload(tipo, lines)
+    outputs = {}
+    for backend in ('manual', 'generated', 'direct'):
+        for pretty in (True, False):
+            tree = _xml(data, backend, pretty, False)
+            if tree != _xml(data, backend, pretty, True):
+                failures.append(f"{tipo} {backend}: árbol y streaming no coinciden")
+            outputs[backend, pretty] = tree
+    for pretty in (True, False):
+        if outputs['generated', pretty] != outputs['direct', pretty]:
+            failures.append(f"{tipo}: 'generated' y 'direct' no coinciden")
+
+    root = etree.fromstring(outputs['direct', False])
+    pages = root.findall('Paginacion/Pagina')
+    if int(root.findtext('Encabezado/IdDoc/TotalPaginas') or 0) != len(pages):
+        failures.append(f"{tipo}: TotalPaginas no es la cantidad de páginas")
+    covered = [n for p in pages for n in range(int(p.findtext('NoLineaDesde')), int(p.findtext('NoLineaHasta')) + 1)]
+    if covered != list(range(1, lines + 1)):
+        failures.append(f"{tipo}: las páginas no cubren las líneas 1-{lines}")
+
+    # Lo que deberían sumar las páginas, desde los MontoItem del XML
+    expected = {}
+    for item in root.iterfind('DetallesItems/Item'):
+        indicador = int(item.findtext('IndicadorFacturacion'))
+        expected[indicador] = expected.get(indicador, 0) + _cents(item.findtext('MontoItem'))
+    fields = page_fields(tipo)
+    for field, indicadores in (('SubtotalMontoGravado1Pagina', (1,)), ('SubtotalMontoGravado2Pagina', (2,)),
+                               ('SubtotalMontoGravado3Pagina', (3,)), ('SubtotalMontoGravadoPagina', (1, 2, 3)),
+                               ('SubtotalExentoPagina', (4,)), ('SubtotalMontoNoFacturablePagina', (0,))):
+        if field in fields:
+            total = sum(_cents(p.findtext(field) or '0') for p in pages)
+            if total != sum(expected.get(n, 0) for n in indicadores):
+                failures.append(f"{tipo}: la suma de {field} no es la de sus líneas")
+    montos = sum(_cents(p.findtext('MontoSubtotalPagina')) for p in pages)
+    itbis = sum(_cents(p.findtext('SubtotalItbisPagina') or '0') for p in pages)
+    if 'SubtotalItbisPagina' in fields and montos != sum(expected.get(n, 0) for n in (1, 2, 3, 4)) + itbis:
+        failures.append(f"{tipo}: MontoSubtotalPagina no es gravado + exento + ITBIS")
+
+
+def _measure(lines, lines_per_page, queue):
+    base_builder.BaseECFBuilder.lines_per_page = lines_per_page
+    data = _payload(31, lines)
+    page_fields(31)  # reglas del XSD cargadas antes de medir, como tras el calentamiento
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    builder = ECFBuilderManager.get_builder(data, 'direct')
+    builder.pretty = False
+    size = sum(len(chunk) for chunk in builder.iter_xml_bytes())
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((size, elapsed, (after - before) / 1024))
+
+
+def measure(lines, lines_per_page):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(lines, lines_per_page, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    lines_per_page = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    base_builder.BaseECFBuilder.lines_per_page = lines_per_page
+    base_builder.datetime = _FixedDatetime
+    failures = []
+    for tipo in TIPOS:
+        for lines in (lines_per_page + 1, lines_per_page * 7 - 3):
+            check_type(tipo, lines, failures)
+    base_builder.datetime = datetime
+    print(f"coherencia ({lines_per_page} líneas por página, {len(TIPOS)} tipos x 3 backends): "
+          f"{len(failures)} fallas")
+    for failure in failures[:20]:
+        print(f"  {failure}")
+
+    print(f"\n{'líneas':>8}{'páginas':>9}{'sin pág. ms':>13}{'con pág. ms':>13}{'+%':>7}"
+          f"{'sin pág. +MB':>14}{'con pág. +MB':>14}")
+    for lines in SIZES:
+        _, plain, plain_mb = measure(lines, 0)
+        _, paged, paged_mb = measure(lines, lines_per_page)
+        print(f"{lines:>8}{-(-lines // lines_per_page):>9}{plain * 1000:>13.0f}{paged * 1000:>13.0f}"
+              f"{(paged / plain - 1) * 100:>7.1f}{plain_mb:>14.1f}{paged_mb:>14.1f}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
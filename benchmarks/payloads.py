@@ -0,0 +1,99 @@
+"""
+Payloads sintéticos por TipoeCF, a partir de verify_builders.get_base_mock_data.
+
+Los ajustes por tipo son los mínimos para que tanto los builders escritos a
+mano como los generados desde el XSD acepten el documento.
+"""
+import copy
+from verify_builders import get_base_mock_data
+
+TIPOS = [31, 32, 33, 34, 41, 43, 44, 45, 46, 47]
+
+
+def make_payload(tipo, items=1, seq=1, optional=False):
+    """
+    Documento de `items` líneas. Con optional=True agrega los bloques opcionales
+    Subtotales, DescuentosORecargos, Paginacion (una página cada 100 líneas)
+    y OtraMonedaDetalle por línea; sin él se quita OtraMoneda.
+    """
+    data = get_base_mock_data(tipo, f"E{tipo}{seq:010d}")
+    encabezado = data['Encabezado']
+    id_doc = encabezado['IdDoc']
+
+    if tipo in (33, 34):
+        data['InformacionReferencia'] = {
+            "NCFModificado": "E310000000001",
+            "FechaNCFModificado": "2023-10-20",
+            "CodigoModificacion": 1,
+            "RazonModificacion": "Error en precio"
+        }
+    if tipo == 34:
+        id_doc['IndicadorNotaCredito'] = 0
+    # Los builders ignoran el campo en los tipos cuyo XSD no lo lleva (32)
+    id_doc['FechaVencimientoSecuencia'] = "2025-12-31"
+    if tipo == 47:
+        encabezado['Comprador'] = {
+            "IdentificadorExtranjero": "EXT123456",
+            "RazonSocialComprador": "Foreign Corp"
+        }
+        encabezado['Totales']['TotalISRRetencion'] = 10.00 * items
+
+    base_item = data['DetallesItems'][0]
+    base_item['IndicadorBienoServicio'] = 1
+    if tipo in (41, 47):
+        base_item['Retencion'] = {
+            "IndicadorAgenteRetencionoPercepcion": 1,
+            "MontoISRRetenido": 10.00
+        }
+
+    data['DetallesItems'] = []
+    for n in range(items):
+        item = copy.deepcopy(base_item)
+        item['NumeroLinea'] = n + 1
+        item['NombreItem'] = f"Item {n + 1}"
+        if optional:
+            item['OtraMonedaDetalle'] = {"PrecioOtraMoneda": 1.71, "MontoItemOtraMoneda": 1.71}
+        data['DetallesItems'].append(item)
+
+    if optional:
+        _add_optional_blocks(data, items)
+    else:
+        del encabezado['OtraMoneda']
+    return data
+
+
+def _add_optional_blocks(data, items):
+    monto = 100.00 * items
+    data['Subtotales'] = {"Subtotal": [{
+        "NumeroSubTotal": 1,
+        "DescripcionSubtotal": "Subtotal general",
+        "Orden": 1,
+        "SubTotalMontoGravadoTotal": monto,
+        "SubTotaITBIS": monto * 0.18,
+        "MontoSubTotal": monto * 1.18,
+        "Lineas": min(items, 99)
+    }]}
+    data['DescuentosORecargos'] = {"DescuentoORecargo": [{
+        "NumeroLinea": 1,
+        "TipoAjuste": "D",
+        "DescripcionDescuentooRecargo": "Descuento por volumen",
+        "TipoValor": "$",
+        "ValorDescuentooRecargo": 10.00,
+        "MontoDescuentooRecargo": 10.00,
+        "IndicadorFacturacionDescuentooRecargo": 1
+    }]}
+    per_page = 100
+    data['Paginacion'] = {"Pagina": [
+        {
+            "PaginaNo": page + 1,
+            "NoLineaDesde": start + 1,
+            "NoLineaHasta": min(start + per_page, items),
+            "SubtotalMontoGravadoPagina": 100.00 * (min(start + per_page, items) - start),
+            "MontoSubtotalPagina": 118.00 * (min(start + per_page, items) - start)
+        }
+        for page, start in enumerate(range(0, items, per_page))
+    ]}
+    data['Encabezado']['OtraMoneda'].update({
+        "MontoGravadoTotalOtraMoneda": round(monto / 58.5, 2),
+        "MontoTotalOtraMoneda": round(monto * 1.18 / 58.5, 2)
+    })
@@ -0,0 +1,122 @@
+"""
+Validación previa del JSON (payload_validator) frente a construir el e-CF.
+
+Por cada TipoeCF mide cuánto cuesta revisar el payload contra lo que cuesta
+build + serialize (backend generado). Después corre payloads con un campo
+dañado a propósito y comprueba:
+  - que la validación previa los rechaza a todos,
+  - que los válidos que pasan la validación previa también pasan el XSD
+    (en los tipos cuyo esquema compila en libxml2).
+
+Uso: python -m benchmarks.preflight [iteraciones] [items]
+"""
+import sys
+import copy
+import time
+from lxml import etree
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.schema_registry import schema_registry
+from app.services.payload_validator import payload_validator
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.suite import _percentile
+
+# (ruta, valor inválido) aplicados de a uno sobre un payload válido
+MUTATIONS = [
+    (('Encabezado', 'IdDoc', 'eNCF'), 'E32000001'),
+    (('Encabezado', 'IdDoc', 'TipoIngresos'), 9),
+    (('Encabezado', 'IdDoc', 'TipoPago'), 5),
+    (('Encabezado', 'Emisor', 'RNCEmisor'), '12345'),
+    (('Encabezado', 'Emisor', 'RazonSocialEmisor'), 'x' * 200),
+    (('Encabezado', 'Emisor', 'FechaEmision'), '2024-02-30'),
+    (('Encabezado', 'Totales', 'MontoTotal'), 'mil'),
+    (('Encabezado', 'Totales', 'MontoTotal'), 10 ** 17),
+    (('DetallesItems', 0, 'IndicadorFacturacion'), 7),
+    (('DetallesItems', 0, 'CantidadItem'), -1),
+    (('DetallesItems', 0, 'NombreItem'), None),
+    (('Encabezado', 'Emisor'), None),
+]
+
+
+def _in_schema(tipo, path):
+    rule = payload_validator.rules(tipo)
+    for key in path:
+        if isinstance(key, int):
+            continue
+        rule = rule.container if rule.container is not None else rule
+        rule = rule.by_name.get(key) if hasattr(rule, 'by_name') else None
+        if rule is None:
+            return False
+    return True
+
+
+def _mutate(payload, path, value):
+    target = payload
+    for key in path[:-1]:
+        target = target[key]
+    if path[-1] not in target and not isinstance(target, list):
+        return False
+    if value is None:
+        del target[path[-1]]
+    else:
+        target[path[-1]] = value
+    return True
+
+
+def _build(payload, backend='generated'):
+    builder = ECFBuilderFactory.get_builder(payload, backend=backend)
+    builder.build()
+    return builder.get_xml_string().encode('utf-8')
+
+
+def _timeit(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return _percentile(samples, 50) * 1e6, _percentile(samples, 99) * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    print(f"items por documento: {items}")
+    print("p50 en microsegundos; build = build + get_xml_string")
+    print(f"{'Tipo':<6}{'válido':>10}{'inválido':>10}{'generated':>11}{'manual':>10}")
+    for tipo in TIPOS:
+        payload = make_payload(tipo, items=items, optional=True)
+        assert payload_validator.validate(payload) == [], payload_validator.validate(payload)
+        bad = copy.deepcopy(payload)
+        bad['DetallesItems'][-1]['IndicadorFacturacion'] = 7
+        check = _timeit(lambda: payload_validator.validate(payload), iterations)
+        reject = _timeit(lambda: payload_validator.validate(bad), iterations)
+        generated = _timeit(lambda: _build(payload), iterations)
+        manual = _timeit(lambda: _build(payload, 'manual'), iterations)
+        print(f"{tipo:<6}{check[0]:>10.1f}{reject[0]:>10.1f}{generated[0]:>11.1f}{manual[0]:>10.1f}")
+
+    rejected = missed = xsd_checked = xsd_failed = 0
+    for tipo in TIPOS:
+        valid = make_payload(tipo, items=3, optional=True)
+        if schema_registry.get(tipo).error is None:
+            xsd_checked += 1
+            if schema_registry.validate(tipo, etree.fromstring(_build(valid))):
+                xsd_failed += 1
+        for path, value in MUTATIONS:
+            if not _in_schema(tipo, path):
+                continue  # p. ej. TipoIngresos no existe en los tipos 41, 43 y 47
+            payload = copy.deepcopy(valid)
+            if not _mutate(payload, path, value):
+                continue
+            if payload_validator.validate(payload):
+                rejected += 1
+            else:
+                missed += 1
+                print(f"  no detectado: tipo {tipo} {'.'.join(map(str, path))} = {value!r}")
+
+    print(f"payloads dañados rechazados: {rejected}, no detectados: {missed}")
+    print(f"válidos según preflight que fallan el XSD: {xsd_failed} de {xsd_checked} tipos con esquema")
+
+
+if __name__ == "__main__":
+    main()
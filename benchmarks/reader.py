@@ -0,0 +1,197 @@
+"""
+Lectura de e-CF recibidos (app/services/ecf_reader.py): ida y vuelta, memoria y ritmo.
+
+1. Ida y vuelta JSON -> XML -> JSON -> XML para cada TipoeCF, con y sin los
+   bloques opcionales, backends 'generated' y 'direct', indentado y compacto:
+     - el segundo XML tiene los mismos bytes que el primero,
+     - leer el segundo XML da el mismo JSON que leer el primero,
+     - el JSON leído pasa la validación previa del tipo.
+   Lo mismo para RFCE, ARECF y ACECF.
+2. Memoria pico al leer un documento de N líneas recorriendo items() contra
+   parsearlo completo con etree.parse. Cada medición corre en un proceso nuevo
+   para que ru_maxrss no arrastre la anterior.
+3. Un documento de ~80 KB leído desde bytes y desde un stream, y un
+   directorio con batch_builder.read_directory, en serie y con el pool.
+
+Uso: python -m benchmarks.reader [documentos_del_directorio]
+"""
+import io
+import os
+import sys
+import copy
+import time
+import random
+import shutil
+import resource
+import tempfile
+import multiprocessing
+from lxml import etree
+from app.services import batch_builder
+from app.services.ecf_reader import ecf_reader
+from app.services.payload_validator import payload_validator
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_generation.document_builders import DOCUMENT_BUILDERS
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.rfce import receipt
+from benchmarks.receipts import outcome, COMPRADOR
+
+SIZES = [1000, 10000, 100000]
+# La hora que el builder pone si no viene, fija para poder comparar bytes
+TIMESTAMPS = {'ARECF': 'FechaHoraAcuseRecibo', 'ACECF': 'FechaHoraAprobacionComercial'}
+
+
+def _payload(tipo, items, optional):
+    data = make_payload(tipo, items=items, seq=1, optional=optional)
+    data['FechaHoraFirma'] = '01-01-2024 12:00:00'
+    if optional:
+        # make_payload pone Lineas = items, pero el XSD admite hasta 2 dígitos
+        data['Subtotales']['Subtotal'][0]['Lineas'] = min(items, 99)
+    return data
+
+
+def _xml(data, backend, pretty):
+    builder = ECFBuilderManager.get_builder(copy.deepcopy(data), backend)
+    builder.pretty = pretty
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+def _document_xml(document, data, pretty):
+    builder = DOCUMENT_BUILDERS[document](copy.deepcopy(data))
+    builder.pretty = pretty
+    return builder.build()
+
+
+def round_trip(label, first, rebuild, failures, key):
+    data = ecf_reader.read(io.BytesIO(first))
+    if ecf_reader.read(first) != data:
+        failures.append(f"{label}: leer los bytes (árbol) y el stream (iterparse) da distinto JSON")
+    second = rebuild(data)
+    if second != first:
+        failures.append(f"{label}: el XML reconstruido no es el original ({len(second)} y {len(first)} bytes)")
+    elif ecf_reader.read(io.BytesIO(second)) != data:
+        failures.append(f"{label}: leer el XML reconstruido da otro JSON")
+    errors = payload_validator.validate(data, key if isinstance(key, str) else None)
+    if errors:
+        failures.append(f"{label}: el JSON leído no pasa la validación previa: {errors[:2]}")
+
+
+def check_round_trips():
+    failures = []
+    cases = 0
+    for tipo in TIPOS:
+        for items, optional in ((1, False), (150, True)):
+            data = _payload(tipo, items, optional)
+            for backend in ('generated', 'direct'):
+                for pretty in (True, False):
+                    label = f"{tipo} {backend} {'indentado' if pretty else 'compacto'} {items} líneas"
+                    round_trip(label, _xml(data, backend, pretty),
+                               lambda d: _xml(d, backend, pretty), failures, tipo)
+                    cases += 1
+    rng = random.Random(5)
+    documents = [('RFCE', receipt(rng, 5))]
+    for document, timestamp in TIMESTAMPS.items():
+        for n in range(20):
+            data = dict(outcome(rng, document, n), RNCComprador=COMPRADOR)
+            data[timestamp] = '01-01-2024 12:00:00'
+            documents.append((document, data))
+    for document, data in documents:
+        for pretty in (True, False):
+            round_trip(f"{document} {'indentado' if pretty else 'compacto'}", _document_xml(document, data, pretty),
+                       lambda d: _document_xml(document, d, pretty), failures, document)
+            cases += 1
+    print(f"ida y vuelta: {cases} casos ({len(TIPOS)} tipos x 2 backends x 2 formatos x 2 tamaños, "
+          f"más RFCE, ARECF y ACECF), {len(failures)} fallas")
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    return not failures
+
+
+def _measure(path, mode, queue):
+    ecf_reader.model(31)  # modelo armado antes de medir, como tras el calentamiento
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'items':
+        document = ecf_reader.open(path)
+        lines = sum(1 for _ in document.items())
+        document.tail()
+    else:
+        root = etree.parse(path).getroot()
+        lines = len(root.find('DetallesItems'))
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((lines, elapsed, (after - before) / 1024))
+
+
+def measure(path, mode):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(path, mode, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def _write_document(path, lines):
+    builder = ECFBuilderManager.get_builder(_payload(31, lines, False), 'direct')
+    builder.pretty = False
+    with open(path, 'wb') as f:
+        for chunk in builder.iter_xml_bytes():
+            f.write(chunk)
+
+
+def memory(workdir):
+    print(f"\n{'líneas':>8}{'MB':>8}{'items() s':>11}{'items() +MB':>13}{'etree.parse s':>15}{'etree.parse +MB':>17}")
+    for lines in SIZES:
+        path = os.path.join(workdir, f"grande-{lines}.xml")
+        _write_document(path, lines)
+        _, streamed, streamed_mb = measure(path, 'items')
+        _, dom, dom_mb = measure(path, 'dom')
+        print(f"{lines:>8}{os.path.getsize(path) / 2 ** 20:>8.1f}{streamed:>11.2f}{streamed_mb:>13.1f}"
+              f"{dom:>15.2f}{dom_mb:>17.1f}")
+        os.remove(path)
+
+
+def throughput(workdir, count):
+    # ~80 KB por documento: 150 líneas con los bloques opcionales, indentado
+    xml = _xml(_payload(31, 150, True), 'direct', True)
+    directory = os.path.join(workdir, 'recibidos')
+    os.makedirs(directory)
+    for n in range(count):
+        with open(os.path.join(directory, f"E31{n:010d}.xml"), 'wb') as f:
+            f.write(xml)
+
+    print(f"\ndocumento de {len(xml) / 1024:.0f} KB")
+    for label, source in (('bytes (árbol + iterwalk)', lambda: xml), ('stream (iterparse)', lambda: io.BytesIO(xml))):
+        start = time.perf_counter()
+        for _ in range(200):
+            ecf_reader.read(source())
+        single = (time.perf_counter() - start) / 200
+        print(f"  {label:<26}{single * 1000:>7.2f} ms{len(xml) / single / 2 ** 20:>7.0f} MB/s")
+
+    print(f"\nread_directory, {count} archivos, {os.cpu_count()} CPU")
+    print(f"{'workers':<10}{'ok':>8}{'s':>8}{'docs/s':>10}")
+    for workers in (0, os.cpu_count()):
+        start = time.perf_counter()
+        ok = sum(r['status'] == 'ok' for r in batch_builder.read_directory(directory, workers=workers))
+        elapsed = time.perf_counter() - start
+        batch_builder.shutdown_executor()
+        print(f"{'serie' if workers == 0 else workers:<10}{ok:>8}{elapsed:>8.2f}{count / elapsed:>10.0f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ok = check_round_trips()
+    workdir = tempfile.mkdtemp()
+    try:
+        memory(workdir)
+        throughput(workdir, count)
+    finally:
+        shutil.rmtree(workdir)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
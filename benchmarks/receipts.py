@@ -0,0 +1,163 @@
+"""
+Acuses de recibo (ARECF) y aprobaciones comerciales (ACECF) en lote.
+
+1. Sobre resultados aleatorios (recibido/no recibido, aceptado/rechazado):
+     - la salida compacta es la indentada sin los espacios entre etiquetas,
+     - lo que pasa la validación previa cumple el XSD compilado (solo ARECF:
+       el XSD del ACECF no compila en lxml y se informa como no disponible),
+     - firmado, el documento verifica y sigue cumpliendo el XSD.
+2. Costo de validar contra el esquema compilado una vez (schema_registry)
+   frente a compilar el XSD en cada documento.
+3. /ecf/arecf/batch y /ecf/acecf/batch con N identificadores en NDJSON, en
+   serie y con el pool, sin y con firma.
+
+Uso: python -m benchmarks.receipts [documentos]
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from lxml import etree
+from app import create_app
+from app.services import batch_builder
+from app.services.payload_validator import payload_validator
+from app.services.schema_registry import schema_registry, SchemaUnavailableError
+from app.services.xml_generation.document_builders import ARECFBuilder, ACECFBuilder
+from app.services.xml_signer import KeyStore, sign_tree, verify_tree
+from benchmarks.certs import write_self_signed_p12
+from benchmarks.rfce import _BenchConfig
+
+BLANK = etree.XMLParser(remove_blank_text=True)
+COMPRADOR = '101010101'
+
+
+def outcome(rng, document, n):
+    item = {'RNCEmisor': str(rng.randint(100000000, 999999999)),
+            'eNCF': f"E{rng.choice([31, 33, 34, 41, 43, 44, 45])}{n + 1:010d}"}
+    if document == 'ARECF':
+        item['Estado'] = rng.choice('001')
+        if item['Estado'] == '1':
+            item['CodigoMotivoNoRecibido'] = rng.choice('1234')
+    else:
+        item.update(FechaEmision=f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024",
+                    MontoTotal=round(rng.uniform(1, 500000), 2), Estado=rng.choice('112'))
+        if item['Estado'] == '2':
+            item['DetalleMotivoRechazo'] = rng.choice(['Monto no corresponde', 'Mercancía no recibida & devuelta'])
+    return item
+
+
+def check(builder_class, item, material, failures):
+    document = builder_class.document
+    data = dict(item, RNCComprador=COMPRADOR)
+    errors = payload_validator.validate({builder_class.detail: data}, document)
+    if errors:
+        failures.append(f"{document} {item['eNCF']}: la validación previa lo rechaza: {errors[:2]}")
+        return
+    pretty = builder_class(dict(data))
+    compact = builder_class(dict(data))
+    compact.pretty = False
+    pretty_bytes, compact_bytes = pretty.build(), compact.build()
+    if etree.tostring(etree.fromstring(pretty_bytes, BLANK), encoding='UTF-8', xml_declaration=True) != compact_bytes:
+        failures.append(f"{document} {item['eNCF']}: la salida compacta no es la indentada sin espacios")
+
+    sign_tree(compact.root, material, False)
+    signed = etree.fromstring(compact.get_xml_bytes())
+    try:
+        verify_tree(signed)
+    except ValueError as e:
+        failures.append(f"{document} {item['eNCF']}: la firma no verifica: {e}")
+    for label, tree in (('sin firmar', etree.fromstring(pretty_bytes)), ('firmado', signed)):
+        try:
+            errors = schema_registry.validate(document, tree)
+        except SchemaUnavailableError:
+            return
+        if errors:
+            failures.append(f"{document} {item['eNCF']} {label}: no cumple el XSD: {errors[:2]}")
+
+
+def coherence(count, seed, material):
+    rng = random.Random(seed)
+    failures = []
+    for builder_class in (ARECFBuilder, ACECFBuilder):
+        for n in range(count):
+            check(builder_class, outcome(rng, builder_class.document, n), material, failures)
+    unavailable = sorted(d for d in ('ARECF', 'ACECF') if schema_registry.get(d).error)
+    print(f"coherencia: {count} ARECF + {count} ACECF (semilla {seed}), {len(failures)} fallas"
+          + (f"; XSD no disponible: {', '.join(unavailable)}" if unavailable else ""))
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    return not failures
+
+
+def schema_reuse(count):
+    rng = random.Random(3)
+    trees = []
+    for n in range(count):
+        builder = ARECFBuilder(dict(outcome(rng, 'ARECF', n), RNCComprador=COMPRADOR))
+        trees.append(etree.fromstring(builder.build()))
+    path = schema_registry.get('ARECF').path
+    times = {}
+    start = time.perf_counter()
+    for tree in trees:
+        schema_registry.validate('ARECF', tree)
+    times['compilado una vez'] = (time.perf_counter() - start) / count
+    start = time.perf_counter()
+    for tree in trees:
+        etree.XMLSchema(etree.parse(path)).validate(tree)
+    times['compilado por documento'] = (time.perf_counter() - start) / count
+    print(f"\nvalidación XSD del ARECF, {count} documentos")
+    for label, seconds in times.items():
+        print(f"  {label:<26}{seconds * 1e6:>10.0f} µs/doc")
+
+
+def shift(client, document, items, workers, sign):
+    client.application.config['ECF_BATCH_WORKERS'] = workers
+    body = "".join(json.dumps(item) + "\n" for item in items)
+    query = f"rnc_comprador={COMPRADOR}&validate=1" + ("&sign=1" if sign else "")
+    start = time.perf_counter()
+    response = client.post(f'/ecf/{document.lower()}/batch?{query}', data=body, content_type='application/x-ndjson')
+    records = [json.loads(line) for line in response.data.splitlines()]
+    elapsed = time.perf_counter() - start
+    batch_builder.shutdown_executor()
+    errors = [r for r in records if r['status'] != 'ok']
+    if errors:
+        raise RuntimeError(f"{document}: {len(errors)} documentos con error, p. ej. {errors[0]}")
+    return len(records), elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workdir = tempfile.mkdtemp()
+    certs_dir = os.path.join(workdir, 'certs')
+    write_self_signed_p12(certs_dir, COMPRADOR, 'prueba')
+    store = KeyStore(certs_dir, default_password='prueba')
+    ok = coherence(300, 21, store.get(COMPRADOR))
+    schema_reuse(200)
+
+    class BenchConfig(_BenchConfig):
+        ECF_SIGN_MODE = 'request'
+        ECF_VALIDATION_MODE = 'request'
+        ECF_CERTS_DIR = certs_dir
+        ECF_CERT_PASSWORD = 'prueba'
+
+    client = create_app(BenchConfig).test_client()
+    rng = random.Random(1)
+    print(f"\nlotes NDJSON de {count} documentos, compacto, ?validate=1, {os.cpu_count()} CPU")
+    print(f"{'documento':<11}{'firma':<7}{'workers':<10}{'docs':>8}{'s':>8}{'docs/s':>10}{'µs/doc':>9}")
+    for document in ('ARECF', 'ACECF'):
+        items = [outcome(rng, document, n) for n in range(count)]
+        for sign in (False, True):
+            # Firmar cuesta ~1 ms por documento: menos documentos para no alargar la corrida
+            sample = items if not sign else items[:max(count // 10, 1)]
+            for workers in (0, os.cpu_count()):
+                done, elapsed = shift(client, document, sample, workers, sign)
+                print(f"{document:<11}{'sí' if sign else 'no':<7}{'serie' if workers == 0 else workers:<10}"
+                      f"{done:>8}{elapsed:>8.2f}{done / elapsed:>10.0f}{elapsed / done * 1e6:>9.0f}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
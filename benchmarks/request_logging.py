@@ -0,0 +1,119 @@
+"""
+Latencia de /ecf/ecf según cómo se loguea cada petición, con varios hilos a la vez.
+
+  antes       -> app.logger.info(f"Builder creado: {json_data}") en el hilo de la
+                 petición, con un handler sincrónico (lo que hacía la ruta)
+  sincrónico  -> registro estructurado de request_log escrito en la petición
+                 (ECF_LOG_QUEUE_SIZE=0)
+  cola        -> registro estructurado por la cola, escrito desde el hilo de fondo
+
+La salida de logs es un archivo al que cada escritura le suma `retardo_ms`,
+para simular un stderr/journald/recolector que no da abasto. Los payloads
+mezclan facturas de 1, 20 y 1000 items.
+
+Uso: python -m benchmarks.request_logging [peticiones_por_hilo] [hilos] [retardo_ms]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import threading
+from flask import request
+from app import create_app
+from config import Config
+from app.services.request_log import request_log
+from benchmarks.payloads import make_payload
+from benchmarks.suite import _percentile
+
+SIZES = (1, 20, 1, 20, 1000)
+
+
+class SlowFile:
+    """Archivo que tarda `delay` segundos en cada escritura."""
+    def __init__(self, path, delay):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+def _app(mode, workdir, delay):
+    class BenchConfig(Config):
+        ECF_IDEMPOTENCY_ENABLED = False
+        ECF_METRICS_DIR = os.path.join(workdir, 'metrics')
+        ECF_LOG_ENABLED = mode != 'antes'
+        ECF_LOG_QUEUE_SIZE = 0 if mode == 'sincrónico' else 10000
+
+    app = create_app(BenchConfig)
+    handler = logging.StreamHandler(SlowFile(os.path.join(workdir, f'{mode}.log'), delay))
+    request_log.configure(mode != 'antes', 1.0, 'off', 0.0, 4096, BenchConfig.ECF_LOG_QUEUE_SIZE, handler)
+    if mode == 'antes':
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        request_log.stop()
+        app.logger.handlers = [handler]
+        app.logger.setLevel(logging.INFO)
+
+        @app.before_request
+        def old_log():
+            if request.endpoint == 'ecf.create_ecf':
+                app.logger.info(f"Builder creado: {request.json}")
+    return app
+
+
+def _run(app, payloads, per_thread, threads):
+    samples = []
+    lock = threading.Lock()
+
+    def client_loop(offset):
+        client = app.test_client()
+        local = []
+        for n in range(per_thread):
+            payload = payloads[(offset + n) % len(payloads)]
+            start = time.perf_counter()
+            response = client.post('/ecf/ecf', json=payload)
+            local.append((len(payload['DetallesItems']), time.perf_counter() - start))
+            assert response.status_code == 200, response.data[:200]
+        with lock:
+            samples.extend(local)
+
+    pool = [threading.Thread(target=client_loop, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def main():
+    per_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    delay = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.002
+    workdir = tempfile.mkdtemp()
+    payloads = [make_payload(32, items=n, seq=i + 1) for i, n in enumerate(SIZES)]
+
+    print(f"{threads} hilos x {per_thread} peticiones, retardo de escritura {delay * 1000:.1f} ms, items {SIZES}")
+    print(f"{'modo':<12}{'items':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>8}{'log KB':>10}{'descartados':>13}")
+    for mode in ('antes', 'sincrónico', 'cola'):
+        app = _app(mode, workdir, delay)
+        _run(app, payloads, 5, 1)  # compilar reglas y calentar
+        request_log.dropped = 0
+        samples, elapsed = _run(app, payloads, per_thread, threads)
+        request_log.stop()
+        size = os.path.getsize(os.path.join(workdir, f'{mode}.log')) / 1024
+        groups = [('todos', [s for _, s in samples])]
+        groups += [(str(n), [s for items, s in samples if items == n]) for n in sorted(set(SIZES))]
+        for label, group in groups:
+            totals = f"{len(samples) / elapsed:>8.0f}{size:>10.0f}{request_log.dropped:>13}" if label == 'todos' else ''
+            print(f"{mode if label == 'todos' else '':<12}{label:>6}{_percentile(group, 50) * 1000:>9.2f}"
+                  f"{_percentile(group, 95) * 1000:>9.2f}{_percentile(group, 99) * 1000:>9.2f}{totals}")
+
+
+if __name__ == "__main__":
+    main()
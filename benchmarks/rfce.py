@@ -0,0 +1,159 @@
+"""
+RFCE desde el JSON del e-CF 32: coherencia con el e-CF y ritmo de peticiones.
+
+1. Sobre facturas de consumo aleatorias (benchmarks.totals.random_document):
+     - cada valor del RFCE es el mismo, en la misma ruta, que en el e-CF 32
+       completo (backend 'direct') armado con el mismo JSON,
+     - la salida compacta es la indentada sin los espacios entre etiquetas,
+     - lo que pasa la validación previa del RFCE se escribe sin errores.
+2. Peticiones por segundo de /ecf/rfce contra /ecf/ecf (backend 'direct',
+   compacto) con recibos pequeños, en el cliente de pruebas de Flask: p50/p99
+   por petición, sin el costo del servidor HTTP.
+3. /ecf/rfce/batch con un turno de recibos en NDJSON, en serie y con el pool.
+
+Uso: python -m benchmarks.rfce [recibos_por_turno] [líneas_por_recibo]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import random
+from lxml import etree
+from app import create_app
+from app.services import batch_builder
+from app.services.payload_validator import payload_validator
+from app.services.totals import totals_engine
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_generation.document_builders import RFCEBuilder
+from benchmarks.suite import _percentile
+from benchmarks.totals import random_document
+from config import Config
+
+BLANK = etree.XMLParser(remove_blank_text=True)
+
+
+def receipt(rng, lines):
+    data = random_document(rng, 32, lines)
+    data.pop('DescuentosORecargos', None)
+    data['Encabezado'].pop('OtraMoneda', None)
+    if not data['Encabezado']['Totales'].get('MontoImpuestoAdicional'):
+        data['Encabezado']['Totales'].pop('MontoImpuestoAdicional', None)
+    for item in data['DetallesItems']:
+        # Que el e-CF 32 completo también pase la validación previa
+        item['CantidadItem'] = item['CantidadItem'] or 1
+        for field in ('DescuentoMonto', 'RecargoMonto', 'Retencion'):
+            item.pop(field, None)
+    data['Encabezado']['CodigoSeguridadeCF'] = ''.join(rng.choice('abcdefABCDEF0123456789') for _ in range(6))
+    totals_engine.apply(data)
+    return data
+
+
+def _leaves(node, path=''):
+    for child in node:
+        if not isinstance(child.tag, str) or etree.QName(child).localname == 'Signature':
+            continue
+        child_path = f"{path}/{child.tag}"
+        if len(child):
+            yield from _leaves(child, child_path)
+        else:
+            yield child_path, child.text
+
+
+def check_receipt(data, failures):
+    encf = data['Encabezado']['IdDoc']['eNCF']
+    errors = payload_validator.validate(data, 'RFCE')
+    if errors:
+        failures.append(f"{encf}: la validación previa del RFCE rechaza el recibo: {errors[:2]}")
+        return
+    builder = RFCEBuilder(data)
+    pretty = builder.build()
+    builder = RFCEBuilder(data)
+    builder.pretty = False
+    compact = builder.build()
+    if etree.tostring(etree.fromstring(pretty, BLANK), encoding='UTF-8', xml_declaration=True) != compact:
+        failures.append(f"{encf}: la salida compacta no es la indentada sin espacios")
+
+    ecf = ECFBuilderManager.get_builder(copy.deepcopy(data), 'direct')
+    ecf.build()
+    ecf_root = etree.fromstring(ecf.get_xml_bytes())
+    for path, text in _leaves(etree.fromstring(compact)):
+        if path in ('/Encabezado/CodigoSeguridadeCF', '/Encabezado/Comprador'):
+            continue
+        if ecf_root.findtext(path[1:]) != text:
+            failures.append(f"{encf}: {path} es {text!r} en el RFCE y {ecf_root.findtext(path[1:])!r} en el e-CF 32")
+
+
+def coherence(count, seed):
+    rng = random.Random(seed)
+    failures = []
+    for n in range(count):
+        check_receipt(receipt(rng, rng.choice([1, 3, 10, 50])), failures)
+    print(f"coherencia: {count} recibos (semilla {seed}), {len(failures)} fallas")
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    return not failures
+
+
+class _BenchConfig(Config):
+    ECF_BUILDER_BACKEND = 'direct'
+    ECF_RESPONSE_FORMAT = 'compact'
+    ECF_SEQUENCE_MODE = 'off'
+    ECF_IDEMPOTENCY_ENABLED = False
+    ECF_ARCHIVE_ENABLED = False
+    ECF_LOG_ENABLED = False
+    ECF_WARMUP = 'sync'
+    ECF_COMPRESSION_ENCODINGS = ''
+
+
+def requests_per_second(client, url, bodies):
+    times = []
+    for body in bodies:
+        start = time.perf_counter()
+        response = client.post(url, data=body, content_type='application/json')
+        times.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: {response.status_code} {response.data[:300]!r}")
+    return len(times) / sum(times), _percentile(times, 50), _percentile(times, 99)
+
+
+def shift(client, receipts, workers):
+    client.application.config['ECF_BATCH_WORKERS'] = workers
+    body = "".join(json.dumps(r) + "\n" for r in receipts)
+    start = time.perf_counter()
+    response = client.post('/ecf/rfce/batch', data=body, content_type='application/x-ndjson')
+    ok = sum(json.loads(line)["status"] == "ok" for line in response.data.splitlines())
+    elapsed = time.perf_counter() - start
+    batch_builder.shutdown_executor()
+    return ok, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    ok = coherence(500, 20)
+
+    app = create_app(_BenchConfig)
+    client = app.test_client()
+    rng = random.Random(1)
+    bodies = [json.dumps(receipt(rng, lines)) for _ in range(2000)]
+    for url in ('/ecf/rfce', '/ecf/ecf'):
+        requests_per_second(client, url, bodies[:200])  # calentamiento
+    print(f"\nrecibos de {lines} líneas, {len(bodies)} peticiones, compacto, {os.cpu_count()} CPU")
+    print(f"{'endpoint':<12}{'pet/s':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for url in ('/ecf/rfce', '/ecf/ecf'):
+        rate, p50, p99 = requests_per_second(client, url, bodies)
+        print(f"{url:<12}{rate:>10.0f}{p50 * 1e6:>10.0f}{p99 * 1e6:>10.0f}")
+
+    receipts = [receipt(rng, lines) for _ in range(count)]
+    print(f"\n/ecf/rfce/batch, turno de {count} recibos en NDJSON")
+    print(f"{'workers':<10}{'ok':>8}{'s':>8}{'recibos/s':>12}")
+    for workers in (0, os.cpu_count()):
+        done, elapsed = shift(client, receipts, workers)
+        print(f"{'serie' if workers == 0 else workers:<10}{done:>8}{elapsed:>8.2f}{count / elapsed:>12.0f}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
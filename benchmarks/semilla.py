@@ -0,0 +1,42 @@
+"""
+Latencia de /auth/semilla bajo ráfaga: generar cada semilla en la petición
+(SemillaBuilder) contra sacarla del pool de SeedService. Las ráfagas mayores
+que el pool muestran el costo de generar en línea mientras el hilo rellena.
+
+Uso: python -m benchmarks.semilla [ráfaga ...]
+"""
+import sys
+import time
+import tempfile
+import os
+from app.services.auth.semilla_builder import SemillaBuilder
+from app.services.auth.seed_service import SeedService
+from benchmarks.suite import _percentile
+
+
+def burst(issue, count):
+    samples = []
+    for _ in range(count):
+        t0 = time.perf_counter()
+        issue()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 1000, 5000]
+    service = SeedService()
+    service.configure(pool_size=1024, path=os.path.join(tempfile.mkdtemp(), 'semillas.sqlite3'))
+    print(f"{'ráfaga':>8}{'builder p50 us':>16}{'p99':>10}{'pool p50 us':>14}{'p99':>10}")
+    for count in sizes:
+        # Pool lleno antes de cada ráfaga, como al inicio de un turno
+        service.issue()
+        time.sleep(0.5)
+        old = burst(lambda: SemillaBuilder().get_xml_string(), count)
+        new = burst(service.issue, count)
+        print(f"{count:>8}{_percentile(old, 50) * 1e6:>16.1f}{_percentile(old, 99) * 1e6:>10.1f}"
+              f"{_percentile(new, 50) * 1e6:>14.1f}{_percentile(new, 99) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
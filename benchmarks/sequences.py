@@ -0,0 +1,152 @@
+"""
+Asignador de eNCF: prueba de concurrencia entre procesos y asignaciones por segundo.
+
+1. Estrés: varios procesos, cada uno con varios hilos, piden números del mismo
+   emisor y tipo sobre un SQLite compartido, con bloques chicos para forzar
+   muchas reservas y varios rangos autorizados (uno vencido). Uno de los
+   procesos termina sin liberar sus bloques, como si se cayera. Se comprueba:
+     - ningún número se entregó dos veces,
+     - todos están dentro de rangos vigentes,
+     - ningún número entregado aparece en unused() como bloque cerrado sin usar,
+     - entregados + sin usar + bloques abiertos = todo lo reservado.
+2. Rendimiento: asignaciones por segundo en un proceso según el tamaño del
+   bloque (1 = un viaje al almacén por número), y en varios procesos a la vez.
+
+Uso: python -m benchmarks.sequences [procesos] [hilos] [números_por_hilo]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import multiprocessing
+from app.services.sequence_allocator import SequenceAllocator, parse_encf
+
+RNC = '101010101'
+TIPO = 31
+
+
+def _worker(path, block_size, threads, per_thread, out_path, crash):
+    allocator = SequenceAllocator()
+    allocator.configure(path, block_size)
+    numbers = []
+    lock = threading.Lock()
+
+    def loop():
+        local = [parse_encf(allocator.allocate(RNC, TIPO)[0])[1] for _ in range(per_thread)]
+        with lock:
+            numbers.extend(local)
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    with open(out_path, 'w') as f:
+        f.write('\n'.join(map(str, numbers)))
+    if crash:
+        os._exit(0)  # sin release(): sus bloques quedan abiertos
+    allocator.release()
+
+
+def stress(processes, threads, per_thread):
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, 'sequences.sqlite3')
+    allocator = SequenceAllocator()
+    allocator.configure(path, 7)
+    total = processes * threads * per_thread
+    allocator.authorize(RNC, TIPO, 1, 1000, '2020-12-31')  # vencido: no se debe usar
+    ranges = [(1001, 1000 + total // 2), (5001 + total, 5000 + total * 3)]
+    for start, end in ranges:
+        allocator.authorize(RNC, TIPO, start, end, '2099-12-31')
+
+    ctx = multiprocessing.get_context('fork')
+    outs = [os.path.join(workdir, f'{n}.txt') for n in range(processes)]
+    procs = [ctx.Process(target=_worker, args=(path, 7, threads, per_thread, outs[n], n == 0))
+             for n in range(processes)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    handed = []
+    for out in outs:
+        with open(out) as f:
+            handed.extend(int(line) for line in f.read().split())
+    handed_set = set(handed)
+    in_range = all(any(s <= n <= e for s, e in ranges) for n in handed)
+
+    closed_unused, open_leased = set(), set()
+    for gap in allocator.unused(RNC, TIPO):
+        numbers = range(parse_encf(gap['desde'])[1], parse_encf(gap['hasta'])[1] + 1)
+        (closed_unused if gap['cerrado'] else open_leased).update(numbers)
+    leased = set()
+    for start_, end_ in allocator._conn().execute("SELECT start, end FROM encf_leases"):
+        leased.update(range(start_, end_ + 1))
+
+    print(f"estrés: {processes} procesos x {threads} hilos x {per_thread} números, bloques de 7, "
+          f"{elapsed:.2f} s")
+    print(f"  entregados: {len(handed)}  duplicados: {len(handed) - len(handed_set)}  "
+          f"fuera de rango vigente: {0 if in_range else 'SÍ'}")
+    print(f"  entregados que unused() da como sin usar: {len(handed_set & closed_unused)}")
+    print(f"  reservados: {len(leased)} = entregados {len(handed_set - open_leased)} + sin usar {len(closed_unused)}"
+          f" + en bloques abiertos {len(open_leased)}")
+    capacity = allocator.capacity(RNC, TIPO)[0]
+    print(f"  capacidad: autorizados {capacity['authorized']}, reservados {capacity['leased']}, "
+          f"restantes {capacity['remaining']}, vencidos {capacity['expired']}")
+    ok = (len(handed) == len(handed_set) and in_range and not handed_set & closed_unused
+          and leased == (handed_set - open_leased) | closed_unused | open_leased)
+    print(f"  resultado: {'ok' if ok else 'FALLA'}")
+    return ok
+
+
+def _rate_worker(path, block_size, count, result):
+    allocator = SequenceAllocator()
+    allocator.configure(path, block_size)
+    allocator.allocate(RNC, TIPO)
+    start = time.perf_counter()
+    for _ in range(count):
+        allocator.allocate(RNC, TIPO)
+    result.put(count / (time.perf_counter() - start))
+    allocator.release()
+
+
+def throughput(processes):
+    workdir = tempfile.mkdtemp()
+    print(f"\n{'bloque':>8}{'1 proceso/s':>14}{f'{processes} procesos/s':>16}")
+    for block_size in (1, 10, 100, 1000):
+        path = os.path.join(workdir, f'rate-{block_size}.sqlite3')
+        allocator = SequenceAllocator()
+        allocator.configure(path, block_size)
+        allocator.authorize(RNC, TIPO, 1, 10 ** 9, '2099-12-31')
+        count = 2000 if block_size == 1 else 100000
+        ctx = multiprocessing.get_context('fork')
+        result = ctx.Queue()
+        p = ctx.Process(target=_rate_worker, args=(path, block_size, count, result))
+        p.start()
+        single = result.get()
+        p.join()
+        procs = [ctx.Process(target=_rate_worker, args=(path, block_size, count // processes, result))
+                 for _ in range(processes)]
+        for p in procs:
+            p.start()
+        multi = sum(result.get() for _ in procs)
+        for p in procs:
+            p.join()
+        print(f"{block_size:>8}{single:>14.0f}{multi:>16.0f}")
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    per_thread = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    ok = stress(processes, threads, per_thread)
+    throughput(processes)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
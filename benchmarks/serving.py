@@ -0,0 +1,154 @@
+"""
+Modo de servicio 'sync' contra 'threaded' (ECF_SERVER_MODE) bajo concurrencia.
+
+Levanta gunicorn con gunicorn.conf.py en cada modo (en 'sync', 2 x núcleos + 1
+workers; en 'threaded', un worker gthread por núcleo con sus hilos y los pools
+acotados de app/services/offload.py) y le manda /ecf/ecf?validate=1 (e-CF 32,
+cuyo XSD sí compila en lxml) desde C clientes a la vez, para varios C. Una
+parte de los clientes son lentos: envían el cuerpo en partes con pausas, como
+un POS con mala conexión, y así tienen ocupado lo que los atiende sin gastar
+CPU. Se reporta, para los clientes
+normales, peticiones por segundo y latencia p50/p95/p99, y los errores (503
+de los pools llenos incluidos) de todos.
+
+Uso: python -m benchmarks.serving [segundos_por_nivel] [concurrencias] [fracción_lentos]
+     p. ej. python -m benchmarks.serving 5 1,4,16,32 0.25
+"""
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import tempfile
+import threading
+import subprocess
+import http.client
+from benchmarks.cold_start import ROOT, _free_port, _get
+from benchmarks.payloads import make_payload
+from benchmarks.suite import _percentile
+
+MODES = ('sync', 'threaded')
+# Un cliente lento manda el cuerpo en SLOW_PARTS partes separadas por SLOW_PAUSE segundos
+SLOW_PARTS = 4
+SLOW_PAUSE = 0.05
+PATH = '/ecf/ecf?validate=1&format=compact'
+
+
+def start_server(mode, workdir, **overrides):
+    """
+    gunicorn con gunicorn.conf.py en el modo pedido; devuelve (proceso, puerto)
+    ya listo. overrides reemplaza cualquier variable de entorno de la lista.
+    """
+    port = _free_port()
+    env = dict(os.environ, ECF_SERVER_MODE=mode, ECF_SERVER_BIND=f'127.0.0.1:{port}',
+               ECF_BUILDER_BACKEND='direct', ECF_WARMUP='sync', ECF_SERVER_PRELOAD='1',
+               ECF_METRICS_DIR=os.path.join(workdir, 'metrics'), ECF_IDEMPOTENCY_ENABLED='0',
+               ECF_ARCHIVE_ENABLED='0', ECF_SEQUENCE_MODE='off', ECF_LOG_ENABLED='0',
+               ECF_COMPRESSION_ENCODINGS='', ECF_TASKS_DB=os.path.join(workdir, 'tasks.sqlite3'),
+               SEMILLA_DB=os.path.join(workdir, 'semillas.sqlite3'),
+               ECF_PROFILES_DB=os.path.join(workdir, 'perfiles.sqlite3'), FLASK_CONFIG='prod')
+    env.update(overrides)
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    while True:
+        try:
+            if _get(base + '/health/ready')[0] == 200:
+                return server, port
+        except OSError:
+            pass
+        if server.poll() is not None or time.perf_counter() - start > 60:
+            server.kill()
+            raise RuntimeError(f"{mode}: gunicorn no quedó listo en 60 s")
+        time.sleep(0.05)
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=30)
+
+
+def _post(port, body, slow):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.putrequest('POST', PATH)
+        conn.putheader('Content-Type', 'application/json')
+        conn.putheader('Content-Length', str(len(body)))
+        conn.endheaders()
+        if slow:
+            step = len(body) // SLOW_PARTS + 1
+            for offset in range(0, len(body), step):
+                conn.send(body[offset:offset + step])
+                time.sleep(SLOW_PAUSE)
+        else:
+            conn.send(body)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def level(port, concurrency, seconds, slow_fraction, body):
+    slow_clients = int(concurrency * slow_fraction + 0.5) if concurrency > 1 else 0
+    fast, errors, done = [], [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(slow):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = _post(port, body, slow)
+            except OSError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                done[0] += 1
+                if status != 200:
+                    errors.append(status)
+                elif not slow:
+                    fast.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(n < slow_clients,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return slow_clients, fast, errors, done[0]
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    levels = [int(c) for c in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1, 4, 16, 32]
+    slow_fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 0.25
+    body = json.dumps(make_payload(32, items=10, seq=1)).encode('utf-8')
+    print(f"/ecf/ecf?validate=1, e-CF 32 de 10 líneas ({len(body)} B), {seconds:.0f} s por nivel, "
+          f"{slow_fraction:.0%} de clientes lentos ({SLOW_PARTS} partes cada {SLOW_PAUSE * 1000:.0f} ms), "
+          f"{os.cpu_count()} CPU")
+    print(f"{'modo':<10}{'clientes':>9}{'lentos':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'errores':>9}")
+    for mode in MODES:
+        workdir = tempfile.mkdtemp()
+        server, port = start_server(mode, workdir)
+        try:
+            for concurrency in levels:
+                slow_clients, fast, errors, done = level(port, concurrency, seconds, slow_fraction, body)
+                if fast:
+                    p50, p95, p99 = (_percentile(fast, q) * 1000 for q in (50, 95, 99))
+                else:
+                    p50 = p95 = p99 = float('nan')
+                kinds = sorted(set(map(str, errors)))
+                print(f"{mode:<10}{concurrency:>9}{slow_clients:>8}{len(fast) / seconds:>8.0f}{p50:>9.1f}"
+                      f"{p95:>9.1f}{p99:>9.1f}{len(errors) / max(done, 1):>8.1%}"
+                      + (f"  ({', '.join(kinds)})" if kinds else ""))
+        finally:
+            stop_server(server)
+            shutil.rmtree(workdir)
+    print("req/s y latencias: solo los clientes normales; errores: sobre todas las peticiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Firmas por segundo del motor XMLDSig con un certificado autofirmado local.
+
+Compara:
+  - abrir el PKCS#12 en cada firma (lo que haría un firmador sin caché),
+  - llave en caché (KeyStore) sobre el árbol recién construido,
+  - lote en el pool de procesos de /ecf/batch (build + firma).
+
+Cada documento firmado se verifica después de serializarlo y volver a parsearlo.
+
+Uso: python -m benchmarks.signing [documentos] [workers]
+"""
+import os
+import sys
+import time
+import tempfile
+from lxml import etree
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.xml_signer import KeyStore, XMLSigner, key_store, verify_tree
+from app.services.batch_builder import build_batch, shutdown_executor
+from benchmarks.certs import write_self_signed_p12
+from benchmarks.payloads import TIPOS, make_payload
+
+RNC = '101010101'
+PASSWORD = 'prueba'
+
+
+def built_roots(payloads):
+    roots = []
+    for payload in payloads:
+        builder = ECFBuilderFactory.get_builder(payload)
+        builder.build()
+        roots.append(builder)
+    return roots
+
+
+def sign_all(signer, builders, fresh_store=False, certs_dir=None):
+    start = time.perf_counter()
+    for builder in builders:
+        if fresh_store:
+            signer = XMLSigner(KeyStore(certs_dir, default_password=PASSWORD))
+        signer.sign_tree(builder.root, RNC)
+    return len(builders) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    certs_dir = tempfile.mkdtemp()
+    write_self_signed_p12(certs_dir, RNC, PASSWORD)
+    payloads = [make_payload(TIPOS[n % len(TIPOS)], items=10, seq=n + 1) for n in range(count)]
+
+    cold_count = min(count, 50)
+    cold = sign_all(None, built_roots(payloads[:cold_count]), fresh_store=True, certs_dir=certs_dir)
+
+    signer = XMLSigner(KeyStore(certs_dir, default_password=PASSWORD))
+    builders = built_roots(payloads)
+    cached = sign_all(signer, builders)
+
+    for builder in builders:
+        verify_tree(etree.fromstring(builder.get_xml_string().encode('utf-8')))
+
+    # Lote: cada proceso del pool carga la llave una vez (el KeyStore se hereda configurado)
+    key_store.configure(certs_dir, default_password=PASSWORD)
+    list(build_batch(payloads[:workers * 16], sign=True, workers=workers))  # arrancar el pool
+    start = time.perf_counter()
+    records = list(build_batch(payloads, sign=True, workers=workers, chunk_size=16))
+    batch = count / (time.perf_counter() - start)
+    shutdown_executor()
+    failed = [r for r in records if r['status'] != 'ok']
+    for record in records[:20]:
+        verify_tree(etree.fromstring(record['xml'].encode('utf-8')))
+
+    print(f"documentos: {count} (10 items), RSA 2048 / SHA-256")
+    print(f"{'PKCS#12 por firma':<32}{cold:>10.0f} firmas/s")
+    print(f"{'llave en caché':<32}{cached:>10.0f} firmas/s")
+    print(f"{f'lote, {workers} procesos (build+firma)':<32}{batch:>10.0f} docs/s")
+    print(f"verificación tras serializar: ok; errores en lote: {len(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Memoria pico del modo árbol (build + get_xml_string + encode) contra el modo
+streaming (iter_xml_bytes) según crece la cantidad de items. Cada medición
+corre en un proceso nuevo para que ru_maxrss no arrastre la anterior; también
+comprueba que ambos modos producen los mismos bytes.
+
+Uso: python -m benchmarks.streaming_memory
+"""
+import copy
+import resource
+import multiprocessing
+from datetime import datetime
+from verify_builders import get_base_mock_data
+from app.services.xml_builder import ECFBuilderFactory
+import app.services.xml_generation.base_builder as base_builder
+
+SIZES = [100, 1000, 10000, 50000]
+
+
+class _FixedDatetime(datetime):
+    # FechaHoraFirma fija para poder comparar bytes entre modos
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2024, 1, 1, 12, 0, 0)
+
+
+def make_payload(items):
+    data = get_base_mock_data(46, "E460000000001")
+    data['Encabezado']['IdDoc']['FechaVencimientoSecuencia'] = "2025-12-31"
+    item = data['DetallesItems'][0]
+    data['DetallesItems'] = [dict(item, NumeroLinea=n + 1, DescripcionItem=f"Lote {n}") for n in range(items)]
+    return data
+
+
+def _measure(mode, items, queue):
+    data = make_payload(items)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    builder = ECFBuilderFactory.get_builder(data)
+    size = 0
+    if mode == "tree":
+        builder.build()
+        size = len(builder.get_xml_string().encode('utf-8'))
+    else:
+        for chunk in builder.iter_xml_bytes():
+            size += len(chunk)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((size, (after - before) / 1024))
+
+
+def measure(mode, items):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(mode, items, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def check_identical(items=500):
+    base_builder.datetime = _FixedDatetime
+    data = make_payload(items)
+    tree = ECFBuilderFactory.get_builder(copy.deepcopy(data))
+    tree.build()
+    streamed = b"".join(ECFBuilderFactory.get_builder(copy.deepcopy(data)).iter_xml_bytes())
+    base_builder.datetime = datetime
+    return tree.get_xml_string().encode('utf-8') == streamed
+
+
+def main():
+    print(f"Bytes idénticos entre modos: {check_identical()}")
+    print(f"{'items':>8}{'XML (KB)':>12}{'árbol +MB':>12}{'stream +MB':>12}")
+    for items in SIZES:
+        size, tree_mb = measure("tree", items)
+        _, stream_mb = measure("stream", items)
+        print(f"{items:>8}{size / 1024:>12.0f}{tree_mb:>12.1f}{stream_mb:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Suite de rendimiento del pipeline de generación de e-CF.
+
+Para cada TipoeCF, tamaño (cantidad de items) y variante (con o sin los bloques
+opcionales Subtotales, DescuentosORecargos, Paginacion y OtraMoneda) mide por
+separado cada fase de create_ecf:
+
+    dispatch   ECFBuilderFactory.get_builder()
+    build      builder.build()
+    serialize  get_xml_string().encode('utf-8')
+    validate   fromstring + validación contra el XSD compilado (SchemaRegistry)
+
+y reporta docs/s, p50/p99 por fase y la memoria pico (ru_maxrss de un proceso
+nuevo por caso). Los resultados se guardan en JSON con el commit actual, para
+comparar dos corridas:
+
+    python -m benchmarks.suite run [--sizes 1,10,100,1000,10000] [--backend manual]
+                                   [--tipos 31,32] [--no-memory] [-o salida.json]
+    python -m benchmarks.suite compare base.json nuevo.json [--threshold 0.10]
+
+compare termina con código 1 si algún caso empeora su p50 total más que el umbral.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+import multiprocessing
+from datetime import datetime
+from lxml import etree
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.schema_registry import schema_registry, SchemaUnavailableError
+from benchmarks.payloads import TIPOS, make_payload
+
+SIZES = [1, 10, 100, 1000, 10000]
+PHASES = ('dispatch', 'build', 'serialize', 'validate')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def _iterations(items):
+    # ~20k líneas por caso: suficientes muestras para el p99 sin eternizar los 10k
+    return max(5, min(500, 20000 // items))
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(samples):
+    return {
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+    }
+
+
+def run_once(data, backend, validate):
+    """Una pasada del pipeline; devuelve los segundos de cada fase y el tamaño del XML."""
+    t0 = time.perf_counter()
+    builder = ECFBuilderFactory.get_builder(data, backend)
+    t1 = time.perf_counter()
+    builder.build()
+    t2 = time.perf_counter()
+    xml_bytes = builder.get_xml_string().encode('utf-8')
+    t3 = time.perf_counter()
+    if validate:
+        schema_registry.validate(builder.tipo_ecf, etree.fromstring(xml_bytes))
+    t4 = time.perf_counter()
+    return (t1 - t0, t2 - t1, t3 - t2, t4 - t3), len(xml_bytes)
+
+
+def _can_validate(tipo):
+    try:
+        return schema_registry.get(tipo).error is None
+    except SchemaUnavailableError:
+        return False
+
+
+def time_case(tipo, items, optional, backend):
+    data = make_payload(tipo, items, optional=optional)
+    validate = _can_validate(tipo)
+    run_once(data, backend, validate)  # calentamiento
+
+    samples = {phase: [] for phase in PHASES}
+    totals = []
+    size = 0
+    for _ in range(_iterations(items)):
+        phases, size = run_once(data, backend, validate)
+        for phase, seconds in zip(PHASES, phases):
+            samples[phase].append(seconds)
+        totals.append(sum(phases))
+
+    result = {
+        "tipo": tipo,
+        "items": items,
+        "optional": optional,
+        "iterations": len(totals),
+        "xml_bytes": size,
+        "validated": validate,
+        "docs_per_s": len(totals) / sum(totals),
+        "items_per_s": len(totals) * items / sum(totals),
+        "total": _summary(totals),
+        "phases": {phase: _summary(values) for phase, values in samples.items()},
+    }
+    if not validate:
+        # El XSD no compila en libxml2: la fase no se midió
+        result["phases"]["validate"] = None
+    return result
+
+
+def _measure_memory(tipo, items, optional, backend, queue):
+    data = make_payload(tipo, items, optional=optional)
+    validate = _can_validate(tipo)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    run_once(data, backend, validate)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((after - before) / 1024)
+
+
+def peak_memory_mb(tipo, items, optional, backend):
+    """Memoria pico adicional de un documento, en un proceso nuevo para que ru_maxrss no arrastre casos anteriores."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure_memory, args=(tipo, items, optional, backend, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, tipos, backend, memory):
+    results = []
+    print(f"{'Tipo':<6}{'items':>7}{'opc':>5}{'docs/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'build':>9}{'xml':>9}{'xsd':>9}{'+MB':>8}")
+    for items in sizes:
+        for tipo in tipos:
+            for optional in (False, True):
+                result = time_case(tipo, items, optional, backend)
+                result["peak_rss_mb"] = peak_memory_mb(tipo, items, optional, backend) if memory else None
+                results.append(result)
+
+                phases = result["phases"]
+                xsd = f"{phases['validate']['p50_ms']:.2f}" if phases["validate"] else "-"
+                mem = f"{result['peak_rss_mb']:.1f}" if memory else "-"
+                print(f"{tipo:<6}{items:>7}{'sí' if optional else 'no':>5}{result['docs_per_s']:>10.0f}"
+                      f"{result['total']['p50_ms']:>10.2f}{result['total']['p99_ms']:>10.2f}"
+                      f"{phases['build']['p50_ms']:>9.2f}{phases['serialize']['p50_ms']:>9.2f}{xsd:>9}{mem:>8}")
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.now().isoformat(timespec='seconds'),
+            "backend": backend,
+            "python": platform.python_version(),
+            "lxml": etree.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def _key(result):
+    return (result["tipo"], result["items"], result["optional"])
+
+
+def compare(base, new, threshold):
+    """Imprime la variación del p50 total por caso y devuelve los casos que empeoraron más que el umbral."""
+    base_results = {_key(r): r for r in base["results"]}
+    regressions = []
+    print(f"base {base['meta'].get('commit')} ({base['meta'].get('backend')}) -> "
+          f"nuevo {new['meta'].get('commit')} ({new['meta'].get('backend')})")
+    print(f"{'Tipo':<6}{'items':>7}{'opc':>5}{'base ms':>10}{'nuevo ms':>10}{'cambio':>9}")
+    for result in new["results"]:
+        old = base_results.get(_key(result))
+        if old is None:
+            continue
+        before, after = old["total"]["p50_ms"], result["total"]["p50_ms"]
+        change = (after - before) / before
+        flag = ""
+        if change > threshold:
+            flag = "  <-- regresión"
+            regressions.append(_key(result))
+        print(f"{result['tipo']:<6}{result['items']:>7}{'sí' if result['optional'] else 'no':>5}"
+              f"{before:>10.2f}{after:>10.2f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite de rendimiento de generación de e-CF")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Ejecuta la suite y guarda el JSON")
+    run_parser.add_argument("--sizes", type=_int_list, default=SIZES)
+    run_parser.add_argument("--tipos", type=_int_list, default=TIPOS)
+    run_parser.add_argument("--backend", default="manual", choices=("manual", "generated"))
+    run_parser.add_argument("--no-memory", action="store_true", help="No medir memoria pico (más rápido)")
+    run_parser.add_argument("-o", "--output", help="Archivo JSON (por defecto benchmarks/results/<commit>-<backend>.json)")
+
+    compare_parser = sub.add_parser("compare", help="Compara dos corridas")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Empeoramiento tolerado del p50 total (0.10 = 10%%)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} casos empeoraron más de {args.threshold:.0%}")
+            return 1
+        return 0
+
+    report = run(args.sizes, args.tipos, args.backend, not args.no_memory)
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{report['meta']['commit'] or 'local'}-{args.backend}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados en {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""
+Motor de totales: propiedades sobre documentos aleatorios y tiempo por tamaño de factura.
+
+Propiedades, sobre documentos de todos los TipoeCF con líneas, indicadores,
+descuentos, recargos, ajustes globales, IndicadorMontoGravado y TipoCambio al azar:
+  - compute() da lo mismo que un cálculo de referencia línea por línea con Decimal,
+  - con los números como texto (camino Decimal) da lo mismo que con floats (camino entero),
+  - MontoGravadoTotal = suma de MontoGravadoIn, TotalITBIS = suma de TotalITBISn y
+    MontoTotal = MontoGravadoTotal + MontoExento + TotalITBIS + MontoImpuestoAdicional,
+  - reordenar las líneas no cambia los totales,
+  - lo que completa el modo 'missing' pasa el modo 'enforce' con tolerancia 0,
+  - una línea o un total alterado en más de la tolerancia se reporta en su ruta exacta,
+  - cada monto de OtraMoneda x TipoCambio vuelve al monto en pesos (± medio centavo).
+
+Uso: python -m benchmarks.totals [documentos] [semilla]
+"""
+import sys
+import copy
+import time
+import random
+from decimal import Decimal, ROUND_HALF_UP
+from app.services.totals import TotalsEngine, compute, to_decimal, OTRA_MONEDA, TASAS_ITBIS
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.suite import _percentile
+
+CENT = Decimal('0.01')
+
+
+def _random_number(rng, low, high, digits):
+    value = round(rng.uniform(low, high), digits)
+    return int(value) if rng.random() < 0.2 else value
+
+
+def random_document(rng, tipo, lines):
+    payload = make_payload(tipo, items=1, seq=rng.randrange(1, 10 ** 6))
+    encabezado = payload['Encabezado']
+    encabezado['Totales'] = {}
+    if rng.random() < 0.3:
+        encabezado['Totales']['MontoImpuestoAdicional'] = _random_number(rng, 0, 500, 2)
+    encabezado['IdDoc']['IndicadorMontoGravado'] = rng.choice([0, 1])
+    if rng.random() < 0.5:
+        encabezado['OtraMoneda'] = {'TipoMoneda': 'USD', 'TipoCambio': _random_number(rng, 1, 120, 4)}
+    kinds = rng.sample([0, 1, 2, 3, 4], rng.randint(1, 3))
+    items = []
+    for n in range(lines):
+        item = {'NumeroLinea': n + 1, 'IndicadorFacturacion': rng.choice(kinds), 'NombreItem': f'Item {n + 1}',
+                'IndicadorBienoServicio': 1, 'CantidadItem': _random_number(rng, 0.01, 1000, 2),
+                'PrecioUnitarioItem': _random_number(rng, 0.01, 100000, rng.choice([2, 4]))}
+        if rng.random() < 0.2:
+            # A veces mayor que el bruto: líneas negativas, redondeo hacia abajo
+            item['DescuentoMonto'] = _random_number(rng, 0, 500, 2)
+        if rng.random() < 0.1:
+            item['RecargoMonto'] = _random_number(rng, 0, 500, 2)
+        if rng.random() < 0.1:
+            item['Retencion'] = {'IndicadorAgenteRetencionoPercepcion': 1,
+                                 'MontoITBISRetenido': _random_number(rng, 0, 100, 2),
+                                 'MontoISRRetenido': _random_number(rng, 0, 100, 2)}
+        items.append(item)
+    payload['DetallesItems'] = items
+    ajustes = []
+    for n in range(rng.randint(0, 3)):
+        ajuste = {'NumeroLinea': n + 1, 'TipoAjuste': rng.choice(['D', 'R']), 'DescripcionDescuentooRecargo': 'Ajuste',
+                  'TipoValor': rng.choice(['$', '%']), 'IndicadorFacturacionDescuentooRecargo': rng.choice(kinds)}
+        ajuste['ValorDescuentooRecargo'] = _random_number(rng, 0, 15, 2)
+        if ajuste['TipoValor'] == '$' and rng.random() < 0.5:
+            ajuste['MontoDescuentooRecargo'] = ajuste['ValorDescuentooRecargo']
+        ajustes.append(ajuste)
+    if ajustes:
+        payload['DescuentosORecargos'] = {'DescuentoORecargo': ajustes}
+    return payload
+
+
+def _q(value, digits=2):
+    return to_decimal(value).quantize(Decimal(1).scaleb(-digits), ROUND_HALF_UP)
+
+
+def reference(data):
+    """Los mismos totales, línea por línea y sin atajos."""
+    buckets = {}
+    for item in data['DetallesItems']:
+        monto = item.get('MontoItem')
+        if monto is None:
+            monto = (_q(item['CantidadItem']) * _q(item['PrecioUnitarioItem'], 4)
+                     - _q(item.get('DescuentoMonto')) + _q(item.get('RecargoMonto'))).quantize(CENT, ROUND_HALF_UP)
+        kind = item['IndicadorFacturacion']
+        buckets[kind] = buckets.get(kind, Decimal(0)) + _q(monto)
+    for ajuste in (data.get('DescuentosORecargos') or {}).get('DescuentoORecargo', []):
+        kind = ajuste['IndicadorFacturacionDescuentooRecargo']
+        if 'MontoDescuentooRecargo' in ajuste:
+            monto = _q(ajuste['MontoDescuentooRecargo'])
+        elif ajuste['TipoValor'] == '%':
+            monto = (to_decimal(ajuste['ValorDescuentooRecargo']) * buckets.get(kind, 0) / 100).quantize(
+                CENT, ROUND_HALF_UP)
+        else:
+            monto = _q(ajuste['ValorDescuentooRecargo'])
+        buckets[kind] = buckets.get(kind, Decimal(0)) + (-monto if ajuste['TipoAjuste'] == 'D' else monto)
+    totales = {}
+    incluye = data['Encabezado']['IdDoc'].get('IndicadorMontoGravado') == 1
+    for n, tasa in TASAS_ITBIS.items():
+        if n in buckets:
+            if incluye:
+                base = (buckets[n] * 100 / (100 + tasa)).quantize(CENT, ROUND_HALF_UP)
+                impuesto = buckets[n] - base
+            else:
+                base = buckets[n]
+                impuesto = (base * tasa / 100).quantize(CENT, ROUND_HALF_UP)
+            totales[f'MontoGravadoI{n}'], totales[f'TotalITBIS{n}'] = base, impuesto
+    for n, field in ((4, 'MontoExento'), (0, 'MontoNoFacturable')):
+        if n in buckets:
+            totales[field] = buckets[n]
+    return totales
+
+
+def check_document(data, failures):
+    tipo = data['Encabezado']['IdDoc']['TipoeCF']
+    totales, otra_moneda, calculated, montos = compute(data)
+
+    expected = reference(data)
+    for field, value in expected.items():
+        if totales.get(field) != value:
+            failures.append(f"{tipo}: {field} {totales.get(field)} != referencia {value}")
+
+    as_text = copy.deepcopy(data)
+    for item in as_text['DetallesItems']:
+        for field in ('CantidadItem', 'PrecioUnitarioItem', 'DescuentoMonto', 'RecargoMonto'):
+            if field in item:
+                item[field] = str(item[field])
+    if compute(as_text)[:3] != (totales, otra_moneda, calculated):
+        failures.append(f"{tipo}: el camino Decimal (texto) no coincide con el entero (floats)")
+
+    gravados = [n for n in TASAS_ITBIS if f'MontoGravadoI{n}' in totales]
+    if gravados:
+        if totales['MontoGravadoTotal'] != sum(totales[f'MontoGravadoI{n}'] for n in gravados) or \
+                totales['TotalITBIS'] != sum(totales[f'TotalITBIS{n}'] for n in gravados):
+            failures.append(f"{tipo}: MontoGravadoTotal o TotalITBIS no es la suma por tasa")
+    adicional = to_decimal(data['Encabezado']['Totales'].get('MontoImpuestoAdicional'))
+    if totales['MontoTotal'] != totales.get('MontoGravadoTotal', 0) + totales.get('MontoExento', 0) \
+            + totales.get('TotalITBIS', 0) + adicional:
+        failures.append(f"{tipo}: MontoTotal no cuadra")
+
+    shuffled = copy.deepcopy(data)
+    random.Random(len(calculated)).shuffle(shuffled['DetallesItems'])
+    if compute(shuffled)[0] != totales:
+        failures.append(f"{tipo}: los totales dependen del orden de las líneas")
+
+    tipo_cambio = to_decimal((data['Encabezado'].get('OtraMoneda') or {}).get('TipoCambio'))
+    for field, om_field in OTRA_MONEDA:
+        if om_field in otra_moneda and field in totales:
+            if abs(otra_moneda[om_field] * tipo_cambio - totales[field]) > tipo_cambio / 200:
+                failures.append(f"{tipo}: {om_field} x TipoCambio no vuelve a {field}")
+
+    filled = copy.deepcopy(data)
+    engine = TotalsEngine()
+    engine.configure('missing')
+    engine.apply(filled)
+    engine.configure('enforce', '0')
+    errors = engine.apply(copy.deepcopy(filled))
+    if errors:
+        failures.append(f"{tipo}: lo completado no pasa 'enforce': {errors[:2]}")
+
+    engine.configure('enforce', '1.00')
+    line = len(calculated) // 2
+    altered = copy.deepcopy(filled)
+    altered['DetallesItems'][line]['MontoItem'] += 1.5
+    altered['Encabezado']['Totales']['MontoTotal'] -= 2
+    paths = {e['path'] for e in engine.apply(altered)}
+    wanted = {f"DetallesItems[{line}].MontoItem", "Encabezado.Totales.MontoTotal"}
+    if not wanted <= paths:
+        failures.append(f"{tipo}: no se reportó {sorted(wanted - paths)}")
+
+
+def properties(documents, seed):
+    rng = random.Random(seed)
+    failures = []
+    start = time.perf_counter()
+    for n in range(documents):
+        data = random_document(rng, TIPOS[n % len(TIPOS)], rng.choice([1, 2, 5, 20, 200]))
+        check_document(data, failures)
+    print(f"propiedades: {documents} documentos (semilla {seed}), {time.perf_counter() - start:.1f} s, "
+          f"{len(failures)} fallas")
+    for failure in failures[:20]:
+        print(f"  {failure}")
+    return not failures
+
+
+def timings():
+    rng = random.Random(1)
+    engine = TotalsEngine()
+    print(f"\n{'líneas':>8}{'compute p50 ms':>16}{'apply p50 ms':>14}{'µs/línea':>10}")
+    for lines in (10, 100, 1000, 10000, 100000):
+        data = random_document(rng, 31, lines)
+        data.pop('DescuentosORecargos', None)
+        runs = 50 if lines <= 10000 else 5
+        compute_times, apply_times = [], []
+        for _ in range(runs):
+            start = time.perf_counter()
+            compute(data)
+            compute_times.append(time.perf_counter() - start)
+            copy_ = {'Encabezado': copy.deepcopy(data['Encabezado']),
+                     'DetallesItems': [dict(item) for item in data['DetallesItems']]}
+            start = time.perf_counter()
+            engine.apply(copy_)
+            apply_times.append(time.perf_counter() - start)
+        p50 = _percentile(compute_times, 50)
+        print(f"{lines:>8}{p50 * 1000:>16.2f}{_percentile(apply_times, 50) * 1000:>14.2f}"
+              f"{p50 / lines * 1e6:>10.2f}")
+
+
+def main():
+    documents = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 18
+    ok = properties(documents, seed)
+    timings()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Latencia de validación XSD por petición: antes (parsear y compilar el XSD en
+cada llamada) y después (esquema compilado una vez en el SchemaRegistry).
+
+Uso: python -m benchmarks.validation [iteraciones]
+"""
+import sys
+import time
+from lxml import etree
+from verify_builders import get_base_mock_data
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.schema_registry import schema_registry
+
+TIPOS = [32, 33, 34, 41, 43, 44, 45, 46, 47]
+
+
+def build_xml(tipo):
+    data = get_base_mock_data(tipo, f"E{tipo}0000000001")
+    if tipo in (33, 34):
+        data['InformacionReferencia'] = {"NCFModificado": "E310000000001", "CodigoModificacion": 1}
+    if tipo in (41, 43, 44, 45, 46, 47):
+        data['Encabezado']['IdDoc']['FechaVencimientoSecuencia'] = "2024-12-31"
+    builder = ECFBuilderFactory.get_builder(data)
+    builder.build()
+    return builder.get_xml_string().encode('utf-8')
+
+
+def validate_uncached(xml_bytes, xsd_path):
+    # Comportamiento anterior de XMLValidator.validate()
+    xmlschema = etree.XMLSchema(etree.parse(xsd_path))
+    xmlschema.validate(etree.fromstring(xml_bytes))
+
+
+def validate_registry(xml_bytes, tipo):
+    schema_registry.validate(tipo, etree.fromstring(xml_bytes))
+
+
+def timeit(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{'Tipo':<6}{'antes p50':>12}{'antes p99':>12}{'despues p50':>14}{'despues p99':>14}{'x':>8}")
+    for tipo in TIPOS:
+        xml_bytes = build_xml(tipo)
+        xsd_path = schema_registry.get(tipo).path
+        schema_registry.get(tipo)  # compilación inicial fuera de la medición
+
+        before = timeit(lambda: validate_uncached(xml_bytes, xsd_path), iterations)
+        after = timeit(lambda: validate_registry(xml_bytes, tipo), iterations)
+        print(f"{tipo:<6}{before[0]:>10.3f}ms{before[1]:>10.3f}ms{after[0]:>12.3f}ms{after[1]:>12.3f}ms{before[0] / after[0]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,182 @@ from dotenv import load_dotenv
 class Config:
     load_dotenv()
     SECRET_KEY = os.getenv('SECRET_KEY')
+
+    # Builders: 'manual' (escritos a mano), 'generated' (generados desde los XSD, ver codegen.py)
+    # o 'direct' (los generados escribiendo el texto del XML sin crear elementos lxml)
+    ECF_BUILDER_BACKEND = os.getenv('ECF_BUILDER_BACKEND', 'manual')
+
+    # Validación XSD al generar un e-CF:
+    #   'off'     -> nunca
+    #   'request' -> solo si la petición trae ?validate=1
+    #   'sample'  -> una fracción (ECF_VALIDATION_SAMPLE_RATE) de las peticiones, o ?validate=1
+    #   'always'  -> todas
+    ECF_VALIDATION_MODE = os.getenv('ECF_VALIDATION_MODE', 'request')
+    ECF_VALIDATION_SAMPLE_RATE = float(os.getenv('ECF_VALIDATION_SAMPLE_RATE', '0.05'))
+
+    # Validación previa del JSON con las reglas de los XSD, antes de construir:
+    #   'enforce' -> un payload con errores se rechaza con 400 y la lista de errores
+    #   'report'  -> solo se registran en el log
+    #   'off'     -> no se revisa
+    ECF_PREFLIGHT_MODE = os.getenv('ECF_PREFLIGHT_MODE', 'enforce')
+
+    # Documentos con al menos esta cantidad de items se generan en modo streaming
+    # (también con ?stream=1). 0 lo desactiva. El XSD admite hasta 1000 items, así
+    # que el umbral tiene que quedar por debajo para que se use.
+    ECF_STREAM_MIN_ITEMS = int(os.getenv('ECF_STREAM_MIN_ITEMS', '300'))
+
+    # Paginacion automática: los documentos con más de esta cantidad de items que no
+    # traen Paginacion la generan, con TotalPaginas y los subtotales de cada página.
+    # 0 (por defecto) la desactiva: cambia el documento, así que se activa a propósito.
+    ECF_PAGINATION_LINES = int(os.getenv('ECF_PAGINATION_LINES', '0'))
+
+    # Formato del XML de /ecf/ecf: 'pretty' (indentado) o 'compact' (sin espacios entre
+    # etiquetas). El cliente lo elige por petición con ?format= o el header X-ECF-Format.
+    ECF_RESPONSE_FORMAT = os.getenv('ECF_RESPONSE_FORMAT', 'pretty')
+
+    # Compresión de la respuesta negociada con Accept-Encoding, en orden de preferencia
+    # ('zstd' requiere el paquete zstandard; vacío la desactiva). Solo por encima de
+    # ECF_COMPRESSION_MIN_BYTES; en modo streaming se comprime siempre.
+    ECF_COMPRESSION_ENCODINGS = os.getenv('ECF_COMPRESSION_ENCODINGS', 'zstd,gzip')
+    ECF_COMPRESSION_MIN_BYTES = int(os.getenv('ECF_COMPRESSION_MIN_BYTES', '1400'))
+    ECF_COMPRESSION_GZIP_LEVEL = int(os.getenv('ECF_COMPRESSION_GZIP_LEVEL', '6'))
+    ECF_COMPRESSION_ZSTD_LEVEL = int(os.getenv('ECF_COMPRESSION_ZSTD_LEVEL', '3'))
+
+    # /ecf/batch: procesos del pool (vacío = núcleos de la máquina, 0 = en el mismo proceso),
+    # documentos por tarea y tareas en vuelo (acota la memoria del lote)
+    ECF_BATCH_WORKERS = int(os.getenv('ECF_BATCH_WORKERS')) if os.getenv('ECF_BATCH_WORKERS') else None
+    ECF_BATCH_CHUNK_SIZE = int(os.getenv('ECF_BATCH_CHUNK_SIZE', '16'))
+    ECF_BATCH_MAX_IN_FLIGHT = int(os.getenv('ECF_BATCH_MAX_IN_FLIGHT')) if os.getenv('ECF_BATCH_MAX_IN_FLIGHT') else None
+    # /ecf/rfce/batch, /ecf/arecf/batch y /ecf/acecf/batch: cada documento cuesta
+    # unas decenas de µs, así que los bloques son más grandes que los de
+    # /ecf/batch para que el envío al pool no domine
+    ECF_DOCUMENT_BATCH_CHUNK_SIZE = int(os.getenv('ECF_DOCUMENT_BATCH_CHUNK_SIZE', '256'))
+
+    # Métricas por fase en /metrics. Cada worker vuelca sus histogramas en
+    # ECF_METRICS_DIR (vacío = un directorio temporal por proceso maestro) cada
+    # ECF_METRICS_FLUSH_INTERVAL segundos (0 = al terminar cada petición).
+    # Al morir un worker, gunicorn.conf.py suma su archivo a retired.json y lo borra.
+    ECF_METRICS_ENABLED = os.getenv('ECF_METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    ECF_METRICS_DIR = os.getenv('ECF_METRICS_DIR')
+    ECF_METRICS_FLUSH_INTERVAL = float(os.getenv('ECF_METRICS_FLUSH_INTERVAL', '1.0'))
+
+    # Log estructurado (JSON por línea) de /ecf/ecf, escrito desde un hilo de fondo.
+    # ECF_LOG_SAMPLE_RATE: fracción de peticiones exitosas que se loguean (los errores siempre).
+    # ECF_LOG_PAYLOAD: 'off', 'redacted' (sin datos del comprador) o 'full'; se adjunta en
+    # una fracción (ECF_LOG_PAYLOAD_SAMPLE_RATE) de las exitosas y en todos los errores.
+    # ECF_LOG_QUEUE_SIZE: registros en espera antes de descartar (0 = escribir en la petición).
+    ECF_LOG_ENABLED = os.getenv('ECF_LOG_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    ECF_LOG_SAMPLE_RATE = float(os.getenv('ECF_LOG_SAMPLE_RATE', '1.0'))
+    ECF_LOG_PAYLOAD = os.getenv('ECF_LOG_PAYLOAD', 'off')
+    ECF_LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('ECF_LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+    ECF_LOG_PAYLOAD_MAX_BYTES = int(os.getenv('ECF_LOG_PAYLOAD_MAX_BYTES', '4096'))
+    ECF_LOG_QUEUE_SIZE = int(os.getenv('ECF_LOG_QUEUE_SIZE', '10000'))
+
+    # Caché de idempotencia de /ecf/ecf por (RNCEmisor, eNCF, hash del payload), en un
+    # SQLite compartido por los workers (vacío = archivo en el directorio temporal).
+    # TTL en segundos; pasado el máximo de entradas se descartan las menos usadas.
+    ECF_IDEMPOTENCY_ENABLED = os.getenv('ECF_IDEMPOTENCY_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    ECF_IDEMPOTENCY_DB = os.getenv('ECF_IDEMPOTENCY_DB')
+    ECF_IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('ECF_IDEMPOTENCY_MAX_ENTRIES', '10000'))
+    ECF_IDEMPOTENCY_TTL = int(os.getenv('ECF_IDEMPOTENCY_TTL', '86400'))
+    ECF_IDEMPOTENCY_WAIT = float(os.getenv('ECF_IDEMPOTENCY_WAIT', '10'))
+
+    # /auth/semilla: semillas pre-generadas por worker, vigencia (segundos) de una
+    # semilla emitida, antigüedad máxima en el pool y SQLite compartido donde se registran
+    SEMILLA_POOL_SIZE = int(os.getenv('SEMILLA_POOL_SIZE', '256'))
+    SEMILLA_TTL = int(os.getenv('SEMILLA_TTL', '300'))
+    SEMILLA_MAX_AGE = int(os.getenv('SEMILLA_MAX_AGE', '60'))
+    SEMILLA_DB = os.getenv('SEMILLA_DB')
+
+    # Asignación de eNCF (app/services/sequence_allocator.py) desde los rangos autorizados
+    # que se registran en POST /ecf/secuencias:
+    #   'missing' -> /ecf/ecf y /ecf/batch asignan eNCF (y FechaVencimientoSecuencia) si no viene
+    #   'off'     -> el cliente siempre trae su eNCF
+    # Cada proceso reserva bloques de ECF_SEQUENCE_BLOCK_SIZE números en ECF_SEQUENCE_DB.
+    ECF_SEQUENCE_MODE = os.getenv('ECF_SEQUENCE_MODE', 'missing')
+    ECF_SEQUENCE_DB = os.getenv('ECF_SEQUENCE_DB')
+    ECF_SEQUENCE_BLOCK_SIZE = int(os.getenv('ECF_SEQUENCE_BLOCK_SIZE', '100'))
+
+    # Archivo de los e-CF generados (app/services/archive.py): cada XML se anexa
+    # comprimido a segmentos en ECF_ARCHIVE_DIR y se consulta en GET /ecf/<eNCF> y
+    # GET /ecf/archivo. Un segmento se sella con sus índices al llegar a
+    # ECF_ARCHIVE_SEGMENT_DOCS documentos. Códec 'zstd' (si está instalado) o 'zlib'.
+    ECF_ARCHIVE_ENABLED = os.getenv('ECF_ARCHIVE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    ECF_ARCHIVE_DIR = os.getenv('ECF_ARCHIVE_DIR')
+    ECF_ARCHIVE_SEGMENT_DOCS = int(os.getenv('ECF_ARCHIVE_SEGMENT_DOCS', '262144'))
+    ECF_ARCHIVE_CODEC = os.getenv('ECF_ARCHIVE_CODEC', 'zstd')
+    ECF_ARCHIVE_LEVEL = int(os.getenv('ECF_ARCHIVE_LEVEL', '3'))
+
+    # Perfiles de emisor (app/services/emitter_profiles.py) registrados en PUT /ecf/emisores/<rnc>,
+    # en un SQLite compartido por los workers (vacío = archivo en el directorio temporal).
+    # Cada proceso revisa si otro cambió un perfil como mucho cada tantos segundos.
+    ECF_PROFILES_DB = os.getenv('ECF_PROFILES_DB')
+    ECF_PROFILES_CHECK_INTERVAL = float(os.getenv('ECF_PROFILES_CHECK_INTERVAL', '1.0'))
+
+    # Firma XMLDSig dentro del servicio (app/services/xml_signer.py):
+    #   'off'     -> se deja el placeholder de <Signature>
+    #   'request' -> solo si la petición trae ?sign=1
+    #   'always'  -> todas
+    # Certificados PKCS#12 en ECF_CERTS_DIR/<RNCEmisor>.p12; contraseña por RNC
+    # ("rnc=clave,rnc=clave") o una común. Las llaves se cachean por proceso.
+    ECF_SIGN_MODE = os.getenv('ECF_SIGN_MODE', 'off')
+    ECF_CERTS_DIR = os.getenv('ECF_CERTS_DIR')
+    ECF_CERT_PASSWORD = os.getenv('ECF_CERT_PASSWORD')
+    ECF_CERT_PASSWORDS = os.getenv('ECF_CERT_PASSWORDS')
+    ECF_KEY_CACHE_SIZE = int(os.getenv('ECF_KEY_CACHE_SIZE', '32'))
+    ECF_KEY_CACHE_TTL = int(os.getenv('ECF_KEY_CACHE_TTL', '3600'))
+
+    # Pipeline asíncrono (app/tasks): /ecf/ecf devuelve un id de trabajo y
+    # build -> validate -> sign -> submit -> poll corren en `python -m app.tasks.worker`.
+    #   'off'     -> siempre síncrono
+    #   'request' -> solo si la petición trae ?async=1
+    #   'always'  -> todas las peticiones
+    ECF_ASYNC_MODE = os.getenv('ECF_ASYNC_MODE', 'request')
+    ECF_TASKS_DB = os.getenv('ECF_TASKS_DB')
+    # Trabajos en curso por etapa (y hilos por etapa en cada proceso de workers)
+    ECF_TASKS_STAGE_LIMITS = os.getenv('ECF_TASKS_STAGE_LIMITS', 'build=4,validate=4,sign=4,submit=8,poll=8')
+    ECF_TASKS_VALIDATE = os.getenv('ECF_TASKS_VALIDATE', '1').lower() in ('1', 'true', 'yes')
+    ECF_TASKS_MAX_ATTEMPTS = int(os.getenv('ECF_TASKS_MAX_ATTEMPTS', '8'))
+    ECF_TASKS_BACKOFF_BASE = float(os.getenv('ECF_TASKS_BACKOFF_BASE', '1.0'))
+    ECF_TASKS_BACKOFF_MAX = float(os.getenv('ECF_TASKS_BACKOFF_MAX', '300'))
+    ECF_TASKS_POLL_INTERVAL = float(os.getenv('ECF_TASKS_POLL_INTERVAL', '5'))
+    ECF_TASKS_LEASE = float(os.getenv('ECF_TASKS_LEASE', '60'))
+
+    # Totales calculados desde DetallesItems (app/services/totals.py):
+    # 'missing' completa MontoItem y los campos de Totales/OtraMoneda que falten,
+    # 'report' además registra los que no coinciden, 'enforce' los rechaza con 400
+    # y 'off' emite lo que envía el cliente. La tolerancia es en pesos.
+    ECF_TOTALS_MODE = os.getenv('ECF_TOTALS_MODE', 'missing')
+    ECF_TOTALS_TOLERANCE = os.getenv('ECF_TOTALS_TOLERANCE', '1.00')
+
+    # Calentamiento al crear la app (app/services/warmup.py): 'sync', 'background' u 'off'.
+    # gunicorn.conf.py usa 'sync' con preload para compilar todo antes del fork.
+    ECF_WARMUP = os.getenv('ECF_WARMUP', 'background')
+
+    # Modo de servicio (gunicorn.conf.py y app/services/offload.py):
+    #   'sync'     -> workers sync: cada petición en curso ocupa un proceso entero
+    #   'threaded' -> workers gthread, un proceso por núcleo con ECF_SERVER_THREADS hilos
+    #                 para la E/S; build, validación XSD y firma pasan por pools acotados
+    ECF_SERVER_MODE = os.getenv('ECF_SERVER_MODE', 'sync')
+    # Perfil de gunicorn (gunicorn.conf.py). Workers vacío = 2 x núcleos + 1 en 'sync' y
+    # núcleos en 'threaded'. Con ECF_SERVER_THREADS > 1 y worker class 'sync', gunicorn usa 'gthread'.
+    ECF_SERVER_BIND = os.getenv('ECF_SERVER_BIND', '0.0.0.0:' + os.getenv('PORT', '8000'))
+    ECF_SERVER_WORKERS = int(os.getenv('ECF_SERVER_WORKERS')) if os.getenv('ECF_SERVER_WORKERS') else None
+    ECF_SERVER_WORKER_CLASS = os.getenv('ECF_SERVER_WORKER_CLASS', 'sync')
+    ECF_SERVER_THREADS = int(os.getenv('ECF_SERVER_THREADS')) if os.getenv('ECF_SERVER_THREADS') else None
+    # Modo 'threaded': hilos por etapa ("build=2,validate=0,sign=0", 0 = núcleos), trabajos en
+    # cola por etapa antes de responder 503, y el Retry-After (segundos) de ese 503
+    ECF_OFFLOAD_POOLS = os.getenv('ECF_OFFLOAD_POOLS', 'build=2')
+    ECF_OFFLOAD_QUEUE = int(os.getenv('ECF_OFFLOAD_QUEUE', '64'))
+    ECF_OFFLOAD_RETRY_AFTER = int(os.getenv('ECF_OFFLOAD_RETRY_AFTER', '1'))
+    ECF_SERVER_PRELOAD = os.getenv('ECF_SERVER_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+    ECF_SERVER_TIMEOUT = int(os.getenv('ECF_SERVER_TIMEOUT', '30'))
+    ECF_SERVER_MAX_REQUESTS = int(os.getenv('ECF_SERVER_MAX_REQUESTS', '0'))
+
+    # Servicios de la DGII (o el sustituto local: python -m app.tasks.dgii_standin)
+    DGII_BASE_URL = os.getenv('DGII_BASE_URL', 'https://ecf.dgii.gov.do/testecf')
+    DGII_TOKEN = os.getenv('DGII_TOKEN')
+    DGII_TIMEOUT = float(os.getenv('DGII_TIMEOUT', '30'))
     
     
 
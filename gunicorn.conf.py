@@ -0,0 +1,56 @@
+"""
+Perfil de producción de gunicorn (Procfile: gunicorn -c gunicorn.conf.py run:app).
+
+Con ECF_SERVER_PRELOAD la app se crea una vez en el maestro y se calienta
+(esquemas XSD, reglas de validación previa, builders) antes de crear los
+workers. Los workers la heredan por fork, en memoria compartida copy-on-write,
+y no pagan imports ni compilaciones en su primera petición.
+
+Con ECF_SERVER_MODE=threaded los workers son gthread: un proceso por núcleo
+con muchos hilos, así un cliente lento o una espera de E/S ocupa un hilo y no
+un proceso. El trabajo de CPU de esos hilos pasa por los pools acotados de
+app/services/offload.py.
+
+Los valores se toman de config.Config (variables ECF_SERVER_*).
+"""
+import gc
+import os
+from config import Config
+
+THREADED_THREADS = 32
+
+bind = Config.ECF_SERVER_BIND
+if Config.ECF_SERVER_MODE == 'threaded':
+    workers = Config.ECF_SERVER_WORKERS or (os.cpu_count() or 1)
+    worker_class = 'gthread'
+    threads = Config.ECF_SERVER_THREADS or THREADED_THREADS
+else:
+    workers = Config.ECF_SERVER_WORKERS or (2 * (os.cpu_count() or 1) + 1)
+    worker_class = Config.ECF_SERVER_WORKER_CLASS
+    threads = Config.ECF_SERVER_THREADS or 1
+preload_app = Config.ECF_SERVER_PRELOAD
+timeout = Config.ECF_SERVER_TIMEOUT
+max_requests = Config.ECF_SERVER_MAX_REQUESTS
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from app.services.warmup import warmup
+    # En modo 'background' espera a que termine: un fork a medias dejaría workers fríos
+    warmup.run()
+    # Lo cargado hasta aquí no lo vuelve a recorrer el GC de los workers, así sus
+    # páginas no se copian al tocar los contadores del recolector
+    gc.collect()
+    gc.freeze()
+    server.log.info("App precargada y caliente (%.2f s): %s", warmup.duration or 0, warmup.steps)
+
+
+def child_exit(server, worker):
+    # Sin esto el directorio de métricas acumula un archivo por cada worker reciclado
+    from app.services.metrics import metrics
+    try:
+        metrics.retire(worker.pid, Config.ECF_METRICS_DIR or metrics.default_dir(os.getpid()))
+    except OSError as e:
+        server.log.warning("No se pudieron retirar las métricas del worker %s: %s", worker.pid, e)
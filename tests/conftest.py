@@ -0,0 +1,63 @@
+"""
+Fixtures comunes: una app con todos sus archivos (SQLite, métricas, archivo)
+dentro del tmp_path de la prueba, y el sustituto local de la DGII servido en
+un puerto libre.
+"""
+import logging
+import threading
+import pytest
+from werkzeug.serving import make_server
+from config import Config
+from app import create_app
+from app.services.batch_builder import shutdown_executor
+from app.tasks.dgii_standin import create_standin_app
+from benchmarks.certs import write_self_signed_p12
+
+RNC = '101010101'
+PASSWORD = 'prueba'
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    def make(**overrides):
+        settings = {
+            'TESTING': True,
+            'ECF_TASKS_DB': str(tmp_path / 'tasks.sqlite3'),
+            'ECF_IDEMPOTENCY_DB': str(tmp_path / 'idempotency.sqlite3'),
+            'ECF_SEQUENCE_DB': str(tmp_path / 'sequences.sqlite3'),
+            'ECF_PROFILES_DB': str(tmp_path / 'profiles.sqlite3'),
+            'ECF_METRICS_DIR': str(tmp_path / 'metrics'),
+            'ECF_ARCHIVE_DIR': str(tmp_path / 'archive'),
+            'ECF_ARCHIVE_ENABLED': False,
+            'ECF_LOG_ENABLED': False,
+        }
+        settings.update(overrides)
+        # El pool se crea después de configurar la app, como en un worker de gunicorn
+        shutdown_executor()
+        return create_app(type('TestConfig', (Config,), settings))
+    return make
+
+
+@pytest.fixture
+def standin():
+    """Arranca el sustituto de la DGII; devuelve start(**opciones) -> (base_url, app)."""
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    servers = []
+
+    def start(**options):
+        app = create_standin_app(**options)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}", app
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def certs_dir(tmp_path):
+    path = str(tmp_path / 'certs')
+    write_self_signed_p12(path, RNC, PASSWORD)
+    return path
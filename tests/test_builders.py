@@ -0,0 +1,168 @@
+"""
+Pruebas diferenciales de los builders: 'direct' escribe los mismos bytes que
+'generated', y el modo streaming los mismos que el build completo, en cada
+TipoeCF y en salida indentada y compacta.
+"""
+import json
+import pytest
+from lxml import etree
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.xml_generation.base_builder import BaseECFBuilder
+from app.services.xml_signer import KeyStore, XMLSigner
+from benchmarks.payloads import TIPOS, make_payload
+from tests.conftest import RNC, PASSWORD
+
+
+def _variants(tipo):
+    yield 'mínimo', make_payload(tipo, items=1)
+    yield 'sin items', dict(make_payload(tipo, items=1), DetallesItems=[])
+    yield 'opcionales, 25 items', make_payload(tipo, items=25, optional=True)
+
+    data = make_payload(tipo, items=3, optional=True)
+    emisor = data['Encabezado']['Emisor']
+    emisor['RazonSocialEmisor'] = 'Peña & Asociados <S.R.L.> "El Águila" \'x\''
+    emisor['DireccionEmisor'] = 'Calle 1\r\nNo. 2\ttercer piso'
+    emisor['NombreComercial'] = ''
+    data['DetallesItems'][0]['NombreItem'] = 'ñandú ≥ 5 € — 😀'
+    yield 'textos especiales', data
+
+    data = make_payload(tipo, items=2, optional=True)
+    data['Encabezado']['IdDoc']['TablaFormasPago'] = {'FormaDePago': []}
+    data['Encabezado']['Emisor']['TablaTelefonoEmisor'] = []
+    yield 'bloques vacíos', data
+
+    data = make_payload(tipo, items=2, optional=True)
+    data['Encabezado']['Totales']['MontoExento'] = None
+    data['Encabezado']['Emisor']['TablaTelefonoEmisor'] = None
+    yield 'opcionales en null', data
+
+
+def _cases():
+    for tipo in TIPOS:
+        for name, payload in _variants(tipo):
+            # FechaHoraFirma fija: si no, dos builds pueden caer en segundos distintos
+            payload['FechaHoraFirma'] = '01-01-2024 10:00:00'
+            yield tipo, name, payload
+
+
+CASES = list(_cases())
+IDS = [f"{tipo}-{name}" for tipo, name, _ in CASES]
+
+
+def _build(payload, backend, stream=False, pretty=True):
+    builder = ECFBuilderFactory.get_builder(payload, backend)
+    builder.pretty = pretty
+    if stream:
+        return b''.join(builder.iter_xml_bytes())
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+@pytest.mark.parametrize('tipo,name,payload', CASES, ids=IDS)
+@pytest.mark.parametrize('pretty', [True, False], ids=['indentado', 'compacto'])
+def test_direct_matches_generated(tipo, name, payload, pretty):
+    expected = _build(payload, 'generated', pretty=pretty)
+    assert _build(payload, 'direct', pretty=pretty) == expected
+    assert _build(payload, 'direct', stream=True, pretty=pretty) == expected
+    assert _build(payload, 'generated', stream=True, pretty=pretty) == expected
+
+
+@pytest.mark.parametrize('tipo,name,payload', CASES, ids=IDS)
+def test_manual_stream_matches_build(tipo, name, payload):
+    for pretty in (True, False):
+        assert _build(payload, 'manual', stream=True, pretty=pretty) == _build(payload, 'manual', pretty=pretty)
+
+
+def _paged(payload, backend, stream, pretty=True):
+    builder = ECFBuilderFactory.get_builder(payload, backend)
+    builder.pretty = pretty
+    if stream:
+        return b''.join(builder.iter_xml_bytes())
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+@pytest.mark.parametrize('tipo', TIPOS)
+def test_pagination_is_the_same_in_every_mode(tipo, monkeypatch):
+    monkeypatch.setattr(BaseECFBuilder, 'lines_per_page', 5)
+    payload = make_payload(tipo, items=23)
+    payload['FechaHoraFirma'] = '01-01-2024 10:00:00'
+    for pretty in (True, False):
+        manual = _paged(payload, 'manual', False, pretty)
+        assert _paged(payload, 'manual', True, pretty) == manual
+        expected = _paged(payload, 'generated', False, pretty)
+        for backend, stream in (('generated', True), ('direct', False), ('direct', True)):
+            assert _paged(payload, backend, stream, pretty) == expected
+
+    root = etree.fromstring(expected)
+    pages = root.findall('Paginacion/Pagina')
+    assert len(pages) == 5
+    assert root.findtext('Encabezado/IdDoc/TotalPaginas') == '5'
+    covered = [n for page in pages
+               for n in range(int(page.findtext('NoLineaDesde')), int(page.findtext('NoLineaHasta')) + 1)]
+    assert covered == list(range(1, 24))
+
+
+@pytest.mark.parametrize('tipo', TIPOS)
+def test_signed_direct_matches_generated(tipo, certs_dir):
+    signer = XMLSigner(KeyStore(certs_dir, default_password=PASSWORD))
+    payload = make_payload(tipo, items=5)
+    payload['FechaHoraFirma'] = '01-01-2024 10:00:00'
+    signed = []
+    for backend in ('generated', 'direct'):
+        builder = ECFBuilderFactory.get_builder(payload, backend)
+        builder.build()
+        signer.sign_tree(builder.root, RNC)
+        signed.append(builder.get_xml_bytes())
+    assert signed[0] == signed[1]
+
+
+@pytest.mark.parametrize('backend', ['generated', 'direct'])
+def test_control_characters_are_rejected(backend):
+    payload = make_payload(32, items=1)
+    payload['Encabezado']['Emisor']['RazonSocialEmisor'] = 'control \x01'
+    with pytest.raises(ValueError):
+        _build(payload, backend)
+
+
+
+def _batch_xml(client, query='', headers=None):
+    payloads = [make_payload(32, items=3, seq=n) for n in (1, 2)]
+    response = client.post('/ecf/batch' + query, json=payloads, headers=headers or {})
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [r['status'] for r in records] == ['ok', 'ok']
+    return [r['xml'].split('?>', 1)[1].strip() for r in records]
+
+
+@pytest.mark.parametrize('query,headers', [('?format=compact', {}), ('', {'X-ECF-Format': 'compact'})])
+def test_batch_honours_compact_format(make_app, query, headers):
+    client = make_app().test_client()
+    assert all('\n' in xml for xml in _batch_xml(client))
+    assert not any('\n' in xml for xml in _batch_xml(client, query, headers))
+
+
+def test_streamed_response_is_not_buffered(make_app):
+    client = make_app(ECF_IDEMPOTENCY_ENABLED=False).test_client()
+    payload = make_payload(32, items=20, seq=1)
+    payload['FechaHoraFirma'] = '01-01-2024 10:00:00'
+    streamed = client.post('/ecf/ecf?stream=1', json=payload)
+    built = client.post('/ecf/ecf', json=payload)
+    # Sin Content-Length: el cuerpo sale a medida que se escribe
+    assert 'Content-Length' not in streamed.headers
+    assert 'Content-Length' in built.headers
+    assert streamed.data == built.data
+
+
+def test_large_invoice_streams_under_default_settings(make_app):
+    client = make_app().test_client()
+    payload = make_payload(32, items=300, seq=1)
+    payload['FechaHoraFirma'] = '01-01-2024 10:00:00'
+    streamed = client.post('/ecf/ecf', json=payload)
+    assert streamed.status_code == 200
+    assert 'Content-Length' not in streamed.headers
+    assert 'X-ECF-Cache' not in streamed.headers
+    # Con la clave del cliente pasa por la caché y sale completo, con los mismos bytes
+    keyed = client.post('/ecf/ecf', json=payload, headers={'Idempotency-Key': 'factura-1'})
+    assert keyed.headers['X-ECF-Cache'] == 'miss'
+    assert 'Content-Length' in keyed.headers
+    assert keyed.data == streamed.data
@@ -0,0 +1,121 @@
+"""Cliente DGII y pipeline asíncrono contra el sustituto local de la DGII."""
+import time
+import threading
+import pytest
+from app.tasks.dgii_client import DGIIClient, RetryableError
+from app.tasks.pipeline import Pipeline, RetryLater
+from app.tasks.queue import job_queue, FINAL_STATUSES
+from app.tasks.worker import worker_from_config
+from benchmarks.payloads import TIPOS, make_payload
+from tests.conftest import PASSWORD
+
+XML = b"<ECF><Encabezado><Emisor><RNCEmisor>101010101</RNCEmisor></Emisor>" \
+      b"<IdDoc><eNCF>E310000000001</eNCF></IdDoc></Encabezado></ECF>"
+
+
+def test_submit_and_status(standin):
+    base_url, _ = standin(processing_polls=1)
+    client = DGIIClient(base_url)
+    track_id = client.submit('101010101E310000000001.xml', XML)
+    assert client.status(track_id)['estado'] == 'En Proceso'
+    result = client.status(track_id)
+    assert result['estado'] == 'Aceptado'
+    assert result['encf'] == 'E310000000001'
+
+
+def test_transient_failures_are_retryable(standin):
+    base_url, _ = standin(failure_rate=1.0)
+    with pytest.raises(RetryableError):
+        DGIIClient(base_url).submit('doc.xml', XML)
+    base_url, _ = standin(throttle_rate=1.0)
+    with pytest.raises(RetryableError):
+        DGIIClient(base_url).submit('doc.xml', XML)
+
+
+def test_unreachable_host_is_retryable():
+    with pytest.raises(RetryableError):
+        DGIIClient('http://127.0.0.1:9', timeout=1.0).status('x')
+
+
+def test_client_errors_are_final(standin):
+    base_url, _ = standin()
+    client = DGIIClient(base_url)
+    with pytest.raises(ValueError):
+        client.submit('doc.xml', b'<ECF>')
+    with pytest.raises(ValueError):
+        client.status('no-existe')
+
+
+def test_one_session_per_thread(standin):
+    base_url, _ = standin()
+    client = DGIIClient(base_url)
+    sessions = []
+
+    def use():
+        client.submit('doc.xml', XML)
+        sessions.append(client.session)
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(session) for session in sessions}) == 4
+    assert client.session is client.session
+
+
+def test_pipeline_stages(standin):
+    base_url, _ = standin(processing_polls=1)
+    pipeline = Pipeline(DGIIClient(base_url), poll_interval=0.5)
+    payload = make_payload(32, items=3, seq=1)
+    job = {'payload': payload, 'rnc': '101010101', 'encf': payload['Encabezado']['IdDoc']['eNCF']}
+    for stage in ('build', 'validate', 'sign', 'submit'):
+        job.update(pipeline.run(stage, job))
+    assert job['tipo_ecf'] == 32 and job['track_id']
+    with pytest.raises(RetryLater) as info:
+        pipeline.run('poll', job)
+    assert info.value.delay == 0.5
+    assert pipeline.run('poll', job)['status'] == 'done'
+
+
+def test_pipeline_rejection(standin):
+    base_url, _ = standin(processing_polls=0, reject_rate=1.0)
+    pipeline = Pipeline(DGIIClient(base_url))
+    payload = make_payload(32, items=1, seq=1)
+    job = {'payload': payload, 'rnc': '101010101', 'encf': payload['Encabezado']['IdDoc']['eNCF']}
+    job.update(pipeline.run('build', job))
+    job.update(pipeline.run('submit', job))
+    assert pipeline.run('poll', job)['status'] == 'rejected'
+
+
+def test_async_documents_reach_the_dgii_signed_once(make_app, standin, certs_dir):
+    # Con 503 y 429 inyectados cada documento se reintenta hasta llegar una sola vez
+    base_url, standin_app = standin(failure_rate=0.2, throttle_rate=0.1, processing_polls=1, seed=7)
+    app = make_app(ECF_ASYNC_MODE='always', ECF_BUILDER_BACKEND='generated',
+                   ECF_CERTS_DIR=certs_dir, ECF_CERT_PASSWORD=PASSWORD,
+                   DGII_BASE_URL=base_url, ECF_TASKS_POLL_INTERVAL=0.02,
+                   ECF_TASKS_BACKOFF_BASE=0.01, ECF_TASKS_BACKOFF_MAX=0.05)
+    client = app.test_client()
+    job_ids, encfs = [], set()
+    for n, tipo in enumerate(TIPOS):
+        payload = make_payload(tipo, items=3, seq=n + 1)
+        response = client.post('/ecf/ecf', json=payload)
+        assert response.status_code == 202, response.data
+        job_ids.append(response.get_json()['job_id'])
+        encfs.add(payload['Encabezado']['IdDoc']['eNCF'])
+
+    worker = worker_from_config(app.config)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if all(job_queue.get(job_id)['status'] in FINAL_STATUSES for job_id in job_ids):
+                break
+            time.sleep(0.05)
+    finally:
+        worker.stop(timeout=5)
+
+    assert [job_queue.get(job_id)['status'] for job_id in job_ids] == ['done'] * len(TIPOS)
+    received = standin_app.config['DGII_RECEIVED'].values()
+    assert sorted(doc['encf'] for doc in received) == sorted(encfs)
+    assert all(doc['signed'] for doc in received)
@@ -0,0 +1,99 @@
+"""
+Lectura de e-CF recibidos: ida y vuelta JSON -> XML -> JSON -> XML con los
+mismos bytes, para cada TipoeCF y para RFCE, ARECF y ACECF.
+"""
+import io
+import json
+import copy
+import random
+import pytest
+from app.services.ecf_reader import ecf_reader
+from app.services.payload_validator import payload_validator
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_generation.document_builders import DOCUMENT_BUILDERS
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.rfce import receipt
+from benchmarks.receipts import outcome, COMPRADOR
+
+# La hora que el builder pone si no viene, fija para poder comparar bytes
+TIMESTAMPS = {'ARECF': 'FechaHoraAcuseRecibo', 'ACECF': 'FechaHoraAprobacionComercial'}
+
+
+def _xml(data, backend, pretty):
+    builder = ECFBuilderManager.get_builder(copy.deepcopy(data), backend)
+    builder.pretty = pretty
+    builder.build()
+    return builder.get_xml_bytes()
+
+
+def _document_xml(document, data, pretty):
+    builder = DOCUMENT_BUILDERS[document](copy.deepcopy(data))
+    builder.pretty = pretty
+    return builder.build()
+
+
+def _assert_round_trip(first, rebuild, key):
+    data = ecf_reader.read(io.BytesIO(first))
+    # Los bytes se parsean completos y el stream con iterparse: mismo JSON
+    assert ecf_reader.read(first) == data
+    second = rebuild(data)
+    assert second == first
+    assert ecf_reader.read(io.BytesIO(second)) == data
+    assert payload_validator.validate(data, key if isinstance(key, str) else None) == []
+
+
+@pytest.mark.parametrize('tipo', TIPOS)
+@pytest.mark.parametrize('backend', ['generated', 'direct'])
+@pytest.mark.parametrize('pretty', [True, False], ids=['indentado', 'compacto'])
+@pytest.mark.parametrize('items,optional', [(1, False), (150, True)], ids=['mínimo', 'opcionales'])
+def test_ecf_round_trip(tipo, backend, pretty, items, optional):
+    data = make_payload(tipo, items=items, seq=1, optional=optional)
+    data['FechaHoraFirma'] = '01-01-2024 12:00:00'
+    _assert_round_trip(_xml(data, backend, pretty), lambda d: _xml(d, backend, pretty), tipo)
+
+
+def _documents():
+    rng = random.Random(5)
+    yield 'RFCE', receipt(rng, 5)
+    for document, timestamp in TIMESTAMPS.items():
+        for n in range(5):
+            data = dict(outcome(rng, document, n), RNCComprador=COMPRADOR)
+            data[timestamp] = '01-01-2024 12:00:00'
+            yield document, data
+
+
+@pytest.mark.parametrize('document,data', list(_documents()))
+@pytest.mark.parametrize('pretty', [True, False], ids=['indentado', 'compacto'])
+def test_document_round_trip(document, data, pretty):
+    _assert_round_trip(_document_xml(document, data, pretty),
+                       lambda d: _document_xml(document, d, pretty), document)
+
+
+def test_items_are_read_incrementally():
+    data = make_payload(31, items=40, seq=1, optional=True)
+    xml = _xml(data, 'direct', False)
+    document = ecf_reader.open(io.BytesIO(xml))
+    assert document.tipo_ecf == 31
+    lines = [item['NumeroLinea'] for item in document.items()]
+    assert lines == list(range(1, 41))
+    assert 'Subtotales' in document.tail()
+    with pytest.raises(RuntimeError):
+        list(document.items())
+
+
+@pytest.mark.parametrize('source', [b'<ECF><Encabezado>', b'<Otro/>'])
+def test_invalid_documents(source):
+    with pytest.raises(ValueError):
+        ecf_reader.read(source)
+
+
+@pytest.mark.parametrize('stream', ['0', '1'])
+def test_parse_endpoint(make_app, stream):
+    client = make_app().test_client()
+    data = make_payload(32, items=30, seq=1)
+    xml = _xml(data, 'generated', True)
+    response = client.post(f'/ecf/parse?stream={stream}', data=xml, content_type='application/xml')
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True)) == ecf_reader.read(xml)
+    bad = client.post('/ecf/parse', data=b'<ECF>', content_type='application/xml')
+    assert bad.status_code == 400
@@ -0,0 +1,180 @@
+"""Asignador de eNCF: unicidad entre procesos y números gastados por /ecf/ecf."""
+import os
+import json
+import threading
+import multiprocessing
+import pytest
+from app.services.sequence_allocator import SequenceAllocator, SequenceError, sequence_allocator, parse_encf
+from app.services.xml_generation.base_builder import BaseECFBuilder
+from benchmarks.payloads import make_payload
+from tests.conftest import RNC
+
+TIPO = 31
+
+
+def _worker(path, threads, per_thread, out_path, crash):
+    allocator = SequenceAllocator()
+    allocator.configure(path, 7)
+    numbers = []
+    lock = threading.Lock()
+
+    def loop():
+        local = [parse_encf(allocator.allocate(RNC, TIPO)[0])[1] for _ in range(per_thread)]
+        with lock:
+            numbers.extend(local)
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    with open(out_path, 'w') as f:
+        f.write('\n'.join(map(str, numbers)))
+    if crash:
+        os._exit(0)  # sin release(): sus bloques quedan abiertos
+    allocator.release()
+
+
+def test_numbers_are_unique_across_processes(tmp_path):
+    processes, threads, per_thread = 4, 3, 40
+    path = str(tmp_path / 'sequences.sqlite3')
+    allocator = SequenceAllocator()
+    allocator.configure(path, 7)
+    total = processes * threads * per_thread
+    allocator.authorize(RNC, TIPO, 1, 1000, '2020-12-31')  # vencido: no se debe usar
+    ranges = [(1001, 1000 + total // 2), (5001 + total, 5000 + total * 3)]
+    for start, end in ranges:
+        allocator.authorize(RNC, TIPO, start, end, '2099-12-31')
+
+    ctx = multiprocessing.get_context('fork')
+    outs = [str(tmp_path / f'{n}.txt') for n in range(processes)]
+    procs = [ctx.Process(target=_worker, args=(path, threads, per_thread, outs[n], n == 0))
+             for n in range(processes)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert [p.exitcode for p in procs] == [0] * processes
+
+    handed = []
+    for out in outs:
+        with open(out) as f:
+            handed.extend(int(line) for line in f.read().split())
+    assert len(handed) == total
+    assert len(set(handed)) == total
+    assert all(any(s <= n <= e for s, e in ranges) for n in handed)
+
+    # Lo reservado es exactamente lo entregado más lo que unused() reporta
+    closed_unused, open_leased = set(), set()
+    for gap in allocator.unused(RNC, TIPO):
+        numbers = range(parse_encf(gap['desde'])[1], parse_encf(gap['hasta'])[1] + 1)
+        (closed_unused if gap['cerrado'] else open_leased).update(numbers)
+    leased = set()
+    for start, end in allocator._conn().execute("SELECT start, end FROM encf_leases"):
+        leased.update(range(start, end + 1))
+    assert not set(handed) & closed_unused
+    assert open_leased  # los bloques del proceso que no hizo release()
+    assert leased == (set(handed) - open_leased) | closed_unused | open_leased
+
+
+def test_exhausted_ranges(tmp_path):
+    allocator = SequenceAllocator()
+    allocator.configure(str(tmp_path / 'sequences.sqlite3'), 4)
+    allocator.authorize(RNC, TIPO, 1, 3, '2099-12-31')
+    assert [encf for encf, _ in allocator.allocate_many(RNC, TIPO, 5)] == \
+        ['E310000000001', 'E310000000002', 'E310000000003']
+    with pytest.raises(SequenceError):
+        allocator.allocate(RNC, TIPO)
+    with pytest.raises(SequenceError):
+        allocator.authorize(RNC, TIPO, 2, 10, '2099-12-31')
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app(ECF_SEQUENCE_MODE='missing', ECF_SEQUENCE_BLOCK_SIZE=10, ECF_BUILDER_BACKEND='manual')
+    sequence_allocator.authorize(RNC, 32, 1, 100, '2099-12-31')
+    return app.test_client()
+
+
+def _unassigned():
+    payload = make_payload(32, items=2)
+    del payload['Encabezado']['IdDoc']['eNCF']
+    payload['Encabezado']['IdDoc'].pop('FechaVencimientoSecuencia', None)
+    return payload
+
+
+def test_rejected_payload_uses_no_number(client):
+    bad = _unassigned()
+    del bad['Encabezado']['Emisor']['RazonSocialEmisor']
+    del bad['Encabezado']['Emisor']['DireccionEmisor']
+    assert client.post('/ecf/ecf', json=bad).status_code == 400
+    response = client.post('/ecf/ecf', json=_unassigned())
+    assert response.status_code == 200
+    assert b'<eNCF>E320000000001</eNCF>' in response.data
+
+
+def test_identical_payloads_get_different_numbers(client):
+    payload = _unassigned()
+    first = client.post('/ecf/ecf', json=payload)
+    second = client.post('/ecf/ecf', json=payload)
+    assert 'X-ECF-Cache' not in first.headers
+    assert b'<eNCF>E320000000001</eNCF>' in first.data
+    assert b'<eNCF>E320000000002</eNCF>' in second.data
+
+
+def test_retry_with_the_same_client_key_gets_the_same_number(client):
+    payload = _unassigned()
+    first = client.post('/ecf/ecf', json=payload, headers={'Idempotency-Key': 'venta-1'})
+    retry = client.post('/ecf/ecf', json=payload, headers={'Idempotency-Key': 'venta-1'})
+    other = client.post('/ecf/ecf', json=payload, headers={'Idempotency-Key': 'venta-2'})
+    assert (first.headers['X-ECF-Cache'], retry.headers['X-ECF-Cache']) == ('miss', 'hit')
+    assert retry.data == first.data
+    assert b'<eNCF>E320000000001</eNCF>' in first.data
+    assert b'<eNCF>E320000000002</eNCF>' in other.data
+
+
+def test_failed_build_voids_its_number(client, monkeypatch):
+    def boom(self):
+        raise RuntimeError("falla de prueba")
+
+    monkeypatch.setattr(BaseECFBuilder, 'build', boom)
+    assert client.post('/ecf/ecf', json=_unassigned()).status_code == 500
+    voided = [gap for gap in sequence_allocator.unused(RNC, 32) if gap.get('motivo')]
+    assert [(gap['desde'], gap['cantidad']) for gap in voided] == [('E320000000001', 1)]
+    assert 'falla de prueba' in voided[0]['motivo']
+
+
+def test_payload_with_encf_is_not_reassigned(client):
+    payload = make_payload(32, items=2, seq=77)
+    response = client.post('/ecf/ecf', json=payload)
+    assert response.status_code == 200
+    assert f"<eNCF>{payload['Encabezado']['IdDoc']['eNCF']}</eNCF>".encode() in response.data
+    assert sequence_allocator.capacity(RNC, 32)[0]['leased'] == 0
+
+
+def test_rejected_batch_documents_leave_no_gap(client):
+    bad = _unassigned()
+    del bad['Encabezado']['Emisor']['RazonSocialEmisor']
+    del bad['Encabezado']['Emisor']['DireccionEmisor']
+    payloads = [_unassigned(), bad, _unassigned(), bad, _unassigned()]
+    response = client.post('/ecf/batch', json=payloads)
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(r['status'], r.get('code')) for r in records] == [('ok', None), ('error', 400)] * 2 + [('ok', None)]
+    assert sorted(r['eNCF'] for r in records if r['status'] == 'ok') == \
+        ['E320000000001', 'E320000000002', 'E320000000003']
+    assert all(f"<eNCF>{r['eNCF']}</eNCF>" in r['xml'] for r in records if r['status'] == 'ok')
+    assert sequence_allocator.unused(RNC, 32) == []
+
+
+def test_failed_batch_document_voids_its_number(client, monkeypatch):
+    def boom(self):
+        raise RuntimeError("falla de prueba")
+
+    # En proceso: el parche no llega a un pool creado antes
+    client.application.config['ECF_BATCH_WORKERS'] = 0
+    monkeypatch.setattr(BaseECFBuilder, 'build', boom)
+    response = client.post('/ecf/batch', json=[_unassigned()])
+    record = json.loads(response.get_data(as_text=True))
+    assert (record['status'], record['code'], record['eNCF']) == ('error', 500, 'E320000000001')
+    voided = [gap for gap in sequence_allocator.unused(RNC, 32) if gap.get('motivo')]
+    assert [gap['desde'] for gap in voided] == ['E320000000001']
@@ -0,0 +1,95 @@
+"""Firma XMLDSig con un certificado autofirmado: cada documento firmado se verifica."""
+import base64
+import pytest
+from lxml import etree
+from cryptography import x509
+from app.services.xml_builder import ECFBuilderFactory
+from app.services.xml_generation.manager import ECFBuilderManager
+from app.services.xml_signer import KeyStore, XMLSigner, SigningKeyError, verify_tree, DS
+from benchmarks.certs import write_self_signed_p12
+from benchmarks.payloads import TIPOS, make_payload
+from tests.conftest import RNC, PASSWORD
+
+
+@pytest.fixture
+def signer(certs_dir):
+    return XMLSigner(KeyStore(certs_dir, default_password=PASSWORD))
+
+
+@pytest.fixture(params=['manual', 'generated', 'direct'])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(ECFBuilderManager, 'backend', request.param)
+    return request.param
+
+
+def _signed_bytes(signer, payload, pretty=True):
+    builder = ECFBuilderFactory.get_builder(payload)
+    builder.pretty = pretty
+    builder.build()
+    signer.sign_tree(builder.root, RNC, pretty)
+    return builder.get_xml_bytes()
+
+
+@pytest.mark.parametrize('tipo', TIPOS)
+@pytest.mark.parametrize('pretty', [True, False])
+def test_signed_documents_verify_after_reparsing(signer, backend, tipo, pretty):
+    xml = _signed_bytes(signer, make_payload(tipo, items=5, seq=1, optional=True), pretty)
+    root = etree.fromstring(xml)
+    assert verify_tree(root) is True
+    # Una sola firma, al final del documento, y sin el placeholder del builder
+    assert root[-1].tag == DS + 'Signature'
+    assert len(root.findall(DS + 'Signature')) == 1
+
+
+def test_signature_uses_the_emitter_certificate(signer, certs_dir):
+    root = etree.fromstring(_signed_bytes(signer, make_payload(32, items=2, seq=1)))
+    der = base64.b64decode(root.findtext('.//' + DS + 'X509Certificate'))
+    certificate = x509.load_der_x509_certificate(der)
+    assert certificate == signer.key_store.get(RNC).certificate
+    assert verify_tree(root, certificate)
+
+
+def test_tampered_document_fails(signer):
+    root = etree.fromstring(_signed_bytes(signer, make_payload(32, items=2, seq=1)))
+    root.find('Encabezado/Totales/MontoTotal').text = '1.00'
+    with pytest.raises(ValueError, match='DigestValue'):
+        verify_tree(root)
+
+
+def test_other_certificate_fails(signer, tmp_path):
+    root = etree.fromstring(_signed_bytes(signer, make_payload(32, items=2, seq=1)))
+    write_self_signed_p12(str(tmp_path / 'otro'), RNC, PASSWORD)
+    other = KeyStore(str(tmp_path / 'otro'), default_password=PASSWORD).get(RNC).certificate
+    with pytest.raises(ValueError, match='SignatureValue'):
+        verify_tree(root, other)
+
+
+def test_sign_bytes_replaces_previous_signature(signer):
+    xml = _signed_bytes(signer, make_payload(32, items=2, seq=1))
+    resigned = signer.sign_bytes(xml, RNC)
+    root = etree.fromstring(resigned)
+    assert len(root.findall(DS + 'Signature')) == 1
+    assert verify_tree(root)
+
+
+def test_missing_certificate(tmp_path):
+    signer = XMLSigner(KeyStore(str(tmp_path), default_password=PASSWORD))
+    with pytest.raises(SigningKeyError):
+        _signed_bytes(signer, make_payload(32, items=1, seq=1))
+
+
+def test_wrong_password(certs_dir):
+    signer = XMLSigner(KeyStore(certs_dir, default_password='otra'))
+    with pytest.raises(SigningKeyError):
+        _signed_bytes(signer, make_payload(32, items=1, seq=1))
+
+
+def test_sign_endpoint(make_app, certs_dir):
+    app = make_app(ECF_SIGN_MODE='request', ECF_CERTS_DIR=certs_dir, ECF_CERT_PASSWORD=PASSWORD)
+    client = app.test_client()
+    for query in ('?sign=1', '?sign=1&format=compact'):
+        response = client.post('/ecf/ecf' + query, json=make_payload(31, items=3, seq=1))
+        assert response.status_code == 200, response.data
+        assert verify_tree(etree.fromstring(response.data))
+    unsigned = client.post('/ecf/ecf', json=make_payload(31, items=3, seq=2))
+    assert etree.fromstring(unsigned.data).find(DS + 'Signature/' + DS + 'SignatureValue') is None
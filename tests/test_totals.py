@@ -0,0 +1,116 @@
+"""
+Motor de totales: propiedades sobre documentos aleatorios de todos los TipoeCF
+(generados con la semilla de cada caso) y el manejo de bloques mal formados.
+"""
+import copy
+import json
+import random
+import pytest
+from app.services.totals import TotalsEngine, compute, to_decimal, OTRA_MONEDA, TASAS_ITBIS
+from benchmarks.payloads import TIPOS, make_payload
+from benchmarks.totals import random_document, reference
+
+SEEDS = range(40)
+
+
+@pytest.fixture(params=SEEDS)
+def document(request):
+    rng = random.Random(request.param)
+    return random_document(rng, TIPOS[request.param % len(TIPOS)], rng.choice([1, 2, 5, 20, 200]))
+
+
+def _engine(mode, tolerance='1.00'):
+    engine = TotalsEngine()
+    engine.configure(mode, tolerance)
+    return engine
+
+
+def test_matches_line_by_line_reference(document):
+    totales = compute(document)[0]
+    for field, value in reference(document).items():
+        assert totales.get(field) == value, field
+
+
+def test_text_numbers_give_the_same_totals(document):
+    as_text = copy.deepcopy(document)
+    for item in as_text['DetallesItems']:
+        for field in ('CantidadItem', 'PrecioUnitarioItem', 'DescuentoMonto', 'RecargoMonto'):
+            if field in item:
+                item[field] = str(item[field])
+    assert compute(as_text)[:3] == compute(document)[:3]
+
+
+def test_totals_add_up(document):
+    totales = compute(document)[0]
+    gravados = [n for n in TASAS_ITBIS if f'MontoGravadoI{n}' in totales]
+    if gravados:
+        assert totales['MontoGravadoTotal'] == sum(totales[f'MontoGravadoI{n}'] for n in gravados)
+        assert totales['TotalITBIS'] == sum(totales[f'TotalITBIS{n}'] for n in gravados)
+    adicional = to_decimal(document['Encabezado']['Totales'].get('MontoImpuestoAdicional'))
+    assert totales['MontoTotal'] == totales.get('MontoGravadoTotal', 0) + totales.get('MontoExento', 0) \
+        + totales.get('TotalITBIS', 0) + adicional
+
+
+def test_line_order_does_not_matter(document):
+    shuffled = copy.deepcopy(document)
+    random.Random(0).shuffle(shuffled['DetallesItems'])
+    assert compute(shuffled)[0] == compute(document)[0]
+
+
+def test_otra_moneda_converts_back(document):
+    totales, otra_moneda = compute(document)[:2]
+    tipo_cambio = to_decimal((document['Encabezado'].get('OtraMoneda') or {}).get('TipoCambio'))
+    for field, om_field in OTRA_MONEDA:
+        if om_field in otra_moneda and field in totales:
+            assert abs(otra_moneda[om_field] * tipo_cambio - totales[field]) <= tipo_cambio / 200, om_field
+
+
+def test_filled_totals_pass_enforce(document):
+    filled = copy.deepcopy(document)
+    assert _engine('missing').apply(filled) == []
+    assert _engine('enforce', '0').apply(filled) == []
+
+
+def test_altered_amounts_are_reported_at_their_path(document):
+    filled = copy.deepcopy(document)
+    _engine('missing').apply(filled)
+    line = len(filled['DetallesItems']) // 2
+    filled['DetallesItems'][line]['MontoItem'] += 1.5
+    filled['Encabezado']['Totales']['MontoTotal'] -= 2
+    errors = _engine('enforce', '1.00').apply(filled)
+    assert {e['rule'] for e in errors} == {'total'}
+    assert {f"DetallesItems[{line}].MontoItem", "Encabezado.Totales.MontoTotal"} <= {e['path'] for e in errors}
+
+
+def test_report_mode_logs_instead_of_rejecting(caplog):
+    data = make_payload(32, items=3)
+    _engine('missing').apply(data)
+    data['Encabezado']['Totales']['MontoTotal'] += 10
+    assert _engine('report').apply(data) == []
+    assert 'Encabezado.Totales.MontoTotal' in caplog.text
+
+
+@pytest.mark.parametrize('mode', ['missing', 'report', 'enforce'])
+@pytest.mark.parametrize('block', ['Totales', 'OtraMoneda'])
+def test_null_blocks_are_payload_errors(mode, block):
+    data = make_payload(32, items=3)
+    data['Encabezado'][block] = None
+    errors = _engine(mode).apply(data)
+    assert errors[0] == {"path": f"Encabezado.{block}", "rule": "type", "message": "Se esperaba un objeto"}
+
+
+@pytest.mark.parametrize('path', ['/ecf/ecf', '/ecf/batch'])
+def test_null_totales_is_a_400(make_app, path):
+    client = make_app(ECF_TOTALS_MODE='missing').test_client()
+    data = make_payload(32, items=3)
+    data['Encabezado']['Totales'] = None
+    if path == '/ecf/batch':
+        response = client.post(path, json=[data])
+        assert response.status_code == 200
+        record = json.loads(response.get_data(as_text=True))
+        assert (record['status'], record['code']) == ('error', 400)
+    else:
+        response = client.post(path, json=data)
+        assert response.status_code == 400
+        record = response.get_json()
+    assert 'Encabezado.Totales' in {e['path'] for e in record['errors']}